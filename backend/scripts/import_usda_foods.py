@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para importar a base de alimentos USDA RE-EDUCA Store.
+
+Gera o índice local usado por HealthService.search_foods/get_food_details
+(services/usda_food_store.py) a partir dos dumps em lote do FoodData Central:
+https://fdc.nal.usda.gov/download-datasets
+
+Fontes aceitas (pode combinar várias):
+- Diretório de um dump CSV (food.csv, food_nutrient.csv, food_category.csv)
+- Arquivo JSON (FoundationFoods / SRLegacyFoods)
+
+A base é trocada de forma atômica; a aplicação passa a usá-la sem reinício.
+
+Uso:
+    python scripts/import_usda_foods.py ~/Downloads/FoodData_Central_sr_legacy_food_csv_2018-04
+    python scripts/import_usda_foods.py foundation.json sr_legacy.json --output data/usda_foods
+
+Opções:
+    --output: Diretório da base (padrão: USDA_FOOD_STORE_PATH ou backend/data/usda_foods)
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from itertools import chain
+from pathlib import Path
+
+# Adiciona o diretório src ao path para imports
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir / "src"))
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Função principal da importação"""
+    parser = argparse.ArgumentParser(description="Importação da base de alimentos USDA RE-EDUCA Store")
+    parser.add_argument("sources", nargs="+", help="Diretórios CSV ou arquivos JSON do FoodData Central")
+    parser.add_argument(
+        "--output",
+        default=os.environ.get("USDA_FOOD_STORE_PATH", str(backend_dir / "data" / "usda_foods")),
+        help="Diretório da base local",
+    )
+
+    args = parser.parse_args()
+
+    from services.usda_food_store import read_usda_csv, read_usda_json, write_food_store
+
+    readers = []
+    for source in args.sources:
+        if os.path.isdir(source):
+            readers.append(read_usda_csv(source))
+        elif source.lower().endswith(".json"):
+            readers.append(read_usda_json(source))
+        else:
+            logger.error(f"Fonte não reconhecida (esperado diretório CSV ou .json): {source}")
+            sys.exit(1)
+
+    started = time.time()
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    total = write_food_store(chain(*readers), args.output, sources=[os.path.basename(s) for s in args.sources])
+
+    if not total:
+        logger.error("Nenhum alimento importado; verifique as fontes")
+        sys.exit(1)
+
+    logger.info(f"✓ {total} alimento(s) indexado(s) em {args.output} ({time.time() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
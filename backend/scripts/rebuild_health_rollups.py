@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para recalcular os rollups diários de saúde RE-EDUCA Store.
+
+Reconstrói health_daily_rollups a partir dos registros brutos (diário
+alimentar, exercícios, IMC, hidratação e sono). Use para o backfill do
+histórico após a migração 032 ou para corrigir divergências.
+
+O intervalo é processado em blocos de dias para manter cada transação curta.
+
+Uso:
+    python scripts/rebuild_health_rollups.py [--days 365] [--user USER_ID]
+    python scripts/rebuild_health_rollups.py --start 2024-01-01 --end 2024-12-31
+
+Opções:
+    --days: Quantidade de dias até hoje a recalcular (padrão: 365)
+    --start/--end: Intervalo explícito (YYYY-MM-DD); sobrepõe --days
+    --user: Recalcula apenas um usuário (padrão: todos)
+    --chunk-days: Dias por bloco (padrão: 30)
+"""
+
+import argparse
+import logging
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+# Adiciona o diretório src ao path para imports
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir / "src"))
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Função principal do rebuild"""
+    parser = argparse.ArgumentParser(description="Rebuild dos rollups diários de saúde RE-EDUCA Store")
+    parser.add_argument("--days", type=int, default=365, help="Dias até hoje a recalcular (padrão: 365)")
+    parser.add_argument("--start", type=date.fromisoformat, help="Primeiro dia (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Último dia (YYYY-MM-DD)")
+    parser.add_argument("--user", help="ID do usuário (padrão: todos)")
+    parser.add_argument("--chunk-days", type=int, default=30, help="Dias por bloco (padrão: 30)")
+
+    args = parser.parse_args()
+
+    end = args.end or date.today()
+    start = args.start or end - timedelta(days=args.days)
+    if start > end or args.chunk_days < 1:
+        logger.error("Intervalo inválido")
+        sys.exit(1)
+
+    from repositories.health_rollup_repository import HealthRollupRepository
+
+    repo = HealthRollupRepository()
+    scope = f"usuário {args.user}" if args.user else "todos os usuários"
+    logger.info(f"Recalculando rollups de {start} a {end} ({scope})")
+
+    total_rows = 0
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=args.chunk_days - 1), end)
+        rows = repo.rebuild(chunk_start.isoformat(), chunk_end.isoformat(), user_id=args.user)
+        if rows is None:
+            logger.error(f"Falha ao recalcular {chunk_start} a {chunk_end}; execute novamente a partir daqui")
+            sys.exit(1)
+
+        total_rows += rows
+        logger.info(f"✓ {chunk_start} a {chunk_end}: {rows} rollup(s)")
+        chunk_start = chunk_end + timedelta(days=1)
+
+    logger.info(f"Rebuild concluído: {total_rows} rollup(s) gravado(s)")
+
+
+if __name__ == "__main__":
+    main()
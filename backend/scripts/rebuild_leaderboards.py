@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para reconstruir os leaderboards RE-EDUCA Store a partir do ledger.
+
+Recalcula no Redis os rankings geral, semanal, mensal e por desafio com os
+totais de user_points e, opcionalmente, grava uma foto do topo de cada
+ranking em leaderboard_snapshots. Necessário uma vez para ativar a leitura
+dos rankings pelo Redis; depois o worker de leaderboards repete o rebuild
+periodicamente para corrigir divergências.
+
+Uso:
+    python scripts/rebuild_leaderboards.py [--batch-size 1000] [--snapshot]
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Adiciona o diretório src ao path para imports
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir / "src"))
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Função principal do rebuild"""
+    parser = argparse.ArgumentParser(description="Rebuild dos leaderboards RE-EDUCA Store")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Usuários por lote (padrão: 1000)")
+    parser.add_argument("--snapshot", action="store_true", help="Grava uma foto dos rankings após o rebuild")
+
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        logger.error("Tamanho de lote inválido")
+        sys.exit(1)
+
+    from services.leaderboard_service import leaderboard_service
+
+    if not leaderboard_service.redis:
+        logger.error("Redis indisponível: os leaderboards não podem ser construídos")
+        sys.exit(1)
+
+    logger.info("Reconstruindo leaderboards a partir do ledger de pontos")
+    try:
+        totals = leaderboard_service.rebuild(batch_size=args.batch_size)
+    except RuntimeError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    logger.info(
+        f"Rebuild concluído: {totals['users']} usuário(s) e {totals['challenges']} ranking(s) de desafios"
+    )
+
+    if args.snapshot:
+        saved = leaderboard_service.snapshot()
+        logger.info(f"Fotos gravadas: {', '.join(f'{board} ({count})' for board, count in saved.items()) or 'nenhuma'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para reconstruir o índice de busca social RE-EDUCA Store.
+
+Indexa todos os posts (termos e hashtags) e usuários (nome e email) no
+Redis. Depois do primeiro rebuild o índice é mantido pelos próprios
+eventos de posts e perfis; execute novamente após perda dos dados do
+Redis ou para corrigir divergências. Durante o rebuild a busca usa o banco.
+
+Uso:
+    python scripts/rebuild_social_search.py [--batch-size 500]
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Adiciona o diretório src ao path para imports
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir / "src"))
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Função principal do rebuild"""
+    parser = argparse.ArgumentParser(description="Rebuild do índice de busca social RE-EDUCA Store")
+    parser.add_argument("--batch-size", type=int, default=500, help="Registros por lote (padrão: 500)")
+
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        logger.error("Tamanho de lote inválido")
+        sys.exit(1)
+
+    from services.social_search_service import social_search
+
+    if not social_search.redis:
+        logger.error("Redis indisponível: o índice de busca não pode ser construído")
+        sys.exit(1)
+
+    logger.info("Reconstruindo índice de busca social")
+    totals = social_search.rebuild(batch_size=args.batch_size)
+    logger.info(f"Rebuild concluído: {totals['posts']} post(s) e {totals['users']} usuário(s) indexados")
+
+
+if __name__ == "__main__":
+    main()
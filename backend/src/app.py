@@ -120,8 +120,14 @@ def create_app(config_name=None):
     if not test_db_connection():
         logger.warning("Conexão com banco de dados falhou")
 
-    # Configura SocketIO
-    socketio = SocketIO(app, cors_allowed_origins="*", logger=True, engineio_logger=True)
+    # Configura SocketIO (com REDIS_URL, workers também emitem eventos pela fila do Redis)
+    socketio = SocketIO(
+        app,
+        cors_allowed_origins="*",
+        logger=True,
+        engineio_logger=True,
+        message_queue=os.environ.get("REDIS_URL") or None,
+    )
 
     # Registra blueprints
     register_blueprints(app)
@@ -228,9 +234,11 @@ def setup_websocket(socketio):
     para eventos de conexão, desconexão e streaming ao vivo.
     """
     from services.integration_service import integration_service
+    from services.realtime_service import realtime_service
 
     # Inicializar WebSocket via serviço de integração
     ws_service = integration_service.initialize_websocket(socketio)
+    realtime_service.init_app(socketio)
 
     # Eventos de conexão
     @socketio.on('connect')
@@ -270,6 +278,19 @@ def setup_websocket(socketio):
     def handle_report_stream(data):
         return ws_service.on_report_stream(data)
 
+    @socketio.on('set_slow_mode')
+    def handle_set_slow_mode(data):
+        return ws_service.on_set_slow_mode(data)
+
+    # Mensagens diretas
+    @socketio.on('send_direct_message')
+    def handle_send_direct_message(data):
+        return ws_service.on_send_direct_message(data)
+
+    @socketio.on('read_conversation')
+    def handle_read_conversation(data):
+        return ws_service.on_read_conversation(data)
+
 
 def register_error_handlers(app):
     """Registra handlers de erro"""
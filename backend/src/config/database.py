@@ -139,6 +139,19 @@ class SupabaseClient:
             logger.error(f"Erro na requisição Supabase: {e}")
             return {'error': str(e)}
 
+    def rpc(self, function_name: str, params: Optional[Dict] = None) -> Any:
+        """
+        Executa uma função SQL exposta pelo PostgREST (/rpc).
+
+        Args:
+            function_name (str): Nome da função SQL.
+            params (Optional[Dict]): Argumentos nomeados da função.
+
+        Returns:
+            Any: Retorno da função (JSON) ou dicionário de erro.
+        """
+        return self._make_request('POST', f'rpc/{function_name}', params or {})
+
     # Métodos para usuários
     def get_user_by_email(self, email: str) -> Optional[Dict]:
         """Busca usuário por email"""
@@ -458,22 +471,32 @@ class TableQueryBuilder:
 
     def gt(self, column: str, value: Any):
         """Adiciona filtro maior que."""
-        self.params[column] = f'gt.{value}'
-        return self
+        return self._add_range_filter(column, f'gt.{value}')
 
     def gte(self, column: str, value: Any):
         """Adiciona filtro maior ou igual."""
-        self.params[column] = f'gte.{value}'
-        return self
+        return self._add_range_filter(column, f'gte.{value}')
 
     def lt(self, column: str, value: Any):
         """Adiciona filtro menor que."""
-        self.params[column] = f'lt.{value}'
-        return self
+        return self._add_range_filter(column, f'lt.{value}')
 
     def lte(self, column: str, value: Any):
         """Adiciona filtro menor ou igual."""
-        self.params[column] = f'lte.{value}'
+        return self._add_range_filter(column, f'lte.{value}')
+
+    def _add_range_filter(self, column: str, expression: str):
+        """
+        Adiciona filtro de intervalo sem sobrescrever outro na mesma coluna.
+
+        gte + lte na mesma coluna viram parâmetros repetidos (?day=gte.X&day=lte.Y),
+        que o PostgREST combina com AND.
+        """
+        existing = self.params.get(column)
+        if existing is None:
+            self.params[column] = expression
+        else:
+            self.params[column] = (existing if isinstance(existing, list) else [existing]) + [expression]
         return self
 
     def like(self, column: str, pattern: str):
@@ -491,14 +514,20 @@ class TableQueryBuilder:
         self.params[column] = f'in.({",".join(map(str, values))})'
         return self
 
+    def or_(self, filters: str):
+        """Adiciona filtro OR no formato PostgREST (ex.: 'a.lt.1,and(a.eq.1,b.lt.2)')."""
+        self.params['or'] = f'({filters})'
+        return self
+
     def contains(self, column: str, value: Any):
         """Adiciona filtro contains (para arrays)."""
         self.params[column] = f'cs.{value if isinstance(value, str) else "{" + ",".join(map(str, value)) + "}"}'
         return self
 
     def order(self, column: str, desc: bool = False):
-        """Define ordenação."""
-        self.params['order'] = f'{column}.{"desc" if desc else "asc"}'
+        """Define ordenação (chamadas encadeadas acumulam colunas, como no PostgREST)."""
+        clause = f'{column}.{"desc" if desc else "asc"}'
+        self.params['order'] = f"{self.params['order']},{clause}" if self.params.get('order') else clause
         return self
 
     def range(self, from_: int, to_: int):
@@ -534,11 +563,12 @@ class TableQueryBuilder:
         self.method = 'DELETE'
         return self
 
-    def upsert(self, data: Dict[str, Any]):
-        """Prepara upsert."""
+    def upsert(self, data: Any, on_conflict: str = 'id'):
+        """Prepara upsert (aceita um registro ou uma lista para upsert em lote)."""
         self.method = 'POST'
         self.data = data
-        self.params['on_conflict'] = 'id'  # Assumir que há um campo id único
+        self.is_upsert = True
+        self.params['on_conflict'] = on_conflict
         return self
 
     def execute(self):
@@ -551,6 +581,9 @@ class TableQueryBuilder:
             headers = self.client.headers.copy()
             if self.columns and self.columns != '*' and self.method == 'GET':
                 headers['Prefer'] = f'return=representation,columns={self.columns}'
+            if getattr(self, 'is_upsert', False):
+                # Sem merge-duplicates o PostgREST trata o POST como insert puro
+                headers['Prefer'] = 'resolution=merge-duplicates,return=representation'
 
             # Preparar parâmetros de query (filtros)
             query_params = {}
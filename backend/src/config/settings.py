@@ -66,6 +66,10 @@ class Config:
 
         warnings.warn("USDA_API_KEY não definida. Usando valor padrão (apenas para desenvolvimento)")
     USDA_BASE_URL = "https://api.nal.usda.gov/fdc/v1"
+    # Base local de alimentos gerada por scripts/import_usda_foods.py (API vira fallback)
+    USDA_FOOD_STORE_PATH = os.environ.get(
+        "USDA_FOOD_STORE_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "usda_foods")
+    )
 
     # Configurações de CORS
     # Ler CORS_ORIGINS do ambiente, com fallback para desenvolvimento
@@ -19,9 +19,15 @@ from repositories.favorite_repository import FavoriteRepository
 from repositories.goal_repository import GoalRepository
 from repositories.groups_repository import GroupsRepository
 from repositories.health_repository import HealthRepository
+from repositories.health_rollup_repository import HealthRollupRepository
+from repositories.inventory_alert_repository import InventoryAlertRepository
 from repositories.inventory_repository import InventoryRepository
+from repositories.leaderboard_repository import LeaderboardRepository
+from repositories.gamification_repository import GamificationRepository
 from repositories.lgpd_repository import LGPDRepository
+from repositories.live_streaming_repository import LiveStreamingRepository
 from repositories.messages_repository import MessagesRepository
+from repositories.notification_repository import NotificationRepository
 from repositories.order_item_repository import OrderItemRepository
 from repositories.order_repository import OrderRepository
 from repositories.predictive_analysis_repository import PredictiveAnalysisRepository
@@ -29,7 +35,9 @@ from repositories.product_repository import ProductRepository
 from repositories.promotion_repository import PromotionRepository
 from repositories.shipping_repository import ShippingRepository
 from repositories.social_repository import SocialRepository
+from repositories.social_search_repository import SocialSearchRepository
 from repositories.subscription_repository import SubscriptionRepository
+from repositories.timeline_repository import TimelineRepository
 from repositories.transaction_repository import TransactionRepository
 from repositories.two_factor_repository import TwoFactorRepository
 from repositories.user_repository import UserRepository
@@ -40,6 +48,7 @@ from repositories.workout_repository import WorkoutRepository
 __all__ = [
     "BaseRepository",
     "HealthRepository",
+    "HealthRollupRepository",
     "UserRepository",
     "ProductRepository",
     "ExerciseRepository",
@@ -50,10 +59,16 @@ __all__ = [
     "WorkoutRepository",
     "WorkoutPlanRepository",
     "SocialRepository",
+    "TimelineRepository",
+    "SocialSearchRepository",
+    "NotificationRepository",
+    "LeaderboardRepository",
+    "GamificationRepository",
     "CouponRepository",
     "CouponUsageRepository",
     "TwoFactorRepository",
     "InventoryRepository",
+    "InventoryAlertRepository",
     "AffiliateRepository",
     "LGPDRepository",
     "VideoRepository",
@@ -69,8 +84,6 @@ __all__ = [
     "ShippingRepository",
     "GroupsRepository",
     "MessagesRepository",
-    "FavoriteRepository",
-]
-itory",
+    "LiveStreamingRepository",
     "FavoriteRepository",
 ]
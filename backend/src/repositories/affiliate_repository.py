@@ -234,6 +234,106 @@ class AffiliateRepository(BaseRepository):
             self.logger.error(f"Erro ao fazer upsert de produto: {str(e)}", exc_info=True)
             return None
 
+    def find_product_hashes(self, product_source: str, page_size: int = 1000) -> Optional[Dict[str, str]]:
+        """
+        Busca o content_hash dos produtos já sincronizados de uma origem.
+
+        Args:
+            product_source: Origem (hotmart, kiwifi, other)
+            page_size: Linhas por consulta
+
+        Returns:
+            Dict platform_product_id -> content_hash, ou None em caso de erro
+        """
+        try:
+            hashes: Dict[str, str] = {}
+            offset = 0
+            while True:
+                result = (
+                    self.db.table("products")
+                    .select("platform_product_id, content_hash")
+                    .eq("product_source", product_source)
+                    .order("platform_product_id")
+                    .range(offset, offset + page_size - 1)
+                    .execute()
+                )
+                rows = result.data or []
+                hashes.update(
+                    {row["platform_product_id"]: row.get("content_hash") for row in rows if row.get("platform_product_id")}
+                )
+                if len(rows) < page_size:
+                    return hashes
+                offset += page_size
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar hashes de produtos de afiliados: {str(e)}", exc_info=True)
+            return None
+
+    def upsert_products_bulk(self, products: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Grava um lote de produtos de afiliados em uma chamada.
+
+        Usa upsert_affiliate_products (migração 047): atualiza os produtos
+        existentes cujo content_hash mudou e insere os novos.
+
+        Args:
+            products: Linhas com platform_product_id, product_source, content_hash
+                e os campos do produto
+
+        Returns:
+            Dict com success, updated e inserted, ou error
+        """
+        if not products:
+            return {"success": True, "updated": 0, "inserted": 0}
+        try:
+            result = self.db.rpc("upsert_affiliate_products", {"p_products": products})
+            if not isinstance(result, dict):
+                return {"success": False, "error": "Erro ao gravar produtos"}
+            return result
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {"success": False, "error": "Dados inválidos"}
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar lote de produtos de afiliados: {str(e)}", exc_info=True)
+            return {"success": False, "error": "Erro ao gravar produtos"}
+
+    def get_sync_state(self, platform: str) -> Dict[str, Any]:
+        """
+        Busca o estado da sincronização de uma plataforma.
+
+        Returns:
+            Registro de affiliate_sync_state (vazio se a plataforma nunca sincronizou)
+        """
+        try:
+            result = self.db.table("affiliate_sync_state").select("*").eq("platform", platform).execute()
+            return result.data[0] if result.data else {}
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar estado da sincronização {platform}: {str(e)}", exc_info=True)
+            return {}
+
+    def save_sync_state(self, platform: str, state: Dict[str, Any]) -> bool:
+        """
+        Grava o estado da sincronização de uma plataforma.
+
+        Args:
+            platform: Plataforma
+            state: Campos de affiliate_sync_state (cursor, last_stats...)
+
+        Returns:
+            True se gravado
+        """
+        try:
+            from datetime import datetime
+
+            record = {**state, "platform": platform, "updated_at": datetime.now().isoformat()}
+            result = self.db.table("affiliate_sync_state").upsert(record, on_conflict="platform").execute()
+            return bool(result.data)
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar estado da sincronização {platform}: {str(e)}", exc_info=True)
+            return False
+
     def find_all_products(self, platform: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Busca todos os produtos de afiliados.
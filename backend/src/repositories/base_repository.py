@@ -125,6 +125,100 @@ class BaseRepository(ABC):
             self.logger.error(f"Erro ao buscar {self.table_name} por ID {id}: {str(e)}", exc_info=True)
             return None
 
+    def find_by_ids(
+        self,
+        ids: List[str],
+        use_cache: bool = True,
+        cache_ttl: int = 300,
+        columns: str = "*",
+        cache_prefix: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca vários registros por ID em lote, com o mesmo cache de find_by_id.
+
+        Ordem de leitura: cache em memória (L1), Redis em uma única ida (L2) e
+        uma query IN só para os ids restantes.
+
+        Args:
+            ids: IDs dos registros
+            use_cache: Se deve usar cache (padrão: True)
+            cache_ttl: TTL do cache em segundos (padrão: 300)
+            columns: Colunas/JOINs do select (padrão: *)
+            cache_prefix: Prefixo das chaves (padrão: nome da tabela); use um
+                prefixo próprio quando columns não for "*"
+
+        Returns:
+            Registros encontrados, na ordem de ids
+        """
+        ids = [item_id for item_id in dict.fromkeys(ids) if item_id]
+        if not ids:
+            return []
+
+        from time import time
+
+        prefix = cache_prefix or self.table_name
+        found: Dict[str, Dict[str, Any]] = {}
+        if use_cache:
+            now = time()
+            for item_id in ids:
+                cache_key = f"{prefix}:id:{item_id}"
+                if cache_key in _cache and _cache_ttl.get(cache_key, 0) > now:
+                    found[item_id] = _cache[cache_key]
+
+            pending = [item_id for item_id in ids if item_id not in found]
+            if pending and USE_REDIS_CACHE and cache_service:
+                try:
+                    cached = cache_service.get_many([f"{prefix}:id:{item_id}" for item_id in pending])
+                    for item_id in pending:
+                        value = cached.get(f"{prefix}:id:{item_id}")
+                        if value:
+                            found[item_id] = value
+                            _cache[f"{prefix}:id:{item_id}"] = value
+                            _cache_ttl[f"{prefix}:id:{item_id}"] = now + cache_ttl
+                except Exception as e:
+                    # Falha de cache não deve quebrar a leitura: segue para o banco
+                    self.logger.debug(f"Erro ao ler cache em lote (não crítico): {str(e)}")
+
+        missing = [item_id for item_id in ids if item_id not in found]
+        if missing:
+            try:
+                result = self.db.table(self.table_name).select(columns).in_("id", missing).execute()
+                loaded = {row["id"]: row for row in (result.data or []) if row.get("id")}
+                found.update(loaded)
+                if use_cache and loaded:
+                    entries = {f"{prefix}:id:{item_id}": row for item_id, row in loaded.items()}
+                    if USE_REDIS_CACHE and cache_service:
+                        cache_service.set_many(entries, ttl=cache_ttl)
+                    expires = time() + cache_ttl
+                    for cache_key, row in entries.items():
+                        _cache[cache_key] = row
+                        _cache_ttl[cache_key] = expires
+            except (ValueError, KeyError) as e:
+                self.logger.warning(f"Erro de validação ao buscar {self.table_name} por IDs: {str(e)}")
+            except Exception as e:
+                self.logger.error(f"Erro ao buscar {self.table_name} por IDs: {str(e)}", exc_info=True)
+
+        return [found[item_id] for item_id in ids if item_id in found]
+
+    def _forget_cached_ids(self, ids: List[str], cache_prefix: Optional[str] = None):
+        """
+        Remove registros específicos do cache (L1 e L2), sem varrer a tabela.
+
+        Args:
+            ids: IDs dos registros
+            cache_prefix: Prefixo usado em find_by_ids (padrão: nome da tabela)
+        """
+        keys = [f"{cache_prefix or self.table_name}:id:{item_id}" for item_id in ids if item_id]
+        for cache_key in keys:
+            _cache.pop(cache_key, None)
+            _cache_ttl.pop(cache_key, None)
+        if keys and USE_REDIS_CACHE and cache_service:
+            try:
+                for cache_key in keys:
+                    cache_service.delete(cache_key)
+            except Exception as e:
+                self.logger.debug(f"Erro ao invalidar cache Redis (não crítico): {str(e)}")
+
     def _invalidate_cache(self, item_id: Optional[str] = None):
         """
         Invalida cache de um item específico ou toda a tabela.
@@ -384,5 +478,3 @@ class BaseRepository(ABC):
             True se existe, False caso contrário
         """
         return self.find_by_id(id) is not None
-ot None
-s not None
@@ -5,7 +5,7 @@ Repositório de Cupons RE-EDUCA Store.
 Gerencia acesso a dados de cupons de desconto.
 """
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from repositories.base_repository import BaseRepository
 
@@ -43,6 +43,22 @@ class CouponRepository(BaseRepository):
             self.logger.error(f"Erro ao buscar cupom: {str(e)}", exc_info=True)
             return None
 
+    def find_active_coupons(self) -> List[Dict[str, Any]]:
+        """
+        Busca todos os cupons ativos (índice de cupons e promoções).
+
+        Returns:
+            Lista de cupons ativos
+        """
+        try:
+            return self.find_all(filters={"is_active": True}, order_by="code", desc=False)
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            # Tratamento específico pode ser adicionado aqui
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar cupons ativos: {str(e)}", exc_info=True)
+            return []
+
     def is_valid(self, code: str) -> bool:
         """
         Verifica se cupom é válido.
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Repositório do Motor de Gamificação RE-EDUCA Store.
+
+Acesso a dados usado pelo GamificationEngine: catálogo de regras (desafios e
+conquistas ativos), aplicação de lotes de eventos (apply_gamification_events,
+migração 039) e contadores por usuário (user_gamification_stats).
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from repositories.base_repository import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+
+class GamificationRepository(BaseRepository):
+    """Repositório das regras e do progresso de gamificação."""
+
+    def __init__(self):
+        """Inicializa o repositório de gamificação."""
+        super().__init__("user_gamification_stats")
+
+    def get_active_challenges(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Desafios ativos (catálogo e regras).
+
+        Returns:
+            Lista de desafios ou None em caso de erro
+        """
+        try:
+            result = self.db.table("challenges").select("*").eq("is_active", True).execute()
+            return result.data if getattr(result, "data", None) else []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar desafios ativos: {str(e)}", exc_info=True)
+            return None
+
+    def get_active_achievements(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Conquistas ativas com requisitos (regras).
+
+        Returns:
+            Lista de conquistas ou None em caso de erro
+        """
+        try:
+            result = (
+                self.db.table("achievements")
+                .select("id, code, title, description, icon, rarity, points, requirements")
+                .eq("is_active", True)
+                .execute()
+            )
+            return result.data if getattr(result, "data", None) else []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar conquistas ativas: {str(e)}", exc_info=True)
+            return None
+
+    def apply_events(self, events: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Aplica um lote de eventos em uma transação.
+
+        Eventos já aplicados (mesmo event_id) são ignorados.
+
+        Args:
+            events: Lista de {event_id, user_id, day, active_day, updates}
+
+        Returns:
+            Progresso das regras alteradas ({user_id, kind, rule_id, progress,
+            target, completed, points, title}) ou None em caso de erro
+        """
+        try:
+            result = self.db.rpc("apply_gamification_events", {"p_events": events})
+            if isinstance(result, dict) and result.get("error"):
+                self.logger.error(f"Erro ao aplicar eventos de gamificação: {result['error']}")
+                return None
+            return result or []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao aplicar eventos de gamificação: {str(e)}", exc_info=True)
+            return None
+
+    def get_stats(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Contadores e sequência de dias ativos do usuário.
+
+        Args:
+            user_id: ID do usuário
+
+        Returns:
+            Linha de user_gamification_stats ou None se não houver
+        """
+        try:
+            result = self.db.table(self.table_name).select("*").eq("user_id", user_id).execute()
+            return result.data[0] if getattr(result, "data", None) else None
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar estatísticas de gamificação: {str(e)}", exc_info=True)
+            return None
+
+    def get_user_challenges(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Progresso do usuário nos desafios.
+
+        Args:
+            user_id: ID do usuário
+
+        Returns:
+            Lista de {challenge_id, status, progress, target}
+        """
+        try:
+            result = (
+                self.db.table("user_challenges")
+                .select("challenge_id, status, progress, target")
+                .eq("user_id", user_id)
+                .execute()
+            )
+            return result.data if getattr(result, "data", None) else []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar desafios do usuário: {str(e)}", exc_info=True)
+            return []
+
+    def purge_processed_events(self, before: datetime) -> bool:
+        """
+        Remove o registro de eventos aplicados antes de uma data.
+
+        Args:
+            before: Data limite
+
+        Returns:
+            True se removido
+        """
+        try:
+            self.db.table("gamification_processed_events").delete().lt("processed_at", before.isoformat()).execute()
+            return True
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Erro ao limpar eventos de gamificação: {str(e)}", exc_info=True)
+            return False
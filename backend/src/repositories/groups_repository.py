@@ -216,7 +216,7 @@ class GroupsRepository(BaseRepository):
                 self.db.table("groups")
                 .select("*")
                 .eq("is_active", True)
-                .order("member_count", desc=True)
+                .order("members_count", desc=True)
                 .limit(limit)
                 .execute()
             )
@@ -228,6 +228,102 @@ class GroupsRepository(BaseRepository):
             logger.error(f"Erro ao buscar grupos ordenados: {str(e)}", exc_info=True)
             return []
 
+    def find_by_ids(self, group_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Busca grupos ativos por ID em uma consulta.
+
+        Args:
+            group_ids: IDs dos grupos
+
+        Returns:
+            Lista de grupos (sem ordem definida)
+        """
+        if not group_ids:
+            return []
+        try:
+            result = self.db.table("groups").select("*").in_("id", list(group_ids)).eq("is_active", True).execute()
+            return result.data or []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            logger.error(f"Erro ao buscar grupos por ID: {str(e)}", exc_info=True)
+            return []
+
+    def get_member_counts(self, batch_size: int = 1000) -> Optional[List[Dict[str, Any]]]:
+        """
+        Lista ID e members_count de todos os grupos ativos.
+
+        members_count é mantido pelo trigger update_group_members_count.
+
+        Args:
+            batch_size: Grupos por consulta
+
+        Returns:
+            Lista de {id, members_count} ou None em caso de erro
+        """
+        try:
+            rows: List[Dict[str, Any]] = []
+            while True:
+                result = (
+                    self.db.table("groups")
+                    .select("id, members_count")
+                    .eq("is_active", True)
+                    .order("id", desc=False)
+                    .range(len(rows), len(rows) + batch_size - 1)
+                    .execute()
+                )
+                batch = result.data or []
+                rows.extend(batch)
+                if len(batch) < batch_size:
+                    return rows
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Erro ao contar membros dos grupos: {str(e)}", exc_info=True)
+            return None
+
+    def get_member_roles(self, group_id: str) -> Optional[Dict[str, str]]:
+        """
+        Busca o papel de cada membro do grupo.
+
+        Args:
+            group_id: ID do grupo
+
+        Returns:
+            Dict user_id -> role ou None em caso de erro
+        """
+        try:
+            result = self.db.table("group_members").select("user_id, role").eq("group_id", group_id).execute()
+            return {str(row["user_id"]): row.get("role") or "member" for row in result.data or []}
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Erro ao buscar papéis dos membros: {str(e)}", exc_info=True)
+            return None
+
+    def get_user_group_ids(self, user_id: str) -> Optional[List[str]]:
+        """
+        Busca os IDs dos grupos de que o usuário participa.
+
+        Args:
+            user_id: ID do usuário
+
+        Returns:
+            Lista de IDs ou None em caso de erro
+        """
+        try:
+            result = self.db.table("group_members").select("group_id").eq("user_id", user_id).execute()
+            return [str(row["group_id"]) for row in result.data or []]
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Erro ao buscar grupos do usuário: {str(e)}", exc_info=True)
+            return None
+
     def is_user_member(self, group_id: str, user_id: str) -> bool:
         """
         Verifica se usuário é membro de um grupo.
@@ -11,6 +11,17 @@ from repositories.base_repository import BaseRepository
 
 logger = logging.getLogger(__name__)
 
+# Tenta usar cache_service se disponível (versão dos dados para memoização)
+try:
+    from services.cache_service import cache_service
+except ImportError:
+    cache_service = None
+
+DATA_VERSION_KEY = "health:data_version:{user_id}"
+
+# Colunas usadas pelo motor de analytics (evita trafegar linhas inteiras)
+IMC_SERIES_COLUMNS = "imc,calculated_at,created_at"
+
 
 class HealthRepository(BaseRepository):
     """
@@ -42,6 +53,7 @@ class HealthRepository(BaseRepository):
             # Usa tabela específica
             result = self.db.table("biological_age_calculations").insert(data).execute()
             if result.data and len(result.data) > 0:
+                self.bump_data_version(data.get("user_id"))
                 return result.data[0]
             return None
         except (ValueError, KeyError) as e:
@@ -328,7 +340,10 @@ class HealthRepository(BaseRepository):
                 data["calculated_at"] = datetime.now().isoformat()
 
             result = self.db.table("imc_history").insert(data).execute()
-            return result.data[0] if result.data and len(result.data) > 0 else None
+            if result.data and len(result.data) > 0:
+                self.bump_data_version(data.get("user_id"))
+                return result.data[0]
+            return None
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
             # Tratamento específico pode ser adicionado aqui
@@ -612,7 +627,10 @@ class HealthRepository(BaseRepository):
         """Adiciona entrada de exercício."""
         try:
             result = self.db.table("exercise_entries").insert(entry_data).execute()
-            return result.data[0] if result.data and len(result.data) > 0 else None
+            if result.data and len(result.data) > 0:
+                self.bump_data_version(user_id)
+                return result.data[0]
+            return None
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
             # Tratamento específico pode ser adicionado aqui
@@ -857,6 +875,7 @@ class HealthRepository(BaseRepository):
             )
             
             if result.data and len(result.data) > 0:
+                self.bump_data_version(user_id)
                 return result.data[0]
             return None
             
@@ -878,7 +897,10 @@ class HealthRepository(BaseRepository):
         try:
             result = self.db.table("food_diary_entries").delete().eq("id", entry_id).eq("user_id", user_id).execute()
 
-            return result.data is not None and len(result.data) > 0
+            deleted = result.data is not None and len(result.data) > 0
+            if deleted:
+                self.bump_data_version(user_id)
+            return deleted
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
             # Tratamento específico pode ser adicionado aqui
@@ -890,7 +912,10 @@ class HealthRepository(BaseRepository):
         """Adiciona entrada no diário alimentar."""
         try:
             result = self.db.table("food_diary_entries").insert(entry_data).execute()
-            return result.data[0] if result.data and len(result.data) > 0 else None
+            if result.data and len(result.data) > 0:
+                self.bump_data_version(user_id)
+                return result.data[0]
+            return None
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
             # Tratamento específico pode ser adicionado aqui
@@ -924,3 +949,53 @@ class HealthRepository(BaseRepository):
         except Exception as e:
             self.logger.error(f"Erro ao buscar entradas de exercícios: {str(e)}", exc_info=True)
             return []
+
+    def get_imc_series(self, user_id: str, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """
+        Retorna registros de IMC do intervalo para o motor de analytics.
+
+        O filtro de datas é aplicado na query (não no cliente) e apenas as
+        colunas usadas nos cálculos são selecionadas.
+
+        Args:
+            user_id: ID do usuário
+            start_date: Data inicial (ISO, inclusiva)
+            end_date: Data final (ISO, inclusiva)
+
+        Returns:
+            Lista de registros ordenados por created_at
+        """
+        try:
+            result = (
+                self.db.table("imc_history")
+                .select(IMC_SERIES_COLUMNS)
+                .eq("user_id", user_id)
+                .gte("created_at", start_date)
+                .lte("created_at", end_date)
+                .order("created_at")
+                .execute()
+            )
+            return result.data if result.data else []
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar série de IMC: {str(e)}", exc_info=True)
+            return []
+
+    def get_data_version(self, user_id: str) -> Optional[int]:
+        """
+        Retorna a versão dos dados de saúde do usuário.
+
+        A versão é incrementada a cada escrita relevante para analytics e
+        compõe a chave de memoização dos resultados.
+
+        Returns:
+            Versão atual (0 se nunca houve escrita) ou None sem Redis
+        """
+        if not cache_service or not cache_service.is_available():
+            return None
+        version = cache_service.get(DATA_VERSION_KEY.format(user_id=user_id))
+        return int(version) if version else 0
+
+    def bump_data_version(self, user_id: Optional[str]) -> None:
+        """Incrementa a versão dos dados de saúde do usuário (invalida analytics memoizados)."""
+        if user_id and cache_service:
+            cache_service.increment(DATA_VERSION_KEY.format(user_id=user_id))
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Repositório de Rollups Diários de Saúde RE-EDUCA Store.
+
+Acesso à tabela health_daily_rollups (uma linha por usuário/dia),
+mantida por triggers na escrita dos registros brutos de saúde.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from repositories.base_repository import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+
+class HealthRollupRepository(BaseRepository):
+    """
+    Repositório para rollups diários de saúde.
+
+    Tabelas:
+    - health_daily_rollups
+    """
+
+    def __init__(self):
+        """Inicializa o repositório de rollups de saúde."""
+        super().__init__("health_daily_rollups")
+
+    def find_by_range(
+        self, user_id: str, start_day: str, end_day: str, columns: str = "*"
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca rollups do usuário em um intervalo de dias.
+
+        Args:
+            user_id: ID do usuário
+            start_day: Primeiro dia (YYYY-MM-DD, inclusivo)
+            end_day: Último dia (YYYY-MM-DD, inclusivo)
+            columns: Colunas a selecionar
+
+        Returns:
+            Lista de rollups ordenada por dia
+        """
+        try:
+            result = (
+                self.db.table(self.table_name)
+                .select(columns)
+                .eq("user_id", user_id)
+                .gte("day", start_day)
+                .lte("day", end_day)
+                .order("day")
+                .execute()
+            )
+            return result.data if result.data else []
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar rollups de saúde: {str(e)}", exc_info=True)
+            return []
+
+    def find_by_day(self, user_id: str, day: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca o rollup de um dia.
+
+        Args:
+            user_id: ID do usuário
+            day: Dia (YYYY-MM-DD)
+
+        Returns:
+            Rollup do dia ou None se não houver registros no dia
+        """
+        rollups = self.find_by_range(user_id, day, day)
+        return rollups[0] if rollups else None
+
+    def rebuild(self, start_day: str, end_day: str, user_id: Optional[str] = None) -> Optional[int]:
+        """
+        Recalcula rollups de um intervalo a partir dos registros brutos.
+
+        Args:
+            start_day: Primeiro dia (YYYY-MM-DD, inclusivo)
+            end_day: Último dia (YYYY-MM-DD, inclusivo)
+            user_id: Usuário (None = todos os usuários)
+
+        Returns:
+            Número de rollups gravados ou None em caso de erro
+        """
+        try:
+            result = self.db.rpc(
+                "rebuild_health_daily_rollups", {"p_user_id": user_id, "p_start": start_day, "p_end": end_day}
+            )
+            if isinstance(result, dict) and result.get("error"):
+                self.logger.error(f"Erro ao recalcular rollups de saúde: {result['error']}")
+                return None
+            return int(result) if isinstance(result, (int, float)) else 0
+        except Exception as e:
+            self.logger.error(f"Erro ao recalcular rollups de saúde: {str(e)}", exc_info=True)
+            return None
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Repositório de Alertas de Estoque RE-EDUCA Store.
+
+Gerencia acesso a dados do histórico de alertas de estoque baixo.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from repositories.base_repository import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+
+class InventoryAlertRepository(BaseRepository):
+    """
+    Repositório para alertas de estoque.
+
+    Tabelas:
+    - inventory_alert_history
+    - inventory_alert_settings (leitura, via get_low_stock_alert_candidates)
+    """
+
+    def __init__(self):
+        """Inicializa o repositório de alertas de estoque."""
+        super().__init__("inventory_alert_history")
+
+    def find_alert_candidates(
+        self, default_threshold: int, window_hours: int, product_ids: Optional[List[str]] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Busca em uma consulta os produtos que precisam de alerta.
+
+        Usa get_low_stock_alert_candidates (migração 045): junta produtos,
+        configurações e histórico recente no banco.
+
+        Args:
+            default_threshold: Limite para produtos sem configuração
+            window_hours: Produtos com alerta em aberto nesta janela são ignorados
+            product_ids: Restringe a avaliação a estes produtos (opcional)
+
+        Returns:
+            Lista de {product_id, product_name, stock_quantity, threshold,
+            notify_email, notify_admins} ou None em caso de erro
+        """
+        try:
+            result = self.db.rpc(
+                "get_low_stock_alert_candidates",
+                {
+                    "p_default_threshold": default_threshold,
+                    "p_window_hours": window_hours,
+                    "p_product_ids": product_ids,
+                },
+            )
+            if isinstance(result, dict) and result.get("error"):
+                self.logger.error(f"Erro ao buscar candidatos a alerta: {result['error']}")
+                return None
+            return result or []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar candidatos a alerta: {str(e)}", exc_info=True)
+            return None
+
+    def create_many(self, alerts: List[Dict[str, Any]], window_hours: int = 24) -> List[Dict[str, Any]]:
+        """
+        Grava vários alertas em uma chamada.
+
+        Usa insert_inventory_alerts (migração 045): produtos que já têm
+        alerta em aberto (índice único parcial) são ignorados, inclusive
+        quando duas avaliações gravam ao mesmo tempo.
+
+        Args:
+            alerts: Registros de inventory_alert_history
+            window_hours: Alertas em aberto mais antigos que isto são resolvidos antes
+
+        Returns:
+            Registros criados (lista vazia em caso de erro)
+        """
+        if not alerts:
+            return []
+        try:
+            result = self.db.rpc("insert_inventory_alerts", {"p_alerts": alerts, "p_window_hours": window_hours})
+            if isinstance(result, dict) and result.get("error"):
+                self.logger.error(f"Erro ao gravar alertas de estoque: {result['error']}")
+                return []
+            return result or []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar alertas de estoque: {str(e)}", exc_info=True)
+            return []
+
+    def resolve_restocked(self, default_threshold: int) -> int:
+        """
+        Resolve alertas de produtos que voltaram acima do limite.
+
+        Args:
+            default_threshold: Limite para produtos sem configuração
+
+        Returns:
+            Número de alertas resolvidos
+        """
+        try:
+            result = self.db.rpc("resolve_restocked_inventory_alerts", {"p_default_threshold": default_threshold})
+            return result if isinstance(result, int) else 0
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return 0
+        except Exception as e:
+            self.logger.error(f"Erro ao resolver alertas de estoque: {str(e)}", exc_info=True)
+            return 0
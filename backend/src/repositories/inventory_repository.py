@@ -18,7 +18,7 @@ class InventoryRepository(BaseRepository):
 
     Tabelas:
     - stock_reservations
-    - stock_movements (se existir)
+    - stock_movements (migração 044)
     """
 
     def __init__(self):
@@ -27,12 +27,110 @@ class InventoryRepository(BaseRepository):
 
     def get_product_stock(self, product_id: str) -> Optional[Dict[str, Any]]:
         """
-        Obtém informações de estoque de um produto.
-        Nota: Este método pode usar ProductRepository se necessário.
+        Obtém nome e estoque gravado (stock_quantity) de um produto.
+
+        Returns:
+            Dict com id, name e stock_quantity ou None se não encontrado
+        """
+        try:
+            result = (
+                self.db.table("products")
+                .select("id, name, stock_quantity")
+                .eq("id", str(product_id))
+                .limit(1)
+                .execute()
+            )
+            return result.data[0] if result.data else None
+        except Exception as e:
+            logger.error(f"Erro ao buscar estoque do produto {product_id}: {str(e)}")
+            return None
+
+    def get_stock_levels(self, product_ids: List[str]) -> Optional[Dict[str, int]]:
+        """
+        Estoque disponível (stock_quantity) de vários produtos em uma consulta.
+
+        Args:
+            product_ids: IDs dos produtos
+
+        Returns:
+            Dict {product_id: stock_quantity} (produtos inexistentes ficam de fora)
+            ou None em caso de erro
+        """
+        if not product_ids:
+            return {}
+        try:
+            result = (
+                self.db.table("products")
+                .select("id, stock_quantity")
+                .in_("id", [str(pid) for pid in product_ids])
+                .execute()
+            )
+            return {str(row["id"]): int(row.get("stock_quantity") or 0) for row in result.data or []}
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar níveis de estoque: {str(e)}", exc_info=True)
+            return None
+
+    def apply_stock_events(self, events: List[Dict[str, Any]], strict: bool = False) -> Dict[str, Any]:
+        """
+        Aplica um lote de eventos do livro de estoque em uma transação.
+
+        Usa apply_stock_events (migração 044); eventos já aplicados são
+        ignorados e eventos que falham voltam em failed (índice no lote),
+        sem desfazer os demais.
+
+        Args:
+            events: Eventos {type, reservation_id, product_id, quantity, order_id, expires_at, at}
+            strict: Recusa estoque negativo (reserva direta no banco, sem Redis)
+
+        Returns:
+            Dict com success, applied e failed, ou error
+        """
+        try:
+            result = self.db.rpc("apply_stock_events", {"p_events": events, "p_strict": strict})
+            if not isinstance(result, dict):
+                return {"success": False, "error": "Erro ao gravar eventos de estoque"}
+            return result
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {"success": False, "error": "Dados inválidos"}
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar eventos de estoque: {str(e)}", exc_info=True)
+            return {"success": False, "error": "Erro ao gravar eventos de estoque"}
+
+    def expire_reservations(self, before_date: str) -> int:
+        """
+        Expira reservas pendentes vencidas e devolve o estoque em uma instrução.
+
+        Args:
+            before_date: Reservas com expires_at anterior são expiradas
+
+        Returns:
+            Número de reservas expiradas
+        """
+        try:
+            result = self.db.rpc("expire_stock_reservations", {"p_before": before_date})
+            return result if isinstance(result, int) else 0
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return 0
+        except Exception as e:
+            self.logger.error(f"Erro ao expirar reservas: {str(e)}", exc_info=True)
+            return 0
+
+    def find_reservation_by_id(self, reservation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca uma reserva de estoque por ID (sem cache).
+
+        Args:
+            reservation_id: ID da reserva
+
+        Returns:
+            Reserva ou None
         """
-        # Por enquanto retorna None, pode ser implementado depois
-        # ou delegar para ProductRepository
-        return None
+        return self.find_by_id(reservation_id, use_cache=False)
 
     def find_expired_reservations(self, before_date: str) -> List[Dict[str, Any]]:
         """
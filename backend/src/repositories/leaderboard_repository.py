@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Repositório de Leaderboards RE-EDUCA Store.
+
+Acesso a dados usado pelo LeaderboardService: ledger de pontos
+(user_points), totais por usuário para reconstrução dos rankings e fotos
+periódicas (leaderboard_snapshots, migração 038).
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from repositories.base_repository import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderboardRepository(BaseRepository):
+    """Repositório do ledger de pontos e das fotos de rankings."""
+
+    def __init__(self):
+        """Inicializa o repositório de leaderboards."""
+        super().__init__("user_points")
+
+    def add_points(self, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Registra pontos no ledger (users.total_points é mantido por trigger).
+
+        Args:
+            entry: {user_id, points, source, source_id, description}
+
+        Returns:
+            Registro criado ou None em caso de erro
+        """
+        try:
+            result = self.db.table("user_points").insert(entry).execute()
+            return result.data[0] if getattr(result, "data", None) else None
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao registrar pontos: {str(e)}", exc_info=True)
+            return None
+
+    def get_ledger_totals(
+        self, after_user_id: Optional[str], limit: int, week_start: datetime, month_start: datetime
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Totais do ledger por usuário, paginados por user_id.
+
+        Usa get_leaderboard_ledger_totals (migração 038).
+
+        Args:
+            after_user_id: Último user_id do lote anterior
+            limit: Usuários por lote
+            week_start: Início da semana atual (UTC)
+            month_start: Início do mês atual (UTC)
+
+        Returns:
+            Lista de {user_id, name, avatar_url, total_points, week_points,
+            month_points, challenge_points} ou None em caso de erro
+        """
+        try:
+            result = self.db.rpc(
+                "get_leaderboard_ledger_totals",
+                {
+                    "p_after_user_id": after_user_id,
+                    "p_limit": limit,
+                    "p_week_start": week_start.isoformat(),
+                    "p_month_start": month_start.isoformat(),
+                },
+            )
+            if isinstance(result, dict) and result.get("error"):
+                self.logger.error(f"Erro ao ler totais do ledger: {result['error']}")
+                return None
+            return result or []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao ler totais do ledger: {str(e)}", exc_info=True)
+            return None
+
+    def get_profiles(self, user_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Nome e avatar de usuários em lote.
+
+        Args:
+            user_ids: IDs dos usuários
+
+        Returns:
+            Lista de {id, name, avatar_url}
+        """
+        if not user_ids:
+            return []
+        try:
+            result = self.db.table("users").select("id, name, avatar_url").in_("id", user_ids).execute()
+            return result.data if getattr(result, "data", None) else []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar perfis do ranking: {str(e)}", exc_info=True)
+            return []
+
+    def get_top_users(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Usuários com mais pontos (fallback sem Redis).
+
+        Args:
+            limit: Número de usuários
+
+        Returns:
+            Lista de {id, name, avatar_url, total_points}
+        """
+        try:
+            result = (
+                self.db.table("users")
+                .select("id, name, avatar_url, total_points")
+                .order("total_points", desc=True)
+                .limit(limit)
+                .execute()
+            )
+            return result.data if getattr(result, "data", None) else []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar ranking no banco: {str(e)}", exc_info=True)
+            return []
+
+    def replace_snapshot(self, board: str, rows: List[Dict[str, Any]]) -> bool:
+        """
+        Substitui a foto de um ranking.
+
+        Args:
+            board: Ranking (global, weekly:2026-W42, monthly:2026-10, challenge:{id})
+            rows: Lista de {user_id, rank, points}
+
+        Returns:
+            True se gravado
+        """
+        try:
+            result = self.db.rpc("replace_leaderboard_snapshot", {"p_board": board, "p_rows": rows})
+            if isinstance(result, dict) and result.get("error"):
+                self.logger.error(f"Erro ao gravar foto do ranking {board}: {result['error']}")
+                return False
+            return True
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar foto do ranking {board}: {str(e)}", exc_info=True)
+            return False
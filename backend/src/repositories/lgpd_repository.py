@@ -20,6 +20,8 @@ class LGPDRepository(BaseRepository):
     - user_consents
     - data_access_logs
     - user_deletions
+    - data_exports
+    - scheduled_exports
     """
 
     def __init__(self):
@@ -337,3 +339,85 @@ class LGPDRepository(BaseRepository):
         except Exception as e:
             self.logger.warning(f"Erro ao buscar scheduled exports (tabela pode não existir): {str(e)}")
             return []
+
+    def find_export_by_id(self, export_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca uma exportação pelo ID.
+
+        Args:
+            export_id: ID da exportação
+
+        Returns:
+            Export encontrado ou None
+        """
+        try:
+            result = self.db.table("data_exports").select("*").eq("id", export_id).execute()
+            return result.data[0] if result.data and len(result.data) > 0 else None
+        except Exception as e:
+            self.logger.warning(f"Erro ao buscar export {export_id}: {str(e)}")
+            return None
+
+    def update_export(self, export_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Atualiza status/progresso de uma exportação.
+
+        Args:
+            export_id: ID da exportação
+            update_data: Campos a atualizar
+
+        Returns:
+            Export atualizado ou None
+        """
+        try:
+            from datetime import datetime
+
+            update_data = {**update_data, "updated_at": datetime.now().isoformat()}
+            result = self.db.table("data_exports").update(update_data).eq("id", export_id).execute()
+            return result.data[0] if result.data and len(result.data) > 0 else None
+        except Exception as e:
+            self.logger.error(f"Erro ao atualizar export {export_id}: {str(e)}", exc_info=True)
+            return None
+
+    def find_due_scheduled_exports(self, now_iso: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Busca exportações agendadas habilitadas cuja próxima execução já passou.
+
+        Args:
+            now_iso: Data/hora de referência (ISO)
+            limit: Máximo de agendamentos retornados
+
+        Returns:
+            Lista de exportações agendadas vencidas
+        """
+        try:
+            result = (
+                self.db.table("scheduled_exports")
+                .select("*")
+                .eq("enabled", True)
+                .lte("next_run", now_iso)
+                .order("next_run", desc=False)
+                .limit(limit)
+                .execute()
+            )
+            return result.data if result.data else []
+        except Exception as e:
+            self.logger.warning(f"Erro ao buscar scheduled exports vencidos: {str(e)}")
+            return []
+
+    def update_scheduled_export(self, schedule_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Atualiza uma exportação agendada (next_run, last_run, status).
+
+        Args:
+            schedule_id: ID do agendamento
+            update_data: Campos a atualizar
+
+        Returns:
+            Agendamento atualizado ou None
+        """
+        try:
+            result = self.db.table("scheduled_exports").update(update_data).eq("id", schedule_id).execute()
+            return result.data[0] if result.data and len(result.data) > 0 else None
+        except Exception as e:
+            self.logger.error(f"Erro ao atualizar scheduled export {schedule_id}: {str(e)}", exc_info=True)
+            return None
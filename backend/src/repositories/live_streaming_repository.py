@@ -4,3 +4,47 @@ Repositório de Live Streaming RE-EDUCA Store.
 
 Gerencia acesso a dados de transmissões ao vivo.
 """
+import logging
+from typing import Any, Dict, List, Optional
+
+from repositories.base_repository import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+
+class LiveStreamingRepository(BaseRepository):
+    """Repositório de transmissões ao vivo e seus eventos."""
+
+    def __init__(self):
+        """Inicializa o repositório de live streaming."""
+        super().__init__("live_streams")
+
+    def insert_events(
+        self, messages: List[Dict[str, Any]], gifts: List[Dict[str, Any]]
+    ) -> Optional[Dict[str, int]]:
+        """
+        Grava um lote de mensagens e presentes em uma chamada.
+
+        Usa insert_stream_events (migração 041): eventos já gravados são
+        ignorados, então o lote pode ser repetido.
+
+        Args:
+            messages: Lista de {id, stream_id, user_id, message, created_at}
+            gifts: Lista de {id, stream_id, user_id, gift_id, gift_name, gift_cost, created_at}
+
+        Returns:
+            Dict com messages e gifts gravados ou None em caso de erro
+        """
+        try:
+            result = self.db.rpc("insert_stream_events", {"p_messages": messages, "p_gifts": gifts})
+            if isinstance(result, dict) and result.get("error"):
+                self.logger.error(f"Erro ao gravar eventos de live: {result['error']}")
+                return None
+            row = result[0] if result else {}
+            return {"messages": int(row.get("messages_inserted") or 0), "gifts": int(row.get("gifts_inserted") or 0)}
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar eventos de live: {str(e)}", exc_info=True)
+            return None
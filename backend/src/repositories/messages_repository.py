@@ -1,14 +1,50 @@
 """
 Repository para mensagens diretas.
+
+A caixa de entrada é lida de direct_conversations (uma linha por
+participante, mantida por triggers da migração 040) e o histórico de uma
+conversa por pair_key em ordem keyset (created_at, id).
 """
 
 import logging
-from typing import Any, Dict, List, Optional
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
 
 from repositories.base_repository import BaseRepository
+from repositories.timeline_repository import keyset_filter
 
 logger = logging.getLogger(__name__)
 
+CONVERSATION_COLUMNS = "*, other_user:users!direct_conversations_other_user_id_fkey(id, name, avatar_url)"
+MESSAGE_COLUMNS = "*, sender:users!direct_messages_sender_id_fkey(id, name, avatar_url)"
+
+
+def pair_key(user_id: str, other_user_id: str) -> str:
+    """
+    Chave da conversa entre dois usuários (igual a direct_messages.pair_key).
+
+    Os IDs são normalizados para a forma canônica do UUID, cuja ordem textual
+    é a mesma de LEAST/GREATEST no banco.
+
+    Raises:
+        ValueError: Se algum ID não for um UUID
+    """
+    return ":".join(sorted(str(uuid.UUID(str(value))) for value in (user_id, other_user_id)))
+
+
+def inbox_keyset_filter(cursor: Tuple[str, str]) -> str:
+    """
+    Filtro PostgREST para "depois do cursor" em ordem (last_message_at DESC, other_user_id DESC).
+
+    Args:
+        cursor: (last_message_at ISO, other_user_id) da última conversa da página anterior
+
+    Returns:
+        Expressão para o parâmetro or
+    """
+    last_message_at, other_user_id = cursor
+    return f'last_message_at.lt."{last_message_at}",and(last_message_at.eq."{last_message_at}",other_user_id.lt.{other_user_id})'
+
 
 class MessagesRepository(BaseRepository):
     """Repository para mensagens diretas"""
@@ -16,234 +52,183 @@ class MessagesRepository(BaseRepository):
     def __init__(self):
         super().__init__("direct_messages")
 
-    def get_conversations(self, user_id: str) -> List[Dict[str, Any]]:
+    def get_conversations(
+        self, user_id: str, limit: int = 50, before: Optional[Tuple[str, str]] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Lista conversas do usuário.
-        Agrupa mensagens por outro usuário e retorna última mensagem.
+        Lista conversas do usuário (uma consulta ao índice de conversas).
+
+        Args:
+            user_id: ID do usuário
+            limit: Máximo de conversas
+            before: Cursor (last_message_at, other_user_id) exclusivo
+
+        Returns:
+            Conversas da mais recente para a mais antiga
         """
         try:
-            # Buscar todas as mensagens onde o usuário é sender ou recipient
-            sent = (
-                self.db.table("direct_messages")
-                .select("*, recipient:users!direct_messages_recipient_id_fkey(id, name, avatar_url)")
-                .eq("sender_id", user_id)
-                .execute()
-            )
-
-            received = (
-                self.db.table("direct_messages")
-                .select("*, sender:users!direct_messages_sender_id_fkey(id, name, avatar_url)")
-                .eq("recipient_id", user_id)
-                .execute()
+            query = (
+                self.db.table("direct_conversations")
+                .select(CONVERSATION_COLUMNS)
+                .eq("user_id", user_id)
+                # Linhas só com marca de leitura (mensagem ainda na fila) ficam de fora
+                .not_.is_("last_message_id", "null")
+                .order("last_message_at", desc=True)
+                .order("other_user_id", desc=True)
+                .limit(limit)
             )
-
-            # Agrupar por usuário e pegar última mensagem
-            conversations_map = {}
-
-            # Processar mensagens enviadas
-            for msg in sent.data or []:
-                other_id = msg["recipient_id"]
-                recipient = msg.get("recipient", {})
-
-                if (
-                    other_id not in conversations_map
-                    or msg["created_at"] > conversations_map[other_id]["last_message_at"]
-                ):
-                    conversations_map[other_id] = {
-                        "user_id": other_id,
-                        "user_name": recipient.get("name", "Usuário") if isinstance(recipient, dict) else "Usuário",
-                        "avatar_url": recipient.get("avatar_url") if isinstance(recipient, dict) else None,
-                        "last_message": msg["content"],
-                        "last_message_at": msg["created_at"],
-                        "unread_count": 0,
+            if before:
+                query = query.or_(inbox_keyset_filter(before))
+            result = query.execute()
+
+            conversations = []
+            for row in result.data or []:
+                other = row.get("other_user") if isinstance(row.get("other_user"), dict) else {}
+                conversations.append(
+                    {
+                        "user_id": row["other_user_id"],
+                        "user_name": other.get("name", "Usuário"),
+                        "avatar_url": other.get("avatar_url"),
+                        "last_message": row.get("last_message"),
+                        "last_message_id": row.get("last_message_id"),
+                        "last_attachment_type": row.get("last_attachment_type"),
+                        "last_sender_id": row.get("last_sender_id"),
+                        "last_message_at": row["last_message_at"],
+                        "unread_count": row.get("unread_count") or 0,
                     }
-
-            # Processar mensagens recebidas
-            for msg in received.data or []:
-                other_id = msg["sender_id"]
-                sender = msg.get("sender", {})
-                unread = 1 if not msg.get("read_at") else 0
-
-                if (
-                    other_id not in conversations_map
-                    or msg["created_at"] > conversations_map[other_id]["last_message_at"]
-                ):
-                    conversations_map[other_id] = {
-                        "user_id": other_id,
-                        "user_name": sender.get("name", "Usuário") if isinstance(sender, dict) else "Usuário",
-                        "avatar_url": sender.get("avatar_url") if isinstance(sender, dict) else None,
-                        "last_message": msg["content"],
-                        "last_message_at": msg["created_at"],
-                        "unread_count": unread,
-                    }
-                else:
-                    conversations_map[other_id]["unread_count"] += unread
-
-            # Converter para lista e ordenar por última mensagem
-            conversations = list(conversations_map.values())
-            conversations.sort(key=lambda x: x["last_message_at"], reverse=True)
-
+                )
             return conversations
 
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return []
         except Exception as e:
             logger.error(f"Erro ao buscar conversas: {str(e)}", exc_info=True)
             return []
 
-    def get_messages(self, user_id: str, other_user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+    def get_messages(
+        self, user_id: str, other_user_id: str, limit: int = 50, before: Optional[Tuple[str, str]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Busca mensagens entre dois usuários.
-        Retorna mensagens ordenadas por data (mais antigas primeiro).
+
+        Args:
+            user_id: ID do usuário
+            other_user_id: ID do outro usuário
+            limit: Máximo de mensagens
+            before: Cursor (created_at, message_id) exclusivo
+
+        Returns:
+            Mensagens da mais recente para a mais antiga
         """
         try:
-            # Buscar mensagens onde user_id e other_user_id são sender ou recipient
-            result = (
+            query = (
                 self.db.table("direct_messages")
-                .select("*, sender:users!direct_messages_sender_id_fkey(id, name, avatar_url)")
-                .or_(
-                    f"and(sender_id.eq.{user_id},recipient_id.eq.{other_user_id}),"
-                    f"and(sender_id.eq.{other_user_id},recipient_id.eq.{user_id})"
-                )
-                .order("created_at", desc=False)
+                .select(MESSAGE_COLUMNS)
+                .eq("pair_key", pair_key(user_id, other_user_id))
+                .order("created_at", desc=True)
+                .order("id", desc=True)
                 .limit(limit)
-                .execute()
             )
+            if before:
+                query = query.or_(keyset_filter(before))
+            result = query.execute()
 
             return result.data or []
 
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return []
         except Exception as e:
             logger.error(f"Erro ao buscar mensagens: {str(e)}", exc_info=True)
             return []
 
-    def create_message(
-        self, sender_id: str, recipient_id: str, content: str, attachment_url: str = None, 
-        attachment_type: str = None, attachment_filename: str = None, attachment_size: int = None
-    ) -> Optional[Dict[str, Any]]:
+    def insert_messages(self, messages: List[Dict[str, Any]]) -> Optional[int]:
         """
-        Cria nova mensagem com suporte a anexos.
-        
+        Grava um lote de mensagens já montadas (com id e created_at).
+
+        Usa insert_direct_messages (migração 040): mensagens já gravadas são
+        ignoradas, então o lote pode ser repetido.
+
         Args:
-            sender_id: ID do remetente
-            recipient_id: ID do destinatário
-            content: Conteúdo da mensagem
-            attachment_url: URL do anexo (opcional)
-            attachment_type: Tipo do anexo (opcional)
-            attachment_filename: Nome do arquivo (opcional)
-            attachment_size: Tamanho do arquivo em bytes (opcional)
+            messages: Lista de {id, sender_id, recipient_id, content, created_at, attachment_*}
+
+        Returns:
+            Número de mensagens gravadas ou None em caso de erro
         """
         try:
-            if sender_id == recipient_id:
-                logger.warning(f"Tentativa de enviar mensagem para si mesmo: {sender_id}")
+            result = self.db.rpc("insert_direct_messages", {"p_messages": messages})
+            if isinstance(result, dict) and result.get("error"):
+                logger.error(f"Erro ao gravar mensagens: {result['error']}")
                 return None
-
-            if not content or not content.strip():
-                # Permitir mensagem vazia se tiver anexo
-                if not attachment_url:
-                    logger.warning("Tentativa de enviar mensagem vazia sem anexo")
-                    return None
-
-            message_data = {
-                "sender_id": sender_id,
-                "recipient_id": recipient_id,
-                "content": content.strip() if content else "",
-            }
-            
-            # Adicionar dados do anexo se fornecido
-            if attachment_url:
-                message_data["attachment_url"] = attachment_url
-                if attachment_type:
-                    message_data["attachment_type"] = attachment_type
-                if attachment_filename:
-                    message_data["attachment_filename"] = attachment_filename
-                if attachment_size:
-                    message_data["attachment_size"] = attachment_size
-
-            result = (
-                self.db.table("direct_messages")
-                .insert(message_data)
-                .execute()
-            )
-
-            if result.data:
-                return result.data[0]
-            return None
+            return int(result or 0)
 
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return None
         except Exception as e:
-            logger.error(f"Erro ao criar mensagem: {str(e)}", exc_info=True)
+            logger.error(f"Erro ao gravar mensagens: {str(e)}", exc_info=True)
             return None
 
-    def mark_as_read(self, message_id: str, user_id: str) -> bool:
-        """
-        Marca mensagem como lida.
-        Apenas o recipient pode marcar como lida.
+    def mark_read(
+        self,
+        user_id: str,
+        other_user_id: Optional[str] = None,
+        up_to: Optional[str] = None,
+        message_id: Optional[str] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
         """
-        try:
-            result = (
-                self.db.table("direct_messages")
-                .update({"read_at": "now()"})
-                .eq("id", message_id)
-                .eq("recipient_id", user_id)
-                .is_("read_at", "null")
-                .execute()
-            )
+        Marca mensagens recebidas como lidas em uma instrução.
 
-            return len(result.data) > 0
+        Apenas o destinatário pode marcar como lida.
 
-        except (ValueError, KeyError) as e:
-            logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
-        except Exception as e:
-            logger.error(f"Erro ao marcar como lida: {str(e)}", exc_info=True)
-            return False
+        Args:
+            user_id: ID do destinatário
+            other_user_id: Apenas mensagens deste remetente
+            up_to: Apenas mensagens criadas até esta data (ISO)
+            message_id: Apenas esta mensagem
 
-    def mark_conversation_as_read(self, user_id: str, other_user_id: str) -> int:
-        """
-        Marca todas as mensagens de uma conversa como lidas.
-        Retorna número de mensagens marcadas.
+        Returns:
+            Lista de {sender_id, read_count, read_at} ou None em caso de erro
         """
         try:
-            result = (
-                self.db.table("direct_messages")
-                .update({"read_at": "now()"})
-                .eq("recipient_id", user_id)
-                .eq("sender_id", other_user_id)
-                .is_("read_at", "null")
-                .execute()
+            result = self.db.rpc(
+                "mark_direct_messages_read",
+                {
+                    "p_user_id": user_id,
+                    "p_other_user_id": other_user_id,
+                    "p_up_to": up_to,
+                    "p_message_id": message_id,
+                },
             )
-
-            return len(result.data) if result.data else 0
+            if isinstance(result, dict) and result.get("error"):
+                logger.error(f"Erro ao marcar mensagens como lidas: {result['error']}")
+                return None
+            return result or []
 
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return None
         except Exception as e:
-            logger.error(f"Erro ao marcar conversa como lida: {str(e)}", exc_info=True)
-            return 0
+            logger.error(f"Erro ao marcar mensagens como lidas: {str(e)}", exc_info=True)
+            return None
 
     def get_unread_count(self, user_id: str) -> int:
-        """Retorna número de mensagens não lidas do usuário"""
+        """Retorna número de mensagens não lidas do usuário (soma do índice de conversas)"""
         try:
             result = (
-                self.db.table("direct_messages")
-                .select("id", count="exact")
-                .eq("recipient_id", user_id)
-                .is_("read_at", "null")
+                self.db.table("direct_conversations")
+                .select("unread_count")
+                .eq("user_id", user_id)
+                .gt("unread_count", 0)
                 .execute()
             )
 
-            return result.count if hasattr(result, "count") else 0
+            return sum(int(row.get("unread_count") or 0) for row in result.data or [])
 
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return 0
         except Exception as e:
             logger.error(f"Erro ao contar mensagens não lidas: {str(e)}", exc_info=True)
             return 0
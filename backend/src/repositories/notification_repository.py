@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Repositório de Notificações RE-EDUCA Store.
+
+Acesso a dados usado pelo NotificationService: gravação em lote de
+notificações agrupadas (upsert_notifications, migração 037), lista em ordem
+keyset (updated_at, id) e contagem/marcação de não lidas.
+"""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from repositories.base_repository import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_COLUMNS = "*, actor:users!notifications_from_user_id_fkey(id, name, avatar_url)"
+
+
+class NotificationRepository(BaseRepository):
+    """Repositório da tabela notifications."""
+
+    def __init__(self):
+        """Inicializa o repositório de notificações."""
+        super().__init__("notifications")
+
+    def upsert_notifications(self, items: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Grava um lote de notificações agrupadas em uma única chamada.
+
+        Itens com o mesmo (user_id, group_key) de uma notificação ainda não
+        lida são somados a ela; os demais viram notificações novas.
+
+        Args:
+            items: Lista de {user_id, from_user_id, type, title, message, data,
+                group_key, actor_ids, actor_count} (um por user_id/group_key)
+
+        Returns:
+            Lista de {id, user_id, group_key, actor_count, inserted} ou None em caso de erro
+        """
+        if not items:
+            return []
+        try:
+            result = self.db.rpc("upsert_notifications", {"p_items": items})
+            if isinstance(result, dict) and result.get("error"):
+                self.logger.error(f"Erro ao gravar notificações: {result['error']}")
+                return None
+            return result or []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar notificações: {str(e)}", exc_info=True)
+            return None
+
+    def get_notifications(
+        self,
+        user_id: str,
+        limit: int = 20,
+        before: Optional[Tuple[str, str]] = None,
+        unread_only: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Notificações do usuário em ordem (updated_at DESC, id DESC).
+
+        Args:
+            user_id: ID do usuário
+            limit: Máximo de notificações
+            before: Cursor (updated_at ISO, notification_id) exclusivo
+            unread_only: Se deve retornar apenas não lidas
+
+        Returns:
+            Lista de notificações com o ator mais recente (actor)
+        """
+        try:
+            query = (
+                self.db.table("notifications")
+                .select(NOTIFICATION_COLUMNS)
+                .eq("user_id", user_id)
+                .order("updated_at", desc=True)
+                .order("id", desc=True)
+                .limit(limit)
+            )
+            if unread_only:
+                query = query.eq("is_read", False)
+            if before:
+                updated_at, notification_id = before
+                query = query.or_(
+                    f'updated_at.lt."{updated_at}",and(updated_at.eq."{updated_at}",id.lt.{notification_id})'
+                )
+            result = query.execute()
+            return result.data if getattr(result, "data", None) else []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar notificações: {str(e)}", exc_info=True)
+            return []
+
+    def mark_read(self, notification_id: str, user_id: str) -> bool:
+        """
+        Marca uma notificação não lida como lida.
+
+        Args:
+            notification_id: ID da notificação
+            user_id: ID do usuário (verificação de segurança)
+
+        Returns:
+            True se a notificação estava não lida e foi atualizada
+        """
+        try:
+            result = (
+                self.db.table("notifications")
+                .update({"is_read": True})
+                .eq("id", notification_id)
+                .eq("user_id", user_id)
+                .eq("is_read", False)
+                .execute()
+            )
+            return bool(getattr(result, "data", None))
+        except (ValueError, KeyError) as e:
+            self.logger.warning(f"Erro de validação ao marcar notificação: {str(e)}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Erro ao marcar notificação como lida: {str(e)}", exc_info=True)
+            return False
+
+    def mark_all_read(self, user_id: str) -> int:
+        """
+        Marca todas as notificações não lidas do usuário como lidas.
+
+        Args:
+            user_id: ID do usuário
+
+        Returns:
+            Número de notificações atualizadas
+        """
+        try:
+            result = (
+                self.db.table("notifications")
+                .update({"is_read": True})
+                .eq("user_id", user_id)
+                .eq("is_read", False)
+                .execute()
+            )
+            return len(result.data) if getattr(result, "data", None) else 0
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return 0
+        except Exception as e:
+            self.logger.error(f"Erro ao marcar notificações como lidas: {str(e)}", exc_info=True)
+            return 0
+
+    def count_unread(self, user_id: str) -> Optional[int]:
+        """
+        Conta as notificações não lidas do usuário.
+
+        Args:
+            user_id: ID do usuário
+
+        Returns:
+            Total de não lidas ou None em caso de erro
+        """
+        try:
+            result = (
+                self.db.table("notifications")
+                .select("id", count="exact")
+                .eq("user_id", user_id)
+                .eq("is_read", False)
+                .limit(1)
+                .execute()
+            )
+            return int(result.count or 0)
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao contar notificações não lidas: {str(e)}", exc_info=True)
+            return None
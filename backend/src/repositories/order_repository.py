@@ -5,7 +5,7 @@ Repositório de Pedidos RE-EDUCA Store.
 Gerencia acesso a dados de pedidos.
 """
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from repositories.base_repository import BaseRepository
 
@@ -80,6 +80,59 @@ class OrderRepository(BaseRepository):
             self.logger.error(f"Erro ao buscar pedidos: {str(e)}", exc_info=True)
             return {"orders": [], "pagination": {"page": page, "per_page": per_page, "total": 0, "pages": 0}}
 
+    def find_history(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 20,
+        before: Optional[Tuple[str, str]] = None,
+        offset: int = 0,
+        order_id: Optional[str] = None,
+        status: Optional[str] = None,
+        with_user: bool = False,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Busca pedidos com itens embutidos em uma consulta.
+
+        Usa get_order_history (migração 048): cada pedido traz items com
+        preço do pedido, nome, imagem e categoria do produto.
+
+        Args:
+            user_id: ID do usuário (None = todos, para o admin)
+            limit: Máximo de pedidos
+            before: Cursor (created_at, id) do último pedido da página anterior
+            offset: Offset (só sem cursor)
+            order_id: Restringe a um pedido
+            status: Filtra por status
+            with_user: Inclui users {name, email}
+
+        Returns:
+            Pedidos do mais recente para o mais antigo, ou None em caso de erro
+        """
+        try:
+            result = self.db.rpc(
+                "get_order_history",
+                {
+                    "p_user_id": user_id,
+                    "p_limit": limit,
+                    "p_before_created_at": before[0] if before else None,
+                    "p_before_id": before[1] if before else None,
+                    "p_offset": offset,
+                    "p_order_id": order_id,
+                    "p_status": status,
+                    "p_with_user": with_user,
+                },
+            )
+            if isinstance(result, dict) and result.get("error"):
+                self.logger.error(f"Erro ao buscar histórico de pedidos: {result['error']}")
+                return None
+            return result if isinstance(result, list) else []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar histórico de pedidos: {str(e)}", exc_info=True)
+            return None
+
     def find_by_date_range(
         self, start_date: str, end_date: str, status_filter: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
@@ -228,6 +281,74 @@ class OrderRepository(BaseRepository):
             self.logger.error(f"Erro ao criar pedido: {str(e)}", exc_info=True)
             return None
 
+    def create_from_quote(
+        self, user_id: str, order_data: Dict[str, Any], cart_items: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Cria pedido a partir de uma cotação de checkout em uma chamada.
+
+        Usa create_order_from_quote (migração 043): confere o carrinho,
+        reserva o uso do cupom e cria o pedido na mesma transação.
+
+        Args:
+            user_id: ID do usuário
+            order_data: Valores do pedido (subtotal, desconto, frete, total, endereço...)
+            cart_items: Itens cotados [{product_id, quantity, price, name}]
+
+        Returns:
+            Dict com success e order, ou error (code=quote_stale se a cotação não vale mais)
+        """
+        try:
+            result = self.db.rpc(
+                "create_order_from_quote",
+                {"p_user_id": user_id, "p_order_data": order_data, "p_cart_items": cart_items},
+            )
+            if not isinstance(result, dict):
+                return {"success": False, "error": "Erro ao criar pedido"}
+            if result.get("success") and isinstance(result.get("order"), str):
+                import json
+
+                result["order"] = json.loads(result["order"])
+            return result
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {"success": False, "error": "Dados inválidos"}
+        except Exception as e:
+            self.logger.error(f"Erro ao criar pedido a partir da cotação: {str(e)}", exc_info=True)
+            return {"success": False, "error": "Erro ao criar pedido"}
+
+    def apply_payment_webhooks(self, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Registra um lote de webhooks de pagamento e atualiza os pedidos.
+
+        Usa apply_payment_webhooks (migração 046): uma transação por lote,
+        webhooks já registrados em processed_webhooks são ignorados. Um evento
+        com erro não desfaz os demais; os seguintes da mesma ordering_key
+        voltam com ele em failed.
+
+        Args:
+            events: [{webhook_id, provider, event_type, order_id, transaction_id,
+                payment_status, order_status, ordering_key}] na ordem recebida
+
+        Returns:
+            Dict com success, applied, paid ([{order_id, user_id}] que passaram
+            a pagos), skipped (registrados sem pedido: order_id inválido ou
+            inexistente) e failed ([{index, error}]), ou error
+        """
+        try:
+            result = self.db.rpc("apply_payment_webhooks", {"p_events": events})
+            if not isinstance(result, dict):
+                return {"success": False, "error": "Erro ao gravar webhooks"}
+            if result.get("success"):
+                self._forget_cached_ids([event["order_id"] for event in events if event.get("order_id")])
+            return result
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {"success": False, "error": "Dados inválidos"}
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar webhooks de pagamento: {str(e)}", exc_info=True)
+            return {"success": False, "error": "Erro ao gravar webhooks"}
+
     def get_orders_with_user_info(
         self, filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = None, offset: int = 0
     ) -> List[Dict[str, Any]]:
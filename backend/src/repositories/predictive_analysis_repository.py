@@ -6,7 +6,7 @@ Gerencia acesso a dados para análise preditiva e machine learning.
 """
 import logging
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from repositories.base_repository import BaseRepository
 
@@ -25,6 +25,7 @@ class PredictiveAnalysisRepository(BaseRepository):
     - user_activities
     - orders
     - users
+    - health_predictions / churn_scores (predições pré-calculadas em lote)
     """
 
     def __init__(self):
@@ -143,3 +144,176 @@ class PredictiveAnalysisRepository(BaseRepository):
         except Exception as e:
             self.logger.warning(f"Erro ao buscar último login: {str(e)}")
             return None
+
+    # ------------------------------------------------------------------
+    # Leituras em lote (pipeline offline de predições)
+    # ------------------------------------------------------------------
+
+    def get_active_users_page(self, after_id: Optional[str] = None, limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        Busca uma página de usuários ativos ordenada por id (paginação por cursor).
+
+        Returns:
+            Lista de {id, last_login}; vazia quando não há mais usuários
+        """
+        try:
+            query = self.db.table("users").select("id,last_login").eq("is_active", True)
+            if after_id:
+                query = query.gt("id", after_id)
+            result = query.order("id").limit(limit).execute()
+            return result.data if result.data else []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.warning(f"Erro ao buscar usuários ativos: {str(e)}")
+            return []
+
+    def get_imc_history_for_users(self, user_ids: List[str]) -> List[Dict[str, Any]]:
+        """Busca histórico de IMC de vários usuários em uma única consulta."""
+        if not user_ids:
+            return []
+        try:
+            result = (
+                self.db.table("imc_history")
+                .select("user_id,calculated_at,imc_value,weight_kg,height_cm")
+                .in_("user_id", user_ids)
+                .order("calculated_at")
+                .execute()
+            )
+            return result.data if result.data else []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.warning(f"Erro ao buscar histórico de IMC em lote: {str(e)}")
+            return []
+
+    def get_workout_sessions_for_users(self, user_ids: List[str]) -> List[Dict[str, Any]]:
+        """Busca sessões de treino de vários usuários em uma única consulta."""
+        if not user_ids:
+            return []
+        try:
+            result = (
+                self.db.table("workout_sessions")
+                .select("user_id,completed_at,created_at,duration_minutes")
+                .in_("user_id", user_ids)
+                .order("completed_at")
+                .execute()
+            )
+            return result.data if result.data else []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.warning(f"Erro ao buscar sessões de treino em lote: {str(e)}")
+            return []
+
+    def get_activities_for_users(self, user_ids: List[str], days_back: int = 30) -> List[Dict[str, Any]]:
+        """Busca atividades recentes de vários usuários em uma única consulta."""
+        if not user_ids:
+            return []
+        try:
+            start_date = (datetime.now() - timedelta(days=days_back)).isoformat()
+            result = (
+                self.db.table("user_activities")
+                .select("user_id,timestamp,created_at")
+                .in_("user_id", user_ids)
+                .gte("timestamp", start_date)
+                .execute()
+            )
+            return result.data if result.data else []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.warning(f"Erro ao buscar atividades em lote: {str(e)}")
+            return []
+
+    # ------------------------------------------------------------------
+    # Predições armazenadas
+    # ------------------------------------------------------------------
+
+    def get_stored_prediction(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Busca a predição de saúde pré-calculada do usuário."""
+        try:
+            result = self.db.table("health_predictions").select("*").eq("user_id", user_id).limit(1).execute()
+            return result.data[0] if result.data else None
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.warning(f"Erro ao buscar predição armazenada: {str(e)}")
+            return None
+
+    def get_prediction_versions(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Busca versão de dados e data de cálculo das predições de vários usuários.
+
+        Returns:
+            {user_id: {data_version, computed_at}}
+        """
+        if not user_ids:
+            return {}
+        try:
+            result = (
+                self.db.table("health_predictions")
+                .select("user_id,data_version,computed_at")
+                .in_("user_id", user_ids)
+                .execute()
+            )
+            return {row["user_id"]: row for row in (result.data or [])}
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {}
+        except Exception as e:
+            self.logger.warning(f"Erro ao buscar versões de predições: {str(e)}")
+            return {}
+
+    def upsert_predictions(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Grava predições em lote (uma requisição). Retorna quantidade enviada."""
+        rows = list(rows)
+        if not rows:
+            return 0
+        try:
+            result = self.db.table("health_predictions").upsert(rows, on_conflict="user_id").execute()
+            if getattr(result, "error", None):
+                self.logger.error(f"Erro ao gravar health_predictions: {result.error}")
+                return 0
+            return len(rows)
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return 0
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar predições: {str(e)}")
+            return 0
+
+    def get_churn_score(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Busca o score de churn pré-calculado do usuário."""
+        try:
+            result = self.db.table("churn_scores").select("*").eq("user_id", user_id).limit(1).execute()
+            return result.data[0] if result.data else None
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.warning(f"Erro ao buscar score de churn: {str(e)}")
+            return None
+
+    def upsert_churn_scores(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Grava scores de churn em lote (uma requisição). Retorna quantidade enviada."""
+        rows = list(rows)
+        if not rows:
+            return 0
+        try:
+            result = self.db.table("churn_scores").upsert(rows, on_conflict="user_id").execute()
+            if getattr(result, "error", None):
+                self.logger.error(f"Erro ao gravar churn_scores: {result.error}")
+                return 0
+            return len(rows)
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return 0
+        except Exception as e:
+            self.logger.error(f"Erro ao gravar scores de churn: {str(e)}")
+            return 0
@@ -80,6 +80,22 @@ class PromotionRepository(BaseRepository):
             self.logger.error(f"Erro ao buscar promoções aplicáveis: {str(e)}", exc_info=True)
             return []
 
+    def find_active_promotions(self) -> List[Dict[str, Any]]:
+        """
+        Busca todas as promoções ativas, por prioridade (índice de cupons e promoções).
+
+        Returns:
+            Lista de promoções ativas
+        """
+        try:
+            return self.find_all(filters={"is_active": True}, order_by="priority", desc=True)
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            # Tratamento específico pode ser adicionado aqui
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar promoções ativas: {str(e)}", exc_info=True)
+            return []
+
     def find_by_id(self, promotion_id: str) -> Optional[Dict[str, Any]]:
         """
         Busca uma promoção por ID.
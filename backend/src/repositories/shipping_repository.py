@@ -5,7 +5,7 @@ Repositório de Regras de Frete RE-EDUCA Store.
 Gerencia acesso a dados de regras de frete.
 """
 import logging
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from repositories.base_repository import BaseRepository
 
@@ -23,7 +23,7 @@ class ShippingRepository(BaseRepository):
         """Inicializa o repositório de regras de frete."""
         super().__init__("shipping_rules")
 
-    def find_active_rules(self, order_by: str = "priority", desc: bool = True) -> List[Dict[str, Any]]:
+    def find_active_rules(self, order_by: str = "priority", desc: bool = True) -> Optional[List[Dict[str, Any]]]:
         """
         Busca regras de frete ativas, ordenadas por prioridade.
 
@@ -32,13 +32,20 @@ class ShippingRepository(BaseRepository):
             desc: Se ordenação é descendente
 
         Returns:
-            Lista de regras ativas
+            Lista de regras ativas ou None em caso de erro (diferente de
+            nenhuma regra ativa)
         """
         try:
-            return self.find_all(filters={"is_active": True}, order_by=order_by, desc=desc)
+            result = (
+                self.db.table(self.table_name).select("*").eq("is_active", True).order(order_by, desc=desc).execute()
+            )
+            if getattr(result, "error", None):
+                self.logger.error(f"Erro ao buscar regras de frete ativas: {result.error}")
+                return None
+            return result.data or []
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return None
         except Exception as e:
             self.logger.error(f"Erro ao buscar regras de frete ativas: {str(e)}", exc_info=True)
-            return []
+            return None
@@ -5,9 +5,10 @@ Gerencia acesso a dados de funcionalidades sociais.
 """
 
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from repositories.base_repository import BaseRepository
+from repositories.timeline_repository import keyset_filter
 
 logger = logging.getLogger(__name__)
 
@@ -108,31 +109,87 @@ class SocialRepository(BaseRepository):
         Returns:
             Número de likes
         """
+        return self.get_post_like_counts([post_id]).get(post_id, 0)
+
+    def get_post_like_counts(self, post_ids: List[str]) -> Dict[str, int]:
+        """
+        Retorna o número de likes de vários posts em uma única query.
+
+        Lê posts.likes_count (mantido por trigger, migração 035) em vez de
+        buscar as linhas de reactions.
+
+        Args:
+            post_ids: IDs dos posts
+
+        Returns:
+            Dict {post_id: likes}
+        """
+        return {post_id: counts["likes"] for post_id, counts in self.get_post_counts(post_ids).items()}
+
+    def get_post_counts(self, post_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        """
+        Retorna likes e comentários de vários posts em uma única query.
+
+        Args:
+            post_ids: IDs dos posts
+
+        Returns:
+            Dict {post_id: {likes, comments}}
+        """
+        post_ids = [post_id for post_id in dict.fromkeys(post_ids) if post_id]
+        if not post_ids:
+            return {}
+        try:
+            result = self.db.table("posts").select("id, likes_count, comments_count").in_("id", post_ids).execute()
+            return {
+                row["id"]: {"likes": row.get("likes_count") or 0, "comments": row.get("comments_count") or 0}
+                for row in getattr(result, "data", None) or []
+            }
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {}
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar contadores de posts: {str(e)}", exc_info=True)
+            return {}
+
+    def get_reacted_post_ids(self, user_id: str, post_ids: List[str]) -> set:
+        """
+        Retorna quais dos posts o usuário reagiu.
+
+        Consulta de pertinência limitada aos posts da página (índice
+        único post_id/user_id/reaction_type), independente do total de reações.
+
+        Args:
+            user_id: ID do usuário
+            post_ids: IDs dos posts
+
+        Returns:
+            Conjunto de post_ids com reação do usuário
+        """
+        if not user_id or not post_ids:
+            return set()
         try:
             result = (
                 self.db.table("reactions")
-                .select("id", count="exact")
-                .eq("post_id", post_id)
-                .eq("reaction_type", "like")
+                .select("post_id")
+                .eq("user_id", user_id)
+                .in_("post_id", list(post_ids))
                 .execute()
             )
-            return (
-                result.count
-                if hasattr(result, "count") and result.count is not None
-                else (len(result.data) if result.data else 0)
-            )
+            return {row["post_id"] for row in getattr(result, "data", None) or [] if row.get("post_id")}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return set()
         except Exception as e:
-            self.logger.error(f"Erro ao contar likes do post {post_id}: {str(e)}", exc_info=True)
-            return 0
+            self.logger.warning(f"Erro ao buscar reações do usuário: {str(e)}")
+            return set()
 
     def count_total_likes_for_user(self, user_id: str) -> int:
         """
         Conta total de likes recebidos pelo usuário em todos os posts.
         
-        Otimizado para usar uma única query com JOIN em vez de N+1 queries.
+        Contado no banco (JOIN posts/reactions) em vez de enviar todos os ids
+        de posts do usuário em um IN.
 
         Args:
             user_id: ID do usuário
@@ -140,32 +197,102 @@ class SocialRepository(BaseRepository):
         Returns:
             Total de likes recebidos
         """
+        counters = self.get_user_counters([user_id]).get(user_id)
+        return counters["total_likes"] if counters else 0
+
+    def get_user_counters(self, user_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        """
+        Calcula seguidores, seguindo, posts e likes recebidos de vários usuários.
+
+        Uma única chamada à função get_social_user_counters (migração 034).
+
+        Args:
+            user_ids: IDs dos usuários
+
+        Returns:
+            Dict {user_id: {followers, following, posts, total_likes}}
+            (usuários ausentes em caso de erro)
+        """
+        if not user_ids:
+            return {}
+        try:
+            result = self.db.rpc("get_social_user_counters", {"p_user_ids": list(user_ids)})
+            if isinstance(result, dict) and result.get("error"):
+                self.logger.error(f"Erro ao calcular contadores sociais: {result['error']}")
+                return {}
+            return {
+                str(row["user_id"]): {
+                    "followers": int(row.get("followers") or 0),
+                    "following": int(row.get("following") or 0),
+                    "posts": int(row.get("posts") or 0),
+                    "total_likes": int(row.get("total_likes") or 0),
+                }
+                for row in (result or [])
+            }
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {}
+        except Exception as e:
+            self.logger.error(f"Erro ao calcular contadores sociais: {str(e)}", exc_info=True)
+            return {}
+
+    def get_post_owner(self, post_id: str) -> Optional[str]:
+        """
+        Busca o autor de um post.
+
+        Args:
+            post_id: ID do post
+
+        Returns:
+            ID do autor ou None
+        """
         try:
-            # 1. Buscar IDs dos posts do usuário
-            post_ids = self.get_user_post_ids(user_id)
-            if not post_ids:
-                return 0
+            result = self.db.table("posts").select("user_id").eq("id", post_id).limit(1).execute()
+            if result.data:
+                return result.data[0].get("user_id")
+            return None
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar autor do post {post_id}: {str(e)}", exc_info=True)
+            return None
 
-            # 2. Contar likes em uma única query com IN (batch)
+    def get_relationship(self, user_id: str, viewer_id: str) -> Dict[str, bool]:
+        """
+        Verifica o seguimento nos dois sentidos com uma única query.
+
+        Args:
+            user_id: ID do usuário do perfil
+            viewer_id: ID do usuário visualizando
+
+        Returns:
+            Dict com is_following (viewer segue user) e is_follower (user segue viewer)
+        """
+        relationship = {"is_following": False, "is_follower": False}
+        if not viewer_id or viewer_id == user_id:
+            return relationship
+        try:
+            pair = [user_id, viewer_id]
             result = (
-                self.db.table("reactions")
-                .select("id", count="exact")
-                .eq("reaction_type", "like")
-                .in_("post_id", post_ids)
+                self.db.table("follows")
+                .select("follower_id, following_id")
+                .in_("follower_id", pair)
+                .in_("following_id", pair)
                 .execute()
             )
-
-            return (
-                result.count
-                if hasattr(result, "count") and result.count is not None
-                else (len(result.data) if result.data else 0)
-            )
+            for row in getattr(result, "data", None) or []:
+                if row.get("follower_id") == viewer_id and row.get("following_id") == user_id:
+                    relationship["is_following"] = True
+                elif row.get("follower_id") == user_id and row.get("following_id") == viewer_id:
+                    relationship["is_follower"] = True
+            return relationship
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return relationship
         except Exception as e:
-            self.logger.error(f"Erro ao contar total de likes: {str(e)}", exc_info=True)
-            return 0
+            self.logger.error(f"Erro ao verificar relacionamento: {str(e)}", exc_info=True)
+            return relationship
 
     # =====================================================
     # MÉTODOS DE POSTS
@@ -202,6 +329,7 @@ class SocialRepository(BaseRepository):
         limit: int = 20,
         post_type: Optional[str] = None,
         hashtag: Optional[str] = None,
+        cursor: Optional[Tuple[str, str]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Busca posts do feed.
@@ -210,10 +338,12 @@ class SocialRepository(BaseRepository):
 
         Args:
             user_id: ID do usuário logado (para verificar reações próprias)
-            page: Número da página
+            page: Número da página (ignorado quando há cursor)
             limit: Limite por página
             post_type: Tipo de post (filtro opcional)
             hashtag: Hashtag (filtro opcional)
+            cursor: (created_at, id) do último post da página anterior; pagina
+                por keyset em vez de OFFSET (custo constante em qualquer profundidade)
 
         Returns:
             Lista de posts com dados do usuário enriquecidos
@@ -227,8 +357,12 @@ class SocialRepository(BaseRepository):
                 self.db.table("posts")
                 .select("*, users!posts_user_id_fkey(id, name, email, avatar_url)")
                 .order("created_at", desc=True)
-                .range(offset, offset + limit - 1)
+                .order("id", desc=True)
             )
+            if cursor:
+                query = query.or_(keyset_filter(cursor)).limit(limit)
+            else:
+                query = query.range(offset, offset + limit - 1)
 
             # Filtros
             if post_type:
@@ -242,77 +376,18 @@ class SocialRepository(BaseRepository):
             result = query.execute()
             posts = result.data if result.data else []
 
-            # Se houver muitos posts, fazer batch queries para contadores
             if posts:
-                post_ids = [p.get("id") for p in posts if p.get("id")]
-
-                # Buscar contadores de reações em batch (uma query para todos)
-                reaction_counts = {}
-                if post_ids:
-                    try:
-                        reactions_result = (
-                            self.db.table("reactions")
-                            .select("post_id")
-                            .eq("reaction_type", "like")
-                            .in_("post_id", post_ids)
-                            .execute()
-                        )
-                        # Contar por post_id
-                        if reactions_result.data:
-                            for reaction in reactions_result.data:
-                                post_id = reaction.get("post_id")
-                                if post_id:
-                                    reaction_counts[post_id] = reaction_counts.get(post_id, 0) + 1
-                    except (ValueError, KeyError) as e:
-                        logger.warning(f"Erro de validação: {str(e)}")
-                        # Tratamento específico pode ser adicionado aqui
-                    except Exception as e:
-                        self.logger.warning(f"Erro ao buscar contadores de reações em batch: {str(e)}")
-
-                # Buscar contadores de comentários em batch
-                comment_counts = {}
-                if post_ids:
-                    try:
-                        comments_result = self.db.table("comments").select("post_id").in_("post_id", post_ids).execute()
-                        # Contar por post_id
-                        if comments_result.data:
-                            for comment in comments_result.data:
-                                post_id = comment.get("post_id")
-                                if post_id:
-                                    comment_counts[post_id] = comment_counts.get(post_id, 0) + 1
-                    except (ValueError, KeyError) as e:
-                        logger.warning(f"Erro de validação: {str(e)}")
-                        # Tratamento específico pode ser adicionado aqui
-                    except Exception as e:
-                        self.logger.warning(f"Erro ao buscar contadores de comentários em batch: {str(e)}")
-
-                # Verificar reações do usuário atual em batch
-                user_reactions = set()
-                if user_id and post_ids:
-                    try:
-                        user_reactions_result = (
-                            self.db.table("reactions")
-                            .select("post_id")
-                            .eq("user_id", user_id)
-                            .in_("post_id", post_ids)
-                            .execute()
-                        )
-                        if user_reactions_result.data:
-                            user_reactions = {r.get("post_id") for r in user_reactions_result.data if r.get("post_id")}
-                    except (ValueError, KeyError) as e:
-                        logger.warning(f"Erro de validação: {str(e)}")
-                        # Tratamento específico pode ser adicionado aqui
-                    except Exception as e:
-                        self.logger.warning(f"Erro ao buscar reações do usuário em batch: {str(e)}")
+                # Contadores vêm na própria linha (likes_count/comments_count);
+                # só a reação do usuário atual exige uma consulta extra
+                user_reactions = self.get_reacted_post_ids(user_id, [p.get("id") for p in posts if p.get("id")])
 
-                # Enriquecer posts com dados já obtidos em batch
                 enriched_posts = []
                 for post in posts:
                     post_id = post.get("id")
                     enriched = {
                         **post,
-                        "reaction_count": reaction_counts.get(post_id, 0),
-                        "comment_count": comment_counts.get(post_id, 0),
+                        "reaction_count": post.get("likes_count") or 0,
+                        "comment_count": post.get("comments_count") or 0,
                         "user_reacted": post_id in user_reactions,
                     }
                     # Adicionar dados do usuário (já vem do JOIN)
@@ -346,7 +421,7 @@ class SocialRepository(BaseRepository):
                     .execute()
                 )
                 posts = result.data if result.data else []
-                return [self._enrich_post_with_user_data(p, user_id) for p in posts]
+                return self._enrich_posts(posts, user_id)
             except Exception as e2:
                 self.logger.error(f"Erro no fallback de busca de posts: {str(e2)}")
                 return []
@@ -494,7 +569,7 @@ class SocialRepository(BaseRepository):
 
     def create_reaction(self, post_id: str, user_id: str, reaction_type: str) -> Optional[Dict[str, Any]]:
         """
-        Cria ou atualiza uma reação em um post.
+        Cria uma reação em um post (add_post_reaction, migração 034).
 
         Args:
             post_id: ID do post
@@ -502,32 +577,19 @@ class SocialRepository(BaseRepository):
             reaction_type: Tipo de reação (like, love, etc)
 
         Returns:
-            Reação criada/atualizada ou None
+            Reação criada com post_owner_id (autor do post) ou None se já
+            existia ou em caso de erro
         """
         try:
-            # Verificar se já existe reação
-            existing = (
-                self.db.table("reactions")
-                .select("*")
-                .eq("post_id", post_id)
-                .eq("user_id", user_id)
-                .eq("reaction_type", reaction_type)
-                .execute()
+            result = self.db.rpc(
+                "add_post_reaction", {"p_post_id": post_id, "p_user_id": user_id, "p_reaction_type": reaction_type}
             )
-
-            if existing.data and len(existing.data) > 0:
-                # Já existe, retornar existente
-                return existing.data[0]
-
-            # Criar nova reação
-            result = (
-                self.db.table("reactions")
-                .insert({"post_id": post_id, "user_id": user_id, "reaction_type": reaction_type})
-                .execute()
-            )
-            if result.data and len(result.data) > 0:
-                return result.data[0]
-            return None
+            if isinstance(result, dict) and result.get("error"):
+                self.logger.error(f"Erro ao criar reação: {result['error']}")
+                return None
+            if not result:
+                return None
+            return {**result[0]["reaction"], "post_owner_id": result[0].get("post_owner_id")}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
             # Tratamento específico pode ser adicionado aqui
@@ -535,9 +597,9 @@ class SocialRepository(BaseRepository):
             self.logger.error(f"Erro ao criar reação: {str(e)}", exc_info=True)
             return None
 
-    def remove_reaction(self, post_id: str, user_id: str, reaction_type: Optional[str] = None) -> bool:
+    def remove_reaction(self, post_id: str, user_id: str, reaction_type: Optional[str] = None) -> List[Dict[str, Any]]:
         """
-        Remove uma reação de um post.
+        Remove reações de um post (remove_post_reactions, migração 034).
 
         Args:
             post_id: ID do post
@@ -545,87 +607,73 @@ class SocialRepository(BaseRepository):
             reaction_type: Tipo de reação (opcional, remove qualquer tipo se None)
 
         Returns:
-            True se removido, False caso contrário
+            Reações removidas ({reaction_type, post_owner_id}); vazia se não
+            havia reação ou em caso de erro
         """
         try:
-            query = self.db.table("reactions").delete().eq("post_id", post_id).eq("user_id", user_id)
-            if reaction_type:
-                query = query.eq("reaction_type", reaction_type)
-
-            result = query.execute()
-            return result.data is not None
+            result = self.db.rpc(
+                "remove_post_reactions",
+                {"p_post_id": post_id, "p_user_id": user_id, "p_reaction_type": reaction_type},
+            )
+            if isinstance(result, dict) and result.get("error"):
+                self.logger.error(f"Erro ao remover reação: {result['error']}")
+                return []
+            return result or []
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return []
         except Exception as e:
             self.logger.error(f"Erro ao remover reação: {str(e)}", exc_info=True)
-            return False
+            return []
 
     # =====================================================
     # MÉTODOS DE SEGUIMENTOS
     # =====================================================
 
-    def follow_user(self, follower_id: str, following_id: str) -> Optional[Dict[str, Any]]:
+    def follow_user(self, follower_id: str, following_id: str) -> bool:
         """
-        Cria relação de seguimento.
+        Cria relação de seguimento (add_follow, migração 034).
 
         Args:
             follower_id: ID do usuário que está seguindo
             following_id: ID do usuário sendo seguido
 
         Returns:
-            Relação criada ou None
+            True se a relação foi criada, False se já existia ou em caso de erro
         """
         try:
-            # Verificar se já existe
-            existing = (
-                self.db.table("follows")
-                .select("*")
-                .eq("follower_id", follower_id)
-                .eq("following_id", following_id)
-                .execute()
-            )
-
-            if existing.data and len(existing.data) > 0:
-                return existing.data[0]
-
-            # Criar nova relação
-            result = (
-                self.db.table("follows").insert({"follower_id": follower_id, "following_id": following_id}).execute()
-            )
-            if result.data and len(result.data) > 0:
-                return result.data[0]
-            return None
+            result = self.db.rpc("add_follow", {"p_follower_id": follower_id, "p_following_id": following_id})
+            if isinstance(result, dict) and result.get("error"):
+                self.logger.error(f"Erro ao seguir usuário: {result['error']}")
+                return False
+            return result is True
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return False
         except Exception as e:
             self.logger.error(f"Erro ao seguir usuário: {str(e)}", exc_info=True)
-            return None
+            return False
 
     def unfollow_user(self, follower_id: str, following_id: str) -> bool:
         """
-        Remove relação de seguimento.
+        Remove relação de seguimento (remove_follow, migração 034).
 
         Args:
             follower_id: ID do usuário que está deixando de seguir
             following_id: ID do usuário sendo deixado de seguir
 
         Returns:
-            True se removido, False caso contrário
+            True se a relação existia e foi removida
         """
         try:
-            result = (
-                self.db.table("follows")
-                .delete()
-                .eq("follower_id", follower_id)
-                .eq("following_id", following_id)
-                .execute()
-            )
-            return result.data is not None
+            result = self.db.rpc("remove_follow", {"p_follower_id": follower_id, "p_following_id": following_id})
+            if isinstance(result, dict) and result.get("error"):
+                self.logger.error(f"Erro ao deixar de seguir: {result['error']}")
+                return False
+            return result is True
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return False
         except Exception as e:
             self.logger.error(f"Erro ao deixar de seguir: {str(e)}", exc_info=True)
             return False
@@ -672,6 +720,9 @@ class SocialRepository(BaseRepository):
         """
         Busca avançada de posts, usuários ou hashtags com filtros.
 
+        Consulta direta ao banco; usada quando o índice de busca
+        (SocialSearchService) não está disponível.
+
         Args:
             query: Termo de busca
             search_type: Tipo (all, posts, users, hashtags)
@@ -732,8 +783,12 @@ class SocialRepository(BaseRepository):
 
                     # Filtro por posts com mídia
                     if filters.get("media") is True:
-                        posts_query = posts_query.not_.is_("media_urls", "null")
-                        posts_query = posts_query.neq("media_urls", "[]")
+                        # NULL <> '{}' é NULL: posts sem mídia ficam de fora
+                        posts_query = posts_query.neq("media_urls", "{}")
+
+                    # Filtro por localização
+                    if filters.get("location"):
+                        posts_query = posts_query.ilike("location", f"%{filters['location']}%")
 
                     # Ordenação
                     sort_by = filters.get("sortBy", "recent")
@@ -742,29 +797,17 @@ class SocialRepository(BaseRepository):
                     elif sort_by == "oldest":
                         posts_query = posts_query.order("created_at", desc=False)
                     elif sort_by == "popular":
-                        # Ordenar por likes (precisa calcular ou usar campo calculado)
-                        posts_query = posts_query.order("created_at", desc=True)  # Fallback
+                        posts_query = posts_query.order("likes_count", desc=True).order("created_at", desc=True)
+
+                    # Filtro por mínimo de likes
+                    min_likes = filters.get("minLikes", 0)
+                    if min_likes > 0:
+                        posts_query = posts_query.gte("likes_count", min_likes)
 
                     posts_result = posts_query.range(offset, offset + limit - 1).execute()
 
                     if posts_result.data:
-                        posts = [self._enrich_post_with_user_data(p) for p in posts_result.data]
-
-                        # Filtro por mínimo de likes (após buscar)
-                        min_likes = filters.get("minLikes", 0)
-                        if min_likes > 0:
-                            posts = [p for p in posts if p.get("reaction_count", 0) >= min_likes]
-
-                        # Filtro por localização
-                        location = filters.get("location")
-                        if location:
-                            posts = [
-                                p
-                                for p in posts
-                                if p.get("location") and location.lower() in p.get("location", "").lower()
-                            ]
-
-                        results["posts"] = posts
+                        results["posts"] = [self._enrich_post_with_user_data(p) for p in posts_result.data]
                 except (ValueError, KeyError) as e:
                     logger.warning(f"Erro de validação: {str(e)}")
                 except Exception as e:
@@ -815,7 +858,9 @@ class SocialRepository(BaseRepository):
             # Hashtags (buscar em posts que contenham hashtag)
             if search_type in ("all", "hashtags"):
                 try:
-                    hashtag_query = self.db.table("posts").select("hashtags")
+                    hashtag_query = (
+                        self.db.table("posts").select("hashtags").order("created_at", desc=True).limit(500)
+                    )
 
                     if query:
                         hashtag_query = hashtag_query.contains("hashtags", [query.replace("#", "")])
@@ -844,76 +889,50 @@ class SocialRepository(BaseRepository):
             return {"posts": [], "users": [], "hashtags": []}
 
     # =====================================================
-    # MÉTODOS DE NOTIFICAÇÕES
+    # MÉTODOS AUXILIARES - ENRIQUECIMENTO DE DADOS
     # =====================================================
 
-    def get_notifications(
-        self, user_id: str, page: int = 1, limit: int = 20, unread_only: bool = False
+    def enrich_posts(
+        self, posts: List[Dict[str, Any]], current_user_id: Optional[str] = None, refresh_counts: bool = False
     ) -> List[Dict[str, Any]]:
         """
-        Busca notificações do usuário.
+        Enriquece posts vindos de cache (timeline, páginas de perfil).
 
         Args:
-            user_id: ID do usuário
-            page: Número da página
-            limit: Limite por página
-            unread_only: Se deve retornar apenas não lidas
+            posts: Posts com dados do autor (JOIN users)
+            current_user_id: ID do usuário atual
+            refresh_counts: Relê likes/comentários do banco (uma query para todos)
 
         Returns:
-            Lista de notificações
+            Posts enriquecidos
         """
-        try:
-            offset = (page - 1) * limit
-            query = (
-                self.db.table("notifications")
-                .select("*")
-                .eq("user_id", user_id)
-                .order("created_at", desc=True)
-                .range(offset, offset + limit - 1)
-            )
-
-            if unread_only:
-                query = query.eq("is_read", False)
-
-            result = query.execute()
-            return result.data if result.data else []
-        except (ValueError, KeyError) as e:
-            logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
-        except Exception as e:
-            self.logger.error(f"Erro ao buscar notificações: {str(e)}", exc_info=True)
-            return []
+        if refresh_counts and posts:
+            counts = self.get_post_counts([p.get("id") for p in posts if p.get("id")])
+            posts = [
+                {
+                    **{k: v for k, v in p.items() if k not in ("reaction_count", "comment_count", "user_reacted")},
+                    "likes_count": counts.get(p.get("id"), {}).get("likes", p.get("likes_count", 0)),
+                    "comments_count": counts.get(p.get("id"), {}).get("comments", p.get("comments_count", 0)),
+                }
+                for p in posts
+            ]
+        return self._enrich_posts(posts, current_user_id)
 
-    def mark_notification_read(self, notification_id: str, user_id: str) -> bool:
+    def _enrich_posts(self, posts: List[Dict[str, Any]], current_user_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
-        Marca notificação como lida.
+        Enriquece uma lista de posts verificando as reações do usuário atual em lote.
 
         Args:
-            notification_id: ID da notificação
-            user_id: ID do usuário (verificação de segurança)
+            posts: Posts (com likes_count/comments_count da própria linha)
+            current_user_id: ID do usuário atual
 
         Returns:
-            True se atualizado, False caso contrário
+            Posts enriquecidos
         """
-        try:
-            result = (
-                self.db.table("notifications")
-                .update({"is_read": True})
-                .eq("id", notification_id)
-                .eq("user_id", user_id)
-                .execute()
-            )
-            return result.data is not None
-        except (ValueError, KeyError) as e:
-            self.logger.warning(f"Erro de validação ao marcar notificação: {str(e)}")
-            return False
-        except Exception as e:
-            self.logger.error(f"Erro ao marcar notificação como lida: {str(e)}", exc_info=True)
-            return False
-
-    # =====================================================
-    # MÉTODOS AUXILIARES - ENRIQUECIMENTO DE DADOS
-    # =====================================================
+        if current_user_id:
+            reacted = self.get_reacted_post_ids(current_user_id, [p.get("id") for p in posts if p.get("id")])
+            posts = [{**p, "user_reacted": p.get("id") in reacted} for p in posts]
+        return [self._enrich_post_with_user_data(p, current_user_id) for p in posts]
 
     def _enrich_post_with_user_data(
         self, post: Dict[str, Any], current_user_id: Optional[str] = None
@@ -948,34 +967,16 @@ class SocialRepository(BaseRepository):
                     "user_email": post.get("user_email", ""),
                 }
 
-            # Ou calcular uma única vez (não fazer query adicional se não necessário)
             post_id = post.get("id", "")
 
-            # Se os contadores já estão no post (via triggers/views), usar
-            reaction_count = post.get("reaction_count") or post.get("likes_count") or 0
-            comment_count = post.get("comment_count") or post.get("comments_count") or 0
-
-            # Se não estão presentes, calcular (mas apenas se realmente necessário)
-            # Normalmente os triggers do banco já atualizam esses campos
-            if reaction_count == 0 and post_id:
-                reaction_count = self.count_post_likes(post_id)
-
-            if comment_count == 0 and post_id:
-                try:
-                    comment_result = (
-                        self.db.table("comments").select("id", count="exact").eq("post_id", post_id).execute()
-                    )
-                    comment_count = (
-                        comment_result.count
-                        if hasattr(comment_result, "count") and comment_result.count is not None
-                        else (len(comment_result.data) if comment_result.data else 0)
-                    )
-                except (ValueError, KeyError, AttributeError) as e:
-                    self.logger.debug(f"Erro ao processar contador (não crítico): {str(e)}")
-                    pass
-                except Exception as e:
-                    self.logger.debug(f"Erro inesperado ao processar contador: {str(e)}")
-                    pass
+            # Contadores mantidos por trigger; uma leitura da linha se vieram fora do select
+            if "likes_count" in post or "reaction_count" in post:
+                reaction_count = post.get("reaction_count", post.get("likes_count")) or 0
+                comment_count = post.get("comment_count", post.get("comments_count")) or 0
+            else:
+                counts = self.get_post_counts([post_id]).get(post_id, {}) if post_id else {}
+                reaction_count = counts.get("likes", 0)
+                comment_count = counts.get("comments", 0)
 
             # Verificar se usuário atual reagiu (apenas se necessário)
             user_reacted = False
@@ -1083,13 +1084,16 @@ class SocialRepository(BaseRepository):
     # MÉTODOS DE PERFIL PÚBLICO
     # =====================================================
 
-    def get_user_profile(self, user_id: str, viewer_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    def get_user_profile(
+        self, user_id: str, viewer_id: Optional[str] = None, stats: Optional[Dict[str, int]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Busca perfil público de um usuário.
 
         Args:
             user_id: ID do usuário cujo perfil será buscado
             viewer_id: ID do usuário que está visualizando (para verificar seguimento)
+            stats: Contadores já carregados (None = calcula via get_user_counters)
 
         Returns:
             Dict com dados do perfil ou None
@@ -1108,33 +1112,13 @@ class SocialRepository(BaseRepository):
 
             user = user_result.data[0]
 
-            followers_count = self.count_followers(user_id)
-            following_count = self.count_following(user_id)
-
-            posts_count = 0
-            try:
-                posts_result = self.db.table("posts").select("id", count="exact").eq("user_id", user_id).execute()
-                posts_count = (
-                    posts_result.count
-                    if hasattr(posts_result, "count") and posts_result.count is not None
-                    else (len(posts_result.data) if posts_result.data else 0)
+            # Contadores em uma chamada (cache Redis via SocialCounterService ou RPC)
+            if stats is None:
+                stats = self.get_user_counters([user_id]).get(
+                    user_id, {"followers": 0, "following": 0, "posts": 0, "total_likes": 0}
                 )
-            except (ValueError, KeyError, AttributeError) as e:
-                # Fallback: se não conseguir contar posts, assume 0
-                self.logger.debug(f"Erro ao contar posts do usuário (não crítico): {str(e)}")
-                pass
-            except Exception as e:
-                self.logger.debug(f"Erro inesperado ao contar posts: {str(e)}")
-                pass
-
-            total_likes = self.count_total_likes_for_user(user_id)
 
-            # Verificar se viewer está seguindo
-            is_following = False
-            is_follower = False
-            if viewer_id and viewer_id != user_id:
-                is_following = self.is_following(viewer_id, user_id)
-                is_follower = self.is_following(user_id, viewer_id)
+            relationship = self.get_relationship(user_id, viewer_id)
 
             # Buscar posts recentes (últimos 10)
             recent_posts = []
@@ -1148,7 +1132,7 @@ class SocialRepository(BaseRepository):
                     .execute()
                 )
                 if posts_result.data:
-                    recent_posts = [self._enrich_post_with_user_data(p, viewer_id) for p in posts_result.data]
+                    recent_posts = self._enrich_posts(posts_result.data, viewer_id)
             except (ValueError, KeyError) as e:
                 logger.warning(f"Erro de validação: {str(e)}")
                 # Tratamento específico pode ser adicionado aqui
@@ -1164,16 +1148,12 @@ class SocialRepository(BaseRepository):
                 "is_verified": user.get("is_verified", False),
                 "created_at": user.get("created_at"),
                 "stats": {
-                    "followers": followers_count,
-                    "following": following_count,
-                    "posts": posts_count,
-                    "total_likes": total_likes,
-                },
-                "relationship": {
-                    "is_following": is_following,
-                    "is_follower": is_follower,
-                    "is_own_profile": viewer_id == user_id,
+                    "followers": stats.get("followers", 0),
+                    "following": stats.get("following", 0),
+                    "posts": stats.get("posts", 0),
+                    "total_likes": stats.get("total_likes", 0),
                 },
+                "relationship": {**relationship, "is_own_profile": viewer_id == user_id},
                 "recent_posts": recent_posts,
             }
         except (ValueError, KeyError) as e:
@@ -1209,7 +1189,7 @@ class SocialRepository(BaseRepository):
                 .execute()
             )
             posts = result.data if result.data else []
-            return [self._enrich_post_with_user_data(p, viewer_id) for p in posts]
+            return self._enrich_posts(posts, viewer_id)
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
             # Tratamento específico pode ser adicionado aqui
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Repositório da Busca Social RE-EDUCA Store.
+
+Acesso a dados usado pelo SocialSearchService: leitura em lotes para o
+rebuild do índice e filtros aplicados no banco sobre um conjunto limitado
+de candidatos vindos do índice (consultas por chave primária).
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from repositories.base_repository import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+DATE_RANGES = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+
+def date_range_start(date_range: Optional[str]) -> Optional[datetime]:
+    """Início do intervalo do filtro dateRange (None = sem limite)"""
+    days = DATE_RANGES.get(date_range or "all")
+    return datetime.utcnow() - timedelta(days=days) if days else None
+
+
+class SocialSearchRepository(BaseRepository):
+    """Repositório de leitura para o índice de busca social (tabela posts)."""
+
+    def __init__(self):
+        """Inicializa o repositório da busca social."""
+        super().__init__("posts")
+
+    def get_posts_batch(self, after_id: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        Lote de posts para indexação, paginado por id (keyset).
+
+        Args:
+            after_id: Último id do lote anterior
+            limit: Tamanho do lote
+
+        Returns:
+            Lista de {id, user_id, content, hashtags, created_at}
+        """
+        try:
+            query = (
+                self.db.table("posts")
+                .select("id, user_id, content, hashtags, created_at")
+                .order("id")
+                .limit(limit)
+            )
+            if after_id:
+                query = query.gt("id", after_id)
+            result = query.execute()
+            return result.data if getattr(result, "data", None) else []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.error(f"Erro ao ler lote de posts para indexação: {str(e)}", exc_info=True)
+            return []
+
+    def get_users_batch(self, after_id: Optional[str] = None, limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        Lote de usuários para indexação, paginado por id (keyset).
+
+        Args:
+            after_id: Último id do lote anterior
+            limit: Tamanho do lote
+
+        Returns:
+            Lista de {id, name, email}
+        """
+        try:
+            query = self.db.table("users").select("id, name, email").order("id").limit(limit)
+            if after_id:
+                query = query.gt("id", after_id)
+            result = query.execute()
+            return result.data if getattr(result, "data", None) else []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.error(f"Erro ao ler lote de usuários para indexação: {str(e)}", exc_info=True)
+            return []
+
+    def filter_posts(
+        self, post_ids: List[str], filters: Dict[str, Any], offset: int = 0, limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        Aplica os filtros da busca no banco sobre os candidatos do índice.
+
+        Args:
+            post_ids: Candidatos (já restritos pelo índice)
+            filters: type, media, minLikes, location, verified, sortBy
+            offset: Deslocamento da página
+            limit: Tamanho da página
+
+        Returns:
+            Posts com dados do autor (JOIN users), ordenados conforme sortBy
+        """
+        if not post_ids:
+            return []
+        try:
+            query = (
+                self.db.table("posts")
+                .select("*, users!posts_user_id_fkey(id, name, email, avatar_url)")
+                .in_("id", post_ids)
+            )
+            if filters.get("type") and filters["type"] != "all":
+                query = query.eq("post_type", filters["type"])
+            if filters.get("media") is True:
+                # NULL <> '{}' é NULL: posts sem mídia ficam de fora
+                query = query.neq("media_urls", "{}")
+            if filters.get("minLikes", 0) > 0:
+                query = query.gte("likes_count", filters["minLikes"])
+            if filters.get("location"):
+                query = query.ilike("location", f"%{filters['location']}%")
+            if filters.get("verified") is True:
+                verified = self.get_verified_user_ids()
+                if not verified:
+                    return []
+                query = query.in_("user_id", verified)
+
+            sort_by = filters.get("sortBy", "recent")
+            if sort_by == "popular":
+                query = query.order("likes_count", desc=True)
+            query = query.order("created_at", desc=sort_by != "oldest").order("id", desc=sort_by != "oldest")
+
+            result = query.range(offset, offset + limit - 1).execute()
+            return result.data if getattr(result, "data", None) else []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.error(f"Erro ao filtrar posts da busca: {str(e)}", exc_info=True)
+            return []
+
+    def get_users_by_ids(self, user_ids: List[str], verified_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        Perfis públicos de usuários em lote, na ordem de user_ids.
+
+        Args:
+            user_ids: IDs dos usuários
+            verified_only: Retorna apenas usuários verificados
+
+        Returns:
+            Lista de {id, name, email, avatar_url, bio}
+        """
+        if not user_ids:
+            return []
+        try:
+            if verified_only:
+                verified = set(self.get_verified_user_ids(user_ids))
+                user_ids = [uid for uid in user_ids if uid in verified]
+                if not user_ids:
+                    return []
+            result = (
+                self.db.table("users").select("id, name, email, avatar_url, bio").in_("id", user_ids).execute()
+            )
+            by_id = {row["id"]: row for row in (getattr(result, "data", None) or []) if row.get("id")}
+            return [by_id[uid] for uid in user_ids if uid in by_id]
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar usuários da busca: {str(e)}", exc_info=True)
+            return []
+
+    def get_verified_user_ids(self, user_ids: Optional[List[str]] = None) -> List[str]:
+        """
+        IDs de usuários verificados (account_verifications).
+
+        Args:
+            user_ids: Restringe a verificação a estes usuários (opcional)
+
+        Returns:
+            Lista de user_ids verificados
+        """
+        try:
+            query = self.db.table("account_verifications").select("user_id").eq("status", "verified")
+            if user_ids:
+                query = query.in_("user_id", user_ids)
+            result = query.execute()
+            return [row["user_id"] for row in (getattr(result, "data", None) or []) if row.get("user_id")]
+        except Exception as e:
+            # Tabela pode não existir em ambientes antigos: filtro não se aplica
+            self.logger.warning(f"Erro ao buscar usuários verificados: {str(e)}")
+            return []
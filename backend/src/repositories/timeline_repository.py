@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Repositório de Timelines RE-EDUCA Store.
+
+Acesso a dados usado pelo TimelineService: ids de posts em ordem keyset
+(created_at, id), seguidores/seguidos paginados e cartões de post em lote
+com cache.
+"""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from repositories.base_repository import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+POST_CARD_COLUMNS = "*, users!posts_user_id_fkey(id, name, email, avatar_url)"
+POST_CARD_CACHE_PREFIX = "posts:card"
+POST_CARD_CACHE_TTL = 60
+
+
+def keyset_filter(cursor: Tuple[str, str]) -> str:
+    """
+    Filtro PostgREST para "depois do cursor" em ordem (created_at DESC, id DESC).
+
+    Args:
+        cursor: (created_at ISO, post_id) do último item da página anterior
+
+    Returns:
+        Expressão para o parâmetro or
+    """
+    created_at, post_id = cursor
+    return f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{post_id})'
+
+
+class TimelineRepository(BaseRepository):
+    """Repositório de leitura para timelines (tabela posts)."""
+
+    def __init__(self):
+        """Inicializa o repositório de timelines."""
+        super().__init__("posts")
+
+    def find_posts_by_ids(self, post_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Busca cartões de posts (post + autor) em lote, com cache L1/L2.
+
+        Args:
+            post_ids: IDs dos posts
+
+        Returns:
+            Posts encontrados na ordem de post_ids (removidos são omitidos)
+        """
+        return self.find_by_ids(
+            post_ids, cache_ttl=POST_CARD_CACHE_TTL, columns=POST_CARD_COLUMNS, cache_prefix=POST_CARD_CACHE_PREFIX
+        )
+
+    def forget_posts(self, post_ids: List[str]):
+        """Remove cartões de posts do cache após edição/remoção"""
+        self._forget_cached_ids(post_ids, cache_prefix=POST_CARD_CACHE_PREFIX)
+
+    def get_home_timeline_ids(
+        self,
+        user_id: str,
+        limit: int,
+        before: Optional[Tuple[str, str]] = None,
+        exclude_authors: Optional[List[str]] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Ids da timeline de um usuário (posts próprios e de quem segue).
+
+        Usa get_home_timeline_ids (migração 036).
+
+        Args:
+            user_id: ID do usuário
+            limit: Máximo de posts
+            before: Cursor (created_at, post_id) exclusivo
+            exclude_authors: Autores a ignorar (lidos por fan-out-on-read)
+
+        Returns:
+            Lista de {id, user_id, created_at} ou None em caso de erro
+        """
+        try:
+            params = {"p_user_id": user_id, "p_limit": limit, "p_exclude_authors": exclude_authors or []}
+            if before:
+                params["p_before_created_at"], params["p_before_id"] = before
+            result = self.db.rpc("get_home_timeline_ids", params)
+            if isinstance(result, dict) and result.get("error"):
+                self.logger.error(f"Erro ao montar timeline de {user_id}: {result['error']}")
+                return None
+            return result or []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Erro ao montar timeline de {user_id}: {str(e)}", exc_info=True)
+            return None
+
+    def get_author_post_ids(
+        self, author_id: str, limit: int, before: Optional[Tuple[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Posts mais recentes de um autor em ordem keyset.
+
+        Args:
+            author_id: ID do autor
+            limit: Máximo de posts
+            before: Cursor (created_at, post_id) exclusivo
+
+        Returns:
+            Lista de {id, user_id, created_at}
+        """
+        try:
+            query = (
+                self.db.table("posts")
+                .select("id, user_id, created_at")
+                .eq("user_id", author_id)
+                .order("created_at", desc=True)
+                .order("id", desc=True)
+                .limit(limit)
+            )
+            if before:
+                query = query.or_(keyset_filter(before))
+            result = query.execute()
+            return result.data if getattr(result, "data", None) else []
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar posts do autor {author_id}: {str(e)}", exc_info=True)
+            return []
+
+    def get_follower_ids_page(self, user_id: str, after_id: Optional[str] = None, limit: int = 1000) -> List[str]:
+        """
+        Página de seguidores de um usuário, paginada por follower_id (keyset).
+
+        Args:
+            user_id: ID do usuário seguido
+            after_id: Último follower_id da página anterior
+            limit: Tamanho da página
+
+        Returns:
+            Lista de follower_ids
+        """
+        try:
+            query = (
+                self.db.table("follows")
+                .select("follower_id")
+                .eq("following_id", user_id)
+                .order("follower_id")
+                .limit(limit)
+            )
+            if after_id:
+                query = query.gt("follower_id", after_id)
+            result = query.execute()
+            return [row["follower_id"] for row in (getattr(result, "data", None) or []) if row.get("follower_id")]
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar seguidores de {user_id}: {str(e)}", exc_info=True)
+            return []
+
+    def get_following_ids(self, user_id: str) -> List[str]:
+        """
+        IDs de quem o usuário segue.
+
+        Args:
+            user_id: ID do usuário
+
+        Returns:
+            Lista de following_ids
+        """
+        try:
+            result = self.db.table("follows").select("following_id").eq("follower_id", user_id).execute()
+            return [row["following_id"] for row in (getattr(result, "data", None) or []) if row.get("following_id")]
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar seguidos de {user_id}: {str(e)}", exc_info=True)
+            return []
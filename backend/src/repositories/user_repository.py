@@ -59,6 +59,23 @@ class UserRepository(BaseRepository):
             self.logger.error(f"Erro ao buscar todos os usuários: {str(e)}", exc_info=True)
             return []
 
+    def find_admin_emails(self) -> List[str]:
+        """
+        Busca os emails dos administradores ativos.
+
+        Returns:
+            Lista de emails
+        """
+        try:
+            result = self.db.table(self.table_name).select("email").eq("role", "admin").eq("is_active", True).execute()
+            return [row["email"] for row in result.data or [] if row.get("email")]
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return []
+        except Exception as e:
+            self.logger.error(f"Erro ao buscar emails de administradores: {str(e)}", exc_info=True)
+            return []
+
     def find_by_date_range(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
         """
         Busca usuários criados em um intervalo de datas.
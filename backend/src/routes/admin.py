@@ -11,6 +11,7 @@ from flask import Blueprint, request, jsonify
 from datetime import datetime
 from services.admin_service import AdminService
 from services.analytics_service import AnalyticsService
+from services.order_read_model import order_read_model
 from utils.decorators import admin_required, log_activity
 from utils.rate_limit_helper import rate_limit
 from utils.exception_strategies import handle_route_exceptions
@@ -349,8 +350,9 @@ def get_all_orders():
         raise ValidationError("per_page deve ser um número válido")
     
     status = request.args.get('status')
+    cursor = request.args.get('cursor') or None
 
-    orders = admin_service.get_all_orders(page, per_page, status)
+    orders = admin_service.get_all_orders(page, per_page, status, cursor=cursor)
     return jsonify(orders), 200
 
 @admin_bp.route('/orders/<order_id>/cancel', methods=['POST'])
@@ -396,6 +398,7 @@ def cancel_order(order_id: str):
     
     if not updated:
         raise ValidationError("Erro ao cancelar pedido")
+    order_read_model.invalidate(order.get("user_id"))
     
     result = {"success": True, "message": "Pedido cancelado com sucesso", "order": updated}
     
@@ -466,6 +469,7 @@ def refund_order(order_id: str):
         'refund_amount': amount,
         'refund_reason': reason
     })
+    order_read_model.invalidate(order.get('user_id'))
     
     log_user_activity(admin_id, 'order_refunded', {
         'order_id': order_id,
@@ -544,6 +548,7 @@ def update_order_items(order_id: str):
     # Atualizar total do pedido
     if recalculate_total:
         order_service.repo.update(order_id, {'total': total})
+    order_read_model.invalidate(order.get('user_id'))
     
     log_user_activity(admin_id, 'order_items_updated', {
         'order_id': order_id,
@@ -6,8 +6,9 @@ incluindo listagem de produtos, sincronização e tracking de conversões.
 """
 from flask import Blueprint, request, jsonify
 from services.affiliate_service import AffiliateService
+from services.webhook_inbox import webhook_inbox
+from services.webhook_processor import AFFILIATE_SALE_HANDLERS
 from utils.decorators import token_required, admin_required, validate_json
-from utils.idempotency_decorators import webhook_idempotent
 from utils.rate_limit_helper import rate_limit
 from utils.exception_strategies import handle_route_exceptions
 from exceptions.custom_exceptions import ValidationError, InternalServerError, UnauthorizedError
@@ -281,14 +282,14 @@ def get_affiliate_stats():
     return jsonify(result), 200
 
 @affiliates_bp.route('/webhook/hotmart', methods=['POST'])
-@webhook_idempotent(event_id_field='data.purchase.subscription.code', ttl=604800)
 @handle_route_exceptions
 def hotmart_webhook():
     """
     Webhook do Hotmart para notificações de venda (IDEMPOTENTE).
     
     Implementa tratamento robusto de exceções e validação de dados.
-    Idempotência garante que eventos duplicados são ignorados automaticamente (TTL: 7 dias).
+    A venda é enfileirada e registrada por workers/webhook_worker.py; eventos
+    duplicados são ignorados automaticamente (TTL: 7 dias).
     """
     # Verifica assinatura do webhook
     signature = request.headers.get('X-Hotmart-Hottok')
@@ -309,19 +310,9 @@ def hotmart_webhook():
     if not data:
         raise ValidationError('Payload inválido')
 
-    # Processa notificação de venda
-    if data.get('event') == 'PURCHASE_APPROVED':
-        result = affiliate_service.track_hotmart_sale(data)
-
-        if not result.get('success'):
-            raise ValidationError(result.get('error', 'Erro ao processar venda do Hotmart'))
-
-        return jsonify({'status': 'success'}), 200
-
-    return jsonify({'status': 'ignored'}), 200
+    return _ingest_sale('hotmart', data, _event_id(data, 'data.purchase.subscription.code'))
 
 @affiliates_bp.route('/webhook/kiwify', methods=['POST'])
-@webhook_idempotent(event_id_field='data.id', ttl=604800)
 @handle_route_exceptions
 def kiwify_webhook():
     """
@@ -348,19 +339,9 @@ def kiwify_webhook():
     if not data:
         raise ValidationError('Payload inválido')
 
-    # Processa notificação de venda
-    if data.get('event') == 'sale.created':
-        result = affiliate_service.track_kiwify_sale(data)
-
-        if not result.get('success'):
-            raise ValidationError(result.get('error', 'Erro ao processar venda do Kiwify'))
-
-        return jsonify({'status': 'success'}), 200
-
-    return jsonify({'status': 'ignored'}), 200
+    return _ingest_sale('kiwify', data, _event_id(data, 'data.id'))
 
 @affiliates_bp.route('/webhook/logs', methods=['POST'])
-@webhook_idempotent(event_id_field='data.id', ttl=604800)
 @handle_route_exceptions
 def logs_webhook():
     """
@@ -373,19 +354,9 @@ def logs_webhook():
     if not data:
         raise ValidationError('Payload inválido')
 
-    # Processa notificação de venda
-    if data.get('event') == 'sale.completed':
-        result = affiliate_service.track_logs_sale(data)
-
-        if not result.get('success'):
-            raise ValidationError(result.get('error', 'Erro ao processar venda do Logs'))
-
-        return jsonify({'status': 'success'}), 200
-
-    return jsonify({'status': 'ignored'}), 200
+    return _ingest_sale('logs', data, _event_id(data, 'data.id'))
 
 @affiliates_bp.route('/webhook/braip', methods=['POST'])
-@webhook_idempotent(event_id_field='transaction.id', ttl=604800)
 @handle_route_exceptions
 def braip_webhook():
     """
@@ -398,16 +369,37 @@ def braip_webhook():
     if not data:
         raise ValidationError('Payload inválido')
 
-    # Processa notificação de venda
-    if data.get('event') == 'transaction.approved':
-        result = affiliate_service.track_braip_sale(data)
+    return _ingest_sale('braip', data, _event_id(data, 'transaction.id'))
+
+def _event_id(data, path):
+    """Lê o ID do evento (campo aninhado com notação de ponto)"""
+    value = data
+    for field in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(field)
+    return str(value) if value else None
 
-        if not result.get('success'):
-            raise ValidationError(result.get('error', 'Erro ao processar venda do Braip'))
+def _ingest_sale(platform, data, event_id):
+    """
+    Enfileira a venda (services/webhook_inbox.py) ou, sem fila, registra na
+    requisição. Eventos que não são de venda são ignorados.
+    """
+    sale_event, method = AFFILIATE_SALE_HANDLERS[platform]
+    if data.get('event') != sale_event:
+        return jsonify({'status': 'ignored'}), 200
 
-        return jsonify({'status': 'success'}), 200
+    if event_id:
+        queued = webhook_inbox.ingest(platform, event_id, data['event'], data)
+        if queued.get('success'):
+            return jsonify({'status': 'success'}), 200
+
+    result = getattr(affiliate_service, method)(data)
+
+    if not result.get('success'):
+        raise ValidationError(result.get('error', f'Erro ao processar venda do {platform.capitalize()}'))
 
-    return jsonify({'status': 'ignored'}), 200
+    return jsonify({'status': 'success'}), 200
 
 @affiliates_bp.route('/commission/calculate', methods=['POST'])
 @token_required
@@ -436,4 +428,5 @@ def calculate_commission():
         'platform': platform,
         'amount': amount,
         'commission': commission,
-        'commission_ra
\ No newline at end of file
+        'commission_rate': commission / amount if amount else 0
+    }), 200
@@ -169,6 +169,9 @@ def get_leaderboard():
 
     Query Parameters:
         limit (int): Número de usuários a retornar (padrão: 10, máximo: 100)
+        offset (int): Posição inicial (padrão: 0)
+        window (str): global, weekly ou monthly (padrão: global)
+        challenge_id (str): Ranking de um desafio (opcional)
 
     Returns:
         JSON: Lista de usuários ordenados por pontos
@@ -179,11 +182,53 @@ def get_leaderboard():
             limit = 10
         if limit > 100:
             limit = 100
+        offset = max(int(request.args.get('offset', 0)), 0)
     except (ValueError, TypeError):
-        limit = 10
+        limit, offset = 10, 0
 
-    leaderboard = gamification_service.get_leaderboard(limit)
-    return jsonify({"leaderboard": leaderboard, "total": len(leaderboard)}), 200
+    window = request.args.get('window', 'global')
+    try:
+        leaderboard = gamification_service.get_leaderboard(
+            limit, window, offset, request.args.get('challenge_id')
+        )
+    except ValueError as e:
+        raise ValidationError(str(e))
+    return jsonify({"leaderboard": leaderboard, "total": len(leaderboard), "window": window}), 200
+
+
+@gamification_bp.route("/leaderboard/me", methods=["GET"])
+@token_required
+@rate_limit("30 per minute")
+@handle_route_exceptions
+def get_leaderboard_position():
+    """
+    Retorna a posição do usuário autenticado e os vizinhos no ranking.
+
+    Query Parameters:
+        window (str): global, weekly ou monthly (padrão: global)
+        radius (int): Usuários acima e abaixo (padrão: 5, máximo: 25)
+        challenge_id (str): Ranking de um desafio (opcional)
+
+    Returns:
+        JSON: rank, points, total e around
+    """
+    user_id = request.current_user.get("id")
+    if not user_id:
+        raise UnauthorizedError("Usuário não autenticado")
+
+    try:
+        radius = min(max(int(request.args.get('radius', 5)), 0), 25)
+    except (ValueError, TypeError):
+        radius = 5
+
+    window = request.args.get('window', 'global')
+    try:
+        position = gamification_service.get_leaderboard_position(
+            user_id, window, radius, request.args.get('challenge_id')
+        )
+    except ValueError as e:
+        raise ValidationError(str(e))
+    return jsonify({**position, "window": window}), 200
 
 
 @gamification_bp.route("/rewards", methods=["GET"])
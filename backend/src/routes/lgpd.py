@@ -10,6 +10,7 @@ Endpoints para:
 """
 from flask import Blueprint, request, jsonify
 from utils.decorators import token_required, handle_exceptions
+from services.export_job_service import ExportJobService
 from services.lgpd_service import LGPDService
 from exceptions.custom_exceptions import ValidationError
 import logging
@@ -19,6 +20,7 @@ logger = logging.getLogger(__name__)
 lgpd_bp = Blueprint('lgpd', __name__, url_prefix='/api/lgpd')
 
 lgpd_service = LGPDService()
+export_job_service = ExportJobService()
 
 
 # ============================================================
@@ -89,11 +91,16 @@ def revoke_consent(consent_type: str):
 @handle_exceptions
 def export_data():
     """
-    Exporta dados do usuário (LGPD).
+    Solicita exportação dos dados do usuário (LGPD).
+
+    A exportação roda em background (fila 'exports'); a resposta traz o
+    export_id para acompanhar em GET /export/<export_id>. Se a fila estiver
+    indisponível, ou com "async": false, a exportação é feita na requisição.
 
     Request Body:
         data_types (list): Tipos de dados ['all'] ou específicos
         format (str): 'json', 'csv', 'pdf'
+        async (bool): Processar em background (padrão: true)
     """
     user_id = request.current_user['id']
     data = request.get_json() or {}
@@ -104,6 +111,19 @@ def export_data():
     if format not in ['json', 'csv', 'pdf']:
         raise ValidationError("format deve ser 'json', 'csv' ou 'pdf'")
 
+    if data.get('async', True):
+        job = export_job_service.submit_export(user_id=user_id, data_types=data_types, format=format)
+        if job['success']:
+            return jsonify({
+                'success': True,
+                'export_id': job['export_id'],
+                'status': job['status'],
+                'status_url': f"/api/lgpd/export/{job['export_id']}"
+            }), 202
+        if not job.get('queue_unavailable'):
+            return jsonify({'error': job.get('error')}), 500
+        logger.warning("Fila de exportação indisponível, exportando de forma síncrona")
+
     result = lgpd_service.export_user_data(
         user_id=user_id,
         data_types=data_types,
@@ -116,6 +136,34 @@ def export_data():
         return jsonify({'error': result.get('error')}), 500
 
 
+@lgpd_bp.route('/export/<export_id>', methods=['GET'])
+@token_required
+@handle_exceptions
+def get_export_status(export_id):
+    """Retorna status e progresso de uma exportação em background"""
+    user_id = request.current_user['id']
+    result = export_job_service.get_export_status(export_id, user_id)
+
+    if result['success']:
+        return jsonify(result), 200
+    else:
+        return jsonify({'error': result.get('error')}), 404
+
+
+@lgpd_bp.route('/export/<export_id>/download', methods=['GET'])
+@token_required
+@handle_exceptions
+def get_export_download(export_id):
+    """Retorna link assinado (temporário) para baixar o arquivo da exportação"""
+    user_id = request.current_user['id']
+    result = export_job_service.get_download_url(export_id, user_id)
+
+    if result['success']:
+        return jsonify(result), 200
+    else:
+        return jsonify({'error': result.get('error')}), 409
+
+
 # ============================================================
 # EXCLUSÃO DE CONTA
 # ============================================================
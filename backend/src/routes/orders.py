@@ -4,6 +4,7 @@ Rotas de Pedidos RE-EDUCA Store.
 Gerencia endpoints relacionados a pedidos incluindo:
 - Listagem de pedidos do usuário (paginação)
 - Detalhes de pedido específico
+- Cotação de checkout assinada (carrinho, cupom e frete)
 - Criação de novos pedidos
 - Cancelamento de pedidos
 
@@ -13,6 +14,7 @@ Rate limiting aplicado em criação de pedidos.
 from flask import Blueprint, request, jsonify
 import logging
 from services.order_service import OrderService
+from services.checkout_service import CheckoutService
 from utils.decorators import token_required, log_activity
 from utils.rate_limit_helper import rate_limit
 from utils.exception_strategies import handle_route_exceptions
@@ -26,6 +28,14 @@ logger = logging.getLogger(__name__)
 
 orders_bp = Blueprint('orders', __name__)
 order_service = OrderService()
+checkout_service = CheckoutService()
+
+
+def _server_timing(response, timings):
+    """Adiciona o tempo de cada etapa no header Server-Timing"""
+    if timings:
+        response.headers['Server-Timing'] = ', '.join(f'{stage};dur={ms}' for stage, ms in timings.items())
+    return response
 
 @orders_bp.route('/', methods=['GET'])
 @token_required
@@ -37,7 +47,8 @@ def get_user_orders():
     Implementa tratamento robusto de exceções e validação de dados.
 
     Suporta paginação via query parameters:
-    - page: Número da página (padrão: 1)
+    - cursor: next_cursor da página anterior (paginação por cursor)
+    - page: Número da página (padrão: 1), usado só sem cursor
     - per_page: Itens por página (padrão: 20)
 
     Returns:
@@ -57,7 +68,7 @@ def get_user_orders():
     except (ValueError, TypeError):
         page, per_page = 1, 20
 
-    orders = order_service.get_user_orders(user_id, page, per_page)
+    orders = order_service.get_user_orders(user_id, page, per_page, cursor=request.args.get('cursor') or None)
     return jsonify(orders), 200
 
 @orders_bp.route('/<order_id>', methods=['GET'])
@@ -94,6 +105,36 @@ def get_order(order_id):
 
     return jsonify(order), 200
 
+@orders_bp.route('/checkout-quote', methods=['POST'])
+@token_required
+@rate_limit("60 per minute")
+@handle_route_exceptions
+def create_checkout_quote():
+    """
+    Calcula a cotação assinada do checkout.
+
+    O quote_token retornado é enviado na criação do pedido, que então é
+    feita com uma única chamada ao banco.
+
+    Request Body:
+        shipping_address (dict): Endereço de entrega com CEP
+        coupon_code (str, optional): Cupom de desconto
+        items (array, optional): Peso e dimensões dos itens (cotação nos Correios)
+
+    Returns:
+        JSON: quote_token, valores da cotação, expires_at e tempos por etapa
+        (também no header Server-Timing).
+    """
+    user_id = request.current_user.get('id')
+    if not user_id:
+        raise UnauthorizedError('Usuário não autenticado')
+
+    result = checkout_service.create_quote(user_id, request.get_json() or {})
+    if not result.get('success'):
+        raise ValidationError(result.get('error', 'Erro ao calcular cotação'))
+
+    return _server_timing(jsonify(result), result.get('timings')), 200
+
 @orders_bp.route('/', methods=['POST'])
 @token_required
 @rate_limit("10 per hour")
@@ -129,13 +170,16 @@ def create_order():
     if not data:
         raise ValidationError('Dados do pedido são obrigatórios')
 
-    # Valida dados
-    if not order_validator.validate_order(data):
+    # Valida dados (com cotação, itens e endereço já foram validados nela)
+    if not data.get('quote_token') and not order_validator.validate_order(data):
         raise ValidationError('Dados inválidos', details=order_validator.get_errors())
 
     # Cria pedido
     result = order_service.create_order(user_id, data)
 
+    if result.get('code') == 'quote_stale':
+        # Cliente deve recalcular a cotação
+        return jsonify({'error': result.get('error'), 'code': 'quote_stale'}), 409
     if not result.get('success'):
         raise ValidationError(result.get('error', 'Erro ao criar pedido'))
 
@@ -144,10 +188,10 @@ def create_order():
         'total': result['order']['total']
     })
 
-    return jsonify({
+    return _server_timing(jsonify({
         'message': 'Pedido criado com sucesso',
         'order': result['order']
-    }), 201
+    }), result.get('timings')), 201
 
 @orders_bp.route('/<order_id>/cancel', methods=['PUT', 'POST'])
 @token_required
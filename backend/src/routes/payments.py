@@ -8,16 +8,17 @@ Gerencia pagamentos via múltiplos métodos incluindo:
 - Webhooks de confirmação
 """
 import os
+import re
 import stripe
 from flask import Blueprint, request, jsonify
 from services.payment_service import PaymentService
+from services.webhook_inbox import webhook_inbox
 from utils.decorators import token_required, validate_json
 from utils.rate_limit_helper import rate_limit
 from utils.exception_strategies import handle_route_exceptions
 from exceptions.custom_exceptions import ValidationError, NotFoundError, InternalServerError
-from utils.validation_decorators import validate_payment_request, validate_positive_numbers
-from utils.idempotency_decorators import webhook_idempotent, idempotent_endpoint
-from middleware.logging import log_user_activity, log_security_event
+from utils.validation_decorators import validate_positive_numbers
+from middleware.logging import log_user_activity
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,6 +26,9 @@ logger = logging.getLogger(__name__)
 payments_bp = Blueprint('payments', __name__)
 payment_service = PaymentService()
 
+# Código de notificação do PagSeguro: 39 caracteres hexadecimais em 4 grupos
+PAGSEGURO_NOTIFICATION_CODE = re.compile(r'^[0-9A-Fa-f]{6}-[0-9A-Fa-f]{12}-[0-9A-Fa-f]{12}-[0-9A-Fa-f]{6}$')
+
 @payments_bp.route('/methods', methods=['GET'])
 @handle_route_exceptions
 def get_payment_methods():
@@ -95,7 +99,6 @@ def create_stripe_payment_intent():
     return jsonify(intent_result), 200
 
 @payments_bp.route('/webhooks/stripe', methods=['POST'])
-@webhook_idempotent(event_id_field='id', ttl=604800)
 @handle_route_exceptions
 def stripe_webhook():
     """
@@ -113,7 +116,9 @@ def stripe_webhook():
 
     IMPORTANTE: Esta rota NÃO requer autenticação (Stripe chama diretamente).
     Validação via assinatura Stripe (webhook secret).
-    Idempotência garante que eventos duplicados são ignorados automaticamente (TTL: 7 dias).
+    O evento é só verificado e enfileirado (services/webhook_inbox.py); o
+    processamento é feito por workers/webhook_worker.py. Eventos repetidos
+    são descartados pelo ID do evento (TTL: 7 dias).
     """
     payload = request.get_data(as_text=True)
     sig_header = request.headers.get('Stripe-Signature')
@@ -135,13 +140,18 @@ def stripe_webhook():
         logger.error("Assinatura inválida do Stripe")
         raise ValidationError('Assinatura inválida')
 
-    # Processa evento
     event_type = event['type']
     event_data = event['data']['object']
     event_id = event.get('id')  # ID do evento para idempotência
 
-    # Passa event_id para verificação adicional de idempotência
-    # O service já registra o webhook como processado internamente
+    queued = webhook_inbox.ingest(
+        'stripe', event_id, event_type, event_data,
+        ordering_key=(event_data.get('metadata') or {}).get('order_id'),
+    )
+    if queued.get('success'):
+        return jsonify({'received': True}), 200
+
+    # Sem fila: processa na requisição (o service registra o webhook como processado)
     result = payment_service.handle_stripe_webhook_event(event_type, event_data, event_id)
 
     if not result.get('success'):
@@ -241,21 +251,34 @@ def create_pagseguro_payment():
     return jsonify(result), 200
 
 @payments_bp.route('/pagseguro/notification', methods=['POST'])
-@webhook_idempotent(event_id_field='notificationCode', ttl=604800)
+@rate_limit("60 per minute")
 @handle_route_exceptions
 def pagseguro_notification():
     """
     Notificação do PagSeguro (IDEMPOTENTE).
     
     Implementa tratamento robusto de exceções e validação de dados.
-    Idempotência garante que notificações duplicadas são ignoradas automaticamente (TTL: 7 dias).
+    A notificação é enfileirada e a transação é consultada no PagSeguro pelo
+    workers/webhook_worker.py. Notificações repetidas são descartadas pelo
+    código da notificação (TTL: 7 dias).
+
+    A notificação não é autenticada e só traz o código: cada uma entra na
+    fila com a própria chave, e o pedido (chave de ordenação) vem da
+    transação consultada no worker. Um código falso falha sozinho.
     """
     notification_code = request.form.get('notificationCode')
     notification_type = request.form.get('notificationType')
 
     if not notification_code:
         raise ValidationError('Código de notificação não fornecido')
+    if not PAGSEGURO_NOTIFICATION_CODE.match(notification_code):
+        raise ValidationError('Código de notificação inválido')
 
+    queued = webhook_inbox.ingest('pagseguro', notification_code, notification_type, {})
+    if queued.get('success'):
+        return jsonify({'status': 'success'}), 200
+
+    # Sem fila: processa na requisição
     result = payment_service.handle_pagseguro_notification(notification_code, notification_type)
 
     if not result.get('success'):
@@ -309,13 +332,15 @@ def get_payment_history():
     # Utiliza OrderService para acesso a dados seguindo o padrão de arquitetura
     from services.order_service import OrderService
     order_service = OrderService()
-    orders_result = order_service.get_user_orders(user_id, page, per_page)
+    orders_result = order_service.get_user_orders(user_id, page, per_page, cursor=request.args.get('cursor') or None)
+    pagination = orders_result.get('pagination', {})
 
     return jsonify({
         'payments': orders_result.get('orders', []),
         'page': page,
         'per_page': per_page,
-        'total': orders_result.get('pagination', {}).get('total', 0)
+        'next_cursor': pagination.get('next_cursor'),
+        'has_more': pagination.get('has_more', False)
     }), 200
 
 @payments_bp.route('/subscriptions', methods=['GET'])
@@ -376,7 +401,3 @@ def cancel_subscription(subscription_id):
         'subscription_id': subscription_id
     })
     return jsonify({'message': 'Assinatura cancelada com sucesso'}), 200
-og_user_activity(user_id, 'subscription_cancelled', {
-        'subscription_id': subscription_id
-    })
-    return jsonify({'message': 'Assinatura cancelada com sucesso'}), 200
@@ -289,16 +289,17 @@ def update_coupon(coupon_id):
         if field in data:
             update_data[field] = data[field]
 
-    updated_coupon = promotion_service.coupon_repo.update(coupon_id, update_data)
+    # O service publica nova versão do índice de cupons
+    result = promotion_service.update_coupon(coupon_id, update_data)
 
-    if not updated_coupon:
-        raise InternalServerError('Erro ao atualizar cupom')
+    if not result.get('success'):
+        raise InternalServerError(result.get('error', 'Erro ao atualizar cupom'))
 
     log_user_activity(request.current_user['id'], 'coupon_updated', {
         'coupon_id': coupon_id,
         'updated_fields': list(update_data.keys())
     })
-    return jsonify({'success': True, 'coupon': updated_coupon}), 200
+    return jsonify({'success': True, 'coupon': result['coupon']}), 200
 
 @promotions_bp.route('/promotions/<promotion_id>', methods=['PUT'])
 @token_required
@@ -310,19 +311,13 @@ def update_promotion(promotion_id):
     Atualiza uma promoção (admin only).
     
     Implementa tratamento robusto de exceções e validação de dados.
-    
-    NOTA: Promoções ainda usam queries diretas ao Supabase (pode ser melhorado depois).
     """
     if not promotion_id:
         raise ValidationError("promotion_id é obrigatório")
     
     data = request.get_json()
 
-    # Busca promoção através do service
-    # Por enquanto mantém query direta para promotions (não há PromotionRepository ainda)
-    promotion_result = promotion_service.supabase.table('promotions').select('*').eq('id', promotion_id).execute()
-
-    if not promotion_result.data:
+    if not promotion_service.get_promotion(promotion_id):
         raise NotFoundError('Promoção não encontrada')
 
     # Atualiza dados
@@ -335,17 +330,17 @@ def update_promotion(promotion_id):
         if field in data:
             update_data[field] = data[field]
 
-    # Atualiza no banco (promoções ainda direto)
-    result = promotion_service.supabase.table('promotions').update(update_data).eq('id', promotion_id).execute()
+    # O service publica nova versão do índice de promoções
+    result = promotion_service.update_promotion(promotion_id, update_data)
 
-    if not result.data:
-        raise InternalServerError('Erro ao atualizar promoção')
+    if not result.get('success'):
+        raise InternalServerError(result.get('error', 'Erro ao atualizar promoção'))
 
     log_user_activity(request.current_user['id'], 'promotion_updated', {
         'promotion_id': promotion_id,
         'updated_fields': list(update_data.keys())
     })
-    return jsonify({'success': True, 'promotion': result.data[0]}), 200
+    return jsonify({'success': True, 'promotion': result['promotion']}), 200
 
 @promotions_bp.route('/coupons/<coupon_id>', methods=['DELETE'])
 @token_required
@@ -367,11 +362,10 @@ def delete_coupon(coupon_id):
     if not coupon:
         raise NotFoundError('Cupom não encontrado')
 
-    # Deleta cupom
-    success = promotion_service.coupon_repo.delete(coupon_id)
+    result = promotion_service.delete_coupon(coupon_id)
 
-    if not success:
-        raise InternalServerError('Erro ao deletar cupom')
+    if not result.get('success'):
+        raise InternalServerError(result.get('error', 'Erro ao deletar cupom'))
 
     log_user_activity(request.current_user['id'], 'coupon_deleted', {
         'coupon_id': coupon_id,
@@ -390,24 +384,24 @@ def delete_promotion(promotion_id):
     Deleta uma promoção (admin only).
     
     Implementa tratamento robusto de exceções e validação de dados.
-    
-    NOTA: Promoções ainda usam queries diretas ao Supabase (pode ser melhorado depois).
     """
     if not promotion_id:
         raise ValidationError("promotion_id é obrigatório")
     
     # Verifica se promoção existe
-    promotion_result = promotion_service.supabase.table('promotions').select('*').eq('id', promotion_id).execute()
+    promotion = promotion_service.get_promotion(promotion_id)
 
-    if not promotion_result.data:
+    if not promotion:
         raise NotFoundError('Promoção não encontrada')
 
-    # Deleta promoção
-    promotion_service.supabase.table('promotions').delete().eq('id', promotion_id).execute()
+    result = promotion_service.delete_promotion(promotion_id)
+
+    if not result.get('success'):
+        raise InternalServerError(result.get('error', 'Erro ao deletar promoção'))
 
     log_user_activity(request.current_user['id'], 'promotion_deleted', {
         'promotion_id': promotion_id,
-        'promotion_name': promotion_result.data[0]['name']
+        'promotion_name': promotion.get('name', '')
     })
 
     return jsonify({'success': True, 'message': 'Promoção deletada com sucesso'}), 200
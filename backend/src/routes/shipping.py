@@ -6,15 +6,16 @@ Gerencia cálculo de frete incluindo:
 - Cálculo por CEP usando API dos Correios
 - Validação de CEP
 - Múltiplas opções de frete
+- Cálculo por regras de vários carrinhos de uma vez
+- Gestão das regras de frete (admin)
 """
 from flask import Blueprint, request, jsonify
 import logging
-from services.shipping_service import ShippingService
-from utils.decorators import token_required
+from services.shipping_service import MAX_BATCH_CARTS, ShippingService
+from utils.decorators import admin_required, token_required, validate_json
 from utils.rate_limit_helper import rate_limit
 from utils.exception_strategies import handle_route_exceptions
 from exceptions.custom_exceptions import ValidationError
-from utils.validators import validate_json
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +62,77 @@ def calculate_shipping():
     
     return jsonify(result), 200
 
+@shipping_bp.route('/calculate-batch', methods=['POST'])
+@token_required
+@rate_limit("30 per minute")
+@validate_json('carts')
+@handle_route_exceptions
+def calculate_shipping_batch():
+    """
+    Calcula o frete por regras de vários carrinhos (prévia do carrinho,
+    campanhas de carrinho abandonado).
+    
+    Request Body:
+        carts (array): Lista de {order_total, cep}
+    """
+    carts = request.get_json().get('carts')
+    if not isinstance(carts, list) or not carts:
+        raise ValidationError("carts deve ser uma lista não vazia")
+    if len(carts) > MAX_BATCH_CARTS:
+        raise ValidationError(f"Máximo de {MAX_BATCH_CARTS} carrinhos por chamada")
+    if not all(isinstance(cart, dict) for cart in carts):
+        raise ValidationError("Cada carrinho deve ser um objeto")
+    
+    results = shipping_service.calculate_shipping_batch(carts)
+    return jsonify({'success': True, 'results': results}), 200
+
+@shipping_bp.route('/rules', methods=['GET'])
+@token_required
+@admin_required
+@handle_route_exceptions
+def list_shipping_rules():
+    """Lista as regras de frete (admin)."""
+    return jsonify({'success': True, 'rules': shipping_service.list_rules()}), 200
+
+@shipping_bp.route('/rules', methods=['POST'])
+@token_required
+@admin_required
+@handle_route_exceptions
+def create_shipping_rule():
+    """
+    Cria regra de frete (admin).
+    
+    Request Body:
+        name, shipping_cost, min_order_value, max_order_value,
+        free_shipping_threshold, priority, is_active, cep_start, cep_end
+    """
+    result = shipping_service.save_rule(request.get_json() or {})
+    if not result.get('success'):
+        raise ValidationError(result.get('error', 'Erro ao salvar regra de frete'))
+    return jsonify(result), 201
+
+@shipping_bp.route('/rules/<rule_id>', methods=['PUT'])
+@token_required
+@admin_required
+@handle_route_exceptions
+def update_shipping_rule(rule_id):
+    """Atualiza regra de frete (admin)."""
+    result = shipping_service.save_rule(request.get_json() or {}, rule_id=rule_id)
+    if not result.get('success'):
+        raise ValidationError(result.get('error', 'Erro ao salvar regra de frete'))
+    return jsonify(result), 200
+
+@shipping_bp.route('/rules/<rule_id>', methods=['DELETE'])
+@token_required
+@admin_required
+@handle_route_exceptions
+def delete_shipping_rule(rule_id):
+    """Remove regra de frete (admin)."""
+    result = shipping_service.delete_rule(rule_id)
+    if not result.get('success'):
+        raise ValidationError(result.get('error', 'Erro ao remover regra de frete'))
+    return jsonify(result), 200
+
 @shipping_bp.route('/calculate-by-cep', methods=['POST'])
 @token_required
 @rate_limit("30 per minute")
@@ -50,19 +50,29 @@ def create_post():
 @token_required
 @handle_exceptions
 def get_posts():
-    """Buscar posts do feed"""
+    """
+    Buscar posts do feed
+
+    feed=home retorna a timeline de quem o usuário segue; o feed global
+    aceita page ou cursor (next_cursor da página anterior).
+    """
     user_id = request.current_user['id']
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 20, type=int)
     post_type = request.args.get('type')
     hashtag = request.args.get('hashtag')
+    cursor = request.args.get('cursor')
 
-    result = social_service.get_posts(user_id, page, limit, post_type, hashtag)
+    if request.args.get('feed') == 'home':
+        result = social_service.get_home_feed(user_id, cursor, limit)
+    else:
+        result = social_service.get_posts(user_id, page, limit, post_type, hashtag, cursor=cursor)
 
     if result.get('success'):
         return jsonify(result), 200
     else:
-        return jsonify({'error': result.get('error', 'Erro ao buscar posts')}), 500
+        status = 400 if result.get('error') == 'Cursor inválido' else 500
+        return jsonify({'error': result.get('error', 'Erro ao buscar posts')}), status
 
 @social_bp.route('/posts/<post_id>', methods=['GET'])
 @token_required
@@ -233,16 +243,17 @@ def unfollow_user(user_id):
 def get_notifications():
     """Buscar notificações do usuário"""
     user_id = request.current_user['id']
-    page = request.args.get('page', 1, type=int)
-    limit = request.args.get('limit', 20, type=int)
+    cursor = request.args.get('cursor')
+    limit = min(request.args.get('limit', 20, type=int), 100)
     unread_only = request.args.get('unread_only', 'false').lower() == 'true'
 
-    result = social_service.get_notifications(user_id, page, limit, unread_only)
+    result = social_service.get_notifications(user_id, cursor, limit, unread_only)
 
     if result.get('success'):
         return jsonify(result), 200
     else:
-        return jsonify({'error': result.get('error', 'Erro ao buscar notificações')}), 500
+        status = 400 if result.get('error') == 'Cursor inválido' else 500
+        return jsonify({'error': result.get('error', 'Erro ao buscar notificações')}), status
 
 @social_bp.route('/notifications/<notification_id>/read', methods=['PUT'])
 @token_required
@@ -258,6 +269,34 @@ def mark_notification_read(notification_id):
     else:
         return jsonify({'error': result.get('error', 'Erro ao marcar notificação')}), 500
 
+@social_bp.route('/notifications/read-all', methods=['PUT'])
+@token_required
+@handle_exceptions
+def mark_all_notifications_read():
+    """Marcar todas as notificações como lidas"""
+    user_id = request.current_user['id']
+
+    result = social_service.mark_all_notifications_read(user_id)
+
+    if result.get('success'):
+        return jsonify(result), 200
+    else:
+        return jsonify({'error': result.get('error', 'Erro ao marcar notificações')}), 500
+
+@social_bp.route('/badges', methods=['GET'])
+@token_required
+@handle_exceptions
+def get_badges():
+    """Contadores de não lidas (também enviados pelo Socket.IO no evento badges)"""
+    user_id = request.current_user['id']
+
+    result = social_service.get_badges(user_id)
+
+    if result.get('success'):
+        return jsonify(result), 200
+    else:
+        return jsonify({'error': result.get('error', 'Erro ao buscar contadores')}), 500
+
 # =====================================================
 # ROTAS DE BUSCA
 # =====================================================
@@ -271,6 +310,7 @@ def search():
     
     Suporta filtros avançados incluindo:
     - Tipo de busca (posts, users, hashtags, all)
+    - Tipo de post (postType)
     - Filtro por data (day, week, month, year, all)
     - Ordenação (recent, oldest, popular)
     - Filtro por verificado
@@ -285,7 +325,7 @@ def search():
     
     # Filtros avançados
     filters = {
-        'type': request.args.get('type', 'all'),
+        'type': request.args.get('postType', 'all'),
         'dateRange': request.args.get('dateRange', 'all'),
         'sortBy': request.args.get('sortBy', 'recent'),
         'verified': request.args.get('verified', 'false').lower() == 'true',
@@ -303,3 +343,17 @@ def search():
         return jsonify(result), 200
     else:
         return jsonify({'error': result.get('error', 'Erro na busca')}), 500
+
+@social_bp.route('/hashtags/trending', methods=['GET'])
+@token_required
+@handle_exceptions
+def get_trending_hashtags():
+    """Hashtags em alta"""
+    limit = request.args.get('limit', 10, type=int)
+
+    result = social_service.get_trending_hashtags(limit)
+
+    if result.get('success'):
+        return jsonify(result), 200
+    else:
+        return jsonify({'error': result.get('error', 'Erro ao buscar hashtags em alta')}), 500
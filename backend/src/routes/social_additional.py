@@ -15,6 +15,7 @@ Utiliza GroupsService e SocialService para acesso a dados seguindo o padrão de
 from flask import Blueprint, request, jsonify
 from utils.decorators import token_required
 from services.social_service import SocialService
+from services.social_counter_service import social_counters
 from services.groups_service import GroupsService
 from services.messages_service import MessagesService
 from services.image_upload_service import ImageUploadService
@@ -60,12 +61,11 @@ def get_groups():
     
     groups = result.get('groups', [])
     
-    # Enriquecer com informação de membro para cada grupo
+    # Informação de membro de todos os grupos em uma verificação
+    joined = groups_service.are_members(user_id, [g.get('id') for g in groups]) if user_id else {}
     groups_list = []
     for g in groups:
-        is_joined = False
-        if user_id:
-            is_joined = groups_service.is_user_member(g.get('id'), user_id)
+        is_joined = joined.get(g.get('id'), False)
         
         groups_list.append({
             'id': g.get('id'),
@@ -73,7 +73,7 @@ def get_groups():
             'description': g.get('description'),
             'category': g.get('category', 'general'),
             'privacy': 'public' if g.get('privacy') == 'public' else 'private',
-            'members': g.get('member_count', g.get('members_count', 0)) or 0,
+            'members': g.get('members_count', g.get('member_count', 0)) or 0,
             'posts': g.get('posts_count', 0) or 0,
             'createdAt': g.get('created_at'),
             'isJoined': is_joined
@@ -183,8 +183,9 @@ def get_analytics():
         try:
             # Calcular taxa de engajamento
             total_posts = len(posts_list)
-            total_followers = social_repo.count_followers(user_id)
-            total_likes = social_repo.count_total_likes_for_user(user_id)
+            counters = social_counters.get_counters(user_id)
+            total_followers = counters['followers']
+            total_likes = counters['total_likes']
             
             if total_posts > 0 and total_followers > 0:
                 engagement_rate = (total_likes / (total_posts * total_followers)) * 100 if total_followers > 0 else 0
@@ -202,8 +203,7 @@ def get_analytics():
                 if post_ids:
                     max_likes = 0
                     popular_post_id = None
-                    for post_id in post_ids:
-                        likes = social_repo.count_post_likes(post_id)
+                    for post_id, likes in social_repo.get_post_like_counts(post_ids).items():
                         if likes > max_likes:
                             max_likes = likes
                             popular_post_id = post_id
@@ -423,29 +423,15 @@ def get_social_stats():
         'totalLikes': 0
     }
 
-    # Utiliza SocialService para acesso a dados
+    # Contadores desnormalizados (uma leitura no Redis)
     try:
-        posts_result = social_service.get_posts(user_id=user_id, page=1, limit=1)
-        stats['totalPosts'] = (
-            posts_result.get('pagination', {}).get('total', 0) if posts_result.get('success') else 0
-        )
-    except (AttributeError, KeyError, TypeError) as e:
-        logger.warning(f"Erro ao contar posts: {str(e)}")
-        stats['totalPosts'] = 0
-
-    # Utiliza SocialRepository através do service padronizado
-    try:
-        from repositories.social_repository import SocialRepository
-        social_repo = SocialRepository()
-        
-        stats['totalFollowers'] = social_repo.count_followers(user_id)
-        stats['totalFollowing'] = social_repo.count_following(user_id)
-        stats['totalLikes'] = social_repo.count_total_likes_for_user(user_id)
+        counters = social_counters.get_counters(user_id)
+        stats['totalPosts'] = counters['posts']
+        stats['totalFollowers'] = counters['followers']
+        stats['totalFollowing'] = counters['following']
+        stats['totalLikes'] = counters['total_likes']
     except (AttributeError, KeyError, TypeError) as e:
         logger.warning(f"Erro ao contar estatísticas sociais: {str(e)}")
-        stats['totalFollowers'] = 0
-        stats['totalFollowing'] = 0
-        stats['totalLikes'] = 0
 
     return jsonify({
         'success': True,
@@ -500,7 +486,7 @@ def get_my_groups():
                             'description': g.get('description'),
                             'category': g.get('category', 'general'),
                             'privacy': 'public' if g.get('is_public', True) else 'private',
-                            'members': g.get('member_count', g.get('members_count', 0)) or 0,
+                            'members': g.get('members_count', g.get('member_count', 0)) or 0,
                             'posts': g.get('posts_count', 0) or 0,
                             'createdAt': g.get('created_at'),
                             'isJoined': True
@@ -576,16 +562,23 @@ def get_conversations():
     """
     Lista conversas do usuário.
     
+    Query Parameters:
+        cursor: next_cursor da página anterior
+        limit: Limite de conversas (padrão: 50, máximo: 100)
+    
     Returns:
-        JSON: Lista de conversas com última mensagem
+        JSON: Lista de conversas com última mensagem e next_cursor
     """
     user_id = request.current_user.get('id')
-    result = messages_service.get_conversations(user_id)
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', 50, type=int)
+    result = messages_service.get_conversations(user_id, cursor, limit)
     
     if result.get('success'):
         return jsonify(result), 200
     else:
-        return jsonify({'error': result.get('error', 'Erro ao buscar conversas')}), 500
+        status = 400 if result.get('error') == 'Cursor inválido' else 500
+        return jsonify({'error': result.get('error', 'Erro ao buscar conversas')}), status
 
 @social_additional_bp.route('/messages/<other_user_id>', methods=['GET'])
 @token_required
@@ -598,20 +591,23 @@ def get_messages(other_user_id):
         other_user_id: ID do outro usuário
     
     Query Parameters:
-        limit: Limite de mensagens (padrão: 50)
+        limit: Limite de mensagens (padrão: 50, máximo: 100)
+        cursor: next_cursor da página anterior (mensagens mais antigas)
     
     Returns:
-        JSON: Lista de mensagens
+        JSON: Lista de mensagens (ordem cronológica) e next_cursor
     """
     user_id = request.current_user.get('id')
     limit = request.args.get('limit', 50, type=int)
+    cursor = request.args.get('cursor')
     
-    result = messages_service.get_messages(user_id, other_user_id, limit)
+    result = messages_service.get_messages(user_id, other_user_id, limit, cursor)
     
     if result.get('success'):
         return jsonify(result), 200
     else:
-        return jsonify({'error': result.get('error', 'Erro ao buscar mensagens')}), 500
+        status = 400 if result.get('error') == 'Cursor inválido' else 500
+        return jsonify({'error': result.get('error', 'Erro ao buscar mensagens')}), status
 
 @social_additional_bp.route('/messages', methods=['POST'])
 @token_required
@@ -784,11 +780,15 @@ def mark_conversation_read(other_user_id):
     Args:
         other_user_id: ID do outro usuário
     
+    Body (JSON, opcional):
+        up_to (str): created_at da última mensagem vista (padrão: todas)
+    
     Returns:
         JSON: Número de mensagens marcadas
     """
     user_id = request.current_user.get('id')
-    result = messages_service.mark_conversation_read(user_id, other_user_id)
+    data = request.get_json(silent=True) or {}
+    result = messages_service.mark_conversation_read(user_id, other_user_id, data.get('up_to'))
     
     if result.get('success'):
         return jsonify(result), 200
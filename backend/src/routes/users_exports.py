@@ -15,16 +15,15 @@ from flask import Blueprint, request, jsonify
 from utils.decorators import token_required
 from utils.exception_strategies import handle_route_exceptions
 from exceptions.custom_exceptions import ValidationError, NotFoundError, UnauthorizedError, InternalServerError
-from config.database import supabase_client
+from services.export_job_service import ExportJobService
 from services.lgpd_service import LGPDService
 import logging
-from datetime import datetime, timedelta
-import uuid
 
 logger = logging.getLogger(__name__)
 
 # Instanciar service
 lgpd_service = LGPDService()
+export_job_service = ExportJobService()
 
 exports_bp = Blueprint('exports', __name__, url_prefix='/api/users/exports')
 
@@ -87,27 +86,19 @@ def get_scheduled_exports():
     if not user_id:
         raise UnauthorizedError('Usuário não identificado')
 
-    # Buscar agendados reais do Supabase
-    # NOTA: Ainda usa acesso direto ao Supabase - pode ser melhorado depois
+    # Utiliza LGPDRepository (a execução dos agendamentos é feita pelo ExportWorker)
     try:
-        scheduled_result = supabase_client._make_request(
-            'GET',
-            'scheduled_exports',
-            params={'user_id': f'eq.{user_id}', 'order': 'next_run.asc'}
-        )
-
-        if isinstance(scheduled_result, list):
-            scheduled_list = [{
-                'id': sched.get('id'),
-                'name': sched.get('name'),
-                'format': sched.get('format'),
-                'frequency': sched.get('frequency'),
-                'nextRun': sched.get('next_run'),
-                'dataTypes': sched.get('data_types', []),
-                'enabled': sched.get('enabled', True)
-            } for sched in scheduled_result]
-        else:
-            scheduled_list = []
+        scheduled_list = [{
+            'id': sched.get('id'),
+            'name': sched.get('name'),
+            'format': sched.get('format'),
+            'frequency': sched.get('frequency'),
+            'nextRun': sched.get('next_run'),
+            'lastRun': sched.get('last_run'),
+            'lastRunStatus': sched.get('last_run_status'),
+            'dataTypes': sched.get('data_types', []),
+            'enabled': sched.get('enabled', True)
+        } for sched in lgpd_service.repo.find_scheduled_exports(user_id)]
     except (ValueError, KeyError, AttributeError, ConnectionError, TimeoutError) as e:
         logger.warning(f"Erro ao buscar scheduled exports (tabela pode não existir): {str(e)}")
         scheduled_list = []  # Continua mesmo se houver erro
@@ -124,9 +115,9 @@ def create_export():
     """
     Cria uma nova exportação de dados do usuário (LGPD/GDPR).
     
-    Implementa tratamento robusto de exceções e criação de exportações.
-    Inicia processo de exportação assíncrono que coleta todos os dados
-    do usuário nos formatos solicitados (JSON, CSV, PDF).
+    Enfileira um job de exportação (ExportWorker) que coleta todos os dados
+    do usuário nos formatos solicitados (JSON, CSV, PDF). O progresso pode
+    ser acompanhado em GET /api/lgpd/export/<export_id>.
 
     Request Body:
         name (str): Nome descritivo da exportação.
@@ -134,7 +125,7 @@ def create_export():
         dataTypes (list): Tipos de dados a incluir ['all'] ou específicos.
 
     Returns:
-        JSON: ID da exportação criada, status 'pending' e mensagem.
+        JSON: ID da exportação criada, status 'pending' e mensagem (HTTP 202).
     """
     user_id = request.current_user.get('id')
     if not user_id:
@@ -150,39 +141,20 @@ def create_export():
     if export_format not in valid_formats:
         raise ValidationError(f'format deve ser um dos: {", ".join(valid_formats)}')
 
-    # Criar registro de exportação no Supabase
-    try:
-        export_data = {
-            'user_id': user_id,
-            'name': export_name,
-            'format': export_format,
-            'status': 'pending',
-            'data_types': data_types,
-            'expires_at': (datetime.now() + timedelta(days=30)).isoformat()
-        }
-
-        # Utiliza LGPDService para criação padronizada
-        export_result = lgpd_service.repo.create_export(export_data)
-
-        if export_result:
-            export_id = export_result.get('id')
-        else:
-            # Se não retornou ID, gerar um UUID temporário
-            export_id = str(uuid.uuid4())
-            logger.warning(f"Export criado mas ID não retornado, usando UUID temporário: {export_id}")
-
-        return jsonify({
-            'success': True,
-            'export_id': export_id,
-            'message': 'Exportação iniciada',
-            'status': 'pending'
-        }), 200
-    except (ValueError, KeyError, AttributeError, ConnectionError, TimeoutError) as e:
-        logger.error(f"Erro ao criar export no Supabase: {str(e)}")
-        # Retorna sucesso com ID temporário para manter compatibilidade com frontend
-        return jsonify({
-            'success': True,
-            'export_id': str(uuid.uuid4()),
-            'message': 'Exportação iniciada (modo offline)',
-            'status': 'pending'
-        }), 200
+    # Cria o job e enfileira para o ExportWorker
+    result = export_job_service.submit_export(
+        user_id=user_id,
+        data_types=data_types,
+        format=export_format,
+        name=export_name
+    )
+
+    if not result['success']:
+        raise InternalServerError(result.get('error', 'Erro ao iniciar exportação'))
+
+    return jsonify({
+        'success': True,
+        'export_id': result['export_id'],
+        'message': 'Exportação iniciada',
+        'status': result['status']
+    }), 202
@@ -10,13 +10,14 @@ Gerencia operações administrativas incluindo:
 
 import logging
 from datetime import datetime, timedelta
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from config.database import supabase_client
 from repositories.order_repository import OrderRepository
 from repositories.product_repository import ProductRepository
 from repositories.user_repository import UserRepository
 from services.base_service import BaseService
+from services.order_read_model import decode_cursor, encode_cursor
 
 logger = logging.getLogger(__name__)
 
@@ -232,33 +233,51 @@ class AdminService(BaseService):
             logger.error(f"Erro ao gerar analytics: {str(e)}", exc_info=True)
             return {"error": "Erro interno do servidor"}
 
-    def get_all_orders(self, page: int = 1, per_page: int = 20, status: str = None) -> Dict[str, Any]:
-        """Retorna todos os pedidos"""
+    def get_all_orders(
+        self, page: int = 1, per_page: int = 20, status: str = None, cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Retorna todos os pedidos com itens e dados do usuário.
+
+        Com cursor (next_cursor da página anterior), pagina por (created_at, id);
+        sem cursor, usa page/per_page.
+        """
         try:
             filters = {}
             if status:
                 filters["status"] = status
 
-            # Usa método que inclui informações de usuário
-            orders = self.order_repo.get_orders_with_user_info(
-                filters=filters, limit=per_page, offset=(page - 1) * per_page
+            # Pedidos com itens e usuário em uma consulta
+            orders = self.order_repo.find_history(
+                None,
+                limit=per_page + 1,
+                before=decode_cursor(cursor) if cursor else None,
+                offset=(page - 1) * per_page,
+                status=status,
+                with_user=True,
             )
+            if orders is None:
+                return {"error": "Erro interno do servidor"}
+            has_more = len(orders) > per_page
+            orders = orders[:per_page]
 
             total = self.order_repo.count(filters=filters)
 
             return {
-                "orders": orders or [],
+                "orders": orders,
                 "pagination": {
                     "page": page,
                     "per_page": per_page,
                     "total": total,
                     "pages": (total + per_page - 1) // per_page if total > 0 else 0,
+                    "next_cursor": encode_cursor(orders[-1]) if has_more else None,
+                    "has_more": has_more,
                 },
             }
 
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return {"error": str(e)}
         except Exception as e:
             logger.error(f"Erro ao buscar pedidos: {str(e)}", exc_info=True)
             return {"error": "Erro interno do servidor"}
@@ -15,11 +15,13 @@ import hashlib
 import hmac
 import logging
 import os
+import time
 from datetime import datetime
 from typing import Any, Dict, Optional
 
 import requests
 from repositories.affiliate_repository import AffiliateRepository
+from services.affiliate_sync import AffiliateCatalogSync
 from services.base_service import BaseService
 
 logger = logging.getLogger(__name__)
@@ -44,6 +46,8 @@ class AffiliateService(BaseService):
         self.hotmart_client_secret = os.environ.get("HOTMART_CLIENT_SECRET")
         self.hotmart_webhook_secret = os.environ.get("HOTMART_WEBHOOK_SECRET")  # Secret para validar webhooks
         self.hotmart_base_url = os.environ.get("HOTMART_BASE_URL", "https://developers.hotmart.com")
+        self._hotmart_token: Optional[str] = None
+        self._hotmart_token_expires_at = 0.0
 
         # Configurações Kiwify
         self.kiwify_api_key = os.environ.get("KIWIFY_API_KEY")
@@ -66,10 +70,16 @@ class AffiliateService(BaseService):
         """
         Obtém token de acesso do Hotmart via OAuth2.
 
+        O token é reaproveitado até perto de expirar (a sincronização busca
+        muitas páginas em sequência).
+
         Returns:
             Optional[str]: Access token ou None se falhar.
         """
         try:
+            if self._hotmart_token and time.time() < self._hotmart_token_expires_at:
+                return self._hotmart_token
+
             url = f"{self.hotmart_base_url}/payments/api/oauth/token"
             data = {
                 "grant_type": "client_credentials",
@@ -81,7 +91,10 @@ class AffiliateService(BaseService):
 
             if response.status_code == 200:
                 token_data = response.json()
-                return token_data.get("access_token")
+                self._hotmart_token = token_data.get("access_token")
+                # Margem de 60s para não usar um token prestes a expirar
+                self._hotmart_token_expires_at = time.time() + max(0, int(token_data.get("expires_in") or 0) - 60)
+                return self._hotmart_token
             else:
                 logger.error(f"Erro ao obter token Hotmart: {response.status_code}")
                 return None
@@ -419,49 +432,14 @@ class AffiliateService(BaseService):
     # ================================
 
     def sync_all_affiliate_products(self) -> Dict[str, Any]:
-        """Sincroniza produtos de todas as plataformas"""
-        try:
-            all_products = []
-            platforms = ["hotmart", "kiwify", "logs", "braip"]
-
-            for platform in platforms:
-                try:
-                    if platform == "hotmart":
-                        result = self.get_hotmart_products()
-                    elif platform == "kiwify":
-                        result = self.get_kiwify_products()
-                    elif platform == "logs":
-                        result = self.get_logs_products()
-                    elif platform == "braip":
-                        result = self.get_braip_products()
-
-                    if result.get("success"):
-                        all_products.extend(result["products"])
-
-                        # Salva produtos no banco
-                        for product in result["products"]:
-                            self.repo.upsert_product(product)
-
-                except (ValueError, KeyError) as e:
-                    logger.warning(f"Erro de validação: {str(e)}")
-                    # Tratamento específico pode ser adicionado aqui
-                except Exception as e:
-                    logger.error(f"Erro ao sincronizar {platform}: {str(e)}", exc_info=True)
-                    continue
-
-            return {
-                "success": True,
-                "total_products": len(all_products),
-                "platforms_synced": platforms,
-                "products": all_products,
-            }
+        """
+        Sincroniza produtos de todas as plataformas.
 
-        except (ValueError, KeyError) as e:
-            logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
-        except Exception as e:
-            logger.error(f"Erro ao sincronizar produtos: {str(e)}", exc_info=True)
-            return {"success": False, "error": str(e)}
+        Usa AffiliateCatalogSync (services/affiliate_sync.py): todas as
+        páginas, plataformas em paralelo, gravação em lote só dos produtos
+        novos ou alterados e retomada a partir do cursor salvo.
+        """
+        return AffiliateCatalogSync(self).run()
 
     def get_affiliate_products(
         self, platform: str = None, category: str = None, page: int = 1, limit: int = 20
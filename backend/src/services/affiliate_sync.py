@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+Sincronização do Catálogo de Afiliados RE-EDUCA Store.
+
+Sincroniza os produtos de Hotmart, Kiwify, Logs e Braip com a tabela
+products (chamado por AffiliateService.sync_all_affiliate_products):
+- As plataformas sincronizam em paralelo; em cada uma, as páginas são
+  buscadas por várias threads, respeitando o limite de requisições por
+  segundo da plataforma (PLATFORM_SYNC)
+- Cada produto tem um content_hash; só os produtos novos ou alterados são
+  gravados, em lotes de WRITE_CHUNK (upsert_affiliate_products, migração 047)
+- O cursor de cada plataforma (affiliate_sync_state) avança a cada lote
+  gravado: uma execução interrompida recomeça da página em que parou
+- Cada execução grava as métricas (páginas, produtos, alterados, tempos)
+  no estado da plataforma
+"""
+
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.base_service import BaseService
+
+logger = logging.getLogger(__name__)
+
+# Plataforma -> product_source (mesmo mapeamento de AffiliateRepository)
+PRODUCT_SOURCES = {"hotmart": "hotmart", "kiwify": "kiwifi", "logs": "other", "braip": "other"}
+
+# fetch: método de AffiliateService; first_page: numeração da API
+PLATFORM_SYNC = {
+    "hotmart": {"fetch": "get_hotmart_products", "first_page": 0, "page_size": 50, "requests_per_second": 2, "workers": 4},
+    "kiwify": {"fetch": "get_kiwify_products", "first_page": 1, "page_size": 100, "requests_per_second": 5, "workers": 4},
+    "logs": {"fetch": "get_logs_products", "first_page": 1, "page_size": 100, "requests_per_second": 5, "workers": 4},
+    "braip": {"fetch": "get_braip_products", "first_page": 1, "page_size": 100, "requests_per_second": 5, "workers": 4},
+}
+
+WRITE_CHUNK = 500
+
+
+class RateLimiter:
+    """Intervalo mínimo entre requisições, compartilhado pelas threads de uma plataforma."""
+
+    def __init__(self, per_second: float, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self.clock = clock
+        self.sleep = sleep
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Aguarda a vez da próxima requisição"""
+        with self._lock:
+            now = self.clock()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            self.sleep(wait)
+
+
+def content_hash(row: Dict[str, Any]) -> str:
+    """Hash do conteúdo de um produto (campos vindos da plataforma)"""
+    return hashlib.sha256(json.dumps(row, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def catalog_row(product: Dict[str, Any], platform: str) -> Optional[Dict[str, Any]]:
+    """
+    Converte um produto da plataforma na linha de products.
+
+    Returns:
+        Linha com content_hash, ou None se o produto veio sem ID
+    """
+    platform_product_id = str(product.get("id") or "")
+    if not platform_product_id or platform_product_id.endswith("_None"):
+        return None
+    row = {
+        "platform_product_id": platform_product_id,
+        "product_source": PRODUCT_SOURCES[platform],
+        "name": product.get("name") or "Produto",
+        "description": product.get("description"),
+        "price": product.get("price") or 0,
+        "image_url": product.get("image_url"),
+        "category": product.get("category"),
+        "tags": product.get("tags") or [],
+        "platform_url": product.get("affiliate_url"),
+    }
+    row["content_hash"] = content_hash(row)
+    return row
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+class AffiliateCatalogSync(BaseService):
+    """
+    Sincronização paralela e incremental do catálogo de afiliados.
+
+    Busca as páginas com os métodos get_*_products de AffiliateService e
+    grava com AffiliateRepository.
+    """
+
+    def __init__(
+        self, affiliate_service, platforms: Optional[Dict[str, Dict[str, Any]]] = None, chunk_size: int = WRITE_CHUNK
+    ):
+        """
+        Inicializa a sincronização.
+
+        Args:
+            affiliate_service: AffiliateService (clientes das plataformas e repositório)
+            platforms: Configuração por plataforma (padrão: PLATFORM_SYNC)
+            chunk_size: Produtos por gravação
+        """
+        super().__init__()
+        self.affiliate_service = affiliate_service
+        self.repo = affiliate_service.repo
+        self.platforms = platforms or PLATFORM_SYNC
+        self.chunk_size = chunk_size
+
+    def run(self, platforms: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Sincroniza as plataformas em paralelo.
+
+        Args:
+            platforms: Plataformas a sincronizar (padrão: todas)
+
+        Returns:
+            Dict com total_products, platforms_synced e métricas por plataforma
+        """
+        try:
+            started = time.perf_counter()
+            names = [name for name in (platforms or self.platforms) if name in self.platforms]
+            if not names:
+                return {"success": False, "error": "Nenhuma plataforma para sincronizar"}
+
+            with ThreadPoolExecutor(max_workers=len(names)) as pool:
+                results = dict(zip(names, pool.map(self.sync_platform, names)))
+
+            return {
+                "success": True,
+                "total_products": sum(result.get("products", 0) for result in results.values()),
+                "total_written": sum(result.get("written", 0) for result in results.values()),
+                "platforms_synced": [name for name, result in results.items() if result.get("complete")],
+                "platforms": results,
+                "duration_ms": _elapsed_ms(started),
+            }
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {"success": False, "error": str(e)}
+        except Exception as e:
+            self.logger.error(f"Erro ao sincronizar produtos afiliados: {str(e)}", exc_info=True)
+            return {"success": False, "error": str(e)}
+
+    def sync_platform(self, platform: str) -> Dict[str, Any]:
+        """
+        Sincroniza uma plataforma a partir do cursor salvo.
+
+        Returns:
+            Métricas da execução (pages, products, changed, written, tempos,
+            cursor, complete e error quando interrompida)
+        """
+        config = self.platforms[platform]
+        state = self.repo.get_sync_state(platform)
+        start_page = max(config["first_page"], int(state.get("cursor") or 0))
+        stats: Dict[str, Any] = {
+            "start_page": start_page,
+            "pages": 0,
+            "products": 0,
+            "changed": 0,
+            "written": 0,
+            "fetch_ms": 0.0,
+            "write_ms": 0.0,
+            "complete": False,
+        }
+        started = time.perf_counter()
+        cursor = start_page
+
+        try:
+            self.repo.save_sync_state(platform, {"cursor": start_page, "last_started_at": datetime.now().isoformat()})
+            hashes = self.repo.find_product_hashes(PRODUCT_SOURCES[platform])
+            if hashes is None:
+                raise RuntimeError("Erro ao carregar produtos já sincronizados")
+
+            pending: List[Dict[str, Any]] = []
+            with closing(self._fetch_pages(config, start_page, stats)) as pages:
+                for page, result in pages:
+                    if not result.get("success"):
+                        raise RuntimeError(f"Página {page}: {result.get('error', 'erro ao buscar')}")
+                    stats["pages"] += 1
+                    pending.extend(self._changed_rows(platform, result.get("products") or [], hashes, stats))
+                    if len(pending) >= self.chunk_size:
+                        self._write(pending, stats)
+                        pending = []
+                        cursor = page + 1
+                        self.repo.save_sync_state(platform, {"cursor": cursor})
+
+            self._write(pending, stats)
+            stats["complete"] = True
+            cursor = 0
+        except Exception as e:
+            stats["error"] = str(e)
+            self.logger.error(f"Sincronização {platform} interrompida (retoma da página {cursor}): {str(e)}")
+
+        stats["cursor"] = cursor
+        stats["duration_ms"] = _elapsed_ms(started)
+        finished = {"cursor": cursor, "last_stats": stats}
+        if stats["complete"]:
+            finished["last_completed_at"] = datetime.now().isoformat()
+        self.repo.save_sync_state(platform, finished)
+        self.logger.info(f"Sincronização {platform}: {stats}")
+        return stats
+
+    def _fetch_pages(
+        self, config: Dict[str, Any], start_page: int, stats: Dict[str, Any]
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Busca as páginas a partir de start_page, entregando-as em ordem.
+
+        Com o total informado pela plataforma, as demais páginas são buscadas
+        em paralelo; sem ele, uma a uma até a primeira página incompleta.
+        """
+        fetch = getattr(self.affiliate_service, config["fetch"])
+        size = config["page_size"]
+        limiter = RateLimiter(config["requests_per_second"])
+        lock = threading.Lock()
+
+        def get_page(page: int) -> Dict[str, Any]:
+            limiter.acquire()
+            started = time.perf_counter()
+            try:
+                return fetch(page, size) or {"success": False}
+            finally:
+                with lock:
+                    stats["fetch_ms"] = round(stats["fetch_ms"] + _elapsed_ms(started), 2)
+
+        first = get_page(start_page)
+        yield start_page, first
+        if not first.get("success"):
+            return
+
+        total = int(first.get("total") or 0)
+        if not total:
+            page, result = start_page, first
+            while len(result.get("products") or []) >= size:
+                page += 1
+                result = get_page(page)
+                yield page, result
+                if not result.get("success"):
+                    return
+            return
+
+        last_page = config["first_page"] + math.ceil(total / size) - 1
+        with ThreadPoolExecutor(max_workers=config["workers"]) as pool:
+            futures = [(page, pool.submit(get_page, page)) for page in range(start_page + 1, last_page + 1)]
+            try:
+                for page, future in futures:
+                    yield page, future.result()
+            finally:
+                # Interrompida (erro ou gravação falhou): não busca o resto
+                for _, future in futures:
+                    future.cancel()
+
+    def _changed_rows(
+        self, platform: str, products: List[Dict[str, Any]], hashes: Dict[str, str], stats: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Linhas dos produtos novos ou alterados (e não repetidos nesta execução)"""
+        rows = []
+        for product in products:
+            row = catalog_row(product, platform)
+            if row is None:
+                continue
+            stats["products"] += 1
+            if hashes.get(row["platform_product_id"]) == row["content_hash"]:
+                continue
+            hashes[row["platform_product_id"]] = row["content_hash"]
+            rows.append(row)
+        stats["changed"] += len(rows)
+        return rows
+
+    def _write(self, rows: List[Dict[str, Any]], stats: Dict[str, Any]):
+        """Grava as linhas em lotes de chunk_size"""
+        for offset in range(0, len(rows), self.chunk_size):
+            chunk = rows[offset : offset + self.chunk_size]
+            started = time.perf_counter()
+            result = self.repo.upsert_products_bulk(chunk)
+            stats["write_ms"] = round(stats["write_ms"] + _elapsed_ms(started), 2)
+            if not result.get("success"):
+                raise RuntimeError(result.get("error", "Erro ao gravar produtos"))
+            stats["written"] += int(result.get("updated") or 0) + int(result.get("inserted") or 0)
@@ -16,6 +16,7 @@ from typing import Any, Dict, List
 
 from config.database import supabase_client
 from services.cache_service import CacheService
+from services.order_read_model import order_read_model
 from sklearn.feature_extraction.text import TfidfVectorizer
 
 logger = logging.getLogger(__name__)
@@ -90,19 +91,17 @@ class AIRecommendationService:
                 logger.info(f"Recomendações de produtos recuperadas do cache para usuário {user_id}")
                 return cached_result
             from repositories.product_repository import ProductRepository
-            from repositories.order_repository import OrderRepository
             from repositories.review_repository import ReviewRepository
             from repositories.favorite_repository import FavoriteRepository
             import numpy as np
 
             product_repo = ProductRepository()
-            order_repo = OrderRepository()
             review_repo = ReviewRepository()
             favorite_repo = FavoriteRepository()
 
-            # 1. Buscar histórico de compras do usuário
-            orders_result = order_repo.find_by_user(user_id, page=1, per_page=50)
-            user_orders = orders_result.get("orders", []) if isinstance(orders_result, dict) else []
+            # 1. Buscar histórico de compras do usuário (itens já trazem a categoria)
+            orders_result = order_read_model.user_orders(user_id, 50)
+            user_orders = orders_result.get("orders", []) if orders_result else []
             purchased_product_ids = set()
             purchased_categories = {}
             
@@ -110,14 +109,11 @@ class AIRecommendationService:
                 order_items = order.get("items", [])
                 for item in order_items:
                     product_id = item.get("product_id")
-                    # Buscar categoria do produto
                     if product_id:
-                        product = product_repo.find_by_id(product_id)
-                        if product:
-                            category = product.get("category")
-                            purchased_product_ids.add(product_id)
-                            if category:
-                                purchased_categories[category] = purchased_categories.get(category, 0) + 1
+                        category = item.get("category")
+                        purchased_product_ids.add(product_id)
+                        if category:
+                            purchased_categories[category] = purchased_categories.get(category, 0) + 1
 
             # 2. Buscar produtos favoritados
             try:
@@ -547,10 +543,8 @@ class AIRecommendationService:
     def _get_user_purchase_data(self, user_id: str) -> List[Dict[str, Any]]:
         """Obtém dados de compras do usuário do banco"""
         try:
-            from repositories.order_repository import OrderRepository
-            order_repo = OrderRepository()
-            orders = order_repo.find_by_user(user_id, limit=50)
-            return orders if isinstance(orders, list) else []
+            orders_result = order_read_model.user_orders(user_id, 50)
+            return orders_result.get("orders", []) if orders_result else []
         except Exception as e:
             logger.warning(f"Erro ao buscar dados de compras: {str(e)}")
             return []
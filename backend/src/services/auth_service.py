@@ -75,6 +75,10 @@ class AuthService(BaseService):
             result = self.user_repo.create(user_data)
 
             if result and isinstance(result, dict) and "id" in result:
+                from services.social_search_service import social_search
+
+                social_search.index_user(result)
+
                 # Gera token
                 token = generate_token(result["id"])
 
@@ -162,6 +166,14 @@ class AuthService(BaseService):
             result = self.user_repo.update(user_id, data)
 
             if result:
+                if "name" in data or "email" in data:
+                    from services.social_search_service import social_search
+
+                    social_search.index_user(result)
+                if "name" in data or "avatar_url" in data:
+                    from services.leaderboard_service import leaderboard_service
+
+                    leaderboard_service.cache_profiles([result], only_existing=True)
                 return {"success": True, "user": result}
             else:
                 return {"success": False, "error": "Erro ao atualizar usuário"}
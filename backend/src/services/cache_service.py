@@ -117,6 +117,42 @@ class CacheService:
             logger.debug(f"Erro ao definir no cache: {e}")
             return False
 
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Obtém vários valores do cache em uma única ida ao Redis (MGET).
+
+        Args:
+            keys (List[str]): Chaves do cache.
+
+        Returns:
+            Dict[str, Any]: Valores deserializados das chaves encontradas.
+        """
+        try:
+            if not self.is_available() or not keys:
+                return {}
+
+            return {key: json.loads(value) for key, value in zip(keys, self.redis_client.mget(keys)) if value}
+
+        except Exception as e:
+            logger.debug(f"Erro ao obter do cache: {e}")
+            return {}
+
+    def set_many(self, values: Dict[str, Any], ttl: int = 3600) -> bool:
+        """Define vários valores no cache com TTL (pipeline)"""
+        try:
+            if not self.is_available() or not values:
+                return False
+
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, value in values.items():
+                pipe.setex(key, ttl, json.dumps(value, default=str))
+            pipe.execute()
+            return True
+
+        except Exception as e:
+            logger.debug(f"Erro ao definir no cache: {e}")
+            return False
+
     def delete(self, key: str) -> bool:
         """Remove valor do cache"""
         try:
@@ -299,14 +335,14 @@ class SocialCacheService:
     def __init__(self):
         self.cache = cache_service
 
-    def get_user_posts(self, user_id: str, page: int = 1) -> Optional[List]:
+    def get_user_posts(self, user_id: str, page: int = 1, limit: int = 20) -> Optional[List]:
         """Obtém posts do usuário do cache"""
-        key = f"user_posts:{user_id}:page:{page}"
+        key = f"user_posts:{user_id}:page:{page}:limit:{limit}"
         return self.cache.get(key)
 
-    def set_user_posts(self, user_id: str, page: int, posts: List, ttl: int = 300):
+    def set_user_posts(self, user_id: str, page: int, posts: List, ttl: int = 300, limit: int = 20):
         """Armazena posts do usuário no cache"""
-        key = f"user_posts:{user_id}:page:{page}"
+        key = f"user_posts:{user_id}:page:{page}:limit:{limit}"
         return self.cache.set(key, posts, ttl)
 
     def invalidate_user_posts(self, user_id: str):
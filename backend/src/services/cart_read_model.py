@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+Leitura do Carrinho RE-EDUCA Store.
+
+Visão do carrinho por usuário no Redis, para que badge, página do carrinho,
+prévia de frete e criação de pedido leiam o carrinho com um HGETALL:
+- CART_KEY é um hash com um campo por item (quantidade e snapshot do
+  produto: nome, preço, imagem, estoque); total e item_count saem da soma
+  dos itens na leitura, sem banco
+- Alterações do carrinho (CartService) são gravadas na visão ao mesmo tempo
+  que no banco (write-through); CART_VERSION_KEY muda a cada escrita, e uma
+  visão montada do banco só é gravada se a versão não mudou no meio
+- CART_PRODUCT_KEY (sorted set usuário -> quantidade) é o índice reverso
+  produto -> carrinhos: mudança de preço, produto ou estoque (o snapshot
+  guarda o estoque) invalida todos os carrinhos com o produto
+
+Sem Redis, CartService monta o carrinho do banco como antes.
+"""
+
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+CART_KEY = "cart:view:{user_id}"
+CART_VERSION_KEY = "cart:version:{user_id}"
+CART_PRODUCT_KEY = "cart:product:{product_id}"
+CART_TTL = 3600
+
+# Campo presente em toda visão gravada (carrinho vazio também é um acerto)
+_MARKER = "_v"
+_ITEM_PREFIX = "item:"
+
+# KEYS: visão, versão; ARGV: versão lida antes do banco, TTL, campo, valor, ...
+_STORE = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+# KEYS: visão, versão; ARGV: TTL, campo, valor (vazio remove o campo)
+_WRITE_ITEM = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+if ARGV[3] == '' then
+    redis.call('HDEL', KEYS[1], ARGV[2])
+else
+    redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+end
+return 1
+"""
+
+# KEYS: visão, versão; ARGV: TTL
+_CLEAR = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], '_v', '1')
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+def cart_item_view(item: Dict[str, Any], product: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Monta o item do carrinho no formato de get_cart.
+
+    Args:
+        item: Linha de cart_items
+        product: Produto do item
+
+    Returns:
+        Item com snapshot do produto, ou None se o produto está inativo
+    """
+    product = product if isinstance(product, dict) else {}
+    if not product.get("is_active", True):
+        return None
+    price = product.get("price", 0)
+    return {
+        "id": item["id"],
+        "product_id": item["product_id"],
+        "quantity": item["quantity"],
+        "name": product.get("name", "Produto"),
+        "price": price,
+        "image_url": product.get("image_url", ""),
+        "stock_quantity": product.get("stock_quantity", 0),
+        "total": item["quantity"] * price,
+        "created_at": item.get("created_at"),
+        "updated_at": item.get("updated_at"),
+    }
+
+
+def summarize(items: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Carrinho com items (ordem de inclusão), total e item_count"""
+    items = sorted(items, key=lambda item: item.get("created_at") or "")
+    total = sum(item["total"] for item in items)
+    return {"items": items, "total": round(total, 2), "item_count": len(items)}
+
+
+class CartReadModel:
+    """Visão do carrinho por usuário no Redis."""
+
+    def __init__(self):
+        """Inicializa a visão do carrinho."""
+        self.logger = logger
+
+    @property
+    def redis(self):
+        return cache_service.redis_client
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Lê o carrinho da visão (um HGETALL).
+
+        Returns:
+            Carrinho no formato de get_cart, ou None se não há visão
+        """
+        try:
+            if not self.redis:
+                return None
+            fields = self.redis.hgetall(CART_KEY.format(user_id=user_id))
+            if not fields:
+                return None
+            return summarize(
+                json.loads(value) for field, value in fields.items() if field.startswith(_ITEM_PREFIX)
+            )
+        except Exception as e:
+            self.logger.warning(f"Erro ao ler carrinho do usuário {user_id} do cache: {str(e)}")
+            return None
+
+    def version(self, user_id: str) -> Optional[str]:
+        """
+        Versão atual do carrinho; lida antes de montar a visão do banco.
+
+        Returns:
+            Versão, ou None sem Redis (a visão não deve ser gravada)
+        """
+        try:
+            if not self.redis:
+                return None
+            return self.redis.get(CART_VERSION_KEY.format(user_id=user_id)) or "0"
+        except Exception as e:
+            self.logger.warning(f"Erro ao ler versão do carrinho do usuário {user_id}: {str(e)}")
+            return None
+
+    def store(self, user_id: str, items: List[Dict[str, Any]], version: str) -> bool:
+        """
+        Grava a visão montada do banco.
+
+        Args:
+            user_id: ID do usuário
+            items: Itens (cart_item_view)
+            version: Versão lida antes da consulta ao banco
+
+        Returns:
+            True se gravada; False se o carrinho mudou no meio (a visão seria antiga)
+        """
+        try:
+            if not self.redis:
+                return False
+            fields = [_MARKER, "1"]
+            for item in items:
+                fields += [f"{_ITEM_PREFIX}{item['id']}", json.dumps(item, default=str)]
+            stored = self.redis.eval(
+                _STORE,
+                2,
+                CART_KEY.format(user_id=user_id),
+                CART_VERSION_KEY.format(user_id=user_id),
+                version,
+                CART_TTL,
+                *fields,
+            )
+            if not int(stored or 0):
+                return False
+            self._index(user_id, items)
+            return True
+        except Exception as e:
+            self.logger.warning(f"Erro ao gravar carrinho do usuário {user_id} no cache: {str(e)}")
+            return False
+
+    def put_item(self, user_id: str, item: Optional[Dict[str, Any]]):
+        """Grava um item incluído ou alterado (write-through)"""
+        if item is None:
+            self.invalidate(user_id)
+            return
+        if self._write_item(user_id, item["id"], json.dumps(item, default=str)):
+            self._index(user_id, [item])
+
+    def remove_item(self, user_id: str, item_id: str):
+        """Remove um item da visão (write-through)"""
+        self._write_item(user_id, item_id, "")
+
+    def clear(self, user_id: str):
+        """Grava o carrinho vazio (carrinho limpo ou convertido em pedido)"""
+        try:
+            if self.redis:
+                self.redis.eval(
+                    _CLEAR, 2, CART_KEY.format(user_id=user_id), CART_VERSION_KEY.format(user_id=user_id), CART_TTL
+                )
+        except Exception as e:
+            self.logger.warning(f"Erro ao limpar carrinho do usuário {user_id} no cache: {str(e)}")
+            self.invalidate(user_id)
+
+    def invalidate(self, user_id: str):
+        """Descarta a visão; a próxima leitura monta de novo a partir do banco"""
+        self.invalidate_many([user_id])
+
+    def invalidate_many(self, user_ids: Iterable[str]):
+        """Descarta as visões de vários usuários"""
+        user_ids = list(user_ids)
+        try:
+            if not self.redis or not user_ids:
+                return
+            pipe = self.redis.pipeline()
+            for user_id in user_ids:
+                pipe.incr(CART_VERSION_KEY.format(user_id=user_id))
+                pipe.expire(CART_VERSION_KEY.format(user_id=user_id), CART_TTL)
+                pipe.delete(CART_KEY.format(user_id=user_id))
+            pipe.execute()
+        except Exception as e:
+            self.logger.warning(f"Erro ao invalidar {len(user_ids)} carrinho(s) no cache: {str(e)}")
+
+    def invalidate_product(self, product_id: str):
+        """Descarta os carrinhos com o produto (preço, nome, status ou estoque mudou)"""
+        try:
+            if not self.redis:
+                return
+            index = CART_PRODUCT_KEY.format(product_id=product_id)
+            self.invalidate_many(self.redis.zrange(index, 0, -1))
+            self.redis.delete(index)
+        except Exception as e:
+            self.logger.warning(f"Erro ao invalidar carrinhos do produto {product_id}: {str(e)}")
+
+    def _write_item(self, user_id: str, item_id: str, value: str) -> bool:
+        try:
+            if not self.redis:
+                return False
+            written = self.redis.eval(
+                _WRITE_ITEM,
+                2,
+                CART_KEY.format(user_id=user_id),
+                CART_VERSION_KEY.format(user_id=user_id),
+                CART_TTL,
+                f"{_ITEM_PREFIX}{item_id}",
+                value,
+            )
+            return bool(int(written or 0))
+        except Exception as e:
+            self.logger.warning(f"Erro ao atualizar carrinho do usuário {user_id} no cache: {str(e)}")
+            self.invalidate(user_id)
+            return False
+
+    def _index(self, user_id: str, items: List[Dict[str, Any]]):
+        """Registra o carrinho no índice reverso de cada produto"""
+        # Entradas antigas (item removido, visão expirada) só causam invalidações a mais
+        pipe = self.redis.pipeline()
+        for item in items:
+            index = CART_PRODUCT_KEY.format(product_id=item["product_id"])
+            pipe.zadd(index, {str(user_id): item["quantity"]})
+            pipe.expire(index, CART_TTL)
+        pipe.execute()
+
+
+cart_read_model = CartReadModel()
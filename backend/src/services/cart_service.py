@@ -7,6 +7,8 @@ Gerencia operações do carrinho de compras incluindo:
 - Calcular totais
 - Validar estoque disponível
 - Limpar carrinho
+- Visão do carrinho no Redis, atualizada a cada alteração
+  (services/cart_read_model.py)
 """
 
 import logging
@@ -14,6 +16,7 @@ from typing import Any, Dict
 
 from repositories.cart_repository import CartRepository
 from services.base_service import BaseService
+from services.cart_read_model import cart_item_view, cart_read_model, summarize
 from services.product_service import ProductService
 
 logger = logging.getLogger(__name__)
@@ -31,49 +34,38 @@ class CartService(BaseService):
         super().__init__()
         self.repo = CartRepository()
         self.product_service = ProductService()
+        self.read_model = cart_read_model
 
-    def get_cart(self, user_id: str) -> Dict[str, Any]:
+    def get_cart(self, user_id: str, use_cache: bool = True) -> Dict[str, Any]:
         """
         Retorna carrinho do usuário com itens e totais.
 
-        Utiliza CartRepository para operações padronizadas.
+        Lê a visão do carrinho no Redis (services/cart_read_model.py); sem
+        visão, monta do banco com CartRepository e grava a visão.
 
         Args:
             user_id (str): ID do usuário.
+            use_cache (bool): False lê preços e estoque atuais do banco
+                (checkout), sem confiar no snapshot da visão.
 
         Returns:
             Dict[str, Any]: Carrinho com items, total e item_count.
         """
         try:
+            cached = self.read_model.get(user_id) if use_cache else None
+            if cached is not None:
+                return cached
+
+            # Versão lida antes do banco: se o carrinho mudar no meio, a visão não é gravada
+            version = self.read_model.version(user_id)
             cart_items = self.repo.find_by_user_with_products(user_id)
 
-            items = []
-            total = 0
-
-            for item in cart_items:
-                # Filtrar apenas produtos ativos
-                product = item.get("products", {}) if isinstance(item.get("products"), dict) else {}
-                if not product.get("is_active", True):
-                    continue
-
-                item_total = item["quantity"] * product.get("price", 0)
-                items.append(
-                    {
-                        "id": item["id"],
-                        "product_id": item["product_id"],
-                        "quantity": item["quantity"],
-                        "name": product.get("name", "Produto"),
-                        "price": product.get("price", 0),
-                        "image_url": product.get("image_url", ""),
-                        "stock_quantity": product.get("stock_quantity", 0),
-                        "total": item_total,
-                        "created_at": item.get("created_at"),
-                        "updated_at": item.get("updated_at"),
-                    }
-                )
-                total += item_total
-
-            return {"items": items, "total": round(total, 2), "item_count": len(items)}
+            # Filtrar apenas produtos ativos
+            items = [view for view in (cart_item_view(item, item.get("products")) for item in cart_items) if view]
+
+            if version is not None:
+                self.read_model.store(user_id, items, version)
+            return summarize(items)
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
             # Tratamento específico pode ser adicionado aqui
@@ -119,14 +111,16 @@ class CartService(BaseService):
                 if product.get("stock_quantity", 0) < new_quantity:
                     return {"success": False, "error": "Estoque insuficiente para esta quantidade"}
 
-                updated = self.repo.update_quantity(existing_item["id"], user_id, new_quantity)
-                if not updated:
+                saved = self.repo.update_quantity(existing_item["id"], user_id, new_quantity)
+                if not saved:
                     return {"success": False, "error": "Erro ao atualizar carrinho"}
             else:
-                created = self.repo.create_item(user_id, product_id, quantity)
-                if not created:
+                saved = self.repo.create_item(user_id, product_id, quantity)
+                if not saved:
                     return {"success": False, "error": "Erro ao adicionar ao carrinho"}
 
+            self.read_model.put_item(user_id, cart_item_view(saved, product))
+
             return {"success": True, "message": "Produto adicionado ao carrinho"}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -173,6 +167,7 @@ class CartService(BaseService):
             if not updated:
                 return {"success": False, "error": "Erro ao atualizar carrinho"}
 
+            self.read_model.put_item(user_id, cart_item_view(updated, product))
             return {"success": True, "message": "Carrinho atualizado"}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -198,6 +193,7 @@ class CartService(BaseService):
             success = self.repo.delete_by_id_and_user(item_id, user_id)
 
             if success:
+                self.read_model.remove_item(user_id, item_id)
                 return {"success": True, "message": "Item removido do carrinho"}
             else:
                 return {"success": False, "error": "Erro ao remover do carrinho"}
@@ -224,6 +220,7 @@ class CartService(BaseService):
             success = self.repo.delete_all_by_user(user_id)
 
             if success:
+                self.read_model.clear(user_id)
                 return {"success": True, "message": "Carrinho limpo"}
             else:
                 return {"success": False, "error": "Erro ao limpar carrinho"}
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Service de Checkout RE-EDUCA Store.
+
+Cotação de checkout assinada, calculada na visualização da página de
+checkout:
+- Etapas: carrinho, depois cupom e frete em paralelo (ambos dependem só do
+  subtotal); cada etapa tem seu tempo medido
+- A cotação (itens com preço, desconto, frete, endereço) é assinada com
+  HMAC-SHA256 e vale por QUOTE_TTL segundos
+- OrderService.create_order com quote_token confere a assinatura e cria o
+  pedido com uma chamada (create_order_from_quote, migração 043), sem reler
+  carrinho, cupom ou frete
+
+O cupom é apenas validado na cotação; o uso é reservado na criação do
+pedido, dentro da transação.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from services.base_service import BaseService
+
+QUOTE_TTL = 600
+QUOTE_VERSION = 1
+
+# Cupom e frete de várias cotações rodam em paralelo neste pool
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="checkout-quote")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _quote_secret() -> Optional[bytes]:
+    """Chave de assinatura (CHECKOUT_QUOTE_SECRET ou SECRET_KEY)"""
+    secret = os.environ.get("CHECKOUT_QUOTE_SECRET") or os.environ.get("SECRET_KEY")
+    return secret.encode("utf-8") if secret else None
+
+
+def sign_quote(payload: Dict[str, Any]) -> str:
+    """
+    Serializa e assina uma cotação.
+
+    Raises:
+        ValueError: Se não houver chave de assinatura configurada
+    """
+    secret = _quote_secret()
+    if not secret:
+        raise ValueError("Chave de assinatura da cotação não configurada")
+    body = _b64encode(json.dumps(payload, separators=(",", ":"), sort_keys=True, default=str).encode("utf-8"))
+    signature = _b64encode(hmac.new(secret, body.encode("ascii"), hashlib.sha256).digest())
+    return f"{body}.{signature}"
+
+
+def verify_quote(token: str, user_id: str, now: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Confere assinatura, dono e validade de uma cotação.
+
+    Args:
+        token: Token retornado por create_quote
+        user_id: Usuário que está criando o pedido
+        now: Horário de referência (epoch, padrão: agora)
+
+    Returns:
+        Payload da cotação
+
+    Raises:
+        ValueError: "Cotação inválida" ou "Cotação expirada"
+    """
+    secret = _quote_secret()
+    try:
+        body, signature = str(token).split(".", 1)
+        expected = _b64encode(hmac.new(secret or b"", body.encode("ascii"), hashlib.sha256).digest())
+        if not secret or not hmac.compare_digest(signature, expected):
+            raise ValueError("assinatura")
+        payload = json.loads(_b64decode(body))
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Cotação inválida")
+    if payload.get("v") != QUOTE_VERSION or str(payload.get("uid")) != str(user_id):
+        raise ValueError("Cotação inválida")
+    if float(payload.get("exp") or 0) < (now if now is not None else time.time()):
+        raise ValueError("Cotação expirada")
+    return payload
+
+
+def _cep(address: Dict[str, Any]) -> Optional[str]:
+    """CEP do endereço (cep, postal_code ou zip_code)"""
+    return address.get("cep") or address.get("postal_code") or address.get("zip_code")
+
+
+class CheckoutService(BaseService):
+    """Cotação de checkout assinada (carrinho, cupom e frete)."""
+
+    def __init__(self):
+        """Inicializa o serviço de checkout."""
+        super().__init__()
+        from services.cart_service import CartService
+        from services.coupon_service import CouponService
+        from services.shipping_service import ShippingService
+
+        self.cart_service = CartService()
+        self.coupon_service = CouponService()
+        self.shipping_service = ShippingService()
+
+    @staticmethod
+    def _timed(timings: Dict[str, float], stage: str, func: Callable, *args, **kwargs) -> Any:
+        """Executa uma etapa registrando o tempo em ms"""
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[stage] = round((time.perf_counter() - started) * 1000, 2)
+
+    def create_quote(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Calcula e assina a cotação do checkout.
+
+        Args:
+            user_id: ID do usuário
+            data: shipping_address (com CEP), coupon_code e items (peso e
+                dimensões, opcional, para cotar nos Correios)
+
+        Returns:
+            Dict com success, quote_token, quote (valores), expires_at e timings (ms por etapa)
+        """
+        timings: Dict[str, float] = {}
+        try:
+            shipping_address = data.get("shipping_address") or {}
+            if not isinstance(shipping_address, dict) or not _cep(shipping_address):
+                return {"success": False, "error": "Endereço de entrega com CEP é obrigatório"}
+
+            # Preços do banco: o pedido é cobrado pelo valor da cotação
+            cart = self._timed(timings, "cart", self.cart_service.get_cart, user_id, use_cache=False)
+            cart_items = cart.get("items") or []
+            if not cart_items:
+                return {"success": False, "error": "Carrinho vazio", "timings": timings}
+            subtotal = round(float(cart.get("total") or 0), 2)
+
+            coupon_code = (data.get("coupon_code") or "").strip() or None
+            coupon_future = None
+            if coupon_code:
+                coupon_future = _executor.submit(
+                    self._timed, timings, "coupon", self.coupon_service.validate_coupon, coupon_code, subtotal
+                )
+            shipping_items = data.get("items") or []
+            shipping_future = _executor.submit(
+                self._timed,
+                timings,
+                "shipping",
+                self.shipping_service.calculate_shipping,
+                order_total=subtotal,
+                address={**shipping_address, "cep": _cep(shipping_address)},
+                items=shipping_items,
+                use_correios=bool(shipping_items),
+            )
+
+            discount_amount = 0.0
+            if coupon_future:
+                coupon = coupon_future.result()
+                if not coupon.get("success"):
+                    shipping_future.cancel()
+                    return {"success": False, "error": coupon.get("error", "Cupom inválido"), "timings": timings}
+                discount_amount = round(float(coupon.get("discount_amount") or 0), 2)
+            shipping = shipping_future.result()
+            shipping_cost = round(float(shipping.get("shipping_cost") or 0), 2)
+
+            expires_at = int(time.time()) + QUOTE_TTL
+            quote = {
+                "items": [
+                    {
+                        "product_id": str(item["product_id"]),
+                        "quantity": int(item["quantity"]),
+                        "price": float(item["price"]),
+                        "name": item.get("name", "Produto"),
+                    }
+                    for item in cart_items
+                ],
+                "subtotal": subtotal,
+                "discount_amount": discount_amount,
+                "shipping_cost": shipping_cost,
+                "total": round(subtotal - discount_amount + shipping_cost, 2),
+                "coupon_code": coupon_code,
+                "shipping_address": shipping_address,
+                "shipping": {
+                    key: shipping.get(key) for key in ("is_free", "message", "calculated_by", "delivery_days")
+                },
+            }
+            payload = {"v": QUOTE_VERSION, "qid": str(uuid.uuid4()), "uid": str(user_id), "exp": expires_at, **quote}
+            token = self._timed(timings, "sign", sign_quote, payload)
+
+            self.logger.info(f"Cotação de checkout {payload['qid']} calculada: {timings}")
+            return {
+                "success": True,
+                "quote_token": token,
+                "quote": quote,
+                "expires_at": expires_at,
+                "timings": timings,
+            }
+        except (ValueError, KeyError) as e:
+            self.logger.warning(f"Erro de validação na cotação de checkout: {str(e)}")
+            return {"success": False, "error": f"Dados inválidos: {str(e)}", "timings": timings}
+        except Exception as e:
+            self.logger.error(f"Erro ao calcular cotação de checkout: {str(e)}", exc_info=True)
+            return {"success": False, "error": "Erro ao calcular cotação", "timings": timings}
+
+
+def order_payload_from_quote(quote: Dict[str, Any], data: Dict[str, Any]) -> Tuple[Dict[str, Any], list]:
+    """
+    Dados do pedido e itens para create_order_from_quote.
+
+    Args:
+        quote: Payload verificado da cotação
+        data: Corpo da criação do pedido (payment_method, transaction_id)
+
+    Returns:
+        Tuple (order_data, cart_items)
+    """
+    order_data = {
+        "subtotal": float(quote["subtotal"]),
+        "discount_amount": float(quote["discount_amount"]),
+        "shipping_cost": float(quote["shipping_cost"]),
+        "total": float(quote["total"]),
+        "status": "pending",
+        "payment_status": "pending",
+        "shipping_address": quote.get("shipping_address"),
+        "payment_method": data.get("payment_method", "credit_card"),
+        "coupon_code": quote.get("coupon_code"),
+        "transaction_id": data.get("transaction_id"),
+    }
+    return order_data, list(quote["items"])
@@ -6,14 +6,83 @@ Integra com API dos Correios para cálculo de frete real baseado em:
 - CEP de origem e destino
 - Peso e dimensões do produto
 - Tipo de serviço (PAC, SEDEX, etc)
+
+Cotações ficam em cache por faixa (prefixo de 5 dígitos dos CEPs, peso,
+dimensões e valor declarado arredondados para cima): a API é chamada com os
+valores da faixa, então a cotação vale para qualquer pedido dentro dela.
+Os serviços são cotados em paralelo sob um prazo único (QUOTE_DEADLINE);
+serviço que não responde a tempo recebe estimativa da tabela regional e a
+API fica em modo degradado por DEGRADED_SECONDS, sem novas chamadas.
+Respostas que chegam depois do prazo ainda entram no cache.
 """
 import logging
+import math
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
 import requests
-from typing import Any, Dict, List, Optional
+
+from services.cache_service import cache_service
 
 logger = logging.getLogger(__name__)
 
+QUOTE_KEY = "shipping:quote:{service_code}:{bucket}"
+QUOTE_TTL = 6 * 3600
+QUOTE_DEADLINE = float(os.environ.get("CORREIOS_QUOTE_DEADLINE", "2.5"))
+DEGRADED_SECONDS = 60
+
+# Mínimos aceitos pelos Correios (cm) e faixas de arredondamento
+MIN_DIMENSIONS = {"comprimento": 16, "largura": 11, "altura": 2}
+DIMENSION_STEP_CM = 5
+DECLARED_VALUE_STEP = 50
+
+# Tabela regional de referência para quando a API não responde a tempo:
+# (preço até 1 kg, preço por kg adicional, prazo em dias úteis) por zona.
+# Zona pelo primeiro dígito do CEP: mesma região postal = local, mesma
+# macrorregião = regional, demais = nacional.
+FALLBACK_RATES = {
+    "PAC": {"local": (19.90, 2.50, 5), "regional": (26.90, 4.90, 8), "nacional": (36.90, 8.90, 12)},
+    "SEDEX": {"local": (24.90, 3.90, 2), "regional": (39.90, 8.90, 3), "nacional": (59.90, 14.90, 5)},
+}
+FALLBACK_SERVICE = {
+    "PAC": "PAC",
+    "PAC_CONTRATO": "PAC",
+    "SEDEX": "SEDEX",
+    "SEDEX_CONTRATO": "SEDEX",
+    "SEDEX_10": "SEDEX",
+    "SEDEX_12": "SEDEX",
+}
+MACRO_REGIONS = ("012389", "456", "7")
+
+# Pool compartilhado: cotações em andamento não seguram a requisição após o prazo
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="correios-quote")
+
+
+def _weight_bucket(peso_gramas: int) -> int:
+    """Faixa de peso em gramas (300 g, 500 g, depois kg inteiros)"""
+    if peso_gramas <= 300:
+        return 300
+    if peso_gramas <= 500:
+        return 500
+    return int(math.ceil(peso_gramas / 1000.0)) * 1000
+
+
+def _dimension_bucket(value_cm: float, minimum: int) -> int:
+    """Dimensão arredondada para cima em múltiplos de DIMENSION_STEP_CM, respeitando o mínimo"""
+    return max(minimum, int(math.ceil(float(value_cm or 0) / DIMENSION_STEP_CM)) * DIMENSION_STEP_CM)
+
+
+def _shipping_zone(cep_origem: str, cep_destino: str) -> str:
+    """Zona da tabela regional a partir do primeiro dígito dos CEPs"""
+    if cep_origem[0] == cep_destino[0]:
+        return "local"
+    if any(cep_origem[0] in region and cep_destino[0] in region for region in MACRO_REGIONS):
+        return "regional"
+    return "nacional"
+
 
 class CorreiosIntegrationService:
     """
@@ -45,6 +114,11 @@ class CorreiosIntegrationService:
         # URL da API dos Correios
         self.api_url = "http://ws.correios.com.br/calculador/CalcPrecoPrazo.aspx"
 
+        # Conexões reaproveitadas entre cotações
+        self.session = requests.Session()
+        self._degraded_until = 0.0
+        self._lock = threading.Lock()
+
     def calculate_shipping(
         self,
         cep_destino: str,
@@ -95,28 +169,18 @@ class CorreiosIntegrationService:
             if peso_gramas < 1:
                 peso_gramas = 1  # Mínimo 1g
 
-            # Calcular para cada serviço
-            shipping_options = []
-
-            for service_name in services:
-                service_code = self.service_codes.get(service_name)
-                if not service_code:
-                    continue
-
-                result = self._call_correios_api(
-                    cep_origem=cep_origem,
-                    cep_destino=cep_destino,
-                    peso_gramas=peso_gramas,
-                    comprimento_cm=comprimento_cm,
-                    altura_cm=altura_cm,
-                    largura_cm=largura_cm,
-                    valor_declarado=valor_declarado,
-                    service_code=service_code,
-                    service_name=service_name,
-                )
-
-                if result.get("success"):
-                    shipping_options.append(result)
+            params = {
+                "cep_origem": cep_origem,
+                "cep_destino": cep_destino,
+                "peso_gramas": _weight_bucket(peso_gramas),
+                "comprimento_cm": _dimension_bucket(comprimento_cm, MIN_DIMENSIONS["comprimento"]),
+                "altura_cm": _dimension_bucket(altura_cm, MIN_DIMENSIONS["altura"]),
+                "largura_cm": _dimension_bucket(largura_cm, MIN_DIMENSIONS["largura"]),
+                "valor_declarado": int(math.ceil(float(valor_declarado or 0) / DECLARED_VALUE_STEP))
+                * DECLARED_VALUE_STEP,
+            }
+            requested = [(name, self.service_codes[name]) for name in services if name in self.service_codes]
+            shipping_options = [quote for quote in self._quote_services(params, requested) if quote.get("success")]
 
             if not shipping_options:
                 return {"success": False, "error": "Nenhuma opção de frete disponível"}
@@ -135,6 +199,109 @@ class CorreiosIntegrationService:
             self.logger.error(f"Erro ao calcular frete dos Correios: {str(e)}", exc_info=True)
             return {"success": False, "error": f"Erro ao calcular frete: {str(e)}"}
 
+    def _quote_bucket(self, params: Dict[str, Any]) -> str:
+        """Faixa da cotação usada na chave de cache"""
+        return ":".join(
+            str(part)
+            for part in (
+                params["cep_origem"][:5],
+                params["cep_destino"][:5],
+                params["peso_gramas"],
+                f"{params['comprimento_cm']}x{params['altura_cm']}x{params['largura_cm']}",
+                params["valor_declarado"],
+            )
+        )
+
+    def _quote_services(self, params: Dict[str, Any], requested: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Cota os serviços: cache, depois API em paralelo até QUOTE_DEADLINE,
+        depois tabela regional.
+
+        Args:
+            params: Parâmetros da API já arredondados para a faixa
+            requested: Lista de (nome, código) dos serviços
+
+        Returns:
+            Lista de cotações com source (cache, correios ou estimate)
+        """
+        bucket = self._quote_bucket(params)
+        keys = {code: QUOTE_KEY.format(service_code=code, bucket=bucket) for _, code in requested}
+        cached = cache_service.get_many(list(keys.values()))
+
+        quotes: Dict[str, Dict[str, Any]] = {}
+        for name, code in requested:
+            if keys[code] in cached:
+                quotes[code] = {**cached[keys[code]], "source": "cache"}
+
+        pending = [(name, code) for name, code in requested if code not in quotes]
+        unanswered = {code for _, code in pending}
+        if pending and time.monotonic() >= self._degraded_until:
+            futures = {}
+            for name, code in pending:
+                future = _executor.submit(self._call_correios_api, service_code=code, service_name=name, **params)
+                future.add_done_callback(self._cache_quote_callback(keys[code]))
+                futures[future] = code
+            done, _ = wait(futures, timeout=QUOTE_DEADLINE)
+            for future in done:
+                result = future.result()
+                if result.get("success"):
+                    quotes[futures[future]] = {**result, "source": "correios"}
+                if not result.get("unavailable"):
+                    # Resposta da API (inclusive serviço indisponível para o CEP)
+                    unanswered.discard(futures[future])
+            if unanswered:
+                self._mark_degraded()
+
+        for name, code in pending:
+            if code in unanswered:
+                quotes[code] = self._estimate(name, code, params)
+
+        return [quotes[code] for _, code in requested if code in quotes]
+
+    def _cache_quote_callback(self, key: str):
+        """Grava a cotação no cache quando a chamada termina (mesmo após o prazo)"""
+
+        def callback(future):
+            try:
+                result = future.result()
+                if result.get("success"):
+                    cache_service.set(key, result, ttl=QUOTE_TTL)
+            except Exception as e:
+                self.logger.debug(f"Erro ao gravar cotação em cache: {str(e)}")
+
+        return callback
+
+    def _mark_degraded(self):
+        """Suspende chamadas à API por DEGRADED_SECONDS"""
+        with self._lock:
+            if time.monotonic() >= self._degraded_until:
+                self.logger.warning(
+                    f"API dos Correios lenta ou indisponível; usando tabela regional por {DEGRADED_SECONDS}s"
+                )
+            self._degraded_until = time.monotonic() + DEGRADED_SECONDS
+
+    def _estimate(self, service_name: str, service_code: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Estimativa pela tabela regional (FALLBACK_RATES).
+
+        Returns:
+            Cotação com source=estimate, ou erro se o serviço não tem tarifa de referência
+        """
+        rates = FALLBACK_RATES.get(FALLBACK_SERVICE.get(service_name, ""))
+        if not rates:
+            return {"success": False, "error": "Serviço sem tarifa de referência"}
+        base, per_kg, delivery_days = rates[_shipping_zone(params["cep_origem"], params["cep_destino"])]
+        extra_kg = max(0, int(math.ceil(params["peso_gramas"] / 1000.0)) - 1)
+        return {
+            "success": True,
+            "service": service_name,
+            "service_code": service_code,
+            "price": round(base + per_kg * extra_kg, 2),
+            "delivery_days": delivery_days,
+            "delivery_estimate": f"{delivery_days} dia(s) útil(is)",
+            "source": "estimate",
+        }
+
     def _call_correios_api(
         self,
         cep_origem: str,
@@ -180,10 +347,10 @@ class CorreiosIntegrationService:
             params = {k: v for k, v in params.items() if v}
 
             # Fazer requisição
-            response = requests.get(self.api_url, params=params, timeout=10)
+            response = self.session.get(self.api_url, params=params, timeout=QUOTE_DEADLINE)
 
             if response.status_code != 200:
-                return {"success": False, "error": f"Erro na API dos Correios: {response.status_code}"}
+                return {"success": False, "error": f"Erro na API dos Correios: {response.status_code}", "unavailable": True}
 
             # Parse XML (simplificado - em produção usar xml.etree.ElementTree)
             import xml.etree.ElementTree as ET
@@ -225,10 +392,10 @@ class CorreiosIntegrationService:
 
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Erro na requisição para Correios: {str(e)}")
-            return {"success": False, "error": f"Erro de conexão: {str(e)}"}
+            return {"success": False, "error": f"Erro de conexão: {str(e)}", "unavailable": True}
         except Exception as e:
             self.logger.error(f"Erro ao processar resposta dos Correios: {str(e)}", exc_info=True)
-            return {"success": False, "error": f"Erro ao processar resposta: {str(e)}"}
+            return {"success": False, "error": f"Erro ao processar resposta: {str(e)}", "unavailable": True}
 
     def validate_cep(self, cep: str) -> Dict[str, Any]:
         """
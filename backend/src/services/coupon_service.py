@@ -2,17 +2,18 @@
 Service de Cupons RE-EDUCA Store.
 
 Gerencia operações de cupons de desconto incluindo:
-- Validação de cupons
+- Validação de cupons (índice em memória, services/promotion_engine.py)
 - Aplicação de descontos
-- Controle de uso e limites
+- Controle de uso e limites (contador atômico no Redis)
 """
 
 import logging
-from datetime import datetime
+import time
 from typing import Any, Dict
 
 from repositories.coupon_repository import CouponRepository
 from services.base_service import BaseService
+from services.promotion_engine import promotion_engine
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +29,7 @@ class CouponService(BaseService):
         """Inicializa o serviço de cupons."""
         super().__init__()
         self.repo = CouponRepository()
+        self.engine = promotion_engine
 
     def validate_coupon(self, code: str, order_total: float = 0) -> Dict[str, Any]:
         """
@@ -44,63 +46,40 @@ class CouponService(BaseService):
             if not code or not code.strip():
                 return {"success": False, "error": "Código do cupom é obrigatório"}
 
-            coupon = self.repo.find_by_code(code.strip().upper())
+            # Índice em memória (apenas cupons ativos, datas já convertidas)
+            compiled = self.engine.get_index().coupon(code)
 
-            if not coupon:
+            if not compiled:
                 return {"success": False, "error": "Cupom não encontrado"}
 
-            # Verificar se está ativo
-            if not coupon.get("is_active", False):
-                return {"success": False, "error": "Cupom inativo"}
-
             # Validar data de validade
-            now = datetime.utcnow()
-            if coupon.get("valid_from"):
-                valid_from = datetime.fromisoformat(coupon["valid_from"].replace("Z", "+00:00"))
-                if now < valid_from:
-                    return {"success": False, "error": "Cupom ainda não está válido"}
-
-            if coupon.get("valid_until"):
-                valid_until = datetime.fromisoformat(coupon["valid_until"].replace("Z", "+00:00"))
-                if now > valid_until:
-                    return {"success": False, "error": "Cupom expirado"}
+            window = compiled.window_status(time.time())
+            if window == "pending":
+                return {"success": False, "error": "Cupom ainda não está válido"}
+            if window == "expired":
+                return {"success": False, "error": "Cupom expirado"}
 
             # Validar valor mínimo de compra
-            min_purchase = float(coupon.get("min_purchase_amount", 0) or 0)
-            if order_total < min_purchase:
-                return {"success": False, "error": f"Valor mínimo de compra: R$ {min_purchase:.2f}"}
-
-            # Validar limite de uso
-            usage_limit = coupon.get("usage_limit")
-            usage_count = coupon.get("usage_count", 0)
-            if usage_limit and usage_count >= usage_limit:
+            if order_total < compiled.min_order_value:
+                return {"success": False, "error": f"Valor mínimo de compra: R$ {compiled.min_order_value:.2f}"}
+
+            # Validar limite de uso (contador atômico no Redis)
+            if compiled.usage_limit and self.engine.usage_count(compiled) >= compiled.usage_limit:
                 return {"success": False, "error": "Cupom esgotado"}
 
-            # Calcular desconto
-            discount_type = coupon.get("discount_type", "percentage")
-            discount_value = float(coupon.get("discount_value", 0) or 0)
-
-            if discount_type == "percentage":
-                discount_amount = order_total * (discount_value / 100)
-                # Aplicar max_discount_amount se existir
-                max_discount = coupon.get("max_discount_amount")
-                if max_discount and discount_amount > max_discount:
-                    discount_amount = float(max_discount)
-            else:  # fixed
-                discount_amount = discount_value
-                if discount_amount > order_total:
-                    discount_amount = order_total
+            discount_type = compiled.type
+            discount_value = compiled.value
 
             return {
                 "success": True,
                 "valid": True,
-                "code": coupon["code"],
+                "code": compiled.code,
                 "discount_type": discount_type,
                 "discount_percentage": discount_value if discount_type == "percentage" else None,
-                "discount_amount": round(discount_amount, 2),
+                "discount_amount": compiled.discount(order_total),
                 "discount_value": discount_value,
                 "type": discount_type,
-                "coupon": coupon,
+                "coupon": compiled.row,
             }
 
         except (ValueError, KeyError) as e:
@@ -129,16 +108,22 @@ class CouponService(BaseService):
                 return validation
 
             coupon = validation["coupon"]
+            compiled = self.engine.get_index().coupon(validation["code"])
 
             # Incrementar uso (se não tiver limite, não precisa incrementar)
-            if coupon.get("usage_limit"):
+            if compiled and compiled.usage_limit:
+                # Reserva atômica: dois pedidos simultâneos não passam do limite
+                if not self.engine.reserve_use(compiled):
+                    return {"success": False, "error": "Cupom esgotado"}
+                # Uso não gravado no banco: o desconto não vale (senão passa do usage_limit)
                 try:
-                    self.repo.increment_usage(coupon["code"])
-                except (ValueError, KeyError) as e:
-                    logger.warning(f"Erro de validação: {str(e)}")
-                    # Tratamento específico pode ser adicionado aqui
+                    recorded = self.repo.increment_usage(coupon["code"])
                 except Exception as e:
                     self.logger.warning(f"Erro ao incrementar uso do cupom: {str(e)}")
+                    recorded = False
+                if not recorded:
+                    self.engine.release_use(compiled.code)
+                    return {"success": False, "error": "Não foi possível aplicar o cupom"}
 
             return {
                 "success": True,
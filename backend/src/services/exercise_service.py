@@ -18,6 +18,7 @@ from repositories.exercise_repository import ExerciseRepository
 from repositories.workout_plan_repository import WorkoutPlanRepository
 from repositories.workout_repository import WorkoutRepository
 from services.base_service import BaseService
+from services.gamification_engine import gamification_engine
 
 logger = logging.getLogger(__name__)
 
@@ -259,6 +260,7 @@ class ExerciseService(BaseService):
             session = self.workout_repo.create_workout_session(log_data)
 
             if session:
+                gamification_engine.publish(user_id, "workout_completed", session.get("id"))
                 return {"success": True, "log": session}
             else:
                 return {"success": False, "error": "Erro ao criar log de exercício"}
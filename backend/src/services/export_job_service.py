@@ -0,0 +1,480 @@
+# -*- coding: utf-8 -*-
+"""
+Serviço de Jobs de Exportação de Dados RE-EDUCA Store.
+
+Executa exportações LGPD e agendadas fora do request HTTP:
+- submit_export: cria registro em data_exports e enfileira na fila 'exports'
+- process_export: executado pelo ExportWorker, busca seções em paralelo
+- Checkpoint por seção no Redis: após crash o job retoma de onde parou
+- Artefato enviado ao Supabase Storage (bucket privado 'exports')
+- Link de download assinado gerado sob demanda
+
+Chaves Redis:
+    export_job:{id}:sections  hash {seção: json} com seções já buscadas
+    export_job:{id}:lock      lock de processamento (SET NX EX)
+    export_jobs:active        sorted set {export_id: heartbeat}, registrado já na retirada da fila
+"""
+import csv
+import io
+import json
+import time
+import zipfile
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import requests
+from repositories.lgpd_repository import LGPDRepository
+from services.base_service import BaseService
+from services.lgpd_service import LGPDService
+from services.queue_service import QueueNames, queue_service
+
+EXPORT_BUCKET = "exports"
+CHECKPOINT_TTL = 24 * 3600  # seções buscadas ficam disponíveis por 24h para retomada
+LOCK_TTL = 600  # lock renovado a cada seção concluída
+STALLED_AFTER = 900  # job sem heartbeat há 15min é considerado órfão
+SIGNED_URL_TTL = 3600
+ARTIFACT_RETENTION_DAYS = 30
+ACTIVE_JOBS_KEY = "export_jobs:active"
+
+SCHEDULE_INTERVALS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+    "monthly": timedelta(days=30),
+    "custom": timedelta(days=1),
+}
+
+
+class ExportJobService(BaseService):
+    """
+    Service para exportações de dados em background.
+
+    Reaproveita a coleta por seções do LGPDService e persiste o estado do job
+    em data_exports (status) e no Redis (checkpoint).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.repo = LGPDRepository()
+        self.lgpd_service = LGPDService()
+        self.queue = queue_service
+        self.redis = queue_service.redis_client
+
+        from config.settings import get_config
+
+        config = get_config()
+        self.supabase_url = config.SUPABASE_URL
+        self.supabase_key = config.SUPABASE_KEY
+
+    # ============================================================
+    # SUBMISSÃO E CONSULTA
+    # ============================================================
+
+    def submit_export(
+        self,
+        user_id: str,
+        data_types: Optional[List[str]] = None,
+        format: str = "json",
+        name: str = "Exportação de Dados",
+        scheduled_export_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Cria o job de exportação e o enfileira.
+
+        Returns:
+            Dict com export_id e status 'pending', ou erro se a fila estiver indisponível
+        """
+        try:
+            if not self.queue.is_connected():
+                return {"success": False, "error": "Fila de exportação indisponível", "queue_unavailable": True}
+
+            data_types = self.lgpd_service.normalize_export_data_types(data_types)
+            sections = self.lgpd_service.get_export_sections(data_types)
+
+            export = self.repo.create_export(
+                {
+                    "user_id": user_id,
+                    "name": name,
+                    "format": format,
+                    "status": "pending",
+                    "data_types": data_types,
+                    "progress": {"completed": 0, "total": len(sections)},
+                    "scheduled_export_id": scheduled_export_id,
+                    "expires_at": (datetime.now() + timedelta(days=ARTIFACT_RETENTION_DAYS)).isoformat(),
+                }
+            )
+            if not export:
+                return {"success": False, "error": "Erro ao registrar exportação"}
+
+            export_id = export["id"]
+            if not self.queue.enqueue_task(QueueNames.EXPORTS, {"export_id": export_id}, priority=1):
+                self.repo.update_export(export_id, {"status": "failed", "error_message": "Falha ao enfileirar"})
+                return {"success": False, "error": "Falha ao enfileirar exportação"}
+
+            return {"success": True, "export_id": export_id, "status": "pending"}
+        except Exception as e:
+            return self._handle_error(e, "Erro ao solicitar exportação")
+
+    def get_export_status(self, export_id: str, user_id: str) -> Dict[str, Any]:
+        """
+        Retorna status e progresso do job.
+
+        O progresso de jobs em andamento vem do checkpoint no Redis (HLEN),
+        sem escrita no banco a cada seção.
+        """
+        export = self.repo.find_export_by_id(export_id)
+        if not export or export.get("user_id") != user_id:
+            return {"success": False, "error": "Exportação não encontrada"}
+
+        progress = export.get("progress") or {}
+        if export.get("status") in ("pending", "processing") and self.redis is not None:
+            try:
+                progress = {**progress, "completed": self.redis.hlen(self._sections_key(export_id))}
+            except Exception as e:
+                self.logger.debug(f"Erro ao ler checkpoint do export {export_id}: {e}")
+
+        return {
+            "success": True,
+            "export": {
+                "id": export_id,
+                "status": export.get("status"),
+                "format": export.get("format"),
+                "data_types": export.get("data_types", []),
+                "progress": progress,
+                "file_size": export.get("file_size"),
+                "created_at": export.get("created_at"),
+                "completed_at": export.get("completed_at"),
+                "expires_at": export.get("expires_at"),
+                "error": export.get("error_message"),
+            },
+        }
+
+    def get_download_url(self, export_id: str, user_id: str) -> Dict[str, Any]:
+        """Gera link assinado e temporário para o artefato de uma exportação concluída."""
+        try:
+            export = self.repo.find_export_by_id(export_id)
+            if not export or export.get("user_id") != user_id:
+                return {"success": False, "error": "Exportação não encontrada"}
+            if export.get("status") != "completed" or not export.get("storage_path"):
+                return {"success": False, "error": "Exportação ainda não concluída"}
+
+            response = requests.post(
+                f"{self.supabase_url}/storage/v1/object/sign/{EXPORT_BUCKET}/{export['storage_path']}",
+                json={"expiresIn": SIGNED_URL_TTL},
+                headers=self._get_storage_headers("application/json"),
+                timeout=10,
+            )
+            response.raise_for_status()
+            signed_path = response.json().get("signedURL") or response.json().get("signedUrl")
+            if not signed_path:
+                return {"success": False, "error": "Storage não retornou URL assinada"}
+
+            return {
+                "success": True,
+                "download_url": f"{self.supabase_url}/storage/v1{signed_path}",
+                "expires_in": SIGNED_URL_TTL,
+            }
+        except Exception as e:
+            return self._handle_error(e, "Erro ao gerar link de download")
+
+    # ============================================================
+    # PROCESSAMENTO (WORKER)
+    # ============================================================
+
+    def claim_next_job(self) -> Optional[Dict[str, Any]]:
+        """
+        Retira o próximo job da fila 'exports' já com o primeiro heartbeat.
+
+        O registro em export_jobs:active é atômico com a retirada: se o worker
+        morrer antes de process_export, requeue_stalled_jobs ainda encontra o job.
+        """
+        return self.queue.dequeue_tracked(QueueNames.EXPORTS, ACTIVE_JOBS_KEY, "export_id")
+
+    def process_export(self, export_id: str) -> bool:
+        """
+        Processa um job de exportação, retomando do último checkpoint.
+
+        Returns:
+            True se concluído (ou já concluído/em processamento por outro worker),
+            False se falhou e deve ser retentado
+        """
+        if not self._acquire_lock(export_id):
+            self.logger.info(f"Export {export_id} já está sendo processado por outro worker")
+            return True
+
+        try:
+            export = self.repo.find_export_by_id(export_id)
+            if not export:
+                self.logger.warning(f"Export {export_id} não encontrado, descartando job")
+                self._clear_checkpoint(export_id)
+                return True
+            if export.get("status") == "completed":
+                self._clear_checkpoint(export_id)
+                return True
+
+            user_id = export["user_id"]
+            export_format = export.get("format", "json")
+            data_types = self.lgpd_service.normalize_export_data_types(export.get("data_types"))
+            sections = self.lgpd_service.get_export_sections(data_types)
+
+            fetched = self._load_checkpoint(export_id)
+            pending = [section for section in sections if section not in fetched]
+
+            self._heartbeat(export_id)
+            self.repo.update_export(
+                export_id,
+                {
+                    "status": "processing",
+                    "started_at": export.get("started_at") or datetime.now().isoformat(),
+                    "progress": {"completed": len(sections) - len(pending), "total": len(sections)},
+                },
+            )
+            if len(pending) < len(sections):
+                self.logger.info(f"Export {export_id} retomado: {len(sections) - len(pending)} seções do checkpoint")
+
+            def _checkpoint(section: str, data: Any):
+                self._save_section(export_id, section, data)
+                self._heartbeat(export_id)
+
+            started = time.time()
+            fetched.update(self.lgpd_service.fetch_export_sections(user_id, pending, on_section_done=_checkpoint))
+            fetch_seconds = round(time.time() - started, 3)
+
+            export_data = self.lgpd_service.assemble_export_data(user_id, data_types, export_format, fetched)
+            content, content_type, extension = self._serialize(export_data, export_format)
+
+            storage_path = f"{user_id}/{export_id}.{extension}"
+            self._upload_artifact(storage_path, content, content_type)
+
+            self.repo.update_export(
+                export_id,
+                {
+                    "status": "completed",
+                    "storage_path": storage_path,
+                    "file_url": f"/api/lgpd/export/{export_id}/download",
+                    "file_size": len(content),
+                    "completed_at": datetime.now().isoformat(),
+                    "error_message": None,
+                    "progress": {"completed": len(sections), "total": len(sections), "fetch_seconds": fetch_seconds},
+                },
+            )
+            if export.get("scheduled_export_id"):
+                self.repo.update_scheduled_export(export["scheduled_export_id"], {"last_run_status": "success"})
+
+            self.lgpd_service._log_data_access(
+                user_id=user_id,
+                accessed_user_id=user_id,
+                access_type="export",
+                resource_type="all",
+                resource_id=export_id,
+                metadata={"data_types": data_types, "format": export_format, "async": True},
+            )
+
+            self._clear_checkpoint(export_id)
+            return True
+        except Exception as e:
+            self.logger.error(f"Erro ao processar export {export_id}: {e}", exc_info=True)
+            self.repo.update_export(export_id, {"error_message": str(e)})
+            return False
+        finally:
+            self._release_lock(export_id)
+
+    def mark_failed(self, export_id: str, error: str):
+        """Marca job como falho após esgotar as tentativas e descarta o checkpoint."""
+        export = self.repo.update_export(export_id, {"status": "failed", "error_message": error})
+        if export and export.get("scheduled_export_id"):
+            self.repo.update_scheduled_export(export["scheduled_export_id"], {"last_run_status": "failed"})
+        self._clear_checkpoint(export_id)
+
+    def requeue_stalled_jobs(self) -> int:
+        """
+        Reenfileira jobs cujo worker morreu no meio do processamento.
+
+        Um job fica órfão quando seu heartbeat não é atualizado há STALLED_AFTER
+        segundos; o novo processamento retoma a partir do checkpoint.
+        """
+        if self.redis is None:
+            return 0
+
+        requeued = 0
+        try:
+            stalled = self.redis.zrangebyscore(ACTIVE_JOBS_KEY, 0, time.time() - STALLED_AFTER)
+            for export_id in stalled:
+                if self.redis.exists(self._lock_key(export_id)):
+                    continue
+                if self.queue.enqueue_task(QueueNames.EXPORTS, {"export_id": export_id}, priority=2):
+                    self.redis.zadd(ACTIVE_JOBS_KEY, {export_id: time.time()})
+                    requeued += 1
+                    self.logger.warning(f"Export {export_id} órfão reenfileirado")
+        except Exception as e:
+            self.logger.error(f"Erro ao reenfileirar exports órfãos: {e}", exc_info=True)
+        return requeued
+
+    def enqueue_due_scheduled_exports(self) -> int:
+        """Cria jobs para exportações agendadas vencidas e avança next_run."""
+        now = datetime.utcnow()
+        submitted = 0
+        for schedule in self.repo.find_due_scheduled_exports(now.isoformat()):
+            result = self.submit_export(
+                user_id=schedule["user_id"],
+                data_types=schedule.get("data_types"),
+                format=schedule.get("format", "json"),
+                name=schedule.get("name", "Exportação Agendada"),
+                scheduled_export_id=schedule["id"],
+            )
+            if not result.get("success"):
+                self.logger.warning(f"Falha ao agendar export {schedule['id']}: {result.get('error')}")
+                continue
+
+            interval = SCHEDULE_INTERVALS.get(schedule.get("frequency"), SCHEDULE_INTERVALS["daily"])
+            self.repo.update_scheduled_export(
+                schedule["id"],
+                {"last_run": now.isoformat(), "next_run": (now + interval).isoformat()},
+            )
+            submitted += 1
+        return submitted
+
+    # ============================================================
+    # HELPERS
+    # ============================================================
+
+    @staticmethod
+    def _sections_key(export_id: str) -> str:
+        return f"export_job:{export_id}:sections"
+
+    @staticmethod
+    def _lock_key(export_id: str) -> str:
+        return f"export_job:{export_id}:lock"
+
+    def _acquire_lock(self, export_id: str) -> bool:
+        if self.redis is None:
+            return True
+        try:
+            return bool(self.redis.set(self._lock_key(export_id), "1", nx=True, ex=LOCK_TTL))
+        except Exception as e:
+            self.logger.debug(f"Erro ao adquirir lock do export {export_id}: {e}")
+            return True
+
+    def _release_lock(self, export_id: str):
+        if self.redis is None:
+            return
+        try:
+            self.redis.delete(self._lock_key(export_id))
+        except Exception as e:
+            self.logger.debug(f"Erro ao liberar lock do export {export_id}: {e}")
+
+    def _heartbeat(self, export_id: str):
+        if self.redis is None:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            pipe.zadd(ACTIVE_JOBS_KEY, {export_id: time.time()})
+            pipe.expire(self._lock_key(export_id), LOCK_TTL)
+            pipe.execute()
+        except Exception as e:
+            self.logger.debug(f"Erro ao registrar heartbeat do export {export_id}: {e}")
+
+    def _load_checkpoint(self, export_id: str) -> Dict[str, Any]:
+        if self.redis is None:
+            return {}
+        try:
+            raw = self.redis.hgetall(self._sections_key(export_id))
+            return {section: json.loads(payload) for section, payload in raw.items()}
+        except Exception as e:
+            self.logger.warning(f"Checkpoint do export {export_id} ilegível, reiniciando: {e}")
+            return {}
+
+    def _save_section(self, export_id: str, section: str, data: Any):
+        if self.redis is None:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            pipe.hset(self._sections_key(export_id), section, json.dumps(data, default=str))
+            pipe.expire(self._sections_key(export_id), CHECKPOINT_TTL)
+            pipe.execute()
+        except Exception as e:
+            # Sem checkpoint o job ainda conclui; apenas não retoma em caso de crash
+            self.logger.debug(f"Erro ao salvar checkpoint {section} do export {export_id}: {e}")
+
+    def _clear_checkpoint(self, export_id: str):
+        if self.redis is None:
+            return
+        try:
+            pipe = self.redis.pipeline()
+            pipe.delete(self._sections_key(export_id))
+            pipe.zrem(ACTIVE_JOBS_KEY, export_id)
+            pipe.execute()
+        except Exception as e:
+            self.logger.debug(f"Erro ao limpar checkpoint do export {export_id}: {e}")
+
+    def _get_storage_headers(self, content_type: str) -> Dict[str, str]:
+        """Retorna headers para requisições de storage"""
+        return {
+            "Authorization": f"Bearer {self.supabase_key}",
+            "apikey": self.supabase_key,
+            "Content-Type": content_type,
+        }
+
+    def _upload_artifact(self, storage_path: str, content: bytes, content_type: str):
+        """Envia o artefato ao Supabase Storage (upsert para suportar retentativas)."""
+        headers = self._get_storage_headers(content_type)
+        headers["x-upsert"] = "true"
+        response = requests.post(
+            f"{self.supabase_url}/storage/v1/object/{EXPORT_BUCKET}/{storage_path}",
+            data=content,
+            headers=headers,
+            timeout=120,
+        )
+        if response.status_code not in [200, 201]:
+            raise Exception(f"Erro no upload do export: {response.text}")
+
+    def _serialize(self, export_data: Dict[str, Any], export_format: str):
+        """
+        Serializa o documento de exportação.
+
+        csv gera um .zip com um CSV por coleção. pdf ainda não possui
+        renderizador dedicado e é entregue como JSON.
+        """
+        if export_format == "csv":
+            return self._to_csv_zip(export_data), "application/zip", "zip"
+
+        content = json.dumps(export_data, default=str, ensure_ascii=False, indent=2).encode("utf-8")
+        return content, "application/json", "json"
+
+    def _to_csv_zip(self, export_data: Dict[str, Any]) -> bytes:
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name, rows in self._flatten_collections(export_data):
+                if isinstance(rows, dict):
+                    rows = [rows]
+                if not rows:
+                    continue
+
+                columns: List[str] = []
+                for row in rows:
+                    for column in row.keys():
+                        if column not in columns:
+                            columns.append(column)
+
+                output = io.StringIO()
+                writer = csv.DictWriter(output, fieldnames=columns)
+                writer.writeheader()
+                for row in rows:
+                    writer.writerow(
+                        {
+                            column: json.dumps(value, default=str, ensure_ascii=False)
+                            if isinstance(value, (dict, list))
+                            else value
+                            for column, value in row.items()
+                        }
+                    )
+                archive.writestr(f"{name}.csv", output.getvalue())
+        return buffer.getvalue()
+
+    @staticmethod
+    def _flatten_collections(export_data: Dict[str, Any]):
+        for data_type, value in export_data.items():
+            if isinstance(value, dict) and value and all(isinstance(v, list) for v in value.values()):
+                for key, rows in value.items():
+                    yield f"{data_type}_{key}", rows
+            else:
+                yield data_type, value
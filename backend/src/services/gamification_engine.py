@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de Regras de Gamificação RE-EDUCA Store.
+
+Avalia desafios e conquistas a partir de eventos de domínio, sem reler as
+tabelas de atividades:
+- Os serviços publicam eventos (publish) na fila gamification_events:
+  workout_completed, food_diary_entry, order_paid e post_created
+- As regras (requirements.action de challenges e achievements) ficam
+  indexadas por tipo de evento em memória; cada evento avalia apenas as
+  regras do seu tipo
+- workers/gamification_worker.py consome a fila em lotes e aplica cada lote
+  com apply_gamification_events (migração 039): progresso incremental,
+  conclusão, conquistas e pontos em uma transação. O event_id é derivado da
+  origem (ex.: ID do pedido), então retries e eventos repetidos não
+  concedem nada duas vezes
+- user_gamification_stats guarda contadores e a sequência de dias ativos,
+  lidos em uma consulta por GamificationService e UserDashboardService
+
+Modos de progresso (requirements): count (padrão, +1 por evento),
+distinct_days (um avanço por dia) e consecutive (dias seguidos).
+Sem fila, os eventos são aplicados na hora.
+"""
+import logging
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from repositories.gamification_repository import GamificationRepository
+from services.base_service import BaseService
+from services.leaderboard_service import leaderboard_service
+from services.queue_service import QueueNames, queue_service
+from services.realtime_service import realtime_service
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = ("workout_completed", "food_diary_entry", "order_paid", "post_created")
+# Eventos que contam para a sequência de dias ativos
+ACTIVE_DAY_EVENTS = ("workout_completed", "food_diary_entry")
+RULES_TTL = 300
+PROCESSED_EVENTS_RETENTION_DAYS = 30
+
+
+def event_id(event_type: str, source_id: str) -> str:
+    """ID determinístico de um evento (mesma origem = mesmo evento)"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"gamification:{event_type}:{source_id}"))
+
+
+def rule_mode(requirements: Dict[str, Any]) -> str:
+    """Modo de progresso de uma regra (count, days ou consecutive)"""
+    if requirements.get("consecutive"):
+        return "consecutive"
+    if requirements.get("distinct_days"):
+        return "days"
+    return "count"
+
+
+def build_rule_index(
+    challenges: Iterable[Dict[str, Any]], achievements: Iterable[Dict[str, Any]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Indexa desafios e conquistas pelo tipo de evento (requirements.action).
+
+    Args:
+        challenges: Desafios ativos
+        achievements: Conquistas ativas
+
+    Returns:
+        Dict {tipo de evento: [regra]}
+    """
+    index: Dict[str, List[Dict[str, Any]]] = {}
+    for kind, rows in (("challenge", challenges), ("achievement", achievements)):
+        for row in rows:
+            requirements = row.get("requirements") or {}
+            action = requirements.get("action")
+            if action not in EVENT_TYPES:
+                continue
+            rule = {
+                "kind": kind,
+                "rule_id": row["id"],
+                "mode": rule_mode(requirements),
+                "amount": 1,
+                "target": max(int(requirements.get("count") or 1), 1),
+                "points": int(row.get("points") or 0),
+                "title": row.get("name") or row.get("title"),
+            }
+            if kind == "achievement":
+                rule.update(description=row.get("description"), icon=row.get("icon"), rarity=row.get("rarity"))
+            index.setdefault(action, []).append(rule)
+    return index
+
+
+class GamificationEngine(BaseService):
+    """Aplica eventos de domínio às regras de desafios e conquistas."""
+
+    def __init__(self):
+        """Inicializa o motor de regras."""
+        super().__init__()
+        self.repo = GamificationRepository()
+        self._index: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._challenges: List[Dict[str, Any]] = []
+        self._loaded_at = 0.0
+
+    # =====================================================
+    # REGRAS
+    # =====================================================
+
+    def _rule_index(self) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Índice de regras, recarregado a cada RULES_TTL segundos"""
+        if self._index is None or time.monotonic() - self._loaded_at >= RULES_TTL:
+            challenges = self.repo.get_active_challenges()
+            achievements = self.repo.get_active_achievements()
+            if challenges is not None and achievements is not None:
+                self._index = build_rule_index(challenges, achievements)
+                self._challenges = challenges
+                self._loaded_at = time.monotonic()
+        return self._index
+
+    def get_challenges(self) -> List[Dict[str, Any]]:
+        """Catálogo de desafios ativos (cópias, podem ser alteradas)"""
+        self._rule_index()
+        return [dict(challenge) for challenge in self._challenges]
+
+    def invalidate_rules(self):
+        """Força a recarga das regras na próxima avaliação"""
+        self._index = None
+
+    # =====================================================
+    # EVENTOS
+    # =====================================================
+
+    def publish(self, user_id: Optional[str], event_type: str, source_id: Any, day: Optional[str] = None) -> bool:
+        """
+        Publica um evento de domínio.
+
+        Args:
+            user_id: Usuário que gerou o evento
+            event_type: workout_completed, food_diary_entry, order_paid ou post_created
+            source_id: ID da origem (registro, pedido, post); define o event_id
+            day: Dia da atividade, YYYY-MM-DD ou data ISO (padrão: hoje)
+
+        Returns:
+            True se o evento foi enfileirado ou aplicado
+        """
+        if not user_id or not source_id or event_type not in EVENT_TYPES:
+            return False
+        try:
+            event = {
+                "event_id": event_id(event_type, str(source_id)),
+                "user_id": user_id,
+                "type": event_type,
+                "day": date.fromisoformat(str(day)[:10]).isoformat() if day else date.today().isoformat(),
+            }
+            if queue_service.enqueue_task(QueueNames.GAMIFICATION_EVENTS, event, priority=1):
+                return True
+            return self.process([event]) is not None
+        except Exception as e:
+            self.logger.warning(f"Erro ao publicar evento de gamificação: {str(e)}")
+            return False
+
+    def process(self, events: List[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+        """
+        Aplica um lote de eventos às regras do seu tipo.
+
+        Args:
+            events: Lista de {event_id, user_id, type, day}
+
+        Returns:
+            Dict com events (eventos aplicados) e completed (desafios e
+            conquistas concluídos), ou None se o lote deve ser repetido
+        """
+        index = self._rule_index()
+        if index is None:
+            return None
+
+        payload = []
+        for event in events:
+            rules = index.get(event.get("type"), [])
+            active_day = event.get("type") in ACTIVE_DAY_EVENTS
+            if not rules and not active_day:
+                continue
+            payload.append(
+                {
+                    "event_id": event["event_id"],
+                    "user_id": event["user_id"],
+                    "day": event["day"],
+                    "active_day": active_day,
+                    "updates": rules,
+                }
+            )
+        if not payload:
+            return {"events": 0, "completed": 0}
+
+        results = self.repo.apply_events(payload)
+        if results is None:
+            return None
+
+        completed = [result for result in results if result.get("completed")]
+        for award in completed:
+            self._announce(award)
+        return {"events": len(payload), "completed": len(completed)}
+
+    def _announce(self, award: Dict[str, Any]):
+        """Atualiza os rankings e avisa o usuário de um desafio ou conquista concluído"""
+        user_id, rule_id = str(award["user_id"]), str(award["rule_id"])
+        if award.get("points"):
+            leaderboard_service.record(user_id, int(award["points"]), award["kind"], rule_id)
+        event = "challenge_completed" if award["kind"] == "challenge" else "achievement_unlocked"
+        realtime_service.emit_to_user(
+            user_id, event, {"id": rule_id, "title": award.get("title"), "points": award.get("points") or 0}
+        )
+
+    # =====================================================
+    # LEITURA
+    # =====================================================
+
+    def get_stats(self, user_id: str) -> Dict[str, Any]:
+        """
+        Contadores de gamificação do usuário (uma consulta).
+
+        A sequência só vale se o último dia ativo for hoje ou ontem.
+
+        Returns:
+            Dict com achievements_count, completed_challenges_count,
+            active_challenges_count, claimed_rewards_count, current_streak
+            e longest_streak
+        """
+        stats = self.repo.get_stats(user_id) or {}
+        current_streak = int(stats.get("current_streak") or 0)
+        last_active_on = stats.get("last_active_on")
+        if not last_active_on or date.fromisoformat(str(last_active_on)[:10]) < date.today() - timedelta(days=1):
+            current_streak = 0
+        return {
+            "achievements_count": int(stats.get("achievements_count") or 0),
+            "completed_challenges_count": int(stats.get("completed_challenges_count") or 0),
+            "active_challenges_count": int(stats.get("active_challenges_count") or 0),
+            "claimed_rewards_count": int(stats.get("claimed_rewards_count") or 0),
+            "current_streak": current_streak,
+            "longest_streak": int(stats.get("longest_streak") or 0),
+        }
+
+    def purge_processed_events(self, retention_days: int = PROCESSED_EVENTS_RETENTION_DAYS) -> bool:
+        """Esquece eventos aplicados há mais de retention_days (fim da janela de retry)"""
+        return self.repo.purge_processed_events(datetime.utcnow() - timedelta(days=retention_days))
+
+
+gamification_engine = GamificationEngine()
@@ -14,7 +14,11 @@ from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
 from config.database import supabase_client
+from repositories.gamification_repository import GamificationRepository
+from repositories.leaderboard_repository import LeaderboardRepository
 from services.base_service import BaseService
+from services.gamification_engine import gamification_engine
+from services.leaderboard_service import leaderboard_service
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +29,8 @@ class GamificationService(BaseService):
     def __init__(self):
         super().__init__()
         self.supabase = supabase_client
+        self.leaderboard_repo = LeaderboardRepository()
+        self.gamification_repo = GamificationRepository()
         try:
             from repositories.achievements_repository import AchievementsRepository
 
@@ -36,6 +42,9 @@ class GamificationService(BaseService):
         """
         Retorna estatísticas de gamificação do usuário.
 
+        Os contadores vêm de user_gamification_stats, mantido pelo motor de
+        regras e por triggers (ver GamificationEngine).
+
         Args:
             user_id: ID do usuário
 
@@ -52,34 +61,7 @@ class GamificationService(BaseService):
             if self.achievements_repo:
                 achievements = self.achievements_repo.get_user_achievements(user_id)
 
-            # Buscar desafios completados
-            completed_challenges_result = (
-                self.supabase.table("user_challenges")
-                .select("*, challenges(*)")
-                .eq("user_id", user_id)
-                .eq("status", "completed")
-                .execute()
-            )
-            completed_challenges = completed_challenges_result.data if completed_challenges_result.data else []
-
-            # Buscar desafios em progresso
-            active_challenges_result = (
-                self.supabase.table("user_challenges")
-                .select("*, challenges(*)")
-                .eq("user_id", user_id)
-                .eq("status", "in_progress")
-                .execute()
-            )
-            active_challenges = active_challenges_result.data if active_challenges_result.data else []
-
-            # Buscar recompensas reivindicadas
-            rewards_result = (
-                self.supabase.table("user_rewards")
-                .select("*, rewards(*)")
-                .eq("user_id", user_id)
-                .execute()
-            )
-            claimed_rewards = rewards_result.data if rewards_result.data else []
+            stats = gamification_engine.get_stats(user_id)
 
             # Calcular nível (baseado em pontos)
             level = (total_points // 100) + 1
@@ -88,12 +70,15 @@ class GamificationService(BaseService):
                 "user_id": user_id,
                 "total_points": total_points,
                 "level": level,
-                "achievements_count": len(achievements),
+                "achievements_count": stats["achievements_count"],
                 "achievements": achievements,
-                "completed_challenges_count": len(completed_challenges),
-                "active_challenges_count": len(active_challenges),
-                "claimed_rewards_count": len(claimed_rewards),
+                "completed_challenges_count": stats["completed_challenges_count"],
+                "active_challenges_count": stats["active_challenges_count"],
+                "claimed_rewards_count": stats["claimed_rewards_count"],
+                "current_streak": stats["current_streak"],
+                "longest_streak": stats["longest_streak"],
                 "next_level_points": level * 100 - total_points,
+                "rank": leaderboard_service.get_rank(user_id),
             }
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -108,13 +93,19 @@ class GamificationService(BaseService):
             "completed_challenges_count": 0,
             "active_challenges_count": 0,
             "claimed_rewards_count": 0,
+            "current_streak": 0,
+            "longest_streak": 0,
             "next_level_points": 100,
+            "rank": None,
         }
 
     def get_challenges(self, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Retorna lista de desafios disponíveis.
 
+        O catálogo vem do índice de regras do motor (em memória); o progresso
+        do usuário é mantido pelo motor a cada evento.
+
         Args:
             user_id: ID do usuário (opcional, para filtrar desafios do usuário)
 
@@ -122,23 +113,11 @@ class GamificationService(BaseService):
             Lista de desafios
         """
         try:
-            # Buscar desafios ativos do banco
-            challenges_result = (
-                self.supabase.table("challenges").select("*").eq("is_active", True).execute()
-            )
-            challenges = challenges_result.data if challenges_result.data else []
+            challenges = gamification_engine.get_challenges()
 
             # Se tiver user_id, verificar progresso e status
             if user_id:
-                user_challenges_result = (
-                    self.supabase.table("user_challenges")
-                    .select("challenge_id, status, progress, target")
-                    .eq("user_id", user_id)
-                    .execute()
-                )
-                user_challenges_map = {
-                    uc["challenge_id"]: uc for uc in (user_challenges_result.data if user_challenges_result.data else [])
-                }
+                user_challenges_map = {uc["challenge_id"]: uc for uc in self.gamification_repo.get_user_challenges(user_id)}
 
                 for challenge in challenges:
                     challenge_id = challenge["id"]
@@ -152,7 +131,7 @@ class GamificationService(BaseService):
                     else:
                         challenge["status"] = "available"
                         challenge["progress"] = 0
-                        challenge["target"] = challenge.get("requirements", {}).get("count", 1)
+                        challenge["target"] = (challenge.get("requirements") or {}).get("count", 1)
                         challenge["is_completed"] = False
                         challenge["is_in_progress"] = False
 
@@ -282,9 +261,11 @@ class GamificationService(BaseService):
                     }
                 )
                 .eq("id", user_challenge["id"])
+                .eq("status", "in_progress")
                 .execute()
             )
 
+            # Só quem mudou o status concede os pontos (chamadas concorrentes)
             if update_result.data:
                 # Adicionar pontos ao usuário
                 self._add_points(user_id, points, "challenge", challenge_id, f"Desafio completado: {challenge.get('name', 'N/A')}")
@@ -416,9 +397,8 @@ class GamificationService(BaseService):
             return {"success": False, "error": "Erro ao reivindicar recompensa"}
 
     def _add_points(self, user_id: str, points: int, source: str, source_id: str = None, description: str = None):
-        """Adiciona pontos ao usuário e atualiza total_points"""
+        """Registra pontos no ledger (total_points é mantido por trigger) e atualiza os rankings"""
         try:
-            # Inserir registro de pontos
             points_data = {
                 "user_id": user_id,
                 "points": points,
@@ -426,53 +406,42 @@ class GamificationService(BaseService):
                 "source_id": source_id,
                 "description": description,
             }
-            self.supabase.table("user_points").insert(points_data).execute()
-
-            # Atualizar total_points do usuário (trigger também faz isso, mas garantimos)
-            user_result = self.supabase.table("users").select("total_points").eq("id", user_id).execute()
-            current_points = user_result.data[0].get("total_points", 0) if user_result.data else 0
-            new_total = max(0, current_points + points)
-
-            self.supabase.table("users").update({"total_points": new_total}).eq("id", user_id).execute()
+            if self.leaderboard_repo.add_points(points_data):
+                leaderboard_service.record(user_id, points, source, source_id)
 
         except Exception as e:
             logger.error(f"Erro ao adicionar pontos: {str(e)}", exc_info=True)
 
-    def get_leaderboard(self, limit: int = 10) -> List[Dict[str, Any]]:
+    def get_leaderboard(
+        self, limit: int = 10, window: str = "global", offset: int = 0, challenge_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Retorna leaderboard de usuários por pontos.
+        Retorna leaderboard de usuários por pontos (Redis, ver LeaderboardService).
 
         Args:
             limit: Número de usuários a retornar (padrão: 10)
+            window: global, weekly ou monthly
+            offset: Posição inicial
+            challenge_id: Ranking de um desafio
 
         Returns:
             Lista de usuários ordenados por pontos
+
+        Raises:
+            ValueError: Se a janela for inválida
         """
-        try:
-            result = (
-                self.supabase.table("users")
-                .select("id, name, email, total_points")
-                .order("total_points", desc=True)
-                .limit(limit)
-                .execute()
-            )
+        return leaderboard_service.get_leaderboard(window, limit, offset, challenge_id)
 
-            leaderboard = []
-            for idx, user in enumerate(result.data if result.data else [], 1):
-                leaderboard.append(
-                    {
-                        "rank": idx,
-                        "user_id": user["id"],
-                        "name": user.get("name", "Usuário"),
-                        "total_points": user.get("total_points", 0),
-                        "level": (user.get("total_points", 0) // 100) + 1,
-                    }
-                )
+    def get_leaderboard_position(
+        self, user_id: str, window: str = "global", radius: int = 5, challenge_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Retorna a posição do usuário e os vizinhos no ranking.
 
-            return leaderboard
-        except Exception as e:
-            logger.error(f"Erro ao buscar leaderboard: {str(e)}", exc_info=True)
-            return []
+        Raises:
+            ValueError: Se a janela for inválida
+        """
+        return leaderboard_service.get_position(user_id, window, radius, challenge_id)
 
     def get_available_rewards(self, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
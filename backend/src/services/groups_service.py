@@ -1,14 +1,39 @@
 """
 Service para grupos e comunidades.
+
+Índice de participação no Redis (cache-aside, invalidado em entrar, sair,
+convidar e criar grupo):
+- groups:members:{group_id}: hash user_id -> role dos membros do grupo
+- groups:user:{user_id}: set com os IDs dos grupos do usuário
+- groups:member_list:{group_id}: primeira página de membros com perfil
+- groups:by_members: sorted set group_id -> members_count dos grupos
+  ativos, usado na descoberta; reconstruído a partir de groups.members_count
+  (mantido por trigger) quando groups:by_members:ready expira
+
+Hash e set levam o marcador __loaded__ para distinguir "sem membros/grupos"
+de "não carregado". Sem Redis, tudo é lido do banco.
 """
 
+import json
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Optional, Set
 
 from repositories.groups_repository import GroupsRepository
+from services.cache_service import cache_service
 
 logger = logging.getLogger(__name__)
 
+MEMBERS_KEY = "groups:members:{group_id}"
+USER_GROUPS_KEY = "groups:user:{user_id}"
+MEMBER_LIST_KEY = "groups:member_list:{group_id}"
+BY_MEMBERS_KEY = "groups:by_members"
+BY_MEMBERS_READY_KEY = "groups:by_members:ready"
+LOADED = "__loaded__"
+
+MEMBERSHIP_TTL = 600
+MEMBER_LIST_SIZE = 100
+DISCOVERY_TTL = 3600
+
 
 class GroupsService:
     """Service para grupos"""
@@ -16,6 +41,164 @@ class GroupsService:
     def __init__(self):
         self.repo = GroupsRepository()
 
+    @property
+    def redis(self):
+        """Cliente Redis compartilhado (None se indisponível)"""
+        return cache_service.redis_client
+
+    # =====================================================
+    # ÍNDICE DE PARTICIPAÇÃO
+    # =====================================================
+
+    def _get_role(self, group_id: str, user_id: str) -> Optional[str]:
+        """
+        Papel do usuário no grupo a partir do hash de membros.
+
+        Returns:
+            Role ou None se não for membro
+        """
+        key = MEMBERS_KEY.format(group_id=group_id)
+        if self.redis:
+            try:
+                role, loaded = self.redis.hmget(key, [user_id, LOADED])
+                if loaded:
+                    return role
+            except Exception as e:
+                logger.warning(f"Erro ao ler membros do grupo em cache: {str(e)}")
+
+        roles = self.repo.get_member_roles(group_id)
+        if roles is None:
+            return self.repo.get_user_role(group_id, user_id)
+        if self.redis:
+            try:
+                pipe = self.redis.pipeline(transaction=True)
+                pipe.delete(key)
+                pipe.hset(key, mapping={**roles, LOADED: "1"})
+                pipe.expire(key, MEMBERSHIP_TTL)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Erro ao gravar membros do grupo em cache: {str(e)}")
+        return roles.get(user_id)
+
+    def _get_user_group_ids(self, user_id: str) -> Optional[Set[str]]:
+        """IDs dos grupos do usuário a partir do set em cache (None em caso de erro)"""
+        key = USER_GROUPS_KEY.format(user_id=user_id)
+        if self.redis:
+            try:
+                group_ids = self.redis.smembers(key)
+                if LOADED in group_ids:
+                    return set(group_ids) - {LOADED}
+            except Exception as e:
+                logger.warning(f"Erro ao ler grupos do usuário em cache: {str(e)}")
+
+        group_ids = self.repo.get_user_group_ids(user_id)
+        if group_ids is None:
+            return None
+        self._cache_user_groups(user_id, group_ids)
+        return set(group_ids)
+
+    def _cache_user_groups(self, user_id: str, group_ids: Iterable[str]):
+        """Grava o set de grupos do usuário"""
+        if not self.redis:
+            return
+        key = USER_GROUPS_KEY.format(user_id=user_id)
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.delete(key)
+            pipe.sadd(key, LOADED, *(str(group_id) for group_id in group_ids))
+            pipe.expire(key, MEMBERSHIP_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Erro ao gravar grupos do usuário em cache: {str(e)}")
+
+    def _membership_changed(self, group_id: str, user_id: str, delta: int):
+        """
+        Invalida o cache de participação do grupo e do usuário e ajusta o
+        contador de descoberta.
+
+        Args:
+            group_id: ID do grupo
+            user_id: ID do usuário que entrou ou saiu
+            delta: Variação de membros (+1, -1 ou 0)
+        """
+        if not self.redis:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.delete(
+                MEMBERS_KEY.format(group_id=group_id),
+                MEMBER_LIST_KEY.format(group_id=group_id),
+                USER_GROUPS_KEY.format(user_id=user_id),
+            )
+            if delta:
+                pipe.zincrby(BY_MEMBERS_KEY, delta, group_id)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Erro ao invalidar participação do grupo {group_id}: {str(e)}")
+
+    def rebuild_discovery_index(self) -> Optional[int]:
+        """
+        Reconstrói groups:by_members a partir de groups.members_count.
+
+        O índice é montado em uma chave temporária e trocado com RENAME, então
+        as leituras nunca veem um índice parcial.
+
+        Returns:
+            Número de grupos indexados ou None se não foi possível reconstruir
+        """
+        if not self.redis:
+            return None
+        rows = self.repo.get_member_counts()
+        if rows is None:
+            return None
+        tmp_key = f"{BY_MEMBERS_KEY}:rebuild"
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.delete(tmp_key)
+            for start in range(0, len(rows), 1000):
+                pipe.zadd(
+                    tmp_key,
+                    {str(row["id"]): int(row.get("members_count") or 0) for row in rows[start : start + 1000]},
+                )
+            if rows:
+                pipe.rename(tmp_key, BY_MEMBERS_KEY)
+            else:
+                pipe.delete(BY_MEMBERS_KEY)
+            pipe.set(BY_MEMBERS_READY_KEY, "1", ex=DISCOVERY_TTL)
+            pipe.execute()
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Erro ao reconstruir índice de grupos: {str(e)}", exc_info=True)
+            return None
+
+    def _discovery_page(self, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Grupos com mais membros a partir do sorted set (None se indisponível)"""
+        if not self.redis:
+            return None
+        try:
+            if not self.redis.exists(BY_MEMBERS_READY_KEY) and self.rebuild_discovery_index() is None:
+                return None
+            ranked = self.redis.zrevrange(BY_MEMBERS_KEY, 0, limit - 1, withscores=True)
+        except Exception as e:
+            logger.warning(f"Erro ao ler índice de grupos: {str(e)}")
+            return None
+
+        by_id = {str(group["id"]): group for group in self.repo.find_by_ids([group_id for group_id, _ in ranked])}
+        groups, missing = [], []
+        for group_id, members in ranked:
+            group = by_id.get(group_id)
+            if group:
+                groups.append({**group, "members_count": int(members)})
+            else:
+                missing.append(group_id)
+        if missing:
+            # Grupos desativados ou removidos saem do índice
+            try:
+                self.redis.zrem(BY_MEMBERS_KEY, *missing)
+            except Exception as e:
+                logger.warning(f"Erro ao limpar índice de grupos: {str(e)}")
+        return groups
+
     def get_groups(self, filters: Dict = None, page: int = 1, limit: int = 20) -> Dict[str, Any]:
         """Lista grupos"""
         try:
@@ -62,7 +245,8 @@ class GroupsService:
 
             if group:
                 # Adicionar criador como admin
-                self.repo.join_group(group["id"], user_id, "admin")
+                if self.repo.join_group(group["id"], user_id, "admin"):
+                    self._membership_changed(str(group["id"]), user_id, 1)
                 return {"success": True, "group": group}
             return {"success": False, "error": "Erro ao criar grupo"}
         except (ValueError, KeyError) as e:
@@ -82,7 +266,7 @@ class GroupsService:
 
             # Verificar se é criador ou admin
             if group.get("creator_id") != user_id:
-                role = self.repo.get_user_role(group_id, user_id)
+                role = self._get_role(group_id, user_id)
                 if role not in ["admin", "moderator"]:
                     return {"success": False, "error": "Sem permissão para atualizar grupo"}
 
@@ -129,6 +313,7 @@ class GroupsService:
 
             success = self.repo.join_group(group_id, user_id)
             if success:
+                self._membership_changed(group_id, user_id, 1)
                 return {"success": True, "message": "Você entrou no grupo"}
             return {"success": False, "error": "Erro ao participar do grupo ou já é membro"}
         except (ValueError, KeyError) as e:
@@ -141,8 +326,10 @@ class GroupsService:
     def leave_group(self, group_id: str, user_id: str) -> Dict[str, Any]:
         """Sai do grupo"""
         try:
+            was_member = self._get_role(group_id, user_id) is not None
             success = self.repo.leave_group(group_id, user_id)
             if success:
+                self._membership_changed(group_id, user_id, -1 if was_member else 0)
                 return {"success": True, "message": "Você saiu do grupo"}
             return {"success": False, "error": "Erro ao sair do grupo ou você é o criador"}
         except (ValueError, KeyError) as e:
@@ -156,6 +343,8 @@ class GroupsService:
         """Busca grupos do usuário"""
         try:
             groups = self.repo.get_user_groups(user_id)
+            if groups:
+                self._cache_user_groups(user_id, [group["id"] for group in groups if group.get("id")])
             return {"success": True, "groups": groups}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -168,6 +357,9 @@ class GroupsService:
         """
         Busca grupos ordenados por número de membros.
 
+        Lê a ordem do sorted set groups:by_members e os grupos em uma
+        consulta; sem Redis, ordena no banco.
+
         Args:
             limit: Limite de resultados
 
@@ -175,7 +367,9 @@ class GroupsService:
             Dict com lista de grupos
         """
         try:
-            groups = self.repo.find_all_sorted_by_members(limit=limit)
+            groups = self._discovery_page(limit)
+            if groups is None:
+                groups = self.repo.find_all_sorted_by_members(limit=limit)
             return {"success": True, "groups": groups}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -195,20 +389,51 @@ class GroupsService:
         Returns:
             True se é membro
         """
+        return self.are_members(user_id, [group_id]).get(group_id, False)
+
+    def are_members(self, user_id: str, group_ids: List[str]) -> Dict[str, bool]:
+        """
+        Verifica a participação do usuário em vários grupos de uma vez
+        (listagens), com uma leitura do set groups:user:{user_id}.
+
+        Args:
+            user_id: ID do usuário
+            group_ids: IDs dos grupos
+
+        Returns:
+            Dict group_id -> é membro
+        """
         try:
-            return self.repo.is_user_member(group_id, user_id)
+            user_group_ids = self._get_user_group_ids(user_id) or set()
+            return {group_id: str(group_id) in user_group_ids for group_id in group_ids}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
             # Tratamento específico pode ser adicionado aqui
         except Exception as e:
             logger.error(f"Erro ao verificar membro: {str(e)}", exc_info=True)
-            return False
+            return {group_id: False for group_id in group_ids}
 
     def get_members(self, group_id: str, limit: int = 50) -> Dict[str, Any]:
-        """Busca membros do grupo"""
+        """Busca membros do grupo (as primeiras MEMBER_LIST_SIZE entradas ficam em cache)"""
         try:
-            members = self.repo.get_members(group_id, limit)
-            return {"success": True, "members": members}
+            if limit > MEMBER_LIST_SIZE or not self.redis:
+                return {"success": True, "members": self.repo.get_members(group_id, limit)}
+
+            key = MEMBER_LIST_KEY.format(group_id=group_id)
+            try:
+                cached = self.redis.get(key)
+                if cached:
+                    return {"success": True, "members": json.loads(cached)[:limit]}
+            except Exception as e:
+                logger.warning(f"Erro ao ler membros do grupo em cache: {str(e)}")
+
+            members = self.repo.get_members(group_id, MEMBER_LIST_SIZE)
+            if members:
+                try:
+                    self.redis.setex(key, MEMBERSHIP_TTL, json.dumps(members, default=str))
+                except Exception as e:
+                    logger.warning(f"Erro ao gravar membros do grupo em cache: {str(e)}")
+            return {"success": True, "members": members[:limit]}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
             # Tratamento específico pode ser adicionado aqui
@@ -219,9 +444,8 @@ class GroupsService:
     def is_member(self, group_id: str, user_id: str) -> Dict[str, Any]:
         """Verifica se usuário é membro"""
         try:
-            is_member = self.repo.is_member(group_id, user_id)
-            role = self.repo.get_user_role(group_id, user_id) if is_member else None
-            return {"success": True, "is_member": is_member, "role": role}
+            role = self._get_role(group_id, user_id)
+            return {"success": True, "is_member": role is not None, "role": role}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
             # Tratamento específico pode ser adicionado aqui
@@ -248,13 +472,14 @@ class GroupsService:
                 return {"success": False, "error": "Grupo não encontrado"}
 
             # Verificar se quem convida tem permissão (admin ou moderator)
-            inviter_role = self.repo.get_user_role(group_id, invited_by)
+            inviter_role = self._get_role(group_id, invited_by)
             if inviter_role not in ["admin", "moderator"] and group.get("creator_id") != invited_by:
                 return {"success": False, "error": "Sem permissão para convidar usuários"}
 
             # Convidar usuário
             success = self.repo.invite_user(group_id, user_id, invited_by)
             if success:
+                self._membership_changed(group_id, user_id, 1)
                 return {"success": True, "message": "Usuário convidado com sucesso"}
             return {"success": False, "error": "Erro ao convidar usuário ou usuário já é membro"}
         except (ValueError, KeyError) as e:
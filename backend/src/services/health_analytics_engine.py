@@ -0,0 +1,425 @@
+"""
+Motor de Analytics de Saúde - RE-EDUCA Store.
+
+Refatoração: Extrai de health_service.py os cálculos de get_health_analytics
+(tendências, correlações e métricas diárias).
+
+As séries do usuário (IMC, diário alimentar, exercícios) são materializadas
+como arrays numpy, a partir dos registros brutos ou dos rollups diários
+(health_daily_rollups), e todos os agregados são calculados de forma
+vetorizada:
+- Reamostragem diária (np.bincount sobre o índice do dia)
+- Janelas móveis (soma acumulada)
+- Tendências (primeiro/último valor + mínimos quadrados)
+- Correlações (Pearson sobre as séries diárias)
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+ROLLING_WINDOW_DAYS = 7
+TREND_THRESHOLD_PERCENT = 5
+MIN_CORRELATION_POINTS = 3
+
+FOOD_FIELDS = ("calories", "protein", "carbs", "fat", "fiber")
+EXERCISE_FIELDS = ("calories_burned", "duration")
+
+# Campo da série -> coluna de health_daily_rollups
+FOOD_ROLLUP_FIELDS = {
+    "calories": "calories_in",
+    "protein": "protein",
+    "carbs": "carbs",
+    "fat": "fat",
+    "fiber": "fiber",
+    "entries": "food_entries",
+}
+EXERCISE_ROLLUP_FIELDS = {
+    "calories_burned": "calories_out",
+    "duration": "exercise_minutes",
+    "entries": "exercise_entries",
+}
+
+
+def to_datetime64(values: Sequence[Any]) -> np.ndarray:
+    """
+    Converte strings ISO (data ou timestamp) para datetime64[s].
+
+    Fuso e frações de segundo são descartados; valores inválidos viram NaT.
+    """
+    cleaned = [value[:19] if isinstance(value, str) and value else "NaT" for value in values]
+    try:
+        return np.array(cleaned, dtype="datetime64[s]")
+    except ValueError:
+        converted = np.empty(len(cleaned), dtype="datetime64[s]")
+        for i, value in enumerate(cleaned):
+            try:
+                converted[i] = np.datetime64(value, "s")
+            except ValueError:
+                converted[i] = np.datetime64("NaT")
+        return converted
+
+
+def _to_float(value: Any) -> float:
+    """Converte valor numérico do banco para float (0 se ausente/inválido)"""
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def rolling_mean(values: np.ndarray, window: int = ROLLING_WINDOW_DAYS) -> np.ndarray:
+    """Média móvel à direita; os primeiros dias usam a janela parcial disponível"""
+    if values.size == 0:
+        return values.astype(float)
+    cumulative = np.concatenate(([0.0], np.cumsum(values, dtype=float)))
+    ends = np.arange(1, values.size + 1)
+    starts = np.maximum(ends - window, 0)
+    return (cumulative[ends] - cumulative[starts]) / (ends - starts)
+
+
+def pearson(x: np.ndarray, y: np.ndarray) -> Optional[float]:
+    """Correlação de Pearson ignorando NaN; None se não houver pontos ou variância suficientes"""
+    mask = np.isfinite(x) & np.isfinite(y)
+    if mask.sum() < MIN_CORRELATION_POINTS:
+        return None
+    x, y = x[mask], y[mask]
+    if np.std(x) == 0 or np.std(y) == 0:
+        return None
+    return round(float(np.corrcoef(x, y)[0, 1]), 3)
+
+
+class HealthSeries:
+    """
+    Série temporal de um stream de saúde como arrays tipados.
+
+    Attributes:
+        timestamps (np.ndarray): Instantes de cada registro (datetime64[s]).
+        values (Dict[str, np.ndarray]): Colunas numéricas (float64) por campo.
+    """
+
+    def __init__(self, timestamps: np.ndarray, values: Dict[str, np.ndarray]):
+        """Inicializa a série a partir de arrays já alinhados."""
+        self.timestamps = timestamps
+        self.values = values
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: List[Dict[str, Any]],
+        date_fields: Sequence[str],
+        value_fields: Union[Sequence[str], Mapping[str, str]],
+        count_field: Optional[str] = None,
+    ) -> "HealthSeries":
+        """
+        Materializa registros do banco como arrays.
+
+        Args:
+            rows: Registros retornados pelo repositório
+            date_fields: Campos de data em ordem de preferência
+            value_fields: Campos numéricos a materializar (ou mapa campo -> coluna)
+            count_field: Se informado, cria o campo com 1 por registro (contagem)
+        """
+        if not isinstance(value_fields, Mapping):
+            value_fields = {field: field for field in value_fields}
+
+        dates = [next((row.get(field) for field in date_fields if row.get(field)), None) for row in rows]
+        values = {
+            field: np.fromiter((_to_float(row.get(column)) for row in rows), dtype=float, count=len(rows))
+            for field, column in value_fields.items()
+        }
+        if count_field:
+            values[count_field] = np.ones(len(rows))
+        return cls(to_datetime64(dates), values)
+
+    def __len__(self) -> int:
+        return self.timestamps.size
+
+    def sum(self, field: str) -> float:
+        """Soma de um campo"""
+        return float(self.values[field].sum())
+
+    def mean(self, field: str) -> float:
+        """Média de um campo (0 se vazia)"""
+        return float(self.values[field].mean()) if len(self) else 0.0
+
+    def between(self, start: np.datetime64, end: np.datetime64, include_end: bool = True) -> "HealthSeries":
+        """Recorte da série no intervalo [start, end] (ou [start, end))"""
+        upper = self.timestamps <= end if include_end else self.timestamps < end
+        mask = (self.timestamps >= start) & upper
+        return HealthSeries(self.timestamps[mask], {field: column[mask] for field, column in self.values.items()})
+
+    def daily(self, field: Optional[str], start_day: np.datetime64, n_days: int, how: str = "sum") -> np.ndarray:
+        """
+        Reamostra a série por dia.
+
+        Args:
+            field: Campo a agregar (None para contagem)
+            start_day: Primeiro dia (datetime64[D])
+            n_days: Quantidade de dias
+            how: 'sum', 'count' ou 'mean' (NaN nos dias sem registro)
+        """
+        day_index = (self.timestamps.astype("datetime64[D]") - start_day).astype(np.int64)
+        mask = ~np.isnat(self.timestamps) & (day_index >= 0) & (day_index < n_days)
+        day_index = day_index[mask]
+
+        counts = np.bincount(day_index, minlength=n_days).astype(float)
+        if how == "count" or field is None:
+            return counts
+
+        sums = np.bincount(day_index, weights=self.values[field][mask], minlength=n_days)
+        if how == "mean":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return np.where(counts > 0, sums / counts, np.nan)
+        return sums
+
+    def trend(self, field: str) -> Dict[str, Any]:
+        """
+        Tendência do campo entre o primeiro e o último registro.
+
+        Mantém o formato histórico (trend/change/change_percent) e adiciona a
+        inclinação diária por mínimos quadrados.
+        """
+        if len(self) < 2:
+            return {"trend": "stable", "change": 0}
+
+        order = np.argsort(self.timestamps, kind="stable")
+        ordered = self.values[field][order]
+        first_value, last_value = float(ordered[0]), float(ordered[-1])
+
+        change = last_value - first_value
+        change_percent = (change / first_value * 100) if first_value > 0 else 0
+
+        if change_percent > TREND_THRESHOLD_PERCENT:
+            trend = "increasing"
+        elif change_percent < -TREND_THRESHOLD_PERCENT:
+            trend = "decreasing"
+        else:
+            trend = "stable"
+
+        result = {"trend": trend, "change": round(change, 2), "change_percent": round(change_percent, 2)}
+
+        timestamps = self.timestamps[order]
+        valid = ~np.isnat(timestamps)
+        days = (timestamps[valid] - timestamps[valid][0]).astype(float) / 86400 if valid.any() else np.array([])
+        if days.size >= 2 and np.ptp(days) > 0:
+            slope = np.polyfit(days, ordered[valid], 1)[0]
+            result["slope_per_day"] = round(float(slope), 4)
+
+        return result
+
+
+class HealthAnalyticsEngine:
+    """
+    Calcula analytics de saúde de um período a partir das séries do usuário.
+
+    Recebe os registros já filtrados por data no banco e devolve métricas,
+    tendências, comparação com o período anterior, correlações e métricas
+    diárias no formato de HealthService.get_health_analytics.
+    """
+
+    def __init__(self, period_days: int, end_date: datetime):
+        """
+        Inicializa o motor para um período.
+
+        Args:
+            period_days: Tamanho da janela em dias
+            end_date: Fim do período (inclusivo)
+        """
+        self.period_days = period_days
+        self.end_date = end_date
+        self.start_date = end_date - timedelta(days=period_days)
+        self.previous_start = self.start_date - timedelta(days=period_days)
+
+    def compute(
+        self,
+        imc_rows: List[Dict[str, Any]],
+        food_rows: List[Dict[str, Any]],
+        exercise_rows: List[Dict[str, Any]],
+        biological_age_count: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        Calcula analytics do período a partir dos registros brutos.
+
+        Args:
+            imc_rows: Registros de IMC desde o início do período anterior
+            food_rows: Entradas do diário alimentar do período
+            exercise_rows: Entradas de exercício do período
+            biological_age_count: Cálculos de idade biológica no período
+
+        Returns:
+            Dict com period, metrics, trends, comparison, correlations e daily_metrics
+        """
+        food = HealthSeries.from_rows(food_rows, ("consumed_at", "created_at"), FOOD_FIELDS, count_field="entries")
+        exercise = HealthSeries.from_rows(
+            exercise_rows, ("entry_date", "created_at"), EXERCISE_FIELDS, count_field="entries"
+        )
+        return self._compute(imc_rows, food, exercise, biological_age_count)
+
+    def compute_from_rollups(
+        self,
+        imc_rows: List[Dict[str, Any]],
+        rollup_rows: List[Dict[str, Any]],
+        biological_age_count: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        Calcula analytics do período a partir dos rollups diários.
+
+        Alimentação e exercícios vêm de health_daily_rollups (uma linha por
+        dia); as tendências de calorias passam a comparar o primeiro e o
+        último dia com registro.
+
+        Args:
+            imc_rows: Registros de IMC desde o início do período anterior
+            rollup_rows: Rollups diários do período
+            biological_age_count: Cálculos de idade biológica no período
+        """
+        food_rows = [row for row in rollup_rows if _to_float(row.get("food_entries")) > 0]
+        exercise_rows = [row for row in rollup_rows if _to_float(row.get("exercise_entries")) > 0]
+        food = HealthSeries.from_rows(food_rows, ("day",), FOOD_ROLLUP_FIELDS)
+        exercise = HealthSeries.from_rows(exercise_rows, ("day",), EXERCISE_ROLLUP_FIELDS)
+        return self._compute(imc_rows, food, exercise, biological_age_count)
+
+    def _compute(
+        self,
+        imc_rows: List[Dict[str, Any]],
+        food: HealthSeries,
+        exercise: HealthSeries,
+        biological_age_count: int,
+    ) -> Dict[str, Any]:
+        """Cálculo comum às séries brutas e aos rollups (campo 'entries' = registros)"""
+        start = np.datetime64(self.start_date.replace(microsecond=0), "s")
+        end = np.datetime64(self.end_date.replace(microsecond=0), "s")
+        previous_start = np.datetime64(self.previous_start.replace(microsecond=0), "s")
+
+        all_imc = HealthSeries.from_rows(imc_rows, ("created_at", "calculated_at"), ("imc",))
+        imc = all_imc.between(start, end)
+        previous_imc = all_imc.between(previous_start, start, include_end=False)
+
+        period_days = self.period_days
+        total_calories_consumed = food.sum("calories")
+        total_calories_burned = exercise.sum("calories_burned")
+        food_count = int(food.sum("entries"))
+        exercise_count = int(exercise.sum("entries"))
+        avg_imc = imc.mean("imc")
+        previous_avg_imc = previous_imc.mean("imc")
+
+        start_day = np.datetime64(self.start_date.date(), "D")
+        n_days = (self.end_date.date() - self.start_date.date()).days + 1
+        daily = {
+            "calories": food.daily("calories", start_day, n_days),
+            "calories_burned": exercise.daily("calories_burned", start_day, n_days),
+            "exercise_count": exercise.daily("entries", start_day, n_days),
+            "exercise_duration": exercise.daily("duration", start_day, n_days),
+            "imc": imc.daily("imc", start_day, n_days, how="mean"),
+        }
+
+        return {
+            "period": {
+                "start_date": self.start_date.isoformat(),
+                "end_date": self.end_date.isoformat(),
+                "days": period_days,
+            },
+            "metrics": {
+                "total_imc_calculations": len(imc),
+                "average_imc": round(avg_imc, 2),
+                "imc_change": round(avg_imc - previous_avg_imc, 2) if previous_avg_imc > 0 else 0,
+                "total_food_entries": food_count,
+                "total_calories_consumed": total_calories_consumed,
+                "avg_daily_calories": round(total_calories_consumed / period_days, 2) if period_days > 0 else 0,
+                "total_exercise_entries": exercise_count,
+                "total_calories_burned": total_calories_burned,
+                "avg_daily_exercise": round(exercise_count / period_days, 2) if period_days > 0 else 0,
+                "avg_exercise_duration": round(exercise.sum("duration") / exercise_count, 2) if exercise_count else 0,
+                "net_calories": total_calories_consumed - total_calories_burned,
+                "macronutrients": {field: round(food.sum(field), 2) for field in FOOD_FIELDS[1:]},
+                "biological_age_calculations": biological_age_count,
+            },
+            "trends": {
+                "imc_trend": imc.trend("imc"),
+                "calories_trend": food.trend("calories"),
+                "exercise_trend": exercise.trend("calories_burned"),
+            },
+            "comparison": {
+                "previous_avg_imc": round(previous_avg_imc, 2),
+                "current_avg_imc": round(avg_imc, 2),
+                "imc_change_percent": (
+                    round(((avg_imc - previous_avg_imc) / previous_avg_imc * 100), 2) if previous_avg_imc > 0 else 0
+                ),
+            },
+            "correlations": self._correlations(imc, food_count, exercise_count, total_calories_consumed, daily),
+            "daily_metrics": self._daily_metrics(start_day, n_days, daily),
+        }
+
+    def _correlations(
+        self,
+        imc: HealthSeries,
+        food_count: int,
+        exercise_count: int,
+        total_calories: float,
+        daily: Dict[str, np.ndarray],
+    ) -> Dict[str, Any]:
+        """Classificações históricas + coeficientes de Pearson sobre as séries diárias"""
+        period_days = self.period_days
+        correlations = {
+            "exercise_vs_imc": "insufficient_data",
+            "calories_vs_imc": "insufficient_data",
+            "consistency_score": 0,
+        }
+
+        if len(imc) >= 2 and exercise_count > 0:
+            exercise_frequency = exercise_count / period_days if period_days > 0 else 0
+            if exercise_frequency > 0.3:  # Exercita mais de 30% dos dias
+                ordered_imc = imc.values["imc"][np.argsort(imc.timestamps, kind="stable")]
+                if ordered_imc[0] > 0 and ordered_imc[-1] < ordered_imc[0]:
+                    correlations["exercise_vs_imc"] = "positive"
+                else:
+                    correlations["exercise_vs_imc"] = "neutral"
+            else:
+                correlations["exercise_vs_imc"] = "negative"
+
+        if len(imc) >= 2 and food_count > 0 and period_days > 0:
+            avg_daily_calories = total_calories / period_days
+            if 1500 <= avg_daily_calories <= 2500:
+                correlations["calories_vs_imc"] = "balanced"
+            elif avg_daily_calories > 2500:
+                correlations["calories_vs_imc"] = "high"
+            else:
+                correlations["calories_vs_imc"] = "low"
+
+        # Score de consistência (quanto mais dados, maior o score)
+        data_points = len(imc) + food_count + exercise_count
+        max_possible = period_days * 3  # 3 tipos de dados por dia
+        correlations["consistency_score"] = round((data_points / max_possible * 100) if max_possible > 0 else 0, 2)
+
+        net_rolling = rolling_mean(daily["calories"] - daily["calories_burned"])
+        correlations["coefficients"] = {
+            "intake_vs_burned": pearson(daily["calories"], daily["calories_burned"]),
+            "net_calories_7d_vs_imc": pearson(net_rolling, daily["imc"]),
+        }
+
+        return correlations
+
+    def _daily_metrics(
+        self, start_day: np.datetime64, n_days: int, daily: Dict[str, np.ndarray]
+    ) -> List[Dict[str, Any]]:
+        """Monta a lista de métricas por dia (todos os dias do período)"""
+        dates = np.arange(start_day, start_day + n_days).astype(str).tolist()
+        calories = daily["calories"].tolist()
+        burned = daily["calories_burned"].tolist()
+        counts = daily["exercise_count"].astype(int).tolist()
+        durations = daily["exercise_duration"].tolist()
+        calories_rolling = np.round(rolling_mean(daily["calories"]), 2).tolist()
+
+        return [
+            {
+                "date": dates[i],
+                "calories": calories[i],
+                "calories_burned": burned[i],
+                "exercise_count": counts[i],
+                "exercise_duration": durations[i],
+                "calories_7d_avg": calories_rolling[i],
+            }
+            for i in range(n_days)
+        ]
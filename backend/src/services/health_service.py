@@ -11,17 +11,33 @@ Gerencia dados de saúde do usuário incluindo:
 """
 
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 import requests
 from config.settings import get_config
 from repositories.health_repository import HealthRepository
+from repositories.health_rollup_repository import HealthRollupRepository
 from services.base_service import BaseService
+from services.cache_service import cache_service
+from services.gamification_engine import gamification_engine
+from services.health_analytics_engine import HealthAnalyticsEngine
+from services.usda_food_store import get_food_store, normalize_text
 from utils.helpers import generate_uuid
 
 logger = logging.getLogger(__name__)
 
+ANALYTICS_CACHE_KEY = "health_analytics:{user_id}:{period_days}:v{version}:{day}"
+ANALYTICS_CACHE_TTL = 6 * 3600
+
+USDA_PAGE_SIZE = 25
+USDA_SEARCH_CACHE_KEY = "usda:search:{query}"
+USDA_SEARCH_CACHE_TTL = 7 * 24 * 3600
+USDA_FOOD_CACHE_KEY = "usda:food:{fdc_id}"
+USDA_FOOD_CACHE_TTL = 30 * 24 * 3600  # dados de referência USDA mudam raramente
+USDA_BACKOFF_KEY = "usda:rate_limited"
+USDA_BACKOFF_TTL = 300
+
 
 class HealthService(BaseService):
     """
@@ -35,6 +51,7 @@ class HealthService(BaseService):
         super().__init__()
         self.config = get_config()
         self.repo = HealthRepository()  # Repositório de saúde
+        self.rollup_repo = HealthRollupRepository()  # Agregados diários (health_daily_rollups)
 
     def save_imc_calculation(self, user_id: str, calculation_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -77,35 +94,38 @@ class HealthService(BaseService):
 
     def search_foods(self, query: str) -> List[Dict[str, Any]]:
         """
-        Busca alimentos na API USDA.
+        Busca alimentos na base local USDA; a API FoodData Central é só fallback.
 
-        Utiliza USDAFoodParser para processamento e reduzir complexidade ciclomática.
+        Resultados da API ficam em cache (USDA_SEARCH_CACHE_TTL) e, enquanto
+        a API estiver limitando requisições (429), ela não é chamada.
         """
         try:
-            # API USDA Food Data Central
-            url = f"{self.config.USDA_BASE_URL}/foods/search"
-            params = {
-                "api_key": self.config.USDA_API_KEY,
-                "query": query,
-                "pageSize": 25,
-                "dataType": ["Foundation", "SR Legacy"],
-            }
-
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-
-            data = response.json()
+            store = get_food_store()
+            if store is not None:
+                foods = store.search(query, limit=USDA_PAGE_SIZE)
+                if foods:
+                    return foods
+
+            cache_key = USDA_SEARCH_CACHE_KEY.format(query=normalize_text(query))
+            cached = cache_service.get(cache_key)
+            if cached is not None:
+                return cached
+
+            data = self._usda_request(
+                "/foods/search",
+                {"query": query, "pageSize": USDA_PAGE_SIZE, "dataType": ["Foundation", "SR Legacy"]},
+            )
+            if data is None:
+                return []
 
             from services.usda_food_parser import USDAFoodParser
 
             parser = USDAFoodParser()
             foods = parser.parse_food_list(data.get("foods", []))
 
+            cache_service.set(cache_key, foods, ttl=USDA_SEARCH_CACHE_TTL)
             return foods
 
-        except requests.RequestException as e:
-            logger.error(f"Erro na API USDA: {str(e)}")
-            return []
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
             # Tratamento específico pode ser adicionado aqui
@@ -116,17 +136,25 @@ class HealthService(BaseService):
     def get_food_details(self, fdc_id: int) -> Optional[Dict[str, Any]]:
         """
         Retorna detalhes nutricionais de um alimento.
-        
-        Utiliza USDAFoodParser para processamento e reduzir complexidade ciclomática.
+
+        Base local primeiro; alimentos fora dela (ex.: Branded) vêm da API
+        USDA com cache de longa duração.
         """
         try:
-            url = f"{self.config.USDA_BASE_URL}/food/{fdc_id}"
-            params = {"api_key": self.config.USDA_API_KEY, "format": "full"}
+            store = get_food_store()
+            if store is not None:
+                food = store.get(fdc_id)
+                if food:
+                    return food
 
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
+            cache_key = USDA_FOOD_CACHE_KEY.format(fdc_id=fdc_id)
+            cached = cache_service.get(cache_key)
+            if cached is not None:
+                return cached
 
-            data = response.json()
+            data = self._usda_request(f"/food/{fdc_id}", {"format": "full"})
+            if data is None:
+                return None
 
             from services.usda_food_parser import USDAFoodParser
 
@@ -146,12 +174,10 @@ class HealthService(BaseService):
                         nutrients[nutrient_name] = {"value": nutrient_value, "unit": nutrient_unit, "id": nutrient_id}
 
                 food["nutrients"] = nutrients
+                cache_service.set(cache_key, food, ttl=USDA_FOOD_CACHE_TTL)
 
             return food
 
-        except requests.RequestException as e:
-            logger.error(f"Erro na API USDA: {str(e)}")
-            return None
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
             # Tratamento específico pode ser adicionado aqui
@@ -159,6 +185,37 @@ class HealthService(BaseService):
             self.logger.error(f"Erro ao buscar detalhes do alimento: {str(e)}", exc_info=True)
             return None
 
+    def _usda_request(self, path: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Chamada à API USDA com backoff compartilhado em caso de rate limit.
+
+        Returns:
+            JSON da resposta ou None (erro, ou API em backoff)
+        """
+        if cache_service.get(USDA_BACKOFF_KEY):
+            logger.info("API USDA em backoff por rate limit, consulta ignorada")
+            return None
+
+        try:
+            response = requests.get(
+                f"{self.config.USDA_BASE_URL}{path}",
+                params={"api_key": self.config.USDA_API_KEY, **params},
+                timeout=10,
+            )
+            if response.status_code == 429:
+                retry_after = response.headers.get("Retry-After", "")
+                backoff = int(retry_after) if retry_after.isdigit() else USDA_BACKOFF_TTL
+                cache_service.set(USDA_BACKOFF_KEY, True, ttl=backoff)
+                logger.warning(f"API USDA limitou requisições; backoff de {backoff}s")
+                return None
+
+            response.raise_for_status()
+            return response.json()
+
+        except requests.RequestException as e:
+            logger.error(f"Erro na API USDA: {str(e)}")
+            return None
+
     def add_food_entry(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Adiciona entrada de alimento - usa repositório"""
         """Adiciona entrada no diário alimentar"""
@@ -186,6 +243,7 @@ class HealthService(BaseService):
             entry = self.repo.add_food_entry(user_id, entry_data)
 
             if entry:
+                gamification_engine.publish(user_id, "food_diary_entry", entry_data["id"], entry_data["consumed_at"])
                 return {"success": True, "entry": entry}
             else:
                 return {"success": False, "error": "Erro ao adicionar entrada"}
@@ -311,6 +369,7 @@ class HealthService(BaseService):
             entry = self.repo.add_exercise_entry(user_id, entry_data)
 
             if entry:
+                gamification_engine.publish(user_id, "workout_completed", entry_data["id"], entry_data["entry_date"])
                 return {"success": True, "entry": entry}
             else:
                 return {"success": False, "error": "Erro ao adicionar exercício"}
@@ -366,132 +425,54 @@ class HealthService(BaseService):
         """
         try:
             end_date = datetime.now()
-            start_date = end_date - timedelta(days=period_days)
-
-            # Buscar dados históricos
-            imc_history = self.repo.get_imc_history(user_id, page=1, per_page=1000)
-            imc_data = imc_history.get("entries", []) if isinstance(imc_history, dict) else []
-            imc_result_data = [
-                entry
-                for entry in imc_data
-                if start_date.isoformat() <= entry.get("created_at", "") <= end_date.isoformat()
-            ]
-
-            food_entries_result = self.repo.get_food_entries(user_id, page=1, per_page=1000)
-            food_data = (
-                food_entries_result.get("entries", [])
-                if isinstance(food_entries_result, dict)
-                else (food_entries_result if isinstance(food_entries_result, list) else [])
+            engine = HealthAnalyticsEngine(period_days, end_date)
+
+            # Memoização por (usuário, janela, versão dos dados); o dia compõe a
+            # chave porque a janela desliza mesmo sem novas escritas
+            data_version = self.repo.get_data_version(user_id)
+            cache_key = None
+            if data_version is not None:
+                cache_key = ANALYTICS_CACHE_KEY.format(
+                    user_id=user_id, period_days=period_days, version=data_version, day=end_date.date().isoformat()
+                )
+                cached = cache_service.get(cache_key)
+                if cached:
+                    return cached
+
+            # Filtro de datas aplicado nas queries; IMC inclui o período anterior para comparação.
+            # Alimentação e exercícios vêm dos rollups diários (uma linha por dia)
+            period_start = engine.start_date.isoformat()
+            period_end = end_date.isoformat()
+            imc_data = self.repo.get_imc_series(user_id, engine.previous_start.isoformat(), period_end)
+            rollups = self.rollup_repo.find_by_range(
+                user_id, engine.start_date.date().isoformat(), end_date.date().isoformat()
             )
 
-            exercise_entries_result = self.repo.get_exercise_entries(user_id, page=1, per_page=1000)
-            exercise_data = (
-                exercise_entries_result.get("entries", [])
-                if isinstance(exercise_entries_result, dict)
-                else (exercise_entries_result if isinstance(exercise_entries_result, list) else [])
+            biological_age_history = self.repo.get_biological_age_history(
+                user_id, page=1, per_page=1, start_date=period_start, end_date=period_end
             )
-
-            # Buscar outros cálculos de saúde
-            biological_age_history = self.repo.get_biological_age_history(user_id, page=1, per_page=100)
-            biological_age_data = (
-                biological_age_history.get("entries", [])
+            biological_age_count = (
+                biological_age_history.get("pagination", {}).get("total", 0)
                 if isinstance(biological_age_history, dict)
-                else []
-            )
-
-            # Métricas básicas
-            total_calories_consumed = sum(entry.get("calories", 0) for entry in food_data)
-            total_calories_burned = sum(entry.get("calories_burned", 0) for entry in exercise_data)
-            avg_imc = (
-                sum(entry.get("imc", 0) for entry in imc_result_data) / len(imc_result_data) if imc_result_data else 0
-            )
-
-            # Métricas avançadas
-            avg_daily_calories = total_calories_consumed / period_days if period_days > 0 else 0
-            avg_daily_exercise = len(exercise_data) / period_days if period_days > 0 else 0
-            avg_exercise_duration = (
-                sum(entry.get("duration", 0) for entry in exercise_data) / len(exercise_data)
-                if exercise_data
                 else 0
             )
 
-            # Análise de macronutrientes
-            total_protein = sum(entry.get("protein", 0) for entry in food_data)
-            total_carbs = sum(entry.get("carbs", 0) for entry in food_data)
-            total_fat = sum(entry.get("fat", 0) for entry in food_data)
-            total_fiber = sum(entry.get("fiber", 0) for entry in food_data)
-
-            # Análise de tendências avançadas
-            imc_trend = self._calculate_trend(imc_result_data, "imc")
-            calories_trend = self._calculate_trend(food_data, "calories")
-            exercise_trend = self._calculate_trend(exercise_data, "calories_burned")
-
-            # Comparação com período anterior
-            previous_start = start_date - timedelta(days=period_days)
-            previous_imc_data = [
-                entry
-                for entry in imc_data
-                if previous_start.isoformat() <= entry.get("created_at", "") < start_date.isoformat()
-            ]
-            previous_avg_imc = (
-                sum(entry.get("imc", 0) for entry in previous_imc_data) / len(previous_imc_data)
-                if previous_imc_data
-                else 0
-            )
-
-            # Análise de correlações
-            correlations = self._analyze_correlations(
-                imc_result_data, food_data, exercise_data, period_days
-            )
+            analytics = engine.compute_from_rollups(imc_data, rollups, biological_age_count)
 
             # Insights e recomendações
-            insights = self._generate_health_insights(
-                avg_imc, total_calories_consumed, total_calories_burned, len(exercise_data), period_days
+            metrics = analytics["metrics"]
+            analytics["insights"] = self._generate_health_insights(
+                metrics["average_imc"],
+                metrics["total_calories_consumed"],
+                metrics["total_calories_burned"],
+                metrics["total_exercise_entries"],
+                period_days,
             )
 
-            # Análise temporal detalhada
-            daily_metrics = self._calculate_daily_metrics(food_data, exercise_data, start_date, end_date)
+            if cache_key:
+                cache_service.set(cache_key, analytics, ttl=ANALYTICS_CACHE_TTL)
 
-            return {
-                "period": {"start_date": start_date.isoformat(), "end_date": end_date.isoformat(), "days": period_days},
-                "metrics": {
-                    "total_imc_calculations": len(imc_result_data),
-                    "average_imc": round(avg_imc, 2),
-                    "imc_change": round(avg_imc - previous_avg_imc, 2) if previous_avg_imc > 0 else 0,
-                    "total_food_entries": len(food_data),
-                    "total_calories_consumed": total_calories_consumed,
-                    "avg_daily_calories": round(avg_daily_calories, 2),
-                    "total_exercise_entries": len(exercise_data),
-                    "total_calories_burned": total_calories_burned,
-                    "avg_daily_exercise": round(avg_daily_exercise, 2),
-                    "avg_exercise_duration": round(avg_exercise_duration, 2),
-                    "net_calories": total_calories_consumed - total_calories_burned,
-                    "macronutrients": {
-                        "protein": round(total_protein, 2),
-                        "carbs": round(total_carbs, 2),
-                        "fat": round(total_fat, 2),
-                        "fiber": round(total_fiber, 2),
-                    },
-                    "biological_age_calculations": len(biological_age_data),
-                },
-                "trends": {
-                    "imc_trend": imc_trend,
-                    "calories_trend": calories_trend,
-                    "exercise_trend": exercise_trend,
-                },
-                "comparison": {
-                    "previous_avg_imc": round(previous_avg_imc, 2),
-                    "current_avg_imc": round(avg_imc, 2),
-                    "imc_change_percent": (
-                        round(((avg_imc - previous_avg_imc) / previous_avg_imc * 100), 2)
-                        if previous_avg_imc > 0
-                        else 0
-                    ),
-                },
-                "correlations": correlations,
-                "insights": insights,
-                "daily_metrics": daily_metrics,
-            }
+            return analytics
 
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -1005,78 +986,6 @@ class HealthService(BaseService):
             logger.error(f"Erro ao salvar cálculo de estresse: {str(e)}", exc_info=True)
             return {"success": False, "error": "Erro interno do servidor"}
 
-    def _calculate_trend(self, data: List[Dict[str, Any]], field: str) -> Dict[str, Any]:
-        """Calcula tendência dos dados"""
-        if not data:
-            return {"trend": "stable", "change": 0}
-
-        sorted_data = sorted(data, key=lambda x: x.get("created_at", ""))
-
-        if len(sorted_data) < 2:
-            return {"trend": "stable", "change": 0}
-
-        first_value = sorted_data[0].get(field, 0)
-        last_value = sorted_data[-1].get(field, 0)
-
-        change = last_value - first_value
-        change_percent = (change / first_value * 100) if first_value > 0 else 0
-
-        if change_percent > 5:
-            trend = "increasing"
-        elif change_percent < -5:
-            trend = "decreasing"
-        else:
-            trend = "stable"
-
-        return {"trend": trend, "change": round(change, 2), "change_percent": round(change_percent, 2)}
-
-    def _analyze_correlations(
-        self, imc_data: List[Dict], food_data: List[Dict], exercise_data: List[Dict], period_days: int
-    ) -> Dict[str, Any]:
-        """Analisa correlações entre diferentes métricas de saúde"""
-        try:
-            correlations = {
-                "exercise_vs_imc": "insufficient_data",
-                "calories_vs_imc": "insufficient_data",
-                "consistency_score": 0,
-            }
-
-            if len(imc_data) >= 2 and len(exercise_data) > 0:
-                # Calcular correlação entre exercício e IMC
-                imc_values = [entry.get("imc", 0) for entry in imc_data]
-                exercise_days = len(exercise_data)
-                exercise_frequency = exercise_days / period_days if period_days > 0 else 0
-
-                if exercise_frequency > 0.3:  # Exercita mais de 30% dos dias
-                    avg_imc_start = imc_values[0] if imc_values else 0
-                    avg_imc_end = imc_values[-1] if imc_values else 0
-                    if avg_imc_start > 0 and avg_imc_end < avg_imc_start:
-                        correlations["exercise_vs_imc"] = "positive"
-                    else:
-                        correlations["exercise_vs_imc"] = "neutral"
-                else:
-                    correlations["exercise_vs_imc"] = "negative"
-
-            if len(imc_data) >= 2 and len(food_data) > 0:
-                # Calcular correlação entre calorias e IMC
-                avg_daily_calories = sum(entry.get("calories", 0) for entry in food_data) / period_days
-                if 1500 <= avg_daily_calories <= 2500:
-                    correlations["calories_vs_imc"] = "balanced"
-                elif avg_daily_calories > 2500:
-                    correlations["calories_vs_imc"] = "high"
-                else:
-                    correlations["calories_vs_imc"] = "low"
-
-            # Score de consistência (quanto mais dados, maior o score)
-            data_points = len(imc_data) + len(food_data) + len(exercise_data)
-            max_possible = period_days * 3  # 3 tipos de dados por dia
-            correlations["consistency_score"] = round((data_points / max_possible * 100) if max_possible > 0 else 0, 2)
-
-            return correlations
-        except Exception as e:
-            logger.warning(f"Erro ao analisar correlações: {str(e)}")
-            return {"exercise_vs_imc": "unknown", "calories_vs_imc": "unknown", "consistency_score": 0}
-
     def _generate_health_insights(
         self, avg_imc: float, total_calories: float, total_burned: float, exercise_count: int, period_days: int
     ) -> List[Dict[str, str]]:
@@ -1149,56 +1058,3 @@ class HealthService(BaseService):
             )
 
         return insights
-
-    def _calculate_daily_metrics(
-        self, food_data: List[Dict], exercise_data: List[Dict], start_date: datetime, end_date: datetime
-    ) -> List[Dict[str, Any]]:
-        """Calcula métricas diárias para análise temporal"""
-        try:
-            from collections import defaultdict
-
-            daily_metrics_dict = defaultdict(lambda: {"calories": 0, "exercise": 0, "exercise_duration": 0})
-
-            # Agrupar por dia
-            for entry in food_data:
-                entry_date = entry.get("consumed_at") or entry.get("created_at", "")
-                if entry_date:
-                    try:
-                        date_obj = datetime.fromisoformat(entry_date.replace("Z", "+00:00")).date()
-                        date_str = date_obj.isoformat()
-                        daily_metrics_dict[date_str]["calories"] += entry.get("calories", 0)
-                    except (ValueError, AttributeError):
-                        pass
-
-            for entry in exercise_data:
-                entry_date = entry.get("entry_date") or entry.get("created_at", "")
-                if entry_date:
-                    try:
-                        date_obj = datetime.fromisoformat(entry_date.replace("Z", "+00:00")).date()
-                        date_str = date_obj.isoformat()
-                        daily_metrics_dict[date_str]["exercise"] += 1
-                        daily_metrics_dict[date_str]["exercise_duration"] += entry.get("duration", 0)
-                    except (ValueError, AttributeError):
-                        pass
-
-            # Preencher todos os dias do período
-            current = start_date.date()
-            end = end_date.date()
-            daily_metrics = []
-
-            while current <= end:
-                date_str = current.isoformat()
-                daily_metrics.append(
-                    {
-                        "date": date_str,
-                        "calories": daily_metrics_dict[date_str]["calories"],
-                        "exercise_count": daily_metrics_dict[date_str]["exercise"],
-                        "exercise_duration": daily_metrics_dict[date_str]["exercise_duration"],
-                    }
-                )
-                current += timedelta(days=1)
-
-            return daily_metrics
-        except Exception as e:
-            logger.warning(f"Erro ao calcular métricas diárias: {str(e)}")
-            return []
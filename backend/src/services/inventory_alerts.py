@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Alertas de Estoque Baixo RE-EDUCA Store.
+
+Avalia os alertas em conjunto em vez de produto a produto:
+- Uma consulta (get_low_stock_alert_candidates, migração 045) devolve os
+  produtos no limite, já cruzados com as configurações e com o histórico
+  recente de alertas
+- Os alertas do lote são gravados em uma chamada (insert_inventory_alerts);
+  o índice único parcial garante um alerta em aberto por produto
+- Cada destinatário recebe um único email com todos os seus produtos
+
+A avaliação roda no InventoryAlertWorker (varredura completa) e também por
+evento: quando o estoque de um produto cai (update_stock, gravação do livro
+de estoque) só os produtos afetados são avaliados.
+"""
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from repositories.inventory_alert_repository import InventoryAlertRepository
+from repositories.user_repository import UserRepository
+from services.base_service import BaseService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 10
+# Produto com alerta em aberto nesta janela não é alertado de novo
+ALERT_WINDOW_HOURS = 24
+# Abaixo desta fração do limite o alerta é crítico
+CRITICAL_RATIO = 0.3
+
+ALERT_MESSAGES = {
+    "out_of_stock": ("⚠️ ALERTA: {name} está SEM ESTOQUE", "CRÍTICO"),
+    "critical": ("🔴 ALERTA CRÍTICO: {name} com estoque muito baixo", "CRÍTICO"),
+    "low_stock": ("⚠️ ALERTA: {name} com estoque baixo", "MÉDIO"),
+}
+
+# Avaliações por evento rodam fora da requisição que alterou o estoque
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="stock-alerts")
+
+
+def classify_alert(stock_quantity: int, threshold: int) -> str:
+    """
+    Classifica o alerta pelo estoque atual.
+
+    Args:
+        stock_quantity: Estoque atual
+        threshold: Limite do produto
+
+    Returns:
+        'out_of_stock', 'critical' ou 'low_stock'
+    """
+    if stock_quantity <= 0:
+        return "out_of_stock"
+    if stock_quantity <= threshold * CRITICAL_RATIO:
+        return "critical"
+    return "low_stock"
+
+
+def build_alerts(candidates: Iterable[Dict[str, Any]], sent_at: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Monta os registros de inventory_alert_history dos candidatos.
+
+    Args:
+        candidates: Linhas de get_low_stock_alert_candidates
+        sent_at: Data de envio (padrão: agora)
+
+    Returns:
+        Registros de alerta, um por produto
+    """
+    sent_at = sent_at or datetime.utcnow().isoformat()
+    alerts = []
+    for candidate in candidates:
+        stock_quantity = candidate.get("stock_quantity") or 0
+        threshold = candidate.get("threshold") or DEFAULT_THRESHOLD
+        alerts.append(
+            {
+                "product_id": candidate["product_id"],
+                "product_name": candidate.get("product_name") or "",
+                "threshold": threshold,
+                "stock_quantity": stock_quantity,
+                "alert_type": classify_alert(stock_quantity, threshold),
+                "notified_emails": [email for email in candidate.get("notify_email") or [] if email],
+                "notified_admins": candidate.get("notify_admins", True) is not False,
+                "sent_at": sent_at,
+                "is_resolved": False,
+            }
+        )
+    return alerts
+
+
+def group_by_recipient(alerts: Iterable[Dict[str, Any]], admin_emails: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Agrupa os alertas por destinatário.
+
+    Args:
+        alerts: Registros de alerta
+        admin_emails: Emails dos administradores
+
+    Returns:
+        Dict email -> alertas (sem repetir produto por destinatário)
+    """
+    admin_emails = list(admin_emails)
+    grouped: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+    for alert in alerts:
+        recipients = list(alert["notified_emails"])
+        if alert["notified_admins"]:
+            recipients.extend(admin_emails)
+        for email in recipients:
+            grouped[email][alert["product_id"]] = alert
+    return {email: list(by_product.values()) for email, by_product in grouped.items()}
+
+
+def render_alert_email(alerts: List[Dict[str, Any]]) -> Tuple[str, str, str]:
+    """
+    Monta o email de um destinatário.
+
+    Um alerta mantém o assunto por produto; vários viram um resumo.
+
+    Args:
+        alerts: Alertas do destinatário
+
+    Returns:
+        Tupla (assunto, html, texto)
+    """
+    if len(alerts) == 1:
+        template, _ = ALERT_MESSAGES.get(alerts[0]["alert_type"], ALERT_MESSAGES["low_stock"])
+        subject = template.format(name=alerts[0]["product_name"] or "Produto")
+    else:
+        subject = f"⚠️ ALERTA: {len(alerts)} produtos com estoque baixo"
+
+    ordered = sorted(alerts, key=lambda alert: alert["stock_quantity"])
+    rows = []
+    lines = []
+    for alert in ordered:
+        severity = ALERT_MESSAGES.get(alert["alert_type"], ALERT_MESSAGES["low_stock"])[1]
+        name = alert["product_name"] or "Produto"
+        rows.append(
+            f"<tr><td>{name}</td><td>{alert['stock_quantity']}</td>"
+            f"<td>{alert['threshold']}</td><td>{severity}</td></tr>"
+        )
+        lines.append(
+            f"- {name}: {alert['stock_quantity']} unidades (threshold: {alert['threshold']}, severidade: {severity})"
+        )
+
+    html_content = f"""
+            <html>
+            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+                <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                    <h2 style="color: #e74c3c;">{subject}</h2>
+
+                    <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                        <h3>Produtos</h3>
+                        <table style="width: 100%; border-collapse: collapse;">
+                            <tr><th align="left">Produto</th><th align="left">Estoque Atual</th>
+                            <th align="left">Threshold</th><th align="left">Severidade</th></tr>
+                            {''.join(rows)}
+                        </table>
+                    </div>
+
+                    <p>Por favor, verifique o estoque e considere fazer um novo pedido.</p>
+
+                    <p style="color: #666; font-size: 12px; margin-top: 30px;">
+                        Este é um alerta automático do sistema RE-EDUCA Store.
+                    </p>
+                </div>
+            </body>
+            </html>
+            """
+
+    text_content = "\n".join(
+        [subject, "", "Produtos:", *lines, "", "Por favor, verifique o estoque e considere fazer um novo pedido."]
+    )
+    return subject, html_content, text_content
+
+
+class InventoryAlertService(BaseService):
+    """
+    Service de avaliação e envio de alertas de estoque baixo.
+
+    Utiliza InventoryAlertRepository e UserRepository para acesso a dados.
+    """
+
+    def __init__(self):
+        """Inicializa o serviço de alertas de estoque."""
+        super().__init__()
+        self.repo = InventoryAlertRepository()
+        self.user_repo = UserRepository()
+        self._pending: set = set()
+        self._pending_lock = threading.Lock()
+
+    def evaluate(self, threshold: int = DEFAULT_THRESHOLD, product_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Avalia os alertas de estoque e envia as notificações.
+
+        Args:
+            threshold: Limite padrão para produtos sem configuração
+            product_ids: Avalia só estes produtos (modo por evento)
+
+        Returns:
+            Dict com alerts_sent, alerts_created, products_checked e emails_sent
+        """
+        try:
+            candidates = self.repo.find_alert_candidates(threshold, ALERT_WINDOW_HOURS, product_ids)
+            if candidates is None:
+                return {"success": False, "error": "Erro ao buscar produtos com estoque baixo"}
+
+            alerts = build_alerts(candidates)
+            created = self.repo.create_many(alerts, ALERT_WINDOW_HOURS)
+            created_ids = {row.get("product_id") for row in created}
+            # Só notifica o que foi gravado: o histórico é o que impede alertas repetidos
+            alerts = [alert for alert in alerts if alert["product_id"] in created_ids]
+
+            emails_sent = self._send_notifications(alerts) if alerts else 0
+
+            return {
+                "success": True,
+                "alerts_sent": len(alerts),
+                "alerts_created": [row.get("id") for row in created],
+                "products_checked": len(candidates),
+                "emails_sent": emails_sent,
+                "checked_at": datetime.utcnow().isoformat(),
+            }
+
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {"success": False, "error": f"Erro de validação: {str(e)}"}
+        except Exception as e:
+            self.logger.error(f"Erro ao verificar e enviar alertas: {str(e)}", exc_info=True)
+            return {"success": False, "error": str(e)}
+
+    def evaluate_async(self, product_ids: Iterable[str], threshold: int = DEFAULT_THRESHOLD):
+        """
+        Agenda a avaliação dos produtos em background.
+
+        Produtos que já aguardam avaliação não são agendados de novo, então
+        uma rajada de vendas do mesmo produto gera uma única consulta.
+
+        Args:
+            product_ids: Produtos cujo estoque caiu
+            threshold: Limite padrão para produtos sem configuração
+        """
+        with self._pending_lock:
+            new_ids = [product_id for product_id in dict.fromkeys(product_ids) if product_id not in self._pending]
+            self._pending.update(new_ids)
+        if not new_ids:
+            return
+
+        def run():
+            with self._pending_lock:
+                self._pending.difference_update(new_ids)
+            self.evaluate(threshold, new_ids)
+
+        try:
+            _executor.submit(run)
+        except RuntimeError:
+            with self._pending_lock:
+                self._pending.difference_update(new_ids)
+
+    def resolve_restocked(self, threshold: int = DEFAULT_THRESHOLD) -> int:
+        """
+        Resolve alertas de produtos reabastecidos.
+
+        Args:
+            threshold: Limite padrão para produtos sem configuração
+
+        Returns:
+            Número de alertas resolvidos
+        """
+        return self.repo.resolve_restocked(threshold)
+
+    def _send_notifications(self, alerts: List[Dict[str, Any]]) -> int:
+        """
+        Envia um email por destinatário com todos os seus alertas.
+
+        Args:
+            alerts: Alertas gravados
+
+        Returns:
+            Número de emails enviados
+        """
+        try:
+            from services.email_service import EmailService
+
+            admin_emails = self.user_repo.find_admin_emails() if any(a["notified_admins"] for a in alerts) else []
+            email_service = EmailService()
+            sent = 0
+            for email, recipient_alerts in group_by_recipient(alerts, admin_emails).items():
+                subject, html_content, text_content = render_alert_email(recipient_alerts)
+                # Envio síncrono: alertas não devem esperar na fila de emails
+                result = email_service._send_email(email, subject, html_content, text_content, use_queue=False)
+                if result and result.get("success"):
+                    sent += 1
+            return sent
+        except Exception as e:
+            self.logger.error(f"Erro ao enviar notificações de alerta: {str(e)}", exc_info=True)
+            return 0
+
+
+inventory_alert_service = InventoryAlertService()
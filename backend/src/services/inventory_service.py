@@ -4,10 +4,12 @@ Serviço de Estoque RE-EDUCA Store.
 Gerencia controle de estoque incluindo:
 - Consulta de disponibilidade
 - Atualização de estoque (adição/subtração)
-- Reserva de produtos para pedidos
+- Reserva de produtos para pedidos (livro de estoque no Redis,
+  services/stock_ledger.py)
 - Liberação de reservas
 - Validação de estoque disponível
 - Histórico de movimentações
+- Alertas de estoque baixo (services/inventory_alerts.py)
 """
 
 import logging
@@ -17,10 +19,17 @@ from typing import Any, Dict
 from repositories.inventory_repository import InventoryRepository
 from repositories.product_repository import ProductRepository
 from services.base_service import BaseService
+from services.cart_read_model import cart_read_model
+from services.inventory_alerts import inventory_alert_service
 from services.product_service import ProductService
+from services.stock_ledger import stock_ledger
 
 logger = logging.getLogger(__name__)
 
+# Reservas vencidas no banco só são expiradas aqui após esta folga; antes
+# disso o livro de estoque (Redis) é quem as expira
+DB_EXPIRY_GRACE = timedelta(hours=1)
+
 
 class InventoryService(BaseService):
     """
@@ -35,6 +44,8 @@ class InventoryService(BaseService):
         self.repo = InventoryRepository()
         self.product_repo = ProductRepository()
         self.product_service = ProductService()
+        self.ledger = stock_ledger
+        self.alerts = inventory_alert_service
 
     def get_product_stock(self, product_id: str) -> Dict[str, Any]:
         """
@@ -47,17 +58,24 @@ class InventoryService(BaseService):
             Dict[str, Any]: Quantidade em estoque e disponibilidade.
         """
         try:
+            # Saldo do livro de estoque inclui reservas ainda não gravadas e
+            # vale mesmo se a leitura do produto no banco falhar
+            level = self.ledger.get_levels([product_id]).get(str(product_id))
             product = self.repo.get_product_stock(product_id)
 
-            if not product:
+            if not product and not level:
                 return {"success": False, "error": "Produto não encontrado"}
 
+            product = product or {}
+            stock_quantity = level["available"] if level else product.get("stock_quantity", 0)
+
             return {
                 "success": True,
                 "product_id": product_id,
                 "product_name": product.get("name", ""),
-                "stock_quantity": product.get("stock_quantity", 0),
-                "is_available": product.get("stock_quantity", 0) > 0,
+                "stock_quantity": stock_quantity,
+                "reserved_quantity": level["reserved"] if level else None,
+                "is_available": stock_quantity > 0,
             }
 
         except (ValueError, KeyError) as e:
@@ -112,6 +130,7 @@ class InventoryService(BaseService):
 
             # Se sucesso, registrar movimento de estoque
             if result.get("success"):
+                self.ledger.adjust(product_id, actual_change)
                 self._log_stock_movement(
                     product_id,
                     result.get("product_name", ""),
@@ -120,6 +139,12 @@ class InventoryService(BaseService):
                     operation,
                     abs(quantity_change),
                 )
+                # Estoque caiu: avalia o alerta só deste produto, fora da requisição
+                if result.get("new_stock", 0) < result.get("previous_stock", 0):
+                    self.alerts.evaluate_async([product_id])
+                # Carrinhos guardam o estoque no snapshot: reposição também os invalida
+                if result.get("new_stock", 0) != result.get("previous_stock", 0):
+                    cart_read_model.invalidate_product(product_id)
 
             return result
 
@@ -131,111 +156,22 @@ class InventoryService(BaseService):
             return {"success": False, "error": str(e)}
 
     def reserve_stock(self, product_id: str, quantity: int, order_id: str = None) -> Dict[str, Any]:
-        """Reserva estoque para um pedido"""
-        try:
-            # Verifica se há estoque suficiente
-            stock_result = self.get_product_stock(product_id)
-            if not stock_result["success"]:
-                return stock_result
-
-            if stock_result["stock_quantity"] < quantity:
-                return {"success": False, "error": "Estoque insuficiente"}
-
-            # Cria reserva
-            reservation_data = {
-                "product_id": product_id,
-                "quantity": quantity,
-                "order_id": order_id,
-                "status": "reserved",
-            }
-
-            reservation_data["expires_at"] = (datetime.utcnow() + timedelta(hours=24)).isoformat()
-            reservation_data["created_at"] = datetime.utcnow().isoformat()
-
-            reservation = self.repo.create_reservation(reservation_data)
-
-            if reservation:
-                # Atualiza estoque disponível
-                self.update_stock(product_id, quantity, "subtract")
-
-                return {
-                    "success": True,
-                    "reservation_id": reservation["id"],
-                    "product_id": product_id,
-                    "quantity": quantity,
-                    "expires_at": reservation_data["expires_at"],
-                }
-            else:
-                return {"success": False, "error": "Erro ao criar reserva"}
+        """
+        Reserva estoque para um pedido.
 
-        except (ValueError, KeyError) as e:
-            logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
-        except Exception as e:
-            self.logger.error(f"Erro ao reservar estoque: {str(e)}", exc_info=True)
-            return {"success": False, "error": str(e)}
+        Uma operação atômica no Redis (saldo conferido e reserva criada
+        juntos); a gravação no banco é feita em lote pelo worker do livro de
+        estoque.
+        """
+        return self.ledger.reserve(product_id, quantity, order_id=order_id)
 
     def confirm_stock_reservation(self, reservation_id: str) -> Dict[str, Any]:
         """Confirma reserva de estoque (converte em venda)"""
-        try:
-            reservation = self.repo.find_reservation_by_id(reservation_id)
-
-            if not reservation:
-                return {"success": False, "error": "Reserva não encontrada"}
-
-            # Verifica se não expirou
-            expires_at = datetime.fromisoformat(reservation["expires_at"])
-            if datetime.utcnow() > expires_at:
-                return {"success": False, "error": "Reserva expirada"}
-
-            update_data = {"status": "confirmed", "confirmed_at": datetime.utcnow().isoformat()}
-            updated = self.repo.update_reservation(reservation_id, update_data)
-            if not updated:
-                return {"success": False, "error": "Erro ao confirmar reserva"}
-
-            return {
-                "success": True,
-                "reservation_id": reservation_id,
-                "product_id": reservation["product_id"],
-                "quantity": reservation["quantity"],
-            }
-
-        except (ValueError, KeyError) as e:
-            logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
-        except Exception as e:
-            logger.error(f"Erro ao confirmar reserva: {str(e)}", exc_info=True)
-            return {"success": False, "error": str(e)}
+        return self.ledger.confirm(reservation_id)
 
     def cancel_stock_reservation(self, reservation_id: str) -> Dict[str, Any]:
-        """Cancela reserva de estoque"""
-        try:
-            reservation = self.repo.find_reservation_by_id(reservation_id)
-
-            if not reservation:
-                return {"success": False, "error": "Reserva não encontrada"}
-
-            update_data = {"status": "cancelled", "cancelled_at": datetime.utcnow().isoformat()}
-            updated = self.repo.update_reservation(reservation_id, update_data)
-            if not updated:
-                return {"success": False, "error": "Erro ao cancelar reserva"}
-
-            # Devolve estoque
-            self.update_stock(reservation["product_id"], reservation["quantity"], "add")
-
-            return {
-                "success": True,
-                "reservation_id": reservation_id,
-                "product_id": reservation["product_id"],
-                "quantity": reservation["quantity"],
-            }
-
-        except (ValueError, KeyError) as e:
-            logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
-        except Exception as e:
-            logger.error(f"Erro ao cancelar reserva: {str(e)}", exc_info=True)
-            return {"success": False, "error": str(e)}
+        """Cancela reserva de estoque e devolve o estoque"""
+        return self.ledger.release(reservation_id, "cancelled")
 
     def get_low_stock_products(self, threshold: int = 10) -> Dict[str, Any]:
         """Busca produtos com estoque baixo"""
@@ -331,21 +267,20 @@ class InventoryService(BaseService):
             self.logger.error(f"Erro ao registrar movimentação: {str(e)}", exc_info=True)
 
     def cleanup_expired_reservations(self) -> Dict[str, Any]:
-        """Limpa reservas expiradas"""
-        try:
-            now = datetime.now().isoformat()
-
-            # Busca reservas expiradas
-            expired_reservations = self.repo.find_expired_reservations(now)
+        """
+        Limpa reservas expiradas.
 
-            cancelled_count = 0
+        Reservas do livro de estoque são expiradas pelo sorted set de prazos;
+        reservas gravadas direto no banco (sem Redis) são expiradas em uma
+        instrução, após DB_EXPIRY_GRACE.
+        """
+        try:
+            now = datetime.utcnow()
 
-            for reservation in expired_reservations:
-                # Cancela reserva
-                self.cancel_stock_reservation(reservation["id"])
-                cancelled_count += 1
+            cancelled_count = self.ledger.expire_due()
+            cancelled_count += self.repo.expire_reservations((now - DB_EXPIRY_GRACE).isoformat())
 
-            return {"success": True, "cancelled_reservations": cancelled_count, "cleaned_at": now}
+            return {"success": True, "cancelled_reservations": cancelled_count, "cleaned_at": now.isoformat()}
 
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -359,6 +294,7 @@ class InventoryService(BaseService):
         Verifica produtos com estoque baixo e envia alertas.
 
         Utiliza configurações de alerta por produto ou usa threshold padrão.
+        A avaliação é feita em conjunto por services/inventory_alerts.py.
 
         Args:
             threshold: Threshold padrão se produto não tiver configuração
@@ -366,206 +302,7 @@ class InventoryService(BaseService):
         Returns:
             Dict com produtos alertados e estatísticas
         """
-        try:
-            from config.database import supabase_client
-
-            # Buscar produtos com estoque baixo
-            low_stock_result = self.get_low_stock_products(threshold)
-            if not low_stock_result.get("success"):
-                return {"success": False, "error": "Erro ao buscar produtos com estoque baixo"}
-
-            products = low_stock_result.get("products", [])
-            alerts_sent = 0
-            alerts_created = []
-
-            for product in products:
-                product_id = product.get("id")
-                stock_quantity = product.get("stock_quantity", 0)
-
-                # Buscar configuração de alerta do produto
-                alert_config = (
-                    supabase_client.table("inventory_alert_settings")
-                    .select("*")
-                    .eq("product_id", product_id)
-                    .eq("enabled", True)
-                    .execute()
-                )
-
-                config = alert_config.data[0] if alert_config.data else None
-
-                # Usar threshold da configuração ou padrão
-                product_threshold = config.get("threshold", threshold) if config else threshold
-
-                # Verificar se precisa alertar (estoque <= threshold)
-                if stock_quantity > product_threshold:
-                    continue
-
-                # Verificar se já foi alertado recentemente (últimas 24h)
-                recent_alert = (
-                    supabase_client.table("inventory_alert_history")
-                    .select("id")
-                    .eq("product_id", product_id)
-                    .eq("is_resolved", False)
-                    .gte("sent_at", (datetime.utcnow() - timedelta(hours=24)).isoformat())
-                    .execute()
-                )
-
-                if recent_alert.data:
-                    # Já foi alertado recentemente, pular
-                    continue
-
-                # Determinar tipo de alerta
-                if stock_quantity == 0:
-                    alert_type = "out_of_stock"
-                elif stock_quantity <= (product_threshold * 0.3):
-                    alert_type = "critical"
-                else:
-                    alert_type = "low_stock"
-
-                # Criar registro de alerta
-                alert_data = {
-                    "product_id": product_id,
-                    "product_name": product.get("name", ""),
-                    "threshold": product_threshold,
-                    "stock_quantity": stock_quantity,
-                    "alert_type": alert_type,
-                    "notified_emails": config.get("notify_email", []) if config else [],
-                    "notified_admins": config.get("notify_admins", True) if config else True,
-                    "sent_at": datetime.utcnow().isoformat(),
-                    "is_resolved": False,
-                }
-
-                alert_history = (
-                    supabase_client.table("inventory_alert_history")
-                    .insert(alert_data)
-                    .execute()
-                )
-
-                if alert_history.data:
-                    alert_id = alert_history.data[0]["id"]
-                    alerts_created.append(alert_id)
-
-                    # Enviar notificações
-                    self._send_stock_alert_notifications(product, alert_data, config)
-                    alerts_sent += 1
-
-            return {
-                "success": True,
-                "alerts_sent": alerts_sent,
-                "alerts_created": alerts_created,
-                "products_checked": len(products),
-                "checked_at": datetime.utcnow().isoformat(),
-            }
-
-        except (ValueError, KeyError) as e:
-            logger.warning(f"Erro de validação: {str(e)}")
-            return {"success": False, "error": f"Erro de validação: {str(e)}"}
-        except Exception as e:
-            self.logger.error(f"Erro ao verificar e enviar alertas: {str(e)}", exc_info=True)
-            return {"success": False, "error": str(e)}
-
-    def _send_stock_alert_notifications(self, product: Dict[str, Any], alert_data: Dict[str, Any], config: Dict[str, Any] = None):
-        """
-        Envia notificações de alerta de estoque por email.
-
-        Args:
-            product: Dados do produto
-            alert_data: Dados do alerta
-            config: Configuração de alerta (opcional)
-        """
-        try:
-            from services.email_service import EmailService
-            from repositories.user_repository import UserRepository
-
-            email_service = EmailService()
-            user_repo = UserRepository()
-
-            product_name = product.get("name", "Produto")
-            stock_quantity = alert_data.get("stock_quantity", 0)
-            alert_type = alert_data.get("alert_type", "low_stock")
-
-            # Mensagens por tipo de alerta
-            messages = {
-                "out_of_stock": {
-                    "subject": f"⚠️ ALERTA: {product_name} está SEM ESTOQUE",
-                    "severity": "CRÍTICO",
-                },
-                "critical": {
-                    "subject": f"🔴 ALERTA CRÍTICO: {product_name} com estoque muito baixo",
-                    "severity": "CRÍTICO",
-                },
-                "low_stock": {
-                    "subject": f"⚠️ ALERTA: {product_name} com estoque baixo",
-                    "severity": "MÉDIO",
-                },
-            }
-
-            message_info = messages.get(alert_type, messages["low_stock"])
-
-            # Template HTML do email
-            html_content = f"""
-            <html>
-            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-                <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                    <h2 style="color: #e74c3c;">{message_info['subject']}</h2>
-                    
-                    <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;">
-                        <h3>Detalhes do Produto</h3>
-                        <p><strong>Produto:</strong> {product_name}</p>
-                        <p><strong>Estoque Atual:</strong> {stock_quantity} unidades</p>
-                        <p><strong>Threshold:</strong> {alert_data.get('threshold', 10)} unidades</p>
-                        <p><strong>Severidade:</strong> {message_info['severity']}</p>
-                    </div>
-                    
-                    <p>Por favor, verifique o estoque e considere fazer um novo pedido.</p>
-                    
-                    <p style="color: #666; font-size: 12px; margin-top: 30px;">
-                        Este é um alerta automático do sistema RE-EDUCA Store.
-                    </p>
-                </div>
-            </body>
-            </html>
-            """
-
-            text_content = f"""
-            {message_info['subject']}
-            
-            Detalhes do Produto:
-            - Produto: {product_name}
-            - Estoque Atual: {stock_quantity} unidades
-            - Threshold: {alert_data.get('threshold', 10)} unidades
-            - Severidade: {message_info['severity']}
-            
-            Por favor, verifique o estoque e considere fazer um novo pedido.
-            """
-
-            # Enviar para emails configurados
-            notify_emails = config.get("notify_email", []) if config else []
-            for email in notify_emails:
-                if email:
-                    # Enviar email síncrono para alertas críticos (não usar queue)
-                    email_service._send_email(email, message_info["subject"], html_content, text_content, use_queue=False)
-
-            # Enviar para admins se configurado
-            if config is None or config.get("notify_admins", True):
-                # Buscar emails de admins
-                from config.database import supabase_client
-                admins_result = (
-                    supabase_client.table("users")
-                    .select("email")
-                    .eq("role", "admin")
-                    .eq("is_active", True)
-                    .execute()
-                )
-                admins = admins_result.data if admins_result.data else []
-                for admin in admins:
-                    admin_email = admin.get("email")
-                    if admin_email:
-                        # Enviar email síncrono para alertas críticos (não usar queue)
-                        email_service._send_email(admin_email, message_info["subject"], html_content, text_content, use_queue=False)
-
-        except Exception as e:
-            self.logger.error(f"Erro ao enviar notificações de alerta: {str(e)}", exc_info=True)
+        return self.alerts.evaluate(threshold)
 
     def get_alert_settings(self, product_id: str = None) -> Dict[str, Any]:
         """
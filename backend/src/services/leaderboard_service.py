@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+"""
+Serviço de Leaderboards RE-EDUCA Store.
+
+Rankings de pontos em sorted sets Redis (membro = user_id), atualizados com
+ZINCRBY a cada ponto concedido (GamificationService._add_points):
+- leaderboard:global: saldo de pontos (igual a users.total_points)
+- leaderboard:weekly:{2026-W42} / leaderboard:monthly:{2026-10}: pontos
+  ganhos na semana ISO / no mês (UTC); resgates não descontam
+- leaderboard:challenge:{challenge_id}: pontos ganhos em cada desafio
+- leaderboard:profiles: nome e avatar de quem aparece nos rankings
+
+Posição e vizinhança vêm de ZREVRANK/ZREVRANGE (O(log n)), sem consultar o
+banco. O ledger user_points continua sendo a fonte da verdade:
+- rebuild() reconstrói todos os rankings a partir dele (também corrige
+  pontos concedidos direto no banco, ex.: trigger de desafios)
+- snapshot() grava o topo de cada ranking em leaderboard_snapshots
+Ambos rodam em workers/leaderboard_worker.py. Sem Redis, ou antes do
+primeiro rebuild (scripts/rebuild_leaderboards.py), o ranking geral é lido
+do banco.
+"""
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from repositories.leaderboard_repository import LeaderboardRepository
+from services.base_service import BaseService
+from services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "leaderboard:"
+GLOBAL_KEY = "leaderboard:global"
+WEEKLY_KEY = "leaderboard:weekly:{period}"
+MONTHLY_KEY = "leaderboard:monthly:{period}"
+CHALLENGE_KEY = "leaderboard:challenge:{challenge_id}"
+PROFILES_KEY = "leaderboard:profiles"
+READY_KEY = "leaderboard:ready"
+
+WINDOWS = ("global", "weekly", "monthly")
+WEEKLY_TTL = 5 * 7 * 86400
+MONTHLY_TTL = 93 * 86400
+SNAPSHOT_SIZE = 100
+POINTS_PER_LEVEL = 100
+
+
+def week_start(now: datetime) -> datetime:
+    """Segunda-feira 00:00 UTC da semana de now"""
+    day = now.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - timedelta(days=day.weekday())
+
+
+def month_start(now: datetime) -> datetime:
+    """Dia 1 00:00 UTC do mês de now"""
+    return now.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def board_key(window: str = "global", challenge_id: Optional[str] = None, now: Optional[datetime] = None) -> str:
+    """
+    Chave do ranking.
+
+    Args:
+        window: global, weekly ou monthly
+        challenge_id: Ranking de um desafio (ignora window)
+        now: Data de referência das janelas (padrão: agora)
+
+    Raises:
+        ValueError: Se a janela for inválida
+    """
+    if challenge_id:
+        return CHALLENGE_KEY.format(challenge_id=challenge_id)
+    if window not in WINDOWS:
+        raise ValueError("Janela de ranking inválida")
+    if window == "global":
+        return GLOBAL_KEY
+    now = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    if window == "weekly":
+        year, week, _ = now.isocalendar()
+        return WEEKLY_KEY.format(period=f"{year}-W{week:02d}")
+    return MONTHLY_KEY.format(period=f"{now.year}-{now.month:02d}")
+
+
+def _rebuild_key(key: str) -> str:
+    """Chave temporária de um ranking durante o rebuild (fora dos padrões de leitura)"""
+    return f"{KEY_PREFIX}rebuild:{key[len(KEY_PREFIX):]}"
+
+
+class LeaderboardService(BaseService):
+    """Rankings de pontos em sorted sets com reconstrução a partir do ledger."""
+
+    def __init__(self):
+        """Inicializa o serviço de leaderboards."""
+        super().__init__()
+        self.repo = LeaderboardRepository()
+
+    @property
+    def redis(self):
+        """Cliente Redis compartilhado (None se indisponível)"""
+        return cache_service.redis_client
+
+    # =====================================================
+    # ESCRITA
+    # =====================================================
+
+    def record(self, user_id: str, points: int, source: str, source_id: Optional[str] = None):
+        """
+        Soma pontos concedidos (ou descontados) aos rankings.
+
+        Args:
+            user_id: ID do usuário
+            points: Pontos (negativo em resgates)
+            source: Origem (challenge, reward, reward_claim...)
+            source_id: ID da origem (challenge_id em desafios)
+        """
+        if not self.redis or not user_id or not points:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zincrby(GLOBAL_KEY, points, user_id)
+            if points > 0:
+                for key, ttl in self._window_keys(datetime.now(timezone.utc)):
+                    pipe.zincrby(key, points, user_id)
+                    pipe.expire(key, ttl)
+                if source == "challenge" and source_id:
+                    pipe.zincrby(CHALLENGE_KEY.format(challenge_id=source_id), points, user_id)
+            pipe.hexists(PROFILES_KEY, user_id)
+            has_profile = pipe.execute()[-1]
+            if not has_profile:
+                self.cache_profiles(self.repo.get_profiles([user_id]))
+        except Exception as e:
+            self.logger.warning(f"Erro ao atualizar rankings: {str(e)}")
+
+    def cache_profiles(self, users: Iterable[Dict[str, Any]], only_existing: bool = False):
+        """
+        Grava nome e avatar exibidos nos rankings.
+
+        Args:
+            users: Lista de {id, name, avatar_url}
+            only_existing: Atualiza apenas quem já está em cache (edição de perfil)
+        """
+        users = [user for user in users if user and user.get("id")]
+        if not users or not self.redis:
+            return
+        try:
+            if only_existing:
+                pipe = self.redis.pipeline(transaction=False)
+                for user in users:
+                    pipe.hexists(PROFILES_KEY, user["id"])
+                users = [user for user, cached in zip(users, pipe.execute()) if cached]
+                if not users:
+                    return
+            self.redis.hset(
+                PROFILES_KEY,
+                mapping={
+                    user["id"]: json.dumps({"name": user.get("name"), "avatar_url": user.get("avatar_url")})
+                    for user in users
+                },
+            )
+        except Exception as e:
+            self.logger.warning(f"Erro ao gravar perfis do ranking: {str(e)}")
+
+    # =====================================================
+    # LEITURA
+    # =====================================================
+
+    def is_ready(self) -> bool:
+        """Rankings carregados no Redis (após o primeiro rebuild)"""
+        try:
+            return bool(self.redis and self.redis.exists(READY_KEY))
+        except Exception:
+            return False
+
+    def get_leaderboard(
+        self, window: str = "global", limit: int = 10, offset: int = 0, challenge_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Página de um ranking.
+
+        Args:
+            window: global, weekly ou monthly
+            limit: Número de usuários
+            offset: Posição inicial (0 = primeiro lugar)
+            challenge_id: Ranking de um desafio
+
+        Returns:
+            Lista de {rank, user_id, name, avatar_url, points} (e total_points/level no geral)
+
+        Raises:
+            ValueError: Se a janela for inválida
+        """
+        key = board_key(window, challenge_id)
+        if not self.is_ready():
+            return self._leaderboard_from_db(limit, offset) if key == GLOBAL_KEY else []
+        try:
+            rows = self.redis.zrevrange(key, offset, offset + limit - 1, withscores=True)
+            return self._entries(rows, offset + 1, key == GLOBAL_KEY)
+        except Exception as e:
+            self.logger.warning(f"Erro ao ler ranking {key}: {str(e)}")
+            return self._leaderboard_from_db(limit, offset) if key == GLOBAL_KEY else []
+
+    def get_position(
+        self, user_id: str, window: str = "global", radius: int = 5, challenge_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Posição do usuário e vizinhos no ranking ("minha posição").
+
+        Args:
+            user_id: ID do usuário
+            window: global, weekly ou monthly
+            radius: Usuários acima e abaixo
+            challenge_id: Ranking de um desafio
+
+        Returns:
+            Dict com rank (None se fora do ranking), points, total e around
+
+        Raises:
+            ValueError: Se a janela for inválida
+        """
+        key = board_key(window, challenge_id)
+        position = {"rank": None, "points": 0, "total": 0, "around": []}
+        if not self.is_ready():
+            return position
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zrevrank(key, user_id)
+            pipe.zscore(key, user_id)
+            pipe.zcard(key)
+            rank, score, total = pipe.execute()
+            position["total"] = total
+            if rank is None:
+                return position
+            start = max(rank - radius, 0)
+            rows = self.redis.zrevrange(key, start, rank + radius, withscores=True)
+            position.update(
+                rank=rank + 1, points=int(score or 0), around=self._entries(rows, start + 1, key == GLOBAL_KEY)
+            )
+        except Exception as e:
+            self.logger.warning(f"Erro ao ler posição no ranking {key}: {str(e)}")
+        return position
+
+    def get_rank(self, user_id: str) -> Optional[int]:
+        """Posição no ranking geral (None se indisponível ou fora do ranking)"""
+        if not self.is_ready():
+            return None
+        try:
+            rank = self.redis.zrevrank(GLOBAL_KEY, user_id)
+            return rank + 1 if rank is not None else None
+        except Exception as e:
+            self.logger.warning(f"Erro ao ler posição no ranking: {str(e)}")
+            return None
+
+    def _entries(self, rows: List[Tuple[str, float]], first_rank: int, with_level: bool) -> List[Dict[str, Any]]:
+        """Monta as linhas do ranking com os perfis em cache (uma ida ao Redis)"""
+        if not rows:
+            return []
+        user_ids = [user_id for user_id, _ in rows]
+        profiles = self.redis.hmget(PROFILES_KEY, user_ids)
+        entries = []
+        for position, ((user_id, score), profile) in enumerate(zip(rows, profiles)):
+            profile = json.loads(profile) if profile else {}
+            entry = {
+                "rank": first_rank + position,
+                "user_id": user_id,
+                "name": profile.get("name") or "Usuário",
+                "avatar_url": profile.get("avatar_url"),
+                "points": int(score),
+            }
+            if with_level:
+                entry["total_points"] = int(score)
+                entry["level"] = max(int(score), 0) // POINTS_PER_LEVEL + 1
+            entries.append(entry)
+        return entries
+
+    def _leaderboard_from_db(self, limit: int, offset: int) -> List[Dict[str, Any]]:
+        """Ranking geral pelo banco (sem Redis ou antes do primeiro rebuild)"""
+        users = self.repo.get_top_users(offset + limit)[offset:]
+        return [
+            {
+                "rank": offset + position,
+                "user_id": user["id"],
+                "name": user.get("name") or "Usuário",
+                "avatar_url": user.get("avatar_url"),
+                "points": user.get("total_points") or 0,
+                "total_points": user.get("total_points") or 0,
+                "level": max(user.get("total_points") or 0, 0) // POINTS_PER_LEVEL + 1,
+            }
+            for position, user in enumerate(users, 1)
+        ]
+
+    # =====================================================
+    # FOTOS E RECONSTRUÇÃO
+    # =====================================================
+
+    def snapshot(self, size: int = SNAPSHOT_SIZE) -> Dict[str, int]:
+        """
+        Grava o topo de cada ranking em leaderboard_snapshots.
+
+        Inclui os rankings da semana e do mês anteriores enquanto existirem
+        no Redis, para que a foto final de cada período fique completa.
+
+        Args:
+            size: Usuários por ranking
+
+        Returns:
+            Dict {ranking: usuários gravados}
+        """
+        if not self.is_ready():
+            return {}
+        now = datetime.now(timezone.utc)
+        previous = [
+            board_key("weekly", now=now - timedelta(days=7)),
+            board_key("monthly", now=month_start(now) - timedelta(days=1)),
+        ]
+        keys = [GLOBAL_KEY] + [key for key, _ in self._window_keys(now)] + previous
+        keys += sorted(self.redis.scan_iter(match=CHALLENGE_KEY.format(challenge_id="*"), count=1000))
+
+        saved = {}
+        for key in dict.fromkeys(keys):
+            rows = self.redis.zrevrange(key, 0, size - 1, withscores=True)
+            if not rows:
+                continue
+            board = key[len(KEY_PREFIX):]
+            snapshot_rows = [
+                {"user_id": user_id, "rank": rank, "points": int(score)} for rank, (user_id, score) in enumerate(rows, 1)
+            ]
+            if self.repo.replace_snapshot(board, snapshot_rows):
+                saved[board] = len(snapshot_rows)
+        return saved
+
+    def rebuild(self, batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Reconstrói todos os rankings a partir do ledger user_points.
+
+        Os rankings são montados em chaves temporárias e trocados com RENAME
+        ao final, então as leituras nunca veem um ranking parcial. Pontos
+        concedidos durante a reconstrução podem ser sobrescritos; a próxima
+        reconstrução os corrige.
+
+        Args:
+            batch_size: Usuários por chamada ao banco
+
+        Returns:
+            Dict com users (usuários no ledger) e challenges (rankings de desafios)
+        """
+        if not self.redis:
+            return {"users": 0, "challenges": 0}
+        now = datetime.now(timezone.utc)
+        weekly_key, monthly_key = (key for key, _ in self._window_keys(now))
+        built = {GLOBAL_KEY, weekly_key, monthly_key}
+        self.redis.delete(*(_rebuild_key(key) for key in built))
+
+        users, after_id = 0, None
+        while True:
+            batch = self.repo.get_ledger_totals(after_id, batch_size, week_start(now), month_start(now))
+            if batch is None:
+                raise RuntimeError("Falha ao ler o ledger de pontos")
+            if not batch:
+                break
+            pipe = self.redis.pipeline(transaction=False)
+            for row in batch:
+                user_id = str(row["user_id"])
+                pipe.zadd(_rebuild_key(GLOBAL_KEY), {user_id: int(row.get("total_points") or 0)})
+                for key, field in ((weekly_key, "week_points"), (monthly_key, "month_points")):
+                    if int(row.get(field) or 0) > 0:
+                        pipe.zadd(_rebuild_key(key), {user_id: int(row[field])})
+                for challenge_id, points in (row.get("challenge_points") or {}).items():
+                    key = CHALLENGE_KEY.format(challenge_id=challenge_id)
+                    built.add(key)
+                    pipe.zadd(_rebuild_key(key), {user_id: int(points)})
+            pipe.execute()
+            self.cache_profiles(
+                {"id": str(row["user_id"]), "name": row.get("name"), "avatar_url": row.get("avatar_url")}
+                for row in batch
+            )
+            users += len(batch)
+            after_id = str(batch[-1]["user_id"])
+            if len(batch) < batch_size:
+                break
+
+        stale = set(self.redis.scan_iter(match=CHALLENGE_KEY.format(challenge_id="*"), count=1000)) - built
+        pipe = self.redis.pipeline(transaction=True)
+        for key in built:
+            if self.redis.exists(_rebuild_key(key)):
+                pipe.rename(_rebuild_key(key), key)
+            else:
+                pipe.delete(key)
+        if stale:
+            pipe.delete(*stale)
+        for key, ttl in self._window_keys(now):
+            pipe.expire(key, ttl)
+        pipe.set(READY_KEY, 1)
+        pipe.execute()
+        return {"users": users, "challenges": len(built) - 3}
+
+    @staticmethod
+    def _window_keys(now: datetime) -> List[Tuple[str, int]]:
+        """Chaves (e TTLs) dos rankings semanal e mensal atuais"""
+        return [(board_key("weekly", now=now), WEEKLY_TTL), (board_key("monthly", now=now), MONTHLY_TTL)]
+
+
+leaderboard_service = LeaderboardService()
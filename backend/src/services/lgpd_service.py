@@ -9,8 +9,9 @@ Implementa funcionalidades de compliance LGPD:
 - Auditoria de acesso
 """
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional
 
 from middleware.logging import log_security_event
 from repositories.lgpd_repository import LGPDRepository
@@ -19,11 +20,36 @@ from repositories.product_repository import ProductRepository
 from repositories.user_repository import UserRepository
 from services.base_service import BaseService
 from services.health_service import HealthService
+from services.order_read_model import order_read_model
 from services.order_service import OrderService
 from services.user_service import UserService
 
 logger = logging.getLogger(__name__)
 
+# Tipos de dados exportáveis e como cada um é montado a partir das seções.
+# Seção 'table:<nome>' = todas as linhas da tabela com user_id do usuário.
+EXPORT_LAYOUT: Dict[str, Any] = {
+    "profile": "profile",
+    "health_data": {
+        "imc_history": "table:imc_calculations",
+        "biological_age_history": "table:biological_age_calculations",
+        "calorie_history": "table:calorie_calculations",
+        "food_diary": "table:food_diary_entries",
+        "exercise_entries": "table:exercise_entries",
+    },
+    "orders": "orders",
+    "activities": "activities",
+    "exercises": {
+        "workout_sessions": "table:workout_sessions",
+        "exercise_logs": "table:exercise_entries",
+    },
+    "goals": "table:user_goals",
+}
+EXPORT_DATA_TYPES = list(EXPORT_LAYOUT.keys())
+
+# Buscas simultâneas por exportação (cada seção é uma requisição independente)
+EXPORT_FETCH_WORKERS = 4
+
 
 class LGPDService(BaseService):
     """
@@ -167,7 +193,10 @@ class LGPDService(BaseService):
 
     def export_user_data(self, user_id: str, data_types: List[str] = None, format: str = "json") -> Dict[str, Any]:
         """
-        Exporta todos os dados do usuário (LGPD).
+        Exporta todos os dados do usuário (LGPD) de forma síncrona.
+
+        Para contas com muito histórico prefira ExportJobService.submit_export,
+        que executa a mesma coleta em background com checkpoint por seção.
 
         Args:
             user_id: ID do usuário
@@ -175,108 +204,11 @@ class LGPDService(BaseService):
             format: Formato ('json', 'csv', 'pdf')
         """
         try:
-            if data_types is None or "all" in data_types:
-                data_types = ["profile", "health_data", "orders", "activities", "exercises", "goals"]
-
-            export_data = {}
-
-            if "profile" in data_types:
-                profile = self.user_repo.find_by_id(user_id)
-                export_data["profile"] = profile if profile else {}
-
-            # Dados de saúde
-            if "health_data" in data_types:
-                health_data = {
-                    "imc_history": self._get_health_history(user_id, "imc_calculations"),
-                    "biological_age_history": self._get_health_history(user_id, "biological_age_calculations"),
-                    "calorie_history": self._get_health_history(user_id, "calorie_calculations"),
-                    "food_diary": self._get_table_data(user_id, "food_diary_entries"),
-                    "exercise_entries": self._get_table_data(user_id, "exercise_entries"),
-                }
-                export_data["health_data"] = health_data
-
-            if "orders" in data_types:
-                # Inclui order_items e products relacionados para exportação completa
-                orders_data = self.order_repo.find_by_user(user_id, page=1, per_page=1000)
-                orders = orders_data.get("orders", []) if orders_data else []
-                
-                # Enriquecer pedidos com informações completas de produtos
-                enriched_orders = []
-                for order in orders:
-                    enriched_order = {**order}
-                    
-                    # Processar order_items e buscar produtos relacionados
-                    items = order.get("items", []) or order.get("order_items", [])
-                    if items:
-                        # Coletar todos os product_ids únicos
-                        product_ids = list(set([
-                            item.get("product_id") 
-                            for item in items 
-                            if item.get("product_id")
-                        ]))
-                        
-                        # Buscar produtos relacionados
-                        if product_ids:
-                            try:
-                                products = self.product_repo.find_by_ids(product_ids)
-                                products_dict = {p.get("id"): p for p in products if p.get("id")}
-                                
-                                # Enriquecer items com dados do produto
-                                enriched_items = []
-                                for item in items:
-                                    product_id = item.get("product_id")
-                                    enriched_item = {**item}
-                                    
-                                    if product_id and product_id in products_dict:
-                                        enriched_item["product"] = {
-                                            "id": products_dict[product_id].get("id"),
-                                            "name": products_dict[product_id].get("name"),
-                                            "description": products_dict[product_id].get("description"),
-                                            "category": products_dict[product_id].get("category"),
-                                            "price": products_dict[product_id].get("price"),
-                                            "image_url": products_dict[product_id].get("image_url"),
-                                        }
-                                    
-                                    enriched_items.append(enriched_item)
-                                
-                                enriched_order["items"] = enriched_items
-                            except (ValueError, KeyError, AttributeError) as e:
-                                logger.warning(f"Erro ao buscar produtos para exportação LGPD: {str(e)}")
-                                # Continua sem produtos, mas mantém items
-                                enriched_order["items"] = items
-                        else:
-                            enriched_order["items"] = items
-                    else:
-                        enriched_order["items"] = []
-                    
-                    enriched_orders.append(enriched_order)
-                
-                export_data["orders"] = enriched_orders
-
-            if "activities" in data_types:
-                activities_result = self.user_service.get_user_activities(user_id, page=1, per_page=1000)
-                export_data["activities"] = activities_result.get("activities", [])
-
-            # Exercícios e treinos
-            if "exercises" in data_types:
-                exercises = {
-                    "workout_sessions": self._get_table_data(user_id, "workout_sessions"),
-                    "exercise_logs": self._get_table_data(user_id, "exercise_entries"),
-                }
-                export_data["exercises"] = exercises
+            data_types = self.normalize_export_data_types(data_types)
+            sections = self.get_export_sections(data_types)
 
-            # Objetivos
-            if "goals" in data_types:
-                goals = self._get_table_data(user_id, "user_goals")
-                export_data["goals"] = goals
-
-            # Metadata
-            export_data["export_metadata"] = {
-                "exported_at": datetime.utcnow().isoformat(),
-                "user_id": user_id,
-                "data_types": data_types,
-                "format": format,
-            }
+            fetched = self.fetch_export_sections(user_id, sections)
+            export_data = self.assemble_export_data(user_id, data_types, format, fetched)
 
             # Log de auditoria
             self._log_data_access(
@@ -294,6 +226,159 @@ class LGPDService(BaseService):
             self.logger.error(f"Erro ao exportar dados: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
 
+    def normalize_export_data_types(self, data_types: Optional[List[str]]) -> List[str]:
+        """Expande 'all' (ou None) para a lista completa de tipos exportáveis."""
+        if data_types is None or "all" in data_types:
+            return list(EXPORT_DATA_TYPES)
+        return [data_type for data_type in data_types if data_type in EXPORT_LAYOUT]
+
+    def get_export_sections(self, data_types: List[str]) -> List[str]:
+        """
+        Retorna as seções (unidades de busca) necessárias para os tipos pedidos.
+
+        Seções são deduplicadas: 'exercise_entries' aparece em health_data e
+        exercises, mas é buscada uma única vez.
+        """
+        sections = []
+        for data_type in data_types:
+            layout = EXPORT_LAYOUT.get(data_type)
+            if layout is None:
+                continue
+            section_names = layout.values() if isinstance(layout, dict) else [layout]
+            for section in section_names:
+                if section not in sections:
+                    sections.append(section)
+        return sections
+
+    def fetch_export_section(self, user_id: str, section: str) -> Any:
+        """
+        Busca os dados de uma única seção da exportação.
+
+        Args:
+            user_id: ID do usuário
+            section: 'profile', 'orders', 'activities' ou 'table:<nome_tabela>'
+        """
+        if section == "profile":
+            profile = self.user_repo.find_by_id(user_id)
+            return profile if profile else {}
+        if section == "orders":
+            return self._get_orders_for_export(user_id)
+        if section == "activities":
+            activities_result = self.user_service.get_user_activities(user_id, page=1, per_page=1000)
+            return activities_result.get("activities", []) if activities_result else []
+        if section.startswith("table:"):
+            return self._get_table_data(user_id, section.split(":", 1)[1]) or []
+        raise ValueError(f"Seção de exportação desconhecida: {section}")
+
+    def fetch_export_sections(
+        self,
+        user_id: str,
+        sections: List[str],
+        max_workers: int = EXPORT_FETCH_WORKERS,
+        on_section_done: Optional[Callable[[str, Any], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Busca várias seções em paralelo (I/O bound, uma requisição PostgREST cada).
+
+        Args:
+            user_id: ID do usuário
+            sections: Seções a buscar
+            max_workers: Número máximo de buscas simultâneas
+            on_section_done: Callback chamado com (seção, dados) assim que cada
+                seção termina - usado para checkpoint de jobs de exportação
+
+        Returns:
+            Dict {seção: dados}
+        """
+        fetched: Dict[str, Any] = {}
+        if not sections:
+            return fetched
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sections)))) as executor:
+            futures = {
+                executor.submit(self.fetch_export_section, user_id, section): section for section in sections
+            }
+            for future in as_completed(futures):
+                section = futures[future]
+                data = future.result()
+                fetched[section] = data
+                if on_section_done:
+                    on_section_done(section, data)
+
+        return fetched
+
+    def assemble_export_data(
+        self, user_id: str, data_types: List[str], format: str, fetched: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Monta o documento final de exportação a partir das seções buscadas."""
+        export_data: Dict[str, Any] = {}
+        for data_type in data_types:
+            layout = EXPORT_LAYOUT.get(data_type)
+            if isinstance(layout, dict):
+                export_data[data_type] = {key: fetched.get(section, []) for key, section in layout.items()}
+            elif layout is not None:
+                export_data[data_type] = fetched.get(layout, {} if layout == "profile" else [])
+
+        export_data["export_metadata"] = {
+            "exported_at": datetime.utcnow().isoformat(),
+            "user_id": user_id,
+            "data_types": data_types,
+            "format": format,
+        }
+        return export_data
+
+    def _get_orders_for_export(self, user_id: str) -> List[Dict[str, Any]]:
+        """Busca pedidos do usuário enriquecidos com os produtos de cada item."""
+        # Todo o histórico, por cursor, já com os itens de cada pedido
+        orders = list(order_read_model.iter_orders(user_id))
+
+        # Coletar todos os product_ids únicos de todos os pedidos (uma única busca)
+        product_ids = list(
+            {
+                item.get("product_id")
+                for order in orders
+                for item in (order.get("items", []) or order.get("order_items", []) or [])
+                if item.get("product_id")
+            }
+        )
+
+        products_dict = {}
+        if product_ids:
+            try:
+                products = self.product_repo.find_by_ids(product_ids)
+                products_dict = {p.get("id"): p for p in products if p.get("id")}
+            except (ValueError, KeyError, AttributeError) as e:
+                logger.warning(f"Erro ao buscar produtos para exportação LGPD: {str(e)}")
+                # Continua sem produtos, mas mantém items
+
+        enriched_orders = []
+        for order in orders:
+            enriched_order = {**order}
+            items = order.get("items", []) or order.get("order_items", []) or []
+
+            enriched_items = []
+            for item in items:
+                product_id = item.get("product_id")
+                enriched_item = {**item}
+
+                if product_id and product_id in products_dict:
+                    product = products_dict[product_id]
+                    enriched_item["product"] = {
+                        "id": product.get("id"),
+                        "name": product.get("name"),
+                        "description": product.get("description"),
+                        "category": product.get("category"),
+                        "price": product.get("price"),
+                        "image_url": product.get("image_url"),
+                    }
+
+                enriched_items.append(enriched_item)
+
+            enriched_order["items"] = enriched_items
+            enriched_orders.append(enriched_order)
+
+        return enriched_orders
+
     # ============================================================
     # EXCLUSÃO E ANONIMIZAÇÃO
     # ============================================================
@@ -358,8 +443,7 @@ class LGPDService(BaseService):
             # Dados agregados antes de anonimizar
             stats = {"total_orders": 0, "total_health_records": 0, "account_created_at": None, "last_login": None}
 
-            orders_result = self.order_service.get_user_orders(user_id, page=1, per_page=1)
-            stats["total_orders"] = orders_result.get("pagination", {}).get("total", 0)
+            stats["total_orders"] = self.order_repo.count(filters={"user_id": user_id})
 
             anonymized_email = f"deleted_{user_id[:8]}@deleted.local"
             self.user_service.update_user_profile(
@@ -483,4 +567,3 @@ class LGPDService(BaseService):
         except Exception as e:
             self.logger.warning(f"Erro ao buscar {table_name}: {str(e)}")
             return []
-turn []
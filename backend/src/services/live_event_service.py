@@ -0,0 +1,522 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline de Eventos de Live Streaming RE-EDUCA Store.
+
+Mensagens, presentes e curtidas do chat de uma transmissão não esperam o
+banco:
+- Aceite: um script Lua (uma ida ao Redis) aplica o modo lento por usuário
+  e o limite de eventos por segundo da sala e faz XADD no Redis Stream da
+  transmissão (live:events:{stream_id}). O WebSocketService transmite o
+  evento para a sala logo em seguida.
+- Gravação (write-behind): workers/live_event_worker.py lê os streams com um
+  consumer group e grava em lote com insert_stream_events (migração 041);
+  só depois confirma (XACK) e remove as entradas. Entradas de um worker que
+  caiu são reivindicadas (XAUTOCLAIM) por outro. O stream não é cortado por
+  MAXLEN (descartaria eventos ainda não gravados): como as entradas gravadas
+  são removidas, XLEN é o atraso do worker, e acima de STREAM_MAX_BACKLOG a
+  sala deixa de aceitar eventos até o worker alcançar.
+- Contadores: curtidas ficam em sets por mensagem (SADD/SREM atômicos) e
+  presentes em um hash por transmissão; o worker envia os totais alterados
+  para a sala (stream_counters) a cada TICK_SECONDS, em vez de um evento por
+  curtida.
+
+Sem Redis, mensagens e presentes são gravados na hora (sem limites).
+"""
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from repositories.live_streaming_repository import LiveStreamingRepository
+from repositories.user_repository import UserRepository
+from services.base_service import BaseService
+from services.cache_service import cache_service
+from services.realtime_service import realtime_service
+
+logger = logging.getLogger(__name__)
+
+EVENTS_KEY = "live:events:{stream_id}"
+EVENT_STREAMS_KEY = "live:event_streams"
+SETTINGS_KEY = "live:settings:{stream_id}"
+ROOM_RATE_KEY = "live:rate:{stream_id}"
+USER_SLOW_KEY = "live:slow:{stream_id}:{user_id}"
+LIKES_KEY = "live:likes:{message_id}"
+DIRTY_LIKES_KEY = "live:dirty_likes:{stream_id}"
+GIFT_TOTALS_KEY = "live:gifts:{stream_id}"
+DIRTY_STREAMS_KEY = "live:dirty_streams"
+TOTAL_MESSAGES_KEY = "ws:total_messages"
+
+CONSUMER_GROUP = "live_persist"
+# Entradas ainda não gravadas por transmissão antes de recusar novos eventos
+STREAM_MAX_BACKLOG = 100000
+ROOM_RATE_LIMIT = 5000
+MIN_MESSAGE_INTERVAL_MS = 300
+MAX_MESSAGE_LENGTH = 500
+MAX_SLOW_MODE_SECONDS = 300
+COUNTERS_TTL = 86400
+IDLE_STREAM_SECONDS = 86400
+TICK_SECONDS = 1.0
+NAME_TTL = 300
+NAME_CACHE_SIZE = 10000
+
+# Aceite de um evento: modo lento do usuário (só mensagens), atraso do
+# worker (XLEN), limite por segundo da sala (janela fixa) e XADD no stream
+# da transmissão. Retorna {1, id da entrada}, {0, espera em ms} ou
+# {-1, espera em ms} com o stream cheio.
+_ACCEPT = """
+local slow = tonumber(redis.call('HGET', KEYS[4], 'slow_mode') or '0')
+if ARGV[5] == '1' then
+    local wait = redis.call('PTTL', KEYS[2])
+    if wait > 0 then
+        return {0, wait}
+    end
+end
+if redis.call('XLEN', KEYS[1]) >= tonumber(ARGV[2]) then
+    return {-1, 1000}
+end
+local limit = tonumber(redis.call('HGET', KEYS[4], 'rate_limit') or ARGV[3])
+local count = redis.call('INCR', KEYS[3])
+if count == 1 then
+    redis.call('PEXPIRE', KEYS[3], 1000)
+end
+if count > limit then
+    return {0, math.max(redis.call('PTTL', KEYS[3]), 1)}
+end
+if ARGV[5] == '1' then
+    redis.call('SET', KEYS[2], '1', 'PX', math.max(slow * 1000, tonumber(ARGV[4])))
+end
+local id = redis.call('XADD', KEYS[1], '*', 'data', ARGV[6])
+redis.call('ZADD', KEYS[5], ARGV[1], KEYS[1])
+redis.call('INCR', KEYS[6])
+return {1, id}
+"""
+
+# Curtir/descurtir: alterna o usuário no set da mensagem e marca a mensagem
+# e a transmissão para o próximo envio de contadores.
+_TOGGLE_LIKE = """
+local liked = 1
+if redis.call('SREM', KEYS[1], ARGV[1]) == 1 then
+    liked = 0
+else
+    redis.call('SADD', KEYS[1], ARGV[1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('SADD', KEYS[2], ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+redis.call('SADD', KEYS[3], ARGV[3])
+return {liked, redis.call('SCARD', KEYS[1])}
+"""
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class LiveEventService(BaseService):
+    """Aceite, contadores e gravação em lote de eventos de live."""
+
+    def __init__(self):
+        """Inicializa o pipeline de eventos de live."""
+        super().__init__()
+        self.repo = LiveStreamingRepository()
+        self.user_repo = UserRepository()
+        self._names: Dict[str, Tuple[str, float]] = {}
+        self._groups = set()
+
+    @property
+    def redis(self):
+        """Cliente Redis compartilhado (None se indisponível)"""
+        return cache_service.redis_client
+
+    # =====================================================
+    # ACEITE
+    # =====================================================
+
+    def publish_message(self, stream_id: str, user_id: str, message: str) -> Dict[str, Any]:
+        """
+        Aceita uma mensagem do chat de uma transmissão.
+
+        Args:
+            stream_id: ID da transmissão
+            user_id: Autor
+            message: Texto (até MAX_MESSAGE_LENGTH caracteres)
+
+        Returns:
+            Dict com success e event (pronto para transmitir à sala), ou
+            error e retry_after_ms quando o limite foi atingido
+        """
+        try:
+            message = (message or "").strip()
+            if not message:
+                return {"success": False, "error": "Mensagem é obrigatória"}
+            if len(message) > MAX_MESSAGE_LENGTH:
+                return {"success": False, "error": f"Mensagem deve ter até {MAX_MESSAGE_LENGTH} caracteres"}
+            event = {
+                "type": "message",
+                "id": str(uuid.uuid4()),
+                "stream_id": str(uuid.UUID(str(stream_id))),
+                "user_id": user_id,
+                "username": self._display_name(user_id),
+                "message": message,
+                "created_at": _now_iso(),
+            }
+            return self._accept(event, slow_mode=True)
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {"success": False, "error": "Transmissão inválida"}
+        except Exception as e:
+            return self._handle_error(e, "Erro ao enviar mensagem")
+
+    def publish_gift(
+        self, stream_id: str, user_id: str, gift_id: str, gift_name: Optional[str] = None, gift_cost: Any = 0
+    ) -> Dict[str, Any]:
+        """
+        Aceita um presente (sem modo lento, sujeito ao limite da sala).
+
+        Args:
+            stream_id: ID da transmissão
+            user_id: Quem enviou
+            gift_id: Identificador do presente
+            gift_name: Nome exibido (padrão: gift_id)
+            gift_cost: Valor em moedas (inteiro >= 0)
+
+        Returns:
+            Dict com success e event, ou error
+        """
+        try:
+            gift_cost = int(float(gift_cost or 0))
+            if not gift_id or gift_cost < 0:
+                return {"success": False, "error": "Presente inválido"}
+            event = {
+                "type": "gift",
+                "id": str(uuid.uuid4()),
+                "stream_id": str(uuid.UUID(str(stream_id))),
+                "user_id": user_id,
+                "username": self._display_name(user_id),
+                "gift_id": str(gift_id),
+                "gift_name": str(gift_name or gift_id),
+                "gift_cost": gift_cost,
+                "created_at": _now_iso(),
+            }
+            result = self._accept(event, slow_mode=False)
+            if result.get("success") and self.redis:
+                totals_key = GIFT_TOTALS_KEY.format(stream_id=event["stream_id"])
+                pipe = self.redis.pipeline()
+                pipe.hincrby(totals_key, "count", 1)
+                pipe.hincrby(totals_key, "value", gift_cost)
+                pipe.expire(totals_key, COUNTERS_TTL)
+                pipe.sadd(DIRTY_STREAMS_KEY, event["stream_id"])
+                pipe.execute()
+            return result
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {"success": False, "error": "Presente inválido"}
+        except Exception as e:
+            return self._handle_error(e, "Erro ao enviar presente")
+
+    def _accept(self, event: Dict[str, Any], slow_mode: bool) -> Dict[str, Any]:
+        """Aplica os limites e adiciona o evento ao stream da transmissão (uma ida ao Redis)"""
+        redis = self.redis
+        stream_id, user_id = event["stream_id"], event["user_id"]
+        if not redis:
+            messages, gifts = ([event], []) if event["type"] == "message" else ([], [event])
+            if self.repo.insert_events(*self._rows(messages, gifts)) is None:
+                return {"success": False, "error": "Erro ao gravar evento"}
+            return {"success": True, "event": event}
+
+        accepted, value = redis.eval(
+            _ACCEPT,
+            6,
+            EVENTS_KEY.format(stream_id=stream_id),
+            USER_SLOW_KEY.format(stream_id=stream_id, user_id=user_id),
+            ROOM_RATE_KEY.format(stream_id=stream_id),
+            SETTINGS_KEY.format(stream_id=stream_id),
+            EVENT_STREAMS_KEY,
+            TOTAL_MESSAGES_KEY,
+            int(time.time() * 1000),
+            STREAM_MAX_BACKLOG,
+            ROOM_RATE_LIMIT,
+            MIN_MESSAGE_INTERVAL_MS,
+            "1" if slow_mode else "0",
+            json.dumps(event),
+        )
+        if int(accepted) < 0:
+            self.logger.warning(f"Stream da transmissão {stream_id} com {STREAM_MAX_BACKLOG} eventos não gravados")
+            return {"success": False, "error": "Chat temporariamente indisponível", "retry_after_ms": int(value)}
+        if not int(accepted):
+            return {"success": False, "error": "Aguarde para enviar novamente", "retry_after_ms": int(value)}
+        return {"success": True, "event": event}
+
+    def _display_name(self, user_id: str) -> str:
+        """Nome do usuário para o chat (cache em memória, NAME_TTL segundos)"""
+        cached = self._names.get(user_id)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        user = self.user_repo.find_by_id(user_id) or {}
+        name = user.get("name") or "Usuário"
+        if len(self._names) >= NAME_CACHE_SIZE:
+            self._names.clear()
+        self._names[user_id] = (name, time.monotonic() + NAME_TTL)
+        return name
+
+    # =====================================================
+    # CURTIDAS E CONFIGURAÇÃO
+    # =====================================================
+
+    def toggle_like(self, stream_id: str, message_id: str, user_id: str) -> Dict[str, Any]:
+        """
+        Curte ou descurte uma mensagem do chat.
+
+        A sala recebe o total no próximo stream_counters.
+
+        Returns:
+            Dict com success, liked e likes_count
+        """
+        redis = self.redis
+        if not redis:
+            return {"success": False, "error": "Serviço de cache indisponível"}
+        try:
+            liked, count = redis.eval(
+                _TOGGLE_LIKE,
+                3,
+                LIKES_KEY.format(message_id=message_id),
+                DIRTY_LIKES_KEY.format(stream_id=stream_id),
+                DIRTY_STREAMS_KEY,
+                user_id,
+                message_id,
+                stream_id,
+                COUNTERS_TTL,
+            )
+            return {"success": True, "liked": bool(int(liked)), "likes_count": int(count)}
+        except Exception as e:
+            return self._handle_error(e, "Erro ao curtir mensagem")
+
+    def set_slow_mode(self, stream_id: str, user_id: str, seconds: int) -> Dict[str, Any]:
+        """
+        Define o modo lento da sala (intervalo mínimo entre mensagens de um usuário).
+
+        Args:
+            stream_id: ID da transmissão
+            user_id: Quem altera (precisa ser o dono da transmissão)
+            seconds: Intervalo em segundos (0 desativa)
+        """
+        redis = self.redis
+        if not redis:
+            return {"success": False, "error": "Serviço de cache indisponível"}
+        try:
+            stream = self.repo.find_by_id(str(uuid.UUID(str(stream_id))))
+            if not stream or stream.get("user_id") != user_id:
+                return {"success": False, "error": "Sem permissão para moderar esta transmissão"}
+            seconds = int(seconds)
+            if not 0 <= seconds <= MAX_SLOW_MODE_SECONDS:
+                return {"success": False, "error": f"Modo lento deve estar entre 0 e {MAX_SLOW_MODE_SECONDS} segundos"}
+            key = SETTINGS_KEY.format(stream_id=stream_id)
+            pipe = redis.pipeline()
+            pipe.hset(key, "slow_mode", seconds)
+            pipe.expire(key, COUNTERS_TTL)
+            pipe.execute()
+            realtime_service.emit_to_room(
+                f"stream_{stream_id}", "slow_mode_changed", {"stream_id": stream_id, "slow_mode": seconds}
+            )
+            return {"success": True, "slow_mode": seconds}
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {"success": False, "error": "Modo lento inválido"}
+        except Exception as e:
+            return self._handle_error(e, "Erro ao definir modo lento")
+
+    def flush_counters(self) -> int:
+        """
+        Envia para cada sala os contadores alterados desde o último envio.
+
+        Returns:
+            Número de salas atualizadas
+        """
+        redis = self.redis
+        if not redis:
+            return 0
+        pipe = redis.pipeline()
+        pipe.smembers(DIRTY_STREAMS_KEY)
+        pipe.delete(DIRTY_STREAMS_KEY)
+        stream_ids = sorted(pipe.execute()[0] or [])
+        if not stream_ids:
+            return 0
+
+        pipe = redis.pipeline()
+        for stream_id in stream_ids:
+            pipe.smembers(DIRTY_LIKES_KEY.format(stream_id=stream_id))
+            pipe.delete(DIRTY_LIKES_KEY.format(stream_id=stream_id))
+            pipe.hgetall(GIFT_TOTALS_KEY.format(stream_id=stream_id))
+        results = pipe.execute()
+
+        changes = []
+        pipe = redis.pipeline()
+        for position, stream_id in enumerate(stream_ids):
+            message_ids = sorted(results[position * 3] or [])
+            gifts = results[position * 3 + 2] or {}
+            changes.append((stream_id, message_ids, gifts))
+            for message_id in message_ids:
+                pipe.scard(LIKES_KEY.format(message_id=message_id))
+        counts = iter(pipe.execute())
+
+        for stream_id, message_ids, gifts in changes:
+            realtime_service.emit_to_room(
+                f"stream_{stream_id}",
+                "stream_counters",
+                {
+                    "stream_id": stream_id,
+                    "likes": {message_id: int(next(counts)) for message_id in message_ids},
+                    "gifts": {"count": int(gifts.get("count") or 0), "value": int(gifts.get("value") or 0)},
+                },
+            )
+        return len(stream_ids)
+
+    # =====================================================
+    # GRAVAÇÃO (consumer group)
+    # =====================================================
+
+    def read_events(
+        self, consumer: str, count: int, block_ms: Optional[int] = None, pending: bool = False
+    ) -> Optional[List[Tuple[str, List[Tuple[str, Dict[str, str]]]]]]:
+        """
+        Lê eventos dos streams ativos pelo consumer group.
+
+        Args:
+            consumer: Nome deste consumidor
+            count: Máximo de eventos por stream
+            block_ms: Espera por eventos novos (None = não espera)
+            pending: Relê as entradas pendentes deste consumidor (falhas e
+                entradas reivindicadas) em vez das novas
+
+        Returns:
+            Lista de (chave do stream, [(id da entrada, campos)]), ou None se
+            não há transmissões com eventos
+        """
+        redis = self.redis
+        if not redis:
+            return None
+        keys = redis.zrangebyscore(EVENT_STREAMS_KEY, "-inf", "+inf")
+        if not keys:
+            return None
+        for key in keys:
+            self._ensure_group(key)
+        streams = {key: "0" if pending else ">" for key in keys}
+        try:
+            entries = redis.xreadgroup(
+                CONSUMER_GROUP, consumer, streams, count=count, block=None if pending else block_ms
+            )
+        except Exception as e:
+            # Stream removido e recriado (purge_idle_streams em outro worker): recria os grupos na próxima leitura
+            if "NOGROUP" not in str(e):
+                raise
+            self._groups.clear()
+            return []
+        return [(key, items) for key, items in entries or [] if items]
+
+    def _ensure_group(self, key: str):
+        if key in self._groups:
+            return
+        try:
+            self.redis.xgroup_create(key, CONSUMER_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._groups.add(key)
+
+    def persist(self, entries: List[Tuple[str, List[Tuple[str, Dict[str, str]]]]]) -> Optional[Dict[str, int]]:
+        """
+        Grava um lote lido por read_events e confirma as entradas.
+
+        Returns:
+            Dict com messages e gifts gravados, ou None (entradas continuam
+            pendentes e são relidas)
+        """
+        messages, gifts = [], []
+        for _, items in entries:
+            for _, fields in items:
+                try:
+                    event = json.loads(fields.get("data") or "{}")
+                except ValueError:
+                    continue
+                if event.get("type") == "message":
+                    messages.append(event)
+                elif event.get("type") == "gift":
+                    gifts.append(event)
+
+        stats = {"messages": 0, "gifts": 0}
+        if messages or gifts:
+            stats = self.repo.insert_events(*self._rows(messages, gifts))
+            if stats is None:
+                return None
+
+        pipe = self.redis.pipeline()
+        for key, items in entries:
+            ids = [entry_id for entry_id, _ in items]
+            pipe.xack(key, CONSUMER_GROUP, *ids)
+            pipe.xdel(key, *ids)
+        pipe.execute()
+        return stats
+
+    @staticmethod
+    def _rows(
+        messages: List[Dict[str, Any]], gifts: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Colunas de stream_messages e stream_gifts a partir dos eventos"""
+        message_rows = [
+            {key: event[key] for key in ("id", "stream_id", "user_id", "message", "created_at")} for event in messages
+        ]
+        gift_rows = [
+            {
+                key: event[key]
+                for key in ("id", "stream_id", "user_id", "gift_id", "gift_name", "gift_cost", "created_at")
+            }
+            for event in gifts
+        ]
+        return message_rows, gift_rows
+
+    def claim_stale(self, consumer: str, min_idle_ms: int, count: int) -> int:
+        """
+        Reivindica entradas pendentes de consumidores parados há min_idle_ms.
+
+        Returns:
+            Número de entradas reivindicadas (relidas por read_events(pending=True))
+        """
+        redis = self.redis
+        if not redis:
+            return 0
+        claimed = 0
+        for key in redis.zrangebyscore(EVENT_STREAMS_KEY, "-inf", "+inf"):
+            self._ensure_group(key)
+            result = redis.xautoclaim(key, CONSUMER_GROUP, consumer, min_idle_ms, start_id="0-0", count=count)
+            claimed += len(result[1]) if result and len(result) > 1 else 0
+        return claimed
+
+    def purge_idle_streams(self) -> int:
+        """
+        Esquece streams de transmissões sem eventos há IDLE_STREAM_SECONDS.
+
+        Streams ainda com entradas (não gravadas) são mantidos.
+
+        Returns:
+            Número de streams removidos
+        """
+        redis = self.redis
+        if not redis:
+            return 0
+        cutoff = int((time.time() - IDLE_STREAM_SECONDS) * 1000)
+        removed = 0
+        for key in redis.zrangebyscore(EVENT_STREAMS_KEY, "-inf", cutoff):
+            if redis.xlen(key):
+                continue
+            pipe = redis.pipeline()
+            pipe.delete(key)
+            pipe.zrem(EVENT_STREAMS_KEY, key)
+            pipe.execute()
+            self._groups.discard(key)
+            removed += 1
+        return removed
+
+
+live_events = LiveEventService()
@@ -1,53 +1,114 @@
 """
 Service para mensagens diretas.
+
+- Envio: a mensagem recebe id e created_at aqui, é entregue na hora pelo
+  Socket.IO (evento direct_message na sala de remetente e destinatário) e
+  gravada depois (write-behind) por workers/direct_message_worker.py, em
+  lotes. Sem fila, é gravada na hora.
+- Caixa de entrada: uma consulta ao índice direct_conversations (última
+  mensagem e não lidas por participante, migração 040), paginada por cursor.
+- Histórico: paginação keyset por (created_at, id); cada página vem em ordem
+  cronológica e next_cursor aponta para as mensagens mais antigas.
+- Confirmação de leitura: uma instrução marca a conversa inteira (ou até
+  up_to) e o remetente recebe um único evento messages_read. A marca de
+  leitura fica na conversa, então mensagens ainda na fila e criadas até ela
+  são gravadas como lidas.
+
+Uma mensagem recém-enviada pode levar alguns instantes para aparecer no
+histórico e na caixa de entrada lidos do banco; os clientes conectados já a
+receberam pelo Socket.IO.
 """
 
 import logging
-from typing import Any, Dict
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
 
 from repositories.messages_repository import MessagesRepository
+from repositories.user_repository import UserRepository
+from services.notification_service import notification_service
+from services.queue_service import QueueNames, queue_service
+from services.realtime_service import realtime_service
+from utils.cursors import decode_cursor, encode_cursor, score_to_iso, to_score
 
 logger = logging.getLogger(__name__)
 
+MAX_PAGE_SIZE = 100
+
 
 class MessagesService:
     """Service para mensagens diretas"""
 
     def __init__(self):
         self.repo = MessagesRepository()
+        self.user_repo = UserRepository()
 
-    def get_conversations(self, user_id: str) -> Dict[str, Any]:
-        """Lista conversas do usuário"""
+    def get_conversations(self, user_id: str, cursor: Optional[str] = None, limit: int = 50) -> Dict[str, Any]:
+        """
+        Lista conversas do usuário (mais recentes primeiro).
+
+        Args:
+            user_id: ID do usuário
+            cursor: next_cursor da página anterior
+            limit: Conversas por página
+        """
         try:
-            conversations = self.repo.get_conversations(user_id)
-            return {"success": True, "conversations": conversations}
+            limit = max(1, min(limit, MAX_PAGE_SIZE))
+            position = decode_cursor(cursor)
+            before = (score_to_iso(position[0]), position[1]) if position else None
+            conversations = self.repo.get_conversations(user_id, limit, before)
+            next_cursor = None
+            if len(conversations) == limit:
+                last = conversations[-1]
+                next_cursor = encode_cursor(to_score(last["last_message_at"]), last["user_id"])
+            return {"success": True, "conversations": conversations, "next_cursor": next_cursor}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return {"success": False, "error": str(e)}
         except Exception as e:
             logger.error(f"Erro ao buscar conversas: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
 
-    def get_messages(self, user_id: str, other_user_id: str, limit: int = 50) -> Dict[str, Any]:
-        """Busca mensagens entre dois usuários"""
+    def get_messages(
+        self, user_id: str, other_user_id: str, limit: int = 50, cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Busca mensagens entre dois usuários.
+
+        Args:
+            user_id: ID do usuário
+            other_user_id: ID do outro usuário
+            limit: Mensagens por página
+            cursor: next_cursor da página anterior (mensagens mais antigas)
+
+        Returns:
+            Dict com messages (ordem cronológica) e next_cursor
+        """
         try:
-            messages = self.repo.get_messages(user_id, other_user_id, limit)
-            return {"success": True, "messages": messages}
+            limit = max(1, min(limit, MAX_PAGE_SIZE))
+            position = decode_cursor(cursor)
+            before = (score_to_iso(position[0]), position[1]) if position else None
+            messages = self.repo.get_messages(user_id, other_user_id, limit, before)
+            next_cursor = None
+            if len(messages) == limit:
+                next_cursor = encode_cursor(to_score(messages[-1]["created_at"]), messages[-1]["id"])
+            messages.reverse()
+            return {"success": True, "messages": messages, "next_cursor": next_cursor}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return {"success": False, "error": str(e)}
         except Exception as e:
             logger.error(f"Erro ao buscar mensagens: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
 
     def send_message(
-        self, sender_id: str, recipient_id: str, content: str, 
-        attachment_url: str = None, attachment_type: str = None, 
+        self, sender_id: str, recipient_id: str, content: str,
+        attachment_url: str = None, attachment_type: str = None,
         attachment_filename: str = None, attachment_size: int = None
     ) -> Dict[str, Any]:
         """
         Envia mensagem com suporte a anexos.
-        
+
         Args:
             sender_id: ID do remetente
             recipient_id: ID do destinatário
@@ -66,19 +127,44 @@ class MessagesService:
                 if not attachment_url:
                     return {"success": False, "error": "Conteúdo da mensagem ou anexo é obrigatório"}
 
-            message = self.repo.create_message(
-                sender_id, recipient_id, content.strip() if content else "",
-                attachment_url, attachment_type, attachment_filename, attachment_size
-            )
-
-            if message:
-                return {"success": True, "message": message}
-            else:
-                return {"success": False, "error": "Erro ao enviar mensagem"}
+            try:
+                recipient_id = str(uuid.UUID(str(recipient_id)))
+            except ValueError:
+                return {"success": False, "error": "Destinatário inválido"}
+            # O worker descarta mensagens para usuários inexistentes: validar antes de confirmar
+            if not self.user_repo.exists(recipient_id):
+                return {"success": False, "error": "Destinatário não encontrado"}
+
+            message = {
+                "id": str(uuid.uuid4()),
+                "sender_id": sender_id,
+                "recipient_id": recipient_id,
+                "content": content.strip() if content else "",
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "read_at": None,
+            }
+            if attachment_url:
+                message.update(
+                    attachment_url=attachment_url,
+                    attachment_type=attachment_type,
+                    attachment_filename=attachment_filename,
+                    attachment_size=int(attachment_size) if attachment_size else None,
+                )
+
+            # Write-behind: gravação em lote pelo worker; sem fila, grava na hora
+            if not queue_service.enqueue_task(QueueNames.DIRECT_MESSAGES, message, priority=1):
+                if not self.repo.insert_messages([message]):
+                    return {"success": False, "error": "Erro ao enviar mensagem"}
+
+            notification_service.adjust_badges(recipient_id, messages=1)
+            realtime_service.emit_to_user(recipient_id, "direct_message", message)
+            # Outras conexões do remetente (abas, aplicativo)
+            realtime_service.emit_to_user(sender_id, "direct_message", message)
+            return {"success": True, "message": message}
 
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return {"success": False, "error": str(e)}
         except Exception as e:
             logger.error(f"Erro ao enviar mensagem: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
@@ -86,38 +172,78 @@ class MessagesService:
     def mark_message_read(self, message_id: str, user_id: str) -> Dict[str, Any]:
         """Marca mensagem como lida"""
         try:
-            success = self.repo.mark_as_read(message_id, user_id)
+            receipts = self.repo.mark_read(user_id, message_id=message_id)
+            success = self._apply_receipts(user_id, receipts) > 0
             return {
                 "success": success,
                 "message": "Mensagem marcada como lida" if success else "Erro ao marcar como lida",
             }
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return {"success": False, "error": str(e)}
         except Exception as e:
             logger.error(f"Erro ao marcar como lida: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
 
-    def mark_conversation_read(self, user_id: str, other_user_id: str) -> Dict[str, Any]:
-        """Marca todas as mensagens de uma conversa como lidas"""
+    def mark_conversation_read(self, user_id: str, other_user_id: str, up_to: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Marca as mensagens de uma conversa como lidas (uma instrução).
+
+        Args:
+            user_id: ID do usuário que leu
+            other_user_id: ID do outro usuário
+            up_to: Data (ISO) da última mensagem vista; padrão: todas
+        """
         try:
-            count = self.repo.mark_conversation_as_read(user_id, other_user_id)
+            receipts = self.repo.mark_read(user_id, other_user_id=other_user_id, up_to=up_to)
+            if receipts is None:
+                return {"success": False, "error": "Erro ao marcar conversa como lida"}
+            count = self._apply_receipts(user_id, receipts)
             return {"success": True, "count": count, "message": f"{count} mensagens marcadas como lidas"}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return {"success": False, "error": str(e)}
         except Exception as e:
             logger.error(f"Erro ao marcar conversa como lida: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
 
+    def _apply_receipts(self, user_id: str, receipts: Optional[List[Dict[str, Any]]]) -> int:
+        """Atualiza o contador do leitor e avisa cada remetente uma vez; retorna o total lido"""
+        total = 0
+        for receipt in receipts or []:
+            count = int(receipt.get("read_count") or 0)
+            if not count:
+                continue
+            total += count
+            realtime_service.emit_to_user(
+                str(receipt["sender_id"]),
+                "messages_read",
+                {"reader_id": user_id, "read_count": count, "read_at": receipt.get("read_at")},
+            )
+        if total:
+            notification_service.adjust_badges(user_id, messages=-total)
+        return total
+
+    def persist_messages(self, messages: Iterable[Dict[str, Any]]) -> bool:
+        """
+        Grava um lote de mensagens enviadas (write-behind).
+
+        Args:
+            messages: Mensagens montadas por send_message
+
+        Returns:
+            True se o lote foi gravado (mensagens repetidas são ignoradas)
+        """
+        return self.repo.insert_messages(list(messages)) is not None
+
     def get_unread_count(self, user_id: str) -> Dict[str, Any]:
-        """Retorna número de mensagens não lidas"""
+        """Retorna número de mensagens não lidas (contador em cache, ver NotificationService)"""
         try:
-            count = self.repo.get_unread_count(user_id)
+            count = notification_service.get_badges(user_id)["messages"]
             return {"success": True, "unread_count": count}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
+            return {"success": False, "error": str(e), "unread_count": 0}
         except Exception as e:
             logger.error(f"Erro ao contar mensagens não lidas: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e), "unread_count": 0}
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""
+Serviço de Notificações RE-EDUCA Store.
+
+Pipeline das notificações sociais (curtidas, comentários e seguidores):
+- notify() apenas enfileira o evento (fila social_notifications)
+- workers/notification_worker.py consome a fila em lotes: eventos do mesmo
+  destinatário e grupo (ex.: curtidas no mesmo post) viram um item, e o lote
+  inteiro é gravado com upsert_notifications (migração 037), somando-se à
+  notificação ainda não lida do mesmo grupo
+- O texto é montado na leitura ("Ana e outras 40 pessoas curtiram seu post")
+- Não lidas (notificações e mensagens) ficam no hash badges:{user_id},
+  carregado do banco uma vez e atualizado por deltas; cada mudança é enviada
+  ao cliente pelo Socket.IO (evento badges), sem polling
+
+Sem fila, os eventos são entregues na hora; sem Redis, os contadores são
+lidos do banco.
+"""
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from repositories.messages_repository import MessagesRepository
+from repositories.notification_repository import NotificationRepository
+from services.base_service import BaseService
+from services.cache_service import cache_service
+from services.queue_service import QueueNames, queue_service
+from services.realtime_service import realtime_service
+from services.social_counter_service import _INCREMENT_IF_EXISTS
+from utils.cursors import decode_cursor, encode_cursor, score_to_iso, to_score
+
+logger = logging.getLogger(__name__)
+
+BADGE_KEY = "badges:{user_id}"
+BADGE_FIELDS = ("notifications", "messages")
+BADGE_TTL = 86400
+MAX_ACTORS = 10
+
+# tipo -> (título, ação no singular, ação no plural)
+TEMPLATES = {
+    "like": ("Nova curtida!", "curtiu seu post", "curtiram seu post"),
+    "comment": ("Novo comentário!", "comentou no seu post", "comentaram no seu post"),
+    "follow": ("Novo seguidor!", "começou a te seguir", "começaram a te seguir"),
+}
+
+
+def render_message(notification_type: str, actor_name: Optional[str], actor_count: int) -> str:
+    """
+    Texto de uma notificação agrupada.
+
+    Args:
+        notification_type: like, comment ou follow
+        actor_name: Nome do ator mais recente
+        actor_count: Total de atores do grupo
+
+    Returns:
+        Ex.: "Ana e outras 40 pessoas curtiram seu post"
+    """
+    _, singular, plural = TEMPLATES[notification_type]
+    name = actor_name or "Alguém"
+    others = int(actor_count or 1) - 1
+    if others <= 0:
+        return f"{name} {singular}"
+    if others == 1:
+        return f"{name} e outra pessoa {plural}"
+    return f"{name} e outras {others} pessoas {plural}"
+
+
+def coalesce(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Agrupa eventos por (destinatário, group_key) em itens de upsert_notifications.
+
+    Args:
+        events: Eventos em ordem de chegada
+
+    Returns:
+        Um item por grupo, com os atores mais recentes primeiro
+    """
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for index, event in enumerate(events):
+        group_key = event.get("group_key")
+        key = (event["user_id"], group_key) if group_key else (event["user_id"], index)
+        item = groups.get(key)
+        if item is None:
+            title = TEMPLATES[event["type"]][0]
+            item = groups[key] = {
+                "user_id": event["user_id"],
+                "type": event["type"],
+                "title": title,
+                "message": render_message(event["type"], None, 1),
+                "group_key": group_key,
+                "actor_ids": [],
+                "actor_count": 0,
+            }
+        actor_id = event["actor_id"]
+        if actor_id in item["actor_ids"]:
+            item["actor_ids"].remove(actor_id)
+        else:
+            item["actor_count"] += 1
+        item["actor_ids"].insert(0, actor_id)
+        item["from_user_id"] = actor_id
+        item["data"] = event.get("data") or {}
+
+    items = list(groups.values())
+    for item in items:
+        item["actor_ids"] = item["actor_ids"][:MAX_ACTORS]
+    return items
+
+
+class NotificationService(BaseService):
+    """Notificações sociais agrupadas e contadores de não lidas em tempo real."""
+
+    def __init__(self):
+        """Inicializa o serviço de notificações."""
+        super().__init__()
+        self.repo = NotificationRepository()
+        self.messages_repo = MessagesRepository()
+
+    @property
+    def redis(self):
+        """Cliente Redis compartilhado (None se indisponível)"""
+        return cache_service.redis_client
+
+    # =====================================================
+    # EVENTOS
+    # =====================================================
+
+    def notify(
+        self,
+        user_id: Optional[str],
+        actor_id: str,
+        notification_type: str,
+        data: Dict[str, Any],
+        group_key: Optional[str] = None,
+    ) -> bool:
+        """
+        Enfileira um evento de notificação.
+
+        Args:
+            user_id: Destinatário
+            actor_id: Usuário que gerou o evento
+            notification_type: like, comment ou follow
+            data: Dados exibidos com a notificação (post_id, comment_id...)
+            group_key: Eventos com a mesma chave viram uma notificação
+
+        Returns:
+            True se o evento foi enfileirado ou entregue
+        """
+        if not user_id or not actor_id or user_id == actor_id:
+            return False
+        event = {
+            "user_id": user_id,
+            "actor_id": actor_id,
+            "type": notification_type,
+            "data": data,
+            "group_key": group_key,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        if queue_service.enqueue_task(QueueNames.SOCIAL_NOTIFICATIONS, event, priority=1):
+            return True
+        return self.deliver([event]) is not None
+
+    def notify_like(self, owner_id: Optional[str], actor_id: str, post_id: str, reaction_type: str) -> bool:
+        """Reação em post do usuário"""
+        return self.notify(
+            owner_id, actor_id, "like", {"post_id": post_id, "reaction_type": reaction_type}, f"like:post:{post_id}"
+        )
+
+    def notify_comment(self, owner_id: Optional[str], actor_id: str, post_id: str, comment_id: str) -> bool:
+        """Comentário em post do usuário"""
+        return self.notify(
+            owner_id, actor_id, "comment", {"post_id": post_id, "comment_id": comment_id}, f"comment:post:{post_id}"
+        )
+
+    def notify_follow(self, user_id: str, follower_id: str) -> bool:
+        """Novo seguidor"""
+        return self.notify(user_id, follower_id, "follow", {"follower_id": follower_id}, "follow")
+
+    def deliver(self, events: List[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+        """
+        Grava um lote de eventos e avisa os destinatários.
+
+        Args:
+            events: Eventos enfileirados por notify()
+
+        Returns:
+            Dict com notifications (gravadas) e created (novas não lidas),
+            ou None se a gravação falhou (o lote deve ser reenfileirado)
+        """
+        items = coalesce([event for event in events if event.get("type") in TEMPLATES])
+        if not items:
+            return {"notifications": 0, "created": 0}
+
+        rows = self.repo.upsert_notifications(items)
+        if rows is None:
+            return None
+
+        by_group = {(item["user_id"], item["group_key"]): item for item in items}
+        created = Counter(str(row["user_id"]) for row in rows if row.get("inserted"))
+        for row in rows:
+            item = by_group.get((str(row["user_id"]), row.get("group_key")), {})
+            realtime_service.emit_to_user(
+                str(row["user_id"]),
+                "notification",
+                {
+                    "id": row["id"],
+                    "type": item.get("type"),
+                    "group_key": row.get("group_key"),
+                    "actor_id": item.get("from_user_id"),
+                    "actor_count": row.get("actor_count"),
+                    "data": item.get("data"),
+                    "created": bool(row.get("inserted")),
+                },
+            )
+        self._apply_badges({user_id: {"notifications": count} for user_id, count in created.items()})
+        return {"notifications": len(rows), "created": sum(created.values())}
+
+    # =====================================================
+    # LEITURA
+    # =====================================================
+
+    def get_notifications(
+        self, user_id: str, cursor: Optional[str] = None, limit: int = 20, unread_only: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Lista as notificações do usuário com paginação por cursor.
+
+        Args:
+            user_id: ID do usuário
+            cursor: next_cursor da página anterior
+            limit: Notificações por página
+            unread_only: Se deve retornar apenas não lidas
+
+        Returns:
+            Dict com notifications e next_cursor (None na última página)
+        """
+        before = None
+        if cursor:
+            updated_us, notification_id = decode_cursor(cursor)
+            before = (score_to_iso(updated_us), notification_id)
+
+        rows = self.repo.get_notifications(user_id, limit + 1, before, unread_only)
+        page = rows[:limit]
+        for notification in page:
+            if notification.get("type") in TEMPLATES:
+                actor = notification.get("actor") or {}
+                notification["message"] = render_message(
+                    notification["type"], actor.get("name"), notification.get("actor_count") or 1
+                )
+
+        next_cursor = None
+        if len(rows) > limit and page:
+            last = page[-1]
+            next_cursor = encode_cursor(to_score(last.get("updated_at") or last["created_at"]), last["id"])
+        return {"success": True, "notifications": page, "next_cursor": next_cursor, "limit": limit}
+
+    def mark_read(self, user_id: str, notification_id: str) -> bool:
+        """
+        Marca uma notificação como lida e atualiza o contador.
+
+        Returns:
+            True se a notificação estava não lida
+        """
+        changed = self.repo.mark_read(notification_id, user_id)
+        if changed:
+            self.adjust_badges(user_id, notifications=-1)
+        return changed
+
+    def mark_all_read(self, user_id: str) -> int:
+        """
+        Marca todas as notificações como lidas e zera o contador.
+
+        Returns:
+            Número de notificações atualizadas
+        """
+        count = self.repo.mark_all_read(user_id)
+        if count:
+            self.adjust_badges(user_id, notifications=-count)
+        return count
+
+    # =====================================================
+    # CONTADORES (BADGES)
+    # =====================================================
+
+    def get_badges(self, user_id: str) -> Dict[str, int]:
+        """
+        Não lidas do usuário (uma ida ao Redis; banco só se ausente).
+
+        Args:
+            user_id: ID do usuário
+
+        Returns:
+            Dict {notifications, messages}
+        """
+        key = BADGE_KEY.format(user_id=user_id)
+        if self.redis:
+            try:
+                cached = self.redis.hgetall(key)
+                if cached and all(field in cached for field in BADGE_FIELDS):
+                    return {field: int(cached[field]) for field in BADGE_FIELDS}
+            except Exception as e:
+                self.logger.warning(f"Erro ao ler badges do Redis: {str(e)}")
+
+        notifications = self.repo.count_unread(user_id)
+        badges = {"notifications": notifications or 0, "messages": self.messages_repo.get_unread_count(user_id) or 0}
+        if notifications is not None and self.redis:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.hset(key, mapping=badges)
+                pipe.expire(key, BADGE_TTL)
+                pipe.execute()
+            except Exception as e:
+                self.logger.warning(f"Erro ao gravar badges: {str(e)}")
+        return badges
+
+    def adjust_badges(self, user_id: str, notifications: int = 0, messages: int = 0):
+        """
+        Aplica deltas aos contadores do usuário e envia o novo valor.
+
+        Args:
+            user_id: ID do usuário
+            notifications: Delta de notificações não lidas
+            messages: Delta de mensagens não lidas
+        """
+        self._apply_badges({user_id: {"notifications": notifications, "messages": messages}})
+
+    def _apply_badges(self, deltas: Dict[str, Dict[str, int]]):
+        """
+        Aplica deltas só em contadores já carregados e envia os atualizados.
+
+        Contador ausente é recarregado do banco na próxima leitura (ex.: ao
+        conectar), então usuários que não estão ativos não custam nada.
+        """
+        deltas = {uid: fields for uid, fields in deltas.items() if uid and any(fields.values())}
+        if not deltas or not self.redis:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id, fields in deltas.items():
+                key = BADGE_KEY.format(user_id=user_id)
+                for field, delta in fields.items():
+                    if delta:
+                        pipe.eval(_INCREMENT_IF_EXISTS, 1, key, field, int(delta))
+                pipe.hgetall(key)
+            results = pipe.execute()
+        except Exception as e:
+            self.logger.warning(f"Erro ao atualizar badges: {str(e)}")
+            return
+
+        position = 0
+        for user_id, fields in deltas.items():
+            position += sum(1 for delta in fields.values() if delta)
+            badges = results[position]
+            position += 1
+            if badges and all(field in badges for field in BADGE_FIELDS):
+                realtime_service.emit_to_user(user_id, "badges", {field: int(badges[field]) for field in BADGE_FIELDS})
+
+
+notification_service = NotificationService()
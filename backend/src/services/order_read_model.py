@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Histórico de Pedidos RE-EDUCA Store.
+
+Leitura do histórico de pedidos para a página de pedidos, detalhes,
+rastreamento, nota fiscal, exportação LGPD e recomendações:
+- Uma consulta por página (get_order_history, migração 048) traz os
+  pedidos com os itens embutidos (preço do pedido, nome, imagem e
+  categoria do produto)
+- Paginação por cursor (created_at, id): next_cursor aponta para depois
+  do último pedido da página, sem o custo de OFFSET em históricos longos
+- Páginas e pedidos ficam em um hash por usuário no Redis
+  (ORDER_HISTORY_KEY); mudanças de status/pagamento/rastreamento apagam o
+  hash e mudam ORDER_HISTORY_VERSION_KEY, para que uma leitura em
+  andamento não grave de volta dados antigos
+
+Sem Redis, as leituras vão direto ao banco.
+"""
+
+import base64
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from repositories.order_repository import OrderRepository
+from services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+ORDER_HISTORY_KEY = "orders:history:{user_id}"
+ORDER_HISTORY_VERSION_KEY = "orders:history:version:{user_id}"
+ORDER_HISTORY_TTL = 600
+EXPORT_PAGE_SIZE = 200
+
+# KEYS: histórico, versão; ARGV: versão lida antes do banco, TTL, campo, valor
+# O prazo é definido só na criação do hash: leituras não prolongam dados antigos
+_STORE = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[3], ARGV[4])
+if redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+
+def encode_cursor(order: Dict[str, Any]) -> str:
+    """Cursor que aponta para depois do pedido"""
+    raw = f"{order['created_at']}|{order['id']}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Lê um cursor de encode_cursor.
+
+    Raises:
+        ValueError: Se o cursor é inválido
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, order_id = raw.rsplit("|", 1)
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if not created_at or not order_id:
+        raise ValueError("Cursor inválido")
+    return created_at, order_id
+
+
+class OrderReadModel:
+    """Histórico de pedidos com itens embutidos, em cache por usuário."""
+
+    def __init__(self, repo: Optional[OrderRepository] = None):
+        """Inicializa o histórico de pedidos."""
+        self.logger = logger
+        self.repo = repo or OrderRepository()
+
+    @property
+    def redis(self):
+        return cache_service.redis_client
+
+    def user_orders(
+        self, user_id: str, limit: int = 20, cursor: Optional[str] = None, offset: int = 0
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Página do histórico de um usuário.
+
+        Args:
+            user_id: ID do usuário
+            limit: Pedidos por página
+            cursor: next_cursor da página anterior
+            offset: Offset, só sem cursor (compatibilidade com page/per_page)
+
+        Returns:
+            Dict com orders, next_cursor e has_more, ou None em caso de erro
+
+        Raises:
+            ValueError: Se o cursor é inválido
+        """
+        before = decode_cursor(cursor) if cursor else None
+        field = f"page:{limit}:{cursor or offset}"
+        cached = self._get(user_id, field)
+        if cached is not None:
+            return cached
+
+        version = self._version(user_id)
+        orders = self.repo.find_history(user_id, limit=limit + 1, before=before, offset=0 if before else offset)
+        if orders is None:
+            return None
+
+        has_more = len(orders) > limit
+        page = {
+            "orders": orders[:limit],
+            "next_cursor": encode_cursor(orders[limit - 1]) if has_more else None,
+            "has_more": has_more,
+        }
+        self._store(user_id, field, page, version)
+        return page
+
+    def order(self, order_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Pedido do usuário com itens.
+
+        Args:
+            order_id: ID do pedido
+            user_id: ID do usuário; None busca o pedido de qualquer usuário
+                (admin), sem cache
+
+        Returns:
+            Pedido, ou None se não existe ou é de outro usuário
+        """
+        if user_id is None:
+            orders = self.repo.find_history(None, limit=1, order_id=order_id)
+            return orders[0] if orders else None
+
+        field = f"order:{order_id}"
+        cached = self._get(user_id, field)
+        if cached is not None:
+            return cached
+
+        version = self._version(user_id)
+        orders = self.repo.find_history(user_id, limit=1, order_id=order_id)
+        if not orders:
+            return None
+        self._store(user_id, field, orders[0], version)
+        return orders[0]
+
+    def iter_orders(self, user_id: str, page_size: int = EXPORT_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre todo o histórico do usuário por cursor, sem cache (exportação).
+
+        Raises:
+            RuntimeError: Se uma página não puder ser lida
+        """
+        before = None
+        while True:
+            orders = self.repo.find_history(user_id, limit=page_size, before=before)
+            if orders is None:
+                raise RuntimeError("Erro ao buscar histórico de pedidos")
+            yield from orders
+            if len(orders) < page_size:
+                return
+            before = (orders[-1]["created_at"], orders[-1]["id"])
+
+    def invalidate(self, user_id: Optional[str]):
+        """Descarta o histórico em cache do usuário (pedido criado ou alterado)"""
+        if user_id:
+            self.invalidate_many([user_id])
+
+    def invalidate_many(self, user_ids: Iterable[str]):
+        """Descarta o histórico em cache de vários usuários"""
+        user_ids = [user_id for user_id in set(user_ids) if user_id]
+        try:
+            if not self.redis or not user_ids:
+                return
+            pipe = self.redis.pipeline()
+            for user_id in user_ids:
+                pipe.incr(ORDER_HISTORY_VERSION_KEY.format(user_id=user_id))
+                pipe.expire(ORDER_HISTORY_VERSION_KEY.format(user_id=user_id), ORDER_HISTORY_TTL)
+                pipe.delete(ORDER_HISTORY_KEY.format(user_id=user_id))
+            pipe.execute()
+        except Exception as e:
+            self.logger.warning(f"Erro ao invalidar histórico de pedidos de {len(user_ids)} usuário(s): {str(e)}")
+
+    def _get(self, user_id: str, field: str) -> Optional[Any]:
+        try:
+            if not self.redis:
+                return None
+            value = self.redis.hget(ORDER_HISTORY_KEY.format(user_id=user_id), field)
+            return json.loads(value) if value else None
+        except Exception as e:
+            self.logger.warning(f"Erro ao ler histórico de pedidos do usuário {user_id} do cache: {str(e)}")
+            return None
+
+    def _version(self, user_id: str) -> Optional[str]:
+        try:
+            if not self.redis:
+                return None
+            return self.redis.get(ORDER_HISTORY_VERSION_KEY.format(user_id=user_id)) or "0"
+        except Exception as e:
+            self.logger.warning(f"Erro ao ler versão do histórico do usuário {user_id}: {str(e)}")
+            return None
+
+    def _store(self, user_id: str, field: str, value: Any, version: Optional[str]):
+        try:
+            if not self.redis or version is None:
+                return
+            self.redis.eval(
+                _STORE,
+                2,
+                ORDER_HISTORY_KEY.format(user_id=user_id),
+                ORDER_HISTORY_VERSION_KEY.format(user_id=user_id),
+                version,
+                ORDER_HISTORY_TTL,
+                field,
+                json.dumps(value, default=str),
+            )
+        except Exception as e:
+            self.logger.warning(f"Erro ao gravar histórico de pedidos do usuário {user_id} no cache: {str(e)}")
+
+
+order_read_model = OrderReadModel()
@@ -10,11 +10,18 @@ Gerencia fluxo completo de pedidos incluindo:
 """
 
 import logging
+import time
 from datetime import datetime
 from typing import Any, Dict, Optional
 
 from repositories.order_repository import OrderRepository
 from services.base_service import BaseService
+from services.cart_read_model import cart_read_model
+from services.checkout_service import order_payload_from_quote, verify_quote
+from services.gamification_engine import gamification_engine
+from services.order_read_model import order_read_model
+from services.promotion_engine import promotion_engine
+from services.stock_ledger import stock_ledger
 
 logger = logging.getLogger(__name__)
 
@@ -45,27 +52,42 @@ class OrderService(BaseService):
             self.coupon_service = None
             self.shipping_service = None
 
-    def get_user_orders(self, user_id: str, page: int = 1, per_page: int = 20) -> Dict[str, Any]:
+    def get_user_orders(
+        self, user_id: str, page: int = 1, per_page: int = 20, cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        Retorna pedidos do usuário com paginação.
+        Retorna pedidos do usuário com itens, paginados por cursor.
 
-        Utiliza OrderRepository para acesso a dados seguindo o padrão de arquitetura.
+        Utiliza o histórico de pedidos (services/order_read_model.py): uma
+        consulta por página, em cache por usuário.
 
         Args:
             user_id (str): ID do usuário.
-            page (int): Página (padrão: 1).
+            page (int): Página (padrão: 1), usada só sem cursor.
             per_page (int): Itens por página (padrão: 20).
+            cursor (str): next_cursor da página anterior (opcional).
 
         Returns:
-            Dict[str, Any]: Pedidos paginados ou erro.
+            Dict[str, Any]: Pedidos e pagination (next_cursor, has_more) ou erro.
         """
         try:
-            return self.repo.find_by_user(user_id, page, per_page)
+            history = order_read_model.user_orders(user_id, per_page, cursor=cursor, offset=(page - 1) * per_page)
+            if history is None:
+                raise RuntimeError("Erro ao buscar histórico de pedidos")
+            return {
+                "orders": history["orders"],
+                "pagination": {
+                    "page": page,
+                    "per_page": per_page,
+                    "next_cursor": history["next_cursor"],
+                    "has_more": history["has_more"],
+                },
+            }
         except ValueError as e:
             self.logger.warning(f"Erro de validação ao buscar pedidos: {str(e)}")
             return {
                 "orders": [],
-                "pagination": {"page": page, "per_page": per_page, "total": 0, "pages": 0},
+                "pagination": {"page": page, "per_page": per_page, "next_cursor": None, "has_more": False},
                 "error": "Dados inválidos",
             }
         except (ValueError, KeyError) as e:
@@ -75,15 +97,15 @@ class OrderService(BaseService):
             self.logger.error(f"Erro ao buscar pedidos: {str(e)}", exc_info=True)
             return {
                 "orders": [],
-                "pagination": {"page": page, "per_page": per_page, "total": 0, "pages": 0},
+                "pagination": {"page": page, "per_page": per_page, "next_cursor": None, "has_more": False},
                 "error": "Erro interno do servidor",
             }
 
     def get_order(self, order_id: str, user_id: str) -> Optional[Dict[str, Any]]:
         """
-        Retorna detalhes de um pedido.
-        
-        Utiliza repositório e valida que pedido pertence ao usuário para segurança.
+        Retorna detalhes de um pedido com itens.
+
+        Utiliza o histórico de pedidos; a consulta já filtra pelo usuário.
 
         Args:
             order_id: ID do pedido
@@ -93,12 +115,7 @@ class OrderService(BaseService):
             Dict com dados do pedido ou None se não encontrado/não pertence ao usuário
         """
         try:
-            order = self.repo.find_by_id(order_id)
-
-            # Validação de negócio: verifica se pedido pertence ao usuário
-            if order and order.get("user_id") == user_id:
-                return order
-            return None
+            return order_read_model.order(order_id, user_id)
 
         except ValueError as e:
             self.logger.warning(f"Erro de validação ao buscar pedido: {str(e)}")
@@ -127,9 +144,9 @@ class OrderService(BaseService):
             Dict com success ou error
         """
         try:
-            # Verifica se pedido existe e pertence ao usuário (via método que já valida)
-            order = self.get_order(order_id, user_id)
-            if not order:
+            # Status lido do banco (não do cache): a decisão de cancelar depende dele
+            order = self.repo.find_by_id(order_id, use_cache=False)
+            if not order or order.get("user_id") != user_id:
                 return {"success": False, "error": "Pedido não encontrado"}
 
             if order.get("status") in ["cancelled", "completed"]:
@@ -138,6 +155,7 @@ class OrderService(BaseService):
             updated = self.repo.update(order_id, {"status": "cancelled", "updated_at": datetime.utcnow().isoformat()})
 
             if updated:
+                order_read_model.invalidate(user_id)
                 return {"success": True, "message": "Pedido cancelado com sucesso", "order": updated}
             else:
                 return {"success": False, "error": "Erro ao cancelar pedido"}
@@ -161,16 +179,22 @@ class OrderService(BaseService):
 
         MELHORADO: Agora cria pedido a partir do carrinho, calcula frete e aplica cupom.
 
+        Com quote_token (cotação de CheckoutService.create_quote), confere a
+        assinatura e cria o pedido em uma única chamada ao banco.
+
         Args:
             user_id: ID do usuário
-            data: Dados do pedido (shipping_address, payment_method, coupon_code, etc.)
+            data: Dados do pedido (shipping_address, payment_method, coupon_code, quote_token, etc.)
 
         Returns:
             Dict com success e order ou error
         """
+        if data.get("quote_token"):
+            return self.create_order_from_quote(user_id, data)
+
         try:
-            # Buscar carrinho do usuário
-            cart = self.cart_service.get_cart(user_id)
+            # Buscar carrinho do usuário com os preços atuais (create_order_atomic cobra o preço do item)
+            cart = self.cart_service.get_cart(user_id, use_cache=False)
             cart_items = cart.get("items", [])
 
             # Validar que tem produtos no carrinho
@@ -261,6 +285,9 @@ class OrderService(BaseService):
 
             if result and result.get("success"):
                 # A função SQL já limpou o carrinho e validou estoque
+                stock_ledger.apply_sale(formatted_cart_items)
+                cart_read_model.clear(user_id)
+                order_read_model.invalidate(user_id)
                 order_result = result.get("order")
                 if isinstance(order_result, str):
                     import json
@@ -286,6 +313,63 @@ class OrderService(BaseService):
             self.logger.error(f"Erro ao criar pedido: {str(e)}", exc_info=True)
             return {"success": False, "error": "Erro interno do servidor"}
 
+    def create_order_from_quote(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Cria pedido a partir de uma cotação de checkout assinada.
+
+        Carrinho, desconto e frete vêm da cotação; o banco confere que o
+        carrinho não mudou e reserva o uso do cupom na mesma transação.
+
+        Args:
+            user_id: ID do usuário
+            data: quote_token, payment_method e transaction_id
+
+        Returns:
+            Dict com success, order e timings (ms por etapa), ou error
+            (code=quote_stale quando é preciso recalcular a cotação)
+        """
+        timings: Dict[str, float] = {}
+        try:
+            started = time.perf_counter()
+            try:
+                quote = verify_quote(data["quote_token"], user_id)
+            except ValueError as e:
+                return {"success": False, "error": str(e), "code": "quote_stale"}
+            order_data, cart_items = order_payload_from_quote(quote, data)
+            timings["verify"] = round((time.perf_counter() - started) * 1000, 2)
+
+            started = time.perf_counter()
+            result = self.repo.create_from_quote(user_id, order_data, cart_items)
+            timings["rpc"] = round((time.perf_counter() - started) * 1000, 2)
+            self.logger.info(f"Pedido da cotação {quote.get('qid')}: {timings}")
+
+            if result.get("success"):
+                stock_ledger.apply_sale(cart_items)
+                cart_read_model.clear(user_id)
+                order_read_model.invalidate(user_id)
+                if order_data.get("coupon_code"):
+                    # Uso já reservado no banco; mantém o contador do Redis em dia
+                    promotion_engine.note_use(order_data["coupon_code"])
+                return {
+                    "success": True,
+                    "order": result.get("order"),
+                    "message": "Pedido criado com sucesso",
+                    "timings": timings,
+                }
+            self.logger.warning(f"Pedido da cotação {quote.get('qid')} recusado: {result.get('error')}")
+            return {
+                "success": False,
+                "error": result.get("error", "Erro ao criar pedido"),
+                "code": result.get("code"),
+                "timings": timings,
+            }
+        except (ValueError, KeyError) as e:
+            self.logger.warning(f"Erro de validação ao criar pedido da cotação: {str(e)}")
+            return {"success": False, "error": "Cotação inválida", "code": "quote_stale"}
+        except Exception as e:
+            self.logger.error(f"Erro ao criar pedido da cotação: {str(e)}", exc_info=True)
+            return {"success": False, "error": "Erro interno do servidor"}
+
     def update_order_status(self, order_id: str, status: str, transaction_id: str = None) -> Dict[str, Any]:
         """
         Atualiza status de um pedido.
@@ -309,6 +393,9 @@ class OrderService(BaseService):
             updated = self.repo.update(order_id, update_data)
 
             if updated:
+                order_read_model.invalidate(updated.get("user_id"))
+                if status == "paid":
+                    gamification_engine.publish(updated.get("user_id"), "order_paid", order_id)
                 return {"success": True, "order": updated}
             else:
                 return {"success": False, "error": "Pedido não encontrado"}
@@ -360,6 +447,10 @@ class OrderService(BaseService):
             updated = self.repo.update(order_id, update_data)
 
             if updated:
+                order_read_model.invalidate(updated.get("user_id"))
+                # event_id vem do pedido: webhooks repetidos não contam duas vezes
+                if payment_status == "paid":
+                    gamification_engine.publish(updated.get("user_id"), "order_paid", order_id)
                 return {"success": True, "order": updated}
             else:
                 return {"success": False, "error": "Pedido não encontrado"}
@@ -411,6 +502,7 @@ class OrderService(BaseService):
             updated = self.repo.update(order_id, update_data)
 
             if updated:
+                order_read_model.invalidate(order.get("user_id"))
                 # Criar evento inicial no histórico de rastreamento
                 from repositories.tracking_history_repository import TrackingHistoryRepository
                 tracking_repo = TrackingHistoryRepository()
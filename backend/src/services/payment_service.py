@@ -20,6 +20,18 @@ from services.base_service import BaseService
 
 logger = logging.getLogger(__name__)
 
+# Status do provider -> payment_status do pedido
+PAYMENT_STATUS_MAP = {
+    "completed": "paid",
+    "failed": "failed",
+    "pending": "pending",
+    "3": "paid",  # PagSeguro: Paga
+    "4": "paid",  # PagSeguro: Disponível
+    "5": "failed",  # PagSeguro: Em disputa
+    "6": "refunded",  # PagSeguro: Devolvida
+    "7": "failed",  # PagSeguro: Cancelada
+}
+
 
 class PaymentService(BaseService):
     """
@@ -299,23 +311,14 @@ class PaymentService(BaseService):
                     "already_processed": True,
                 }
 
-            # Busca detalhes da transação
-            response = requests.get(
-                f"{self.pagseguro_url}/v3/transactions/notifications/{notification_code}",
-                params={"email": self.pagseguro_email, "token": self.pagseguro_token},
-            )
+            transaction = self.fetch_pagseguro_transaction(notification_code)
 
-            if response.status_code == 200:
-                import xml.etree.ElementTree as ET
-
-                root = ET.fromstring(response.text)
-
-                transaction_id = root.find("code").text
-                status = root.find("status").text
-                reference = root.find("reference").text
+            if transaction.get("success"):
+                transaction_id = transaction["transaction_id"]
+                reference = transaction["reference"]
 
                 # Processar atualização de status
-                result = self._update_payment_status(reference, status, "pagseguro", transaction_id)
+                result = self._update_payment_status(reference, transaction["status"], "pagseguro", transaction_id)
 
                 if result.get("success"):
                     self._register_webhook_processed(
@@ -329,7 +332,7 @@ class PaymentService(BaseService):
 
                 return result
             else:
-                return {"success": False, "error": f"Erro ao buscar transação: {response.status_code}"}
+                return transaction
 
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -338,6 +341,42 @@ class PaymentService(BaseService):
             logger.error(f"Erro ao processar notificação PagSeguro: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
 
+    def fetch_pagseguro_transaction(self, notification_code: str) -> Dict[str, Any]:
+        """
+        Busca no PagSeguro a transação de uma notificação.
+
+        Args:
+            notification_code: Código da notificação
+
+        Returns:
+            Dict com success, transaction_id, status (código PagSeguro) e
+            reference (ID do pedido), ou error
+        """
+        try:
+            response = requests.get(
+                f"{self.pagseguro_url}/v3/transactions/notifications/{notification_code}",
+                params={"email": self.pagseguro_email, "token": self.pagseguro_token},
+                timeout=10,
+            )
+            if response.status_code != 200:
+                return {"success": False, "error": f"Erro ao buscar transação: {response.status_code}"}
+
+            import xml.etree.ElementTree as ET
+
+            root = ET.fromstring(response.text)
+            return {
+                "success": True,
+                "transaction_id": root.find("code").text,
+                "status": root.find("status").text,
+                "reference": root.find("reference").text,
+            }
+        except (ValueError, KeyError, AttributeError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {"success": False, "error": "Resposta inválida do PagSeguro"}
+        except Exception as e:
+            logger.error(f"Erro ao buscar transação PagSeguro: {str(e)}", exc_info=True)
+            return {"success": False, "error": str(e)}
+
     # ================================
     # MÉTODOS AUXILIARES
     # ================================
@@ -586,19 +625,7 @@ class PaymentService(BaseService):
     def _update_payment_status(self, order_id: str, status: str, provider: str, transaction_id: str) -> Dict[str, Any]:
         """Atualiza status do pagamento no banco"""
         try:
-            # Mapeia status
-            status_map = {
-                "completed": "paid",
-                "failed": "failed",
-                "pending": "pending",
-                "3": "paid",  # PagSeguro: Paga
-                "4": "paid",  # PagSeguro: Disponível
-                "5": "failed",  # PagSeguro: Em disputa
-                "6": "failed",  # PagSeguro: Devolvida
-                "7": "failed",  # PagSeguro: Cancelada
-            }
-
-            db_status = status_map.get(status, "pending")
+            db_status = PAYMENT_STATUS_MAP.get(status, "pending")
 
             from services.order_service import OrderService
 
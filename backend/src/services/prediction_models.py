@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Modelos de Predição Vetorizados RE-EDUCA Store.
+
+Funções puras (numpy) usadas tanto pelo caminho online do
+PredictiveAnalysisService quanto pelo pipeline em lote:
+- Regressão linear simples em forma fechada para vários usuários de uma vez
+- Projeção de um modelo armazenado para qualquer horizonte
+- Score de churn vetorizado (mesmas regras de _calculate_churn_score)
+
+Sem I/O: recebem arrays já carregados e devolvem arrays/dicts.
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# Mínimo de pontos para ajustar uma tendência (igual ao caminho online)
+MIN_TREND_POINTS = 3
+
+
+def fit_linear_trends(group: np.ndarray, x: np.ndarray, y: np.ndarray, n_groups: int) -> Dict[str, np.ndarray]:
+    """
+    Ajusta y = intercept + slope·x por mínimos quadrados para cada grupo.
+
+    Usa somas suficientes (n, Σx, Σy, Σx², Σxy, Σy²) acumuladas com
+    np.bincount, então o custo é O(total de pontos) independente do
+    número de usuários — sem um LinearRegression por usuário/métrica.
+
+    Args:
+        group: Índice do grupo (0..n_groups-1) de cada ponto
+        x: Variável independente (dias desde o primeiro registro)
+        y: Variável dependente; pontos com NaN são ignorados
+        n_groups: Quantidade de grupos
+
+    Returns:
+        Dict com arrays por grupo: n, slope, intercept, r2, x_max
+    """
+    group = np.asarray(group, dtype=np.int64)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    valid = ~(np.isnan(x) | np.isnan(y))
+    group, x, y = group[valid], x[valid], y[valid]
+
+    n = np.bincount(group, minlength=n_groups).astype(np.float64)
+    sx = np.bincount(group, weights=x, minlength=n_groups)
+    sy = np.bincount(group, weights=y, minlength=n_groups)
+    sxx = np.bincount(group, weights=x * x, minlength=n_groups)
+    sxy = np.bincount(group, weights=x * y, minlength=n_groups)
+    syy = np.bincount(group, weights=y * y, minlength=n_groups)
+
+    x_max = np.full(n_groups, np.nan)
+    if len(x):
+        np.fmax.at(x_max, group, x)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_x = n * sxx - sx * sx
+        var_y = n * syy - sy * sy
+        cov = n * sxy - sx * sy
+
+        # x constante: reta horizontal na média (mesmo resultado do lstsq de norma mínima)
+        slope = np.where(var_x > 0, cov / var_x, 0.0)
+        intercept = np.where(n > 0, (sy - slope * sx) / n, np.nan)
+
+        # R² da regressão simples = correlação²; y constante é ajuste perfeito
+        r2 = np.where(
+            var_y > 0,
+            np.where(var_x > 0, (cov * cov) / (var_x * var_y), 0.0),
+            1.0,
+        )
+
+    return {
+        "n": n.astype(np.int64),
+        "slope": slope,
+        "intercept": intercept,
+        "r2": np.clip(r2, 0.0, 1.0),
+        "x_max": x_max,
+    }
+
+
+def trend_model_at(fits: Dict[str, np.ndarray], index: int) -> Optional[Dict[str, Any]]:
+    """
+    Extrai o modelo de um grupo em formato serializável (JSON).
+
+    Returns:
+        Dict com slope/intercept/r2/x_max/n ou None se pontos insuficientes
+    """
+    n = int(fits["n"][index])
+    if n < MIN_TREND_POINTS:
+        return None
+    return {
+        "slope": float(fits["slope"][index]),
+        "intercept": float(fits["intercept"][index]),
+        "r2": float(fits["r2"][index]),
+        "x_max": float(fits["x_max"][index]),
+        "n": n,
+    }
+
+
+def project_trend(model: Optional[Dict[str, Any]], days_ahead: int) -> Dict[str, Any]:
+    """
+    Projeta um modelo ajustado para days_ahead dias após o último registro.
+
+    Mantém o formato de resposta de PredictiveAnalysisService._predict_metric.
+    """
+    if not model:
+        return {"error": "Dados insuficientes para predição"}
+
+    slope = model["slope"]
+    predicted_value = model["intercept"] + slope * (model["x_max"] + days_ahead)
+    confidence = max(0.0, min(100.0, model["r2"] * 100))
+
+    return {
+        "predicted_value": round(float(predicted_value), 2),
+        "confidence": round(confidence, 1),
+        "trend": "increasing" if slope > 0 else "decreasing",
+        "change_rate": round(float(slope), 4),
+    }
+
+
+def churn_scores(
+    days_since_last_activity: np.ndarray,
+    days_since_last_login: np.ndarray,
+    activity_frequency: np.ndarray,
+) -> np.ndarray:
+    """
+    Score de churn vetorizado (0-1) para vários usuários.
+
+    Regras idênticas a PredictiveAnalysisService._calculate_churn_score.
+    """
+    activity = np.asarray(days_since_last_activity, dtype=np.float64)
+    login = np.asarray(days_since_last_login, dtype=np.float64)
+    frequency = np.asarray(activity_frequency, dtype=np.float64)
+
+    score = np.select([activity > 14, activity > 7], [0.4, 0.2], 0.0)
+    score += np.select([login > 7, login > 3], [0.3, 0.1], 0.0)
+    score += np.select([frequency < 0.1, frequency < 0.5], [0.3, 0.1], 0.0)
+    return np.minimum(1.0, np.round(score, 2))
+
+
+def churn_risk_level(score: float) -> str:
+    """Classifica o score de churn em Alto/Médio/Baixo"""
+    if score >= 0.7:
+        return "Alto"
+    if score >= 0.4:
+        return "Médio"
+    return "Baixo"
@@ -6,7 +6,11 @@ Implementa Machine Learning para predições de saúde incluindo:
 - Predição de comportamento do usuário
 - Análise de risco de churn
 - Recomendações personalizadas
-- Modelos: LinearRegression, RandomForest, LogisticRegression
+- Modelos: regressão linear (forma fechada, ver prediction_models)
+
+Predições de saúde e churn são pré-calculadas em lote pelo PredictionWorker
+(health_predictions / churn_scores) e servidas diretamente; o cálculo online
+fica como fallback para usuários ainda não processados.
 
 DEPENDÊNCIAS:
 - scikit-learn
@@ -24,11 +28,19 @@ import numpy as np
 import pandas as pd
 from config.database import supabase_client
 from repositories.predictive_analysis_repository import PredictiveAnalysisRepository
-from sklearn.linear_model import LinearRegression
+from services.prediction_models import churn_risk_level, fit_linear_trends, project_trend, trend_model_at
 from sklearn.preprocessing import StandardScaler
 
 logger = logging.getLogger(__name__)
 
+MIN_HEALTH_RECORDS = 10
+
+CHURN_RECOMMENDATIONS = {
+    "Alto": ["Oferecer desconto especial", "Enviar conteúdo personalizado", "Agendar follow-up personalizado"],
+    "Médio": ["Enviar lembretes de uso", "Oferecer novos recursos", "Solicitar feedback"],
+    "Baixo": ["Manter engajamento atual", "Oferecer recursos premium", "Solicitar indicações"],
+}
+
 
 class PredictiveAnalysisService:
     """
@@ -59,10 +71,15 @@ class PredictiveAnalysisService:
             Dict[str, Any]: Predições de peso, IMC, calorias com intervalos de confiança.
         """
         try:
-            # Busca dados históricos reais do usuário
+            # Modelos ajustados em lote: só projeta para o horizonte pedido
+            stored = self.repo.get_stored_prediction(user_id)
+            if stored:
+                return self._render_stored_prediction(user_id, stored, days_ahead)
+
+            # Usuário ainda não processado pelo pipeline: cálculo online
             health_data = self._get_user_health_history(user_id)
 
-            if not health_data or len(health_data) < 10:
+            if not health_data or len(health_data) < MIN_HEALTH_RECORDS:
                 return {"success": False, "error": "Dados insuficientes para predição (mínimo 10 registros)"}
 
             # Prepara dados para predição
@@ -108,6 +125,29 @@ class PredictiveAnalysisService:
             logger.error(f"Erro na predição de métricas de saúde: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
 
+    def _render_stored_prediction(self, user_id: str, stored: Dict[str, Any], days_ahead: int) -> Dict[str, Any]:
+        """Monta a resposta de predict_health_metrics a partir dos modelos gravados em lote"""
+        data_points = int(stored.get("data_points") or 0)
+        if data_points < MIN_HEALTH_RECORDS:
+            return {"success": False, "error": "Dados insuficientes para predição (mínimo 10 registros)"}
+
+        predictions = {metric: project_trend(model, days_ahead) for metric, model in (stored.get("models") or {}).items()}
+        if stored.get("activity"):
+            predictions["activity"] = stored["activity"]
+        predictions["health_risk"] = self._predict_health_risk(None, predictions)
+
+        confidence = stored.get("confidence")
+        return {
+            "success": True,
+            "user_id": user_id,
+            "predictions": predictions,
+            "confidence": float(confidence) if confidence is not None else 50.0,
+            "data_points": data_points,
+            "prediction_date": datetime.now().isoformat(),
+            "target_date": (datetime.now() + timedelta(days=days_ahead)).isoformat(),
+            "model_computed_at": stored.get("computed_at"),
+        }
+
     def predict_user_behavior(self, user_id: str, behavior_type: str) -> Dict[str, Any]:
         """Prediz comportamento do usuário (compras, exercícios, etc.)"""
         try:
@@ -138,6 +178,20 @@ class PredictiveAnalysisService:
     def predict_churn_risk(self, user_id: str) -> Dict[str, Any]:
         """Prediz risco de churn do usuário"""
         try:
+            # Score da tabela noturna (churn_scores)
+            stored = self.repo.get_churn_score(user_id)
+            if stored:
+                risk_level = stored.get("risk_level") or churn_risk_level(float(stored["churn_score"]))
+                return {
+                    "success": True,
+                    "user_id": user_id,
+                    "churn_score": float(stored["churn_score"]),
+                    "risk_level": risk_level,
+                    "recommendations": CHURN_RECOMMENDATIONS[risk_level],
+                    "metrics": stored.get("metrics") or {},
+                    "calculated_at": stored.get("calculated_at"),
+                }
+
             # Coleta métricas de engajamento
             engagement_metrics = self._get_engagement_metrics(user_id)
 
@@ -146,28 +200,14 @@ class PredictiveAnalysisService:
 
             # Calcula score de churn
             churn_score = self._calculate_churn_score(engagement_metrics)
-
-            # Determina categoria de risco
-            if churn_score >= 0.7:
-                risk_level = "Alto"
-                recommendations = [
-                    "Oferecer desconto especial",
-                    "Enviar conteúdo personalizado",
-                    "Agendar follow-up personalizado",
-                ]
-            elif churn_score >= 0.4:
-                risk_level = "Médio"
-                recommendations = ["Enviar lembretes de uso", "Oferecer novos recursos", "Solicitar feedback"]
-            else:
-                risk_level = "Baixo"
-                recommendations = ["Manter engajamento atual", "Oferecer recursos premium", "Solicitar indicações"]
+            risk_level = churn_risk_level(churn_score)
 
             return {
                 "success": True,
                 "user_id": user_id,
                 "churn_score": churn_score,
                 "risk_level": risk_level,
-                "recommendations": recommendations,
+                "recommendations": CHURN_RECOMMENDATIONS[risk_level],
                 "metrics": engagement_metrics,
                 "calculated_at": datetime.now().isoformat(),
             }
@@ -281,26 +321,20 @@ class PredictiveAnalysisService:
     def predict_seasonal_trends(self, user_id: str) -> Dict[str, Any]:
         """Prediz tendências sazonais do usuário"""
         try:
-            # Busca dados históricos por estação
-            seasonal_data = self._get_seasonal_data(user_id)
+            # Tendências históricas pré-calculadas em lote, se disponíveis
+            stored = self.repo.get_stored_prediction(user_id)
+            if stored and stored.get("seasonal") is not None:
+                trends = stored["seasonal"]
+            else:
+                # Busca dados históricos por estação
+                seasonal_data = self._get_seasonal_data(user_id)
 
-            if not seasonal_data:
-                return {"success": False, "error": "Dados sazonais insuficientes"}
+                if not seasonal_data:
+                    return {"success": False, "error": "Dados sazonais insuficientes"}
 
-            # Analisa padrões sazonais
-            trends = {}
-            current_season = self._get_current_season()
+                trends = self._summarize_seasons(seasonal_data)
 
-            for season in ["spring", "summer", "autumn", "winter"]:
-                season_data = seasonal_data.get(season, [])
-                if season_data:
-                    trends[season] = {
-                        "activity_level": np.mean([d.get("activity_level", 0) for d in season_data]),
-                        "mood_score": np.mean([d.get("mood_score", 0) for d in season_data]),
-                        "energy_level": np.mean([d.get("energy_level", 0) for d in season_data]),
-                        "sleep_quality": np.mean([d.get("sleep_quality", 0) for d in season_data]),
-                        "data_points": len(season_data),
-                    }
+            current_season = self._get_current_season()
 
             # Prediz tendências para próxima estação
             next_season = self._get_next_season(current_season)
@@ -324,15 +358,23 @@ class PredictiveAnalysisService:
             logger.error(f"Erro na predição de tendências sazonais: {str(e)}", exc_info=True)
             return {"success": False, "error": str(e)}
 
-    def _get_user_health_history(self, user_id: str) -> List[Dict]:
+    def _get_user_health_history(
+        self,
+        user_id: str,
+        imc_history: Optional[List[Dict]] = None,
+        exercise_history: Optional[List[Dict]] = None,
+    ) -> List[Dict]:
         """
         Busca histórico de saúde do usuário.
 
-        Utiliza PredictiveAnalysisRepository para acesso padronizado aos dados.
+        Utiliza PredictiveAnalysisRepository para acesso padronizado aos dados;
+        o pipeline em lote passa os registros já carregados.
         """
         try:
-            imc_history = self.repo.get_user_imc_history(user_id)
-            exercise_history = self.repo.get_user_workout_sessions(user_id)
+            if imc_history is None:
+                imc_history = self.repo.get_user_imc_history(user_id)
+            if exercise_history is None:
+                exercise_history = self.repo.get_user_workout_sessions(user_id)
 
             # Combina dados
             health_data = []
@@ -371,36 +413,19 @@ class PredictiveAnalysisService:
             return []
 
     def _predict_metric(self, df: pd.DataFrame, metric: str, date_col: str, days_ahead: int) -> Dict:
-        """Prediz uma métrica específica usando regressão linear"""
-        try:
-            # Prepara dados
-            df[date_col] = pd.to_datetime(df[date_col])
-            df["days_since_start"] = (df[date_col] - df[date_col].min()).dt.days
-
-            X = df[["days_since_start"]].values
-            y = df[metric].values
-
-            if len(X) < 3:
-                return {"error": "Dados insuficientes para predição"}
-
-            # Treina modelo
-            model = LinearRegression()
-            model.fit(X, y)
-
-            # Prediz valor futuro
-            future_day = df["days_since_start"].max() + days_ahead
-            predicted_value = model.predict([[future_day]])[0]
+        """
+        Prediz uma métrica específica usando regressão linear.
 
-            # Calcula confiança baseada no R²
-            r2_score = model.score(X, y)
-            confidence = max(0, min(100, r2_score * 100))
+        Mínimos quadrados em forma fechada (mesmo ajuste do pipeline em lote);
+        linhas sem a métrica (ex.: treinos) são ignoradas e df não é alterado.
+        """
+        try:
+            dates = pd.to_datetime(df[date_col])
+            days_since_start = (dates - dates.min()).dt.days.to_numpy(dtype=float)
+            values = pd.to_numeric(df[metric], errors="coerce").to_numpy(dtype=float)
 
-            return {
-                "predicted_value": round(predicted_value, 2),
-                "confidence": round(confidence, 1),
-                "trend": "increasing" if model.coef_[0] > 0 else "decreasing",
-                "change_rate": round(model.coef_[0], 4),
-            }
+            fits = fit_linear_trends(np.zeros(len(values), dtype=np.int64), days_since_start, values, 1)
+            return project_trend(trend_model_at(fits, 0), days_ahead)
 
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -409,11 +434,21 @@ class PredictiveAnalysisService:
             logger.error(f"Erro na predição de métrica: {str(e)}", exc_info=True)
             return {"error": str(e)}
 
-    def _predict_activity_trend(self, df: pd.DataFrame, days_ahead: int, user_id: str = None) -> Dict:
-        """Prediz tendência de atividade física usando dados reais"""
+    def _predict_activity_trend(
+        self,
+        df: Optional[pd.DataFrame],
+        days_ahead: int,
+        user_id: str = None,
+        sessions: Optional[List[Dict]] = None,
+    ) -> Dict:
+        """
+        Prediz tendência de atividade física usando dados reais.
+
+        sessions: sessões dos últimos 30 dias já carregadas (pipeline em lote).
+        """
         try:
             # Tenta obter user_id do DataFrame ou usa o passado como parâmetro
-            if not user_id and len(df) > 0:
+            if not user_id and df is not None and len(df) > 0:
                 # Tenta extrair do primeiro registro se disponível
                 if "user_id" in df.columns:
                     user_id = df.iloc[0].get("user_id")
@@ -422,7 +457,9 @@ class PredictiveAnalysisService:
                     user_id = df.iloc[0].get("user_id", None)
 
             if user_id:
-                exercise_response_data = self.repo.get_user_workout_sessions(user_id, days_back=30)
+                exercise_response_data = (
+                    sessions if sessions is not None else self.repo.get_user_workout_sessions(user_id, days_back=30)
+                )
 
                 if exercise_response_data and len(exercise_response_data) > 0:
                     # Calcula score de atividade baseado em frequência e duração
@@ -523,15 +560,15 @@ class PredictiveAnalysisService:
             logger.error(f"Erro na predição de atividade: {str(e)}", exc_info=True)
             return {"error": str(e)}
 
-    def _predict_health_risk(self, df: pd.DataFrame, predictions: Dict) -> Dict:
+    def _predict_health_risk(self, df: Optional[pd.DataFrame], predictions: Dict) -> Dict:
         """Prediz risco geral de saúde"""
         try:
             risk_factors = 0
             risk_score = 0
 
             # Analisa IMC
-            if "imc" in predictions:
-                imc = predictions["imc"]["predicted_value"]
+            imc = predictions.get("imc", {}).get("predicted_value")
+            if imc is not None:
                 if imc > 30:
                     risk_factors += 1
                     risk_score += 0.3
@@ -539,8 +576,8 @@ class PredictiveAnalysisService:
                     risk_score += 0.1
 
             # Analisa atividade
-            if "activity" in predictions:
-                activity = predictions["activity"]["predicted_activity_score"]
+            activity = predictions.get("activity", {}).get("predicted_activity_score")
+            if activity is not None:
                 if activity < 5:
                     risk_factors += 1
                     risk_score += 0.2
@@ -572,7 +609,10 @@ class PredictiveAnalysisService:
         try:
             # Baseado na quantidade e consistência dos dados
             data_points = len(df)
-            consistency_score = 1.0 - (df.std().mean() / df.mean().mean()) if df.mean().mean() > 0 else 0.5
+            numeric = df.select_dtypes(include="number")
+            consistency_score = (
+                1.0 - (numeric.std().mean() / numeric.mean().mean()) if numeric.mean().mean() > 0 else 0.5
+            )
 
             confidence = min(95, (data_points / 50) * 50 + consistency_score * 30)
             return round(confidence, 1)
@@ -821,15 +861,23 @@ class PredictiveAnalysisService:
             logger.error(f"Erro ao analisar padrões: {str(e)}", exc_info=True)
             return {}
 
-    def _get_seasonal_data(self, user_id: str) -> Dict[str, List[Dict]]:
+    def _get_seasonal_data(
+        self,
+        user_id: str,
+        imc_data: Optional[List[Dict]] = None,
+        exercise_data: Optional[List[Dict]] = None,
+    ) -> Dict[str, List[Dict]]:
         """
         Busca dados históricos agrupados por estação do ano.
 
-        Utiliza PredictiveAnalysisRepository para acesso padronizado aos dados.
+        Utiliza PredictiveAnalysisRepository para acesso padronizado aos dados;
+        o pipeline em lote passa os registros já carregados.
         """
         try:
-            imc_data = self.repo.get_user_imc_history(user_id)
-            exercise_data = self.repo.get_user_workout_sessions(user_id)
+            if imc_data is None:
+                imc_data = self.repo.get_user_imc_history(user_id)
+            if exercise_data is None:
+                exercise_data = self.repo.get_user_workout_sessions(user_id)
 
             seasonal_data = {"spring": [], "summer": [], "autumn": [], "winter": []}
 
@@ -902,6 +950,21 @@ class PredictiveAnalysisService:
             logger.error(f"Erro ao buscar dados sazonais: {str(e)}")
             return {}
 
+    def _summarize_seasons(self, seasonal_data: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+        """Médias históricas por estação (base de predict_seasonal_trends)"""
+        trends = {}
+        for season in ["spring", "summer", "autumn", "winter"]:
+            season_data = seasonal_data.get(season, [])
+            if season_data:
+                trends[season] = {
+                    "activity_level": float(np.mean([d.get("activity_level", 0) for d in season_data])),
+                    "mood_score": float(np.mean([d.get("mood_score", 0) for d in season_data])),
+                    "energy_level": float(np.mean([d.get("energy_level", 0) for d in season_data])),
+                    "sleep_quality": float(np.mean([d.get("sleep_quality", 0) for d in season_data])),
+                    "data_points": len(season_data),
+                }
+        return trends
+
     def _get_season_from_date(self, date: datetime) -> Optional[str]:
         """Determina estação do ano a partir de uma data"""
         try:
@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline em Lote de Análise Preditiva RE-EDUCA Store.
+
+Executado pelo PredictionWorker (agendado), fora do request HTTP:
+- Percorre os usuários ativos em páginas (cursor por id)
+- Carrega IMC e treinos da página inteira em duas consultas (in_)
+- Reajusta apenas usuários cuja versão dos dados mudou (ou predição antiga)
+- Ajusta as tendências de todos esses usuários de uma vez (mínimos quadrados
+  em forma fechada, ver services.prediction_models)
+- Grava health_predictions e churn_scores em upserts em lote
+
+As rotas de /api/predictive servem as tabelas gravadas aqui.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from repositories.predictive_analysis_repository import PredictiveAnalysisRepository
+from services.base_service import BaseService
+from services.health_analytics_engine import to_datetime64
+from services.prediction_models import churn_risk_level, churn_scores, fit_linear_trends, trend_model_at
+
+DEFAULT_BATCH_SIZE = 200
+MIN_PREDICTION_POINTS = 10
+PREDICTION_MAX_AGE = timedelta(hours=24)  # atividade usa janela móvel de 30 dias
+ACTIVITY_WINDOW_DAYS = 30
+CHURN_WINDOW_DAYS = 30
+SECONDS_PER_DAY = 86400
+
+# Métrica da predição -> coluna de imc_history
+TREND_METRICS = {"imc": "imc_value", "weight": "weight_kg"}
+
+
+def _utcnow() -> datetime:
+    """Agora em UTC, sem fuso (mesma convenção de to_datetime64)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _as_float(value: Any) -> float:
+    """Converte valor do banco para float (NaN se ausente/inválido)"""
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _epoch_seconds(values: Sequence[Any]) -> np.ndarray:
+    """Strings ISO -> segundos desde epoch (float, NaN para inválidos)"""
+    stamps = to_datetime64(values)
+    return np.where(np.isnat(stamps), np.nan, stamps.astype(np.int64).astype(np.float64))
+
+
+def _session_date(record: Dict[str, Any]) -> str:
+    """Data de referência de uma sessão de treino"""
+    return record.get("completed_at") or record.get("created_at") or ""
+
+
+def _group_by_user(rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Agrupa registros por user_id preservando a ordem"""
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row.get("user_id")].append(row)
+    return grouped
+
+
+def data_version(imc_rows: List[Dict[str, Any]], session_rows: List[Dict[str, Any]]) -> str:
+    """
+    Impressão digital dos dados de origem de um usuário.
+
+    Muda quando um registro é inserido/removido ou o último registro muda.
+    """
+    imc_last = max((row.get("calculated_at") or "" for row in imc_rows), default="")
+    session_last = max((_session_date(row) for row in session_rows), default="")
+    return f"imc:{len(imc_rows)}:{imc_last}|ws:{len(session_rows)}:{session_last}"
+
+
+class PredictiveBatchService(BaseService):
+    """
+    Service do pipeline offline de predições.
+
+    Reaproveita as regras do PredictiveAnalysisService (atividade, sazonalidade,
+    confiança), alimentando-as com dados já carregados em lote.
+    """
+
+    def __init__(self, analysis_service=None):
+        super().__init__()
+        self.repo = PredictiveAnalysisRepository()
+        if analysis_service is None:
+            from services.predictive_analysis_service import PredictiveAnalysisService
+
+            analysis_service = PredictiveAnalysisService()
+        self.analysis = analysis_service
+
+    def iter_active_user_pages(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """Itera sobre páginas de usuários ativos (cursor por id)"""
+        after_id = None
+        while True:
+            page = self.repo.get_active_users_page(after_id=after_id, limit=batch_size)
+            if not page:
+                return
+            yield page
+            if len(page) < batch_size:
+                return
+            after_id = page[-1]["id"]
+
+    # ============================================================
+    # PREDIÇÕES DE SAÚDE
+    # ============================================================
+
+    def run_health_predictions(self, batch_size: int = DEFAULT_BATCH_SIZE, force: bool = False) -> Dict[str, int]:
+        """
+        Atualiza health_predictions para todos os usuários ativos.
+
+        Args:
+            batch_size: Usuários por página
+            force: Reajusta todos, ignorando a versão dos dados
+
+        Returns:
+            Estatísticas: users, refit, skipped, stored
+        """
+        stats = {"users": 0, "refit": 0, "skipped": 0, "stored": 0}
+        for page in self.iter_active_user_pages(batch_size):
+            page_stats = self.refresh_predictions([user["id"] for user in page], force=force)
+            stats["users"] += len(page)
+            for key in ("refit", "skipped", "stored"):
+                stats[key] += page_stats[key]
+
+        self.logger.info(
+            f"Predições em lote: {stats['users']} usuário(s), {stats['refit']} reajustado(s), "
+            f"{stats['skipped']} sem mudança"
+        )
+        return stats
+
+    def refresh_predictions(self, user_ids: List[str], force: bool = False) -> Dict[str, int]:
+        """Reajusta e grava as predições dos usuários da página cujos dados mudaram"""
+        imc_by_user = _group_by_user(self.repo.get_imc_history_for_users(user_ids))
+        sessions_by_user = _group_by_user(self.repo.get_workout_sessions_for_users(user_ids))
+        stored = {} if force else self.repo.get_prediction_versions(user_ids)
+        now = _utcnow()
+
+        changed = []
+        for user_id in user_ids:
+            version = data_version(imc_by_user.get(user_id, []), sessions_by_user.get(user_id, []))
+            current = stored.get(user_id)
+            if current and current.get("data_version") == version and not self._is_stale(current, now):
+                continue
+            changed.append((user_id, version))
+
+        if not changed:
+            return {"refit": 0, "skipped": len(user_ids), "stored": 0}
+
+        rows = self.build_prediction_rows(changed, imc_by_user, sessions_by_user, now)
+        return {
+            "refit": len(changed),
+            "skipped": len(user_ids) - len(changed),
+            "stored": self.repo.upsert_predictions(rows),
+        }
+
+    def build_prediction_rows(
+        self,
+        users: List[Tuple[str, str]],
+        imc_by_user: Dict[str, List[Dict[str, Any]]],
+        sessions_by_user: Dict[str, List[Dict[str, Any]]],
+        now: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Monta as linhas de health_predictions de vários usuários.
+
+        Args:
+            users: Lista de (user_id, data_version)
+            imc_by_user: Histórico de IMC agrupado por usuário
+            sessions_by_user: Sessões de treino agrupadas por usuário
+            now: Referência de tempo (UTC)
+        """
+        now = now or _utcnow()
+        models = self._fit_trend_models([user_id for user_id, _ in users], imc_by_user, sessions_by_user)
+        activity_cutoff = (now - timedelta(days=ACTIVITY_WINDOW_DAYS)).isoformat()
+
+        rows = []
+        for index, (user_id, version) in enumerate(users):
+            imc_rows = imc_by_user.get(user_id, [])
+            session_rows = sessions_by_user.get(user_id, [])
+            data_points = len(imc_rows) + len(session_rows)
+
+            row = {
+                "user_id": user_id,
+                "data_version": version,
+                "data_points": data_points,
+                "models": {},
+                "activity": None,
+                "seasonal": self.analysis._summarize_seasons(
+                    self.analysis._get_seasonal_data(user_id, imc_data=imc_rows, exercise_data=session_rows)
+                ),
+                "confidence": None,
+                "computed_at": now.isoformat(),
+            }
+
+            if data_points >= MIN_PREDICTION_POINTS:
+                health_data = self.analysis._get_user_health_history(
+                    user_id, imc_history=imc_rows, exercise_history=session_rows
+                )
+                recent_sessions = [r for r in session_rows if (r.get("completed_at") or "") >= activity_cutoff]
+                row["models"] = {metric: fitted[index] for metric, fitted in models.items()}
+                row["activity"] = self.analysis._predict_activity_trend(
+                    None, 0, user_id=user_id, sessions=recent_sessions
+                )
+                row["confidence"] = self.analysis._calculate_prediction_confidence(pd.DataFrame(health_data))
+
+            rows.append(row)
+        return rows
+
+    def _fit_trend_models(
+        self,
+        user_ids: List[str],
+        imc_by_user: Dict[str, List[Dict[str, Any]]],
+        sessions_by_user: Dict[str, List[Dict[str, Any]]],
+    ) -> Dict[str, List[Optional[Dict[str, Any]]]]:
+        """
+        Ajusta as tendências de IMC e peso de todos os usuários de uma vez.
+
+        O eixo x é "dias desde o primeiro registro do usuário" (IMC ou treino),
+        como no caminho online.
+
+        Returns:
+            {metrica: [modelo do usuário i ou None]}
+        """
+        n_users = len(user_ids)
+        groups, dates, values = [], [], {metric: [] for metric in TREND_METRICS}
+        first_seen = np.full(n_users, np.nan)
+
+        for index, user_id in enumerate(user_ids):
+            for row in imc_by_user.get(user_id, []):
+                groups.append(index)
+                dates.append(row.get("calculated_at"))
+                for metric, column in TREND_METRICS.items():
+                    values[metric].append(_as_float(row.get(column)))
+
+            session_dates = [_session_date(row) for row in sessions_by_user.get(user_id, [])]
+            if session_dates:
+                first_seen[index] = np.nanmin(_epoch_seconds(session_dates), initial=np.inf)
+
+        groups = np.asarray(groups, dtype=np.int64)
+        seconds = _epoch_seconds(dates)
+        if len(groups):
+            np.fmin.at(first_seen, groups, seconds)
+        first_seen[np.isinf(first_seen)] = np.nan
+
+        x = np.floor((seconds - first_seen[groups]) / SECONDS_PER_DAY) if len(groups) else np.empty(0)
+
+        models = {}
+        for metric in TREND_METRICS:
+            fits = fit_linear_trends(groups, x, np.asarray(values[metric], dtype=np.float64), n_users)
+            models[metric] = [trend_model_at(fits, index) for index in range(n_users)]
+        return models
+
+    @staticmethod
+    def _is_stale(stored: Dict[str, Any], now: datetime) -> bool:
+        """Predição calculada há mais de PREDICTION_MAX_AGE (ou sem data)"""
+        computed = _epoch_seconds([stored.get("computed_at")])[0]
+        cutoff = (now - PREDICTION_MAX_AGE - datetime(1970, 1, 1)).total_seconds()
+        return bool(np.isnan(computed) or computed < cutoff)
+
+    # ============================================================
+    # CHURN
+    # ============================================================
+
+    def run_churn_scores(self, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Recalcula churn_scores para todos os usuários ativos (job noturno).
+
+        Returns:
+            Estatísticas: users, stored, high_risk
+        """
+        stats = {"users": 0, "stored": 0, "high_risk": 0}
+        now = _utcnow()
+        for page in self.iter_active_user_pages(batch_size):
+            rows = self.compute_churn_rows(page, now)
+            stats["users"] += len(page)
+            stats["high_risk"] += sum(1 for row in rows if row["risk_level"] == "Alto")
+            stats["stored"] += self.repo.upsert_churn_scores(rows)
+
+        self.logger.info(
+            f"Churn em lote: {stats['users']} usuário(s), {stats['high_risk']} com risco alto"
+        )
+        return stats
+
+    def compute_churn_rows(self, users: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Calcula o churn de uma página de usuários de forma vetorizada.
+
+        Args:
+            users: Registros {id, last_login}
+            now: Referência de tempo (UTC)
+        """
+        if not users:
+            return []
+        now = now or _utcnow()
+        user_ids = [user["id"] for user in users]
+        index = {user_id: i for i, user_id in enumerate(user_ids)}
+        n_users = len(user_ids)
+
+        activities = [
+            row
+            for row in self.repo.get_activities_for_users(user_ids, days_back=CHURN_WINDOW_DAYS)
+            if row.get("user_id") in index
+        ]
+        groups = np.asarray([index[row["user_id"]] for row in activities], dtype=np.int64)
+        activity_seconds = _epoch_seconds([row.get("timestamp") or row.get("created_at") for row in activities])
+
+        totals = np.bincount(groups, minlength=n_users)
+        last_activity = np.full(n_users, np.nan)
+        if len(groups):
+            np.fmax.at(last_activity, groups, activity_seconds)
+        last_login = _epoch_seconds([user.get("last_login") for user in users])
+
+        now_seconds = (now - datetime(1970, 1, 1)).total_seconds()
+        with np.errstate(invalid="ignore"):
+            days_activity = np.nan_to_num(np.floor((now_seconds - last_activity) / SECONDS_PER_DAY)).astype(np.int64)
+            days_login = np.nan_to_num(np.floor((now_seconds - last_login) / SECONDS_PER_DAY)).astype(np.int64)
+        frequency = totals / CHURN_WINDOW_DAYS
+
+        scores = churn_scores(days_activity, days_login, frequency)
+        calculated_at = now.isoformat()
+
+        return [
+            {
+                "user_id": user_id,
+                "churn_score": float(scores[i]),
+                "risk_level": churn_risk_level(scores[i]),
+                "metrics": {
+                    "total_activities_30d": int(totals[i]),
+                    "days_since_last_activity": int(days_activity[i]),
+                    "days_since_last_login": int(days_login[i]),
+                    "activity_frequency": float(frequency[i]),
+                },
+                "calculated_at": calculated_at,
+            }
+            for i, user_id in enumerate(user_ids)
+        ]
@@ -19,6 +19,7 @@ from repositories.product_repository import ProductRepository
 from repositories.review_repository import ReviewRepository
 from repositories.order_item_repository import OrderItemRepository
 from services.base_service import BaseService
+from services.cart_read_model import cart_read_model
 
 logger = logging.getLogger(__name__)
 
@@ -130,6 +131,8 @@ class ProductService(BaseService):
             if updated_product:
                 # Invalidar cache do produto específico e lista geral
                 self._invalidate_product_cache(product_id)
+                # Carrinhos com o produto guardam preço/nome/status antigos
+                cart_read_model.invalidate_product(product_id)
                 return {"success": True, "product": updated_product}
             else:
                 return {"success": False, "error": "Erro ao atualizar produto"}
@@ -152,6 +155,7 @@ class ProductService(BaseService):
             if updated:
                 # Invalidar cache do produto e lista geral
                 self._invalidate_product_cache(product_id)
+                cart_read_model.invalidate_product(product_id)
                 return {"success": True, "message": "Produto desativado com sucesso"}
             else:
                 return {"success": False, "error": "Produto não encontrado"}
@@ -772,4 +776,3 @@ class ProductService(BaseService):
             logger.debug(f"Cache de produtos invalidado (product_id={product_id}, reviews={invalidate_reviews})")
         except Exception as e:
             logger.warning(f"Erro ao invalidar cache de produtos: {e}")
-ucts": [], "pagination": {"page": page, "per_page": per_page, "total": 0, "pages": 0}}
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de Cupons e Promoções RE-EDUCA Store.
+
+Mantém em memória o índice compilado de cupons e promoções ativos
+(services/promotion_rules.py) e os contadores de uso de cupons:
+- O índice é recarregado quando a versão publicada no Redis muda
+  (PROMOTIONS_VERSION_KEY, incrementada a cada edição administrativa),
+  conferida a cada RULES_CHECK_SECONDS; sem Redis, ou para alterações feitas
+  direto no banco, é recarregado após RULES_MAX_AGE
+- Uso de cupom com limite é reservado com um script Lua (confere o limite e
+  incrementa atomicamente); o contador é semeado com usage_count lido do
+  banco na hora (não do índice compilado) e expira após USAGE_COUNTER_TTL
+  para ressincronizar
+"""
+
+import logging
+import threading
+import time
+from typing import Optional
+
+from repositories.coupon_repository import CouponRepository
+from repositories.promotion_repository import PromotionRepository
+from services.cache_service import cache_service
+from services.promotion_rules import CompiledCoupon, PromotionIndex, compile_index
+
+logger = logging.getLogger(__name__)
+
+PROMOTIONS_VERSION_KEY = "promotions:rules:version"
+USAGE_COUNTER_KEY = "coupons:usage:{code}"
+USAGE_COUNTER_TTL = 3600
+RULES_CHECK_SECONDS = 2
+RULES_MAX_AGE = 300
+
+# KEYS[1] contador; ARGV[1] limite, ARGV[2] uso no banco ('' = sem semente:
+# retorna -2 se o contador não existe), ARGV[3] TTL
+_RESERVE_USE = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    if ARGV[2] == '' then
+        return -2
+    end
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    current = ARGV[2]
+end
+if tonumber(current) >= tonumber(ARGV[1]) then
+    return -1
+end
+return redis.call('INCR', KEYS[1])
+"""
+
+# KEYS[1] contador; ARGV[1] delta
+_ADD_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+return redis.call('INCRBY', KEYS[1], ARGV[1])
+"""
+
+
+class PromotionEngine:
+    """Índice compilado de cupons e promoções e contadores de uso de cupons."""
+
+    _index: Optional[PromotionIndex] = None
+    _index_loaded_at = 0.0
+    _index_checked_at = 0.0
+    _index_lock = threading.Lock()
+
+    def __init__(self):
+        """Inicializa o motor de promoções."""
+        self.coupon_repo = CouponRepository()
+        self.promotion_repo = PromotionRepository()
+        self.logger = logger
+
+    @property
+    def redis(self):
+        return cache_service.redis_client
+
+    def get_index(self) -> PromotionIndex:
+        """
+        Cupons e promoções ativos compilados, recarregados quando a versão muda.
+
+        Returns:
+            PromotionIndex atual
+        """
+        cls = PromotionEngine
+        index, now = cls._index, time.monotonic()
+        if index is not None and now - cls._index_loaded_at < RULES_MAX_AGE:
+            if now - cls._index_checked_at < RULES_CHECK_SECONDS:
+                return index
+            cls._index_checked_at = now
+            version = self._version()
+            if version == index.version:
+                return index
+        else:
+            version = self._version()
+
+        with cls._index_lock:
+            current = cls._index
+            if current is not None and current is not index and current.version == version:
+                # Outra thread já recarregou
+                return current
+            compiled = compile_index(
+                self.coupon_repo.find_active_coupons(), self.promotion_repo.find_active_promotions(), version
+            )
+            cls._index = compiled
+            cls._index_loaded_at = cls._index_checked_at = time.monotonic()
+            self.logger.info(f"Cupons e promoções compilados: {len(compiled)} regra(s), versão {version}")
+            return compiled
+
+    def _version(self) -> Optional[str]:
+        """Versão das regras no Redis (None sem Redis)"""
+        try:
+            if self.redis:
+                return self.redis.get(PROMOTIONS_VERSION_KEY)
+        except Exception as e:
+            self.logger.warning(f"Erro ao ler versão de cupons e promoções: {str(e)}")
+        return None
+
+    def invalidate(self):
+        """Publica nova versão (todos os processos recarregam em até RULES_CHECK_SECONDS)"""
+        try:
+            if self.redis:
+                self.redis.incr(PROMOTIONS_VERSION_KEY)
+        except Exception as e:
+            self.logger.warning(f"Erro ao publicar versão de cupons e promoções: {str(e)}")
+        PromotionEngine._index = None
+
+    def usage_count(self, coupon: CompiledCoupon) -> int:
+        """Uso atual do cupom (contador do Redis ou usage_count do índice)"""
+        try:
+            if self.redis:
+                value = self.redis.get(USAGE_COUNTER_KEY.format(code=coupon.code))
+                if value is not None:
+                    return int(value)
+        except Exception as e:
+            self.logger.warning(f"Erro ao ler uso do cupom {coupon.code}: {str(e)}")
+        return coupon.usage_count
+
+    def reserve_use(self, coupon: CompiledCoupon) -> bool:
+        """
+        Reserva um uso do cupom respeitando usage_limit.
+
+        Returns:
+            False se o cupom está esgotado
+        """
+        if not coupon.usage_limit:
+            return True
+        try:
+            if self.redis:
+                key = USAGE_COUNTER_KEY.format(code=coupon.code)
+                result = self.redis.eval(_RESERVE_USE, 1, key, coupon.usage_limit, "", USAGE_COUNTER_TTL)
+                if int(result) == -2:
+                    # Contador expirou: semeia com o uso atual do banco (o índice pode ter minutos)
+                    result = self.redis.eval(
+                        _RESERVE_USE, 1, key, coupon.usage_limit, self._stored_usage(coupon), USAGE_COUNTER_TTL
+                    )
+                return int(result) >= 0
+        except Exception as e:
+            self.logger.warning(f"Erro ao reservar uso do cupom {coupon.code}: {str(e)}")
+        return coupon.usage_count < coupon.usage_limit
+
+    def _stored_usage(self, coupon: CompiledCoupon) -> int:
+        """usage_count atual do cupom no banco (do índice se a leitura falhar)"""
+        row = self.coupon_repo.find_by_code(coupon.code)
+        return int(row.get("usage_count") or 0) if row else coupon.usage_count
+
+    def release_use(self, code: str):
+        """Devolve um uso reservado (falha ao gravar no banco)"""
+        self._add_use(code, -1)
+
+    def note_use(self, code: str):
+        """Registra um uso reservado fora do contador (create_order_from_quote)"""
+        self._add_use(code, 1)
+
+    def _add_use(self, code: str, delta: int):
+        try:
+            if self.redis and code:
+                self.redis.eval(_ADD_IF_EXISTS, 1, USAGE_COUNTER_KEY.format(code=str(code).strip().upper()), delta)
+        except Exception as e:
+            self.logger.warning(f"Erro ao atualizar uso do cupom {code}: {str(e)}")
+
+
+promotion_engine = PromotionEngine()
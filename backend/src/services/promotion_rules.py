@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Regras de Cupons e Promoções Compiladas RE-EDUCA Store.
+
+Cupons e promoções ativos são compilados em um índice imutável avaliado sem
+acesso ao banco:
+- Datas de validade convertidas uma vez para epoch (sem fuso = UTC)
+- Cupons indexados pelo código (maiúsculo)
+- Promoções restritas indexadas por produto e por categoria; promoções sem
+  restrição ordenadas por valor mínimo do pedido (busca binária)
+- evaluate avalia todas as promoções de um carrinho em uma passada: os itens
+  são agrupados por produto uma vez e cada promoção candidata é visitada uma
+  única vez
+
+O cálculo do desconto é o mesmo de antes: percentual sobre o valor do
+pedido, fixo, ou BOGO (a cada min_quantity unidades de um produto aplicável,
+uma recebe discount_percent); limitado por max_discount e pelo valor do
+pedido.
+"""
+from bisect import bisect_right
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def parse_timestamp(value: Any) -> Optional[float]:
+    """Data ISO (ou datetime) como epoch; sem fuso horário é tratada como UTC"""
+    if not value:
+        return None
+    moment = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _money(value: Any) -> float:
+    return float(value or 0)
+
+
+def _group_items(items: Iterable[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Itens agrupados por produto: {product_id: [quantidade, preço, categoria]}"""
+    groups: Dict[str, List[Any]] = {}
+    for item in items or ():
+        product_id = item.get("product_id")
+        if not product_id:
+            continue
+        group = groups.get(str(product_id))
+        if group is None:
+            groups[str(product_id)] = [int(item.get("quantity") or 0), _money(item.get("price")), item.get("category")]
+        else:
+            group[0] += int(item.get("quantity") or 0)
+    return groups
+
+
+class _CompiledRule:
+    """Campos comuns de cupons e promoções (somente leitura por convenção)"""
+
+    __slots__ = (
+        "id",
+        "type",
+        "value",
+        "min_order_value",
+        "max_discount",
+        "starts_at",
+        "ends_at",
+        "products",
+        "categories",
+        "min_quantity",
+        "discount_percent",
+        "row",
+    )
+
+    def __init__(self, row: Dict[str, Any]):
+        self.id = row.get("id")
+        # Cupons da tabela base usam discount_type/discount_value/max_discount_amount
+        self.type = row.get("type") or row.get("discount_type") or "percentage"
+        self.value = _money(row.get("value") if row.get("value") is not None else row.get("discount_value"))
+        self.min_order_value = _money(row.get("min_order_value") or row.get("min_purchase_amount"))
+        max_discount = row.get("max_discount") or row.get("max_discount_amount")
+        self.max_discount = _money(max_discount) if max_discount else None
+        self.starts_at = parse_timestamp(row.get("valid_from"))
+        self.ends_at = parse_timestamp(row.get("valid_until"))
+        self.products = frozenset(str(pid) for pid in row.get("applicable_products") or ())
+        self.categories = frozenset(row.get("applicable_categories") or ())
+        self.min_quantity = max(int(row.get("min_quantity") or 2), 1)
+        self.discount_percent = _money(row.get("discount_percent") if row.get("discount_percent") is not None else 100)
+        self.row = row
+
+    @property
+    def restricted(self) -> bool:
+        return bool(self.products or self.categories)
+
+    def window_status(self, now: float) -> Optional[str]:
+        """None se vigente; 'pending' antes do início ou 'expired' após o fim"""
+        if self.starts_at is not None and now < self.starts_at:
+            return "pending"
+        if self.ends_at is not None and now > self.ends_at:
+            return "expired"
+        return None
+
+    def applies_to(self, groups: Dict[str, List[Any]]) -> bool:
+        """Se algum item do carrinho é de produto ou categoria aplicável"""
+        if not self.restricted:
+            return True
+        return any(pid in self.products or group[2] in self.categories for pid, group in groups.items())
+
+    def discount(self, order_value: float, groups: Optional[Dict[str, List[Any]]] = None) -> float:
+        """Valor do desconto para o pedido"""
+        if self.type == "percentage":
+            discount = order_value * (self.value / 100)
+        elif self.type == "fixed":
+            discount = self.value
+        else:
+            discount = self._bogo_discount(groups or {})
+        if self.max_discount:
+            discount = min(discount, self.max_discount)
+        return round(min(discount, order_value), 2)
+
+    def _bogo_discount(self, groups: Dict[str, List[Any]]) -> float:
+        total = 0.0
+        for product_id, (quantity, price, category) in groups.items():
+            if self.restricted and product_id not in self.products and category not in self.categories:
+                continue
+            total += price * (self.discount_percent / 100) * (quantity // self.min_quantity)
+        return total
+
+
+class CompiledCoupon(_CompiledRule):
+    """Cupom compilado"""
+
+    __slots__ = ("code", "usage_limit", "usage_count")
+
+    def __init__(self, row: Dict[str, Any]):
+        super().__init__(row)
+        self.code = str(row.get("code") or "").strip().upper()
+        self.usage_limit = int(row["usage_limit"]) if row.get("usage_limit") else None
+        self.usage_count = int(row.get("usage_count") or 0)
+
+
+class CompiledPromotion(_CompiledRule):
+    """Promoção compilada"""
+
+    __slots__ = ("priority", "rank")
+
+    def __init__(self, row: Dict[str, Any], rank: int):
+        super().__init__(row)
+        self.priority = int(row.get("priority") or 0)
+        # Posição na ordem de prioridade (menor = avaliada primeiro)
+        self.rank = rank
+
+
+class PromotionIndex:
+    """
+    Índice imutável de cupons e promoções ativos.
+
+    Construído por compile_index; pode ser compartilhado entre threads.
+    """
+
+    __slots__ = ("version", "_coupons", "_promotions", "_by_product", "_by_category", "_open", "_open_minimums")
+
+    def __init__(
+        self,
+        coupons: Iterable[Dict[str, Any]],
+        promotions: Iterable[Dict[str, Any]],
+        version: Any = None,
+    ):
+        """
+        Args:
+            coupons: Cupons ativos (linhas de coupons)
+            promotions: Promoções ativas (linhas de promotions)
+            version: Versão das regras no momento da compilação
+        """
+        self.version = version
+        self._coupons = {}
+        for row in coupons or ():
+            coupon = CompiledCoupon(row)
+            if coupon.code:
+                self._coupons[coupon.code] = coupon
+
+        # Ordenação estável: empate de prioridade mantém a ordem recebida
+        ordered = sorted((row for row in promotions or () if row), key=lambda row: -int(row.get("priority") or 0))
+        self._promotions = tuple(CompiledPromotion(row, rank) for rank, row in enumerate(ordered))
+
+        by_product: Dict[str, List[CompiledPromotion]] = {}
+        by_category: Dict[Any, List[CompiledPromotion]] = {}
+        open_promotions: List[CompiledPromotion] = []
+        for promotion in self._promotions:
+            for product_id in promotion.products:
+                by_product.setdefault(product_id, []).append(promotion)
+            for category in promotion.categories:
+                by_category.setdefault(category, []).append(promotion)
+            if not promotion.restricted:
+                open_promotions.append(promotion)
+        open_promotions.sort(key=lambda promotion: promotion.min_order_value)
+
+        self._by_product = {key: tuple(value) for key, value in by_product.items()}
+        self._by_category = {key: tuple(value) for key, value in by_category.items()}
+        self._open = tuple(open_promotions)
+        self._open_minimums = tuple(promotion.min_order_value for promotion in open_promotions)
+
+    def __len__(self) -> int:
+        return len(self._coupons) + len(self._promotions)
+
+    def coupon(self, code: str) -> Optional[CompiledCoupon]:
+        """Cupom ativo pelo código (None se não existe ou está inativo)"""
+        return self._coupons.get(str(code or "").strip().upper())
+
+    def evaluate(
+        self,
+        order_value: float,
+        items: Optional[Iterable[Dict[str, Any]]] = None,
+        product_ids: Optional[Iterable[str]] = None,
+        now: Optional[float] = None,
+    ) -> List[Tuple[CompiledPromotion, float]]:
+        """
+        Promoções aplicáveis a um carrinho, por prioridade (maior primeiro).
+
+        Args:
+            order_value: Valor do pedido
+            items: Itens com product_id, quantity, price e category (BOGO e categorias)
+            product_ids: IDs de produtos quando não há itens
+            now: Horário de referência (epoch, padrão: agora)
+
+        Returns:
+            Lista de (promoção, desconto)
+        """
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        groups = _group_items(items or ())
+        for product_id in product_ids or ():
+            groups.setdefault(str(product_id), [0, 0.0, None])
+
+        candidates: Dict[int, CompiledPromotion] = {}
+        for promotion in self._open[: bisect_right(self._open_minimums, order_value)]:
+            candidates[promotion.rank] = promotion
+        for product_id, group in groups.items():
+            for promotion in self._by_product.get(product_id, ()):
+                candidates[promotion.rank] = promotion
+            for promotion in self._by_category.get(group[2], ()) if group[2] is not None else ():
+                candidates[promotion.rank] = promotion
+
+        applicable = []
+        for rank in sorted(candidates):
+            promotion = candidates[rank]
+            if order_value < promotion.min_order_value or promotion.window_status(now):
+                continue
+            applicable.append((promotion, promotion.discount(order_value, groups)))
+        return applicable
+
+
+def compile_index(
+    coupons: Iterable[Dict[str, Any]], promotions: Iterable[Dict[str, Any]], version: Any = None
+) -> PromotionIndex:
+    """Compila cupons e promoções ativos"""
+    return PromotionIndex(coupons, promotions, version)
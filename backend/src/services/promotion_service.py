@@ -8,11 +8,15 @@ Gerencia promoções e cupons incluindo:
 - Controle de uso por usuário
 - Datas de validade
 - Produtos/categorias aplicáveis
+
+Validação de cupons e busca de promoções usam o índice em memória de
+services/promotion_engine.py; edições administrativas publicam nova versão.
 """
 
 import logging
 import secrets
 import string
+import time
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
@@ -21,6 +25,7 @@ from repositories.coupon_repository import CouponRepository
 from repositories.coupon_usage_repository import CouponUsageRepository
 from repositories.promotion_repository import PromotionRepository
 from services.base_service import BaseService
+from services.promotion_engine import promotion_engine
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +44,7 @@ class PromotionService(BaseService):
         self.coupon_repo = CouponRepository()
         self.usage_repo = CouponUsageRepository()
         self.promotion_repo = PromotionRepository()
+        self.engine = promotion_engine
 
     def create_coupon(self, coupon_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -86,6 +92,7 @@ class PromotionService(BaseService):
             created_coupon = self.coupon_repo.create(coupon)
 
             if created_coupon:
+                self.engine.invalidate()
                 return {"success": True, "coupon": created_coupon, "message": "Cupom criado com sucesso"}
             else:
                 return {"success": False, "error": "Erro ao criar cupom"}
@@ -102,44 +109,42 @@ class PromotionService(BaseService):
     ) -> Dict[str, Any]:
         """Valida um cupom para uso"""
         try:
-            coupon = self.coupon_repo.find_by_code(code, active_only=True)
+            compiled = self.engine.get_index().coupon(code)
 
-            if not coupon:
+            if not compiled:
                 return {"success": False, "error": "Cupom não encontrado ou inativo"}
+            coupon = compiled.row
 
             # Verifica validade temporal
-            now = datetime.now()
-            valid_from = datetime.fromisoformat(coupon["valid_from"])
-            valid_until = datetime.fromisoformat(coupon["valid_until"])
-
-            if now < valid_from:
+            window = compiled.window_status(time.time())
+            if window == "pending":
                 return {"success": False, "error": "Cupom ainda não é válido"}
 
-            if now > valid_until:
+            if window == "expired":
                 return {"success": False, "error": "Cupom expirado"}
 
             # Verifica valor mínimo do pedido
-            if order_value < coupon["min_order_value"]:
-                return {"success": False, "error": f'Valor mínimo do pedido: R$ {coupon["min_order_value"]:.2f}'}
+            if order_value < compiled.min_order_value:
+                return {"success": False, "error": f"Valor mínimo do pedido: R$ {compiled.min_order_value:.2f}"}
 
             # Verifica limite de uso geral
-            if coupon["usage_limit"]:
+            if coupon.get("usage_limit"):
                 usage_count = self.usage_repo.count_by_coupon(coupon["id"])
                 if usage_count >= coupon["usage_limit"]:
                     return {"success": False, "error": "Cupom esgotado"}
 
             # Verifica limite de uso por usuário
             user_usage_count = self.usage_repo.count_by_coupon_and_user(coupon["id"], user_id)
-            if user_usage_count >= coupon["usage_limit_per_user"]:
+            if user_usage_count >= (coupon.get("usage_limit_per_user") or 1):
                 return {"success": False, "error": "Limite de uso por usuário atingido"}
 
             # Verifica produtos aplicáveis
-            if coupon["applicable_products"] and product_ids:
-                if not any(pid in coupon["applicable_products"] for pid in product_ids):
+            if compiled.products and product_ids:
+                if compiled.products.isdisjoint(str(pid) for pid in product_ids):
                     return {"success": False, "error": "Cupom não aplicável aos produtos selecionados"}
 
             # Calcula desconto
-            discount = self._calculate_discount(coupon, order_value, order_items=None)
+            discount = compiled.discount(order_value)
 
             return {"success": True, "coupon": coupon, "discount": discount, "final_value": order_value - discount}
 
@@ -268,6 +273,7 @@ class PromotionService(BaseService):
             created_promotion = promotion_repo.create(promotion)
 
             if created_promotion:
+                self.engine.invalidate()
                 return {"success": True, "promotion": created_promotion, "message": "Promoção criada com sucesso"}
             else:
                 return {"success": False, "error": "Erro ao criar promoção"}
@@ -288,35 +294,16 @@ class PromotionService(BaseService):
         Args:
             order_value: Valor total do pedido
             product_ids: Lista de IDs de produtos (opcional)
-            order_items: Lista de itens do pedido com price e quantity (necessário para BOGO)
+            order_items: Lista de itens do pedido com price, quantity e category (BOGO e categorias)
         """
         try:
-            now = datetime.now().isoformat()
-
-            from repositories.promotion_repository import PromotionRepository
-
-            promotion_repo = PromotionRepository()
-            promotions_list = promotion_repo.find_applicable(
-                order_value=order_value, valid_from=now, valid_until=now, product_ids=product_ids
-            )
-
-            applicable_promotions = []
-
-            for promotion in promotions_list:
-                # Verifica se aplica aos produtos
-                if promotion["applicable_products"] and product_ids:
-                    if not any(pid in promotion["applicable_products"] for pid in product_ids):
-                        continue
-
-                # Calcula desconto (BOGO precisa dos itens do pedido)
-                discount = self._calculate_discount(promotion, order_value, order_items)
+            # Índice em memória: todas as promoções avaliadas em uma passada
+            evaluated = self.engine.get_index().evaluate(order_value, items=order_items, product_ids=product_ids)
 
-                applicable_promotions.append(
-                    {"promotion": promotion, "discount": discount, "final_value": order_value - discount}
-                )
-
-            # Ordena por prioridade
-            applicable_promotions.sort(key=lambda x: x["promotion"]["priority"], reverse=True)
+            applicable_promotions = [
+                {"promotion": promotion.row, "discount": discount, "final_value": order_value - discount}
+                for promotion, discount in evaluated
+            ]
 
             return {"success": True, "promotions": applicable_promotions}
 
@@ -364,97 +351,53 @@ class PromotionService(BaseService):
 
         return {"valid": True}
 
-    def _calculate_discount(
-        self, promotion_or_coupon: Dict[str, Any], order_value: float, order_items: List[Dict[str, Any]] = None
-    ) -> float:
+    def update_coupon(self, coupon_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Calcula valor do desconto.
-        
+        Atualiza um cupom.
+
         Args:
-            promotion_or_coupon: Dados da promoção ou cupom
-            order_value: Valor total do pedido
-            order_items: Lista de itens do pedido (necessário para BOGO)
-        
+            coupon_id: ID do cupom
+            data: Dados para atualizar
+
         Returns:
-            Valor do desconto calculado
+            Dict com success e coupon ou error
         """
-        if promotion_or_coupon["type"] == "percentage":
-            discount = order_value * (promotion_or_coupon["value"] / 100)
-        elif promotion_or_coupon["type"] == "fixed":
-            discount = promotion_or_coupon["value"]
-        else:  # bogo
-            discount = self._calculate_bogo_discount(promotion_or_coupon, order_items or [])
-
-        # Aplica desconto máximo se definido
-        if promotion_or_coupon.get("max_discount"):
-            discount = min(discount, promotion_or_coupon["max_discount"])
-
-        # Não permite desconto maior que o valor do pedido
-        return min(discount, order_value)
+        try:
+            updated_coupon = self.coupon_repo.update(coupon_id, data)
+            if updated_coupon:
+                self.engine.invalidate()
+                return {"success": True, "coupon": updated_coupon}
+            else:
+                return {"success": False, "error": "Erro ao atualizar cupom"}
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {"success": False, "error": str(e)}
+        except Exception as e:
+            logger.error(f"Erro ao atualizar cupom {coupon_id}: {str(e)}", exc_info=True)
+            return {"success": False, "error": str(e)}
 
-    def _calculate_bogo_discount(self, promotion: Dict[str, Any], order_items: List[Dict[str, Any]]) -> float:
+    def delete_coupon(self, coupon_id: str) -> Dict[str, Any]:
         """
-        Calcula desconto para promoção BOGO (Buy One Get One).
-        
-        Lógica:
-        - Se min_quantity = 2 e discount_percent = 100: compre 2, ganhe 1 grátis
-        - Se min_quantity = 2 e discount_percent = 50: compre 2, ganhe 1 com 50% de desconto
-        - Aplica desconto no item mais barato quando há múltiplos
-        
+        Deleta um cupom.
+
         Args:
-            promotion: Dados da promoção (deve ter min_quantity e discount_percent)
-            order_items: Lista de itens do pedido com 'price' e 'quantity'
-        
+            coupon_id: ID do cupom
+
         Returns:
-            Valor total do desconto BOGO
+            Dict com success ou error
         """
-        if not order_items:
-            return 0.0
-
-        # Parâmetros da promoção BOGO
-        min_quantity = promotion.get("min_quantity", 2)  # Quantidade mínima para ativar
-        discount_percent = promotion.get("discount_percent", 100)  # Percentual de desconto (100 = grátis)
-        applicable_product_ids = promotion.get("applicable_products", [])
-
-        total_discount = 0.0
-
-        # Agrupar itens por produto
-        items_by_product = {}
-        for item in order_items:
-            product_id = item.get("product_id")
-            if not product_id:
-                continue
-
-            # Se há produtos aplicáveis, verificar se este produto está na lista
-            if applicable_product_ids and product_id not in applicable_product_ids:
-                continue
-
-            if product_id not in items_by_product:
-                items_by_product[product_id] = {
-                    "price": float(item.get("price", 0)),
-                    "quantity": 0,
-                    "items": []
-                }
-
-            quantity = int(item.get("quantity", 0))
-            items_by_product[product_id]["quantity"] += quantity
-            items_by_product[product_id]["items"].append(item)
-
-        # Calcular desconto para cada produto
-        for product_id, product_data in items_by_product.items():
-            quantity = product_data["quantity"]
-            price = product_data["price"]
-
-            # Quantos itens recebem desconto?
-            # Ex: min_quantity=2, quantity=5 -> 5//2 = 2 itens com desconto
-            items_with_discount = quantity // min_quantity
-
-            if items_with_discount > 0:
-                # Aplicar desconto no item mais barato (ou nos itens mais baratos)
-                discount_per_item = price * (discount_percent / 100)
-                total_discount += discount_per_item * items_with_discount
-
-        return total_discount
+        try:
+            if self.coupon_repo.delete(coupon_id):
+                self.engine.invalidate()
+                return {"success": True, "message": "Cupom deletado com sucesso"}
+            else:
+                return {"success": False, "error": "Erro ao deletar cupom"}
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {"success": False, "error": str(e)}
+        except Exception as e:
+            logger.error(f"Erro ao deletar cupom {coupon_id}: {str(e)}", exc_info=True)
+            return {"success": False, "error": str(e)}
 
     def get_promotion(self, promotion_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -489,6 +432,7 @@ class PromotionService(BaseService):
         try:
             updated_promotion = self.promotion_repo.update_promotion(promotion_id, data)
             if updated_promotion:
+                self.engine.invalidate()
                 return {"success": True, "promotion": updated_promotion}
             else:
                 return {"success": False, "error": "Erro ao atualizar promoção"}
@@ -512,6 +456,7 @@ class PromotionService(BaseService):
         try:
             success = self.promotion_repo.delete_promotion(promotion_id)
             if success:
+                self.engine.invalidate()
                 return {"success": True, "message": "Promoção deletada com sucesso"}
             else:
                 return {"success": False, "error": "Erro ao deletar promoção"}
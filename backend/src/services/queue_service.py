@@ -17,6 +17,9 @@ FILAS DISPONÍVEIS:
 - reports: Geração de relatórios
 - ai_processing: Processamento de IA
 - data_sync: Sincronização de dados
+- exports: Exportações de dados do usuário (LGPD)
+- social_fanout: Distribuição de posts nas timelines dos seguidores
+- social_notifications: Eventos de notificação social (agrupados em lote)
 """
 
 import json
@@ -25,12 +28,45 @@ import os
 import time
 from datetime import datetime
 from functools import wraps
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import redis
 
 logger = logging.getLogger(__name__)
 
+# KEYS: filas por prioridade (alta -> baixa), lista de processamento; ARGV: máximo
+# Cada tarefa sai da fila e entra na lista de processamento no mesmo passo
+_CLAIM = """
+local items = {}
+for i = 1, #KEYS - 1 do
+    while #items < tonumber(ARGV[1]) do
+        local item = redis.call('RPOPLPUSH', KEYS[i], KEYS[#KEYS])
+        if not item then
+            break
+        end
+        items[#items + 1] = item
+    end
+end
+return items
+"""
+
+# KEYS: filas por prioridade (alta -> baixa), sorted set de acompanhamento;
+# ARGV: timestamp, campo de data com o id do job
+# O job entra no sorted set no mesmo passo em que sai da fila
+_DEQUEUE_TRACKED = """
+for i = 1, #KEYS - 1 do
+    local item = redis.call('RPOP', KEYS[i])
+    if item then
+        local data = cjson.decode(item)['data']
+        if type(data) == 'table' and data[ARGV[2]] then
+            redis.call('ZADD', KEYS[#KEYS], ARGV[1], data[ARGV[2]])
+        end
+        return item
+    end
+end
+return false
+"""
+
 
 class RedisQueueService:
     """
@@ -106,24 +142,26 @@ class RedisQueueService:
                 "attempts": 0,
                 "max_attempts": 3,
             }
-
-            if delay > 0:
-                # Tarefa com delay (usando sorted set)
-                score = time.time() + delay
-                self.redis_client.zadd(f"{queue_name}_delayed", {json.dumps(task): score})
-                logger.info(f"Tarefa adicionada à fila {queue_name} com delay de {delay}s")
-            else:
-                # Tarefa imediata (usando list com prioridade)
-                priority_key = f"{queue_name}_priority_{priority}"
-                self.redis_client.lpush(priority_key, json.dumps(task))
-                logger.info(f"Tarefa adicionada à fila {queue_name} com prioridade {priority}")
-
+            self._push(queue_name, task, delay)
             return True
 
         except Exception as e:
             logger.error(f"Erro ao adicionar tarefa à fila {queue_name}: {e}")
             return False
 
+    def _push(self, queue_name: str, task: Dict[str, Any], delay: int = 0):
+        """Grava a tarefa (já montada) na fila de prioridade ou de delay"""
+        if delay > 0:
+            # Tarefa com delay (usando sorted set)
+            score = time.time() + delay
+            self.redis_client.zadd(f"{queue_name}_delayed", {json.dumps(task): score})
+            logger.info(f"Tarefa adicionada à fila {queue_name} com delay de {delay}s")
+        else:
+            # Tarefa imediata (usando list com prioridade)
+            priority_key = f"{queue_name}_priority_{task['priority']}"
+            self.redis_client.lpush(priority_key, json.dumps(task))
+            logger.info(f"Tarefa adicionada à fila {queue_name} com prioridade {task['priority']}")
+
     def dequeue_task(self, queue_name: str, priority: int = 1) -> Optional[Dict[str, Any]]:
         """
         Remove e retorna a próxima tarefa da fila
@@ -140,16 +178,7 @@ class RedisQueueService:
 
         try:
             # Primeiro, verifica tarefas com delay
-            delayed_tasks = self.redis_client.zrangebyscore(f"{queue_name}_delayed", 0, time.time())
-
-            if delayed_tasks:
-                # Move tarefas com delay para fila de prioridade
-                for task_json in delayed_tasks:
-                    task = json.loads(task_json)
-                    priority_key = f"{queue_name}_priority_{task['priority']}"
-                    self.redis_client.lpush(priority_key, task_json)
-                    self.redis_client.zrem(f"{queue_name}_delayed", task_json)
-                    logger.info(f"Tarefa movida da fila de delay para prioridade {task['priority']}")
+            self._move_due_delayed(queue_name)
 
             # Processa por prioridade (alta -> normal -> baixa)
             priorities = [2, 1, 0] if priority == 1 else [priority]
@@ -169,6 +198,193 @@ class RedisQueueService:
             logger.error(f"Erro ao remover tarefa da fila {queue_name}: {e}")
             return None
 
+    def dequeue_tracked(self, queue_name: str, tracking_key: str, id_field: str) -> Optional[Dict[str, Any]]:
+        """
+        Remove a próxima tarefa e registra seu id em um sorted set de acompanhamento
+
+        A retirada e o registro (score = agora) acontecem no mesmo script: se o
+        worker cair logo após retirar a tarefa, ela já aparece em tracking_key
+        e pode ser recuperada por quem varre os jobs parados.
+
+        Args:
+            queue_name: Nome da fila
+            tracking_key: Sorted set {id: heartbeat}
+            id_field: Campo de task["data"] com o id registrado
+
+        Returns:
+            Dict com dados da tarefa ou None se não houver tarefas
+        """
+        if not self.is_connected():
+            return None
+
+        try:
+            self._move_due_delayed(queue_name)
+
+            keys = [f"{queue_name}_priority_{p}" for p in [2, 1, 0]] + [tracking_key]
+            task_json = self.redis_client.eval(_DEQUEUE_TRACKED, len(keys), *keys, time.time(), id_field)
+            if not task_json:
+                return None
+            logger.info(f"Tarefa removida da fila {queue_name} e registrada em {tracking_key}")
+            return json.loads(task_json)
+
+        except Exception as e:
+            logger.error(f"Erro ao remover tarefa da fila {queue_name}: {e}")
+            return None
+
+    def dequeue_batch(self, queue_name: str, max_items: int = 100) -> List[Dict[str, Any]]:
+        """
+        Remove e retorna até max_items tarefas da fila (no máximo uma entrega)
+
+        Cada prioridade é lida com LRANGE + LTRIM em uma transação (uma ida
+        ao Redis por prioridade, em vez de um RPOP por tarefa). O lote sai do
+        Redis antes de ser processado: se o worker cair antes de processá-lo
+        (ou de recolocar as falhas com retry), as tarefas se perdem. Filas
+        que não podem perder tarefas usam claim_batch/ack_tasks.
+
+        Args:
+            queue_name: Nome da fila
+            max_items: Máximo de tarefas retornadas
+
+        Returns:
+            Lista de tarefas (alta -> normal -> baixa, mais antigas primeiro)
+        """
+        if not self.is_connected() or max_items <= 0:
+            return []
+
+        try:
+            self._move_due_delayed(queue_name)
+
+            tasks: List[Dict[str, Any]] = []
+            for p in [2, 1, 0]:
+                remaining = max_items - len(tasks)
+                if remaining <= 0:
+                    break
+                priority_key = f"{queue_name}_priority_{p}"
+                pipe = self.redis_client.pipeline(transaction=True)
+                pipe.lrange(priority_key, -remaining, -1)
+                pipe.ltrim(priority_key, 0, -(remaining + 1))
+                items, _ = pipe.execute()
+                # LPUSH insere à esquerda: as mais antigas estão no fim da lista
+                tasks.extend(json.loads(task_json) for task_json in reversed(items))
+
+            if tasks:
+                logger.debug(f"{len(tasks)} tarefas removidas da fila {queue_name}")
+            return tasks
+
+        except Exception as e:
+            logger.error(f"Erro ao remover lote da fila {queue_name}: {e}")
+            return []
+
+    @staticmethod
+    def _processing_key(queue_name: str, consumer: Optional[str] = None) -> str:
+        """Lista de processamento da fila (uma por consumidor, se informado)"""
+        return f"{queue_name}_processing_{consumer}" if consumer else f"{queue_name}_processing"
+
+    def claim_batch(self, queue_name: str, max_items: int = 100, consumer: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Retira até max_items tarefas da fila sem perdê-las em caso de falha
+
+        As tarefas passam para a lista {queue_name}_processing no mesmo script
+        que as retira da fila e só saem dela com ack_tasks. Se o worker cair
+        antes do ack, requeue_unacked devolve as tarefas à fila.
+
+        Args:
+            queue_name: Nome da fila
+            max_items: Máximo de tarefas retornadas
+            consumer: ID estável da instância, quando a fila tem mais de um
+                consumidor (cada um com a própria lista de processamento)
+
+        Returns:
+            Lista de tarefas (alta -> normal -> baixa, mais antigas primeiro);
+            cada uma traz em "receipt" o valor usado no ack
+        """
+        if not self.is_connected() or max_items <= 0:
+            return []
+
+        try:
+            self._move_due_delayed(queue_name)
+
+            keys = [f"{queue_name}_priority_{p}" for p in [2, 1, 0]] + [self._processing_key(queue_name, consumer)]
+            items = self.redis_client.eval(_CLAIM, len(keys), *keys, max_items) or []
+            tasks = []
+            for task_json in items:
+                task = json.loads(task_json)
+                task["receipt"] = task_json
+                tasks.append(task)
+
+            if tasks:
+                logger.debug(f"{len(tasks)} tarefas retiradas da fila {queue_name}")
+            return tasks
+
+        except Exception as e:
+            logger.error(f"Erro ao retirar lote da fila {queue_name}: {e}")
+            return []
+
+    def ack_tasks(self, queue_name: str, tasks: List[Dict[str, Any]], consumer: Optional[str] = None) -> bool:
+        """
+        Confirma tarefas de claim_batch (concluídas ou já recolocadas para retry)
+
+        Returns:
+            bool: True se as tarefas saíram da lista de processamento
+        """
+        if not self.is_connected() or not tasks:
+            return False
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for task in tasks:
+                pipe.lrem(self._processing_key(queue_name, consumer), 1, task["receipt"])
+            pipe.execute()
+            return True
+
+        except Exception as e:
+            logger.error(f"Erro ao confirmar tarefas da fila {queue_name}: {e}")
+            return False
+
+    def requeue_unacked(self, queue_name: str, consumer: Optional[str] = None) -> int:
+        """
+        Devolve à fila as tarefas retiradas e não confirmadas (worker caiu)
+
+        Só deve ser chamado pelo dono da lista de processamento (o único
+        consumidor da fila, ou o consumer informado), antes de retirar
+        novas tarefas. As tarefas voltam para a frente da fila, na ordem em
+        que tinham sido retiradas.
+
+        Returns:
+            Número de tarefas devolvidas
+        """
+        if not self.is_connected():
+            return 0
+
+        try:
+            processing = self._processing_key(queue_name, consumer)
+            # LPUSH na lista de processamento: as retiradas por último estão à esquerda
+            items = self.redis_client.lrange(processing, 0, -1)
+            if not items:
+                return 0
+            pipe = self.redis_client.pipeline(transaction=True)
+            for task_json in items:
+                pipe.rpush(f"{queue_name}_priority_{json.loads(task_json)['priority']}", task_json)
+                pipe.lrem(processing, 1, task_json)
+            pipe.execute()
+            logger.warning(f"{len(items)} tarefas não confirmadas devolvidas à fila {queue_name}")
+            return len(items)
+
+        except Exception as e:
+            logger.error(f"Erro ao devolver tarefas não confirmadas da fila {queue_name}: {e}")
+            return 0
+
+    def _move_due_delayed(self, queue_name: str):
+        """Move tarefas com delay vencido para a fila de prioridade"""
+        delayed_tasks = self.redis_client.zrangebyscore(f"{queue_name}_delayed", 0, time.time())
+
+        for task_json in delayed_tasks:
+            task = json.loads(task_json)
+            priority_key = f"{queue_name}_priority_{task['priority']}"
+            self.redis_client.lpush(priority_key, task_json)
+            self.redis_client.zrem(f"{queue_name}_delayed", task_json)
+            logger.info(f"Tarefa movida da fila de delay para prioridade {task['priority']}")
+
     def get_queue_stats(self, queue_name: str) -> Dict[str, Any]:
         """
         Retorna estatísticas da fila
@@ -248,7 +464,9 @@ class RedisQueueService:
             return False
 
         try:
-            task["attempts"] += 1
+            # A tarefa volta com o próprio contador de tentativas (sem o receipt de claim_batch)
+            task = {key: value for key, value in task.items() if key != "receipt"}
+            task["attempts"] = int(task.get("attempts") or 0) + 1
 
             if task["attempts"] >= task["max_attempts"]:
                 # Tarefa falhou demais, move para fila de falhas
@@ -258,7 +476,8 @@ class RedisQueueService:
 
             # Recoloca na fila com delay exponencial
             delay = min(60 * (2 ** task["attempts"]), 3600)  # Max 1 hora
-            return self.enqueue_task(queue_name, task["data"], task["priority"], delay)
+            self._push(queue_name, task, delay)
+            return True
 
         except Exception as e:
             logger.error(f"Erro ao fazer retry da tarefa {task.get('id', 'unknown')}: {e}")
@@ -351,6 +570,13 @@ class QueueNames:
     REPORTS = "reports"
     AI_PROCESSING = "ai_processing"
     DATA_SYNC = "data_sync"
+    EXPORTS = "exports"
+    SOCIAL_FANOUT = "social_fanout"
+    SOCIAL_NOTIFICATIONS = "social_notifications"
+    GAMIFICATION_EVENTS = "gamification_events"
+    DIRECT_MESSAGES = "direct_messages"
+    STOCK_LEDGER = "stock_ledger"
+    WEBHOOKS = "webhooks"
 
 
 # Exemplos de uso
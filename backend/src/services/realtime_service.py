@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Serviço de Eventos em Tempo Real RE-EDUCA Store.
+
+Envia eventos Socket.IO para a sala privada de cada usuário (user_{user_id}),
+na qual WebSocketService.on_connect coloca toda conexão autenticada, e para
+as salas de transmissões ao vivo (stream_{id}):
+- No processo web, usa a instância SocketIO do app (init_app)
+- Em workers, emite pela fila de mensagens do Socket.IO no Redis (REDIS_URL),
+  a mesma configurada no app
+
+Sem SocketIO disponível os eventos são descartados: o cliente recebe o
+estado atual na próxima conexão.
+"""
+import logging
+import os
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+USER_ROOM = "user_{user_id}"
+
+
+class RealtimeService:
+    """
+    Emissor de eventos Socket.IO por usuário.
+
+    Nota: Não herda de BaseService pois é um serviço especializado de infraestrutura.
+    """
+
+    def __init__(self):
+        """Inicializa o emissor sem SocketIO (configurado sob demanda)."""
+        self._socketio = None
+        self._external_checked = False
+
+    def init_app(self, socketio):
+        """
+        Usa a instância SocketIO do app.
+
+        Args:
+            socketio: Instância do Flask-SocketIO
+        """
+        self._socketio = socketio
+
+    @property
+    def socketio(self):
+        """SocketIO do app ou emissor externo via Redis (None se indisponível)"""
+        if self._socketio is None and not self._external_checked:
+            self._external_checked = True
+            redis_url = os.environ.get("REDIS_URL")
+            if redis_url:
+                try:
+                    from flask_socketio import SocketIO
+
+                    self._socketio = SocketIO(message_queue=redis_url)
+                except Exception as e:
+                    logger.warning(f"Emissor Socket.IO externo indisponível: {str(e)}")
+        return self._socketio
+
+    def emit_to_user(self, user_id: str, event: str, payload: Dict[str, Any]) -> bool:
+        """
+        Envia um evento para todas as conexões de um usuário.
+
+        Args:
+            user_id: ID do usuário
+            event: Nome do evento
+            payload: Dados do evento
+
+        Returns:
+            True se o evento foi enviado
+        """
+        socketio = self.socketio
+        if not socketio or not user_id:
+            return False
+        try:
+            socketio.emit(event, payload, room=USER_ROOM.format(user_id=user_id), namespace="/")
+            return True
+        except Exception as e:
+            logger.warning(f"Erro ao enviar evento {event} para {user_id}: {str(e)}")
+            return False
+
+    def emit_to_room(self, room: str, event: str, payload: Dict[str, Any]) -> bool:
+        """
+        Envia um evento para todas as conexões de uma sala (ex.: stream_{id}).
+
+        Args:
+            room: Nome da sala
+            event: Nome do evento
+            payload: Dados do evento
+
+        Returns:
+            True se o evento foi enviado
+        """
+        socketio = self.socketio
+        if not socketio or not room:
+            return False
+        try:
+            socketio.emit(event, payload, room=room, namespace="/")
+            return True
+        except Exception as e:
+            logger.warning(f"Erro ao enviar evento {event} para a sala {room}: {str(e)}")
+            return False
+
+
+realtime_service = RealtimeService()
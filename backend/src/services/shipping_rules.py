@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Regras de Frete Compiladas RE-EDUCA Store.
+
+As regras ativas de shipping_rules são compiladas em uma estrutura imutável
+avaliada sem acesso ao banco:
+- Regras ordenadas por prioridade (maior primeiro); a posição na ordem é o
+  bit da regra
+- Índice de intervalos por valor do pedido (centavos) e por faixa de CEP:
+  cada intervalo elementar guarda a máscara de bits das regras que o cobrem
+- A avaliação faz uma busca binária em cada índice e um AND das máscaras;
+  o bit mais baixo é a regra de maior prioridade que atende o pedido
+
+Mantém a semântica do cálculo anterior: min_order_value e max_order_value
+inclusivos, max_order_value vazio ou zero = sem limite.
+"""
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+def _cents(value: Any) -> int:
+    """Valor monetário em centavos"""
+    return int(round(float(value or 0) * 100))
+
+
+def normalize_cep(cep: Any) -> Optional[int]:
+    """CEP como inteiro de 8 dígitos (None se inválido)"""
+    digits = "".join(ch for ch in str(cep or "") if ch.isdigit())
+    return int(digits) if len(digits) == 8 else None
+
+
+class _IntervalIndex:
+    """Máscaras de regras por intervalo elementar [points[i], points[i + 1])"""
+
+    __slots__ = ("points", "masks")
+
+    def __init__(self, ranges: Sequence[Tuple[int, Optional[int], int]]):
+        """
+        Args:
+            ranges: Lista de (início inclusivo, fim exclusivo ou None, bit da regra)
+        """
+        points = sorted({start for start, _, _ in ranges} | {end for _, end, _ in ranges if end is not None})
+        masks = [0] * len(points)
+        for start, end, bit in ranges:
+            first = bisect_right(points, start) - 1
+            last = len(points) if end is None else bisect_right(points, end) - 1
+            for i in range(first, last):
+                masks[i] |= bit
+        self.points = tuple(points)
+        self.masks = tuple(masks)
+
+    def lookup(self, value: int) -> int:
+        """Máscara das regras cujo intervalo contém value"""
+        i = bisect_right(self.points, value) - 1
+        return self.masks[i] if i >= 0 else 0
+
+
+class CompiledShippingRule:
+    """Regra de frete com valores normalizados (somente leitura por convenção)"""
+
+    __slots__ = ("id", "name", "priority", "shipping_cost", "free_shipping_threshold")
+
+    def __init__(self, rule: Dict[str, Any]):
+        self.id = rule.get("id")
+        self.name = rule.get("name") or "Regra padrão"
+        self.priority = int(rule.get("priority") or 0)
+        cost, threshold = rule.get("shipping_cost"), rule.get("free_shipping_threshold")
+        self.shipping_cost = float(cost) if cost else None
+        self.free_shipping_threshold = float(threshold) if threshold else None
+
+
+class ShippingRuleSet:
+    """
+    Conjunto imutável de regras de frete compiladas.
+
+    Construído por compile_rules; pode ser compartilhado entre threads.
+    """
+
+    __slots__ = ("version", "rules", "_by_value", "_by_cep", "_nationwide")
+
+    def __init__(self, rules: Iterable[Dict[str, Any]], version: Any = None):
+        """
+        Args:
+            rules: Regras ativas (linhas de shipping_rules)
+            version: Versão das regras no momento da compilação
+        """
+        # Ordenação estável: empate de prioridade mantém a ordem recebida
+        ordered = sorted((rule for rule in rules if rule), key=lambda rule: -int(rule.get("priority") or 0))
+        value_ranges: List[Tuple[int, Optional[int], int]] = []
+        cep_ranges: List[Tuple[int, Optional[int], int]] = []
+        nationwide = 0
+        for position, rule in enumerate(ordered):
+            bit = 1 << position
+            max_order = rule.get("max_order_value")
+            min_cents = _cents(rule.get("min_order_value"))
+            value_ranges.append((min_cents, _cents(max_order) + 1 if max_order else None, bit))
+            cep_start, cep_end = normalize_cep(rule.get("cep_start")), normalize_cep(rule.get("cep_end"))
+            if cep_start is None or cep_end is None:
+                nationwide |= bit
+                cep_ranges.append((0, None, bit))
+            else:
+                cep_ranges.append((cep_start, cep_end + 1, bit))
+
+        self.version = version
+        self.rules = tuple(CompiledShippingRule(rule) for rule in ordered)
+        self._by_value = _IntervalIndex(value_ranges)
+        self._by_cep = _IntervalIndex(cep_ranges)
+        self._nationwide = nationwide
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def match(self, order_total: float, cep: Any = None) -> Optional[CompiledShippingRule]:
+        """
+        Regra de maior prioridade que atende o pedido.
+
+        Args:
+            order_total: Valor do pedido
+            cep: CEP de destino; sem CEP válido só valem regras sem faixa
+
+        Returns:
+            Regra ou None se nenhuma atende
+        """
+        cep_value = normalize_cep(cep)
+        cep_mask = self._nationwide if cep_value is None else self._by_cep.lookup(cep_value)
+        mask = self._by_value.lookup(_cents(order_total)) & cep_mask
+        if not mask:
+            return None
+        return self.rules[(mask & -mask).bit_length() - 1]
+
+
+def compile_rules(rules: Iterable[Dict[str, Any]], version: Any = None) -> ShippingRuleSet:
+    """Compila as regras ativas de frete"""
+    return ShippingRuleSet(rules, version)
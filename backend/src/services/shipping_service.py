@@ -7,15 +7,30 @@ Gerencia cálculo de frete incluindo:
 - Cálculo por peso e dimensões usando API dos Correios
 - Cálculo por CEP de origem e destino
 - Múltiplas opções de frete (PAC, SEDEX, etc)
+
+As regras ativas ficam compiladas em memória (services/shipping_rules.py),
+compartilhadas entre instâncias do service. A versão em
+shipping:rules:version (incrementada quando um admin altera regras) é
+conferida a cada RULES_CHECK_SECONDS; sem Redis, ou para alterações feitas
+direto no banco, as regras são recarregadas após RULES_MAX_AGE.
 """
 
 import logging
+import threading
+import time
 from typing import Any, Dict, List, Optional
 
 from repositories.shipping_repository import ShippingRepository
+from services.cache_service import cache_service
+from services.shipping_rules import ShippingRuleSet, compile_rules, normalize_cep
 
 logger = logging.getLogger(__name__)
 
+RULES_VERSION_KEY = "shipping:rules:version"
+RULES_CHECK_SECONDS = 2
+RULES_MAX_AGE = 300
+MAX_BATCH_CARTS = 500
+
 
 class ShippingService:
     """
@@ -24,6 +39,11 @@ class ShippingService:
     Suporta cálculo básico por regras e cálculo avançado usando API dos Correios.
     """
 
+    _ruleset: Optional[ShippingRuleSet] = None
+    _ruleset_loaded_at = 0.0
+    _ruleset_checked_at = 0.0
+    _ruleset_lock = threading.Lock()
+
     def __init__(self):
         """Inicializa o serviço de frete."""
         self.repo = ShippingRepository()
@@ -109,50 +129,8 @@ class ShippingService:
                                 }
             
             # Fallback: usar regras configuradas
-            rules = self.repo.find_active_rules(order_by="priority", desc=True)
-
-            # Se não houver regras, usar padrão
-            if not rules:
-                return self._apply_default_rule(order_total)
-
-            # Aplicar primeira regra que atender os critérios
-            for rule in rules:
-                min_order = float(rule.get("min_order_value", 0) or 0)
-                max_order = rule.get("max_order_value")
-                free_threshold = rule.get("free_shipping_threshold")
-
-                # Verificar se o valor do pedido está dentro do range
-                if order_total < min_order:
-                    continue
-
-                if max_order and order_total > float(max_order):
-                    continue
-
-                # Verificar frete grátis
-                if free_threshold and order_total >= float(free_threshold):
-                    return {
-                        "shipping_cost": 0,
-                        "is_free": True,
-                        "message": "Frete grátis!",
-                        "rule_name": rule.get("name", "Regra padrão"),
-                        "calculated_by": "rules",
-                    }
-
-                # Calcular frete baseado na regra
-                shipping_cost = float(
-                    rule.get("shipping_cost", self.default_shipping_cost) or self.default_shipping_cost
-                )
-
-                return {
-                    "shipping_cost": round(shipping_cost, 2),
-                    "is_free": False,
-                    "message": f"Frete: R$ {shipping_cost:.2f}",
-                    "rule_name": rule.get("name", "Regra padrão"),
-                    "calculated_by": "rules",
-                }
-
-            # Se nenhuma regra se aplicou, usar padrão
-            return self._apply_default_rule(order_total)
+            cep = (address or {}).get("cep") or (address or {}).get("postal_code")
+            return self._apply_rules(self.get_rules(), order_total, cep)
 
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -161,6 +139,185 @@ class ShippingService:
             self.logger.error(f"Erro ao calcular frete: {str(e)}", exc_info=True)
             return self._apply_default_rule(order_total)
 
+    def calculate_shipping_batch(self, carts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Calcula o frete por regras de vários carrinhos de uma vez (campanhas
+        de carrinho abandonado, prévia do carrinho), sem consultar o banco.
+
+        Args:
+            carts: Lista de {order_total, cep} (ou address com cep)
+
+        Returns:
+            Lista de resultados na ordem dos carrinhos, no formato de calculate_shipping
+        """
+        ruleset = self.get_rules()
+        results = []
+        for cart in carts:
+            try:
+                order_total = float(cart.get("order_total") or 0)
+                address = cart.get("address") or {}
+                cep = cart.get("cep") or address.get("cep") or address.get("postal_code")
+                results.append(self._apply_rules(ruleset, order_total, cep))
+            except (ValueError, TypeError, AttributeError):
+                results.append(self._apply_default_rule(0))
+        return results
+
+    def _apply_rules(self, ruleset: ShippingRuleSet, order_total: float, cep: Any = None) -> Dict[str, Any]:
+        """Aplica a regra de maior prioridade que atende o pedido (ou a regra padrão)"""
+        rule = ruleset.match(order_total, cep)
+        if rule is None:
+            return self._apply_default_rule(order_total)
+
+        # Verificar frete grátis
+        if rule.free_shipping_threshold and order_total >= rule.free_shipping_threshold:
+            return {
+                "shipping_cost": 0,
+                "is_free": True,
+                "message": "Frete grátis!",
+                "rule_name": rule.name,
+                "calculated_by": "rules",
+            }
+
+        shipping_cost = rule.shipping_cost or self.default_shipping_cost
+        return {
+            "shipping_cost": round(shipping_cost, 2),
+            "is_free": False,
+            "message": f"Frete: R$ {shipping_cost:.2f}",
+            "rule_name": rule.name,
+            "calculated_by": "rules",
+        }
+
+    # =====================================================
+    # REGRAS COMPILADAS
+    # =====================================================
+
+    def get_rules(self) -> ShippingRuleSet:
+        """
+        Regras ativas compiladas, recarregadas quando a versão muda.
+
+        Se a leitura do banco falha, as regras anteriores continuam valendo
+        (sem avançar a versão, então a próxima conferência tenta de novo).
+        Um conjunto vazio não fica em cache.
+
+        Returns:
+            ShippingRuleSet atual
+        """
+        cls = ShippingService
+        ruleset, now = cls._ruleset, time.monotonic()
+        if ruleset is not None and now - cls._ruleset_loaded_at < RULES_MAX_AGE:
+            if now - cls._ruleset_checked_at < RULES_CHECK_SECONDS:
+                return ruleset
+            cls._ruleset_checked_at = now
+            version = self._rules_version()
+            if version == ruleset.version:
+                return ruleset
+        else:
+            version = self._rules_version()
+
+        with cls._ruleset_lock:
+            current = cls._ruleset
+            if current is not None and current is not ruleset and current.version == version:
+                # Outra thread já recarregou
+                return current
+            rules = self.repo.find_active_rules(order_by="priority", desc=True)
+            if rules is None and current is not None:
+                # Nova tentativa em RULES_CHECK_SECONDS (também quando venceu RULES_MAX_AGE)
+                now = time.monotonic()
+                cls._ruleset_checked_at = now
+                cls._ruleset_loaded_at = max(cls._ruleset_loaded_at, now - RULES_MAX_AGE + RULES_CHECK_SECONDS)
+                self.logger.warning(f"Erro ao recarregar regras de frete, mantendo a versão {current.version}")
+                return current
+            compiled = compile_rules(rules or [], version)
+            if not rules:
+                # Falha sem regras anteriores ou nenhuma regra ativa: usa o frete padrão sem cache
+                cls._ruleset = None
+                return compiled
+            cls._ruleset = compiled
+            cls._ruleset_loaded_at = cls._ruleset_checked_at = time.monotonic()
+            self.logger.info(f"Regras de frete compiladas: {len(compiled)} regra(s), versão {version}")
+            return compiled
+
+    def _rules_version(self) -> Optional[str]:
+        """Versão das regras no Redis (None sem Redis)"""
+        try:
+            if cache_service.redis_client:
+                return cache_service.redis_client.get(RULES_VERSION_KEY)
+        except Exception as e:
+            self.logger.warning(f"Erro ao ler versão das regras de frete: {str(e)}")
+        return None
+
+    def invalidate_rules(self):
+        """Publica nova versão das regras (todos os processos recarregam em até RULES_CHECK_SECONDS)"""
+        try:
+            if cache_service.redis_client:
+                cache_service.redis_client.incr(RULES_VERSION_KEY)
+        except Exception as e:
+            self.logger.warning(f"Erro ao publicar versão das regras de frete: {str(e)}")
+        ShippingService._ruleset = None
+
+    def list_rules(self) -> List[Dict[str, Any]]:
+        """Lista todas as regras de frete (ativas e inativas) por prioridade"""
+        return self.repo.find_all(order_by="priority", desc=True)
+
+    def save_rule(self, data: Dict[str, Any], rule_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Cria ou atualiza uma regra de frete e publica a nova versão.
+
+        Args:
+            data: Campos da regra
+            rule_id: ID da regra (None para criar)
+
+        Returns:
+            Dict com success e rule ou error
+        """
+        try:
+            fields = (
+                "name",
+                "description",
+                "min_order_value",
+                "max_order_value",
+                "shipping_cost",
+                "free_shipping_threshold",
+                "is_active",
+                "priority",
+                "cep_start",
+                "cep_end",
+            )
+            rule_data = {field: data[field] for field in fields if field in data}
+            if rule_id is None and (not rule_data.get("name") or rule_data.get("shipping_cost") is None):
+                return {"success": False, "error": "Nome e custo do frete são obrigatórios"}
+            for field in ("min_order_value", "max_order_value", "shipping_cost", "free_shipping_threshold"):
+                if rule_data.get(field) is not None and float(rule_data[field]) < 0:
+                    return {"success": False, "error": f"{field} deve ser maior ou igual a 0"}
+            if "cep_start" in rule_data or "cep_end" in rule_data:
+                cep_start, cep_end = rule_data.get("cep_start"), rule_data.get("cep_end")
+                if cep_start or cep_end:
+                    start, end = normalize_cep(cep_start), normalize_cep(cep_end)
+                    if start is None or end is None or start > end:
+                        return {"success": False, "error": "Faixa de CEP inválida"}
+                    rule_data["cep_start"], rule_data["cep_end"] = f"{start:08d}", f"{end:08d}"
+                else:
+                    rule_data["cep_start"] = rule_data["cep_end"] = None
+
+            rule = self.repo.update(rule_id, rule_data) if rule_id else self.repo.create(rule_data)
+            if not rule:
+                return {"success": False, "error": "Erro ao salvar regra de frete"}
+            self.invalidate_rules()
+            return {"success": True, "rule": rule}
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            return {"success": False, "error": "Valores da regra inválidos"}
+        except Exception as e:
+            self.logger.error(f"Erro ao salvar regra de frete: {str(e)}", exc_info=True)
+            return {"success": False, "error": str(e)}
+
+    def delete_rule(self, rule_id: str) -> Dict[str, Any]:
+        """Remove uma regra de frete e publica a nova versão"""
+        if not self.repo.delete(rule_id):
+            return {"success": False, "error": "Erro ao remover regra de frete"}
+        self.invalidate_rules()
+        return {"success": True}
+
     def _apply_default_rule(self, order_total: float) -> Dict[str, Any]:
         """Aplica regra padrão de frete."""
         if order_total >= self.default_free_shipping_threshold:
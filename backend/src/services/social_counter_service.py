@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Serviço de Contadores Sociais RE-EDUCA Store.
+
+Mantém seguidores, seguindo, posts e likes recebidos de cada usuário em
+hashes Redis (social:counters:user:{user_id}):
+- Leitura de um ou vários perfis em uma única ida ao Redis (pipeline HGETALL)
+- Hash ausente é preenchido pela função get_social_user_counters (migração 034)
+- Escritas sociais aplicam deltas só em hashes já carregados (Lua), sem
+  recriar contadores parciais
+- Todo usuário alterado entra no conjunto social:counters:dirty; a
+  reconciliação periódica (workers/social_counter_worker.py) regrava os
+  valores exatos do banco
+
+Sem Redis, os contadores são lidos direto do banco.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from repositories.social_repository import SocialRepository
+from services.base_service import BaseService
+from services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ("followers", "following", "posts", "total_likes")
+COUNTER_KEY = "social:counters:user:{user_id}"
+DIRTY_SET_KEY = "social:counters:dirty"
+COUNTER_TTL = 7 * 86400
+
+# HINCRBY só se o hash existir: um hash ausente é preenchido inteiro do banco
+# na próxima leitura, então incrementá-lo criaria um contador parcial.
+_INCREMENT_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+local value = redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2])
+if value < 0 then
+    redis.call('HSET', KEYS[1], ARGV[1], 0)
+    value = 0
+end
+return value
+"""
+
+
+def _empty_counters() -> Dict[str, int]:
+    return {field: 0 for field in COUNTER_FIELDS}
+
+
+class SocialCounterService(BaseService):
+    """Contadores sociais desnormalizados em Redis com reconciliação no banco."""
+
+    def __init__(self):
+        """Inicializa o serviço de contadores."""
+        super().__init__()
+        self.repo = SocialRepository()
+
+    @property
+    def redis(self):
+        """Cliente Redis compartilhado (None se indisponível)"""
+        return cache_service.redis_client
+
+    # =====================================================
+    # LEITURA
+    # =====================================================
+
+    def get_counters(self, user_id: str) -> Dict[str, int]:
+        """
+        Retorna os contadores de um usuário.
+
+        Args:
+            user_id: ID do usuário
+
+        Returns:
+            Dict {followers, following, posts, total_likes}
+        """
+        return self.get_many([user_id]).get(user_id, _empty_counters())
+
+    def get_many(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, int]]:
+        """
+        Retorna os contadores de vários usuários.
+
+        Uma ida ao Redis para todos os usuários e uma chamada ao banco para
+        os que ainda não estão em cache.
+
+        Args:
+            user_ids: IDs dos usuários
+
+        Returns:
+            Dict {user_id: {followers, following, posts, total_likes}}
+        """
+        user_ids = list(dict.fromkeys(uid for uid in user_ids if uid))
+        if not user_ids:
+            return {}
+
+        counters: Dict[str, Dict[str, int]] = {}
+        missing = user_ids
+        if self.redis:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                for user_id in user_ids:
+                    pipe.hgetall(COUNTER_KEY.format(user_id=user_id))
+                missing = []
+                for user_id, cached in zip(user_ids, pipe.execute()):
+                    if cached and all(field in cached for field in COUNTER_FIELDS):
+                        counters[user_id] = {field: int(cached[field]) for field in COUNTER_FIELDS}
+                    else:
+                        missing.append(user_id)
+            except Exception as e:
+                self.logger.warning(f"Erro ao ler contadores sociais do Redis: {str(e)}")
+                missing = [uid for uid in user_ids if uid not in counters]
+
+        if missing:
+            loaded = self.repo.get_user_counters(missing)
+            self._store(loaded)
+            for user_id in missing:
+                counters[user_id] = loaded.get(user_id, _empty_counters())
+
+        return counters
+
+    # =====================================================
+    # ESCRITA (eventos sociais)
+    # =====================================================
+
+    def apply(self, deltas: Dict[str, Dict[str, int]]) -> None:
+        """
+        Aplica deltas de contadores e marca os usuários para reconciliação.
+
+        Args:
+            deltas: {user_id: {campo: delta}}
+        """
+        deltas = {uid: fields for uid, fields in deltas.items() if uid and any(fields.values())}
+        if not deltas or not self.redis:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id, fields in deltas.items():
+                key = COUNTER_KEY.format(user_id=user_id)
+                for field, delta in fields.items():
+                    if delta:
+                        pipe.eval(_INCREMENT_IF_EXISTS, 1, key, field, int(delta))
+            pipe.sadd(DIRTY_SET_KEY, *deltas.keys())
+            pipe.execute()
+        except Exception as e:
+            self.logger.warning(f"Erro ao atualizar contadores sociais: {str(e)}")
+
+    def on_follow(self, follower_id: str, following_id: str, delta: int = 1) -> None:
+        """Seguimento criado (delta=1) ou removido (delta=-1)"""
+        self.apply({follower_id: {"following": delta}, following_id: {"followers": delta}})
+
+    def on_post(self, author_id: str, delta: int = 1) -> None:
+        """Post criado (delta=1) ou removido (delta=-1)"""
+        self.apply({author_id: {"posts": delta}})
+
+    def on_like(self, author_id: Optional[str], delta: int = 1) -> None:
+        """Like recebido (delta=1) ou removido (delta=-1) em post do autor"""
+        if author_id:
+            self.apply({author_id: {"total_likes": delta}})
+
+    def invalidate(self, user_id: str) -> None:
+        """
+        Descarta os contadores em cache de um usuário.
+
+        Usado quando o delta não é conhecido (ex.: remoção de post leva junto
+        os likes dele); a próxima leitura recarrega do banco.
+        """
+        if not self.redis or not user_id:
+            return
+        try:
+            self.redis.delete(COUNTER_KEY.format(user_id=user_id))
+        except Exception as e:
+            self.logger.warning(f"Erro ao invalidar contadores sociais: {str(e)}")
+
+    # =====================================================
+    # RECONCILIAÇÃO
+    # =====================================================
+
+    def reconcile(self, user_ids: Optional[List[str]] = None, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Regrava os contadores em cache com os valores exatos do banco.
+
+        Args:
+            user_ids: Usuários a reconciliar (None = consome o conjunto dirty)
+            batch_size: Usuários por chamada ao banco
+
+        Returns:
+            Dict com checked (usuários verificados) e corrected (divergentes)
+        """
+        stats = {"checked": 0, "corrected": 0}
+        if not self.redis:
+            return stats
+
+        pending = list(user_ids) if user_ids is not None else None
+        while True:
+            if pending is None:
+                batch = self.redis.spop(DIRTY_SET_KEY, batch_size) or []
+            else:
+                batch, pending = pending[:batch_size], pending[batch_size:]
+            if not batch:
+                break
+
+            cached = self._read_cached(batch)
+            exact = self.repo.get_user_counters(batch)
+
+            live = {uid: values for uid, values in exact.items() if cached.get(uid) is not None}
+            self._store(live)
+            stats["checked"] += len(live)
+            stats["corrected"] += sum(1 for uid, values in live.items() if cached[uid] != values)
+
+            failed = [uid for uid in batch if uid not in exact]
+            if failed:
+                # Falha no banco: devolve ao conjunto e encerra a rodada
+                self.redis.sadd(DIRTY_SET_KEY, *failed)
+                break
+
+        if stats["corrected"]:
+            self.logger.info(
+                f"Contadores sociais reconciliados: {stats['corrected']} de {stats['checked']} divergiam do banco"
+            )
+        return stats
+
+    def reconcile_all(self, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Reconcilia todos os hashes em cache (varredura completa, sem KEYS).
+
+        Args:
+            batch_size: Usuários por chamada ao banco
+
+        Returns:
+            Dict com checked e corrected
+        """
+        if not self.redis:
+            return {"checked": 0, "corrected": 0}
+        prefix = COUNTER_KEY.format(user_id="")
+        user_ids = [key[len(prefix):] for key in self.redis.scan_iter(match=f"{prefix}*", count=1000)]
+        return self.reconcile(user_ids, batch_size=batch_size)
+
+    def _read_cached(self, user_ids: List[str]) -> Dict[str, Optional[Dict[str, int]]]:
+        """Lê os hashes atuais (None para os que não estão em cache)"""
+        pipe = self.redis.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.hgetall(COUNTER_KEY.format(user_id=user_id))
+        return {
+            user_id: ({field: int(values.get(field, 0)) for field in COUNTER_FIELDS} if values else None)
+            for user_id, values in zip(user_ids, pipe.execute())
+        }
+
+    def _store(self, counters: Dict[str, Dict[str, int]]) -> None:
+        """Grava hashes completos com TTL"""
+        if not counters or not self.redis:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id, values in counters.items():
+                key = COUNTER_KEY.format(user_id=user_id)
+                pipe.hset(key, mapping={field: int(values.get(field, 0)) for field in COUNTER_FIELDS})
+                pipe.expire(key, COUNTER_TTL)
+            pipe.execute()
+        except Exception as e:
+            self.logger.warning(f"Erro ao gravar contadores sociais: {str(e)}")
+
+
+social_counters = SocialCounterService()
@@ -161,11 +161,20 @@ class SocialModerationService(BaseService):
         """Deleta um post (moderação)."""
         try:
             from repositories.social_repository import SocialRepository
+            from services.cache_service import social_cache
+            from services.social_counter_service import social_counters
+            from services.social_search_service import social_search
+            from services.timeline_service import timeline_service
             social_repo = SocialRepository()
             
-            deleted = social_repo.delete(post_id)
+            author_id = social_repo.get_post_owner(post_id)
+            deleted = author_id is not None and social_repo.delete_post(post_id)
             
             if deleted:
+                social_counters.invalidate(author_id)
+                social_cache.invalidate_user_posts(author_id)
+                timeline_service.on_post_deleted(post_id, author_id)
+                social_search.remove_post(post_id)
                 # Adicionar ao histórico
                 self.repo.add_moderation_history(
                     moderator_id=moderator_id,
@@ -0,0 +1,486 @@
+# -*- coding: utf-8 -*-
+"""
+Serviço de Busca Social RE-EDUCA Store.
+
+Índice invertido em Redis, mantido de forma incremental pelos eventos de
+posts (SocialService) e de perfis (UserService, AuthService):
+- search:term:{termo} / search:hashtag:{tag}: postings (sorted set
+  post_id -> created_at em microssegundos), limitadas aos POSTINGS_MAX
+  posts mais recentes de cada termo
+- search:terms:lex: vocabulário, para o prefixo do último termo digitado
+- search:hashtags: número de posts por hashtag (search:hashtags:lex para prefixo)
+- search:users:lex: nome normalizado a partir de cada palavra
+  ("ana maria silva", "maria silva", "silva") + "\\x00{user_id}", lido por
+  ZRANGEBYLEX (trie de prefixos)
+- search:trending: hashtags em alta com decaimento exponencial
+
+Uma busca intersecta as postings dos termos: o custo depende do tamanho
+dessas listas, não do total de posts. Filtros que dependem de colunas do
+post (tipo, mídia, likes, local, verificado) são aplicados no banco sobre
+no máximo SEARCH_CANDIDATES ids. Sem Redis, ou antes do primeiro rebuild
+(scripts/rebuild_social_search.py), a busca continua no banco.
+"""
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from repositories.social_repository import SocialRepository
+from repositories.social_search_repository import SocialSearchRepository, date_range_start
+from repositories.timeline_repository import TimelineRepository
+from services.base_service import BaseService
+from services.cache_service import cache_service
+from utils.cursors import to_score
+
+logger = logging.getLogger(__name__)
+
+TERM_KEY = "search:term:{term}"
+HASHTAG_KEY = "search:hashtag:{tag}"
+TERMS_LEX_KEY = "search:terms:lex"
+HASHTAG_COUNTS_KEY = "search:hashtags"
+HASHTAG_LEX_KEY = "search:hashtags:lex"
+POST_ENTRIES_KEY = "search:post:{post_id}"
+USER_LEX_KEY = "search:users:lex"
+USER_ENTRIES_KEY = "search:user:{user_id}"
+QUERY_KEY = "search:query:{digest}"
+TRENDING_KEY = "search:trending"
+TRENDING_EPOCH_KEY = "search:trending:epoch"
+TRENDING_REBASE_LOCK = "search:trending:rebase"
+READY_KEY = "search:ready"
+
+POSTINGS_MAX = 5000
+SEARCH_CANDIDATES = 500
+PREFIX_EXPANSION = 10
+HASHTAG_PREFIX_MAX = 200
+QUERY_TTL = 30
+MAX_TERMS = 64
+MAX_NAME_WORDS = 8
+TRENDING_HALF_LIFE = 6 * 3600
+TRENDING_REBASE_AFTER = 32  # meias-vidas até reescalar os scores (evita overflow de 2^n)
+TRENDING_MIN_SCORE = 0.01
+LEX_END = "\uffff"
+
+STOPWORDS = frozenset(
+    "a o e de da do das dos em no na nos nas um uma uns umas para por com que se os as ao aos the and of to".split()
+)
+
+
+def normalize(text: Optional[str]) -> str:
+    """Minúsculas sem acentos (ex.: 'Ação' -> 'acao')"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Termos indexáveis de um texto (sem stopwords, sem repetição)"""
+    terms = [term for term in re.findall(r"\w+", normalize(text)) if len(term) >= 2 and term not in STOPWORDS]
+    return list(dict.fromkeys(terms))[:MAX_TERMS]
+
+
+def extract_hashtags(post: Dict[str, Any]) -> List[str]:
+    """Hashtags do post (campo hashtags + #tags no conteúdo), normalizadas"""
+    tags = list(post.get("hashtags") or []) + re.findall(r"#(\w+)", post.get("content") or "")
+    normalized = (normalize(str(tag)).strip().lstrip("#") for tag in tags)
+    return list(dict.fromkeys(tag for tag in normalized if tag))
+
+
+class SocialSearchService(BaseService):
+    """Busca de posts, usuários e hashtags por índice incremental."""
+
+    def __init__(self):
+        """Inicializa o serviço de busca social."""
+        super().__init__()
+        self.repo = SocialSearchRepository()
+        self.cards = TimelineRepository()
+        self.social_repo = SocialRepository()
+
+    @property
+    def redis(self):
+        """Cliente Redis compartilhado (None se indisponível)"""
+        return cache_service.redis_client
+
+    def is_ready(self) -> bool:
+        """Se o índice foi construído e pode atender buscas"""
+        return bool(self.redis and self.redis.exists(READY_KEY))
+
+    # =====================================================
+    # BUSCA
+    # =====================================================
+
+    def search(
+        self,
+        query: str,
+        search_type: str = "all",
+        page: int = 1,
+        limit: int = 20,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """
+        Busca pelo índice.
+
+        Args:
+            query: Termo de busca
+            search_type: Tipo (all, posts, users, hashtags)
+            page: Número da página
+            limit: Limite por página
+            filters: Filtros avançados (mesmos de SocialRepository.search)
+
+        Returns:
+            Dict com posts, users e hashtags, ou None se o índice não puder
+            atender (o chamador usa o banco)
+        """
+        if not self.is_ready():
+            return None
+        try:
+            filters = filters or {}
+            offset = (max(page, 1) - 1) * limit
+            results = {"posts": [], "users": [], "hashtags": []}
+            if search_type in ("all", "posts"):
+                results["posts"] = self.search_posts(query, filters, offset, limit)
+            if search_type in ("all", "users"):
+                results["users"] = self.search_users(query, offset, limit, verified_only=filters.get("verified") is True)
+            if search_type in ("all", "hashtags"):
+                results["hashtags"] = self.search_hashtags(query, offset, limit)
+            return results
+        except Exception as e:
+            self.logger.warning(f"Erro na busca pelo índice, usando o banco: {str(e)}")
+            return None
+
+    def search_posts(self, query: str, filters: Dict[str, Any], offset: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        Posts que contêm todos os termos (o último também como prefixo).
+
+        Sem filtros de coluna a página sai direto das postings e os cartões
+        vêm do cache em lote; com filtros, o banco filtra os
+        SEARCH_CANDIDATES mais recentes (popular ordena só entre eles).
+        """
+        key = self._match_key(query)
+        if not key:
+            return []
+        start = date_range_start(filters.get("dateRange"))
+        min_score = to_score(start) if start else "-inf"
+        oldest = filters.get("sortBy") == "oldest"
+
+        if not self._needs_db(filters):
+            post_ids = self._range(key, min_score, offset, limit, oldest)
+            return self.social_repo.enrich_posts(self.cards.find_posts_by_ids(post_ids), refresh_counts=True)
+
+        candidates = self._range(key, min_score, 0, SEARCH_CANDIDATES, oldest)
+        return self.social_repo.enrich_posts(self.repo.filter_posts(candidates, filters, offset, limit))
+
+    def search_users(self, query: str, offset: int, limit: int, verified_only: bool = False) -> List[Dict[str, Any]]:
+        """Usuários cujo nome (a partir de qualquer palavra) ou email começa com query"""
+        prefix = " ".join(re.findall(r"\w+", normalize(query)))
+        if not prefix:
+            return []
+        members = self.redis.zrangebylex(
+            USER_LEX_KEY, f"[{prefix}", f"[{prefix}{LEX_END}", start=0, num=(offset + limit) * 2
+        )
+        user_ids = list(dict.fromkeys(member.rsplit("\x00", 1)[-1] for member in members))
+        return self.repo.get_users_by_ids(user_ids[offset : offset + limit], verified_only=verified_only)
+
+    def search_hashtags(self, query: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """Hashtags com o prefixo informado, das mais usadas para as menos usadas"""
+        words = re.findall(r"\w+", normalize(query))
+        if not words:
+            entries = self.redis.zrevrange(HASHTAG_COUNTS_KEY, offset, offset + limit - 1, withscores=True)
+            return [{"tag": tag, "count": int(count)} for tag, count in entries]
+
+        prefix = words[0]
+        tags = self.redis.zrangebylex(
+            HASHTAG_LEX_KEY, f"[{prefix}", f"[{prefix}{LEX_END}", start=0, num=HASHTAG_PREFIX_MAX
+        )
+        pipe = self.redis.pipeline(transaction=False)
+        for tag in tags:
+            pipe.zscore(HASHTAG_COUNTS_KEY, tag)
+        counted = [(tag, int(count or 0)) for tag, count in zip(tags, pipe.execute())]
+        counted.sort(key=lambda item: (-item[1], item[0]))
+        return [{"tag": tag, "count": count} for tag, count in counted[offset : offset + limit]]
+
+    def get_trending_hashtags(self, limit: int = 10) -> Dict[str, Any]:
+        """
+        Hashtags em alta.
+
+        score é o número de posts com a hashtag, cada um valendo metade a
+        cada TRENDING_HALF_LIFE segundos.
+
+        Args:
+            limit: Quantidade de hashtags
+
+        Returns:
+            Dict com hashtags [{tag, score, count}]
+        """
+        try:
+            if not self.redis:
+                return {"success": True, "hashtags": []}
+            now = time.time()
+            decay = 2 ** ((now - float(self.redis.get(TRENDING_EPOCH_KEY) or now)) / TRENDING_HALF_LIFE)
+            entries = self.redis.zrevrange(TRENDING_KEY, 0, max(1, min(int(limit), 100)) - 1, withscores=True)
+            pipe = self.redis.pipeline(transaction=False)
+            for tag, _ in entries:
+                pipe.zscore(HASHTAG_COUNTS_KEY, tag)
+            counts = pipe.execute()
+            hashtags = [
+                {"tag": tag, "score": round(score / decay, 3), "count": int(count or 0)}
+                for (tag, score), count in zip(entries, counts)
+            ]
+            return {"success": True, "hashtags": hashtags}
+        except Exception as e:
+            return self._handle_error(e, "Erro ao buscar hashtags em alta")
+
+    def _match_key(self, query: str) -> Optional[str]:
+        """Sorted set com os posts que atendem a query (None = nenhum)"""
+        text = (query or "").strip()
+        if text.startswith("#"):
+            tags = extract_hashtags({"hashtags": [text]})
+            return HASHTAG_KEY.format(tag=tags[0]) if tags else None
+
+        terms = tokenize(text)
+        if not terms:
+            return None
+        dest = QUERY_KEY.format(digest=hashlib.sha1(" ".join(terms).encode("utf-8")).hexdigest())
+        if self.redis.exists(dest):
+            return dest
+
+        last = terms[-1]
+        expansions = self.redis.zrangebylex(TERMS_LEX_KEY, f"[{last}", f"[{last}{LEX_END}", start=0, num=PREFIX_EXPANSION)
+        if not expansions:
+            return None
+        if len(terms) == 1 and expansions == [last]:
+            return TERM_KEY.format(term=last)
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zunionstore(dest, [TERM_KEY.format(term=term) for term in expansions], aggregate="MAX")
+        if len(terms) > 1:
+            pipe.zinterstore(dest, [dest] + [TERM_KEY.format(term=term) for term in terms[:-1]], aggregate="MAX")
+        pipe.expire(dest, QUERY_TTL)
+        pipe.execute()
+        return dest
+
+    def _range(self, key: str, min_score: Any, offset: int, count: int, oldest: bool) -> List[str]:
+        if oldest:
+            return self.redis.zrangebyscore(key, min_score, "+inf", start=offset, num=count)
+        return self.redis.zrevrangebyscore(key, "+inf", min_score, start=offset, num=count)
+
+    @staticmethod
+    def _needs_db(filters: Dict[str, Any]) -> bool:
+        return bool(
+            filters.get("type") not in (None, "", "all")
+            or filters.get("media") is True
+            or filters.get("minLikes", 0) > 0
+            or filters.get("location")
+            or filters.get("verified") is True
+            or filters.get("sortBy") == "popular"
+        )
+
+    # =====================================================
+    # MANUTENÇÃO DO ÍNDICE
+    # =====================================================
+
+    def index_post(self, post: Dict[str, Any], count_trending: bool = False):
+        """
+        Indexa um post novo ou reindexa um post editado.
+
+        Args:
+            post: Post com id, content, hashtags e created_at
+            count_trending: Conta as hashtags novas nas hashtags em alta
+        """
+        if not self.redis or not post or not post.get("id"):
+            return
+        try:
+            old = self.redis.smembers(POST_ENTRIES_KEY.format(post_id=post["id"]))
+            pipe = self.redis.pipeline()
+            added, removed = self._queue_post(pipe, post, old)
+            pipe.execute()
+            self._drop_unused_tags(removed)
+            if count_trending and added:
+                self._bump_trending(added)
+        except Exception as e:
+            self.logger.warning(f"Erro ao indexar post {post.get('id')}: {str(e)}")
+
+    def remove_post(self, post_id: str):
+        """Remove um post do índice"""
+        if not self.redis:
+            return
+        try:
+            old = self.redis.smembers(POST_ENTRIES_KEY.format(post_id=post_id))
+            if not old:
+                return
+            pipe = self.redis.pipeline()
+            _, removed = self._queue_entries(pipe, post_id, 0, set(), old)
+            pipe.execute()
+            self._drop_unused_tags(removed)
+        except Exception as e:
+            self.logger.warning(f"Erro ao remover post {post_id} do índice: {str(e)}")
+
+    def index_user(self, user: Dict[str, Any]):
+        """
+        Indexa (ou reindexa) o nome e o email de um usuário.
+
+        Args:
+            user: Usuário com id, name e/ou email
+        """
+        if not self.redis or not user or not user.get("id") or not ("name" in user or "email" in user):
+            return
+        try:
+            old = self.redis.smembers(USER_ENTRIES_KEY.format(user_id=user["id"]))
+            pipe = self.redis.pipeline()
+            self._queue_user(pipe, user, old)
+            pipe.execute()
+        except Exception as e:
+            self.logger.warning(f"Erro ao indexar usuário {user.get('id')}: {str(e)}")
+
+    def rebuild(self, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Reconstrói o índice a partir do banco.
+
+        As buscas usam o banco até o fim do rebuild; hashtags em alta são
+        mantidas (dependem só de posts novos).
+
+        Args:
+            batch_size: Registros por lote
+
+        Returns:
+            Dict com posts e users indexados
+        """
+        if not self.redis:
+            return {"posts": 0, "users": 0}
+        self.redis.delete(READY_KEY)
+        for pattern in ("search:term:*", "search:hashtag:*", "search:post:*", "search:user:*", "search:query:*"):
+            keys = list(self.redis.scan_iter(match=pattern, count=1000))
+            for i in range(0, len(keys), 1000):
+                self.redis.delete(*keys[i : i + 1000])
+        self.redis.delete(TERMS_LEX_KEY, HASHTAG_COUNTS_KEY, HASHTAG_LEX_KEY, USER_LEX_KEY)
+
+        totals = {"posts": 0, "users": 0}
+        for kind, read_batch, queue in (
+            ("posts", self.repo.get_posts_batch, lambda pipe, row: self._queue_post(pipe, row, set())),
+            ("users", self.repo.get_users_batch, lambda pipe, row: self._queue_user(pipe, row, set())),
+        ):
+            after_id = None
+            while True:
+                batch = read_batch(after_id, batch_size)
+                if not batch:
+                    break
+                pipe = self.redis.pipeline(transaction=False)
+                for row in batch:
+                    queue(pipe, row)
+                pipe.execute()
+                totals[kind] += len(batch)
+                after_id = batch[-1]["id"]
+                if len(batch) < batch_size:
+                    break
+
+        self.redis.set(READY_KEY, 1)
+        return totals
+
+    def _queue_post(self, pipe, post: Dict[str, Any], old: Set[str]) -> Tuple[List[str], List[str]]:
+        entries = {f"t:{term}" for term in tokenize(post.get("content"))}
+        entries |= {f"h:{tag}" for tag in extract_hashtags(post)}
+        score = to_score(post.get("created_at") or datetime.now(timezone.utc))
+        return self._queue_entries(pipe, post["id"], score, entries, old)
+
+    def _queue_entries(
+        self, pipe, post_id: str, score: int, entries: Set[str], old: Set[str]
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Enfileira a troca das entradas old -> entries de um post.
+
+        Entradas são "t:{termo}" ou "h:{tag}".
+
+        Returns:
+            (hashtags adicionadas, hashtags removidas)
+        """
+        added, removed = sorted(entries - old), sorted(old - entries)
+        for entry in removed:
+            kind, value = entry.split(":", 1)
+            pipe.zrem(self._postings_key(kind, value), post_id)
+            if kind == "h":
+                pipe.zincrby(HASHTAG_COUNTS_KEY, -1, value)
+        for entry in added:
+            kind, value = entry.split(":", 1)
+            key = self._postings_key(kind, value)
+            pipe.zadd(key, {post_id: score})
+            pipe.zremrangebyrank(key, 0, -(POSTINGS_MAX + 1))
+            if kind == "h":
+                pipe.zincrby(HASHTAG_COUNTS_KEY, 1, value)
+                pipe.zadd(HASHTAG_LEX_KEY, {value: 0})
+            else:
+                pipe.zadd(TERMS_LEX_KEY, {value: 0})
+
+        entries_key = POST_ENTRIES_KEY.format(post_id=post_id)
+        pipe.delete(entries_key)
+        if entries:
+            pipe.sadd(entries_key, *entries)
+        return [e[2:] for e in added if e.startswith("h:")], [e[2:] for e in removed if e.startswith("h:")]
+
+    def _queue_user(self, pipe, user: Dict[str, Any], old: Set[str]):
+        words = re.findall(r"\w+", normalize(user.get("name")))[:MAX_NAME_WORDS]
+        phrases = {" ".join(words[i:]) for i in range(len(words))}
+        email_name = normalize(user.get("email")).split("@")[0]
+        if email_name:
+            phrases.add(email_name)
+        members = {f"{phrase}\x00{user['id']}" for phrase in phrases}
+
+        if old - members:
+            pipe.zrem(USER_LEX_KEY, *(old - members))
+        if members:
+            pipe.zadd(USER_LEX_KEY, {member: 0 for member in members})
+        entries_key = USER_ENTRIES_KEY.format(user_id=user["id"])
+        pipe.delete(entries_key)
+        if members:
+            pipe.sadd(entries_key, *members)
+
+    @staticmethod
+    def _postings_key(kind: str, value: str) -> str:
+        return HASHTAG_KEY.format(tag=value) if kind == "h" else TERM_KEY.format(term=value)
+
+    def _drop_unused_tags(self, tags: List[str]):
+        """Tira do vocabulário hashtags que ficaram sem posts"""
+        if not tags:
+            return
+        self.redis.zremrangebyscore(HASHTAG_COUNTS_KEY, "-inf", 0)
+        pipe = self.redis.pipeline(transaction=False)
+        for tag in tags:
+            pipe.zscore(HASHTAG_COUNTS_KEY, tag)
+        unused = [tag for tag, count in zip(tags, pipe.execute()) if count is None]
+        if unused:
+            self.redis.zrem(HASHTAG_LEX_KEY, *unused)
+
+    def _bump_trending(self, tags: List[str]):
+        """
+        Soma 2^((agora - época) / meia-vida) a cada hashtag.
+
+        Somar pesos crescentes equivale a decair todos os scores antigos,
+        sem reescrever o sorted set a cada post.
+        """
+        now = time.time()
+        weight = 2 ** ((now - self._trending_epoch(now)) / TRENDING_HALF_LIFE)
+        pipe = self.redis.pipeline(transaction=False)
+        for tag in tags:
+            pipe.zincrby(TRENDING_KEY, weight, tag)
+        pipe.execute()
+
+    def _trending_epoch(self, now: float) -> float:
+        epoch = self.redis.get(TRENDING_EPOCH_KEY)
+        if epoch is None:
+            self.redis.set(TRENDING_EPOCH_KEY, now, nx=True)
+            return float(self.redis.get(TRENDING_EPOCH_KEY) or now)
+
+        elapsed = (now - float(epoch)) / TRENDING_HALF_LIFE
+        if elapsed > TRENDING_REBASE_AFTER and self.redis.set(TRENDING_REBASE_LOCK, 1, ex=60, nx=True):
+            # Reescala para a nova época e descarta hashtags que já esfriaram
+            pipe = self.redis.pipeline()
+            pipe.zunionstore(TRENDING_KEY, {TRENDING_KEY: 2 ** -elapsed})
+            pipe.zremrangebyscore(TRENDING_KEY, "-inf", TRENDING_MIN_SCORE)
+            pipe.set(TRENDING_EPOCH_KEY, now)
+            pipe.execute()
+            return now
+        return float(epoch)
+
+
+# Instância global do serviço de busca social
+social_search = SocialSearchService()
@@ -9,6 +9,13 @@ from typing import Any, Dict, List, Optional
 
 from repositories.social_repository import SocialRepository
 from services.base_service import BaseService
+from services.cache_service import social_cache
+from services.gamification_engine import gamification_engine
+from services.notification_service import notification_service
+from services.social_counter_service import social_counters
+from services.social_search_service import social_search
+from services.timeline_service import timeline_service
+from utils.cursors import decode_cursor, encode_cursor, score_to_iso, to_score
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +43,12 @@ class SocialService(BaseService):
                 "is_public": data.get("is_public", True),
             }
             post = self.repo.create_post(post_data)
+            if post:
+                social_counters.on_post(user_id)
+                social_cache.invalidate_user_posts(user_id)
+                timeline_service.on_post_created(post)
+                social_search.index_post(post, count_trending=True)
+                gamification_engine.publish(user_id, "post_created", post.get("id"))
             return {"success": True, "post": post, "message": "Post criado com sucesso"}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -51,15 +64,25 @@ class SocialService(BaseService):
         limit: int = 20,
         post_type: Optional[str] = None,
         hashtag: Optional[str] = None,
+        cursor: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Busca posts do feed."""
+        """
+        Busca posts do feed global.
+
+        Com cursor (retornado em next_cursor) a paginação é keyset por
+        (created_at, id) e page é ignorado.
+        """
         try:
-            posts = self.repo.get_posts(user_id, page, limit, post_type, hashtag)
-            return {"success": True, "posts": posts, "page": page, "limit": limit}
+            position = decode_cursor(cursor)
+            keyset = (score_to_iso(position[0]), position[1]) if position else None
+            posts = self.repo.get_posts(user_id, page, limit, post_type, hashtag, cursor=keyset)
+            next_cursor = None
+            if len(posts) == limit and posts[-1].get("created_at"):
+                next_cursor = encode_cursor(to_score(posts[-1]["created_at"]), posts[-1]["id"])
+            return {"success": True, "posts": posts, "page": page, "limit": limit, "next_cursor": next_cursor}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
-            # Deixar Exception genérico tratar abaixo
+            return {"success": False, "error": str(e)}
         except Exception as e:
             return self._handle_error(e, "Erro ao buscar posts")
 
@@ -89,7 +112,12 @@ class SocialService(BaseService):
             if post.get("user_id") != user_id:
                 return {"success": False, "error": "Sem permissão para atualizar este post"}
 
+            # Contadores são mantidos por trigger, nunca pelo cliente
+            data = {k: v for k, v in data.items() if k not in ("likes_count", "comments_count")}
             updated = self.repo.update_post(post_id, data)
+            social_cache.invalidate_user_posts(user_id)
+            timeline_service.on_post_updated(post_id)
+            social_search.index_post(updated)
             return {"success": True, "post": updated, "message": "Post atualizado com sucesso"}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -109,6 +137,11 @@ class SocialService(BaseService):
                 return {"success": False, "error": "Sem permissão para deletar este post"}
 
             self.repo.delete_post(post_id)
+            # Os likes do post saem junto (cascade): recarrega o autor do banco
+            social_counters.invalidate(user_id)
+            social_cache.invalidate_user_posts(user_id)
+            timeline_service.on_post_deleted(post_id, user_id)
+            social_search.remove_post(post_id)
             return {"success": True, "message": "Post deletado com sucesso"}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -126,6 +159,8 @@ class SocialService(BaseService):
                 "content": data.get("content"),
             }
             comment = self.repo.create_comment(comment_data)
+            if comment:
+                notification_service.notify_comment(self.repo.get_post_owner(post_id), user_id, post_id, comment["id"])
             return {"success": True, "comment": comment, "message": "Comentário criado com sucesso"}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -149,7 +184,13 @@ class SocialService(BaseService):
     def create_reaction(self, post_id: str, user_id: str, reaction_type: str) -> Dict[str, Any]:
         """Cria uma reação em um post."""
         try:
+            # None quando a reação já existia: contadores e notificação só na primeira vez
             reaction = self.repo.create_reaction(post_id, user_id, reaction_type)
+            if reaction:
+                owner_id = reaction.pop("post_owner_id", None)
+                if reaction_type == "like":
+                    social_counters.on_like(owner_id)
+                notification_service.notify_like(owner_id, user_id, post_id, reaction_type)
             return {"success": True, "reaction": reaction, "message": "Reação adicionada com sucesso"}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -161,7 +202,10 @@ class SocialService(BaseService):
     def remove_reaction(self, post_id: str, user_id: str, reaction_type: Optional[str] = None) -> Dict[str, Any]:
         """Remove uma reação de um post."""
         try:
-            self.repo.remove_reaction(post_id, user_id, reaction_type)
+            removed = self.repo.remove_reaction(post_id, user_id, reaction_type)
+            likes = [row for row in removed if row.get("reaction_type") == "like"]
+            if likes:
+                social_counters.on_like(likes[0].get("post_owner_id"), delta=-len(likes))
             return {"success": True, "message": "Reação removida com sucesso"}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -176,7 +220,11 @@ class SocialService(BaseService):
             if follower_id == user_id:
                 return {"success": False, "error": "Você não pode seguir a si mesmo"}
 
-            self.repo.follow_user(follower_id, user_id)
+            # False quando já seguia: contadores e timeline só na primeira vez
+            if self.repo.follow_user(follower_id, user_id):
+                social_counters.on_follow(follower_id, user_id)
+                timeline_service.on_follow(follower_id, user_id)
+                notification_service.notify_follow(user_id, follower_id)
             return {"success": True, "message": "Usuário seguido com sucesso"}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -188,7 +236,9 @@ class SocialService(BaseService):
     def unfollow_user(self, follower_id: str, user_id: str) -> Dict[str, Any]:
         """Deixa de seguir um usuário."""
         try:
-            self.repo.unfollow_user(follower_id, user_id)
+            if self.repo.unfollow_user(follower_id, user_id):
+                social_counters.on_follow(follower_id, user_id, delta=-1)
+                timeline_service.on_unfollow(follower_id, user_id)
             return {"success": True, "message": "Usuário deixado de seguir com sucesso"}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -198,23 +248,21 @@ class SocialService(BaseService):
             return self._handle_error(e, "Erro ao deixar de seguir usuário")
 
     def get_notifications(
-        self, user_id: str, page: int = 1, limit: int = 20, unread_only: bool = False
+        self, user_id: str, cursor: Optional[str] = None, limit: int = 20, unread_only: bool = False
     ) -> Dict[str, Any]:
-        """Busca notificações do usuário."""
+        """Busca notificações do usuário (paginação por cursor)."""
         try:
-            notifications = self.repo.get_notifications(user_id, page, limit, unread_only)
-            return {"success": True, "notifications": notifications, "page": page, "limit": limit}
+            return notification_service.get_notifications(user_id, cursor, limit, unread_only)
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
-            # Tratamento específico pode ser adicionado aqui
-            # Deixar Exception genérico tratar abaixo
+            return {"success": False, "error": str(e)}
         except Exception as e:
             return self._handle_error(e, "Erro ao buscar notificações")
 
     def mark_notification_read(self, notification_id: str, user_id: str) -> Dict[str, Any]:
         """Marca uma notificação como lida."""
         try:
-            self.repo.mark_notification_read(notification_id, user_id)
+            notification_service.mark_read(user_id, notification_id)
             return {"success": True, "message": "Notificação marcada como lida"}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -223,6 +271,29 @@ class SocialService(BaseService):
         except Exception as e:
             return self._handle_error(e, "Erro ao marcar notificação como lida")
 
+    def mark_all_notifications_read(self, user_id: str) -> Dict[str, Any]:
+        """Marca todas as notificações como lidas."""
+        try:
+            count = notification_service.mark_all_read(user_id)
+            return {"success": True, "count": count, "message": f"{count} notificações marcadas como lidas"}
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            # Tratamento específico pode ser adicionado aqui
+            # Deixar Exception genérico tratar abaixo
+        except Exception as e:
+            return self._handle_error(e, "Erro ao marcar notificações como lidas")
+
+    def get_badges(self, user_id: str) -> Dict[str, Any]:
+        """Retorna os contadores de não lidas (notificações e mensagens)."""
+        try:
+            return {"success": True, "badges": notification_service.get_badges(user_id)}
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            # Tratamento específico pode ser adicionado aqui
+            # Deixar Exception genérico tratar abaixo
+        except Exception as e:
+            return self._handle_error(e, "Erro ao buscar contadores")
+
     def search(
         self,
         query: str,
@@ -245,7 +316,9 @@ class SocialService(BaseService):
             Dict com resultados e metadados
         """
         try:
-            results = self.repo.search(query, search_type, page, limit, filters)
+            results = social_search.search(query, search_type, page, limit, filters)
+            if results is None:
+                results = self.repo.search(query, search_type, page, limit, filters)
             
             # Calcular totais para paginação
             total_posts = len(results.get("posts", []))
@@ -274,6 +347,10 @@ class SocialService(BaseService):
         except Exception as e:
             return self._handle_error(e, "Erro ao realizar busca")
 
+    def get_trending_hashtags(self, limit: int = 10) -> Dict[str, Any]:
+        """Hashtags em alta (contagem com decaimento exponencial)."""
+        return social_search.get_trending_hashtags(limit)
+
     def get_user_profile(self, user_id: str, viewer_id: str) -> Dict[str, Any]:
         """
         Busca perfil público de um usuário.
@@ -286,7 +363,7 @@ class SocialService(BaseService):
             Dict com dados do perfil
         """
         try:
-            profile = self.repo.get_user_profile(user_id, viewer_id)
+            profile = self.repo.get_user_profile(user_id, viewer_id, stats=social_counters.get_counters(user_id))
             if not profile:
                 return {"success": False, "error": "Usuário não encontrado"}
 
@@ -312,7 +389,13 @@ class SocialService(BaseService):
             Dict com lista de posts
         """
         try:
-            posts = self.repo.get_user_posts(user_id, viewer_id, page, limit)
+            # Páginas em cache são iguais para todos os leitores; contadores e
+            # reação do leitor são aplicados por cima
+            posts = social_cache.get_user_posts(user_id, page, limit)
+            if posts is None:
+                posts = self.repo.get_user_posts(user_id, None, page, limit)
+                social_cache.set_user_posts(user_id, page, posts, ttl=300, limit=limit)
+            posts = self.repo.enrich_posts(posts, viewer_id, refresh_counts=True)
             return {"success": True, "posts": posts, "page": page, "limit": limit}
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -321,6 +404,20 @@ class SocialService(BaseService):
         except Exception as e:
             return self._handle_error(e, "Erro ao buscar posts do usuário")
 
+    def get_home_feed(self, user_id: str, cursor: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+        """
+        Timeline personalizada (posts próprios e de quem o usuário segue).
+
+        Args:
+            user_id: ID do usuário
+            cursor: Cursor da página anterior
+            limit: Posts por página
+
+        Returns:
+            Dict com posts e next_cursor
+        """
+        return timeline_service.get_home_feed(user_id, cursor, limit)
+
     def check_follow_status(self, follower_id: str, following_id: str) -> Dict[str, Any]:
         """
         Verifica status de seguimento entre dois usuários.
@@ -0,0 +1,526 @@
+# -*- coding: utf-8 -*-
+"""
+Livro de Estoque RE-EDUCA Store.
+
+Reservas de estoque no caminho quente, sem ida ao banco:
+- Cada produto tem um hash no Redis (STOCK_KEY) com available (igual a
+  products.stock_quantity mais eventos ainda não gravados), reserved,
+  pending (eventos na fila) e seq (versão, para a reconciliação)
+- Reservar, confirmar e liberar são um script Lua cada: conferem o saldo,
+  atualizam os contadores, a reserva, o prazo (sorted set de expiração) e
+  enfileiram o evento na mesma operação atômica
+- workers/stock_ledger_worker.py grava os eventos em lotes com
+  apply_stock_events (migração 044), expira reservas vencidas e reconcilia
+  os contadores com o banco quando o produto não tem eventos pendentes
+- Um pending que não volta a zero sem nenhum evento novo no produto por
+  STALE_PENDING_AFTER (eventos perdidos) é zerado pela reconciliação
+
+Produtos são carregados do banco na primeira reserva. Sem Redis, a reserva
+é gravada direto no banco (apply_stock_events em modo estrito).
+"""
+
+import json
+import logging
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from repositories.inventory_repository import InventoryRepository
+from services.cache_service import cache_service
+from services.queue_service import QueueNames
+
+logger = logging.getLogger(__name__)
+
+STOCK_KEY = "stock:ledger:{product_id}"
+RESERVATION_KEY = "stock:reservation:{reservation_id}"
+DEADLINES_KEY = "stock:reservations:deadlines"
+PRODUCTS_KEY = "stock:ledger:products"
+# Hash {produto: "seq|epoch"}: quando a reconciliação viu o produto pendente com esse seq
+PENDING_SEEN_KEY = "stock:ledger:pending_seen"
+# Fila consumida com RedisQueueService.claim_batch (prioridade normal)
+LEDGER_QUEUE_KEY = f"{QueueNames.STOCK_LEDGER}_priority_1"
+
+RESERVATION_TTL = 24 * 3600
+SETTLED_TTL = 24 * 3600
+EXPIRE_BATCH = 500
+# Bem acima da janela de retry dos eventos (3 tentativas com backoff)
+STALE_PENDING_AFTER = 3600
+
+# KEYS: estoque, reserva, prazos, fila
+# ARGV: quantidade, reserva, produto, pedido, expira em (epoch), tarefa, TTL da reserva
+_RESERVE = """
+local available = redis.call('HGET', KEYS[1], 'available')
+if not available then
+    return -2
+end
+local quantity = tonumber(ARGV[1])
+if tonumber(available) < quantity then
+    return -1
+end
+redis.call('HINCRBY', KEYS[1], 'available', -quantity)
+redis.call('HINCRBY', KEYS[1], 'reserved', quantity)
+redis.call('HINCRBY', KEYS[1], 'pending', 1)
+redis.call('HINCRBY', KEYS[1], 'seq', 1)
+redis.call('HSET', KEYS[2], 'product_id', ARGV[3], 'quantity', quantity, 'order_id', ARGV[4],
+    'status', 'reserved', 'expires_at', ARGV[5])
+redis.call('EXPIRE', KEYS[2], ARGV[7])
+redis.call('ZADD', KEYS[3], ARGV[5], ARGV[2])
+redis.call('LPUSH', KEYS[4], ARGV[6])
+return tonumber(available) - quantity
+"""
+
+# KEYS: estoque, reserva, prazos, fila
+# ARGV: reserva, novo status, tarefa, agora (epoch), TTL da reserva finalizada
+_SETTLE = """
+local status = redis.call('HGET', KEYS[2], 'status')
+if not status then
+    return -2
+end
+if status ~= 'reserved' then
+    return -1
+end
+if ARGV[2] == 'confirmed' and tonumber(redis.call('HGET', KEYS[2], 'expires_at')) < tonumber(ARGV[4]) then
+    return -3
+end
+local quantity = tonumber(redis.call('HGET', KEYS[2], 'quantity'))
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HINCRBY', KEYS[1], 'reserved', -quantity)
+    if ARGV[2] ~= 'confirmed' then
+        redis.call('HINCRBY', KEYS[1], 'available', quantity)
+    end
+    redis.call('HINCRBY', KEYS[1], 'pending', 1)
+    redis.call('HINCRBY', KEYS[1], 'seq', 1)
+end
+redis.call('HSET', KEYS[2], 'status', ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+redis.call('ZREM', KEYS[3], ARGV[1])
+redis.call('LPUSH', KEYS[4], ARGV[3])
+return quantity
+"""
+
+# KEYS[1] estoque; ARGV[1] campo, ARGV[2] delta
+_HINCRBY_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+if ARGV[1] == 'available' then
+    redis.call('HINCRBY', KEYS[1], 'seq', 1)
+end
+return redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2])
+"""
+
+# KEYS[1] estoque; ARGV[1] seq lido, ARGV[2] estoque no banco
+_RECONCILE = """
+local current = redis.call('HMGET', KEYS[1], 'seq', 'pending')
+if not current[1] or current[1] ~= ARGV[1] or tonumber(current[2] or 0) ~= 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'available', ARGV[2])
+return 1
+"""
+
+# KEYS[1] estoque; ARGV[1] seq lido
+_RESET_PENDING = """
+if redis.call('HGET', KEYS[1], 'seq') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'pending', 0)
+return 1
+"""
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+def _task(event: Dict[str, Any]) -> str:
+    """Evento no formato de tarefa de RedisQueueService"""
+    return json.dumps(
+        {
+            "id": f"{QueueNames.STOCK_LEDGER}_{event['reservation_id']}_{event['type']}",
+            "data": event,
+            "priority": 1,
+            "created_at": event["at"],
+            "attempts": 0,
+            "max_attempts": 3,
+        }
+    )
+
+
+class StockLedger:
+    """Contadores de estoque e reservas no Redis com gravação em lote no banco."""
+
+    def __init__(self):
+        """Inicializa o livro de estoque."""
+        self.repo = InventoryRepository()
+        self.logger = logger
+
+    @property
+    def redis(self):
+        return cache_service.redis_client
+
+    def reserve(
+        self, product_id: str, quantity: int, order_id: Optional[str] = None, ttl: int = RESERVATION_TTL
+    ) -> Dict[str, Any]:
+        """
+        Reserva estoque de um produto (uma operação atômica no Redis).
+
+        Args:
+            product_id: ID do produto
+            quantity: Quantidade
+            order_id: Pedido da reserva (opcional)
+            ttl: Validade da reserva em segundos
+
+        Returns:
+            Dict com success, reservation_id, expires_at e available, ou error
+        """
+        try:
+            quantity = int(quantity)
+            if quantity <= 0:
+                return {"success": False, "error": "Quantidade inválida"}
+
+            now = time.time()
+            event = {
+                "type": "reserve",
+                "reservation_id": str(uuid.uuid4()),
+                "product_id": str(product_id),
+                "quantity": quantity,
+                "order_id": str(order_id) if order_id else None,
+                "expires_at": _iso(now + ttl),
+                "at": _iso(now),
+            }
+            redis = self.redis
+            if not redis:
+                return self._reserve_in_db(event)
+
+            keys = (
+                STOCK_KEY.format(product_id=event["product_id"]),
+                RESERVATION_KEY.format(reservation_id=event["reservation_id"]),
+                DEADLINES_KEY,
+                LEDGER_QUEUE_KEY,
+            )
+            args = (quantity, event["reservation_id"], event["product_id"], event["order_id"] or "", now + ttl)
+            result = redis.eval(_RESERVE, 4, *keys, *args, _task(event), ttl + SETTLED_TTL)
+            if result == -2:
+                # Primeira reserva do produto neste Redis
+                if event["product_id"] not in self.load([event["product_id"]]):
+                    return {"success": False, "error": "Produto não encontrado"}
+                result = redis.eval(_RESERVE, 4, *keys, *args, _task(event), ttl + SETTLED_TTL)
+
+            if result == -1:
+                return {"success": False, "error": "Estoque insuficiente"}
+            if result is None or int(result) < 0:
+                return {"success": False, "error": "Produto não encontrado"}
+
+            return {
+                "success": True,
+                "reservation_id": event["reservation_id"],
+                "product_id": event["product_id"],
+                "quantity": quantity,
+                "expires_at": event["expires_at"],
+                "available": int(result),
+            }
+        except (ValueError, TypeError) as e:
+            self.logger.warning(f"Erro de validação ao reservar estoque: {str(e)}")
+            return {"success": False, "error": "Quantidade inválida"}
+        except Exception as e:
+            self.logger.error(f"Erro ao reservar estoque: {str(e)}", exc_info=True)
+            return {"success": False, "error": "Erro ao reservar estoque"}
+
+    def confirm(self, reservation_id: str) -> Dict[str, Any]:
+        """Confirma uma reserva (converte em venda)"""
+        return self._settle(reservation_id, "confirmed")
+
+    def release(self, reservation_id: str, reason: str = "cancelled") -> Dict[str, Any]:
+        """
+        Libera uma reserva e devolve o estoque.
+
+        Args:
+            reservation_id: ID da reserva
+            reason: 'cancelled' ou 'expired'
+        """
+        return self._settle(reservation_id, reason)
+
+    def _settle(self, reservation_id: str, status: str, now: Optional[float] = None) -> Dict[str, Any]:
+        try:
+            redis = self.redis
+            key = RESERVATION_KEY.format(reservation_id=reservation_id)
+            reservation = redis.hgetall(key) if redis else None
+            if not reservation:
+                # Reserva feita sem Redis (ou já removida dele)
+                return self._settle_in_db(reservation_id, status)
+
+            now = time.time() if now is None else now
+            event = {
+                "type": status,
+                "reservation_id": str(reservation_id),
+                "product_id": reservation["product_id"],
+                "quantity": int(reservation["quantity"]),
+                "at": _iso(now),
+            }
+            result = redis.eval(
+                _SETTLE,
+                4,
+                STOCK_KEY.format(product_id=reservation["product_id"]),
+                key,
+                DEADLINES_KEY,
+                LEDGER_QUEUE_KEY,
+                reservation_id,
+                status,
+                _task(event),
+                now,
+                SETTLED_TTL,
+            )
+            if result == -1:
+                return {"success": False, "error": "Reserva já finalizada"}
+            if result == -3:
+                return {"success": False, "error": "Reserva expirada"}
+            if result is None or int(result) < 0:
+                return {"success": False, "error": "Reserva não encontrada"}
+            return {
+                "success": True,
+                "reservation_id": str(reservation_id),
+                "product_id": reservation["product_id"],
+                "quantity": int(result),
+            }
+        except Exception as e:
+            self.logger.error(f"Erro ao finalizar reserva {reservation_id}: {str(e)}", exc_info=True)
+            return {"success": False, "error": "Erro ao finalizar reserva"}
+
+    def _reserve_in_db(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Reserva direto no banco (sem Redis): uma chamada, saldo conferido no banco"""
+        result = self.repo.apply_stock_events([event], strict=True)
+        if not result.get("success"):
+            return {"success": False, "error": result.get("error", "Erro ao reservar estoque")}
+        return {
+            "success": True,
+            "reservation_id": event["reservation_id"],
+            "product_id": event["product_id"],
+            "quantity": event["quantity"],
+            "expires_at": event["expires_at"],
+        }
+
+    def _settle_in_db(self, reservation_id: str, status: str) -> Dict[str, Any]:
+        reservation = self.repo.find_reservation_by_id(reservation_id)
+        if not reservation:
+            return {"success": False, "error": "Reserva não encontrada"}
+        if reservation.get("status") != "reserved":
+            return {"success": False, "error": "Reserva já finalizada"}
+        event = {
+            "type": status,
+            "reservation_id": str(reservation_id),
+            "product_id": str(reservation["product_id"]),
+            "quantity": int(reservation["quantity"]),
+            "at": _iso(time.time()),
+        }
+        result = self.repo.apply_stock_events([event])
+        if not result.get("success") or result.get("failed"):
+            return {"success": False, "error": result.get("error", "Erro ao finalizar reserva")}
+        if reservation.get("product_id") and status != "confirmed":
+            self.adjust(str(reservation["product_id"]), int(reservation["quantity"]))
+        return {
+            "success": True,
+            "reservation_id": str(reservation_id),
+            "product_id": str(reservation["product_id"]),
+            "quantity": int(reservation["quantity"]),
+        }
+
+    def load(self, product_ids: Iterable[str]) -> List[str]:
+        """
+        Carrega o estoque do banco para os produtos ainda não presentes no Redis.
+
+        Returns:
+            IDs dos produtos encontrados no banco
+        """
+        product_ids = [str(pid) for pid in product_ids]
+        levels = self.repo.get_stock_levels(product_ids)
+        if not levels or not self.redis:
+            return []
+        pipe = self.redis.pipeline()
+        for product_id, stock in levels.items():
+            key = STOCK_KEY.format(product_id=product_id)
+            pipe.hsetnx(key, "available", stock)
+            pipe.hsetnx(key, "reserved", 0)
+            pipe.hsetnx(key, "pending", 0)
+            pipe.hsetnx(key, "seq", 0)
+        pipe.sadd(PRODUCTS_KEY, *levels.keys())
+        pipe.execute()
+        return list(levels)
+
+    def get_levels(self, product_ids: Iterable[str]) -> Dict[str, Dict[str, int]]:
+        """
+        Disponível e reservado de vários produtos (apenas produtos já carregados).
+
+        Returns:
+            Dict {product_id: {"available": int, "reserved": int}}
+        """
+        product_ids = [str(pid) for pid in product_ids]
+        if not self.redis or not product_ids:
+            return {}
+        try:
+            pipe = self.redis.pipeline()
+            for product_id in product_ids:
+                pipe.hmget(STOCK_KEY.format(product_id=product_id), ["available", "reserved"])
+            levels = {}
+            for product_id, (available, reserved) in zip(product_ids, pipe.execute()):
+                if available is not None:
+                    levels[product_id] = {"available": int(available), "reserved": int(reserved or 0)}
+            return levels
+        except Exception as e:
+            self.logger.warning(f"Erro ao ler estoque do Redis: {str(e)}")
+            return {}
+
+    def adjust(self, product_id: str, delta: int):
+        """
+        Aplica no Redis uma alteração de estoque já gravada no banco
+        (update_stock, create_order_atomic).
+        """
+        self.adjust_many({str(product_id): int(delta)})
+
+    def adjust_many(self, deltas: Dict[str, int]):
+        """Aplica várias alterações de estoque já gravadas no banco"""
+        try:
+            if not self.redis or not deltas:
+                return
+            pipe = self.redis.pipeline()
+            for product_id, delta in deltas.items():
+                if delta:
+                    pipe.eval(_HINCRBY_IF_EXISTS, 1, STOCK_KEY.format(product_id=product_id), "available", delta)
+            pipe.execute()
+        except Exception as e:
+            self.logger.warning(f"Erro ao ajustar estoque no Redis: {str(e)}")
+
+    def apply_sale(self, items: Iterable[Dict[str, Any]]):
+        """Desconta do Redis os itens de um pedido criado pelo banco"""
+        deltas: Counter = Counter()
+        for item in items or ():
+            deltas[str(item["product_id"])] -= int(item["quantity"])
+        self.adjust_many(dict(deltas))
+
+    def persist(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Grava um lote de eventos no banco (write-behind).
+
+        Eventos repetidos são ignorados pelo banco; um evento inválido não
+        impede a gravação dos demais.
+
+        Returns:
+            Eventos que não foram gravados (o lote inteiro se a chamada falhou)
+        """
+        if not events:
+            return []
+        result = self.repo.apply_stock_events(events)
+        if not result.get("success"):
+            self.logger.error(f"Erro ao gravar {len(events)} evento(s) de estoque: {result.get('error')}")
+            return list(events)
+
+        failed_indexes = set()
+        for failure in result.get("failed") or []:
+            failed_indexes.add(int(failure["index"]))
+            self.logger.error(f"Evento de estoque {failure.get('reservation_id')} não gravado: {failure.get('error')}")
+        self.mark_done([event for index, event in enumerate(events) if index not in failed_indexes])
+        return [event for index, event in enumerate(events) if index in failed_indexes]
+
+    def mark_done(self, events: List[Dict[str, Any]]):
+        """Baixa os eventos pendentes dos produtos (gravados ou descartados)"""
+        try:
+            if not self.redis:
+                return
+            done = Counter(str(event["product_id"]) for event in events)
+            pipe = self.redis.pipeline()
+            for product_id, count in done.items():
+                pipe.eval(_HINCRBY_IF_EXISTS, 1, STOCK_KEY.format(product_id=product_id), "pending", -count)
+            pipe.execute()
+        except Exception as e:
+            self.logger.warning(f"Erro ao atualizar eventos pendentes de estoque: {str(e)}")
+
+    def expire_due(self, now: Optional[float] = None, limit: int = EXPIRE_BATCH) -> int:
+        """
+        Libera as reservas vencidas (sorted set de prazos).
+
+        Returns:
+            Número de reservas expiradas
+        """
+        if not self.redis:
+            return 0
+        now = time.time() if now is None else now
+        expired = 0
+        for reservation_id in self.redis.zrangebyscore(DEADLINES_KEY, 0, now, start=0, num=limit):
+            result = self._settle(reservation_id, "expired", now=now)
+            if result.get("success"):
+                expired += 1
+            elif result.get("error") == "Reserva não encontrada":
+                # Reserva removida do Redis; tira o prazo órfão
+                self.redis.zrem(DEADLINES_KEY, reservation_id)
+        return expired
+
+    def reconcile(self, product_ids: Optional[Iterable[str]] = None, now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Iguala o disponível no Redis ao estoque do banco para produtos sem
+        eventos pendentes.
+
+        Um produto com eventos pendentes e o mesmo seq por STALE_PENDING_AFTER
+        teve eventos perdidos (nenhum evento novo e nada mais em retry): o
+        pending é zerado e o produto volta a ser reconciliado.
+
+        Args:
+            product_ids: Produtos (padrão: todos os carregados)
+            now: Epoch de referência (padrão: agora)
+
+        Returns:
+            Dict com checked, corrected, skipped e reset
+        """
+        stats = {"checked": 0, "corrected": 0, "skipped": 0, "reset": 0}
+        redis = self.redis
+        if not redis:
+            return stats
+        now = time.time() if now is None else now
+        product_ids = [str(pid) for pid in (product_ids if product_ids is not None else redis.smembers(PRODUCTS_KEY))]
+
+        pipe = redis.pipeline()
+        for product_id in product_ids:
+            pipe.hmget(STOCK_KEY.format(product_id=product_id), ["seq", "pending", "available"])
+        seen = dict(zip(product_ids, redis.hmget(PENDING_SEEN_KEY, product_ids))) if product_ids else {}
+        snapshot = {}
+        marks = redis.pipeline()
+        for product_id, (seq, pending, available) in zip(product_ids, pipe.execute()):
+            if seq is not None and int(pending or 0) == 0:
+                snapshot[product_id] = (seq, int(available or 0))
+                if seen.get(product_id):
+                    marks.hdel(PENDING_SEEN_KEY, product_id)
+                continue
+            stats["skipped"] += 1
+            if seq is None:
+                continue
+            seen_seq, _, seen_at = (seen.get(product_id) or "").partition("|")
+            if seen_seq != seq:
+                marks.hset(PENDING_SEEN_KEY, product_id, f"{seq}|{now}")
+            elif now - float(seen_at) >= STALE_PENDING_AFTER and redis.eval(
+                _RESET_PENDING, 1, STOCK_KEY.format(product_id=product_id), seq
+            ):
+                stats["reset"] += 1
+                marks.hdel(PENDING_SEEN_KEY, product_id)
+                self.logger.warning(f"Produto {product_id} com {pending} evento(s) de estoque perdidos: pending zerado")
+        marks.execute()
+        if not snapshot:
+            return stats
+
+        levels = self.repo.get_stock_levels(list(snapshot))
+        if levels is None:
+            stats["skipped"] += len(snapshot)
+            return stats
+        for product_id, (seq, available) in snapshot.items():
+            stats["checked"] += 1
+            stock = levels.get(product_id)
+            if stock is None or stock == available:
+                continue
+            # Só corrige se nada mudou desde a leitura (seq igual, nada pendente)
+            if redis.eval(_RECONCILE, 1, STOCK_KEY.format(product_id=product_id), seq, stock):
+                stats["corrected"] += 1
+                self.logger.warning(f"Estoque do produto {product_id} reconciliado: Redis {available}, banco {stock}")
+        return stats
+
+
+stock_ledger = StockLedger()
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+Serviço de Timelines RE-EDUCA Store.
+
+Feed personalizado (posts próprios e de quem o usuário segue) em sorted
+sets Redis com score = created_at em microssegundos (mesma precisão do
+banco, para o cursor ser exato também nas leituras pelo banco):
+- timeline:home:{user_id}: timeline materializada do leitor
+- timeline:author:{user_id}: posts recentes de cada autor
+
+Escrita (fan-out-on-write): um post novo é inserido nas timelines
+materializadas dos seguidores por uma tarefa na fila social_fanout
+(workers.task_worker). Autores com muitos seguidores (celebridades) não
+fazem fan-out: seus posts são mesclados na leitura (fan-out-on-read)
+a partir de timeline:author:{id}.
+
+Leitura: paginação keyset pelo cursor "{created_us}_{post_id}" (ordem
+created_at DESC, id DESC), hidratação dos ids em lote via
+TimelineRepository.find_posts_by_ids (cache L1/L2) e contadores/reações
+do leitor em duas queries por página. O custo não depende da
+profundidade da página nem do tamanho da tabela posts.
+
+Timelines ausentes (usuário inativo, Redis reiniciado) são reconstruídas
+com uma chamada a get_home_timeline_ids (migração 036); páginas além do
+limite materializado também são lidas dessa função por keyset.
+"""
+import heapq
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from repositories.social_repository import SocialRepository
+from repositories.timeline_repository import TimelineRepository
+from services.base_service import BaseService
+from services.cache_service import cache_service
+from services.queue_service import QueueNames, queue_service
+from services.social_counter_service import social_counters
+from utils.cursors import decode_cursor, encode_cursor, score_to_iso, to_score
+
+logger = logging.getLogger(__name__)
+
+HOME_KEY = "timeline:home:{user_id}"
+AUTHOR_KEY = "timeline:author:{user_id}"
+FOLLOWING_KEY = "timeline:following:{user_id}"
+CELEBRITIES_KEY = "timeline:celebrities"
+
+TIMELINE_MAX = 800
+TIMELINE_TTL = 7 * 86400
+FOLLOWING_TTL = 3600
+FANOUT_THRESHOLD = 5000
+FANOUT_BATCH = 1000
+EMPTY_MARKER = "-"
+
+# ZADD + corte no tamanho máximo, só em timelines já materializadas: a de um
+# usuário inativo é reconstruída do banco quando ele voltar a ler o feed.
+_ADD_IF_EXISTS = """
+local added = 0
+for i = 1, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        redis.call('ZADD', KEYS[i], ARGV[1], ARGV[2])
+        redis.call('ZREMRANGEBYRANK', KEYS[i], 0, -(tonumber(ARGV[3]) + 2))
+        added = added + 1
+    end
+end
+return added
+"""
+
+
+class TimelineService(BaseService):
+    """Timelines com fan-out híbrido e paginação keyset."""
+
+    def __init__(self):
+        """Inicializa o serviço de timelines."""
+        super().__init__()
+        self.repo = TimelineRepository()
+        self.social_repo = SocialRepository()
+
+    @property
+    def redis(self):
+        """Cliente Redis compartilhado (None se indisponível)"""
+        return cache_service.redis_client
+
+    # =====================================================
+    # LEITURA
+    # =====================================================
+
+    def get_home_feed(self, user_id: str, cursor: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+        """
+        Página da timeline do usuário.
+
+        Args:
+            user_id: ID do leitor
+            cursor: Cursor da página anterior (None = topo)
+            limit: Posts por página
+
+        Returns:
+            Dict com posts e next_cursor (None no fim do feed)
+        """
+        try:
+            position = decode_cursor(cursor)
+            limit = max(1, min(int(limit), 100))
+
+            if not self.redis:
+                entries = self._db_page(user_id, position, limit, exclude_authors=[])
+            else:
+                celebrities = self._followed_celebrities(user_id)
+                self._ensure_home(user_id, celebrities)
+                keys = [HOME_KEY.format(user_id=user_id)] + [AUTHOR_KEY.format(user_id=c) for c in celebrities]
+                for celebrity in celebrities:
+                    self._ensure_author(celebrity)
+                entries = self._merge_pages(keys, position, limit)
+
+                floor = self._truncation_floor(user_id)
+                if floor:
+                    # Além do que está materializado só o banco tem a ordem completa
+                    entries = [entry for entry in entries if entry >= floor]
+                    if len(entries) < limit:
+                        last = entries[-1] if entries else position
+                        entries += self._db_page(user_id, last, limit - len(entries), exclude_authors=[])
+
+            posts = self._hydrate(user_id, [post_id for _, post_id in entries])
+            next_cursor = encode_cursor(*entries[-1]) if len(entries) == limit else None
+            return {"success": True, "posts": posts, "next_cursor": next_cursor, "limit": limit}
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+        except Exception as e:
+            return self._handle_error(e, "Erro ao buscar timeline")
+
+    def _merge_pages(self, keys: List[str], position: Optional[Tuple[int, str]], limit: int) -> List[Tuple[int, str]]:
+        """
+        Lê uma página de cada sorted set (uma ida ao Redis) e mescla em ordem keyset.
+
+        Returns:
+            Lista de (score, post_id) em ordem (score DESC, id DESC)
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            if position:
+                score, _ = position
+                pipe.zrevrangebyscore(key, score, score)
+                pipe.zrevrangebyscore(key, f"({score}", "-inf", start=0, num=limit, withscores=True)
+            else:
+                pipe.zrevrangebyscore(key, "+inf", "-inf", start=0, num=limit, withscores=True)
+        results = iter(pipe.execute())
+
+        pages = []
+        for _ in keys:
+            page = []
+            if position:
+                score, post_id = position
+                page = [(score, member) for member in next(results) if member < post_id]
+            page += [(int(s), member) for member, s in next(results)]
+            pages.append([(s, m) for s, m in page if m != EMPTY_MARKER])
+
+        merged, seen = [], set()
+        for entry in heapq.merge(*pages, reverse=True):
+            if entry[1] not in seen:
+                seen.add(entry[1])
+                merged.append(entry)
+                if len(merged) == limit:
+                    break
+        return merged
+
+    def _db_page(
+        self, user_id: str, position: Optional[Tuple[int, str]], limit: int, exclude_authors: List[str]
+    ) -> List[Tuple[int, str]]:
+        """Página da timeline direto do banco (keyset)"""
+        before = (score_to_iso(position[0]), position[1]) if position else None
+        rows = self.repo.get_home_timeline_ids(user_id, limit, before=before, exclude_authors=exclude_authors) or []
+        return [(to_score(row["created_at"]), row["id"]) for row in rows]
+
+    def _hydrate(self, viewer_id: str, post_ids: List[str]) -> List[Dict[str, Any]]:
+        """Cartões dos posts (cache L1/L2) + contadores e reação do leitor"""
+        if not post_ids:
+            return []
+        cards = self.repo.find_posts_by_ids(post_ids)
+        found = {card.get("id") for card in cards}
+        gone = [post_id for post_id in post_ids if post_id not in found]
+        if gone and self.redis:
+            # Posts removidos: limpeza preguiçosa da timeline do leitor
+            self.redis.zrem(HOME_KEY.format(user_id=viewer_id), *gone)
+        return self.social_repo.enrich_posts(cards, viewer_id, refresh_counts=True)
+
+    def _followed_celebrities(self, user_id: str) -> List[str]:
+        """Autores seguidos que não fazem fan-out (lidos na hora)"""
+        key = FOLLOWING_KEY.format(user_id=user_id)
+        if not self.redis.exists(key):
+            following = self.repo.get_following_ids(user_id)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.delete(key)
+            pipe.sadd(key, EMPTY_MARKER, *following)
+            pipe.expire(key, FOLLOWING_TTL)
+            pipe.execute()
+        return sorted(self.redis.sinter(key, CELEBRITIES_KEY) - {EMPTY_MARKER})
+
+    def _ensure_home(self, user_id: str, celebrities: List[str]):
+        """Reconstrói a timeline materializada se ela não existir"""
+        key = HOME_KEY.format(user_id=user_id)
+        if self.redis.exists(key):
+            self.redis.expire(key, TIMELINE_TTL)
+            return
+        rows = self.repo.get_home_timeline_ids(user_id, TIMELINE_MAX, exclude_authors=celebrities)
+        if rows is None:
+            return
+        self._store_zset(key, rows, TIMELINE_TTL)
+
+    def _ensure_author(self, author_id: str):
+        """Carrega os posts recentes de um autor se não estiverem em cache"""
+        key = AUTHOR_KEY.format(user_id=author_id)
+        if not self.redis.exists(key):
+            self._store_zset(key, self.repo.get_author_post_ids(author_id, TIMELINE_MAX), TIMELINE_TTL)
+
+    def _store_zset(self, key: str, rows: List[Dict[str, Any]], ttl: int):
+        members = {row["id"]: to_score(row["created_at"]) for row in rows}
+        # Marcador mantém a chave existente mesmo sem posts (evita reconstruir a cada leitura)
+        members[EMPTY_MARKER] = 0
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(key)
+        pipe.zadd(key, members)
+        pipe.expire(key, ttl)
+        pipe.execute()
+
+    def _truncation_floor(self, user_id: str) -> Optional[Tuple[int, str]]:
+        """
+        Post mais antigo da timeline materializada, se ela atingiu o limite.
+
+        Returns:
+            (score, post_id) a partir do qual a leitura segue no banco, ou None
+        """
+        key = HOME_KEY.format(user_id=user_id)
+        if self.redis.zcard(key) <= TIMELINE_MAX:
+            return None
+        oldest = [(int(score), member) for member, score in self.redis.zrange(key, 0, 1, withscores=True)]
+        oldest = [entry for entry in oldest if entry[1] != EMPTY_MARKER]
+        return oldest[0] if oldest else None
+
+    # =====================================================
+    # ESCRITA
+    # =====================================================
+
+    def on_post_created(self, post: Dict[str, Any]):
+        """
+        Agenda o fan-out de um post novo.
+
+        A timeline do autor e a lista de posts dele são atualizadas na hora;
+        as dos seguidores pela fila social_fanout (ou inline, sem fila).
+        """
+        if not self.redis or not post or not post.get("id"):
+            return
+        post_id, author_id, score = post["id"], post["user_id"], to_score(post["created_at"])
+        self._add_if_exists([HOME_KEY.format(user_id=author_id), AUTHOR_KEY.format(user_id=author_id)], post_id, score)
+
+        task = {"function_name": "fanout_post", "module": __name__, "args": [post_id, author_id, score]}
+        if not queue_service.enqueue_task(QueueNames.SOCIAL_FANOUT, task, priority=1):
+            self.fan_out(post_id, author_id, score)
+
+    def fan_out(self, post_id: str, author_id: str, score: int) -> int:
+        """
+        Insere o post nas timelines materializadas dos seguidores.
+
+        Args:
+            post_id: ID do post
+            author_id: ID do autor
+            score: created_at em microssegundos
+
+        Returns:
+            Número de timelines atualizadas
+        """
+        if not self.redis:
+            return 0
+        if social_counters.get_counters(author_id)["followers"] >= FANOUT_THRESHOLD:
+            # Celebridade: seguidores leem timeline:author:{id} na hora
+            self.redis.sadd(CELEBRITIES_KEY, author_id)
+            return 0
+
+        updated, after_id = 0, None
+        while True:
+            followers = self.repo.get_follower_ids_page(author_id, after_id=after_id, limit=FANOUT_BATCH)
+            if not followers:
+                break
+            updated += self._add_if_exists([HOME_KEY.format(user_id=uid) for uid in followers], post_id, score)
+            if len(followers) < FANOUT_BATCH:
+                break
+            after_id = followers[-1]
+        return updated
+
+    def on_post_deleted(self, post_id: str, author_id: str):
+        """Remove o post do autor; timelines de seguidores são limpas na leitura"""
+        self.repo.forget_posts([post_id])
+        if self.redis:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zrem(AUTHOR_KEY.format(user_id=author_id), post_id)
+            pipe.zrem(HOME_KEY.format(user_id=author_id), post_id)
+            pipe.execute()
+
+    def on_post_updated(self, post_id: str):
+        """Descarta o cartão em cache do post editado"""
+        self.repo.forget_posts([post_id])
+
+    def on_follow(self, follower_id: str, following_id: str):
+        """Traz os posts recentes do autor seguido para a timeline do leitor"""
+        if not self.redis:
+            return
+        home = HOME_KEY.format(user_id=follower_id)
+        following = FOLLOWING_KEY.format(user_id=follower_id)
+        if self.redis.exists(following):
+            self.redis.sadd(following, following_id)
+        if self.redis.sismember(CELEBRITIES_KEY, following_id) or not self.redis.exists(home):
+            return
+        recent = self._recent_author_posts(following_id)
+        if recent:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zadd(home, recent)
+            pipe.zremrangebyrank(home, 0, -(TIMELINE_MAX + 2))
+            pipe.execute()
+
+    def on_unfollow(self, follower_id: str, following_id: str):
+        """Remove os posts do autor da timeline do leitor"""
+        if not self.redis:
+            return
+        self.redis.srem(FOLLOWING_KEY.format(user_id=follower_id), following_id)
+        recent = self._recent_author_posts(following_id)
+        if recent:
+            self.redis.zrem(HOME_KEY.format(user_id=follower_id), *recent.keys())
+
+    def _recent_author_posts(self, author_id: str) -> Dict[str, int]:
+        self._ensure_author(author_id)
+        entries = self.redis.zrevrangebyscore(
+            AUTHOR_KEY.format(user_id=author_id), "+inf", "-inf", start=0, num=TIMELINE_MAX, withscores=True
+        )
+        return {member: int(score) for member, score in entries if member != EMPTY_MARKER}
+
+    def _add_if_exists(self, keys: List[str], post_id: str, score: int) -> int:
+        try:
+            return int(self.redis.eval(_ADD_IF_EXISTS, len(keys), *keys, score, post_id, TIMELINE_MAX) or 0)
+        except Exception as e:
+            self.logger.warning(f"Erro ao atualizar timelines: {str(e)}")
+            return 0
+
+
+timeline_service = TimelineService()
+
+
+def fanout_post(post_id: str, author_id: str, score: int) -> int:
+    """Tarefa da fila social_fanout (executada por workers.task_worker)"""
+    return timeline_service.fan_out(post_id, author_id, score)
@@ -0,0 +1,517 @@
+# -*- coding: utf-8 -*-
+"""
+Base Local de Alimentos USDA - RE-EDUCA Store.
+
+Substitui a busca online na API FoodData Central por um índice local,
+gerado a partir dos dumps em lote (Foundation / SR Legacy, CSV ou JSON)
+por scripts/import_usda_foods.py.
+
+Layout do diretório (arrays .npy abertos com mmap_mode='r', compartilhados
+entre os workers pelo page cache do SO):
+    manifest.json               metadados, colunas de nutrientes, categorias
+    fdc_ids.npy                 int64 [n], ordenado (busca por id via searchsorted)
+    nutrients.npy               float32 [n, k], valores por 100 g (NaN = ausente)
+    category_ids.npy            int16 [n], índice em manifest["categories"] (-1 = sem)
+    names.bin / name_offsets    nomes UTF-8 concatenados + offsets [n+1]
+    tokens.bin / token_offsets  palavras normalizadas únicas, em ordem lexicográfica
+    token_postings(_offsets)    alimentos de cada palavra (contíguos na ordem das palavras)
+    first_token.npy             índice da primeira palavra do nome de cada alimento
+    trigram_keys.npy            trigramas codificados (int64, ordenados)
+    trigram_postings(_offsets)  alimentos de cada trigrama
+    trigram_counts.npy          trigramas distintos por alimento (similaridade de Jaccard)
+
+Busca:
+1. Prefixo: cada palavra da consulta casa com um intervalo contíguo de
+   palavras ordenadas (bisect) -> fatia de postings; interseção entre palavras
+2. Trigramas (tolerante a erros de digitação) completa o resultado
+"""
+
+import bisect
+import csv
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import unicodedata
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT_VERSION = 1
+DEFAULT_SEARCH_LIMIT = 25
+MIN_TRIGRAM_SIMILARITY = 0.3
+STORE_RECHECK_SECONDS = 300
+
+# (id USDA, chave, nome USDA, unidade) - colunas de nutrients.npy
+NUTRIENT_COLUMNS = (
+    (1008, "calories", "Energy", "KCAL"),
+    (1003, "protein", "Protein", "G"),
+    (1005, "carbs", "Carbohydrate, by difference", "G"),
+    (1004, "fat", "Total lipid (fat)", "G"),
+    (1079, "fiber", "Fiber, total dietary", "G"),
+    (2000, "sugars", "Sugars, total including NLEA", "G"),
+    (1258, "saturated_fat", "Fatty acids, total saturated", "G"),
+    (1253, "cholesterol", "Cholesterol", "MG"),
+    (1093, "sodium", "Sodium, Na", "MG"),
+    (1092, "potassium", "Potassium, K", "MG"),
+    (1087, "calcium", "Calcium, Ca", "MG"),
+    (1089, "iron", "Iron, Fe", "MG"),
+    (1162, "vitamin_c", "Vitamin C, total ascorbic acid", "MG"),
+    (1106, "vitamin_a", "Vitamin A, RAE", "UG"),
+)
+NUTRIENT_COLUMN_INDEX = {nutrient_id: i for i, (nutrient_id, _, _, _) in enumerate(NUTRIENT_COLUMNS)}
+
+# Foundation Foods frequentemente só trazem energia por fatores de Atwater
+ENERGY_FALLBACK_IDS = (2048, 2047)
+
+# data_type dos dumps CSV que são importados
+IMPORTED_DATA_TYPES = {"foundation_food", "sr_legacy_food"}
+
+_TRIGRAM_ALPHABET = " abcdefghijklmnopqrstuvwxyz0123456789"
+_TRIGRAM_CODES = {char: code for code, char in enumerate(_TRIGRAM_ALPHABET)}
+_TRIGRAM_BASE = len(_TRIGRAM_ALPHABET)
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+# ============================================================
+# NORMALIZAÇÃO
+# ============================================================
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sem acentos, só [a-z0-9] separados por espaço simples"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    ascii_text = "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+    return _NON_ALNUM.sub(" ", ascii_text).strip()
+
+
+def tokenize(text: str) -> List[str]:
+    """Palavras normalizadas de um texto"""
+    normalized = normalize_text(text)
+    return normalized.split() if normalized else []
+
+
+def trigram_keys(text: str) -> np.ndarray:
+    """
+    Trigramas distintos (codificados em int64) de um texto.
+
+    Cada palavra é completada como no pg_trgm ("  palavra "), então prefixos
+    curtos também geram trigramas.
+    """
+    keys = set()
+    for word in tokenize(text):
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            a, b, c = (_TRIGRAM_CODES[char] for char in padded[i : i + 3])
+            keys.add((a * _TRIGRAM_BASE + b) * _TRIGRAM_BASE + c)
+    return np.array(sorted(keys), dtype=np.int64)
+
+
+# ============================================================
+# LEITURA DOS DUMPS USDA
+# ============================================================
+
+
+def _food_record(fdc_id: Any, name: str, category: Optional[str], amounts: Dict[int, float]) -> Dict[str, Any]:
+    """Registro intermediário do importador"""
+    return {"fdc_id": int(fdc_id), "name": (name or "").strip(), "category": category or None, "nutrients": amounts}
+
+
+def read_usda_csv(directory: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lê um dump CSV do FoodData Central (food.csv, food_nutrient.csv, food_category.csv).
+
+    Só alimentos Foundation e SR Legacy são importados; food_nutrient.csv
+    (centenas de MB no dump completo) é lido em streaming.
+    """
+    categories = {}
+    category_path = os.path.join(directory, "food_category.csv")
+    if os.path.exists(category_path):
+        with open(category_path, newline="", encoding="utf-8") as handle:
+            categories = {row["id"]: row["description"] for row in csv.DictReader(handle)}
+
+    foods = {}
+    with open(os.path.join(directory, "food.csv"), newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            if row.get("data_type") in IMPORTED_DATA_TYPES:
+                foods[row["fdc_id"]] = _food_record(
+                    row["fdc_id"], row.get("description"), categories.get(row.get("food_category_id")), {}
+                )
+
+    wanted = set(NUTRIENT_COLUMN_INDEX) | set(ENERGY_FALLBACK_IDS)
+    with open(os.path.join(directory, "food_nutrient.csv"), newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            food = foods.get(row.get("fdc_id"))
+            if food is None:
+                continue
+            try:
+                nutrient_id = int(row["nutrient_id"])
+                if nutrient_id in wanted and row.get("amount") not in (None, ""):
+                    food["nutrients"][nutrient_id] = float(row["amount"])
+            except (TypeError, ValueError):
+                continue
+
+    yield from foods.values()
+
+
+def read_usda_json(path: str) -> Iterator[Dict[str, Any]]:
+    """Lê um dump JSON do FoodData Central (FoundationFoods / SRLegacyFoods)"""
+    from services.usda_food_parser import USDAFoodParser
+
+    parser = USDAFoodParser()
+    with open(path, encoding="utf-8") as handle:
+        payload = json.load(handle)
+
+    if isinstance(payload, dict):
+        items = payload.get("FoundationFoods") or payload.get("SRLegacyFoods") or payload.get("foods") or []
+    else:
+        items = payload
+
+    for item in items:
+        if not item.get("fdcId"):
+            continue
+        amounts = {}
+        for nutrient in item.get("foodNutrients", []):
+            nutrient_id = parser._get_nutrient_id(nutrient)
+            if nutrient_id is not None and ("amount" in nutrient or "value" in nutrient):
+                amounts[nutrient_id] = parser._get_nutrient_value(nutrient)
+        yield _food_record(item["fdcId"], item.get("description"), parser._extract_category(item), amounts)
+
+
+# ============================================================
+# CONSTRUÇÃO DO ÍNDICE
+# ============================================================
+
+
+def _nutrient_vector(amounts: Dict[int, float]) -> np.ndarray:
+    """Vetor por 100 g nas colunas de NUTRIENT_COLUMNS"""
+    vector = np.full(len(NUTRIENT_COLUMNS), np.nan, dtype=np.float32)
+    for nutrient_id, value in amounts.items():
+        column = NUTRIENT_COLUMN_INDEX.get(nutrient_id)
+        if column is not None:
+            vector[column] = value
+    if np.isnan(vector[0]):
+        for fallback_id in ENERGY_FALLBACK_IDS:
+            if fallback_id in amounts:
+                vector[0] = amounts[fallback_id]
+                break
+    return vector
+
+
+def _write_strings(directory: str, name: str, values: Sequence[str]) -> None:
+    """Grava strings como blob UTF-8 + offsets"""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(item) for item in encoded])
+    with open(os.path.join(directory, f"{name}.bin"), "wb") as handle:
+        handle.write(b"".join(encoded))
+    np.save(os.path.join(directory, f"{name}_offsets.npy"), offsets)
+
+
+def _postings(pairs_key: np.ndarray, pairs_food: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Agrupa pares (chave, alimento) em chaves únicas + offsets + postings"""
+    order = np.lexsort((pairs_food, pairs_key))
+    keys, foods = pairs_key[order], pairs_food[order].astype(np.int32)
+    unique_keys, starts = np.unique(keys, return_index=True)
+    offsets = np.append(starts, len(keys)).astype(np.int64)
+    return unique_keys, offsets, foods
+
+
+def write_food_store(foods: Iterable[Dict[str, Any]], directory: str, sources: Optional[List[str]] = None) -> int:
+    """
+    Gera o índice local a partir dos registros lidos dos dumps.
+
+    A escrita é feita num diretório temporário e trocada de uma vez, então
+    processos que já abriram a base continuam lendo a versão anterior.
+
+    Returns:
+        Quantidade de alimentos indexados
+    """
+    by_id = {}
+    for food in foods:
+        if food.get("name"):
+            by_id[food["fdc_id"]] = food
+    records = [by_id[fdc_id] for fdc_id in sorted(by_id)]
+
+    categories = sorted({food["category"] for food in records if food.get("category")})
+    category_index = {category: i for i, category in enumerate(categories)}
+
+    staging = f"{directory.rstrip(os.sep)}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    np.save(os.path.join(staging, "fdc_ids.npy"), np.array([food["fdc_id"] for food in records], dtype=np.int64))
+    nutrients = np.vstack([_nutrient_vector(food["nutrients"]) for food in records]) if records else np.empty(
+        (0, len(NUTRIENT_COLUMNS)), dtype=np.float32
+    )
+    np.save(os.path.join(staging, "nutrients.npy"), nutrients)
+    np.save(
+        os.path.join(staging, "category_ids.npy"),
+        np.array([category_index.get(food.get("category"), -1) for food in records], dtype=np.int16),
+    )
+    _write_strings(staging, "names", [food["name"] for food in records])
+
+    # Índice de palavras (prefixo)
+    food_tokens = [tokenize(food["name"]) for food in records]
+    vocabulary = sorted({token for tokens in food_tokens for token in tokens})
+    token_index = {token: i for i, token in enumerate(vocabulary)}
+    token_pairs = [(token_index[token], food) for food, tokens in enumerate(food_tokens) for token in set(tokens)]
+    token_keys, token_offsets, token_postings = _postings(
+        np.array([pair[0] for pair in token_pairs], dtype=np.int64),
+        np.array([pair[1] for pair in token_pairs], dtype=np.int64),
+    )
+    # Todas as palavras do vocabulário têm postings, então token_keys == arange(len(vocabulary))
+    _write_strings(staging, "tokens", vocabulary)
+    np.save(os.path.join(staging, "token_postings_offsets.npy"), token_offsets)
+    np.save(os.path.join(staging, "token_postings.npy"), token_postings)
+    np.save(
+        os.path.join(staging, "first_token.npy"),
+        np.array([token_index[tokens[0]] if tokens else -1 for tokens in food_tokens], dtype=np.int32),
+    )
+
+    # Índice de trigramas
+    food_trigrams = [trigram_keys(food["name"]) for food in records]
+    all_keys = np.concatenate(food_trigrams) if food_trigrams else np.empty(0, dtype=np.int64)
+    all_foods = np.repeat(np.arange(len(records)), [len(keys) for keys in food_trigrams])
+    trigram_unique, trigram_offsets, trigram_postings = _postings(all_keys, all_foods)
+    np.save(os.path.join(staging, "trigram_keys.npy"), trigram_unique)
+    np.save(os.path.join(staging, "trigram_postings_offsets.npy"), trigram_offsets)
+    np.save(os.path.join(staging, "trigram_postings.npy"), trigram_postings)
+    np.save(
+        os.path.join(staging, "trigram_counts.npy"), np.array([len(keys) for keys in food_trigrams], dtype=np.int16)
+    )
+
+    manifest = {
+        "version": STORE_FORMAT_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "foods": len(records),
+        "tokens": len(vocabulary),
+        "trigrams": int(len(trigram_unique)),
+        "sources": sources or [],
+        "categories": categories,
+        "nutrient_columns": [
+            {"id": nutrient_id, "key": key, "name": name, "unit": unit}
+            for nutrient_id, key, name, unit in NUTRIENT_COLUMNS
+        ],
+    }
+    with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, ensure_ascii=False, indent=2)
+
+    previous = f"{directory.rstrip(os.sep)}.old-{os.getpid()}"
+    if os.path.exists(directory):
+        os.replace(directory, previous)
+    os.replace(staging, directory)
+    shutil.rmtree(previous, ignore_errors=True)
+    return len(records)
+
+
+# ============================================================
+# LEITURA / BUSCA
+# ============================================================
+
+
+class _StringTable:
+    """Sequência de strings sobre blob UTF-8 mapeado em memória (compatível com bisect)"""
+
+    def __init__(self, directory: str, name: str):
+        self.offsets = np.load(os.path.join(directory, f"{name}_offsets.npy"), mmap_mode="r")
+        blob_path = os.path.join(directory, f"{name}.bin")
+        self.blob = np.memmap(blob_path, dtype=np.uint8, mode="r") if os.path.getsize(blob_path) else b""
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return bytes(self.blob[int(self.offsets[index]) : int(self.offsets[index + 1])]).decode("utf-8")
+
+    def byte_lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+
+class UsdaFoodStore:
+    """
+    Base local de alimentos USDA aberta em modo somente leitura.
+
+    Os resultados seguem o formato de USDAFoodParser.parse_food_item, com os
+    valores por 100 g.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as handle:
+            self.manifest = json.load(handle)
+        if self.manifest.get("version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Versão da base USDA incompatível: {self.manifest.get('version')}")
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+
+        self.fdc_ids = load("fdc_ids")
+        self.nutrients = load("nutrients")
+        self.category_ids = load("category_ids")
+        self.first_token = load("first_token")
+        self.token_postings_offsets = load("token_postings_offsets")
+        self.token_postings = load("token_postings")
+        self.trigram_keys = load("trigram_keys")
+        self.trigram_postings_offsets = load("trigram_postings_offsets")
+        self.trigram_postings = load("trigram_postings")
+        self.trigram_counts = load("trigram_counts")
+        self.names = _StringTable(directory, "names")
+        self.tokens = _StringTable(directory, "tokens")
+        self.name_lengths = self.names.byte_lengths()
+        self.categories = self.manifest.get("categories", [])
+        self.columns = self.manifest["nutrient_columns"]
+
+    def __len__(self) -> int:
+        return len(self.fdc_ids)
+
+    def get(self, fdc_id: int) -> Optional[Dict[str, Any]]:
+        """Busca um alimento pelo fdc_id (None se não estiver na base)"""
+        index = int(np.searchsorted(self.fdc_ids, fdc_id))
+        if index >= len(self.fdc_ids) or int(self.fdc_ids[index]) != int(fdc_id):
+            return None
+        return self._food(index)
+
+    def search(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Busca alimentos por prefixo de palavras, completando com similaridade de trigramas.
+
+        Args:
+            query: Texto digitado pelo usuário
+            limit: Máximo de resultados
+        """
+        words = tokenize(query)
+        if not words or not len(self):
+            return []
+
+        ranked = self._prefix_matches(words)
+        if len(ranked) < limit:
+            seen = set(ranked.tolist())
+            extra = [index for index in self._trigram_matches(query, limit * 2) if index not in seen]
+            ranked = np.concatenate([ranked, np.array(extra, dtype=ranked.dtype)])
+
+        return [self._food(int(index)) for index in ranked[:limit]]
+
+    def _token_range(self, prefix: str) -> Tuple[int, int]:
+        """Intervalo [lo, hi) de palavras do vocabulário que começam com prefix"""
+        lo = bisect.bisect_left(self.tokens, prefix)
+        hi = bisect.bisect_left(self.tokens, prefix + "\uffff", lo)
+        return lo, hi
+
+    def _prefix_matches(self, words: List[str]) -> np.ndarray:
+        """Alimentos cujo nome tem todas as palavras da consulta como prefixo, ranqueados"""
+        candidates = None
+        first_range = None
+        for word in words:
+            lo, hi = self._token_range(word)
+            if lo == hi:
+                return np.empty(0, dtype=np.int64)
+            first_range = first_range or (lo, hi)
+            # Palavras ordenadas -> postings do intervalo são uma fatia contígua
+            start, end = int(self.token_postings_offsets[lo]), int(self.token_postings_offsets[hi])
+            matches = np.unique(self.token_postings[start:end])
+            candidates = matches if candidates is None else np.intersect1d(candidates, matches, assume_unique=True)
+            if not len(candidates):
+                return np.empty(0, dtype=np.int64)
+
+        # Nome começando pela consulta primeiro, depois nomes mais curtos (mais genéricos)
+        first = self.first_token[candidates]
+        starts_with = (first >= first_range[0]) & (first < first_range[1])
+        order = np.lexsort((self.fdc_ids[candidates], self.name_lengths[candidates], ~starts_with))
+        return candidates[order].astype(np.int64)
+
+    def _trigram_matches(self, query: str, limit: int) -> List[int]:
+        """Alimentos por similaridade de Jaccard entre trigramas (tolerante a erros)"""
+        keys = trigram_keys(query)
+        positions = np.searchsorted(self.trigram_keys, keys)
+        found = positions < len(self.trigram_keys)
+        found[found] = self.trigram_keys[positions[found]] == keys[found]
+        if not found.any():
+            return []
+
+        slices = [
+            self.trigram_postings[int(self.trigram_postings_offsets[p]) : int(self.trigram_postings_offsets[p + 1])]
+            for p in positions[found]
+        ]
+        hits = np.bincount(np.concatenate(slices), minlength=len(self))
+        candidates = np.nonzero(hits)[0]
+        shared = hits[candidates]
+        similarity = shared / (len(keys) + self.trigram_counts[candidates] - shared)
+
+        keep = similarity >= MIN_TRIGRAM_SIMILARITY
+        candidates, similarity = candidates[keep], similarity[keep]
+        order = np.lexsort((self.name_lengths[candidates], -similarity))[:limit]
+        return candidates[order].tolist()
+
+    def _food(self, index: int) -> Dict[str, Any]:
+        """Monta o alimento no formato de USDAFoodParser.parse_food_item"""
+        vector = self.nutrients[index]
+        values = {}
+        nutrients = {}
+        for column, value in zip(self.columns, vector):
+            if np.isnan(value):
+                continue
+            values[column["key"]] = round(float(value), 1)
+            nutrients[column["name"]] = {"value": float(value), "unit": column["unit"], "id": column["id"]}
+
+        category_id = int(self.category_ids[index])
+        return {
+            "fdc_id": int(self.fdc_ids[index]),
+            "name": self.names[index],
+            "brand": None,
+            "category": self.categories[category_id] if category_id >= 0 else None,
+            "calories": values.get("calories", 0),
+            "protein": values.get("protein", 0),
+            "carbs": values.get("carbs", 0),
+            "fat": values.get("fat", 0),
+            "fiber": values.get("fiber", 0),
+            "nutrients": nutrients,
+            "serving_size": 100,
+            "serving_unit": "g",
+        }
+
+
+_store: Optional[UsdaFoodStore] = None
+_store_mtime: Optional[float] = None
+_store_checked_at = 0.0
+
+
+def get_food_store() -> Optional[UsdaFoodStore]:
+    """
+    Base local compartilhada pelo processo (None se ainda não foi importada).
+
+    O manifest é verificado periodicamente: uma importação feita com a
+    aplicação no ar passa a ser usada sem reinício.
+    """
+    global _store, _store_mtime, _store_checked_at
+    if time.time() - _store_checked_at < STORE_RECHECK_SECONDS:
+        return _store
+
+    _store_checked_at = time.time()
+    try:
+        from config.settings import get_config
+
+        directory = get_config().USDA_FOOD_STORE_PATH
+        manifest_path = os.path.join(directory, "manifest.json")
+        mtime = os.path.getmtime(manifest_path) if os.path.exists(manifest_path) else None
+        if mtime != _store_mtime:
+            _store = UsdaFoodStore(directory) if mtime is not None else None
+            _store_mtime = mtime
+            if _store is not None:
+                logger.info(f"Base local USDA carregada: {len(_store)} alimentos")
+    except Exception as e:
+        logger.warning(f"Base local USDA indisponível: {str(e)}")
+    return _store
+
+
+def reset_food_store() -> None:
+    """Descarta a base carregada (a próxima chamada reabre do disco)"""
+    global _store, _store_mtime, _store_checked_at
+    _store = None
+    _store_mtime = None
+    _store_checked_at = 0.0
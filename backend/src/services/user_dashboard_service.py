@@ -15,6 +15,8 @@ from datetime import datetime, timedelta
 from typing import Any, Dict, List
 
 from config.database import supabase_client
+from repositories.health_rollup_repository import HealthRollupRepository
+from services.gamification_engine import gamification_engine
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +31,7 @@ class UserDashboardService:
     def __init__(self):
         """Inicializa o serviço de dashboard."""
         self.db = supabase_client
+        self.rollup_repo = HealthRollupRepository()
 
     def get_dashboard_data(self, user_id: str) -> Dict[str, Any]:
         """
@@ -333,23 +336,28 @@ class UserDashboardService:
             return {"total_orders": 0, "total_favorites": 0, "total_reviews": 0, "days_active": 0, "streak_days": 0}
 
     def _get_workout_summary(self, user_id: str) -> Dict[str, Any]:
-        """Retorna resumo de treinos da semana"""
+        """Retorna resumo de treinos da semana (a partir dos rollups diários)"""
         try:
-            seven_days_ago = (datetime.now() - timedelta(days=7)).isoformat()
-            logs_list = self.db.get_exercise_logs(user_id, since=seven_days_ago)
-
-            if not logs_list:
+            today = datetime.now().date()
+            rollups = self.rollup_repo.find_by_range(
+                user_id,
+                (today - timedelta(days=6)).isoformat(),
+                today.isoformat(),
+                columns="day,exercise_entries,exercise_minutes,calories_out,exercise_counts",
+            )
+
+            total_workouts = sum(int(r.get("exercise_entries") or 0) for r in rollups)
+            if not total_workouts:
                 return {"total_workouts": 0, "total_minutes": 0, "total_calories": 0, "favorite_exercise": None}
 
-            total_workouts = len(logs_list)
-            total_minutes = sum(log.get("duration_minutes", 0) for log in logs_list)
-            total_calories = sum(log.get("calories_burned", 0) for log in logs_list)
+            total_minutes = sum(int(r.get("exercise_minutes") or 0) for r in rollups)
+            total_calories = sum(float(r.get("calories_out") or 0) for r in rollups)
 
-            # Encontrar exercício favorito (mais frequente)
+            # Encontrar exercício favorito (mais frequente na semana)
             exercise_counts = {}
-            for log in logs_list:
-                exercise = log.get("exercise_name", "Desconhecido")
-                exercise_counts[exercise] = exercise_counts.get(exercise, 0) + 1
+            for rollup in rollups:
+                for exercise, count in (rollup.get("exercise_counts") or {}).items():
+                    exercise_counts[exercise] = exercise_counts.get(exercise, 0) + count
 
             favorite_exercise = max(exercise_counts.items(), key=lambda x: x[1])[0] if exercise_counts else None
 
@@ -367,26 +375,20 @@ class UserDashboardService:
             return {"total_workouts": 0, "total_minutes": 0, "total_calories": 0, "favorite_exercise": None}
 
     def _get_nutrition_summary(self, user_id: str) -> Dict[str, Any]:
-        """Retorna resumo nutricional do dia"""
+        """Retorna resumo nutricional do dia (a partir do rollup de hoje)"""
         try:
             today = datetime.now().strftime("%Y-%m-%d")
-            logs_list = self.db.get_nutrition_logs(user_id, since=today)
+            rollup = self.rollup_repo.find_by_day(user_id, today)
 
-            if not logs_list:
+            if not rollup:
                 return {"calories": 0, "protein": 0, "carbs": 0, "fat": 0, "water": 0}
 
-            total_calories = sum(log.get("calories", 0) for log in logs_list)
-            total_protein = sum(log.get("protein", 0) for log in logs_list)
-            total_carbs = sum(log.get("carbs", 0) for log in logs_list)
-            total_fat = sum(log.get("fat", 0) for log in logs_list)
-            total_water = sum(log.get("water_ml", 0) for log in logs_list)
-
             return {
-                "calories": round(total_calories, 1),
-                "protein": round(total_protein, 1),
-                "carbs": round(total_carbs, 1),
-                "fat": round(total_fat, 1),
-                "water": round(total_water / 1000, 1),  # Converter para litros
+                "calories": round(float(rollup.get("calories_in") or 0), 1),
+                "protein": round(float(rollup.get("protein") or 0), 1),
+                "carbs": round(float(rollup.get("carbs") or 0), 1),
+                "fat": round(float(rollup.get("fat") or 0), 1),
+                "water": round(float(rollup.get("hydration_liters") or 0), 1),
             }
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -396,28 +398,9 @@ class UserDashboardService:
             return {"calories": 0, "protein": 0, "carbs": 0, "fat": 0, "water": 0}
 
     def _calculate_streak(self, user_id: str) -> int:
-        """Calcula sequência de dias ativos do usuário"""
+        """Sequência de dias ativos (com registro alimentar ou exercício), mantida pelo motor de gamificação"""
         try:
-            activities_list = self.db.get_user_activities(user_id)
-
-            if not activities_list:
-                return 0
-
-            # Contar dias consecutivos com atividade
-            streak = 0
-            current_date = datetime.now().date()
-
-            activity_dates = set()
-            for activity in activities_list:
-                activity_date = datetime.fromisoformat(activity["created_at"].replace("Z", "+00:00")).date()
-                activity_dates.add(activity_date)
-
-            # Verificar sequência
-            while current_date in activity_dates:
-                streak += 1
-                current_date -= timedelta(days=1)
-
-            return streak
+            return gamification_engine.get_stats(user_id)["current_streak"]
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
             # Tratamento específico pode ser adicionado aqui
@@ -121,6 +121,14 @@ class UserService(BaseService):
             if updated_user:
                 # Limpa cache
                 self.user_repo.clear_cache(f"users:id:{user_id}")
+                if "name" in update_data:
+                    from services.social_search_service import social_search
+
+                    social_search.index_user(updated_user)
+                if "name" in update_data or "avatar_url" in update_data:
+                    from services.leaderboard_service import leaderboard_service
+
+                    leaderboard_service.cache_profiles([updated_user], only_existing=True)
                 return {"success": True, "user": updated_user}
             else:
                 return {"success": False, "error": "Erro ao atualizar perfil"}
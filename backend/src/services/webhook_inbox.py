@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Entrada de Webhooks RE-EDUCA Store.
+
+Recebe webhooks de pagamento (Stripe, PagSeguro) e de plataformas de
+afiliados sem processá-los na requisição:
+- A rota verifica a assinatura e chama ingest(), que em um script Lua
+  marca o evento como visto (SET NX com o ID do provider) e o enfileira
+- O provider recebe 200 em poucos milissegundos; retries do provider para
+  o mesmo evento são descartados pela marca no Redis. O evento não se perde
+  depois de marcado: o worker só o tira da lista de processamento depois
+  de gravá-lo, e a marca é removida se ele esgotar as tentativas
+- workers/webhook_worker.py consome as filas e processa os eventos
+  (services/webhook_processor.py)
+
+Os eventos são distribuídos em WEBHOOK_PARTITIONS filas pela chave de
+ordenação (em geral o ID do pedido): eventos do mesmo pedido caem na mesma
+fila e são processados na ordem em que chegaram. Quando um evento falha e
+volta para a fila com retry, ele bloqueia sua chave (block): os eventos
+seguintes da chave esperam em uma lista própria (hold) até ele ser gravado
+ou ir para a fila de falhas, e então voltam para a frente da fila (release).
+Sem Redis, ingest() devolve erro e a rota processa o evento na requisição,
+como antes.
+"""
+
+import json
+import logging
+import os
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from services.cache_service import cache_service
+from services.queue_service import QueueNames
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_SEEN_KEY = "webhooks:seen:{provider}:{event_id}"
+# Mesmo prazo de retry dos providers (Stripe reenvia por até 3 dias)
+WEBHOOK_SEEN_TTL = 7 * 24 * 3600
+# Evento que bloqueia a chave (id da tarefa) e eventos da chave em espera
+WEBHOOK_BLOCK_KEY = "webhooks:block:{ordering_key}"
+WEBHOOK_HELD_KEY = "webhooks:held:{ordering_key}"
+WEBHOOK_PARTITIONS = int(os.environ.get("WEBHOOK_PARTITIONS", "4"))
+
+# KEYS: marca do evento, fila; ARGV: TTL da marca, tarefa
+_INGEST = """
+if not redis.call('SET', KEYS[1], '1', 'NX', 'EX', ARGV[1]) then
+    return 0
+end
+redis.call('LPUSH', KEYS[2], ARGV[2])
+return 1
+"""
+
+
+def partition_for(ordering_key: str, partitions: int = WEBHOOK_PARTITIONS) -> int:
+    """Partição (fila) de uma chave de ordenação"""
+    return zlib.crc32(str(ordering_key).encode("utf-8")) % max(1, partitions)
+
+
+def partition_queue(partition: int) -> str:
+    """Nome da fila (RedisQueueService) de uma partição"""
+    return f"{QueueNames.WEBHOOKS}_{partition}"
+
+
+class WebhookInbox:
+    """Enfileiramento idempotente de webhooks recebidos."""
+
+    def __init__(self):
+        """Inicializa a entrada de webhooks."""
+        self.logger = logger
+
+    @property
+    def redis(self):
+        return cache_service.redis_client
+
+    def ingest(
+        self,
+        provider: str,
+        event_id: str,
+        event_type: str,
+        payload: Dict[str, Any],
+        ordering_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Enfileira um webhook já verificado (uma ida ao Redis).
+
+        Args:
+            provider: 'stripe', 'pagseguro', 'hotmart', 'kiwify'...
+            event_id: ID do evento no provider (deduplicação)
+            event_type: Tipo do evento
+            payload: Dados do evento
+            ordering_key: Eventos com a mesma chave são processados em ordem
+                (padrão: event_id)
+
+        Returns:
+            Dict com success e duplicate, ou error se a fila não estiver disponível
+        """
+        try:
+            redis = self.redis
+            if not redis:
+                return {"success": False, "error": "Fila de webhooks indisponível"}
+            if not event_id:
+                return {"success": False, "error": "Evento sem ID"}
+
+            ordering_key = str(ordering_key or event_id)
+            now = time.time()
+            queue = partition_queue(partition_for(ordering_key))
+            task = json.dumps(
+                {
+                    "id": f"{QueueNames.WEBHOOKS}_{provider}_{event_id}",
+                    "data": {
+                        "provider": provider,
+                        "event_id": str(event_id),
+                        "event_type": event_type,
+                        "ordering_key": ordering_key,
+                        "payload": payload,
+                        "received_at": now,
+                    },
+                    "priority": 1,
+                    "created_at": datetime.utcfromtimestamp(now).isoformat(),
+                    "attempts": 0,
+                    "max_attempts": 5,
+                }
+            )
+            queued = redis.eval(
+                _INGEST,
+                2,
+                WEBHOOK_SEEN_KEY.format(provider=provider, event_id=event_id),
+                f"{queue}_priority_1",
+                WEBHOOK_SEEN_TTL,
+                task,
+            )
+            return {"success": True, "duplicate": not int(queued or 0)}
+        except (TypeError, ValueError) as e:
+            self.logger.warning(f"Webhook {provider} com payload inválido: {str(e)}")
+            return {"success": False, "error": "Payload inválido"}
+        except Exception as e:
+            self.logger.error(f"Erro ao enfileirar webhook {provider}: {str(e)}", exc_info=True)
+            return {"success": False, "error": "Fila de webhooks indisponível"}
+
+    def forget(self, provider: str, event_id: str):
+        """Remove a marca do evento (o próximo retry do provider é aceito de novo)"""
+        try:
+            if self.redis:
+                self.redis.delete(WEBHOOK_SEEN_KEY.format(provider=provider, event_id=event_id))
+        except Exception as e:
+            self.logger.warning(f"Erro ao remover marca do webhook {provider} {event_id}: {str(e)}")
+
+    def blockers(self, ordering_keys: Iterable[str]) -> Dict[str, str]:
+        """Evento (id da tarefa) que bloqueia cada chave, apenas das chaves bloqueadas"""
+        ordering_keys = list(dict.fromkeys(ordering_keys))
+        if not ordering_keys or not self.redis:
+            return {}
+        heads = self.redis.mget([WEBHOOK_BLOCK_KEY.format(ordering_key=key) for key in ordering_keys])
+        return {key: head for key, head in zip(ordering_keys, heads) if head}
+
+    def block(self, ordering_key: str, task_id: str):
+        """Bloqueia a chave até o evento task_id ser gravado ou descartado"""
+        self.redis.set(WEBHOOK_BLOCK_KEY.format(ordering_key=ordering_key), task_id)
+
+    def hold(self, ordering_key: str, task: Dict[str, Any]):
+        """Coloca um evento em espera atrás do evento que bloqueia a chave (sem contar tentativa)"""
+        task = {key: value for key, value in task.items() if key != "receipt"}
+        self.redis.rpush(WEBHOOK_HELD_KEY.format(ordering_key=ordering_key), json.dumps(task))
+
+    def release(self, ordering_key: str) -> int:
+        """
+        Desbloqueia a chave e devolve os eventos em espera para a frente da fila.
+
+        Returns:
+            Número de eventos devolvidos
+        """
+        held_key = WEBHOOK_HELD_KEY.format(ordering_key=ordering_key)
+        queue = partition_queue(partition_for(ordering_key))
+        items = self.redis.lrange(held_key, 0, -1)
+        pipe = self.redis.pipeline(transaction=True)
+        # RPOP consome pela direita: o mais antigo é empurrado por último
+        for task_json in reversed(items):
+            pipe.rpush(f"{queue}_priority_{json.loads(task_json)['priority']}", task_json)
+        pipe.delete(held_key, WEBHOOK_BLOCK_KEY.format(ordering_key=ordering_key))
+        pipe.execute()
+        return len(items)
+
+
+webhook_inbox = WebhookInbox()
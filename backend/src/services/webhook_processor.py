@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Processamento de Webhooks RE-EDUCA Store.
+
+Processa os lotes de webhooks enfileirados por services/webhook_inbox.py
+(chamado por workers/webhook_worker.py):
+- Eventos de pagamento (Stripe payment_intent/charge, notificações do
+  PagSeguro) viram atualizações de status gravadas em uma transação por
+  lote (apply_payment_webhooks, migração 046), que também registra os
+  webhooks em processed_webhooks; cada evento é aplicado em sua própria
+  subtransação, e só os que falham voltam para a fila
+- Demais eventos (assinaturas Stripe, vendas de afiliados) usam os
+  handlers existentes de PaymentService e AffiliateService
+
+Eventos com a mesma chave de ordenação são aplicados na ordem recebida;
+quando um falha, os seguintes da mesma chave no lote não são tentados e
+voltam junto com ele (o worker os coloca em espera atrás dele).
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from repositories.order_repository import OrderRepository
+from services.base_service import BaseService
+from services.gamification_engine import gamification_engine
+from services.order_read_model import order_read_model
+from services.payment_service import PAYMENT_STATUS_MAP, PaymentService
+
+logger = logging.getLogger(__name__)
+
+# Eventos Stripe que alteram o pagamento do pedido
+STRIPE_PAYMENT_EVENTS = {
+    "payment_intent.succeeded": "paid",
+    "charge.succeeded": "paid",
+    "payment_intent.payment_failed": "failed",
+    "charge.failed": "failed",
+    "charge.refunded": "refunded",
+}
+
+# Status do pedido que acompanha o status do pagamento (None = mantém)
+ORDER_STATUS_FOR_PAYMENT = {"refunded": "refunded"}
+
+# Provider de afiliados -> (evento de venda, método de AffiliateService)
+AFFILIATE_SALE_HANDLERS = {
+    "hotmart": ("PURCHASE_APPROVED", "track_hotmart_sale"),
+    "kiwify": ("sale.created", "track_kiwify_sale"),
+    "logs": ("sale.completed", "track_logs_sale"),
+    "braip": ("transaction.approved", "track_braip_sale"),
+}
+
+
+class WebhookProcessor(BaseService):
+    """
+    Service de processamento em lote de webhooks.
+
+    Utiliza OrderRepository para gravar os lotes de pagamento e
+    PaymentService/AffiliateService para os demais eventos.
+    """
+
+    def __init__(self):
+        """Inicializa o processador de webhooks."""
+        super().__init__()
+        self.order_repo = OrderRepository()
+        self.payment_service = PaymentService()
+        self._affiliate_service = None
+
+    @property
+    def affiliate_service(self):
+        if self._affiliate_service is None:
+            from services.affiliate_service import AffiliateService
+
+            self._affiliate_service = AffiliateService()
+        return self._affiliate_service
+
+    def process(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Processa um lote de eventos na ordem recebida.
+
+        Args:
+            events: Dados das tarefas da fila (provider, event_id, event_type,
+                ordering_key, payload)
+
+        Returns:
+            Eventos que falharam (devem voltar para a fila)
+        """
+        failed = set()
+        blocked = set()
+        updates: List[Dict[str, Any]] = []
+        update_events: List[Dict[str, Any]] = []
+
+        for event in events:
+            key = event.get("ordering_key") or event.get("event_id")
+            if key in blocked:
+                failed.add(id(event))
+                continue
+            try:
+                update = self._payment_update(event)
+                if update is not None:
+                    # PagSeguro: a chave passa a ser o pedido da transação consultada
+                    key = event.get("ordering_key") or event.get("event_id")
+                    if key in blocked:
+                        failed.add(id(event))
+                        continue
+                    updates.append({**update, "ordering_key": key})
+                    update_events.append(event)
+                elif not self._handle(event):
+                    blocked.add(key)
+                    failed.add(id(event))
+            except Exception as e:
+                self.logger.error(
+                    f"Erro ao processar webhook {event.get('provider')} {event.get('event_id')}: {str(e)}",
+                    exc_info=True,
+                )
+                blocked.add(key)
+                failed.add(id(event))
+
+        if updates:
+            result = self.order_repo.apply_payment_webhooks(updates)
+            if result.get("success"):
+                for row in result.get("failed") or []:
+                    failed.add(id(update_events[row["index"]]))
+                for row in result.get("skipped") or []:
+                    self.logger.warning(f"Webhook {row.get('webhook_id')} registrado sem pedido: {row.get('reason')}")
+                order_read_model.invalidate_many(order.get("user_id") for order in result.get("orders") or [])
+                for paid in result.get("paid") or []:
+                    gamification_engine.publish(paid.get("user_id"), "order_paid", paid.get("order_id"))
+            else:
+                self.logger.error(f"Erro ao gravar {len(updates)} webhook(s) de pagamento: {result.get('error')}")
+                failed.update(id(event) for event in update_events)
+
+        return [event for event in events if id(event) in failed]
+
+    def _payment_update(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Monta a atualização de pagamento do evento.
+
+        Returns:
+            Linha para apply_payment_webhooks, ou None se o evento não é de pagamento
+
+        Raises:
+            RuntimeError: Se a transação do PagSeguro não puder ser consultada
+        """
+        provider = event["provider"]
+        payload = event.get("payload") or {}
+
+        if provider == "stripe" and event.get("event_type") in STRIPE_PAYMENT_EVENTS:
+            payment_status = STRIPE_PAYMENT_EVENTS[event["event_type"]]
+            return {
+                "webhook_id": event["event_id"],
+                "provider": "stripe",
+                "event_type": event["event_type"],
+                "order_id": (payload.get("metadata") or {}).get("order_id"),
+                "transaction_id": payload.get("id") or payload.get("payment_intent"),
+                "payment_status": payment_status,
+                "order_status": "paid" if payment_status == "paid" else ORDER_STATUS_FOR_PAYMENT.get(payment_status),
+            }
+
+        if provider == "pagseguro":
+            # A notificação só traz o código: a transação é consultada aqui, fora da requisição
+            transaction = self.payment_service.fetch_pagseguro_transaction(event["event_id"])
+            if not transaction.get("success"):
+                raise RuntimeError(transaction.get("error", "Erro ao buscar transação"))
+            # A notificação entra na fila com a própria chave (a rota não é autenticada);
+            # daqui em diante ela segue a ordem do pedido da transação
+            if transaction.get("reference"):
+                event["ordering_key"] = transaction["reference"]
+            payment_status = PAYMENT_STATUS_MAP.get(transaction["status"], "pending")
+            return {
+                "webhook_id": event["event_id"],
+                "provider": "pagseguro",
+                "event_type": event.get("event_type") or "transaction",
+                "order_id": transaction["reference"],
+                "transaction_id": transaction["transaction_id"],
+                "payment_status": payment_status,
+                "order_status": "processing" if payment_status == "paid" else ORDER_STATUS_FOR_PAYMENT.get(payment_status),
+            }
+
+        return None
+
+    def _handle(self, event: Dict[str, Any]) -> bool:
+        """
+        Processa um evento que não é de pagamento.
+
+        Returns:
+            True se processado (ou ignorado), False se deve ser tentado de novo
+        """
+        provider = event["provider"]
+        payload = event.get("payload") or {}
+
+        if provider == "stripe":
+            result = self.payment_service.handle_stripe_webhook_event(
+                event.get("event_type"), payload, event["event_id"]
+            )
+            return bool(result and result.get("success"))
+
+        if provider in AFFILIATE_SALE_HANDLERS:
+            sale_event, method = AFFILIATE_SALE_HANDLERS[provider]
+            if event.get("event_type") != sale_event:
+                return True
+            handler = getattr(self.affiliate_service, method, None)
+            if handler is None:
+                self.logger.error(f"Webhook {provider} sem handler de venda ({method})")
+                return False
+            result = handler(payload)
+            return bool(result and result.get("success"))
+
+        self.logger.warning(f"Webhook de provider desconhecido ignorado: {provider}")
+        return True
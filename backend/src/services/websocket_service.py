@@ -4,10 +4,12 @@ Serviço de WebSocket para Live Streaming RE-EDUCA.
 Gerencia comunicação em tempo real incluindo:
 - Conexões WebSocket autenticadas
 - Salas de chat de streams
-- Mensagens e reações em tempo real
+- Mensagens e reações em tempo real (pipeline em services/live_event_service.py)
 - Sistema de presentes virtuais
 - Tracking de visualizadores ativos
 - Eventos de follows e interações
+- Sala privada por usuário (notificações e contadores de não lidas)
+- Mensagens diretas e confirmações de leitura
 """
 
 import logging
@@ -17,7 +19,11 @@ from config.settings import get_config
 from flask import request
 from flask_socketio import disconnect, emit, join_room, leave_room
 from services.cache_service import cache_service
+from services.live_event_service import live_events
 from services.live_streaming_service import LiveStreamingService
+from services.messages_service import MessagesService
+from services.notification_service import notification_service
+from services.realtime_service import USER_ROOM
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +40,7 @@ class WebSocketService:
         """Inicializa o serviço WebSocket com instância do SocketIO."""
         self.socketio = socketio
         self.live_streaming_service = LiveStreamingService()
+        self.messages_service = MessagesService()
         self.CONNECTIONS_KEY = "ws:connections"  # {user_id: [socket_ids]}
         self.STREAM_ROOMS_KEY = "ws:stream_rooms"  # {stream_id: [user_ids]}
         # Mantidos para compatibilidade (mas não são mais usados)
@@ -179,6 +186,10 @@ class WebSocketService:
                     except Exception:
                         pass  # Não crítico
 
+            # Sala privada: notificações e contadores enviados por realtime_service
+            join_room(USER_ROOM.format(user_id=user_id))
+            emit("badges", notification_service.get_badges(user_id))
+
             logger.info(f"Usuário {user_id} conectado via WebSocket (socket_id: {request.sid})")
             return True
 
@@ -379,7 +390,13 @@ class WebSocketService:
             logger.error(f"Erro ao sair do stream: {e}", exc_info=True)
 
     def on_send_message(self, data):
-        """Evento: enviar mensagem no chat do stream"""
+        """
+        Evento: enviar mensagem no chat do stream.
+
+        A mensagem é aceita no Redis (modo lento e limite da sala) e
+        transmitida na hora; a gravação no banco é feita em lote pelo
+        workers/live_event_worker.py.
+        """
         try:
             user_id = self.get_user_from_socket(request.sid)
             if not user_id:
@@ -387,69 +404,30 @@ class WebSocketService:
                 return
 
             stream_id = data.get("stream_id")
-            message = data.get("message", "").strip()
+            message = (data.get("message") or "").strip()
 
             if not stream_id or not message:
                 emit("error", {"message": "Stream ID e mensagem são obrigatórios"})
                 return
 
-            # Salvar mensagem no banco
-            message_data = self.live_streaming_service.send_message(stream_id, user_id, message)
-
-            if message_data:
-                # Atualizar contador total de mensagens
-                if cache_service.is_available():
-                    try:
-                        import time
-                        total_messages = cache_service.get("ws:total_messages") or 0
-                        cache_service.set("ws:total_messages", int(total_messages) + 1, ttl=3600)
-                        
-                        # Calcular mensagens por segundo (último minuto)
-                        current_time = time.time()
-                        messages_key = "ws:messages_timestamps"
-                        timestamps = cache_service.get(messages_key) or []
-                        # Manter apenas timestamps do último minuto
-                        timestamps = [ts for ts in timestamps if current_time - ts < 60]
-                        timestamps.append(current_time)
-                        cache_service.set(messages_key, timestamps, ttl=60)
-                        
-                        # Calcular mensagens por segundo
-                        if len(timestamps) > 1:
-                            time_span = timestamps[-1] - timestamps[0]
-                            if time_span > 0:
-                                messages_per_second = len(timestamps) / time_span
-                            else:
-                                messages_per_second = len(timestamps)
-                        else:
-                            messages_per_second = 0.0
-                        
-                        cache_service.set("ws:messages_per_second", messages_per_second, ttl=60)
-                    except Exception:
-                        pass  # Não crítico
-
-                # Buscar contador de likes da mensagem (se existir)
-                likes_count = 0
-                if cache_service.is_available():
-                    try:
-                        likes_key = f"stream_message_likes:{message_data['id']}"
-                        likes_list = cache_service.get(likes_key) or []
-                        likes_count = len(likes_list) if isinstance(likes_list, list) else 0
-                    except Exception:
-                        pass  # Não crítico
+            result = live_events.publish_message(stream_id, user_id, message)
+            if not result.get("success"):
+                self._emit_rejected(stream_id, result, "Erro ao enviar mensagem")
+                return
 
-                # Enviar mensagem para todos na sala
-                emit(
-                    "message_received",
-                    {
-                        "id": message_data["id"],
-                        "user_id": user_id,
-                        "username": message_data.get("username", "Usuário"),
-                        "message": message,
-                        "timestamp": message_data["created_at"],
-                        "likes": likes_count,
-                    },
-                    room=f"stream_{stream_id}",
-                )
+            event = result["event"]
+            emit(
+                "message_received",
+                {
+                    "id": event["id"],
+                    "user_id": user_id,
+                    "username": event["username"],
+                    "message": event["message"],
+                    "timestamp": event["created_at"],
+                    "likes": 0,
+                },
+                room=f"stream_{stream_id}",
+            )
 
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -459,7 +437,11 @@ class WebSocketService:
             emit("error", {"message": "Erro ao enviar mensagem"})
 
     def on_send_gift(self, data):
-        """Evento: enviar presente no stream"""
+        """
+        Evento: enviar presente no stream.
+
+        Transmitido na hora; os totais da sala seguem em stream_counters.
+        """
         try:
             user_id = self.get_user_from_socket(request.sid)
             if not user_id:
@@ -467,30 +449,32 @@ class WebSocketService:
                 return
 
             stream_id = data.get("stream_id")
-            gift_type = data.get("gift_type")
-            gift_value = data.get("gift_value", 0)
+            gift_type = data.get("gift_id") or data.get("gift_type")
+            gift_value = data.get("gift_cost", data.get("gift_value", 0))
 
             if not stream_id or not gift_type:
                 emit("error", {"message": "Stream ID e tipo de presente são obrigatórios"})
                 return
 
-            # Salvar presente no banco
-            gift_data = self.live_streaming_service.send_gift(stream_id, user_id, gift_type, gift_value)
+            result = live_events.publish_gift(stream_id, user_id, gift_type, data.get("gift_name"), gift_value)
+            if not result.get("success"):
+                self._emit_rejected(stream_id, result, "Erro ao enviar presente")
+                return
 
-            if gift_data:
-                # Notificar todos na sala
-                emit(
-                    "gift_sent",
-                    {
-                        "id": gift_data["id"],
-                        "user_id": user_id,
-                        "username": gift_data.get("username", "Usuário"),
-                        "gift_type": gift_type,
-                        "gift_value": gift_value,
-                        "timestamp": gift_data["created_at"],
-                    },
-                    room=f"stream_{stream_id}",
-                )
+            event = result["event"]
+            emit(
+                "gift_sent",
+                {
+                    "id": event["id"],
+                    "user_id": user_id,
+                    "username": event["username"],
+                    "gift_type": event["gift_id"],
+                    "gift_name": event["gift_name"],
+                    "gift_value": event["gift_cost"],
+                    "timestamp": event["created_at"],
+                },
+                room=f"stream_{stream_id}",
+            )
 
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -502,8 +486,9 @@ class WebSocketService:
     def on_like_message(self, data):
         """
         Evento: curtir mensagem do chat.
-        
-        Armazena likes no Redis e notifica todos na sala do stream.
+
+        Alterna a curtida no Redis (uma operação atômica) e responde só a quem
+        curtiu; a sala recebe os totais agregados em stream_counters.
         """
         try:
             user_id = self.get_user_from_socket(request.sid)
@@ -513,59 +498,20 @@ class WebSocketService:
 
             message_id = data.get("message_id")
             stream_id = data.get("stream_id")
-            
+
             if not message_id or not stream_id:
                 emit("error", {"message": "message_id e stream_id são obrigatórios"})
                 return
 
-            # Chave para armazenar likes da mensagem
-            likes_key = f"stream_message_likes:{message_id}"
-            # Chave para verificar se usuário já curtiu
-            user_like_key = f"stream_message_like:{message_id}:{user_id}"
-
-            if not cache_service.is_available():
-                emit("error", {"message": "Serviço de cache indisponível"})
+            result = live_events.toggle_like(stream_id, message_id, user_id)
+            if not result.get("success"):
+                emit("error", {"message": result.get("error", "Erro ao curtir mensagem")})
                 return
 
-            # Verificar se usuário já curtiu
-            already_liked = cache_service.get(user_like_key)
-            
-            if already_liked:
-                # Descurtir: remover like
-                current_likes = cache_service.get(likes_key) or []
-                if user_id in current_likes:
-                    current_likes.remove(user_id)
-                    cache_service.set(likes_key, current_likes, ttl=86400)  # 24 horas
-                    cache_service.delete(user_like_key)
-                    
-                    # Notificar todos na sala
-                    emit(
-                        "message_unliked",
-                        {
-                            "message_id": message_id,
-                            "user_id": user_id,
-                            "likes_count": len(current_likes),
-                        },
-                        room=f"stream_{stream_id}",
-                    )
-            else:
-                # Curtir: adicionar like
-                current_likes = cache_service.get(likes_key) or []
-                if user_id not in current_likes:
-                    current_likes.append(user_id)
-                    cache_service.set(likes_key, current_likes, ttl=86400)  # 24 horas
-                    cache_service.set(user_like_key, True, ttl=86400)
-                    
-                    # Notificar todos na sala
-                    emit(
-                        "message_liked",
-                        {
-                            "message_id": message_id,
-                            "user_id": user_id,
-                            "likes_count": len(current_likes),
-                        },
-                        room=f"stream_{stream_id}",
-                    )
+            emit(
+                "message_liked" if result["liked"] else "message_unliked",
+                {"message_id": message_id, "user_id": user_id, "likes_count": result["likes_count"]},
+            )
 
         except (ValueError, KeyError) as e:
             logger.warning(f"Erro de validação: {str(e)}")
@@ -574,6 +520,36 @@ class WebSocketService:
             logger.error(f"Erro ao curtir mensagem: {e}", exc_info=True)
             emit("error", {"message": "Erro ao curtir mensagem"})
 
+    def on_set_slow_mode(self, data):
+        """Evento: dono do stream define o modo lento do chat (segundos, 0 desativa)"""
+        try:
+            user_id = self.get_user_from_socket(request.sid)
+            if not user_id:
+                emit("error", {"message": "Usuário não autenticado"})
+                return
+
+            stream_id = data.get("stream_id")
+            if not stream_id:
+                emit("error", {"message": "ID do stream é obrigatório"})
+                return
+
+            result = live_events.set_slow_mode(stream_id, user_id, data.get("seconds", 0))
+            if not result.get("success"):
+                emit("error", {"message": result.get("error", "Erro ao definir modo lento")})
+
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+        except Exception as e:
+            logger.error(f"Erro ao definir modo lento: {e}", exc_info=True)
+            emit("error", {"message": "Erro ao definir modo lento"})
+
+    def _emit_rejected(self, stream_id, result, default_message):
+        """Avisa o remetente de um evento recusado (limite atingido ou inválido)"""
+        if "retry_after_ms" in result:
+            emit("rate_limited", {"stream_id": stream_id, "retry_after_ms": result["retry_after_ms"]})
+        else:
+            emit("error", {"message": result.get("error", default_message)})
+
     def on_follow_user(self, data):
         """Evento: seguir usuário"""
         try:
@@ -614,6 +590,69 @@ class WebSocketService:
             logger.error(f"Erro ao reportar stream: {e}", exc_info=True)
             emit("error", {"message": "Erro ao reportar stream"})
 
+    def on_send_direct_message(self, data):
+        """
+        Evento: enviar mensagem direta.
+
+        A mensagem é entregue pelas salas privadas (evento direct_message) e
+        gravada em segundo plano; o remetente recebe direct_message_sent com o
+        client_id informado para reconciliar a mensagem otimista.
+        """
+        try:
+            user_id = self.get_user_from_socket(request.sid)
+            if not user_id:
+                emit("error", {"message": "Usuário não autenticado"})
+                return
+
+            result = self.messages_service.send_message(
+                sender_id=user_id,
+                recipient_id=data.get("recipient_id"),
+                content=data.get("content", ""),
+                attachment_url=data.get("attachment_url"),
+                attachment_type=data.get("attachment_type"),
+                attachment_filename=data.get("attachment_filename"),
+                attachment_size=data.get("attachment_size"),
+            )
+            if not result.get("success"):
+                emit("error", {"message": result.get("error", "Erro ao enviar mensagem"), "client_id": data.get("client_id")})
+                return
+
+            emit("direct_message_sent", {"client_id": data.get("client_id"), "message": result["message"]})
+
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+            emit("error", {"message": str(e)})
+        except Exception as e:
+            logger.error(f"Erro ao enviar mensagem direta: {e}", exc_info=True)
+            emit("error", {"message": "Erro ao enviar mensagem"})
+
+    def on_read_conversation(self, data):
+        """
+        Evento: conversa lida até uma mensagem.
+
+        Uma confirmação por conversa (não por mensagem): marca tudo até
+        up_to (created_at da última mensagem vista) e avisa o remetente com
+        messages_read.
+        """
+        try:
+            user_id = self.get_user_from_socket(request.sid)
+            if not user_id:
+                return
+
+            other_user_id = data.get("other_user_id")
+            if not other_user_id:
+                emit("error", {"message": "ID do outro usuário é obrigatório"})
+                return
+
+            result = self.messages_service.mark_conversation_read(user_id, other_user_id, data.get("up_to"))
+            if result.get("success"):
+                emit("conversation_read", {"other_user_id": other_user_id, "count": result["count"]})
+
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Erro de validação: {str(e)}")
+        except Exception as e:
+            logger.error(f"Erro ao marcar conversa como lida: {e}", exc_info=True)
+
     def broadcast_stream_started(self, stream_data):
         """Broadcast: stream iniciado"""
         try:
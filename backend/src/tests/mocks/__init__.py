@@ -4,6 +4,7 @@ Mocks para Testes RE-EDUCA Store.
 
 Centraliza mocks de repositórios e services para uso em testes.
 """
+from tests.mocks.redis_mock import MockRedis, claim_batch_handler
 from tests.mocks.repository_mocks import (
     MockHealthRepository,
     MockOrderRepository,
@@ -16,4 +17,6 @@ __all__ = [
     "MockUserRepository",
     "MockProductRepository",
     "MockOrderRepository",
+    "MockRedis",
+    "claim_batch_handler",
 ]
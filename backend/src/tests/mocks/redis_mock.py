@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""
+Mock de Redis em Memória para Testes RE-EDUCA Store.
+
+Implementa o subconjunto de comandos usados pelos services (strings, listas,
+hashes, sets, sorted sets e pipelines) com a semântica de decode_responses=True.
+Scripts Lua não são interpretados: registre um equivalente em Python
+com register_script_handler.
+"""
+import fnmatch
+from typing import Any, Callable, Dict, List
+
+
+def claim_batch_handler(redis, keys, args):
+    """Equivalente em Python do script Lua de RedisQueueService.claim_batch"""
+    items = []
+    for queue in keys[:-1]:
+        while len(items) < int(args[0]):
+            item = redis.rpop(queue)
+            if item is None:
+                break
+            redis.lpush(keys[-1], item)
+            items.append(item)
+    return items
+
+
+class MockPipeline:
+    """Pipeline que enfileira comandos e os executa em ordem"""
+
+    def __init__(self, redis):
+        self._redis = redis
+        self._calls = []
+
+    def __getattr__(self, name):
+        command = getattr(self._redis, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((command, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self) -> List[Any]:
+        calls, self._calls = self._calls, []
+        return [command(*args, **kwargs) for command, args, kwargs in calls]
+
+
+class MockRedis:
+    """Redis em memória (valores como str, igual a decode_responses=True)"""
+
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+        self.ttls: Dict[str, int] = {}
+        self.script_handlers: Dict[str, Callable] = {}
+
+    def register_script_handler(self, script: str, handler: Callable):
+        """Associa um script Lua a uma função handler(redis, keys, args)"""
+        self.script_handlers[script] = handler
+
+    def pipeline(self, transaction: bool = True) -> MockPipeline:
+        return MockPipeline(self)
+
+    def eval(self, script: str, numkeys: int, *keys_and_args):
+        keys, args = list(keys_and_args[:numkeys]), [str(a) for a in keys_and_args[numkeys:]]
+        return self.script_handlers[script](self, keys, args)
+
+    # Chaves
+    def exists(self, *keys) -> int:
+        return sum(1 for key in keys if key in self.data)
+
+    def delete(self, *keys) -> int:
+        removed = 0
+        for key in keys:
+            if self.data.pop(key, None) is not None:
+                removed += 1
+            self.ttls.pop(key, None)
+        return removed
+
+    def rename(self, src: str, dst: str) -> bool:
+        self.delete(dst)
+        self.data[dst] = self.data.pop(src)
+        if src in self.ttls:
+            self.ttls[dst] = self.ttls.pop(src)
+        return True
+
+    def expire(self, key: str, ttl: int) -> bool:
+        if key not in self.data:
+            return False
+        self.ttls[key] = int(ttl)
+        return True
+
+    def ttl(self, key: str) -> int:
+        return self.ttls.get(key, -1 if key in self.data else -2)
+
+    def scan_iter(self, match: str = "*", count: int = None):
+        return iter([key for key in list(self.data) if fnmatch.fnmatchcase(key, match)])
+
+    # Strings
+    def get(self, key: str):
+        return self.data.get(key)
+
+    def set(self, key: str, value, ex: int = None, nx: bool = False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        if ex:
+            self.ttls[key] = int(ex)
+        return True
+
+    def mget(self, keys: List[str]) -> List[Any]:
+        return [self.data.get(key) for key in keys]
+
+    def setex(self, key: str, ttl: int, value) -> bool:
+        return self.set(key, value, ex=ttl)
+
+    def incrby(self, key: str, amount: int = 1) -> int:
+        value = int(self.data.get(key, 0)) + int(amount)
+        self.data[key] = str(value)
+        return value
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        return self.incrby(key, amount)
+
+    # Hashes
+    def hgetall(self, key: str) -> Dict[str, str]:
+        return dict(self.data.get(key, {}))
+
+    def hget(self, key: str, field: str):
+        return self.data.get(key, {}).get(field)
+
+    def hmget(self, key: str, fields: List[str]) -> List[Any]:
+        return [self.data.get(key, {}).get(field) for field in fields]
+
+    def hexists(self, key: str, field: str) -> bool:
+        return field in self.data.get(key, {})
+
+    def hset(self, key: str, field: str = None, value=None, mapping: Dict = None) -> int:
+        current = self.data.setdefault(key, {})
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        added = sum(1 for f in items if f not in current)
+        current.update({f: str(v) for f, v in items.items()})
+        return added
+
+    def hsetnx(self, key: str, field: str, value) -> int:
+        current = self.data.setdefault(key, {})
+        if field in current:
+            return 0
+        current[field] = str(value)
+        return 1
+
+    def hdel(self, key: str, *fields) -> int:
+        current = self.data.get(key, {})
+        removed = sum(1 for field in fields if current.pop(field, None) is not None)
+        if key in self.data and not current:
+            self.data.pop(key, None)
+        return removed
+
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        current = self.data.setdefault(key, {})
+        value = int(current.get(field, 0)) + int(amount)
+        current[field] = str(value)
+        return value
+
+    # Listas (índice 0 = esquerda)
+    def lpush(self, key: str, *values) -> int:
+        current = self.data.setdefault(key, [])
+        for value in values:
+            current.insert(0, str(value))
+        return len(current)
+
+    def rpush(self, key: str, *values) -> int:
+        current = self.data.setdefault(key, [])
+        current.extend(str(value) for value in values)
+        return len(current)
+
+    def lrem(self, key: str, count: int, value) -> int:
+        current = self.data.get(key, [])
+        removed = 0
+        kept = []
+        for item in current:
+            if item == str(value) and (count == 0 or removed < abs(count)):
+                removed += 1
+                continue
+            kept.append(item)
+        if kept:
+            self.data[key] = kept
+        else:
+            self.data.pop(key, None)
+        return removed
+
+    def rpop(self, key: str):
+        current = self.data.get(key, [])
+        value = current.pop() if current else None
+        if not current:
+            self.data.pop(key, None)
+        return value
+
+    def llen(self, key: str) -> int:
+        return len(self.data.get(key, []))
+
+    @staticmethod
+    def _list_slice(items: List[Any], start: int, end: int) -> List[Any]:
+        start = max(start + len(items), 0) if start < 0 else start
+        end = end + len(items) if end < 0 else end
+        return items[start : end + 1] if end >= start else []
+
+    def lrange(self, key: str, start: int, end: int) -> List[str]:
+        return list(self._list_slice(self.data.get(key, []), start, end))
+
+    def ltrim(self, key: str, start: int, end: int) -> bool:
+        kept = self._list_slice(self.data.get(key, []), start, end)
+        if kept:
+            self.data[key] = list(kept)
+        else:
+            self.data.pop(key, None)
+        return True
+
+    # Sets
+    def sadd(self, key: str, *members) -> int:
+        current = self.data.setdefault(key, set())
+        added = len(set(map(str, members)) - current)
+        current.update(map(str, members))
+        return added
+
+    def srem(self, key: str, *members) -> int:
+        current = self.data.get(key, set())
+        removed = len(current & set(map(str, members)))
+        current.difference_update(map(str, members))
+        if not current:
+            self.data.pop(key, None)
+        return removed
+
+    def smembers(self, key: str) -> set:
+        return set(self.data.get(key, set()))
+
+    def sismember(self, key: str, member) -> bool:
+        return str(member) in self.data.get(key, set())
+
+    def scard(self, key: str) -> int:
+        return len(self.data.get(key, set()))
+
+    def spop(self, key: str, count: int = None):
+        current = self.data.get(key, set())
+        popped = sorted(current)[: count or 1]
+        current.difference_update(popped)
+        if not current:
+            self.data.pop(key, None)
+        if count is None:
+            return popped[0] if popped else None
+        return popped
+
+    def sinter(self, *keys) -> set:
+        sets = [self.data.get(key, set()) for key in keys]
+        return set.intersection(*map(set, sets)) if sets else set()
+
+    # Sorted sets (dict membro -> score)
+    def _zsorted(self, key: str) -> List[tuple]:
+        return sorted(self.data.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+
+    @staticmethod
+    def _bound(value, upper: bool):
+        value = str(value)
+        exclusive = value.startswith("(")
+        value = value.lstrip("(")
+        number = float("inf") if value == "+inf" else float("-inf") if value == "-inf" else float(value)
+        if upper:
+            return (lambda score: score < number) if exclusive else (lambda score: score <= number)
+        return (lambda score: score > number) if exclusive else (lambda score: score >= number)
+
+    def zadd(self, key: str, mapping: Dict[str, float]) -> int:
+        current = self.data.setdefault(key, {})
+        added = sum(1 for member in mapping if str(member) not in current)
+        current.update({str(member): float(score) for member, score in mapping.items()})
+        return added
+
+    def zrem(self, key: str, *members) -> int:
+        current = self.data.get(key, {})
+        removed = sum(1 for member in map(str, members) if current.pop(member, None) is not None)
+        if key in self.data and not current:
+            self.data.pop(key, None)
+        return removed
+
+    def zcard(self, key: str) -> int:
+        return len(self.data.get(key, {}))
+
+    def zrange(self, key: str, start: int, end: int, withscores: bool = False):
+        items = self._zsorted(key)
+        items = items[start:] if end == -1 else items[start : end + 1]
+        return items if withscores else [member for member, _ in items]
+
+    def zrevrangebyscore(self, key: str, max, min, start: int = None, num: int = None, withscores: bool = False):
+        below, above = self._bound(max, upper=True), self._bound(min, upper=False)
+        items = [item for item in reversed(self._zsorted(key)) if below(item[1]) and above(item[1])]
+        if start is not None:
+            items = items[start : start + num]
+        return items if withscores else [member for member, _ in items]
+
+    def zincrby(self, key: str, amount: float, member) -> float:
+        current = self.data.setdefault(key, {})
+        current[str(member)] = current.get(str(member), 0.0) + float(amount)
+        return current[str(member)]
+
+    def zscore(self, key: str, member):
+        return self.data.get(key, {}).get(str(member))
+
+    def zrevrank(self, key: str, member):
+        members = [m for m, _ in reversed(self._zsorted(key))]
+        return members.index(str(member)) if str(member) in members else None
+
+    def zrevrange(self, key: str, start: int, end: int, withscores: bool = False):
+        items = list(reversed(self._zsorted(key)))
+        items = items[start:] if end == -1 else items[start : end + 1]
+        return items if withscores else [member for member, _ in items]
+
+    def zrangebyscore(self, key: str, min, max, start: int = None, num: int = None, withscores: bool = False):
+        below, above = self._bound(max, upper=True), self._bound(min, upper=False)
+        items = [item for item in self._zsorted(key) if below(item[1]) and above(item[1])]
+        if start is not None:
+            items = items[start : start + num]
+        return items if withscores else [member for member, _ in items]
+
+    def zrangebylex(self, key: str, min: str, max: str, start: int = None, num: int = None) -> List[str]:
+        low, high = min[1:], max[1:]  # apenas limites inclusivos "["
+        members = sorted(member for member in self.data.get(key, {}) if low <= member <= high)
+        return members[start : start + num] if start is not None else members
+
+    def zremrangebyscore(self, key: str, min, max) -> int:
+        doomed = self.zrangebyscore(key, min, max)
+        return self.zrem(key, *doomed) if doomed else 0
+
+    def _zstore(self, dest: str, keys, aggregate: str, intersect: bool) -> int:
+        weights = keys if isinstance(keys, dict) else {key: 1 for key in keys}
+        sources = [{m: s * weight for m, s in self.data.get(key, {}).items()} for key, weight in weights.items()]
+        members = set.intersection(*map(set, sources)) if intersect else set().union(*sources)
+        combine = {"SUM": sum, "MAX": max, "MIN": min}[(aggregate or "SUM").upper()]
+        result = {m: combine(source[m] for source in sources if m in source) for m in members}
+        self.delete(dest)
+        if result:
+            self.data[dest] = result
+        return len(result)
+
+    def zunionstore(self, dest: str, keys, aggregate: str = None) -> int:
+        return self._zstore(dest, keys, aggregate, intersect=False)
+
+    def zinterstore(self, dest: str, keys, aggregate: str = None) -> int:
+        return self._zstore(dest, keys, aggregate, intersect=True)
+
+    def zremrangebyrank(self, key: str, start: int, end: int) -> int:
+        items = self._zsorted(key)
+        start = max(start + len(items), 0) if start < 0 else start
+        end = end + len(items) if end < 0 else end
+        doomed = [member for member, _ in items[start : end + 1]] if end >= start else []
+        return self.zrem(key, *doomed) if doomed else 0
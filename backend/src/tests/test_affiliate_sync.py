@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da Sincronização do Catálogo de Afiliados RE-EDUCA Store.
+
+Testa a busca de todas as páginas, a gravação em lote só dos produtos
+alterados, a retomada pelo cursor e o limite de requisições.
+"""
+from unittest.mock import Mock
+
+import pytest
+from services.affiliate_sync import AffiliateCatalogSync, RateLimiter, catalog_row
+
+PAGE_SIZE = 2
+CONFIG = {"fetch": "get_kiwify_products", "first_page": 1, "page_size": PAGE_SIZE, "requests_per_second": 0, "workers": 3}
+
+
+def _product(product_id, price=10.0):
+    return {"id": f"kiwify_{product_id}", "name": f"Curso {product_id}", "price": price, "platform": "kiwify"}
+
+
+class FakeKiwify:
+    """Plataforma com 3 páginas (5 produtos); páginas em failing falham"""
+
+    def __init__(self, products, failing=()):
+        self.products = products
+        self.failing = set(failing)
+        self.requested = []
+
+    def get_kiwify_products(self, page, limit):
+        self.requested.append(page)
+        if page in self.failing:
+            return {"success": False, "error": "Erro HTTP: 429"}
+        start = (page - 1) * limit
+        return {"success": True, "products": self.products[start : start + limit], "total": len(self.products)}
+
+
+@pytest.fixture
+def repo():
+    affiliate_repo = Mock()
+    affiliate_repo.get_sync_state.return_value = {}
+    affiliate_repo.upsert_products_bulk.side_effect = lambda rows: {"success": True, "updated": 0, "inserted": len(rows)}
+    return affiliate_repo
+
+
+def _sync(platform_service, repo, chunk_size=500):
+    platform_service.repo = repo
+    return AffiliateCatalogSync(platform_service, platforms={"kiwify": CONFIG}, chunk_size=chunk_size)
+
+
+class TestAffiliateCatalogSync:
+    """Testes da sincronização"""
+
+    def test_only_changed_products_are_written_in_bulk(self, repo):
+        products = [_product(i) for i in range(5)]
+        unchanged = catalog_row(products[0], "kiwify")
+        repo.find_product_hashes.return_value = {
+            unchanged["platform_product_id"]: unchanged["content_hash"],
+            "kiwify_1": "hash-antigo",
+        }
+        platform = FakeKiwify(products + [_product(2)])  # produto repetido em outra página
+
+        result = _sync(platform, repo).run()
+
+        assert sorted(platform.requested) == [1, 2, 3]
+        rows = repo.upsert_products_bulk.call_args.args[0]
+        assert repo.upsert_products_bulk.call_count == 1
+        assert [row["platform_product_id"] for row in rows] == ["kiwify_1", "kiwify_2", "kiwify_3", "kiwify_4"]
+        assert rows[0]["product_source"] == "kiwifi"
+        stats = result["platforms"]["kiwify"]
+        assert (stats["pages"], stats["products"], stats["changed"], stats["written"]) == (3, 6, 4, 4)
+        assert result["platforms_synced"] == ["kiwify"] and stats["cursor"] == 0
+        assert repo.save_sync_state.call_args.args[1]["last_completed_at"]
+
+    def test_interrupted_sync_resumes_from_cursor(self, repo):
+        repo.find_product_hashes.return_value = {}
+        products = [_product(i) for i in range(5)]
+        platform = FakeKiwify(products, failing={3})
+
+        stats = _sync(platform, repo, chunk_size=2).sync_platform("kiwify")
+
+        # Páginas 1 e 2 gravadas; a 3 falhou e é onde a próxima execução começa
+        assert (stats["complete"], stats["cursor"], stats["written"]) == (False, 3, 4)
+        assert "429" in stats["error"]
+        assert repo.save_sync_state.call_args.args[1]["cursor"] == 3
+
+        repo.get_sync_state.return_value = {"cursor": 3}
+        platform.failing.clear()
+        platform.requested.clear()
+        stats = _sync(platform, repo, chunk_size=2).sync_platform("kiwify")
+
+        assert platform.requested == [3]
+        assert (stats["complete"], stats["cursor"], stats["written"]) == (True, 0, 1)
+
+    def test_rate_limiter_spaces_requests(self):
+        now = [0.0]
+        waits = []
+        limiter = RateLimiter(4, clock=lambda: now[0], sleep=waits.append)
+
+        for _ in range(3):
+            limiter.acquire()
+        now[0] = 10.0
+        limiter.acquire()
+
+        assert waits == [0.25, 0.5]
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da Visão do Carrinho RE-EDUCA Store.
+
+Testa a leitura em um acerto de cache, a gravação write-through das
+alterações, a proteção contra gravar uma visão antiga e a invalidação
+pelo índice reverso produto -> carrinhos.
+"""
+from unittest.mock import Mock, patch
+
+import pytest
+from services.cart_read_model import (
+    _CLEAR,
+    _STORE,
+    _WRITE_ITEM,
+    CART_KEY,
+    CartReadModel,
+    cart_item_view,
+    summarize,
+)
+from services.cart_service import CartService
+from services.product_service import ProductService
+from tests.mocks import MockRedis
+
+
+def _store(redis, keys, args):
+    """Equivalente em Python do script Lua de gravação da visão"""
+    if (redis.get(keys[1]) or "0") != args[0]:
+        return 0
+    redis.delete(keys[0])
+    fields = args[2:]
+    redis.hset(keys[0], mapping=dict(zip(fields[::2], fields[1::2])))
+    redis.expire(keys[0], int(args[1]))
+    return 1
+
+
+def _write_item(redis, keys, args):
+    """Equivalente em Python do script Lua de write-through"""
+    redis.incr(keys[1])
+    redis.expire(keys[1], int(args[0]))
+    if not redis.exists(keys[0]):
+        return 0
+    if args[2] == "":
+        redis.data[keys[0]].pop(args[1], None)
+    else:
+        redis.hset(keys[0], args[1], args[2])
+    return 1
+
+
+def _clear(redis, keys, args):
+    """Equivalente em Python do script Lua de carrinho vazio"""
+    redis.incr(keys[1])
+    redis.delete(keys[0])
+    redis.hset(keys[0], "_v", "1")
+    return 1
+
+
+def _row(item_id, product_id, quantity, created_at):
+    return {"id": item_id, "product_id": product_id, "quantity": quantity, "created_at": created_at}
+
+
+def _product(price, stock=10, **fields):
+    return {"price": price, "name": "Whey", "stock_quantity": stock, "is_active": True, **fields}
+
+
+@pytest.fixture
+def redis():
+    client = MockRedis()
+    client.register_script_handler(_STORE, _store)
+    client.register_script_handler(_WRITE_ITEM, _write_item)
+    client.register_script_handler(_CLEAR, _clear)
+    with patch("services.cart_read_model.cache_service", Mock(redis_client=client)):
+        yield client
+
+
+def _fill(model, user_id, items):
+    assert model.store(user_id, items, model.version(user_id)) is True
+
+
+class TestCartReadModel:
+    """Testes da visão do carrinho"""
+
+    def test_view_matches_cart_and_is_written_through(self, redis):
+        model = CartReadModel()
+        items = [
+            cart_item_view(_row("i2", "p2", 1, "2026-10-02"), _product(5.5)),
+            cart_item_view(_row("i1", "p1", 2, "2026-10-01"), _product(10.0)),
+        ]
+        assert cart_item_view(_row("i3", "p3", 1, "2026-10-03"), _product(1.0, is_active=False)) is None
+        assert model.get("u1") is None
+
+        _fill(model, "u1", items)
+
+        cart = model.get("u1")
+        assert cart == summarize(items)
+        assert ([item["id"] for item in cart["items"]], cart["total"], cart["item_count"]) == (["i1", "i2"], 25.5, 2)
+
+        model.put_item("u1", cart_item_view(_row("i1", "p1", 3, "2026-10-01"), _product(10.0)))
+        model.remove_item("u1", "i2")
+        assert (model.get("u1")["total"], model.get("u1")["item_count"]) == (30.0, 1)
+
+        model.clear("u1")
+        assert model.get("u1") == {"items": [], "total": 0, "item_count": 0}
+
+    def test_stale_fill_is_not_stored(self, redis):
+        model = CartReadModel()
+        version = model.version("u1")
+        # Item incluído entre a leitura da versão e a consulta ao banco
+        model.put_item("u1", cart_item_view(_row("i1", "p1", 1, "2026-10-01"), _product(10.0)))
+
+        assert model.store("u1", [], version) is False
+        assert model.get("u1") is None
+
+    def test_product_changes_invalidate_carts_through_index(self, redis):
+        model = CartReadModel()
+        _fill(model, "u1", [cart_item_view(_row("i1", "p1", 2, "2026-10-01"), _product(10.0))])
+        _fill(model, "u2", [cart_item_view(_row("i2", "p1", 5, "2026-10-01"), _product(10.0))])
+        _fill(model, "u3", [cart_item_view(_row("i3", "p2", 1, "2026-10-01"), _product(3.0))])
+
+        model.invalidate_product("p1")
+        assert [model.get(user) is not None for user in ("u1", "u2", "u3")] == [False, False, True]
+        assert redis.exists(CART_KEY.format(user_id="u3"))
+
+    def test_without_redis_falls_back(self):
+        with patch("services.cart_read_model.cache_service", Mock(redis_client=None)):
+            model = CartReadModel()
+            assert (model.get("u1"), model.version("u1"), model.store("u1", [], "0")) == (None, None, False)
+
+
+class TestCartWiring:
+    """Carrinho e produtos usando a visão de verdade"""
+
+    @pytest.fixture
+    def cart_service(self, redis):
+        service = CartService.__new__(CartService)
+        service.logger = Mock()
+        service.repo = Mock()
+        service.read_model = CartReadModel()
+        self.rows = [{**_row("i1", "p1", 2, "2026-10-01"), "products": {"id": "p1", **_product(10.0)}}]
+        service.repo.find_by_user_with_products.side_effect = lambda user_id: self.rows
+        return service
+
+    def test_price_change_invalidates_carts_and_checkout_reads_current_price(self, cart_service):
+        assert cart_service.get_cart("u1")["total"] == 20.0
+
+        # Preço muda no banco: a visão ainda tem o snapshot antigo
+        self.rows[0]["products"]["price"] = 12.5
+        assert cart_service.get_cart("u1")["total"] == 20.0
+        assert cart_service.get_cart("u1", use_cache=False)["total"] == 25.0
+
+        self.rows[0]["products"]["price"] = 15.0
+        products = ProductService.__new__(ProductService)
+        products.logger = Mock()
+        products.repo = Mock()
+        products.repo.update.return_value = {"id": "p1", "price": 15.0}
+        with patch.object(ProductService, "_invalidate_product_cache"):
+            assert products.update_product("p1", {"price": 15.0})["success"] is True
+
+        assert cart_service.get_cart("u1")["total"] == 30.0
+
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da Cotação de Checkout RE-EDUCA Store.
+
+Testa a assinatura da cotação, o cálculo por etapas (carrinho, cupom e
+frete) e a criação do pedido com uma única chamada ao repositório.
+"""
+import os
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+from services.checkout_service import CheckoutService, sign_quote, verify_quote
+from services.order_service import OrderService
+
+ADDRESS = {"street": "Rua A", "cep": "88010-001", "city": "Florianópolis", "state": "SC"}
+
+
+@pytest.fixture(autouse=True)
+def quote_secret():
+    with patch.dict(os.environ, {"CHECKOUT_QUOTE_SECRET": "segredo-de-teste"}):
+        yield
+
+
+@pytest.fixture
+def checkout():
+    service = CheckoutService.__new__(CheckoutService)
+    service.logger = Mock()
+    service.cart_service = Mock()
+    service.cart_service.get_cart.return_value = {
+        "items": [{"product_id": "p1", "quantity": 2, "price": 50.0, "name": "Whey"}],
+        "total": 100.0,
+    }
+    service.coupon_service = Mock()
+    service.coupon_service.validate_coupon.return_value = {"success": True, "discount_amount": 10}
+    service.shipping_service = Mock()
+    service.shipping_service.calculate_shipping.return_value = {"shipping_cost": 15.0, "is_free": False}
+    return service
+
+
+@pytest.fixture
+def order_service():
+    service = OrderService.__new__(OrderService)
+    service.logger = Mock()
+    service.repo = Mock()
+    service.cart_service = Mock()
+    return service
+
+
+class TestQuoteSignature:
+    """Testes da assinatura da cotação"""
+
+    def test_round_trip_and_rejections(self):
+        payload = {"v": 1, "uid": "u1", "exp": time.time() + 60, "total": 105.0}
+        token = sign_quote(payload)
+
+        assert verify_quote(token, "u1")["total"] == 105.0
+
+        body, signature = token.split(".")
+        tampered = sign_quote({**payload, "total": 1.0}).split(".")[0] + "." + signature
+        for bad in (tampered, "lixo", f"{body}.x"):
+            with pytest.raises(ValueError, match="Cotação inválida"):
+                verify_quote(bad, "u1")
+        with pytest.raises(ValueError, match="Cotação inválida"):
+            verify_quote(token, "outro-usuario")
+        with pytest.raises(ValueError, match="Cotação expirada"):
+            verify_quote(token, "u1", now=time.time() + 120)
+
+
+class TestCheckoutQuote:
+    """Testes do cálculo da cotação"""
+
+    def test_create_quote_prices_all_stages(self, checkout):
+        result = checkout.create_quote("u1", {"shipping_address": ADDRESS, "coupon_code": " BEMVINDO "})
+
+        assert result["success"] is True
+        quote = result["quote"]
+        assert (quote["subtotal"], quote["discount_amount"], quote["shipping_cost"], quote["total"]) == (
+            100.0,
+            10.0,
+            15.0,
+            105.0,
+        )
+        assert set(result["timings"]) == {"cart", "coupon", "shipping", "sign"}
+        checkout.coupon_service.validate_coupon.assert_called_once_with("BEMVINDO", 100.0)
+        assert checkout.shipping_service.calculate_shipping.call_args.kwargs["use_correios"] is False
+        assert verify_quote(result["quote_token"], "u1")["coupon_code"] == "BEMVINDO"
+
+    def test_create_quote_errors(self, checkout):
+        assert checkout.create_quote("u1", {"shipping_address": {"street": "Rua A"}})["success"] is False
+
+        checkout.coupon_service.validate_coupon.return_value = {"success": False, "error": "Cupom expirado"}
+        result = checkout.create_quote("u1", {"shipping_address": ADDRESS, "coupon_code": "VELHO"})
+        assert result == {"success": False, "error": "Cupom expirado", "timings": result["timings"]}
+
+        checkout.cart_service.get_cart.return_value = {"items": [], "total": 0}
+        assert checkout.create_quote("u1", {"shipping_address": ADDRESS})["error"] == "Carrinho vazio"
+
+
+class TestOrderFromQuote:
+    """Testes da criação do pedido a partir da cotação"""
+
+    def test_single_repository_call(self, order_service, checkout):
+        token = checkout.create_quote("u1", {"shipping_address": ADDRESS, "coupon_code": "BEMVINDO"})["quote_token"]
+        order_service.repo.create_from_quote.return_value = {"success": True, "order": {"id": "o1"}}
+
+        result = order_service.create_order("u1", {"quote_token": token, "payment_method": "pix"})
+
+        assert result["success"] is True and result["order"] == {"id": "o1"}
+        assert set(result["timings"]) == {"verify", "rpc"}
+        order_service.repo.create_from_quote.assert_called_once()
+        user_id, order_data, items = order_service.repo.create_from_quote.call_args.args
+        assert user_id == "u1"
+        assert (order_data["total"], order_data["coupon_code"], order_data["payment_method"]) == (105.0, "BEMVINDO", "pix")
+        assert items == [{"product_id": "p1", "quantity": 2, "price": 50.0, "name": "Whey"}]
+        assert order_service.cart_service.mock_calls == []
+        assert len(order_service.repo.mock_calls) == 1
+
+    def test_stale_quote(self, order_service, checkout):
+        token = checkout.create_quote("u1", {"shipping_address": ADDRESS})["quote_token"]
+
+        invalid = order_service.create_order("u2", {"quote_token": token})
+        assert (invalid["success"], invalid["code"]) == (False, "quote_stale")
+        order_service.repo.create_from_quote.assert_not_called()
+
+        order_service.repo.create_from_quote.return_value = {
+            "success": False,
+            "error": "Carrinho alterado desde a cotação",
+            "code": "quote_stale",
+        }
+        changed = order_service.create_order("u1", {"quote_token": token})
+        assert changed["code"] == "quote_stale"
+        assert changed["error"] == "Carrinho alterado desde a cotação"
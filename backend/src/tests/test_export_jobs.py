@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Testes Unitários para exportação de dados em background (LGPD).
+"""
+import io
+import json
+import zipfile
+from unittest.mock import Mock
+
+import pytest
+from services.export_job_service import ACTIVE_JOBS_KEY, STALLED_AFTER, ExportJobService
+from services.lgpd_service import LGPDService
+from services.queue_service import _DEQUEUE_TRACKED, RedisQueueService
+from tests.mocks import MockRedis
+
+
+def _dequeue_tracked(redis, keys, args):
+    """Equivalente em Python do script Lua de retirada com registro"""
+    for key in keys[:-1]:
+        item = redis.rpop(key)
+        if item:
+            export_id = json.loads(item).get("data", {}).get(args[1])
+            if export_id:
+                redis.zadd(keys[-1], {export_id: float(args[0])})
+            return item
+    return None
+
+
+@pytest.fixture
+def lgpd_service():
+    """LGPDService sem dependências externas"""
+    service = LGPDService.__new__(LGPDService)
+    service.logger = Mock()
+    return service
+
+
+@pytest.fixture
+def export_job_service(lgpd_service):
+    """ExportJobService com Redis em memória simulado"""
+    service = ExportJobService.__new__(ExportJobService)
+    service.logger = Mock()
+    service.lgpd_service = lgpd_service
+    service.repo = Mock()
+    service.redis = None
+    return service
+
+
+class TestExportSections:
+    """Testes da divisão da exportação em seções"""
+
+    def test_all_expands_to_every_data_type(self, lgpd_service):
+        data_types = lgpd_service.normalize_export_data_types(["all"])
+        assert data_types == ["profile", "health_data", "orders", "activities", "exercises", "goals"]
+
+    def test_unknown_data_types_are_ignored(self, lgpd_service):
+        assert lgpd_service.normalize_export_data_types(["goals", "passwords"]) == ["goals"]
+
+    def test_shared_table_is_fetched_once(self, lgpd_service):
+        sections = lgpd_service.get_export_sections(["health_data", "exercises"])
+        assert sections.count("table:exercise_entries") == 1
+
+    def test_fetch_reports_each_section_to_callback(self, lgpd_service):
+        lgpd_service.fetch_export_section = lambda user_id, section: [section]
+        done = []
+
+        fetched = lgpd_service.fetch_export_sections(
+            "user-1", ["profile", "orders"], on_section_done=lambda s, d: done.append(s)
+        )
+
+        assert fetched == {"profile": ["profile"], "orders": ["orders"]}
+        assert sorted(done) == ["orders", "profile"]
+
+    def test_assemble_matches_sync_layout(self, lgpd_service):
+        fetched = {
+            "table:exercise_entries": [{"id": "e1"}],
+            "table:workout_sessions": [],
+            "table:user_goals": [{"id": "g1"}],
+        }
+
+        data = lgpd_service.assemble_export_data("user-1", ["exercises", "goals"], "json", fetched)
+
+        assert data["exercises"] == {"workout_sessions": [], "exercise_logs": [{"id": "e1"}]}
+        assert data["goals"] == [{"id": "g1"}]
+        assert data["export_metadata"]["user_id"] == "user-1"
+
+
+class TestExportJobService:
+    """Testes do processamento do job de exportação"""
+
+    def test_process_resumes_from_checkpoint(self, export_job_service, lgpd_service):
+        export_job_service.repo.find_export_by_id.return_value = {
+            "id": "exp-1",
+            "user_id": "user-1",
+            "format": "json",
+            "data_types": ["goals", "profile"],
+        }
+        export_job_service._load_checkpoint = Mock(return_value={"profile": {"id": "user-1"}})
+        export_job_service._upload_artifact = Mock()
+        lgpd_service.repo = Mock()
+        fetched_sections = []
+
+        def fake_fetch(user_id, section):
+            fetched_sections.append(section)
+            return []
+
+        lgpd_service.fetch_export_section = fake_fetch
+
+        assert export_job_service.process_export("exp-1") is True
+        assert fetched_sections == ["table:user_goals"]
+        export_job_service._upload_artifact.assert_called_once()
+        final_update = export_job_service.repo.update_export.call_args_list[-1][0][1]
+        assert final_update["status"] == "completed"
+        assert final_update["storage_path"] == "user-1/exp-1.json"
+
+    def test_csv_export_is_zip_with_one_file_per_collection(self, export_job_service):
+        content, content_type, extension = export_job_service._serialize(
+            {"goals": [{"id": "g1", "meta": {"a": 1}}], "health_data": {"food_diary": [{"id": "f1"}]}},
+            "csv",
+        )
+
+        assert (content_type, extension) == ("application/zip", "zip")
+        names = zipfile.ZipFile(io.BytesIO(content)).namelist()
+        assert sorted(names) == ["goals.csv", "health_data_food_diary.csv"]
+
+
+class TestExportJobLease:
+    """Testes do heartbeat registrado na retirada do job"""
+
+    @pytest.fixture
+    def service(self, export_job_service):
+        redis = MockRedis()
+        redis.register_script_handler(_DEQUEUE_TRACKED, _dequeue_tracked)
+        queue = RedisQueueService.__new__(RedisQueueService)
+        queue.redis_client = redis
+        export_job_service.queue = queue
+        export_job_service.redis = redis
+        return export_job_service
+
+    def test_claim_registers_heartbeat_with_pop(self, service):
+        service.queue.enqueue_task("exports", {"export_id": "exp-1"}, priority=1)
+
+        task = service.claim_next_job()
+
+        assert task["data"]["export_id"] == "exp-1"
+        assert service.redis.zscore(ACTIVE_JOBS_KEY, "exp-1") is not None
+        assert service.claim_next_job() is None
+
+    def test_job_lost_before_processing_is_requeued(self, service):
+        service.queue.enqueue_task("exports", {"export_id": "exp-1"}, priority=1)
+        service.claim_next_job()
+        # Worker morreu antes de process_export: nenhum heartbeat depois da retirada
+        claimed_at = service.redis.zscore(ACTIVE_JOBS_KEY, "exp-1")
+        service.redis.zadd(ACTIVE_JOBS_KEY, {"exp-1": claimed_at - STALLED_AFTER - 1})
+
+        assert service.requeue_stalled_jobs() == 1
+        assert service.claim_next_job()["data"]["export_id"] == "exp-1"
+
+    def test_discarded_job_leaves_active_set(self, service):
+        service.queue.enqueue_task("exports", {"export_id": "exp-1"}, priority=1)
+        service.claim_next_job()
+        service.repo.find_export_by_id.return_value = None
+
+        assert service.process_export("exp-1") is True
+        assert service.redis.zscore(ACTIVE_JOBS_KEY, "exp-1") is None
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do Motor de Regras de Gamificação RE-EDUCA Store.
+
+Testa a indexação das regras por tipo de evento, a montagem dos lotes
+aplicados no banco, a idempotência dos eventos e a leitura dos contadores.
+"""
+from datetime import date, timedelta
+from unittest.mock import Mock, patch
+
+import pytest
+from services.gamification_engine import GamificationEngine, build_rule_index, event_id
+from services.queue_service import _CLAIM, QueueNames, RedisQueueService
+from tests.mocks import MockRedis, claim_batch_handler
+from workers.gamification_worker import GamificationWorker
+
+CHALLENGES = [
+    {"id": "c1", "name": "Semana de Diário", "points": 100, "requirements": {"action": "food_diary_entry", "count": 7, "consecutive": True}},
+    {"id": "c2", "name": "Primeira Compra", "points": 200, "requirements": {"action": "order_paid", "count": 1}},
+    {"id": "c3", "name": "Borboleta Social", "points": 75, "requirements": {"action": "follower_count", "target": 50}},
+]
+ACHIEVEMENTS = [
+    {"id": "a1", "title": "Ativo", "points": 10, "rarity": "rare", "requirements": {"action": "food_diary_entry", "count": 3, "distinct_days": True}},
+]
+
+
+def _event(event_type, source_id, user_id="u1"):
+    return {"event_id": event_id(event_type, source_id), "user_id": user_id, "type": event_type, "day": "2026-10-19"}
+
+
+@pytest.fixture
+def realtime():
+    with patch("services.gamification_engine.realtime_service") as realtime_service:
+        yield realtime_service
+
+
+@pytest.fixture
+def leaderboards():
+    with patch("services.gamification_engine.leaderboard_service") as leaderboard_service:
+        yield leaderboard_service
+
+
+@pytest.fixture
+def engine(realtime, leaderboards):
+    """GamificationEngine com repositório mockado"""
+    rules = GamificationEngine.__new__(GamificationEngine)
+    rules.logger = Mock()
+    rules.repo = Mock()
+    rules.repo.get_active_challenges.return_value = CHALLENGES
+    rules.repo.get_active_achievements.return_value = ACHIEVEMENTS
+    rules.repo.apply_events.return_value = []
+    rules._index = None
+    rules._challenges = []
+    rules._loaded_at = 0.0
+    return rules
+
+
+class TestGamificationEngine:
+    """Testes do GamificationEngine"""
+
+    def test_rules_indexed_by_event_type(self):
+        index = build_rule_index(CHALLENGES, ACHIEVEMENTS)
+
+        assert set(index) == {"food_diary_entry", "order_paid"}
+        assert [(rule["rule_id"], rule["mode"], rule["target"]) for rule in index["food_diary_entry"]] == [
+            ("c1", "consecutive", 7),
+            ("a1", "days", 3),
+        ]
+        assert index["order_paid"][0]["kind"] == "challenge"
+        assert index["food_diary_entry"][1]["rarity"] == "rare"
+
+    def test_process_sends_only_matching_rules_in_one_call(self, engine):
+        stats = engine.process([_event("food_diary_entry", "f1"), _event("order_paid", "o1"), _event("post_created", "p1")])
+
+        assert stats == {"events": 2, "completed": 0}
+        engine.repo.apply_events.assert_called_once()
+        food, order = engine.repo.apply_events.call_args.args[0]
+        assert (food["active_day"], [rule["rule_id"] for rule in food["updates"]]) == (True, ["c1", "a1"])
+        assert (order["active_day"], [rule["rule_id"] for rule in order["updates"]]) == (False, ["c2"])
+        # Regras ficam em memória entre lotes
+        engine.process([_event("order_paid", "o2")])
+        engine.repo.get_active_challenges.assert_called_once()
+
+    def test_completed_rules_update_leaderboards_and_notify(self, engine, realtime, leaderboards):
+        engine.repo.apply_events.return_value = [
+            {"user_id": "u1", "kind": "challenge", "rule_id": "c2", "completed": True, "points": 200, "title": "Primeira Compra"},
+            {"user_id": "u1", "kind": "achievement", "rule_id": "a1", "completed": False, "points": 0},
+        ]
+
+        assert engine.process([_event("order_paid", "o1")]) == {"events": 1, "completed": 1}
+
+        leaderboards.record.assert_called_once_with("u1", 200, "challenge", "c2")
+        realtime.emit_to_user.assert_called_once_with(
+            "u1", "challenge_completed", {"id": "c2", "title": "Primeira Compra", "points": 200}
+        )
+
+    def test_failed_batch_returns_none_for_retry(self, engine, realtime):
+        engine.repo.apply_events.return_value = None
+
+        assert engine.process([_event("order_paid", "o1")]) is None
+        realtime.emit_to_user.assert_not_called()
+
+    def test_publish_uses_source_as_event_id_and_applies_inline_without_queue(self, engine):
+        with patch("services.gamification_engine.queue_service") as queue:
+            queue.enqueue_task.return_value = False
+            assert engine.publish("u1", "order_paid", "o1") is True
+            assert engine.publish("u1", "order_paid", "o1") is True
+            assert engine.publish("u1", "unknown", "x1") is False
+
+        first, second = (call.args[0][0] for call in engine.repo.apply_events.call_args_list)
+        assert first["event_id"] == second["event_id"] == event_id("order_paid", "o1")
+        assert queue.enqueue_task.call_count == 2
+
+    def test_stats_reset_streak_after_missed_day(self, engine):
+        engine.repo.get_stats.return_value = {
+            "achievements_count": 2,
+            "current_streak": 5,
+            "longest_streak": 9,
+            "last_active_on": (date.today() - timedelta(days=2)).isoformat(),
+        }
+        stats = engine.get_stats("u1")
+        assert (stats["achievements_count"], stats["current_streak"], stats["longest_streak"]) == (2, 0, 9)
+
+        engine.repo.get_stats.return_value["last_active_on"] = (date.today() - timedelta(days=1)).isoformat()
+        assert engine.get_stats("u1")["current_streak"] == 5
+
+        engine.repo.get_stats.return_value = None
+        assert engine.get_stats("u1")["completed_challenges_count"] == 0
+
+
+class TestGamificationWorker:
+    """Testes do consumo da fila pelo worker"""
+
+    def test_points_survive_a_crash_before_apply(self):
+        redis = MockRedis()
+        redis.register_script_handler(_CLAIM, claim_batch_handler)
+        queue = RedisQueueService.__new__(RedisQueueService)
+        queue.redis_client = redis
+        worker = GamificationWorker.__new__(GamificationWorker)
+        worker.queue_service, worker.consumer_id, worker.batch_size = queue, "w1", 100
+        worker.batches = worker.events = worker.completed = worker.failed_batches = 0
+        worker.engine = Mock()
+        queue.enqueue_task(QueueNames.GAMIFICATION_EVENTS, _event("order_paid", "o1"))
+
+        # Worker cai antes de aplicar o lote: o evento continua na lista de processamento
+        worker.engine.process.side_effect = SystemExit
+        with pytest.raises(SystemExit):
+            worker.run_once()
+        assert queue.requeue_unacked(QueueNames.GAMIFICATION_EVENTS, "w1") == 1
+
+        worker.engine.process.side_effect = None
+        worker.engine.process.return_value = {"completed": 1}
+        assert worker.run_once() == 1
+        assert worker.engine.process.call_args.args[0][0]["event_id"] == event_id("order_paid", "o1")
+        assert worker.completed == 1
+        assert not redis.exists(f"{QueueNames.GAMIFICATION_EVENTS}_processing_w1")
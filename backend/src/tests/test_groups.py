@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do Índice de Grupos RE-EDUCA Store.
+
+Testa a verificação de participação em lote pelo set do usuário, o papel
+lido do hash do grupo, a descoberta pelo sorted set de membros e a
+invalidação ao entrar e sair de grupos.
+"""
+from unittest.mock import Mock, patch
+
+import pytest
+from services.groups_service import (
+    BY_MEMBERS_KEY,
+    BY_MEMBERS_READY_KEY,
+    MEMBERS_KEY,
+    USER_GROUPS_KEY,
+    GroupsService,
+)
+from tests.mocks import MockRedis
+
+
+@pytest.fixture
+def redis():
+    client = MockRedis()
+    with patch("services.groups_service.cache_service", Mock(redis_client=client)):
+        yield client
+
+
+@pytest.fixture
+def service(redis):
+    """GroupsService com repositório mockado"""
+    groups = GroupsService.__new__(GroupsService)
+    groups.repo = Mock()
+    groups.repo.get_user_group_ids.return_value = ["g1", "g3"]
+    groups.repo.get_member_roles.return_value = {"u1": "admin", "u2": "member"}
+    return groups
+
+
+class TestGroupsService:
+    """Testes do GroupsService"""
+
+    def test_are_members_reads_user_set_once(self, service):
+        assert service.are_members("u1", ["g1", "g2", "g3"]) == {"g1": True, "g2": False, "g3": True}
+        assert service.is_user_member("g2", "u1") is False
+        assert service.is_user_member("g3", "u1") is True
+
+        service.repo.get_user_group_ids.assert_called_once_with("u1")
+
+    def test_user_without_groups_is_cached_too(self, service, redis):
+        service.repo.get_user_group_ids.return_value = []
+
+        assert service.are_members("u9", ["g1"]) == {"g1": False}
+        assert service.are_members("u9", ["g1"]) == {"g1": False}
+        assert service.repo.get_user_group_ids.call_count == 1
+        assert redis.exists(USER_GROUPS_KEY.format(user_id="u9"))
+
+    def test_role_comes_from_group_hash(self, service):
+        assert service.is_member("g1", "u1") == {"success": True, "is_member": True, "role": "admin"}
+        assert service.is_member("g1", "u5") == {"success": True, "is_member": False, "role": None}
+
+        service.repo.get_member_roles.assert_called_once_with("g1")
+        service.repo.get_user_role.assert_not_called()
+
+    def test_join_and_leave_invalidate_and_adjust_discovery(self, service, redis):
+        redis.zadd(BY_MEMBERS_KEY, {"g2": 4})
+        service.repo.find_by_id.return_value = {"id": "g2", "privacy": "public", "is_active": True}
+        service.repo.join_group.return_value = True
+        service.repo.leave_group.return_value = True
+        service.are_members("u1", ["g2"])
+        service.is_member("g2", "u1")
+
+        service.repo.get_user_group_ids.return_value = ["g1", "g2", "g3"]
+        service.repo.get_member_roles.return_value = {"u1": "member"}
+        assert service.join_group("g2", "u1")["success"]
+        assert service.is_user_member("g2", "u1") is True
+        assert redis.zscore(BY_MEMBERS_KEY, "g2") == 5
+
+        service.repo.get_member_roles.return_value = {}
+        assert service.leave_group("g2", "u2")["success"]
+        assert redis.zscore(BY_MEMBERS_KEY, "g2") == 5
+        assert not redis.exists(MEMBERS_KEY.format(group_id="g2"))
+
+    def test_discovery_reads_sorted_set_and_single_query(self, service, redis):
+        service.repo.get_member_counts.return_value = [
+            {"id": "g1", "members_count": 3},
+            {"id": "g2", "members_count": 10},
+            {"id": "g3", "members_count": 7},
+        ]
+        service.repo.find_by_ids.side_effect = lambda ids: [
+            {"id": group_id, "name": group_id.upper(), "members_count": 0} for group_id in ids if group_id != "g3"
+        ]
+
+        result = service.get_groups_sorted_by_members(limit=2)
+
+        assert [(g["id"], g["members_count"]) for g in result["groups"]] == [("g2", 10)]
+        service.repo.find_by_ids.assert_called_once_with(["g2", "g3"])
+        # Grupo inativo sai do índice
+        assert redis.zscore(BY_MEMBERS_KEY, "g3") is None
+        assert redis.exists(BY_MEMBERS_READY_KEY)
+        service.repo.find_all_sorted_by_members.assert_not_called()
+
+        service.get_groups_sorted_by_members(limit=2)
+        service.repo.get_member_counts.assert_called_once()
+
+    def test_without_redis_falls_back_to_database(self, service):
+        service.repo.find_all_sorted_by_members.return_value = [{"id": "g1"}]
+        with patch("services.groups_service.cache_service", Mock(redis_client=None)):
+            assert service.get_groups_sorted_by_members(limit=5)["groups"] == [{"id": "g1"}]
+            assert service.are_members("u1", ["g1"]) == {"g1": True}
+        service.repo.find_all_sorted_by_members.assert_called_once_with(limit=5)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Testes Unitários para o motor de analytics de saúde.
+"""
+from datetime import datetime
+
+import numpy as np
+import pytest
+from services.health_analytics_engine import HealthAnalyticsEngine, HealthSeries, pearson, rolling_mean
+
+END_DATE = datetime(2026, 3, 31, 12, 0, 0)
+
+
+@pytest.fixture
+def engine():
+    """Motor com janela de 30 dias terminando em 31/03"""
+    return HealthAnalyticsEngine(30, END_DATE)
+
+
+class TestHealthSeries:
+    """Testes das operações vetorizadas da série"""
+
+    def test_daily_resample_sums_and_counts_per_day(self):
+        series = HealthSeries.from_rows(
+            [
+                {"consumed_at": "2026-03-01T08:00:00", "calories": 300},
+                {"consumed_at": "2026-03-01T20:00:00+00:00", "calories": 700},
+                {"consumed_at": "2026-03-03", "calories": "500"},
+                {"consumed_at": None, "created_at": "2026-02-01T10:00:00", "calories": 999},
+            ],
+            ("consumed_at", "created_at"),
+            ("calories",),
+        )
+        start_day = np.datetime64("2026-03-01")
+
+        assert series.daily("calories", start_day, 3).tolist() == [1000.0, 0.0, 500.0]
+        assert series.daily(None, start_day, 3, how="count").tolist() == [2.0, 0.0, 1.0]
+
+    def test_invalid_dates_are_ignored_by_resampling(self):
+        series = HealthSeries.from_rows([{"entry_date": "ontem", "duration": 30}], ("entry_date",), ("duration",))
+
+        assert series.sum("duration") == 30
+        assert series.daily("duration", np.datetime64("2026-03-01"), 2).tolist() == [0.0, 0.0]
+
+    def test_trend_uses_chronological_order_and_slope(self):
+        series = HealthSeries.from_rows(
+            [
+                {"created_at": "2026-03-11T00:00:00", "imc": 24.0},
+                {"created_at": "2026-03-01T00:00:00", "imc": 26.0},
+            ],
+            ("created_at",),
+            ("imc",),
+        )
+
+        trend = series.trend("imc")
+
+        assert trend["trend"] == "decreasing"
+        assert trend["change"] == -2.0
+        assert trend["slope_per_day"] == pytest.approx(-0.2)
+
+    def test_rolling_mean_uses_partial_window_at_start(self):
+        assert rolling_mean(np.array([2.0, 4.0, 6.0]), window=2).tolist() == [2.0, 3.0, 5.0]
+
+    def test_pearson_requires_variance(self):
+        assert pearson(np.array([1.0, 2.0, 3.0]), np.array([2.0, 4.0, 6.0])) == 1.0
+        assert pearson(np.array([1.0, 1.0, 1.0]), np.array([2.0, 4.0, 6.0])) is None
+
+
+class TestHealthAnalyticsEngine:
+    """Testes do cálculo completo do período"""
+
+    def test_compute_splits_current_and_previous_imc(self, engine):
+        imc_rows = [
+            {"created_at": "2026-02-15T10:00:00", "imc": 26.0},
+            {"created_at": "2026-03-10T10:00:00", "imc": 25.0},
+            {"created_at": "2026-03-20T10:00:00", "imc": 24.0},
+        ]
+
+        result = engine.compute(imc_rows, [], [])
+
+        assert result["metrics"]["total_imc_calculations"] == 2
+        assert result["metrics"]["average_imc"] == 24.5
+        assert result["comparison"]["previous_avg_imc"] == 26.0
+        assert result["metrics"]["imc_change"] == -1.5
+
+    def test_compute_totals_and_daily_metrics(self, engine):
+        food_rows = [
+            {"consumed_at": "2026-03-30T12:00:00", "calories": 600, "protein": 30, "carbs": 50, "fat": 20, "fiber": 5},
+            {"consumed_at": "2026-03-31T12:00:00", "calories": 900, "protein": 40, "carbs": 80, "fat": 30, "fiber": 8},
+        ]
+        exercise_rows = [{"entry_date": "2026-03-31", "calories_burned": 300, "duration": 45}]
+
+        result = engine.compute([], food_rows, exercise_rows, biological_age_count=2)
+        metrics = result["metrics"]
+
+        assert metrics["total_calories_consumed"] == 1500
+        assert metrics["net_calories"] == 1200
+        assert metrics["macronutrients"] == {"protein": 70, "carbs": 130, "fat": 50, "fiber": 13}
+        assert metrics["avg_exercise_duration"] == 45
+        assert metrics["biological_age_calculations"] == 2
+
+        daily = result["daily_metrics"]
+        assert len(daily) == 31
+        assert daily[0]["date"] == "2026-03-01"
+        assert daily[-1] == {
+            "date": "2026-03-31",
+            "calories": 900.0,
+            "calories_burned": 300.0,
+            "exercise_count": 1,
+            "exercise_duration": 45.0,
+            "calories_7d_avg": 214.29,
+        }
+
+    def test_compute_from_rollups_matches_raw_totals(self, engine):
+        rollups = [
+            {"day": "2026-03-30", "calories_in": 600, "protein": 30, "food_entries": 1, "exercise_entries": 0},
+            {
+                "day": "2026-03-31",
+                "calories_in": 900,
+                "protein": 40,
+                "food_entries": 2,
+                "calories_out": 300,
+                "exercise_minutes": 90,
+                "exercise_entries": 2,
+            },
+        ]
+
+        result = engine.compute_from_rollups([], rollups)
+        metrics = result["metrics"]
+
+        assert metrics["total_food_entries"] == 3
+        assert metrics["total_calories_consumed"] == 1500
+        assert metrics["total_exercise_entries"] == 2
+        assert metrics["avg_exercise_duration"] == 45
+        assert result["daily_metrics"][-1]["exercise_count"] == 2
+
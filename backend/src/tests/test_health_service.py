@@ -298,3 +298,40 @@ class TestHealthServiceBiologicalAgeCalculation:
         assert "biological_age" in result
         assert "recommendations" in result
         assert isinstance(result["recommendations"], list)
+
+
+class TestHealthServiceAnalytics:
+    """Testes para analytics de saúde"""
+
+    def test_get_health_analytics_reads_rollups(self, health_service, mock_health_repo):
+        """Testa que alimentação/exercícios vêm dos rollups do período e o formato é mantido"""
+        mock_health_repo.get_data_version.return_value = None
+        mock_health_repo.get_imc_series.return_value = []
+        mock_health_repo.get_biological_age_history.return_value = {"entries": [], "pagination": {"total": 3}}
+        health_service.rollup_repo = Mock()
+        health_service.rollup_repo.find_by_range.return_value = [
+            {"day": "2026-01-01", "calories_in": 1800, "food_entries": 4, "exercise_entries": 0},
+        ]
+
+        result = health_service.get_health_analytics("user-123", period_days=7)
+
+        start_day, end_day = health_service.rollup_repo.find_by_range.call_args[0][1:]
+        assert start_day == result["period"]["start_date"][:10]
+        assert end_day == result["period"]["end_date"][:10]
+        assert result["metrics"]["total_food_entries"] == 4
+        assert result["metrics"]["total_calories_consumed"] == 1800
+        assert result["metrics"]["biological_age_calculations"] == 3
+        assert len(result["daily_metrics"]) == 8
+        assert {"trends", "comparison", "correlations", "insights"} <= set(result)
+
+    def test_get_health_analytics_uses_memoized_result(self, health_service, mock_health_repo):
+        """Testa que resultado memoizado para a versão atual dos dados evita queries"""
+        mock_health_repo.get_data_version.return_value = 4
+
+        with patch("services.health_service.cache_service") as mock_cache:
+            mock_cache.get.return_value = {"metrics": {"average_imc": 24.5}}
+            result = health_service.get_health_analytics("user-123", period_days=30)
+
+        assert result == {"metrics": {"average_imc": 24.5}}
+        assert ":30:v4:" in mock_cache.get.call_args[0][0]
+        mock_health_repo.get_imc_series.assert_not_called()
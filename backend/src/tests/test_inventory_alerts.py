@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Testes dos Alertas de Estoque Baixo RE-EDUCA Store.
+
+Testa a avaliação em conjunto (uma consulta de candidatos, um insert), o
+agrupamento das notificações por destinatário e o modo por evento.
+"""
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+from services.inventory_alerts import (
+    InventoryAlertService,
+    build_alerts,
+    classify_alert,
+    group_by_recipient,
+    render_alert_email,
+)
+
+CANDIDATES = [
+    {"product_id": "p1", "product_name": "Whey", "stock_quantity": 0, "threshold": 10, "notify_email": [], "notify_admins": True},
+    {
+        "product_id": "p2",
+        "product_name": "Creatina",
+        "stock_quantity": 5,
+        "threshold": 20,
+        "notify_email": ["compras@loja.com", ""],
+        "notify_admins": False,
+    },
+    {"product_id": "p3", "product_name": "Ômega 3", "stock_quantity": 8, "threshold": 10, "notify_email": None},
+]
+
+
+@pytest.fixture
+def service():
+    alert_service = InventoryAlertService.__new__(InventoryAlertService)
+    alert_service.logger = Mock()
+    alert_service.repo = Mock()
+    alert_service.repo.find_alert_candidates.return_value = CANDIDATES
+    alert_service.repo.create_many.side_effect = lambda alerts, window_hours: [
+        {"id": f"a-{alert['product_id']}", "product_id": alert["product_id"]} for alert in alerts
+    ]
+    alert_service.user_repo = Mock()
+    alert_service.user_repo.find_admin_emails.return_value = ["admin@loja.com", "compras@loja.com"]
+    alert_service._pending = set()
+    alert_service._pending_lock = threading.Lock()
+    return alert_service
+
+
+class TestAlertPlanning:
+    """Testes da montagem dos alertas"""
+
+    def test_classification_and_records(self):
+        assert [classify_alert(stock, 10) for stock in (0, 3, 4, 10)] == [
+            "out_of_stock",
+            "critical",
+            "low_stock",
+            "low_stock",
+        ]
+
+        alerts = build_alerts(CANDIDATES, sent_at="2026-10-19T00:00:00")
+        assert [alert["alert_type"] for alert in alerts] == ["out_of_stock", "critical", "low_stock"]
+        assert alerts[1]["notified_emails"] == ["compras@loja.com"]
+        assert (alerts[1]["notified_admins"], alerts[2]["notified_admins"]) == (False, True)
+
+    def test_one_email_per_recipient(self):
+        alerts = build_alerts(CANDIDATES)
+        grouped = group_by_recipient(alerts, ["admin@loja.com", "compras@loja.com"])
+
+        assert sorted(a["product_id"] for a in grouped["admin@loja.com"]) == ["p1", "p3"]
+        # Admin e email configurado ao mesmo tempo: produto aparece uma vez
+        assert sorted(a["product_id"] for a in grouped["compras@loja.com"]) == ["p1", "p2", "p3"]
+
+        subject, html, text = render_alert_email(grouped["compras@loja.com"])
+        assert subject == "⚠️ ALERTA: 3 produtos com estoque baixo"
+        assert "Creatina" in html and text.index("Whey") < text.index("Ômega 3")
+        assert render_alert_email(alerts[:1])[0] == "⚠️ ALERTA: Whey está SEM ESTOQUE"
+
+
+class TestAlertEvaluation:
+    """Testes da avaliação e envio"""
+
+    def test_evaluate_uses_bulk_queries(self, service):
+        email_service = Mock()
+        email_service._send_email.return_value = {"success": True}
+        with patch("services.email_service.EmailService", return_value=email_service):
+            result = service.evaluate(10)
+
+        assert result["success"] is True
+        assert (result["alerts_sent"], result["products_checked"], result["emails_sent"]) == (3, 3, 2)
+        service.repo.find_alert_candidates.assert_called_once_with(10, 24, None)
+        service.repo.create_many.assert_called_once()
+        service.user_repo.find_admin_emails.assert_called_once()
+        assert {call.args[0] for call in email_service._send_email.call_args_list} == {
+            "admin@loja.com",
+            "compras@loja.com",
+        }
+
+    def test_failed_insert_sends_nothing(self, service):
+        service.repo.create_many.side_effect = None
+        service.repo.create_many.return_value = []
+        with patch("services.email_service.EmailService") as email_service:
+            result = service.evaluate(10)
+
+        assert result["alerts_sent"] == 0
+        email_service.assert_not_called()
+
+        # Outra avaliação gravou p1 antes (ON CONFLICT DO NOTHING): só p2 é notificado
+        service.repo.create_many.return_value = [{"id": "a-p2", "product_id": "p2"}]
+        with patch.object(service, "_send_notifications", return_value=1) as send:
+            assert service.evaluate(10)["alerts_sent"] == 1
+        assert [alert["product_id"] for alert in send.call_args.args[0]] == ["p2"]
+        assert service.repo.create_many.call_args.args[1] == 24
+
+        service.repo.find_alert_candidates.return_value = None
+        assert service.evaluate(10)["success"] is False
+
+    def test_event_mode_coalesces_products(self, service):
+        submitted = []
+        with patch("services.inventory_alerts._executor", Mock(submit=submitted.append)):
+            service.evaluate_async(["p1", "p2", "p1"])
+            service.evaluate_async(["p2"])
+
+        assert len(submitted) == 1
+        service.evaluate = Mock()
+        submitted[0]()
+        service.evaluate.assert_called_once_with(10, ["p1", "p2"])
+        assert service._pending == set()
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Testes dos Leaderboards RE-EDUCA Store.
+
+Testa a atualização dos sorted sets a cada ponto concedido, a leitura de
+posição e vizinhança, o fallback para o banco e a reconstrução a partir do
+ledger de pontos.
+"""
+import json
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
+
+import pytest
+from services.leaderboard_service import (
+    GLOBAL_KEY,
+    PROFILES_KEY,
+    READY_KEY,
+    LeaderboardService,
+    board_key,
+)
+from tests.mocks import MockRedis
+
+
+@pytest.fixture
+def redis():
+    client = MockRedis()
+    with patch("services.leaderboard_service.cache_service", Mock(redis_client=client)):
+        yield client
+
+
+@pytest.fixture
+def service(redis):
+    """LeaderboardService com repositório mockado"""
+    leaderboards = LeaderboardService.__new__(LeaderboardService)
+    leaderboards.logger = Mock()
+    leaderboards.repo = Mock()
+    leaderboards.repo.get_profiles.side_effect = lambda ids: [{"id": i, "name": i.upper()} for i in ids]
+    return leaderboards
+
+
+class TestLeaderboardService:
+    """Testes do LeaderboardService"""
+
+    def test_board_keys(self):
+        now = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+
+        assert board_key("weekly", now=now) == "leaderboard:weekly:2026-W01"
+        assert board_key("monthly", now=now) == "leaderboard:monthly:2026-01"
+        assert board_key("weekly", challenge_id="c1") == "leaderboard:challenge:c1"
+        with pytest.raises(ValueError):
+            board_key("daily")
+
+    def test_record_updates_windows_and_challenge_but_claims_only_global(self, service, redis):
+        service.record("u1", 50, "challenge", "c1")
+        service.record("u1", 30, "reward")
+        service.record("u1", -20, "reward_claim")
+
+        assert redis.zscore(GLOBAL_KEY, "u1") == 60
+        assert redis.zscore(board_key("weekly"), "u1") == 80
+        assert redis.zscore(board_key("monthly"), "u1") == 80
+        assert redis.zscore(board_key(challenge_id="c1"), "u1") == 50
+        assert redis.ttl(board_key("weekly")) > 0
+        # Perfil buscado uma única vez
+        service.repo.get_profiles.assert_called_once_with(["u1"])
+
+    def test_position_and_neighbours(self, service, redis):
+        redis.set(READY_KEY, 1)
+        redis.zadd(GLOBAL_KEY, {f"u{n}": n * 10 for n in range(1, 8)})
+        service.cache_profiles([{"id": "u5", "name": "Ana", "avatar_url": "a.png"}])
+
+        position = service.get_position("u5", radius=1)
+
+        assert (position["rank"], position["points"], position["total"]) == (3, 50, 7)
+        assert [(e["rank"], e["user_id"]) for e in position["around"]] == [(2, "u6"), (3, "u5"), (4, "u4")]
+        assert position["around"][1] == {
+            "rank": 3,
+            "user_id": "u5",
+            "name": "Ana",
+            "avatar_url": "a.png",
+            "points": 50,
+            "total_points": 50,
+            "level": 1,
+        }
+        assert service.get_position("nobody")["rank"] is None
+        assert service.get_rank("u7") == 1
+
+    def test_reads_global_from_db_before_first_rebuild(self, service, redis):
+        service.repo.get_top_users.return_value = [
+            {"id": "u1", "name": "Ana", "total_points": 250},
+            {"id": "u2", "name": None, "total_points": 100},
+        ]
+
+        page = service.get_leaderboard(limit=1, offset=1)
+
+        assert page == [
+            {"rank": 2, "user_id": "u2", "name": "Usuário", "avatar_url": None, "points": 100, "total_points": 100, "level": 2}
+        ]
+        assert service.get_leaderboard("weekly") == []
+        assert service.get_rank("u1") is None
+
+    def test_rebuild_swaps_boards_and_drops_stale_challenges(self, service, redis):
+        redis.zadd(GLOBAL_KEY, {"ghost": 999})
+        redis.zadd(board_key(challenge_id="old"), {"u1": 10})
+        service.repo.get_ledger_totals.side_effect = [
+            [
+                {"user_id": "u1", "name": "Ana", "total_points": 70, "week_points": 0, "month_points": 40, "challenge_points": {"c1": 40}},
+                {"user_id": "u2", "name": "Bia", "total_points": 20, "week_points": 20, "month_points": 20, "challenge_points": {}},
+            ],
+            [],
+        ]
+
+        totals = service.rebuild(batch_size=2)
+
+        assert totals == {"users": 2, "challenges": 1}
+        assert redis.zrevrange(GLOBAL_KEY, 0, -1, withscores=True) == [("u1", 70.0), ("u2", 20.0)]
+        assert redis.zrevrange(board_key("weekly"), 0, -1) == ["u2"]
+        assert redis.zrevrange(board_key(challenge_id="c1"), 0, -1) == ["u1"]
+        assert not redis.exists(board_key(challenge_id="old"))
+        assert not list(redis.scan_iter(match="leaderboard:rebuild:*"))
+        assert json.loads(redis.hget(PROFILES_KEY, "u2"))["name"] == "Bia"
+        assert service.is_ready()
+
+    def test_rebuild_raises_when_ledger_unavailable(self, service, redis):
+        service.repo.get_ledger_totals.return_value = None
+
+        with pytest.raises(RuntimeError):
+            service.rebuild()
+        assert not service.is_ready()
+
+    def test_snapshot_saves_top_of_each_board(self, service, redis):
+        redis.set(READY_KEY, 1)
+        redis.zadd(GLOBAL_KEY, {"u1": 30, "u2": 10})
+        redis.zadd(board_key(challenge_id="c1"), {"u2": 5})
+        service.repo.replace_snapshot.return_value = True
+
+        saved = service.snapshot(size=1)
+
+        assert saved == {"global": 1, "challenge:c1": 1}
+        service.repo.replace_snapshot.assert_any_call("global", [{"user_id": "u1", "rank": 1, "points": 30}])
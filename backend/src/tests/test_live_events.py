@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do Pipeline de Eventos de Live Streaming RE-EDUCA Store.
+
+Testa o aceite de mensagens e presentes (limites no Redis e gravação
+imediata sem Redis), as curtidas agregadas por tick e a gravação em lote
+pelo consumer group.
+"""
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+from services.live_event_service import _ACCEPT, _TOGGLE_LIKE, CONSUMER_GROUP, LiveEventService
+from tests.mocks import MockRedis
+from workers.live_event_worker import LiveEventWorker
+
+STREAM = "5b0e8c1a-0000-4000-8000-000000000001"
+
+
+def _toggle_like(redis, keys, args):
+    likes, dirty_likes, dirty_streams = keys
+    user_id, message_id, stream_id, _ = args
+    liked = 0 if redis.srem(likes, user_id) else 1
+    if liked:
+        redis.sadd(likes, user_id)
+    redis.sadd(dirty_likes, message_id)
+    redis.sadd(dirty_streams, stream_id)
+    return [liked, redis.scard(likes)]
+
+
+@pytest.fixture
+def realtime():
+    with patch("services.live_event_service.realtime_service") as realtime_service:
+        yield realtime_service
+
+
+def _service(redis):
+    events = LiveEventService.__new__(LiveEventService)
+    events.logger = Mock()
+    events.repo = Mock()
+    events.user_repo = Mock()
+    events.user_repo.find_by_id.return_value = {"name": "Ana"}
+    events._names = {}
+    events._groups = set()
+    return events
+
+
+@pytest.fixture
+def redis():
+    client = Mock()
+    with patch("services.live_event_service.cache_service", Mock(redis_client=client)):
+        yield client
+
+
+class TestLiveEventService:
+    """Testes do LiveEventService"""
+
+    def test_message_is_accepted_in_one_round_trip(self, redis):
+        redis.eval.return_value = [1, "1700000000000-0"]
+        events = _service(redis)
+
+        first = events.publish_message(STREAM, "u1", "  oi  ")
+        events.publish_message(STREAM, "u1", "tudo bem?")
+
+        event = first["event"]
+        assert first["success"] and (event["type"], event["message"], event["username"]) == ("message", "oi", "Ana")
+        assert redis.eval.call_count == 2
+        args = redis.eval.call_args_list[0].args
+        assert args[0] == _ACCEPT and args[1] == 6
+        assert args[2] == f"live:events:{STREAM}" and args[3] == f"live:slow:{STREAM}:u1"
+        assert json.loads(args[-1]) == event and args[-2] == "1"
+        # Nome do autor fica em memória
+        events.user_repo.find_by_id.assert_called_once_with("u1")
+        events.repo.insert_events.assert_not_called()
+
+    def test_rejections(self, redis):
+        redis.eval.return_value = [0, 1200]
+        events = _service(redis)
+
+        assert events.publish_message(STREAM, "u1", "oi") == {
+            "success": False,
+            "error": "Aguarde para enviar novamente",
+            "retry_after_ms": 1200,
+        }
+        assert events.publish_message("1", "u1", "oi")["error"] == "Transmissão inválida"
+
+        # Worker atrasado: o stream não é cortado, a sala recusa novos eventos
+        redis.eval.return_value = [-1, 1000]
+        assert events.publish_message(STREAM, "u1", "oi")["error"] == "Chat temporariamente indisponível"
+        assert "MAXLEN" not in _ACCEPT
+        assert events.publish_message(STREAM, "u1", "x" * 501)["success"] is False
+        assert events.publish_gift(STREAM, "u1", "rosa", gift_cost=-1)["error"] == "Presente inválido"
+
+    def test_without_redis_events_are_written_inline(self):
+        with patch("services.live_event_service.cache_service", Mock(redis_client=None)):
+            events = _service(None)
+            events.repo.insert_events.return_value = {"messages": 0, "gifts": 1}
+
+            result = events.publish_gift(STREAM, "u1", "rosa", "Rosa", "10")
+
+        assert result["success"] and result["event"]["gift_cost"] == 10
+        messages, gifts = events.repo.insert_events.call_args.args
+        assert messages == [] and set(gifts[0]) == {"id", "stream_id", "user_id", "gift_id", "gift_name", "gift_cost", "created_at"}
+
+    def test_likes_are_broadcast_aggregated_per_tick(self, realtime):
+        client = MockRedis()
+        client.register_script_handler(_TOGGLE_LIKE, _toggle_like)
+        with patch("services.live_event_service.cache_service", Mock(redis_client=client)):
+            events = _service(client)
+            assert events.toggle_like(STREAM, "m1", "u1") == {"success": True, "liked": True, "likes_count": 1}
+            events.toggle_like(STREAM, "m1", "u2")
+            events.toggle_like(STREAM, "m2", "u1")
+            assert events.toggle_like(STREAM, "m2", "u1")["liked"] is False
+            client.hset(f"live:gifts:{STREAM}", mapping={"count": 2, "value": 30})
+
+            assert events.flush_counters() == 1
+            assert events.flush_counters() == 0
+
+        realtime.emit_to_room.assert_called_once_with(
+            f"stream_{STREAM}",
+            "stream_counters",
+            {"stream_id": STREAM, "likes": {"m1": 2, "m2": 0}, "gifts": {"count": 2, "value": 30}},
+        )
+
+    def test_persist_writes_batch_then_acks(self, redis):
+        events = _service(redis)
+        message = {"type": "message", "id": "e1", "stream_id": STREAM, "user_id": "u1", "username": "Ana", "message": "oi", "created_at": "2026-10-19T10:00:00+00:00"}
+        entries = [(f"live:events:{STREAM}", [("1-0", {"data": json.dumps(message)}), ("1-1", {"data": "{quebrado"})])]
+        pipe = redis.pipeline.return_value
+
+        events.repo.insert_events.return_value = None
+        assert events.persist(entries) is None
+        pipe.xack.assert_not_called()
+
+        events.repo.insert_events.return_value = {"messages": 1, "gifts": 0}
+        assert events.persist(entries) == {"messages": 1, "gifts": 0}
+        rows, gifts = events.repo.insert_events.call_args.args
+        assert rows == [{key: message[key] for key in ("id", "stream_id", "user_id", "message", "created_at")}] and gifts == []
+        pipe.xack.assert_called_once_with(f"live:events:{STREAM}", CONSUMER_GROUP, "1-0", "1-1")
+        pipe.xdel.assert_called_once_with(f"live:events:{STREAM}", "1-0", "1-1")
+
+
+class TestLiveEventWorker:
+    """Testes do LiveEventWorker"""
+
+    def test_pending_entries_are_retried_before_new_ones(self):
+        worker = LiveEventWorker.__new__(LiveEventWorker)
+        worker.batch_size = 100
+        worker.consumer = "w1"
+        worker.events = Mock()
+        worker.batches = worker.messages = worker.gifts = worker.failed_batches = worker.tick_events = 0
+        worker.last_tick = worker.last_run = 0.0
+        pending = [("live:events:s1", [("1-0", {})])]
+        worker.events.read_events.side_effect = [pending, [], [("live:events:s1", [("2-0", {}), ("2-1", {})])]]
+        worker.events.persist.side_effect = [None, {"messages": 2, "gifts": 0}]
+
+        assert worker.run_once() == -1
+        assert worker.events.read_events.call_args.kwargs == {"pending": True}
+        assert worker.run_once() == 2
+        assert "block_ms" in worker.events.read_events.call_args.kwargs
+        assert (worker.failed_batches, worker.batches, worker.messages) == (1, 1, 2)
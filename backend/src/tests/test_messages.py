@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Testes de Mensagens Diretas RE-EDUCA Store.
+
+Testa a chave de conversa, a paginação por cursor da caixa de entrada e do
+histórico, o envio com gravação em segundo plano (write-behind) e as
+confirmações de leitura em lote.
+"""
+from unittest.mock import Mock, patch
+
+import pytest
+from repositories.messages_repository import pair_key
+from services.messages_service import MessagesService
+from services.queue_service import _CLAIM, QueueNames, RedisQueueService
+from tests.mocks import MockRedis, claim_batch_handler
+from utils.cursors import encode_cursor, to_score
+from workers.direct_message_worker import DirectMessageWorker
+
+ALICE = "6f1c2a9e-0000-4000-8000-000000000001"
+BOB = "0a7d3b1c-0000-4000-8000-000000000002"
+
+
+def _message(message_id, created_at, sender=ALICE, recipient=BOB):
+    return {"id": message_id, "sender_id": sender, "recipient_id": recipient, "content": "oi", "created_at": created_at}
+
+
+@pytest.fixture
+def realtime():
+    with patch("services.messages_service.realtime_service") as realtime_service:
+        yield realtime_service
+
+
+@pytest.fixture
+def notifications():
+    with patch("services.messages_service.notification_service") as notification_service:
+        yield notification_service
+
+
+@pytest.fixture
+def queue():
+    with patch("services.messages_service.queue_service") as queue_service:
+        queue_service.enqueue_task.return_value = True
+        yield queue_service
+
+
+@pytest.fixture
+def service(realtime, notifications, queue):
+    """MessagesService com repositório mockado"""
+    messages = MessagesService.__new__(MessagesService)
+    messages.repo = Mock()
+    messages.user_repo = Mock()
+    messages.user_repo.exists.return_value = True
+    return messages
+
+
+class TestMessagesService:
+    """Testes do MessagesService"""
+
+    def test_pair_key_is_symmetric_and_canonical(self):
+        assert pair_key(ALICE, BOB) == pair_key(BOB.upper(), ALICE) == f"{BOB}:{ALICE}"
+        with pytest.raises(ValueError):
+            pair_key(ALICE, "nao-e-uuid")
+
+    def test_inbox_is_one_page_with_cursor(self, service):
+        rows = [
+            {"user_id": BOB, "last_message_at": "2026-10-19T10:00:00+00:00", "unread_count": 2},
+            {"user_id": ALICE, "last_message_at": "2026-10-19T09:00:00+00:00", "unread_count": 0},
+        ]
+        service.repo.get_conversations.return_value = rows
+
+        result = service.get_conversations(ALICE, limit=2)
+
+        assert result["conversations"] == rows
+        assert result["next_cursor"] == encode_cursor(to_score(rows[-1]["last_message_at"]), ALICE)
+        service.get_conversations(ALICE, cursor=result["next_cursor"], limit=2)
+        assert service.repo.get_conversations.call_args.args == (ALICE, 2, ("2026-10-19T09:00:00+00:00", ALICE))
+        assert service.get_conversations(ALICE, cursor="lixo") == {"success": False, "error": "Cursor inválido"}
+
+    def test_history_page_is_chronological_and_cursor_points_back(self, service):
+        # Repositório devolve da mais recente para a mais antiga
+        service.repo.get_messages.return_value = [
+            _message("m3", "2026-10-19T10:02:00+00:00"),
+            _message("m2", "2026-10-19T10:01:00+00:00"),
+        ]
+
+        result = service.get_messages(ALICE, BOB, limit=2)
+
+        assert [message["id"] for message in result["messages"]] == ["m2", "m3"]
+        assert result["next_cursor"] == encode_cursor(to_score("2026-10-19T10:01:00+00:00"), "m2")
+
+    def test_send_delivers_now_and_persists_later(self, service, realtime, notifications, queue):
+        result = service.send_message(ALICE, BOB, "  olá  ")
+
+        message = result["message"]
+        assert result["success"] and message["content"] == "olá" and message["id"]
+        queue.enqueue_task.assert_called_once()
+        assert queue.enqueue_task.call_args.args[1] == message
+        service.repo.insert_messages.assert_not_called()
+        notifications.adjust_badges.assert_called_once_with(BOB, messages=1)
+        assert [call.args[:2] for call in realtime.emit_to_user.call_args_list] == [
+            (BOB, "direct_message"),
+            (ALICE, "direct_message"),
+        ]
+
+    def test_send_without_queue_writes_inline(self, service, queue):
+        queue.enqueue_task.return_value = False
+        service.repo.insert_messages.return_value = 1
+
+        assert service.send_message(ALICE, BOB, "oi")["success"]
+        service.repo.insert_messages.assert_called_once()
+
+        service.repo.insert_messages.return_value = None
+        assert service.send_message(ALICE, BOB, "oi") == {"success": False, "error": "Erro ao enviar mensagem"}
+        assert service.send_message(ALICE, "nao-e-uuid", "oi")["error"] == "Destinatário inválido"
+
+    def test_send_to_unknown_recipient_is_rejected(self, service, realtime, queue):
+        service.user_repo.exists.return_value = False
+
+        assert service.send_message(ALICE, BOB, "oi") == {"success": False, "error": "Destinatário não encontrado"}
+        service.user_repo.exists.assert_called_once_with(BOB)
+        queue.enqueue_task.assert_not_called()
+        realtime.emit_to_user.assert_not_called()
+
+    def test_conversation_read_is_one_receipt_per_sender(self, service, realtime, notifications):
+        service.repo.mark_read.return_value = [{"sender_id": BOB, "read_count": 3, "read_at": "2026-10-19T10:05:00+00:00"}]
+
+        result = service.mark_conversation_read(ALICE, BOB, up_to="2026-10-19T10:04:00+00:00")
+
+        assert result["count"] == 3
+        service.repo.mark_read.assert_called_once_with(ALICE, other_user_id=BOB, up_to="2026-10-19T10:04:00+00:00")
+        notifications.adjust_badges.assert_called_once_with(ALICE, messages=-3)
+        realtime.emit_to_user.assert_called_once_with(
+            BOB, "messages_read", {"reader_id": ALICE, "read_count": 3, "read_at": "2026-10-19T10:05:00+00:00"}
+        )
+
+
+class TestDirectMessageWorker:
+    """Testes do DirectMessageWorker"""
+
+    def _worker(self, tasks, persisted):
+        worker = DirectMessageWorker.__new__(DirectMessageWorker)
+        worker.batch_size = 200
+        worker.consumer_id = None
+        worker.queue_service = Mock()
+        worker.queue_service.claim_batch.return_value = tasks
+        worker.messages_service = Mock()
+        worker.messages_service.persist_messages.side_effect = lambda messages: list(messages) and persisted
+        worker.batches = worker.messages = worker.failed_batches = 0
+        worker.last_run = 0.0
+        return worker
+
+    def test_batch_is_written_once_or_retried(self):
+        tasks = [{"data": _message("m1", "2026-10-19T10:00:00+00:00")}, {"data": _message("m2", "2026-10-19T10:00:01+00:00")}]
+
+        worker = self._worker(tasks, persisted=True)
+        assert worker.run_once() == 2
+        assert (worker.batches, worker.messages) == (1, 2)
+        worker.queue_service.retry_failed_task.assert_not_called()
+
+        worker.queue_service.ack_tasks.assert_called_once_with("direct_messages", tasks, None)
+
+        worker = self._worker(tasks, persisted=False)
+        worker.run_once()
+        assert worker.failed_batches == 1
+        assert worker.queue_service.retry_failed_task.call_count == 2
+        worker.queue_service.ack_tasks.assert_called_once_with("direct_messages", tasks, None)
+
+    def test_crash_before_write_keeps_messages(self):
+        redis = MockRedis()
+        redis.register_script_handler(_CLAIM, claim_batch_handler)
+        queue = RedisQueueService.__new__(RedisQueueService)
+        queue.redis_client = redis
+        queue.enqueue_task(QueueNames.DIRECT_MESSAGES, _message("m1", "2026-10-19T10:00:00+00:00"))
+        worker = self._worker([], persisted=True)
+        worker.queue_service = queue
+
+        # Worker cai entre a retirada e a gravação: a mensagem não sai do Redis
+        worker.messages_service.persist_messages.side_effect = SystemExit
+        with pytest.raises(SystemExit):
+            worker.run_once()
+        assert queue.requeue_unacked(QueueNames.DIRECT_MESSAGES) == 1
+
+        worker.messages_service.persist_messages.side_effect = lambda messages: [m["id"] for m in messages] == ["m1"]
+        assert worker.run_once() == 1
+        assert (worker.messages, redis.exists(f"{QueueNames.DIRECT_MESSAGES}_processing")) == (1, 0)
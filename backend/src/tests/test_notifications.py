@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do Pipeline de Notificações RE-EDUCA Store.
+
+Testa o agrupamento de eventos, a gravação em lote, os contadores de não
+lidas em Redis enviados pelo Socket.IO e o consumo da fila em lotes.
+"""
+from unittest.mock import Mock, patch
+
+import pytest
+from services.notification_service import BADGE_KEY, NotificationService, coalesce, render_message
+from services.queue_service import _CLAIM, QueueNames, RedisQueueService
+from services.social_counter_service import _INCREMENT_IF_EXISTS
+from tests.mocks import MockRedis, claim_batch_handler
+from workers.notification_worker import NotificationWorker
+
+
+def _increment_if_exists(redis, keys, args):
+    """Equivalente em Python do script Lua de incremento"""
+    if not redis.exists(keys[0]):
+        return None
+    value = redis.hincrby(keys[0], args[0], int(args[1]))
+    if value < 0:
+        redis.hset(keys[0], args[0], 0)
+        value = 0
+    return value
+
+
+def _like(user_id, actor_id, post_id="p1"):
+    return {
+        "user_id": user_id,
+        "actor_id": actor_id,
+        "type": "like",
+        "data": {"post_id": post_id},
+        "group_key": f"like:post:{post_id}",
+    }
+
+
+@pytest.fixture
+def redis():
+    client = MockRedis()
+    client.register_script_handler(_INCREMENT_IF_EXISTS, _increment_if_exists)
+    with patch("services.notification_service.cache_service", Mock(redis_client=client)):
+        yield client
+
+
+@pytest.fixture
+def realtime():
+    with patch("services.notification_service.realtime_service") as realtime_service:
+        yield realtime_service
+
+
+@pytest.fixture
+def service(redis, realtime):
+    """NotificationService com repositórios mockados"""
+    notifications = NotificationService.__new__(NotificationService)
+    notifications.logger = Mock()
+    notifications.repo = Mock()
+    notifications.repo.count_unread.return_value = 3
+    notifications.messages_repo = Mock()
+    notifications.messages_repo.get_unread_count.return_value = 2
+    return notifications
+
+
+def _emitted(realtime, event):
+    return [call.args[:1] + call.args[2:] for call in realtime.emit_to_user.call_args_list if call.args[1] == event]
+
+
+class TestNotificationService:
+    """Testes do NotificationService"""
+
+    def test_coalesce_groups_by_recipient_and_key(self):
+        events = [_like("u1", "a"), _like("u1", "b"), _like("u1", "a"), _like("u1", "c", "p2"), _like("u2", "a")]
+        events.append({"user_id": "u1", "actor_id": "d", "type": "follow", "data": {}, "group_key": "follow"})
+
+        items = {(item["user_id"], item["group_key"]): item for item in coalesce(events)}
+
+        assert len(items) == 4
+        liked = items[("u1", "like:post:p1")]
+        assert (liked["actor_ids"], liked["actor_count"], liked["from_user_id"]) == (["a", "b"], 2, "a")
+        assert items[("u1", "follow")]["title"] == "Novo seguidor!"
+
+    def test_render_message(self):
+        assert render_message("like", "Ana", 1) == "Ana curtiu seu post"
+        assert render_message("like", "Ana", 2) == "Ana e outra pessoa curtiram seu post"
+        assert render_message("follow", None, 41) == "Alguém e outras 40 pessoas começaram a te seguir"
+
+    def test_deliver_upserts_once_and_pushes_badges_to_loaded_users(self, service, redis, realtime):
+        redis.hset(BADGE_KEY.format(user_id="u1"), mapping={"notifications": 1, "messages": 0})
+        service.repo.upsert_notifications.return_value = [
+            {"id": "n1", "user_id": "u1", "group_key": "like:post:p1", "actor_count": 2, "inserted": True},
+            {"id": "n2", "user_id": "u2", "group_key": "like:post:p1", "actor_count": 5, "inserted": False},
+            {"id": "n3", "user_id": "u3", "group_key": "like:post:p1", "actor_count": 1, "inserted": True},
+        ]
+
+        stats = service.deliver([_like("u1", "a"), _like("u1", "b"), _like("u2", "a"), _like("u3", "a")])
+
+        assert stats == {"notifications": 3, "created": 2}
+        service.repo.upsert_notifications.assert_called_once()
+        assert len(service.repo.upsert_notifications.call_args.args[0]) == 3
+        assert [args[0] for args in _emitted(realtime, "notification")] == ["u1", "u2", "u3"]
+        # u3 não tem contador carregado: recebe o valor ao conectar
+        assert _emitted(realtime, "badges") == [("u1", {"notifications": 2, "messages": 0})]
+        assert not redis.exists(BADGE_KEY.format(user_id="u3"))
+
+    def test_failed_upsert_returns_none_for_retry(self, service, realtime):
+        service.repo.upsert_notifications.return_value = None
+
+        assert service.deliver([_like("u1", "a")]) is None
+        realtime.emit_to_user.assert_not_called()
+
+    def test_badges_load_from_db_once_and_follow_deltas(self, service, redis, realtime):
+        assert service.get_badges("u1") == {"notifications": 3, "messages": 2}
+        service.repo.mark_read.side_effect = [True, False]
+
+        service.mark_read("u1", "n1")
+        service.mark_read("u1", "n1")
+        service.adjust_badges("u1", messages=-5)
+
+        assert service.get_badges("u1") == {"notifications": 2, "messages": 0}
+        service.repo.count_unread.assert_called_once_with("u1")
+        assert [payload for _, payload in _emitted(realtime, "badges")] == [
+            {"notifications": 2, "messages": 2},
+            {"notifications": 2, "messages": 0},
+        ]
+
+    def test_notify_skips_self_and_delivers_inline_without_queue(self, service):
+        service.repo.upsert_notifications.return_value = []
+        with patch("services.notification_service.queue_service") as queue:
+            queue.enqueue_task.return_value = False
+            assert service.notify_like("u1", "u1", "p1", "like") is False
+            assert service.notify_follow("u1", "u2") is True
+
+        queue.enqueue_task.assert_called_once()
+        items = service.repo.upsert_notifications.call_args.args[0]
+        assert [(item["user_id"], item["group_key"], item["actor_ids"]) for item in items] == [("u1", "follow", ["u2"])]
+
+    def test_notifications_page_renders_message_and_cursor(self, service):
+        service.repo.get_notifications.return_value = [
+            {
+                "id": "n2",
+                "type": "like",
+                "actor_count": 41,
+                "actor": {"name": "Ana"},
+                "updated_at": "2025-01-01T00:00:00.000002+00:00",
+            },
+            {"id": "n1", "type": "achievement", "message": "Conquista!", "updated_at": "2025-01-01T00:00:00+00:00"},
+        ]
+
+        page = service.get_notifications("u1", limit=1)
+
+        assert page["notifications"][0]["message"] == "Ana e outras 40 pessoas curtiram seu post"
+        assert page["next_cursor"] == "1735689600000002_n2"
+        service.get_notifications("u1", cursor=page["next_cursor"], limit=1)
+        assert service.repo.get_notifications.call_args.args[2] == ("2025-01-01T00:00:00.000002+00:00", "n2")
+
+
+class TestDequeueBatch:
+    """Testes do consumo da fila em lotes"""
+
+    def test_takes_oldest_first_across_priorities(self):
+        queue = RedisQueueService.__new__(RedisQueueService)
+        queue.redis_client = MockRedis()
+        for n in range(3):
+            queue.enqueue_task("q", {"n": n}, priority=1)
+        queue.enqueue_task("q", {"n": "high"}, priority=2)
+
+        first = queue.dequeue_batch("q", max_items=3)
+        rest = queue.dequeue_batch("q", max_items=3)
+
+        assert [task["data"]["n"] for task in first] == ["high", 0, 1]
+        assert [task["data"]["n"] for task in rest] == [2]
+        assert queue.dequeue_batch("q") == []
+        assert first[0]["priority"] == 2
+
+
+class TestNotificationWorker:
+    """Testes do consumo da fila pelo worker"""
+
+    def test_unacked_batch_returns_to_queue_on_restart(self):
+        redis = MockRedis()
+        redis.register_script_handler(_CLAIM, claim_batch_handler)
+        queue = RedisQueueService.__new__(RedisQueueService)
+        queue.redis_client = redis
+        worker = NotificationWorker.__new__(NotificationWorker)
+        worker.queue_service = queue
+        worker.consumer_id = "w1"
+        worker.batch_size = 10
+        worker.batches = worker.events = worker.notifications = worker.failed_batches = 0
+        worker.notification_service = Mock()
+        for n in range(2):
+            queue.enqueue_task(QueueNames.SOCIAL_NOTIFICATIONS, {"n": n})
+
+        # Worker cai durante a entrega: o lote continua na lista de processamento
+        worker.notification_service.deliver.side_effect = SystemExit
+        with pytest.raises(SystemExit):
+            worker.run_once()
+        assert queue.requeue_unacked(QueueNames.SOCIAL_NOTIFICATIONS, "w1") == 2
+
+        worker.notification_service.deliver.side_effect = None
+        worker.notification_service.deliver.return_value = {"notifications": 2}
+        assert worker.run_once() == 2
+        delivered = worker.notification_service.deliver.call_args.args[0]
+        assert [event["n"] for event in delivered] == [0, 1]
+        assert not redis.exists(f"{QueueNames.SOCIAL_NOTIFICATIONS}_processing_w1")
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do Histórico de Pedidos RE-EDUCA Store.
+
+Testa a paginação por cursor, o cache por usuário, a proteção contra
+gravar uma página antiga depois de uma invalidação e a exportação do
+histórico completo.
+"""
+from unittest.mock import Mock, patch
+
+import pytest
+from services.order_read_model import _STORE, OrderReadModel, decode_cursor, encode_cursor
+from tests.mocks import MockRedis
+
+
+def _store(redis, keys, args):
+    """Equivalente em Python do script Lua de gravação do histórico"""
+    if (redis.get(keys[1]) or "0") != args[0]:
+        return 0
+    redis.hset(keys[0], args[2], args[3])
+    redis.expire(keys[0], int(args[1]))
+    return 1
+
+
+def _order(index):
+    return {
+        "id": f"o{index}",
+        "user_id": "u1",
+        "created_at": f"2026-10-{index:02d}T10:00:00+00:00",
+        "items": [{"product_id": "p1", "quantity": 1, "price": 10.0, "name": "Whey", "category": "suplementos"}],
+    }
+
+
+class FakeHistory:
+    """get_order_history sobre uma lista: mais recentes primeiro, cursor (created_at, id)"""
+
+    def __init__(self, orders):
+        self.orders = sorted(orders, key=lambda order: (order["created_at"], order["id"]), reverse=True)
+        self.calls = []
+
+    def find_history(self, user_id=None, limit=20, before=None, offset=0, order_id=None, status=None, with_user=False):
+        self.calls.append({"limit": limit, "before": before, "offset": offset, "order_id": order_id})
+        orders = [order for order in self.orders if order_id is None or order["id"] == order_id]
+        if before:
+            orders = [order for order in orders if (order["created_at"], order["id"]) < before]
+        return orders[offset : offset + limit]
+
+
+@pytest.fixture
+def redis():
+    client = MockRedis()
+    client.register_script_handler(_STORE, _store)
+    with patch("services.order_read_model.cache_service", Mock(redis_client=client)):
+        yield client
+
+
+@pytest.fixture
+def repo():
+    return FakeHistory([_order(index) for index in range(1, 6)])
+
+
+class TestOrderReadModel:
+    """Testes do histórico de pedidos"""
+
+    def test_cursor_pages_are_cached(self, redis, repo):
+        model = OrderReadModel(repo)
+
+        first = model.user_orders("u1", limit=2)
+        assert [order["id"] for order in first["orders"]] == ["o5", "o4"]
+        assert first["has_more"] is True and first["orders"][0]["items"][0]["category"] == "suplementos"
+        assert repo.calls[-1]["limit"] == 3
+
+        second = model.user_orders("u1", limit=2, cursor=first["next_cursor"])
+        third = model.user_orders("u1", limit=2, cursor=second["next_cursor"])
+        assert [order["id"] for order in second["orders"] + third["orders"]] == ["o3", "o2", "o1"]
+        assert (third["has_more"], third["next_cursor"]) == (False, None)
+
+        calls = len(repo.calls)
+        assert model.user_orders("u1", limit=2, cursor=first["next_cursor"]) == second
+        assert model.order("o3", "u1")["id"] == "o3"
+        assert model.order("o3", "u1")["id"] == "o3"
+        assert len(repo.calls) == calls + 1
+
+    def test_cursor_round_trip(self):
+        order = _order(7)
+        assert decode_cursor(encode_cursor(order)) == (order["created_at"], "o7")
+        with pytest.raises(ValueError):
+            decode_cursor("não-é-cursor")
+
+    def test_invalidation_discards_pages_and_stale_fills(self, redis, repo):
+        model = OrderReadModel(repo)
+        model.user_orders("u1", limit=2)
+        model.invalidate("u1")
+
+        calls = len(repo.calls)
+        model.user_orders("u1", limit=2)
+        assert len(repo.calls) == calls + 1
+
+        # Status alterado entre a leitura da versão e a consulta ao banco
+        version = model._version("u1")
+        model.invalidate("u1")
+        model._store("u1", "page:2:0", {"orders": []}, version)
+        assert model._get("u1", "page:2:0") is None
+
+    def test_iter_orders_walks_all_pages(self, repo):
+        with patch("services.order_read_model.cache_service", Mock(redis_client=None)):
+            model = OrderReadModel(repo)
+            assert [order["id"] for order in model.iter_orders("u1", page_size=2)] == ["o5", "o4", "o3", "o2", "o1"]
+            assert [call["before"] for call in repo.calls][1:] == [
+                (_order(4)["created_at"], "o4"),
+                (_order(2)["created_at"], "o2"),
+            ]
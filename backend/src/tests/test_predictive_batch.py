@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do Pipeline em Lote de Análise Preditiva RE-EDUCA Store.
+
+Testa o ajuste vetorizado, o churn em lote e o serviço das predições
+pré-calculadas.
+"""
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+from services.prediction_models import churn_scores, fit_linear_trends, project_trend, trend_model_at
+from services.predictive_analysis_service import PredictiveAnalysisService
+from services.predictive_batch_service import PredictiveBatchService, data_version
+
+
+@pytest.fixture
+def analysis_service():
+    """PredictiveAnalysisService com repositório mockado"""
+    service = PredictiveAnalysisService.__new__(PredictiveAnalysisService)
+    service.repo = Mock()
+    return service
+
+
+@pytest.fixture
+def batch_service(analysis_service):
+    """PredictiveBatchService com repositório mockado"""
+    service = PredictiveBatchService.__new__(PredictiveBatchService)
+    service.logger = Mock()
+    service.repo = Mock()
+    service.analysis = analysis_service
+    return service
+
+
+def _imc_rows(user_id, start, count, imc_step=0.1):
+    return [
+        {
+            "user_id": user_id,
+            "calculated_at": (start + timedelta(days=2 * i)).isoformat(),
+            "imc_value": 30 - imc_step * i,
+            "weight_kg": 90 - i * 0.5,
+        }
+        for i in range(count)
+    ]
+
+
+class TestPredictionModels:
+    """Testes das funções vetorizadas"""
+
+    def test_fit_linear_trends_matches_polyfit_per_group(self):
+        rng = np.random.default_rng(7)
+        groups = np.repeat([0, 1, 2], [20, 15, 2])
+        x = rng.uniform(0, 100, groups.size)
+        y = 3.0 - 0.05 * x + rng.normal(0, 0.5, groups.size)
+        y[3] = np.nan  # ponto sem a métrica é ignorado
+
+        fits = fit_linear_trends(groups, x, y, 3)
+
+        for group in (0, 1):
+            mask = (groups == group) & ~np.isnan(y)
+            slope, intercept = np.polyfit(x[mask], y[mask], 1)
+            r2 = np.corrcoef(x[mask], y[mask])[0, 1] ** 2
+            assert fits["slope"][group] == pytest.approx(slope)
+            assert fits["intercept"][group] == pytest.approx(intercept)
+            assert fits["r2"][group] == pytest.approx(r2)
+            assert fits["x_max"][group] == pytest.approx(x[mask].max())
+
+        assert fits["n"][0] == 19
+        assert trend_model_at(fits, 2) is None  # menos de 3 pontos
+
+    def test_project_trend_keeps_response_format(self):
+        model = {"slope": -0.1, "intercept": 30.0, "r2": 0.81, "x_max": 10.0, "n": 5}
+
+        assert project_trend(model, 20) == {
+            "predicted_value": 27.0,
+            "confidence": 81.0,
+            "trend": "decreasing",
+            "change_rate": -0.1,
+        }
+        assert "error" in project_trend(None, 20)
+
+    def test_churn_scores_match_online_rules(self, analysis_service):
+        grid = [(a, l, f) for a in (0, 8, 15) for l in (0, 4, 8) for f in (0.0, 0.2, 0.6)]
+        activity, login, frequency = (np.array(column) for column in zip(*grid))
+
+        scores = churn_scores(activity, login, frequency)
+
+        for (a, l, f), score in zip(grid, scores):
+            expected = analysis_service._calculate_churn_score(
+                {"days_since_last_activity": a, "days_since_last_login": l, "activity_frequency": f}
+            )
+            assert score == pytest.approx(expected)
+
+
+class TestBatchPipeline:
+    """Testes do PredictiveBatchService"""
+
+    def test_refresh_only_refits_changed_users(self, batch_service):
+        start = datetime(2026, 1, 1)
+        imc = _imc_rows("u1", start, 12) + _imc_rows("u2", start, 12)
+        batch_service.repo.get_imc_history_for_users.return_value = imc
+        batch_service.repo.get_workout_sessions_for_users.return_value = []
+        batch_service.repo.get_prediction_versions.return_value = {
+            "u1": {
+                "data_version": data_version([r for r in imc if r["user_id"] == "u1"], []),
+                "computed_at": datetime.utcnow().isoformat(),
+            },
+            "u2": {"data_version": "stale", "computed_at": datetime.utcnow().isoformat()},
+        }
+        batch_service.repo.upsert_predictions.side_effect = lambda rows: len(list(rows))
+
+        stats = batch_service.refresh_predictions(["u1", "u2"])
+
+        assert stats == {"refit": 1, "skipped": 1, "stored": 1}
+        (rows,), _ = batch_service.repo.upsert_predictions.call_args
+        assert [row["user_id"] for row in rows] == ["u2"]
+        model = rows[0]["models"]["imc"]
+        assert model["slope"] == pytest.approx(-0.05)  # -0.1 a cada 2 dias
+        assert model["n"] == 12
+        assert rows[0]["activity"]["current_activity_score"] == 2.0
+
+    def test_batch_fit_matches_online_prediction(self, batch_service, analysis_service):
+        start = datetime(2026, 3, 1)
+        imc = _imc_rows("u1", start, 10, imc_step=0.3)
+        sessions = [
+            {"user_id": "u1", "completed_at": (start - timedelta(days=3)).isoformat(), "duration_minutes": 30}
+        ]
+
+        rows = batch_service.build_prediction_rows([("u1", "v1")], {"u1": imc}, {"u1": sessions})
+
+        analysis_service.repo.get_stored_prediction.return_value = None
+        analysis_service.repo.get_user_imc_history.return_value = imc
+        analysis_service.repo.get_user_workout_sessions.return_value = sessions
+        online = analysis_service.predict_health_metrics("u1", days_ahead=15)
+
+        assert online["success"] is True
+        assert project_trend(rows[0]["models"]["imc"], 15) == online["predictions"]["imc"]
+        assert project_trend(rows[0]["models"]["weight"], 15) == online["predictions"]["weight"]
+
+    def test_compute_churn_rows(self, batch_service):
+        now = datetime(2026, 6, 30, 12, 0)
+        batch_service.repo.get_activities_for_users.return_value = [
+            {"user_id": "u1", "timestamp": (now - timedelta(days=1)).isoformat()}
+            for _ in range(20)
+        ]
+        users = [
+            {"id": "u1", "last_login": (now - timedelta(days=1)).isoformat()},
+            {"id": "u2", "last_login": (now - timedelta(days=20)).isoformat()},
+        ]
+
+        rows = batch_service.compute_churn_rows(users, now)
+
+        assert rows[0]["risk_level"] == "Baixo"
+        assert rows[0]["metrics"]["total_activities_30d"] == 20
+        assert rows[1]["churn_score"] == pytest.approx(0.6)  # login > 7 dias + sem atividades
+        assert rows[1]["risk_level"] == "Médio"
+
+
+class TestServingStoredPredictions:
+    """Testes das rotas servindo predições pré-calculadas"""
+
+    def test_predict_health_metrics_uses_stored_models(self, analysis_service):
+        analysis_service.repo.get_stored_prediction.return_value = {
+            "data_points": 20,
+            "models": {"imc": {"slope": 0.02, "intercept": 31.0, "r2": 0.5, "x_max": 50.0, "n": 12}},
+            "activity": {"predicted_activity_score": 3.0},
+            "confidence": 62.5,
+            "computed_at": "2026-10-19T03:00:00+00:00",
+        }
+
+        result = analysis_service.predict_health_metrics("u1", days_ahead=50)
+
+        assert result["success"] is True
+        assert result["predictions"]["imc"]["predicted_value"] == 33.0
+        assert result["predictions"]["health_risk"]["risk_level"] == "Alto"
+        assert result["confidence"] == 62.5
+        analysis_service.repo.get_user_imc_history.assert_not_called()
+
+    def test_predict_churn_risk_uses_nightly_score(self, analysis_service):
+        analysis_service.repo.get_churn_score.return_value = {
+            "churn_score": 0.8,
+            "risk_level": "Alto",
+            "metrics": {"days_since_last_login": 30},
+            "calculated_at": "2026-10-19T03:00:00+00:00",
+        }
+
+        result = analysis_service.predict_churn_risk("u1")
+
+        assert result["risk_level"] == "Alto"
+        assert result["recommendations"][0] == "Oferecer desconto especial"
+        analysis_service.repo.get_user_activities.assert_not_called()
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do Motor de Cupons e Promoções RE-EDUCA Store.
+
+Testa o índice compilado (mesmo resultado da avaliação promoção a
+promoção), a validação de cupons sem acesso ao banco, a reserva atômica de
+uso e o recarregamento após edições administrativas.
+"""
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+
+import pytest
+from services.coupon_service import CouponService
+from services.promotion_engine import (
+    _ADD_IF_EXISTS,
+    _RESERVE_USE,
+    PROMOTIONS_VERSION_KEY,
+    USAGE_COUNTER_KEY,
+    PromotionEngine,
+)
+from services.promotion_rules import compile_index
+from services.promotion_service import PromotionService
+from tests.mocks import MockRedis
+
+NOW = datetime.now(timezone.utc)
+PAST = (NOW - timedelta(days=1)).isoformat()
+FUTURE = (NOW + timedelta(days=1)).isoformat()
+
+PROMOTIONS = [
+    {"id": "p1", "type": "percentage", "value": 10, "priority": 1, "min_order_value": 100, "valid_until": FUTURE},
+    {"id": "p2", "type": "fixed", "value": 15, "priority": 5, "applicable_products": ["a", "b"], "valid_until": FUTURE},
+    {"id": "p3", "type": "bogo", "value": 1, "priority": 3, "applicable_categories": ["whey"], "min_quantity": 2},
+    {"id": "p4", "type": "fixed", "value": 5, "priority": 9, "valid_from": FUTURE, "valid_until": FUTURE},
+    {"id": "p5", "type": "percentage", "value": 50, "max_discount": 20, "priority": 2, "min_order_value": 300},
+]
+
+COUPONS = [
+    {"id": "c1", "code": "BEMVINDO", "discount_type": "percentage", "discount_value": 10, "valid_until": FUTURE},
+    {"id": "c2", "code": "VELHO", "discount_type": "fixed", "discount_value": 10, "valid_until": PAST},
+    {"id": "c3", "code": "FUTURO", "discount_type": "fixed", "discount_value": 10, "valid_from": FUTURE},
+    {"id": "c4", "code": "LIMITE", "discount_type": "fixed", "discount_value": 30, "usage_limit": 2, "usage_count": 1},
+    {"id": "c5", "code": "MINIMO", "discount_type": "fixed", "discount_value": 5, "min_order_value": 50},
+]
+
+
+def _reserve_use(redis, keys, args):
+    """Equivalente em Python do script Lua de reserva"""
+    current = redis.get(keys[0])
+    if current is None:
+        if args[1] == "":
+            return -2
+        redis.set(keys[0], args[1], ex=int(args[2]))
+        current = args[1]
+    if int(current) >= int(args[0]):
+        return -1
+    return redis.incr(keys[0])
+
+
+def _add_if_exists(redis, keys, args):
+    """Equivalente em Python do script Lua de ajuste"""
+    if not redis.exists(keys[0]):
+        return None
+    return redis.incrby(keys[0], int(args[0]))
+
+
+def _legacy_applicable(promotions, order_value, items, now):
+    """Avaliação promoção a promoção (prioridade desc)"""
+    product_ids = {item["product_id"] for item in items}
+    categories = {item.get("category") for item in items}
+    result = []
+    for promotion in sorted(promotions, key=lambda p: -p.get("priority", 0)):
+        if order_value < promotion.get("min_order_value", 0):
+            continue
+        if promotion.get("valid_from") and datetime.fromisoformat(promotion["valid_from"]).timestamp() > now:
+            continue
+        if promotion.get("valid_until") and datetime.fromisoformat(promotion["valid_until"]).timestamp() < now:
+            continue
+        products, cats = promotion.get("applicable_products"), promotion.get("applicable_categories")
+        if (products or cats) and not (product_ids & set(products or ()) or categories & set(cats or ())):
+            continue
+        result.append(promotion["id"])
+    return result
+
+
+@pytest.fixture
+def redis():
+    client = MockRedis()
+    client.register_script_handler(_RESERVE_USE, _reserve_use)
+    client.register_script_handler(_ADD_IF_EXISTS, _add_if_exists)
+    PromotionEngine._index = None
+    with patch("services.promotion_engine.cache_service", Mock(redis_client=client)):
+        yield client
+    PromotionEngine._index = None
+
+
+@pytest.fixture
+def engine(redis):
+    promotion_engine = PromotionEngine.__new__(PromotionEngine)
+    promotion_engine.logger = Mock()
+    promotion_engine.coupon_repo = Mock()
+    promotion_engine.coupon_repo.find_active_coupons.return_value = COUPONS
+    promotion_engine.coupon_repo.find_by_code.side_effect = lambda code: next(
+        (coupon for coupon in COUPONS if coupon["code"] == code), None
+    )
+    promotion_engine.promotion_repo = Mock()
+    promotion_engine.promotion_repo.find_active_promotions.return_value = PROMOTIONS
+    return promotion_engine
+
+
+@pytest.fixture
+def coupon_service(engine):
+    service = CouponService.__new__(CouponService)
+    service.logger = Mock()
+    service.repo = Mock()
+    service.repo.increment_usage.return_value = True
+    service.engine = engine
+    return service
+
+
+class TestPromotionIndex:
+    """Testes do índice compilado"""
+
+    def test_matches_promotion_by_promotion_evaluation(self):
+        index = compile_index(COUPONS, PROMOTIONS)
+        rng = random.Random(7)
+        catalog = [("a", "whey"), ("b", "vitaminas"), ("c", "whey"), ("d", None)]
+        for _ in range(500):
+            items = [
+                {"product_id": pid, "category": category, "quantity": rng.randint(1, 4), "price": 20.0}
+                for pid, category in rng.sample(catalog, rng.randint(0, 3))
+            ]
+            total = round(rng.uniform(0, 400), 2)
+            found = [promotion.id for promotion, _ in index.evaluate(total, items)]
+            assert found == _legacy_applicable(PROMOTIONS, total, items, time.time()), (total, items)
+
+    def test_discounts(self):
+        index = compile_index([], PROMOTIONS)
+        items = [
+            {"product_id": "c", "category": "whey", "quantity": 5, "price": 30.0},
+            {"product_id": "d", "quantity": 1, "price": 200.0},
+        ]
+        discounts = {promotion.id: discount for promotion, discount in index.evaluate(350, items)}
+
+        # BOGO: 5 unidades de whey -> 2 grátis; p5 limitado por max_discount
+        assert discounts == {"p3": 60.0, "p5": 20.0, "p1": 35.0}
+
+
+class TestCouponValidation:
+    """Testes da validação de cupons pelo índice"""
+
+    def test_validate_without_database(self, coupon_service, engine):
+        assert coupon_service.validate_coupon(" bemvindo ", 200)["discount_amount"] == 20.0
+        assert coupon_service.validate_coupon("VELHO", 200)["error"] == "Cupom expirado"
+        assert coupon_service.validate_coupon("FUTURO", 200)["error"] == "Cupom ainda não está válido"
+        assert coupon_service.validate_coupon("MINIMO", 20)["error"] == "Valor mínimo de compra: R$ 50.00"
+        assert coupon_service.validate_coupon("NAOEXISTE", 200)["error"] == "Cupom não encontrado"
+
+        engine.coupon_repo.find_active_coupons.assert_called_once()
+        coupon_service.repo.find_by_code.assert_not_called()
+
+    def test_usage_limit_is_reserved_atomically(self, coupon_service, redis):
+        assert coupon_service.apply_coupon("LIMITE", "u1", 100)["success"] is True
+        assert redis.get(USAGE_COUNTER_KEY.format(code="LIMITE")) == "2"
+
+        assert coupon_service.validate_coupon("LIMITE", 100)["error"] == "Cupom esgotado"
+        assert coupon_service.apply_coupon("LIMITE", "u2", 100)["success"] is False
+        coupon_service.repo.increment_usage.assert_called_once_with("LIMITE")
+
+        # Falha ao gravar no banco devolve o uso reservado
+        redis.set(USAGE_COUNTER_KEY.format(code="LIMITE"), 0)
+        coupon_service.repo.increment_usage.return_value = False
+        assert coupon_service.apply_coupon("LIMITE", "u3", 100)["success"] is False
+        assert redis.get(USAGE_COUNTER_KEY.format(code="LIMITE")) == "0"
+
+        coupon_service.repo.increment_usage.side_effect = Exception("timeout")
+        assert coupon_service.apply_coupon("LIMITE", "u4", 100)["success"] is False
+        assert redis.get(USAGE_COUNTER_KEY.format(code="LIMITE")) == "0"
+
+    def test_expired_counter_is_seeded_from_database(self, coupon_service, engine, redis):
+        # Índice compilado com usage_count 1, banco já com 2 (limite atingido)
+        engine.coupon_repo.find_by_code.side_effect = None
+        engine.coupon_repo.find_by_code.return_value = {"code": "LIMITE", "usage_count": 2}
+
+        assert coupon_service.apply_coupon("LIMITE", "u1", 100)["success"] is False
+        assert redis.get(USAGE_COUNTER_KEY.format(code="LIMITE")) == "2"
+        engine.coupon_repo.find_by_code.assert_called_once_with("LIMITE")
+        coupon_service.repo.increment_usage.assert_not_called()
+
+
+class TestPromotionInvalidation:
+    """Testes do recarregamento após edições"""
+
+    def test_admin_edit_publishes_new_version(self, engine, redis):
+        service = PromotionService.__new__(PromotionService)
+        service.promotion_repo = Mock()
+        service.promotion_repo.update_promotion.return_value = {"id": "p1"}
+        service.engine = engine
+
+        with patch("services.promotion_engine.RULES_CHECK_SECONDS", 0):
+            assert len(service.get_applicable_promotions(150)["promotions"]) == 1
+            service.get_applicable_promotions(150)
+            assert engine.promotion_repo.find_active_promotions.call_count == 1
+
+            engine.promotion_repo.find_active_promotions.return_value = []
+            assert service.update_promotion("p1", {"value": 20})["success"] is True
+            assert redis.get(PROMOTIONS_VERSION_KEY) == "1"
+            assert service.get_applicable_promotions(150)["promotions"] == []
+            assert engine.promotion_repo.find_active_promotions.call_count == 2
+
+    def test_coupon_edits_publish_new_version(self, engine, redis):
+        service = PromotionService.__new__(PromotionService)
+        service.coupon_repo = Mock()
+        service.coupon_repo.update.return_value = {"id": "c1", "is_active": False}
+        service.coupon_repo.delete.return_value = True
+        service.engine = engine
+
+        assert service.update_coupon("c1", {"is_active": False})["success"] is True
+        assert redis.get(PROMOTIONS_VERSION_KEY) == "1"
+        assert service.delete_coupon("c1")["success"] is True
+        assert redis.get(PROMOTIONS_VERSION_KEY) == "2"
+
+        service.coupon_repo.delete.return_value = False
+        assert service.delete_coupon("c1") == {"success": False, "error": "Erro ao deletar cupom"}
+        assert redis.get(PROMOTIONS_VERSION_KEY) == "2"
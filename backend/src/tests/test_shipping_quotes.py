@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Testes das Cotações de Frete RE-EDUCA Store.
+
+Testa o cache de cotações por faixa (CEP, peso, dimensões e valor), a
+cotação paralela dos serviços sob prazo único e a tabela regional usada
+quando a API dos Correios não responde a tempo.
+"""
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from services.cache_service import CacheService
+from services.correios_integration_service import CorreiosIntegrationService, _shipping_zone, _weight_bucket
+from tests.mocks import MockRedis
+
+
+def _quote(service_code, service_name, price=20.0, days=5, **params):
+    return {
+        "success": True,
+        "service": service_name,
+        "service_code": service_code,
+        "price": price,
+        "delivery_days": days,
+    }
+
+
+@pytest.fixture
+def correios():
+    cache = CacheService.__new__(CacheService)
+    cache.redis_client = MockRedis()
+    with patch("services.correios_integration_service.cache_service", cache):
+        service = CorreiosIntegrationService()
+        service.cep_origem = "01310100"
+        yield service
+
+
+class TestShippingQuotes:
+    """Testes das cotações dos Correios"""
+
+    def test_buckets_and_zones(self):
+        assert [_weight_bucket(g) for g in (1, 300, 301, 999, 1001)] == [300, 300, 500, 1000, 2000]
+        assert _shipping_zone("01310100", "04500000") == "local"
+        assert _shipping_zone("01310100", "88000000") == "regional"
+        assert _shipping_zone("01310100", "69000000") == "nacional"
+
+    def test_orders_in_same_bucket_share_cached_quote(self, correios):
+        with patch.object(correios, "_call_correios_api", side_effect=_quote) as api:
+            first = correios.calculate_shipping("88010-001", 0.8, 20, 8, 14, 120)
+            second = correios.calculate_shipping("88010999", 0.95, 18, 10, 12, 149)
+
+        assert api.call_count == 2
+        kwargs = api.call_args.kwargs
+        # A API é chamada com os valores da faixa, e com os mínimos dos Correios
+        assert (kwargs["peso_gramas"], kwargs["comprimento_cm"], kwargs["altura_cm"]) == (1000, 20, 10)
+        assert kwargs["valor_declarado"] == 150
+        assert {o["source"] for o in first["options"]} == {"correios"}
+        assert {o["source"] for o in second["options"]} == {"cache"}
+        assert second["cheapest"]["price"] == 20.0
+
+    def test_services_are_quoted_concurrently(self, correios):
+        barrier = threading.Barrier(2, timeout=1)
+
+        def api(service_code, service_name, **params):
+            barrier.wait()
+            return _quote(service_code, service_name, price=30.0 if service_name == "SEDEX" else 20.0)
+
+        with patch.object(correios, "_call_correios_api", side_effect=api):
+            result = correios.calculate_shipping("88010001", 1, 20, 10, 15)
+
+        assert [o["service"] for o in result["options"]] == ["PAC", "SEDEX"]
+
+    def test_slow_api_falls_back_to_regional_table(self, correios):
+        release = threading.Event()
+
+        def slow(service_code, service_name, **params):
+            if service_name == "SEDEX":
+                release.wait(2)
+            return _quote(service_code, service_name)
+
+        with patch("services.correios_integration_service.QUOTE_DEADLINE", 0.3), patch.object(
+            correios, "_call_correios_api", side_effect=slow
+        ) as api:
+            started = time.monotonic()
+            result = correios.calculate_shipping("69000000", 2.4, 20, 10, 15)
+            assert time.monotonic() - started < 1
+            release.set()
+
+            by_service = {o["service"]: o for o in result["options"]}
+            assert by_service["PAC"]["source"] == "correios"
+            assert by_service["SEDEX"]["source"] == "estimate"
+            assert by_service["SEDEX"]["price"] == round(59.90 + 2 * 14.90, 2)
+
+            # Em modo degradado a API não é chamada
+            calls = api.call_count
+            again = correios.calculate_shipping("69000000", 2.4, 20, 10, 15)
+            assert api.call_count == calls
+            assert {o["source"] for o in again["options"]} <= {"cache", "estimate"}
+
+    def test_business_error_is_not_estimated(self, correios):
+        def api(service_code, service_name, **params):
+            if service_name == "SEDEX":
+                return {"success": False, "error": "Serviço indisponível para o trecho"}
+            return _quote(service_code, service_name)
+
+        with patch.object(correios, "_call_correios_api", side_effect=api):
+            result = correios.calculate_shipping("69000000", 1, 20, 10, 15)
+
+        assert [o["service"] for o in result["options"]] == ["PAC"]
+        assert correios._degraded_until == 0.0
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Testes das Regras de Frete Compiladas RE-EDUCA Store.
+
+Testa o índice de intervalos por valor e faixa de CEP (mesmo resultado da
+avaliação regra a regra), o recarregamento por versão e o cálculo em lote.
+"""
+import random
+from unittest.mock import Mock, patch
+
+import pytest
+from services.shipping_rules import compile_rules
+from services.shipping_service import RULES_VERSION_KEY, ShippingService
+from tests.mocks import MockRedis
+
+RULES = [
+    {"id": "r1", "name": "Base", "priority": 1, "shipping_cost": 15, "free_shipping_threshold": 200},
+    {
+        "id": "r2",
+        "name": "Sul",
+        "priority": 5,
+        "min_order_value": 50,
+        "max_order_value": 150,
+        "shipping_cost": 9.9,
+        "cep_start": "80000000",
+        "cep_end": "99999999",
+    },
+    {"id": "r3", "name": "Faixa média", "priority": 3, "min_order_value": 100, "max_order_value": 300, "shipping_cost": 12},
+]
+
+
+def _legacy_match(rules, order_total, cep):
+    """Avaliação regra a regra (prioridade desc), com faixa de CEP"""
+    digits = "".join(ch for ch in str(cep or "") if ch.isdigit())
+    for rule in sorted(rules, key=lambda r: -r["priority"]):
+        if order_total < float(rule.get("min_order_value") or 0):
+            continue
+        if rule.get("max_order_value") and order_total > float(rule["max_order_value"]):
+            continue
+        if rule.get("cep_start"):
+            if len(digits) != 8 or not rule["cep_start"] <= digits <= rule["cep_end"]:
+                continue
+        return rule["id"]
+    return None
+
+
+@pytest.fixture
+def service():
+    ShippingService._ruleset = None
+    shipping = ShippingService.__new__(ShippingService)
+    shipping.logger = Mock()
+    shipping.repo = Mock()
+    shipping.repo.find_active_rules.return_value = RULES
+    shipping.default_shipping_cost = 15.00
+    shipping.default_free_shipping_threshold = 200.00
+    shipping.correios_available = False
+    yield shipping
+    ShippingService._ruleset = None
+
+
+class TestShippingRules:
+    """Testes das regras compiladas"""
+
+    def test_matches_rule_by_rule_evaluation(self):
+        ruleset = compile_rules(RULES)
+        rng = random.Random(42)
+        for _ in range(2000):
+            total = round(rng.uniform(0, 400), 2)
+            cep = rng.choice([None, "01310-100", "88010001", "99999999", "80000000", "123"])
+            rule = ruleset.match(total, cep)
+            assert (rule.id if rule else None) == _legacy_match(RULES, total, cep), (total, cep)
+
+        # Limites inclusivos
+        assert ruleset.match(150, "88010001").id == "r2"
+        assert ruleset.match(150.01, "88010001").id == "r3"
+        assert compile_rules([]).match(10) is None
+
+    def test_calculate_shipping_uses_compiled_rules(self, service):
+        with patch("services.shipping_service.cache_service", Mock(redis_client=None)):
+            south = service.calculate_shipping(120, address={"cep": "88010-001"})
+            free = service.calculate_shipping(350)
+            service.calculate_shipping(20)
+
+        assert (south["rule_name"], south["shipping_cost"]) == ("Sul", 9.9)
+        assert free["is_free"] and free["rule_name"] == "Base"
+        service.repo.find_active_rules.assert_called_once()
+
+    def test_new_version_triggers_reload(self, service):
+        redis = MockRedis()
+        with patch("services.shipping_service.cache_service", Mock(redis_client=redis)), patch(
+            "services.shipping_service.RULES_CHECK_SECONDS", 0
+        ):
+            assert service.calculate_shipping(120)["rule_name"] == "Faixa média"
+            assert service.calculate_shipping(120)["rule_name"] == "Faixa média"
+            assert service.repo.find_active_rules.call_count == 1
+
+            service.repo.find_active_rules.return_value = RULES[:1]
+            redis.incr(RULES_VERSION_KEY)
+            assert service.calculate_shipping(120)["rule_name"] == "Base"
+            assert service.repo.find_active_rules.call_count == 2
+
+    def test_save_rule_validates_and_publishes_version(self, service):
+        redis = MockRedis()
+        service.repo.create.return_value = {"id": "r4"}
+        with patch("services.shipping_service.cache_service", Mock(redis_client=redis)):
+            invalid = service.save_rule({"name": "X", "shipping_cost": 5, "cep_start": "1"})
+            assert invalid["error"] == "Faixa de CEP inválida"
+            assert service.save_rule({"name": "X"})["success"] is False
+
+            result = service.save_rule({"name": "X", "shipping_cost": 5, "cep_start": "88000-000", "cep_end": "88999999"})
+
+        assert result == {"success": True, "rule": {"id": "r4"}}
+        assert service.repo.create.call_args.args[0]["cep_start"] == "88000000"
+        assert redis.get(RULES_VERSION_KEY) == "1"
+
+    def test_batch_prices_many_carts_with_one_load(self, service):
+        with patch("services.shipping_service.cache_service", Mock(redis_client=None)):
+            results = service.calculate_shipping_batch(
+                [{"order_total": 120, "cep": "88010001"}, {"order_total": "x"}, {"order_total": 400}]
+            )
+
+        assert [r["rule_name"] for r in results] == ["Sul", "Regra padrão", "Base"]
+        assert results[2]["is_free"]
+        service.repo.find_active_rules.assert_called_once()
+
+    def test_failed_reload_keeps_previous_rules(self, service):
+        redis = MockRedis()
+        with patch("services.shipping_service.cache_service", Mock(redis_client=redis)), patch(
+            "services.shipping_service.RULES_CHECK_SECONDS", 0
+        ):
+            assert service.calculate_shipping(120)["rule_name"] == "Faixa média"
+
+            # Banco fora: mantém as regras e a versão anteriores e tenta de novo depois
+            service.repo.find_active_rules.return_value = None
+            redis.incr(RULES_VERSION_KEY)
+            assert service.calculate_shipping(120)["rule_name"] == "Faixa média"
+            assert ShippingService._ruleset.version is None
+
+            service.repo.find_active_rules.return_value = RULES[:1]
+            assert service.calculate_shipping(120)["rule_name"] == "Base"
+            assert ShippingService._ruleset.version == "1"
+
+    def test_empty_ruleset_is_not_cached(self, service):
+        service.repo.find_active_rules.return_value = None
+        with patch("services.shipping_service.cache_service", Mock(redis_client=None)):
+            assert service.calculate_shipping(120)["rule_name"] == "Regra padrão"
+            assert ShippingService._ruleset is None
+
+            service.repo.find_active_rules.return_value = RULES
+            assert service.calculate_shipping(120)["rule_name"] == "Faixa média"
+        assert service.repo.find_active_rules.call_count == 2
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Testes dos Contadores Sociais RE-EDUCA Store.
+
+Testa a leitura em lote com preenchimento pelo banco, os deltas aplicados
+pelos eventos sociais e a reconciliação periódica.
+"""
+from unittest.mock import Mock, call, patch
+
+import pytest
+from services.social_counter_service import (
+    _INCREMENT_IF_EXISTS,
+    COUNTER_KEY,
+    DIRTY_SET_KEY,
+    SocialCounterService,
+)
+from services.social_service import SocialService
+from tests.mocks import MockRedis
+
+
+def _increment_if_exists(redis, keys, args):
+    """Equivalente em Python do script Lua de incremento"""
+    if not redis.exists(keys[0]):
+        return None
+    value = redis.hincrby(keys[0], args[0], int(args[1]))
+    if value < 0:
+        redis.hset(keys[0], args[0], 0)
+        value = 0
+    return value
+
+
+def _counters(followers=0, following=0, posts=0, total_likes=0):
+    return {"followers": followers, "following": following, "posts": posts, "total_likes": total_likes}
+
+
+@pytest.fixture
+def redis():
+    client = MockRedis()
+    client.register_script_handler(_INCREMENT_IF_EXISTS, _increment_if_exists)
+    with patch("services.social_counter_service.cache_service", Mock(redis_client=client)):
+        yield client
+
+
+@pytest.fixture
+def counter_service(redis):
+    """SocialCounterService com repositório mockado"""
+    service = SocialCounterService.__new__(SocialCounterService)
+    service.logger = Mock()
+    service.repo = Mock()
+    return service
+
+
+class TestSocialCounterService:
+    """Testes do SocialCounterService"""
+
+    def test_get_many_fills_only_missing_users_from_db(self, counter_service, redis):
+        redis.hset(COUNTER_KEY.format(user_id="u1"), mapping=_counters(followers=5, posts=2))
+        counter_service.repo.get_user_counters.return_value = {"u2": _counters(followers=1_000_000, total_likes=42)}
+
+        counters = counter_service.get_many(["u1", "u2"])
+
+        assert counters["u1"]["followers"] == 5
+        assert counters["u2"]["followers"] == 1_000_000
+        counter_service.repo.get_user_counters.assert_called_once_with(["u2"])
+        assert redis.hgetall(COUNTER_KEY.format(user_id="u2"))["total_likes"] == "42"
+
+        counter_service.get_counters("u2")
+        assert counter_service.repo.get_user_counters.call_count == 1  # segunda leitura só no Redis
+
+    def test_deltas_only_touch_loaded_hashes_and_mark_dirty(self, counter_service, redis):
+        redis.hset(COUNTER_KEY.format(user_id="author"), mapping=_counters(followers=10))
+
+        counter_service.on_follow("fan", "author")
+        counter_service.on_like("author")
+        counter_service.on_like("author", delta=-1)
+        counter_service.on_like("author", delta=-1)  # nunca fica negativo
+
+        assert redis.hgetall(COUNTER_KEY.format(user_id="author"))["followers"] == "11"
+        assert redis.hgetall(COUNTER_KEY.format(user_id="author"))["total_likes"] == "0"
+        assert not redis.exists(COUNTER_KEY.format(user_id="fan"))  # sem contador parcial
+        assert redis.smembers(DIRTY_SET_KEY) == {"fan", "author"}
+
+    def test_reconcile_rewrites_drifted_counters(self, counter_service, redis):
+        redis.hset(COUNTER_KEY.format(user_id="u1"), mapping=_counters(followers=11))
+        redis.hset(COUNTER_KEY.format(user_id="u2"), mapping=_counters(posts=3))
+        redis.sadd(DIRTY_SET_KEY, "u1", "u2", "u3")
+        counter_service.repo.get_user_counters.return_value = {
+            "u1": _counters(followers=10),
+            "u2": _counters(posts=3),
+            "u3": _counters(),
+        }
+
+        stats = counter_service.reconcile()
+
+        assert stats == {"checked": 2, "corrected": 1}  # u3 não está em cache
+        assert redis.hgetall(COUNTER_KEY.format(user_id="u1"))["followers"] == "10"
+        assert not redis.exists(DIRTY_SET_KEY)
+        assert not redis.exists(COUNTER_KEY.format(user_id="u3"))
+
+    def test_reconcile_requeues_users_when_db_fails(self, counter_service, redis):
+        redis.sadd(DIRTY_SET_KEY, "u1")
+        counter_service.repo.get_user_counters.return_value = {}
+
+        assert counter_service.reconcile() == {"checked": 0, "corrected": 0}
+        assert redis.smembers(DIRTY_SET_KEY) == {"u1"}
+
+
+class TestSocialServiceCounterHooks:
+    """Testes dos eventos sociais atualizando os contadores"""
+
+    @pytest.fixture
+    def social_service(self):
+        service = SocialService.__new__(SocialService)
+        service.logger = Mock()
+        service.repo = Mock()
+        with patch("services.social_service.social_counters") as counters:
+            service.counters = counters
+            yield service
+
+    def test_follow_counts_only_new_relationships(self, social_service):
+        # add_follow/remove_follow dizem se a linha mudou: sem consulta prévia
+        social_service.repo.follow_user.side_effect = [True, False]
+        social_service.follow_user("fan", "author")
+        social_service.follow_user("fan", "author")
+        social_service.repo.unfollow_user.side_effect = [True, False]
+        social_service.unfollow_user("fan", "author")
+        social_service.unfollow_user("fan", "author")
+
+        assert social_service.counters.on_follow.call_args_list == [
+            call("fan", "author"),
+            call("fan", "author", delta=-1),
+        ]
+        social_service.repo.is_following.assert_not_called()
+
+    def test_like_is_credited_to_post_author(self, social_service):
+        social_service.repo.create_reaction.side_effect = [
+            {"id": "r1", "reaction_type": "like", "post_owner_id": "author"},
+            None,
+            {"id": "r2", "reaction_type": "love", "post_owner_id": "author"},
+        ]
+
+        assert social_service.create_reaction("p1", "fan", "like")["reaction"] == {"id": "r1", "reaction_type": "like"}
+        social_service.create_reaction("p1", "fan", "like")
+        social_service.create_reaction("p1", "fan", "love")
+
+        social_service.counters.on_like.assert_called_once_with("author")
+        social_service.repo.get_post_owner.assert_not_called()
+
+    def test_removed_likes_are_debited_once(self, social_service):
+        social_service.repo.remove_reaction.side_effect = [
+            [{"reaction_type": "love", "post_owner_id": "author"}, {"reaction_type": "like", "post_owner_id": "author"}],
+            [],
+        ]
+
+        social_service.remove_reaction("p1", "fan")
+        social_service.remove_reaction("p1", "fan")
+
+        social_service.counters.on_like.assert_called_once_with("author", delta=-1)
+
+    def test_profile_reads_cached_counters(self, social_service):
+        social_service.counters.get_counters.return_value = _counters(followers=7)
+        social_service.repo.get_user_profile.return_value = {"id": "u1"}
+
+        assert social_service.get_user_profile("u1", "viewer")["success"] is True
+        social_service.repo.get_user_profile.assert_called_once_with("u1", "viewer", stats=_counters(followers=7))
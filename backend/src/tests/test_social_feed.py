@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do Feed Social RE-EDUCA Store.
+
+Testa a montagem das páginas de posts com contadores agregados e a
+verificação em lote das reações do usuário atual.
+"""
+from unittest.mock import MagicMock, Mock
+
+import pytest
+from repositories.social_repository import SocialRepository
+
+
+def _query(rows):
+    """Builder encadeável que devolve rows no execute()"""
+    query = MagicMock()
+    for method in ("select", "eq", "in_", "order", "range", "limit", "contains", "gte"):
+        getattr(query, method).return_value = query
+    query.execute.return_value = Mock(data=rows, error=None)
+    return query
+
+
+@pytest.fixture
+def repo():
+    """SocialRepository com banco mockado por tabela"""
+    repository = SocialRepository.__new__(SocialRepository)
+    repository.logger = Mock()
+    repository.db = Mock()
+    repository.tables = {}
+    repository.db.table.side_effect = lambda name: repository.tables[name]
+    return repository
+
+
+POSTS = [
+    {"id": "p1", "user_id": "a", "likes_count": 100_000, "comments_count": 12, "users": {"name": "Ana"}},
+    {"id": "p2", "user_id": "b", "likes_count": 0, "comments_count": 0, "users": {"email": "b@x.com"}},
+]
+
+
+class TestFeedCounters:
+    """Testes dos contadores do feed"""
+
+    def test_get_posts_uses_row_counters_and_one_viewer_lookup(self, repo):
+        repo.tables = {"posts": _query(POSTS), "reactions": _query([{"post_id": "p2"}])}
+
+        posts = repo.get_posts("viewer", page=1, limit=20)
+
+        assert [(p["reaction_count"], p["comment_count"], p["user_reacted"]) for p in posts] == [
+            (100_000, 12, False),
+            (0, 0, True),
+        ]
+        assert posts[1]["user_name"] == "b@x.com"
+        reactions = repo.tables["reactions"]
+        reactions.eq.assert_called_once_with("user_id", "viewer")
+        reactions.in_.assert_called_once_with("post_id", ["p1", "p2"])
+        assert repo.db.table.call_args_list.count((("reactions",),)) == 1
+
+    def test_get_post_like_counts_returns_mapping(self, repo):
+        repo.tables = {"posts": _query([{"id": "p1", "likes_count": 7, "comments_count": 1}])}
+
+        assert repo.get_post_like_counts(["p1", "p1"]) == {"p1": 7}
+        repo.tables["posts"].in_.assert_called_once_with("id", ["p1"])
+
+    def test_user_posts_check_viewer_reactions_in_batch(self, repo):
+        repo.tables = {"posts": _query(POSTS), "reactions": _query([{"post_id": "p1"}])}
+
+        posts = repo.get_user_posts("a", viewer_id="viewer")
+
+        assert [p["user_reacted"] for p in posts] == [True, False]
+        assert repo.db.table.call_args_list.count((("reactions",),)) == 1
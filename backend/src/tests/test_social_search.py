@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da Busca Social RE-EDUCA Store.
+
+Testa a manutenção incremental do índice (posts, hashtags e usuários),
+a busca por termos e prefixos e as hashtags em alta com decaimento.
+"""
+from unittest.mock import Mock, patch
+
+import pytest
+from services.social_search_service import (
+    HASHTAG_COUNTS_KEY,
+    HASHTAG_LEX_KEY,
+    LEX_END,
+    READY_KEY,
+    TRENDING_HALF_LIFE,
+    TRENDING_REBASE_AFTER,
+    SocialSearchService,
+    tokenize,
+)
+from tests.mocks import MockRedis
+
+
+def _post(post_id, content, hashtags=None, second=0):
+    return {
+        "id": post_id,
+        "user_id": "author",
+        "content": content,
+        "hashtags": hashtags or [],
+        "created_at": f"2025-01-01T00:00:{second:02d}+00:00",
+    }
+
+
+@pytest.fixture
+def redis():
+    client = MockRedis()
+    client.set(READY_KEY, 1)
+    with patch("services.social_search_service.cache_service", Mock(redis_client=client)):
+        yield client
+
+
+@pytest.fixture
+def search(redis):
+    """SocialSearchService com repositórios mockados"""
+    service = SocialSearchService.__new__(SocialSearchService)
+    service.logger = Mock()
+    service.repo = Mock()
+    service.repo.get_users_by_ids.side_effect = lambda ids, verified_only=False: [{"id": uid} for uid in ids]
+    service.cards = Mock()
+    service.cards.find_posts_by_ids.side_effect = lambda ids: [{"id": post_id} for post_id in ids]
+    service.social_repo = Mock()
+    service.social_repo.enrich_posts.side_effect = lambda posts, *args, **kwargs: posts
+    return service
+
+
+def _post_ids(service, query, **filters):
+    return [post["id"] for post in service.search(query, "posts", filters=filters)["posts"]]
+
+
+class TestSocialSearchService:
+    """Testes do SocialSearchService"""
+
+    def test_tokenize_normalizes_accents_and_drops_stopwords(self):
+        assert tokenize("Treino de Força na praia, força!") == ["treino", "forca", "praia"]
+
+    def test_terms_are_intersected_and_last_term_matches_prefix(self, search):
+        search.index_post(_post("p1", "Treino de força pela manhã", second=1))
+        search.index_post(_post("p2", "Receita de bolo proteico", second=2))
+        search.index_post(_post("p3", "Treino funcional e bolo no fim", second=3))
+
+        assert _post_ids(search, "treino") == ["p3", "p1"]
+        assert _post_ids(search, "treino bol") == ["p3"]
+        assert _post_ids(search, "FORÇA") == ["p1"]
+        assert _post_ids(search, "treino", sortBy="oldest") == ["p1", "p3"]
+        assert _post_ids(search, "inexistente") == []
+
+    def test_update_and_delete_keep_postings_and_hashtag_counts_in_sync(self, search, redis):
+        search.index_post(_post("p1", "corrida #Saúde", hashtags=["fitness"]))
+        search.index_post(_post("p2", "yoga", hashtags=["saude"]))
+        assert redis.zscore(HASHTAG_COUNTS_KEY, "saude") == 2
+
+        search.index_post(_post("p1", "natação", hashtags=["fitness"]))
+        assert _post_ids(search, "corrida") == []
+        assert _post_ids(search, "natacao") == ["p1"]
+        assert redis.zscore(HASHTAG_COUNTS_KEY, "saude") == 1
+
+        search.remove_post("p1")
+        assert _post_ids(search, "#fitness") == []
+        assert redis.zscore(HASHTAG_COUNTS_KEY, "fitness") is None
+        assert redis.zrangebylex(HASHTAG_LEX_KEY, "[", f"[{LEX_END}") == ["saude"]
+        assert search.search("sa", "hashtags")["hashtags"] == [{"tag": "saude", "count": 1}]
+
+    def test_users_match_any_word_prefix_and_reindex_on_rename(self, search):
+        search.index_user({"id": "u1", "name": "Ana Maria Silva", "email": "ana@x.com"})
+        search.index_user({"id": "u2", "name": "Mariana Costa", "email": "mari@x.com"})
+
+        assert [u["id"] for u in search.search("mari", "users")["users"]] == ["u2", "u1"]
+        assert [u["id"] for u in search.search("maria sil", "users")["users"]] == ["u1"]
+
+        search.index_user({"id": "u1", "name": "Ana Souza", "email": "ana@x.com"})
+        assert [u["id"] for u in search.search("silva", "users")["users"]] == []
+        assert [u["id"] for u in search.search("souza", "users")["users"]] == ["u1"]
+
+    def test_column_filters_run_in_db_over_index_candidates(self, search):
+        search.index_post(_post("p1", "treino", second=1))
+        search.index_post(_post("p2", "treino", second=2))
+        search.repo.filter_posts.return_value = [{"id": "p1"}]
+
+        assert _post_ids(search, "treino", minLikes=10) == ["p1"]
+        candidates, filters, offset, limit = search.repo.filter_posts.call_args.args
+        assert candidates == ["p2", "p1"]
+        assert (offset, limit) == (0, 20)
+
+    def test_trending_decays_older_hashtags(self, search):
+        with patch("services.social_search_service.time.time", return_value=1_000_000):
+            search.index_post(_post("p1", "x", hashtags=["antiga"]), count_trending=True)
+            search.index_post(_post("p2", "x", hashtags=["antiga"]), count_trending=True)
+        later = 1_000_000 + 3 * TRENDING_HALF_LIFE
+        with patch("services.social_search_service.time.time", return_value=later):
+            search.index_post(_post("p3", "x", hashtags=["nova"]), count_trending=True)
+            trending = search.get_trending_hashtags()["hashtags"]
+
+        assert [(h["tag"], h["score"], h["count"]) for h in trending] == [("nova", 1.0, 1), ("antiga", 0.25, 2)]
+
+        rebased = later + (TRENDING_REBASE_AFTER + 1) * TRENDING_HALF_LIFE
+        with patch("services.social_search_service.time.time", return_value=rebased):
+            search.index_post(_post("p4", "x", hashtags=["nova"]), count_trending=True)
+            trending = search.get_trending_hashtags()["hashtags"]
+        assert [(h["tag"], h["score"]) for h in trending] == [("nova", 1.0)]
+
+    def test_search_falls_back_to_db_until_index_is_ready(self, search, redis):
+        redis.delete(READY_KEY)
+        assert search.search("treino") is None
+
+        from services.social_service import SocialService
+
+        service = SocialService.__new__(SocialService)
+        service.logger = Mock()
+        service.repo = Mock()
+        service.repo.search.return_value = {"posts": [{"id": "db"}], "users": [], "hashtags": []}
+        with patch("services.social_service.social_search", search):
+            result = service.search("treino")
+
+        assert result["results"]["posts"] == [{"id": "db"}]
+        service.repo.search.assert_called_once()
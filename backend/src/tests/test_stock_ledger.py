@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+Testes do Livro de Estoque RE-EDUCA Store.
+
+Testa as reservas atômicas (sem vender além do estoque), confirmação e
+liberação, a expiração pelo sorted set de prazos, a gravação em lote e a
+reconciliação com o banco.
+"""
+import json
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+from services.stock_ledger import (
+    _HINCRBY_IF_EXISTS,
+    _RECONCILE,
+    _RESERVE,
+    _RESET_PENDING,
+    _SETTLE,
+    DEADLINES_KEY,
+    LEDGER_QUEUE_KEY,
+    STALE_PENDING_AFTER,
+    STOCK_KEY,
+    StockLedger,
+)
+from tests.mocks import MockRedis
+
+
+def _reserve(redis, keys, args):
+    """Equivalente em Python do script Lua de reserva"""
+    available = redis.hget(keys[0], "available")
+    if available is None:
+        return -2
+    quantity = int(args[0])
+    if int(available) < quantity:
+        return -1
+    redis.hincrby(keys[0], "available", -quantity)
+    redis.hincrby(keys[0], "reserved", quantity)
+    redis.hincrby(keys[0], "pending", 1)
+    redis.hincrby(keys[0], "seq", 1)
+    redis.hset(
+        keys[1],
+        mapping={"product_id": args[2], "quantity": quantity, "order_id": args[3], "status": "reserved", "expires_at": args[4]},
+    )
+    redis.zadd(keys[2], {args[1]: float(args[4])})
+    redis.lpush(keys[3], args[5])
+    return int(available) - quantity
+
+
+def _settle(redis, keys, args):
+    """Equivalente em Python do script Lua de finalização"""
+    status = redis.hget(keys[1], "status")
+    if status is None:
+        return -2
+    if status != "reserved":
+        return -1
+    if args[1] == "confirmed" and float(redis.hget(keys[1], "expires_at")) < float(args[3]):
+        return -3
+    quantity = int(redis.hget(keys[1], "quantity"))
+    if redis.exists(keys[0]):
+        redis.hincrby(keys[0], "reserved", -quantity)
+        if args[1] != "confirmed":
+            redis.hincrby(keys[0], "available", quantity)
+        redis.hincrby(keys[0], "pending", 1)
+        redis.hincrby(keys[0], "seq", 1)
+    redis.hset(keys[1], "status", args[1])
+    redis.zrem(keys[2], args[0])
+    redis.lpush(keys[3], args[2])
+    return quantity
+
+
+def _hincrby_if_exists(redis, keys, args):
+    if not redis.exists(keys[0]):
+        return None
+    if args[0] == "available":
+        redis.hincrby(keys[0], "seq", 1)
+    return redis.hincrby(keys[0], args[0], int(args[1]))
+
+
+def _reconcile(redis, keys, args):
+    seq, pending = redis.hmget(keys[0], ["seq", "pending"])
+    if seq is None or seq != args[0] or int(pending or 0) != 0:
+        return 0
+    redis.hset(keys[0], "available", args[1])
+    return 1
+
+
+def _reset_pending(redis, keys, args):
+    if redis.hget(keys[0], "seq") != args[0]:
+        return 0
+    redis.hset(keys[0], "pending", 0)
+    return 1
+
+
+@pytest.fixture
+def redis():
+    client = MockRedis()
+    for script, handler in (
+        (_RESERVE, _reserve),
+        (_SETTLE, _settle),
+        (_HINCRBY_IF_EXISTS, _hincrby_if_exists),
+        (_RECONCILE, _reconcile),
+        (_RESET_PENDING, _reset_pending),
+    ):
+        client.register_script_handler(script, handler)
+    with patch("services.stock_ledger.cache_service", Mock(redis_client=client)):
+        yield client
+
+
+@pytest.fixture
+def ledger(redis):
+    stock = StockLedger.__new__(StockLedger)
+    stock.logger = Mock()
+    stock.repo = Mock()
+    stock.repo.get_stock_levels.return_value = {"p1": 100}
+    stock.repo.apply_stock_events.return_value = {"success": True}
+    return stock
+
+
+def _queued(redis):
+    return [json.loads(task)["data"] for task in reversed(redis.lrange(LEDGER_QUEUE_KEY, 0, -1))]
+
+
+class TestStockLedger:
+    """Testes do StockLedger"""
+
+    def test_flash_sale_never_oversells(self, ledger, redis):
+        results = [ledger.reserve("p1", 1) for _ in range(150)]
+
+        assert sum(r["success"] for r in results) == 100
+        assert {r["error"] for r in results if not r["success"]} == {"Estoque insuficiente"}
+        assert redis.hgetall(STOCK_KEY.format(product_id="p1"))["available"] == "0"
+        assert redis.hgetall(STOCK_KEY.format(product_id="p1"))["reserved"] == "100"
+        assert len(_queued(redis)) == 100
+        ledger.repo.get_stock_levels.assert_called_once_with(["p1"])
+        ledger.repo.apply_stock_events.assert_not_called()
+
+        ledger.repo.get_stock_levels.return_value = {}
+        assert ledger.reserve("nao-existe", 1)["error"] == "Produto não encontrado"
+
+    def test_confirm_release_and_expiry(self, ledger, redis):
+        sold = ledger.reserve("p1", 3, order_id="o1")
+        released = ledger.reserve("p1", 2)
+        late = ledger.reserve("p1", 4, ttl=60)
+
+        assert ledger.confirm(sold["reservation_id"])["quantity"] == 3
+        assert ledger.release(released["reservation_id"])["success"] is True
+        assert ledger.release(released["reservation_id"])["error"] == "Reserva já finalizada"
+
+        # Só a reserva vencida é expirada; confirmar depois do prazo falha
+        assert ledger.expire_due(now=time.time() + 30) == 0
+        with patch("services.stock_ledger.time.time", return_value=time.time() + 120):
+            assert ledger.confirm(late["reservation_id"])["error"] == "Reserva expirada"
+        assert ledger.expire_due(now=time.time() + 120) == 1
+        assert redis.zcard(DEADLINES_KEY) == 0
+
+        counters = redis.hgetall(STOCK_KEY.format(product_id="p1"))
+        assert (counters["available"], counters["reserved"], counters["pending"]) == ("97", "0", "6")
+        assert [event["type"] for event in _queued(redis)] == [
+            "reserve",
+            "reserve",
+            "reserve",
+            "confirmed",
+            "cancelled",
+            "expired",
+        ]
+
+    def test_persist_and_reconcile(self, ledger, redis):
+        ledger.reserve("p1", 5)
+        key = STOCK_KEY.format(product_id="p1")
+
+        # Evento pendente: o banco ainda não tem a reserva
+        assert ledger.reconcile(["p1"]) == {"checked": 0, "corrected": 0, "skipped": 1, "reset": 0}
+
+        assert ledger.persist(_queued(redis)) == []
+        ledger.repo.apply_stock_events.assert_called_once()
+        assert redis.hget(key, "pending") == "0"
+
+        # Banco alterado por fora (ajuste manual): Redis volta a bater com o banco
+        ledger.repo.get_stock_levels.return_value = {"p1": 90}
+        assert ledger.reconcile(["p1"]) == {"checked": 1, "corrected": 1, "skipped": 0, "reset": 0}
+        assert redis.hget(key, "available") == "90"
+
+        ledger.repo.apply_stock_events.return_value = {"success": False, "error": "timeout"}
+        ledger.reserve("p1", 1)
+        assert ledger.persist(_queued(redis)[-1:]) == _queued(redis)[-1:]
+        assert redis.hget(key, "pending") == "1"
+
+    def test_persist_keeps_only_failed_events_pending(self, ledger, redis):
+        ledger.reserve("p1", 1)
+        ledger.reserve("p1", 2)
+        events = _queued(redis)
+        ledger.repo.apply_stock_events.return_value = {
+            "success": True,
+            "applied": 1,
+            "failed": [{"index": 1, "reservation_id": events[1]["reservation_id"], "error": "violates check"}],
+        }
+
+        assert ledger.persist(events) == [events[1]]
+        assert redis.hget(STOCK_KEY.format(product_id="p1"), "pending") == "1"
+
+    def test_worker_retries_only_the_poison_event(self, ledger, redis):
+        from workers.stock_ledger_worker import StockLedgerWorker
+
+        ledger.reserve("p1", 1)
+        ledger.reserve("p1", 2)
+        events = _queued(redis)
+        poison = {"index": 1, "reservation_id": events[1]["reservation_id"], "error": "violates check"}
+        ledger.repo.apply_stock_events.return_value = {"success": True, "applied": 1, "failed": [poison]}
+
+        worker = StockLedgerWorker.__new__(StockLedgerWorker)
+        worker.batch_size, worker.batches, worker.events, worker.failed_batches = 10, 0, 0, 0
+        worker.ledger, worker.alert_service = ledger, Mock()
+        worker.consumer_id = None
+        worker.queue_service = Mock()
+        worker.queue_service.claim_batch.return_value = [{"data": event, "attempts": 0} for event in events]
+        worker.queue_service.retry_failed_task.return_value = True
+
+        assert worker.run_once() == 2
+        retried = worker.queue_service.retry_failed_task.call_args_list
+        assert [call.args[1]["data"] for call in retried] == [events[1]]
+        assert (worker.events, worker.failed_batches) == (1, 1)
+        assert list(worker.alert_service.evaluate_async.call_args.args[0]) == ["p1"]
+        worker.queue_service.ack_tasks.assert_called_once_with(
+            "stock_ledger", worker.queue_service.claim_batch.return_value, None
+        )
+
+        # Tentativas esgotadas: o evento vai para a fila de falhas e deixa de contar como pendente
+        ledger.repo.apply_stock_events.return_value = {"success": True, "applied": 0, "failed": [dict(poison, index=0)]}
+        worker.queue_service.claim_batch.return_value = [{"data": events[1], "attempts": 3}]
+        worker.queue_service.retry_failed_task.return_value = False
+        worker.run_once()
+        assert redis.hget(STOCK_KEY.format(product_id="p1"), "pending") == "0"
+
+    def test_lost_events_stop_blocking_reconcile(self, ledger, redis):
+        ledger.reserve("p1", 5)
+        redis.delete(LEDGER_QUEUE_KEY)  # lote perdido: pending nunca volta a zero
+        ledger.repo.get_stock_levels.return_value = {"p1": 100}
+        key = STOCK_KEY.format(product_id="p1")
+
+        assert ledger.reconcile(["p1"], now=1000.0)["skipped"] == 1
+        assert ledger.reconcile(["p1"], now=1000.0 + STALE_PENDING_AFTER - 1)["reset"] == 0
+
+        # Evento novo reinicia a contagem
+        ledger.reserve("p1", 1)
+        redis.delete(LEDGER_QUEUE_KEY)
+        assert ledger.reconcile(["p1"], now=1000.0 + STALE_PENDING_AFTER)["reset"] == 0
+
+        stats = ledger.reconcile(["p1"], now=1000.0 + 2 * STALE_PENDING_AFTER)
+        assert (stats["reset"], redis.hget(key, "pending")) == (1, "0")
+        assert ledger.reconcile(["p1"])["corrected"] == 1
+        assert redis.hget(key, "available") == "100"
+
+    def test_sale_adjusts_loaded_products(self, ledger, redis):
+        ledger.reserve("p1", 1)
+        ledger.apply_sale([{"product_id": "p1", "quantity": 2}, {"product_id": "p2", "quantity": 1}])
+
+        assert redis.hget(STOCK_KEY.format(product_id="p1"), "available") == "97"
+        assert not redis.exists(STOCK_KEY.format(product_id="p2"))
+
+    def test_without_redis_reserves_in_database(self, ledger):
+        with patch("services.stock_ledger.cache_service", Mock(redis_client=None)):
+            ledger.repo.apply_stock_events.return_value = {"success": False, "error": "Estoque insuficiente"}
+            assert ledger.reserve("p1", 1)["error"] == "Estoque insuficiente"
+
+            ledger.repo.apply_stock_events.return_value = {"success": True, "applied": 1}
+            result = ledger.reserve("p1", 2, order_id="o1")
+
+        assert result["success"] is True
+        events = ledger.repo.apply_stock_events.call_args.args[0]
+        assert ledger.repo.apply_stock_events.call_args.kwargs == {"strict": True}
+        assert (events[0]["type"], events[0]["quantity"], events[0]["order_id"]) == ("reserve", 2, "o1")
+
+
+class TestInventoryServiceStock:
+    """Consulta de estoque pelo InventoryService"""
+
+    @pytest.fixture
+    def inventory(self, ledger):
+        from services.inventory_service import InventoryService
+
+        service = InventoryService.__new__(InventoryService)
+        service.logger = Mock()
+        service.repo = Mock()
+        service.repo.get_product_stock.return_value = {"id": "p1", "name": "Whey", "stock_quantity": 100}
+        service.ledger = ledger
+        return service
+
+    def test_ledger_level_wins_over_database(self, inventory, ledger, redis):
+        ledger.reserve("p1", 5)
+
+        result = inventory.get_product_stock("p1")
+        assert (result["stock_quantity"], result["reserved_quantity"], result["product_name"]) == (95, 5, "Whey")
+
+        # Leitura do produto no banco falhou: o saldo do livro continua valendo
+        inventory.repo.get_product_stock.return_value = None
+        assert inventory.get_product_stock("p1")["stock_quantity"] == 95
+        assert inventory.get_product_stock("p2") == {"success": False, "error": "Produto não encontrado"}
+
+    def test_restock_invalidates_cached_carts(self, inventory):
+        inventory.alerts = Mock()
+        inventory._log_stock_movement = Mock()
+        rpc = Mock(return_value={"success": True, "previous_stock": 0, "new_stock": 10})
+
+        with patch("config.database.supabase_client", Mock(rpc=rpc)), patch(
+            "services.inventory_service.cart_read_model"
+        ) as carts:
+            assert inventory.update_stock("p1", 10, operation="add")["success"] is True
+
+        carts.invalidate_product.assert_called_once_with("p1")
+        inventory.alerts.evaluate_async.assert_not_called()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Testes das Timelines RE-EDUCA Store.
+
+Testa o fan-out nas timelines materializadas, a mescla dos autores sem
+fan-out na leitura, a paginação por cursor e a hidratação em lote.
+"""
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+from repositories import base_repository
+from repositories.timeline_repository import TimelineRepository
+from services.timeline_service import (
+    _ADD_IF_EXISTS,
+    AUTHOR_KEY,
+    CELEBRITIES_KEY,
+    HOME_KEY,
+    TIMELINE_MAX,
+    TimelineService,
+    encode_cursor,
+)
+from tests.mocks import MockRedis
+
+
+def _add_if_exists(redis, keys, args):
+    """Equivalente em Python do script Lua de fan-out"""
+    added = 0
+    for key in keys:
+        if redis.exists(key):
+            redis.zadd(key, {args[1]: float(args[0])})
+            redis.zremrangebyrank(key, 0, -(int(args[2]) + 2))
+            added += 1
+    return added
+
+
+def _row(post_id, author, score):
+    return {"id": post_id, "user_id": author, "created_at": f"1970-01-01T00:00:00.{score:06d}+00:00"}
+
+
+@pytest.fixture
+def redis():
+    client = MockRedis()
+    client.register_script_handler(_ADD_IF_EXISTS, _add_if_exists)
+    with patch("services.timeline_service.cache_service", Mock(redis_client=client)):
+        yield client
+
+
+@pytest.fixture
+def counters():
+    with patch("services.timeline_service.social_counters") as social_counters:
+        social_counters.get_counters.return_value = {"followers": 10}
+        yield social_counters
+
+
+@pytest.fixture
+def service(redis, counters):
+    """TimelineService com repositórios mockados"""
+    timeline = TimelineService.__new__(TimelineService)
+    timeline.logger = Mock()
+    timeline.repo = Mock()
+    timeline.repo.get_following_ids.return_value = []
+    timeline.repo.find_posts_by_ids.side_effect = lambda ids: [{"id": post_id} for post_id in ids]
+    timeline.social_repo = Mock()
+    timeline.social_repo.enrich_posts.side_effect = lambda posts, viewer, refresh_counts: posts
+    return timeline
+
+
+def _page_ids(result):
+    return [post["id"] for post in result["posts"]]
+
+
+class TestTimelineService:
+    """Testes do TimelineService"""
+
+    def test_fan_out_only_updates_materialized_timelines(self, service, redis):
+        redis.zadd(HOME_KEY.format(user_id="active"), {"-": 0})
+        service.repo.get_follower_ids_page.return_value = ["active", "inactive"]
+
+        assert service.fan_out("p1", "author", 5) == 1
+
+        assert redis.zrange(HOME_KEY.format(user_id="active"), 0, -1) == ["-", "p1"]
+        assert not redis.exists(HOME_KEY.format(user_id="inactive"))
+
+    def test_celebrity_posts_are_merged_on_read(self, service, redis, counters):
+        counters.get_counters.return_value = {"followers": 1_000_000}
+        assert service.fan_out("c1", "star", 15) == 0
+        service.repo.get_follower_ids_page.assert_not_called()
+        assert redis.sismember(CELEBRITIES_KEY, "star")
+
+        service.repo.get_following_ids.return_value = ["friend", "star"]
+        service.repo.get_home_timeline_ids.return_value = [_row("f1", "friend", 20), _row("f2", "friend", 10)]
+        service.repo.get_author_post_ids.return_value = [_row("c1", "star", 15)]
+
+        result = service.get_home_feed("viewer", limit=10)
+
+        assert _page_ids(result) == ["f1", "c1", "f2"]
+        assert result["next_cursor"] is None
+        assert service.repo.get_home_timeline_ids.call_args.kwargs["exclude_authors"] == ["star"]
+
+    def test_cursor_pagination_is_stable_with_equal_timestamps(self, service, redis):
+        redis.zadd(HOME_KEY.format(user_id="viewer"), {"-": 0, "a": 30, "b": 20, "c": 20, "d": 20, "e": 10})
+
+        pages, cursor = [], None
+        while True:
+            result = service.get_home_feed("viewer", cursor=cursor, limit=2)
+            pages.append(_page_ids(result))
+            cursor = result["next_cursor"]
+            if not cursor:
+                break
+
+        assert pages == [["a", "d"], ["c", "b"], ["e"]]
+        assert encode_cursor(20, "d") == "20_d"
+        service.repo.get_home_timeline_ids.assert_not_called()
+
+    def test_cold_timeline_is_rebuilt_once_from_db(self, service, redis):
+        service.repo.get_home_timeline_ids.return_value = []
+
+        assert service.get_home_feed("new_user")["posts"] == []
+        service.get_home_feed("new_user")
+
+        assert service.repo.get_home_timeline_ids.call_count == 1
+        assert service.repo.get_home_timeline_ids.call_args.args == ("new_user", TIMELINE_MAX)
+
+    def test_hydration_drops_deleted_posts(self, service, redis):
+        redis.zadd(HOME_KEY.format(user_id="viewer"), {"-": 0, "p1": 2, "gone": 1})
+        service.repo.find_posts_by_ids.side_effect = lambda ids: [{"id": "p1"}]
+
+        result = service.get_home_feed("viewer")
+
+        assert _page_ids(result) == ["p1"]
+        assert redis.zrange(HOME_KEY.format(user_id="viewer"), 0, -1) == ["-", "p1"]
+
+    def test_unfollow_removes_author_posts(self, service, redis):
+        redis.zadd(HOME_KEY.format(user_id="viewer"), {"-": 0, "x1": 2, "y1": 1})
+        redis.zadd(AUTHOR_KEY.format(user_id="x"), {"-": 0, "x1": 2})
+
+        service.on_unfollow("viewer", "x")
+
+        assert redis.zrange(HOME_KEY.format(user_id="viewer"), 0, -1) == ["-", "y1"]
+
+
+class TestFindByIds:
+    """Testes da busca em lote com cache L1/L2"""
+
+    def test_reads_cache_layers_before_db(self):
+        repo = TimelineRepository()
+        query = MagicMock()
+        query.select.return_value = query
+        query.in_.return_value = query
+        query.execute.return_value = Mock(data=[{"id": "db"}])
+        repo.db = Mock(table=Mock(return_value=query))
+        cache = Mock()
+        cache.get_many.return_value = {"posts:card:id:l2": {"id": "l2"}}
+
+        with patch.dict(base_repository._cache, {"posts:card:id:l1": {"id": "l1"}}), patch.dict(
+            base_repository._cache_ttl, {"posts:card:id:l1": float("inf")}
+        ), patch.object(base_repository, "cache_service", cache):
+            posts = repo.find_posts_by_ids(["db", "l1", "l2", "missing"])
+
+        assert [post["id"] for post in posts] == ["db", "l1", "l2"]
+        cache.get_many.assert_called_once_with(["posts:card:id:db", "posts:card:id:l2", "posts:card:id:missing"])
+        query.in_.assert_called_once_with("id", ["db", "missing"])
+        cache.set_many.assert_called_once_with({"posts:card:id:db": {"id": "db"}}, ttl=60)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da Base Local de Alimentos USDA RE-EDUCA Store.
+
+Testa a importação dos dumps, a busca por prefixo/trigramas e o fallback
+da API USDA com cache no HealthService.
+"""
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+from services.health_service import USDA_BACKOFF_KEY, HealthService
+from services.usda_food_store import UsdaFoodStore, normalize_text, read_usda_csv, read_usda_json, write_food_store
+
+FOODS = [
+    (171705, "Bananas, raw", "Fruits and Fruit Juices", {1008: 89, 1003: 1.09, 1005: 22.84, 1004: 0.33, 1079: 2.6}),
+    (169736, "Banana chips", "Snacks", {1008: 519, 1003: 2.3, 1004: 33.6}),
+    (173944, "Bread, banana, prepared from recipe", "Baked Products", {1008: 326}),
+    (171688, "Apples, raw, with skin", "Fruits and Fruit Juices", {2047: 61, 1003: 0.17}),
+    (168191, "Açaí berry, frozen pulp", None, {1008: 70}),
+]
+
+
+def _write_csv_dump(directory):
+    directory.mkdir()
+    (directory / "food_category.csv").write_text(
+        'id,code,description\n9,0900,"Fruits and Fruit Juices"\n18,1800,"Baked Products"\n25,2500,"Snacks"\n'
+    )
+    category_ids = {"Fruits and Fruit Juices": 9, "Baked Products": 18, "Snacks": 25, None: ""}
+    food_lines = ["fdc_id,data_type,description,food_category_id,publication_date"]
+    nutrient_lines = ["id,fdc_id,nutrient_id,amount"]
+    for fdc_id, name, category, amounts in FOODS:
+        food_lines.append(f'{fdc_id},sr_legacy_food,"{name}",{category_ids[category]},2019-04-01')
+        for nutrient_id, amount in amounts.items():
+            nutrient_lines.append(f"{len(nutrient_lines)},{fdc_id},{nutrient_id},{amount}")
+    food_lines.append('999999,branded_food,"Banana Brand Cereal",,2020-01-01')
+    (directory / "food.csv").write_text("\n".join(food_lines) + "\n", encoding="utf-8")
+    (directory / "food_nutrient.csv").write_text("\n".join(nutrient_lines) + "\n")
+
+
+@pytest.fixture
+def food_store(tmp_path):
+    """Base local construída a partir de um dump CSV mínimo"""
+    _write_csv_dump(tmp_path / "csv")
+    store_dir = tmp_path / "store"
+    assert write_food_store(read_usda_csv(str(tmp_path / "csv")), str(store_dir)) == len(FOODS)
+    return UsdaFoodStore(str(store_dir))
+
+
+class TestUsdaFoodStore:
+    """Testes da importação e da busca local"""
+
+    def test_prefix_search_ranks_names_starting_with_query(self, food_store):
+        results = food_store.search("banan")
+
+        assert [food["fdc_id"] for food in results] == [169736, 171705, 173944]
+        assert all(food["fdc_id"] != 999999 for food in results)  # branded não é importado
+
+    def test_multi_word_prefix_and_accents(self, food_store):
+        assert [food["name"] for food in food_store.search("raw app")] == ["Apples, raw, with skin"]
+        assert food_store.search("acai")[0]["fdc_id"] == 168191
+
+    def test_trigram_fallback_tolerates_typos(self, food_store):
+        results = food_store.search("bannana")
+
+        assert results and results[0]["name"].startswith("Banana")
+
+    def test_get_returns_per_100g_vector(self, food_store):
+        food = food_store.get(171705)
+
+        assert food["calories"] == 89.0
+        assert food["carbs"] == 22.8
+        assert food["category"] == "Fruits and Fruit Juices"
+        assert food["nutrients"]["Protein"] == {"value": pytest.approx(1.09), "unit": "G", "id": 1003}
+        assert (food["serving_size"], food["serving_unit"]) == (100, "g")
+        assert food_store.get(1) is None
+
+    def test_energy_falls_back_to_atwater(self, food_store):
+        assert food_store.get(171688)["calories"] == 61.0
+
+    def test_reads_json_dump(self, tmp_path):
+        path = tmp_path / "foundation.json"
+        path.write_text(
+            json.dumps(
+                {
+                    "FoundationFoods": [
+                        {
+                            "fdcId": 2346389,
+                            "description": "Oats, whole grain, rolled",
+                            "foodCategory": {"description": "Cereal Grains and Pasta"},
+                            "foodNutrients": [
+                                {"nutrient": {"id": 2048, "name": "Energy (Atwater Specific Factors)"}, "amount": 382},
+                                {"nutrient": {"id": 1003, "name": "Protein"}, "amount": 13.5},
+                            ],
+                        }
+                    ]
+                }
+            )
+        )
+        write_food_store(read_usda_json(str(path)), str(tmp_path / "store"))
+
+        food = UsdaFoodStore(str(tmp_path / "store")).search("oats")[0]
+
+        assert food["calories"] == 382.0
+        assert food["category"] == "Cereal Grains and Pasta"
+
+    def test_normalize_text(self):
+        assert normalize_text("  Pão de Açúcar, 100%!") == "pao de acucar 100"
+
+
+class TestHealthServiceFoodSearch:
+    """Testes do HealthService usando a base local e o fallback da API"""
+
+    @pytest.fixture
+    def health_service(self):
+        service = HealthService.__new__(HealthService)
+        service.logger = Mock()
+        service.config = Mock(USDA_BASE_URL="https://api.example", USDA_API_KEY="key")
+        return service
+
+    def test_search_uses_local_store_without_network(self, health_service, food_store):
+        with patch("services.health_service.get_food_store", return_value=food_store), patch(
+            "services.health_service.requests.get"
+        ) as mock_get:
+            foods = health_service.search_foods("bananas")
+
+        assert foods[0]["fdc_id"] == 171705
+        mock_get.assert_not_called()
+
+    def test_api_fallback_is_cached(self, health_service):
+        response = Mock(status_code=200)
+        response.json.return_value = {"foods": [{"fdcId": 1, "description": "Tofu", "foodNutrients": []}]}
+        cache = Mock()
+        cache.get.return_value = None
+
+        with patch("services.health_service.get_food_store", return_value=None), patch(
+            "services.health_service.cache_service", cache
+        ), patch("services.health_service.requests.get", return_value=response):
+            foods = health_service.search_foods("Tofu")
+
+        assert foods[0]["name"] == "Tofu"
+        cache.set.assert_called_once()
+        assert cache.set.call_args[0][0] == "usda:search:tofu"
+
+    def test_rate_limit_sets_backoff_and_skips_api(self, health_service):
+        cache = Mock()
+        cache.get.return_value = None
+        limited = Mock(status_code=429, headers={"Retry-After": "120"})
+
+        with patch("services.health_service.get_food_store", return_value=None), patch(
+            "services.health_service.cache_service", cache
+        ), patch("services.health_service.requests.get", return_value=limited):
+            assert health_service.get_food_details(42) is None
+
+        cache.set.assert_called_once_with(USDA_BACKOFF_KEY, True, ttl=120)
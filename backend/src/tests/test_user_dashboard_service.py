@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Testes Unitários para UserDashboardService RE-EDUCA Store.
+
+Testa os sumários calculados a partir dos rollups diários de saúde.
+"""
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+import pytest
+from services.user_dashboard_service import UserDashboardService
+
+
+@pytest.fixture
+def dashboard_service():
+    """UserDashboardService com repositório de rollups mockado"""
+    service = UserDashboardService.__new__(UserDashboardService)
+    service.db = Mock()
+    service.rollup_repo = Mock()
+    return service
+
+
+def _day(offset: int) -> str:
+    return (datetime.now().date() - timedelta(days=offset)).isoformat()
+
+
+class TestDashboardRollups:
+    """Testes dos sumários do dashboard"""
+
+    def test_workout_summary_aggregates_week(self, dashboard_service):
+        dashboard_service.rollup_repo.find_by_range.return_value = [
+            {
+                "day": _day(1),
+                "exercise_entries": 2,
+                "exercise_minutes": 60,
+                "calories_out": 400,
+                "exercise_counts": {"Corrida": 1, "Yoga": 1},
+            },
+            {
+                "day": _day(0),
+                "exercise_entries": 1,
+                "exercise_minutes": 30,
+                "calories_out": 250.5,
+                "exercise_counts": {"Corrida": 1},
+            },
+        ]
+
+        summary = dashboard_service._get_workout_summary("user-1")
+
+        assert summary == {
+            "total_workouts": 3,
+            "total_minutes": 90,
+            "total_calories": 650.5,
+            "favorite_exercise": "Corrida",
+        }
+
+    def test_nutrition_summary_without_rollup(self, dashboard_service):
+        dashboard_service.rollup_repo.find_by_day.return_value = None
+
+        assert dashboard_service._get_nutrition_summary("user-1")["calories"] == 0
+
+    def test_streak_reads_engine_stats(self, dashboard_service):
+        with patch("services.user_dashboard_service.gamification_engine") as engine:
+            engine.get_stats.return_value = {"current_streak": 2}
+
+            assert dashboard_service._calculate_streak("user-1") == 2
+
+        engine.get_stats.assert_called_once_with("user-1")
+        dashboard_service.rollup_repo.find_by_range.assert_not_called()
@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""
+Testes da Entrada Assíncrona de Webhooks RE-EDUCA Store.
+
+Testa o enfileiramento idempotente (retries do provider descartados no
+Redis), a partição por pedido, o processamento em lote com uma gravação
+por lote e a ordem dos eventos de um mesmo pedido quando algo falha.
+"""
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+from flask import Flask
+from routes.payments import payments_bp
+from services.queue_service import _CLAIM, RedisQueueService
+from services.webhook_inbox import _INGEST, WebhookInbox, partition_for, partition_queue
+from services.webhook_processor import WebhookProcessor
+from tests.mocks import MockRedis, claim_batch_handler
+from workers.webhook_worker import WebhookWorker
+
+
+def _ingest(redis, keys, args):
+    """Equivalente em Python do script Lua de entrada"""
+    if not redis.set(keys[0], "1", ex=int(args[0]), nx=True):
+        return 0
+    redis.lpush(keys[1], args[1])
+    return 1
+
+
+def _event(event_id, event_type, order_id=None, provider="stripe", **payload):
+    if order_id:
+        payload["metadata"] = {"order_id": order_id}
+    return {
+        "provider": provider,
+        "event_id": event_id,
+        "event_type": event_type,
+        "ordering_key": order_id or event_id,
+        "payload": payload,
+        "received_at": 0,
+    }
+
+
+@pytest.fixture
+def redis():
+    client = MockRedis()
+    client.register_script_handler(_INGEST, _ingest)
+    with patch("services.webhook_inbox.cache_service", Mock(redis_client=client)):
+        yield client
+
+
+@pytest.fixture
+def processor():
+    webhook_processor = WebhookProcessor.__new__(WebhookProcessor)
+    webhook_processor.logger = Mock()
+    webhook_processor.order_repo = Mock()
+    webhook_processor.order_repo.apply_payment_webhooks.return_value = {
+        "success": True,
+        "paid": [{"order_id": "o1", "user_id": "u1"}],
+    }
+    webhook_processor.payment_service = Mock()
+    webhook_processor.payment_service.handle_stripe_webhook_event.return_value = {"success": True}
+    webhook_processor._affiliate_service = Mock()
+    return webhook_processor
+
+
+class TestWebhookInbox:
+    """Testes do enfileiramento"""
+
+    def test_provider_retries_are_deduplicated(self, redis):
+        inbox = WebhookInbox()
+        payload = {"id": "pi_1", "metadata": {"order_id": "o1"}}
+
+        first = inbox.ingest("stripe", "evt_1", "payment_intent.succeeded", payload, ordering_key="o1")
+        retry = inbox.ingest("stripe", "evt_1", "payment_intent.succeeded", payload, ordering_key="o1")
+        inbox.ingest("stripe", "evt_2", "charge.succeeded", payload, ordering_key="o1")
+
+        assert (first["duplicate"], retry["duplicate"]) == (False, True)
+        # Eventos do mesmo pedido vão para a mesma fila, na ordem de chegada
+        queue = f"{partition_queue(partition_for('o1'))}_priority_1"
+        tasks = [json.loads(task) for task in reversed(redis.lrange(queue, 0, -1))]
+        assert [task["data"]["event_id"] for task in tasks] == ["evt_1", "evt_2"]
+        assert tasks[0]["data"]["payload"] == payload
+
+        inbox.forget("stripe", "evt_1")
+        assert inbox.ingest("stripe", "evt_1", "payment_intent.succeeded", payload)["duplicate"] is False
+
+    def test_without_redis_reports_unavailable(self):
+        with patch("services.webhook_inbox.cache_service", Mock(redis_client=None)):
+            assert WebhookInbox().ingest("pagseguro", "n1", "transaction", {})["success"] is False
+
+
+class TestWebhookRoutes:
+    """Testes das rotas de entrada"""
+
+    @pytest.fixture
+    def client(self, redis, monkeypatch):
+        monkeypatch.setenv("STRIPE_WEBHOOK_SECRET", "whsec_test")
+        app = Flask(__name__)
+        app.register_blueprint(payments_bp, url_prefix="/api/payments")
+        return app.test_client()
+
+    def test_stripe_webhook_is_queued_and_acknowledged(self, client, redis):
+        event = {
+            "id": "evt_1",
+            "type": "payment_intent.succeeded",
+            "data": {"object": {"id": "pi_1", "metadata": {"order_id": "o1"}}},
+        }
+
+        with patch("routes.payments.stripe.Webhook.construct_event", return_value=event), patch(
+            "routes.payments.payment_service"
+        ) as payment_service:
+            response = client.post("/api/payments/webhooks/stripe", data="{}", headers={"Stripe-Signature": "t=1"})
+            retry = client.post("/api/payments/webhooks/stripe", data="{}", headers={"Stripe-Signature": "t=1"})
+
+        assert (response.status_code, response.get_json()) == (200, {"received": True})
+        assert retry.status_code == 200
+        payment_service.handle_stripe_webhook_event.assert_not_called()
+        queue = f"{partition_queue(partition_for('o1'))}_priority_1"
+        assert [json.loads(task)["data"]["event_id"] for task in redis.lrange(queue, 0, -1)] == ["evt_1"]
+
+    def test_pagseguro_notifications_are_validated_and_queued_by_code(self, client, redis):
+        code = "766B9C-AD4B044B04DA-77742F5FA653-E1AB24"
+        response = client.post(
+            "/api/payments/pagseguro/notification?reference=o7",
+            data={"notificationCode": code, "notificationType": "transaction"},
+        )
+        forged = client.post(
+            "/api/payments/pagseguro/notification",
+            data={"notificationCode": "n1", "notificationType": "transaction"},
+        )
+
+        assert (response.status_code, forged.status_code) == (200, 400)
+        # A chave vem da transação consultada no worker, não da URL
+        queue = f"{partition_queue(partition_for(code))}_priority_1"
+        tasks = [json.loads(task)["data"] for task in redis.lrange(queue, 0, -1)]
+        assert [(task["event_id"], task["ordering_key"]) for task in tasks] == [(code, code)]
+
+
+class TestWebhookProcessor:
+    """Testes do processamento em lote"""
+
+    def test_payment_events_are_written_in_one_batch(self, processor):
+        events = [
+            _event("evt_1", "payment_intent.payment_failed", "o1", id="pi_1"),
+            _event("evt_2", "customer.subscription.updated", id="sub_1"),
+            _event("evt_3", "payment_intent.succeeded", "o1", id="pi_2"),
+            _event("evt_4", "charge.failed", "o2", payment_intent="pi_3"),
+        ]
+
+        with patch("services.webhook_processor.gamification_engine") as gamification:
+            assert processor.process(events) == []
+
+        rows = processor.order_repo.apply_payment_webhooks.call_args.args[0]
+        assert [(row["webhook_id"], row["order_id"], row["payment_status"]) for row in rows] == [
+            ("evt_1", "o1", "failed"),
+            ("evt_3", "o1", "paid"),
+            ("evt_4", "o2", "failed"),
+        ]
+        assert rows[2]["transaction_id"] == "pi_3"
+        processor.payment_service.handle_stripe_webhook_event.assert_called_once_with(
+            "customer.subscription.updated", {"id": "sub_1"}, "evt_2"
+        )
+        gamification.publish.assert_called_once_with("u1", "order_paid", "o1")
+
+    def test_failure_holds_back_later_events_of_same_order(self, processor):
+        processor.payment_service.fetch_pagseguro_transaction.side_effect = [
+            {"success": False, "error": "timeout"},
+            {"success": True, "transaction_id": "t2", "status": "3", "reference": "o2"},
+        ]
+        events = [
+            _event("n1", "transaction", provider="pagseguro"),
+            _event("n2", "transaction", provider="pagseguro"),
+            _event("s1", "sale.created", provider="kiwify"),
+        ]
+        events[0]["ordering_key"] = events[2]["ordering_key"] = "k1"
+        processor._affiliate_service.track_kiwify_sale.return_value = {"success": True}
+
+        failed = processor.process(events)
+
+        # n1 falhou: s1 (mesma chave) volta junto; n2 segue
+        assert [event["event_id"] for event in failed] == ["n1", "s1"]
+        processor._affiliate_service.track_kiwify_sale.assert_not_called()
+        rows = processor.order_repo.apply_payment_webhooks.call_args.args[0]
+        assert [(row["order_id"], row["payment_status"], row["order_status"]) for row in rows] == [
+            ("o2", "paid", "processing")
+        ]
+        assert (rows[0]["ordering_key"], events[1]["ordering_key"]) == ("o2", "o2")
+
+        processor.order_repo.apply_payment_webhooks.return_value = {"success": False, "error": "timeout"}
+        processor.payment_service.fetch_pagseguro_transaction.side_effect = None
+        processor.payment_service.fetch_pagseguro_transaction.return_value = {
+            "success": True,
+            "transaction_id": "t2",
+            "status": "7",
+            "reference": "o2",
+        }
+        assert [event["event_id"] for event in processor.process(events[1:2])] == ["n2"]
+
+    def test_only_events_rejected_by_the_batch_are_retried(self, processor):
+        processor.order_repo.apply_payment_webhooks.return_value = {
+            "success": True,
+            "paid": [],
+            "skipped": [{"index": 2, "webhook_id": "evt_3", "reason": "invalid_order_id"}],
+            "failed": [{"index": 0, "webhook_id": "evt_1", "error": "deadlock detected"}],
+        }
+        events = [
+            _event("evt_1", "payment_intent.succeeded", "o1", id="pi_1"),
+            _event("evt_2", "payment_intent.succeeded", "o2", id="pi_2"),
+            _event("evt_3", "payment_intent.succeeded", "pedido-123", id="pi_3"),
+        ]
+
+        assert [event["event_id"] for event in processor.process(events)] == ["evt_1"]
+        rows = processor.order_repo.apply_payment_webhooks.call_args.args[0]
+        assert [row["ordering_key"] for row in rows] == ["o1", "o2", "pedido-123"]
+
+    def test_refunds_also_update_the_order_status(self, processor):
+        processor.payment_service.fetch_pagseguro_transaction.return_value = {
+            "success": True,
+            "transaction_id": "t1",
+            "status": "6",
+            "reference": "o1",
+        }
+        events = [_event("evt_1", "charge.refunded", "o2", payment_intent="pi_1"), _event("n1", "transaction", provider="pagseguro")]
+
+        assert processor.process(events) == []
+
+        rows = processor.order_repo.apply_payment_webhooks.call_args.args[0]
+        assert [(row["order_id"], row["payment_status"], row["order_status"]) for row in rows] == [
+            ("o2", "refunded", "refunded"),
+            ("o1", "refunded", "refunded"),
+        ]
+
+
+def _worker(processor, queue_service):
+    worker = WebhookWorker.__new__(WebhookWorker)
+    worker.partitions = [0]
+    worker.batch_size = 100
+    worker.processor = processor
+    worker.inbox = Mock()
+    worker.inbox.blockers.return_value = {}
+    worker.queue_service = queue_service
+    worker.processed = worker.retried = worker.dropped = worker.held = 0
+    worker.max_lag = 0.0
+    return worker
+
+
+class TestWebhookWorker:
+    """Testes do worker"""
+
+    def test_failed_events_are_retried_or_released(self, processor):
+        worker = _worker(processor, Mock())
+        worker.queue_service.retry_failed_task.side_effect = [True, False]
+        processor.payment_service.handle_stripe_webhook_event.return_value = {"success": False}
+        tasks = [{"id": str(i), "data": _event(f"evt_{i}", "invoice.paid")} for i in range(3)]
+        tasks[2]["data"]["event_type"] = "payment_intent.succeeded"
+        worker.queue_service.claim_batch.return_value = tasks
+
+        assert worker.run_once() == 3
+
+        assert (worker.processed, worker.retried, worker.dropped) == (1, 1, 1)
+        worker.inbox.forget.assert_called_once_with("stripe", "evt_1")
+        worker.queue_service.ack_tasks.assert_called_once_with(partition_queue(0), tasks)
+
+    def test_events_are_kept_until_the_batch_is_written(self, redis, processor):
+        redis.register_script_handler(_CLAIM, claim_batch_handler)
+        queue_service = RedisQueueService.__new__(RedisQueueService)
+        queue_service.redis_client = redis
+        worker = _worker(processor, queue_service)
+        worker.partitions = [partition_for("o1")]
+        queue = partition_queue(partition_for("o1"))
+        for event_id in ("evt_1", "evt_2"):
+            WebhookInbox().ingest("stripe", event_id, "payment_intent.succeeded", {"id": "pi_1"}, ordering_key="o1")
+
+        # Worker cai no meio do lote: nada foi confirmado
+        processor.order_repo.apply_payment_webhooks.side_effect = ConnectionError("conexão perdida")
+        with pytest.raises(ConnectionError):
+            worker.processor.process([task["data"] for task in queue_service.claim_batch(queue)])
+        assert redis.llen(f"{queue}_processing") == 2
+
+        processor.order_repo.apply_payment_webhooks.side_effect = None
+        assert queue_service.requeue_unacked(queue) == 2
+        with patch("services.webhook_processor.gamification_engine"):
+            assert worker.run_once() == 2
+
+        rows = processor.order_repo.apply_payment_webhooks.call_args.args[0]
+        assert [row["webhook_id"] for row in rows] == ["evt_1", "evt_2"]
+        assert redis.llen(f"{queue}_processing") == 0 and redis.llen(f"{queue}_priority_1") == 0
+
+    def test_failed_event_holds_its_order_until_written(self, redis, processor):
+        redis.register_script_handler(_CLAIM, claim_batch_handler)
+        queue_service = RedisQueueService.__new__(RedisQueueService)
+        queue_service.redis_client = redis
+        worker = _worker(processor, queue_service)
+        worker.inbox = WebhookInbox()
+        worker.partitions = [partition_for("o1")]
+        queue = partition_queue(partition_for("o1"))
+        inbox = WebhookInbox()
+        inbox.ingest("stripe", "evt_1", "payment_intent.payment_failed", {"metadata": {"order_id": "o1"}}, "o1")
+        inbox.ingest("stripe", "evt_2", "payment_intent.succeeded", {"metadata": {"order_id": "o1"}}, "o1")
+
+        # evt_1 falha: evt_2 (mesmo pedido) espera sem gastar tentativa
+        processor.order_repo.apply_payment_webhooks.return_value = {
+            "success": True,
+            "failed": [{"index": 0, "error": "timeout"}, {"index": 1, "error": "held"}],
+        }
+        assert worker.run_once() == 2
+        assert (worker.retried, worker.held) == (1, 1)
+        assert json.loads(redis.lrange("webhooks:held:o1", 0, -1)[0])["attempts"] == 0
+        assert redis.llen(f"{queue}_priority_1") == 0 and redis.llen(f"{queue}_processing") == 0
+
+        # Evento novo do pedido chega antes do retry de evt_1: também espera
+        inbox.ingest("stripe", "evt_3", "charge.refunded", {"metadata": {"order_id": "o1"}}, "o1")
+        processor.order_repo.apply_payment_webhooks.reset_mock()
+        assert worker.run_once() == 1
+        processor.order_repo.apply_payment_webhooks.assert_not_called()
+
+        # Retry de evt_1 gravado: os eventos em espera voltam, na ordem, sem tentativa a mais
+        redis.zadd(f"{queue}_delayed", {member: 0 for member in redis.zrange(f"{queue}_delayed", 0, -1)})
+        processor.order_repo.apply_payment_webhooks.return_value = {"success": True, "paid": []}
+        with patch("services.webhook_processor.gamification_engine"):
+            assert worker.run_once() == 1
+            assert worker.run_once() == 2
+        rows = processor.order_repo.apply_payment_webhooks.call_args.args[0]
+        assert [row["webhook_id"] for row in rows] == ["evt_2", "evt_3"]
+        assert not redis.exists("webhooks:block:o1", "webhooks:held:o1")
+
+    def test_retries_keep_their_attempt_count(self, redis):
+        queue_service = RedisQueueService.__new__(RedisQueueService)
+        queue_service.redis_client = redis
+        task = {"id": "t1", "data": {}, "priority": 1, "attempts": 0, "max_attempts": 2, "receipt": "{}"}
+
+        assert queue_service.retry_failed_task("q", task) is True
+        retried = json.loads(redis.zrange("q_delayed", 0, -1)[0])
+        assert (retried["attempts"], "receipt" in retried) == (1, False)
+
+        assert queue_service.retry_failed_task("q", retried) is False
+        assert json.loads(redis.lrange("q_failed", 0, -1)[0])["attempts"] == 2
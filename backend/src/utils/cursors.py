@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Cursores de Paginação Keyset RE-EDUCA Store.
+
+Cursor opaco "{created_us}_{id}" usado por timelines, feed, notificações e
+mensagens: created_at em microssegundos UTC (mesma precisão do banco, para o
+cursor ser exato também nas leituras pelo banco) e o id como desempate.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Tuple
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_score(created_at: Any) -> int:
+    """Converte created_at (ISO ou datetime) em microssegundos UTC (aritmética inteira)"""
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return (created_at - EPOCH) // timedelta(microseconds=1)
+
+
+def score_to_iso(score: int) -> str:
+    """Converte microssegundos UTC (to_score) de volta em data ISO para filtros no banco"""
+    return (EPOCH + timedelta(microseconds=int(score))).isoformat()
+
+
+def encode_cursor(score: int, item_id: str) -> str:
+    """Cursor opaco da próxima página"""
+    return f"{int(score)}_{item_id}"
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[int, str]]:
+    """
+    Decodifica o cursor recebido do cliente.
+
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    if not cursor:
+        return None
+    score, _, item_id = cursor.partition("_")
+    if not item_id or not score.isdigit():
+        raise ValueError("Cursor inválido")
+    return int(score), item_id
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Worker de Mensagens Diretas RE-EDUCA Store.
+
+Grava em lotes as mensagens enviadas por MessagesService.send_message
+(write-behind): consome a fila direct_messages e grava cada lote com
+insert_direct_messages (migração 040), que também atualiza o índice de
+conversas uma vez por lote. Lotes que falham voltam para a fila com retry;
+mensagens já gravadas são ignoradas pelo banco.
+
+As mensagens já foram confirmadas ao remetente: as retiradas ficam na lista
+de processamento da instância até o lote ser gravado (claim_batch/ack_tasks)
+e, se o worker cair antes, voltam para a fila quando ele reinicia.
+
+Uso:
+    python -m workers.direct_message_worker [batch_size] [consumer_id]
+"""
+import logging
+import os
+import signal
+import time
+from datetime import datetime
+from typing import Optional
+
+from services.messages_service import MessagesService
+from services.queue_service import QueueNames, RedisQueueService
+
+logger = logging.getLogger(__name__)
+
+
+class DirectMessageWorker:
+    """
+    Worker de gravação de mensagens diretas em lote.
+
+    Pode rodar em mais de uma instância: cada lote é retirado da fila de
+    forma atômica e cada mensagem é gravada uma única vez. Cada instância
+    precisa de um consumer_id próprio e estável entre reinícios.
+    """
+
+    def __init__(self, batch_size: int = 200, idle_sleep: float = 0.2, consumer_id: Optional[str] = None):
+        """
+        Inicializa o worker de mensagens.
+
+        Args:
+            batch_size: Mensagens por lote
+            idle_sleep: Espera quando a fila está vazia (segundos); define o
+                atraso máximo até a mensagem aparecer no histórico
+            consumer_id: ID da instância (padrão: WORKER_ID)
+        """
+        self.batch_size = batch_size
+        self.idle_sleep = idle_sleep
+        self.consumer_id = consumer_id or os.environ.get("WORKER_ID")
+        self.queue_service = RedisQueueService()
+        self.messages_service = MessagesService()
+        self.running = False
+        self.last_run = 0.0
+        self.batches = 0
+        self.messages = 0
+        self.failed_batches = 0
+
+        # Configura signal handlers para graceful shutdown
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+    def _signal_handler(self, signum, frame):
+        """Handler para signals de shutdown"""
+        logger.info(f"DirectMessageWorker recebeu signal {signum}, iniciando shutdown...")
+        self.stop()
+
+    def start(self):
+        """Inicia o loop de gravação"""
+        if not self.queue_service.is_connected():
+            logger.error("Redis não está conectado, não é possível iniciar o worker")
+            return
+
+        logger.info(f"DirectMessageWorker iniciando (lote: {self.batch_size})")
+        # Mensagens retiradas por uma execução anterior que caiu antes do ack
+        self.queue_service.requeue_unacked(QueueNames.DIRECT_MESSAGES, self.consumer_id)
+        self.running = True
+
+        try:
+            while self.running:
+                # Fila vazia ou lote parcial: espera acumular mensagens
+                if self.run_once() < self.batch_size and self.running:
+                    time.sleep(self.idle_sleep)
+
+        except KeyboardInterrupt:
+            logger.info("DirectMessageWorker interrompido pelo usuário")
+        except Exception as e:
+            logger.error(f"Erro no DirectMessageWorker: {e}", exc_info=True)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Para o worker"""
+        logger.info("DirectMessageWorker parando...")
+        self.running = False
+
+    def run_once(self) -> int:
+        """
+        Grava um lote da fila.
+
+        Returns:
+            Número de mensagens retiradas da fila
+        """
+        self.last_run = time.time()
+        tasks = self.queue_service.claim_batch(QueueNames.DIRECT_MESSAGES, self.batch_size, self.consumer_id)
+        if not tasks:
+            return 0
+
+        try:
+            persisted = self.messages_service.persist_messages(task["data"] for task in tasks)
+        except Exception as e:
+            logger.error(f"Erro ao gravar mensagens diretas: {e}", exc_info=True)
+            persisted = False
+
+        if persisted:
+            self.batches += 1
+            self.messages += len(tasks)
+        else:
+            self.failed_batches += 1
+            for task in tasks:
+                self.queue_service.retry_failed_task(QueueNames.DIRECT_MESSAGES, task)
+        # Só depois da gravação (ou dos retries já recolocados na fila)
+        self.queue_service.ack_tasks(QueueNames.DIRECT_MESSAGES, tasks, self.consumer_id)
+        return len(tasks)
+
+    def get_stats(self) -> dict:
+        """Retorna estatísticas do worker"""
+        return {
+            "worker_id": "direct_message_worker",
+            "running": self.running,
+            "batches": self.batches,
+            "messages": self.messages,
+            "failed_batches": self.failed_batches,
+            "last_run": datetime.utcfromtimestamp(self.last_run).isoformat() if self.last_run else None,
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    consumer_id = sys.argv[2] if len(sys.argv) > 2 else None
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    worker = DirectMessageWorker(batch_size=batch_size, consumer_id=consumer_id)
+    worker.start()
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Worker para Jobs de Exportação de Dados RE-EDUCA Store.
+
+Consome a fila 'exports' e executa ExportJobService.process_export fora
+dos workers web. Periodicamente também:
+- Reenfileira jobs órfãos (worker morreu no meio; retomam do checkpoint)
+- Cria jobs para exportações agendadas vencidas
+
+Uso:
+    python -m workers.export_worker [poll_interval]
+"""
+import logging
+import signal
+import time
+from datetime import datetime
+
+from services.export_job_service import ExportJobService
+from services.queue_service import QueueNames
+
+logger = logging.getLogger(__name__)
+
+
+class ExportWorker:
+    """
+    Worker de exportações de dados.
+
+    Processa um job por vez; para paralelismo entre jobs, execute várias
+    instâncias (o lock por export evita processamento duplicado).
+    """
+
+    def __init__(self, poll_interval: float = 1.0, maintenance_interval: int = 60):
+        """
+        Inicializa o worker de exportações.
+
+        Args:
+            poll_interval: Intervalo entre verificações da fila vazia (segundos)
+            maintenance_interval: Intervalo entre varreduras de órfãos/agendados (segundos)
+        """
+        self.poll_interval = poll_interval
+        self.maintenance_interval = maintenance_interval
+        self.export_service = ExportJobService()
+        self.queue_service = self.export_service.queue
+        self.running = False
+        self.last_maintenance = 0.0
+        self.processed_jobs = 0
+        self.failed_jobs = 0
+
+        # Configura signal handlers para graceful shutdown
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+    def _signal_handler(self, signum, frame):
+        """Handler para signals de shutdown"""
+        logger.info(f"ExportWorker recebeu signal {signum}, iniciando shutdown...")
+        self.stop()
+
+    def start(self):
+        """Inicia o loop de processamento"""
+        if not self.queue_service.is_connected():
+            logger.error("Redis não está conectado, não é possível iniciar o ExportWorker")
+            return
+
+        logger.info("ExportWorker iniciando")
+        self.running = True
+
+        try:
+            while self.running:
+                if time.time() - self.last_maintenance >= self.maintenance_interval:
+                    self._run_maintenance()
+
+                task = self.export_service.claim_next_job()
+                if task:
+                    self._process_task(task)
+                elif self.running:
+                    time.sleep(self.poll_interval)
+
+        except KeyboardInterrupt:
+            logger.info("ExportWorker interrompido pelo usuário")
+        except Exception as e:
+            logger.error(f"Erro no ExportWorker: {e}", exc_info=True)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Para o worker"""
+        logger.info("ExportWorker parando...")
+        self.running = False
+
+    def _process_task(self, task: dict):
+        """Executa um job e aplica retry com backoff da fila em caso de falha"""
+        export_id = task.get("data", {}).get("export_id")
+        if not export_id:
+            logger.error(f"Tarefa de exportação inválida: {task}")
+            return
+
+        started = time.time()
+        if self.export_service.process_export(export_id):
+            self.processed_jobs += 1
+            logger.info(f"Export {export_id} concluído em {time.time() - started:.2f}s")
+            return
+
+        if self.queue_service.retry_failed_task(QueueNames.EXPORTS, task):
+            logger.info(f"Export {export_id} recolocado na fila para retry (checkpoint preservado)")
+        else:
+            self.failed_jobs += 1
+            self.export_service.mark_failed(export_id, "Exportação falhou após múltiplas tentativas")
+
+    def _run_maintenance(self):
+        """Reenfileira órfãos e dispara exportações agendadas"""
+        self.last_maintenance = time.time()
+        try:
+            requeued = self.export_service.requeue_stalled_jobs()
+            scheduled = self.export_service.enqueue_due_scheduled_exports()
+            if requeued or scheduled:
+                logger.info(f"Manutenção de exports: {requeued} órfão(s) reenfileirado(s), {scheduled} agendado(s)")
+        except Exception as e:
+            logger.error(f"Erro na manutenção de exports: {e}", exc_info=True)
+
+    def get_stats(self) -> dict:
+        """Retorna estatísticas do worker"""
+        return {
+            "worker_id": "export_worker",
+            "running": self.running,
+            "processed_jobs": self.processed_jobs,
+            "failed_jobs": self.failed_jobs,
+            "last_maintenance": datetime.utcfromtimestamp(self.last_maintenance).isoformat()
+            if self.last_maintenance
+            else None,
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    poll_interval = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    worker = ExportWorker(poll_interval=poll_interval)
+    worker.start()
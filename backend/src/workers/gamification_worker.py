@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Worker do Motor de Gamificação RE-EDUCA Store.
+
+Consome a fila gamification_events em lotes e aplica cada lote com
+GamificationEngine.process (progresso de desafios e conquistas, pontos e
+sequência de dias ativos). Lotes que falham voltam para a fila com retry;
+eventos já aplicados são ignorados pelo banco. Uma vez por hora remove o
+registro de eventos aplicados mais antigos que a janela de retry.
+
+Os eventos retirados ficam na lista de processamento da instância até o
+lote ser aplicado (claim_batch/ack_tasks); se o worker cair antes, eles
+voltam para a fila quando ele reinicia.
+
+Uso:
+    python -m workers.gamification_worker [batch_size] [consumer_id]
+"""
+import logging
+import os
+import signal
+import time
+from datetime import datetime
+from typing import Optional
+
+from services.gamification_engine import GamificationEngine
+from services.queue_service import QueueNames, RedisQueueService
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL = 3600
+
+
+class GamificationWorker:
+    """
+    Worker de avaliação das regras de gamificação em lote.
+
+    Pode rodar em mais de uma instância: cada lote é retirado da fila de
+    forma atômica e cada evento é aplicado uma única vez. Cada instância
+    precisa de um consumer_id próprio e estável entre reinícios.
+    """
+
+    def __init__(self, batch_size: int = 500, idle_sleep: float = 1.0, consumer_id: Optional[str] = None):
+        """
+        Inicializa o worker de gamificação.
+
+        Args:
+            batch_size: Eventos por lote
+            idle_sleep: Espera quando a fila está vazia (segundos)
+            consumer_id: ID da instância (padrão: WORKER_ID)
+        """
+        self.batch_size = batch_size
+        self.idle_sleep = idle_sleep
+        self.consumer_id = consumer_id or os.environ.get("WORKER_ID")
+        self.queue_service = RedisQueueService()
+        self.engine = GamificationEngine()
+        self.running = False
+        self.last_run = 0.0
+        self.last_purge = 0.0
+        self.batches = 0
+        self.events = 0
+        self.completed = 0
+        self.failed_batches = 0
+
+        # Configura signal handlers para graceful shutdown
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+    def _signal_handler(self, signum, frame):
+        """Handler para signals de shutdown"""
+        logger.info(f"GamificationWorker recebeu signal {signum}, iniciando shutdown...")
+        self.stop()
+
+    def start(self):
+        """Inicia o loop de avaliação"""
+        if not self.queue_service.is_connected():
+            logger.error("Redis não está conectado, não é possível iniciar o worker")
+            return
+
+        logger.info(f"GamificationWorker iniciando (lote: {self.batch_size})")
+        # Eventos retirados por uma execução anterior que caiu antes do ack
+        self.queue_service.requeue_unacked(QueueNames.GAMIFICATION_EVENTS, self.consumer_id)
+        self.running = True
+
+        try:
+            while self.running:
+                if time.time() - self.last_purge >= PURGE_INTERVAL:
+                    self.engine.purge_processed_events()
+                    self.last_purge = time.time()
+                # Fila vazia ou lote parcial: espera acumular eventos
+                if self.run_once() < self.batch_size and self.running:
+                    time.sleep(self.idle_sleep)
+
+        except KeyboardInterrupt:
+            logger.info("GamificationWorker interrompido pelo usuário")
+        except Exception as e:
+            logger.error(f"Erro no GamificationWorker: {e}", exc_info=True)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Para o worker"""
+        logger.info("GamificationWorker parando...")
+        self.running = False
+
+    def run_once(self) -> int:
+        """
+        Aplica um lote da fila.
+
+        Returns:
+            Número de eventos retirados da fila
+        """
+        self.last_run = time.time()
+        tasks = self.queue_service.claim_batch(QueueNames.GAMIFICATION_EVENTS, self.batch_size, self.consumer_id)
+        if not tasks:
+            return 0
+
+        try:
+            stats = self.engine.process([task["data"] for task in tasks])
+        except Exception as e:
+            logger.error(f"Erro ao aplicar eventos de gamificação: {e}", exc_info=True)
+            stats = None
+
+        if stats is None:
+            self.failed_batches += 1
+            for task in tasks:
+                self.queue_service.retry_failed_task(QueueNames.GAMIFICATION_EVENTS, task)
+        else:
+            self.batches += 1
+            self.completed += stats["completed"]
+        # Só depois da gravação (ou dos retries já recolocados na fila)
+        self.queue_service.ack_tasks(QueueNames.GAMIFICATION_EVENTS, tasks, self.consumer_id)
+        self.events += len(tasks)
+        return len(tasks)
+
+    def get_stats(self) -> dict:
+        """Retorna estatísticas do worker"""
+        return {
+            "worker_id": "gamification_worker",
+            "running": self.running,
+            "batches": self.batches,
+            "events": self.events,
+            "completed": self.completed,
+            "failed_batches": self.failed_batches,
+            "last_run": datetime.utcfromtimestamp(self.last_run).isoformat() if self.last_run else None,
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    consumer_id = sys.argv[2] if len(sys.argv) > 2 else None
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    worker = GamificationWorker(batch_size=batch_size, consumer_id=consumer_id)
+    worker.start()
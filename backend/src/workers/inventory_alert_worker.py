@@ -4,13 +4,18 @@ Worker para Verificação Periódica de Estoque RE-EDUCA Store.
 
 Verifica produtos com estoque baixo periodicamente e envia alertas.
 Executa em background de forma contínua.
+
+Cada verificação resolve os alertas de produtos reabastecidos e avalia
+todos os produtos em uma consulta (services/inventory_alerts.py). Quedas de
+estoque também disparam a avaliação na hora, só do produto afetado; a
+varredura periódica cobre alterações feitas fora da aplicação.
 """
 import logging
 import signal
 import time
 from datetime import datetime
 
-from services.inventory_service import InventoryService
+from services.inventory_alerts import DEFAULT_THRESHOLD, inventory_alert_service
 
 logger = logging.getLogger(__name__)
 
@@ -30,11 +35,12 @@ class InventoryAlertWorker:
             check_interval: Intervalo entre verificações em segundos (padrão: 1 hora)
         """
         self.check_interval = check_interval
-        self.inventory_service = InventoryService()
+        self.alert_service = inventory_alert_service
         self.running = False
         self.last_check = None
         self.total_checks = 0
         self.total_alerts_sent = 0
+        self.total_alerts_resolved = 0
 
         # Configura signal handlers para graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -77,8 +83,7 @@ class InventoryAlertWorker:
             logger.info("Verificando estoque baixo...")
             self.total_checks += 1
 
-            # Verificar e enviar alertas (usa threshold padrão de 10)
-            result = self.inventory_service.check_and_send_low_stock_alerts(threshold=10)
+            result = self._evaluate()
 
             if result.get("success"):
                 alerts_sent = result.get("alerts_sent", 0)
@@ -97,6 +102,11 @@ class InventoryAlertWorker:
         except Exception as e:
             logger.error(f"Erro ao verificar estoque e enviar alertas: {e}", exc_info=True)
 
+    def _evaluate(self) -> dict:
+        """Resolve alertas de produtos reabastecidos e avalia todos os produtos"""
+        self.total_alerts_resolved += self.alert_service.resolve_restocked(DEFAULT_THRESHOLD)
+        return self.alert_service.evaluate(threshold=DEFAULT_THRESHOLD)
+
     def get_stats(self) -> dict:
         """Retorna estatísticas do worker"""
         return {
@@ -105,6 +115,7 @@ class InventoryAlertWorker:
             "check_interval": self.check_interval,
             "total_checks": self.total_checks,
             "total_alerts_sent": self.total_alerts_sent,
+            "total_alerts_resolved": self.total_alerts_resolved,
             "last_check": self.last_check.isoformat() if self.last_check else None,
         }
 
@@ -116,7 +127,7 @@ class InventoryAlertWorker:
             Dict com resultado da verificação
         """
         logger.info("Executando verificação única de estoque...")
-        result = self.inventory_service.check_and_send_low_stock_alerts(threshold=10)
+        result = self._evaluate()
         self.last_check = datetime.utcnow()
         self.total_checks += 1
 
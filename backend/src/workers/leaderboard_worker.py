@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Worker de Leaderboards RE-EDUCA Store.
+
+Mantém os rankings de LeaderboardService alinhados com o banco:
+- A cada intervalo: grava o topo de cada ranking em leaderboard_snapshots
+- A cada rebuild_interval: reconstrói os rankings a partir do ledger
+  user_points (inclui pontos concedidos direto no banco)
+
+Uso:
+    python -m workers.leaderboard_worker [interval_seconds] [rebuild_interval_seconds]
+"""
+import logging
+import signal
+import time
+from datetime import datetime
+
+from services.leaderboard_service import LeaderboardService
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderboardWorker:
+    """
+    Worker de fotos e reconstrução dos leaderboards.
+
+    Deve rodar em uma única instância: a reconstrução troca os rankings
+    inteiros ao final.
+    """
+
+    def __init__(self, interval: int = 900, rebuild_interval: int = 86400, batch_size: int = 1000):
+        """
+        Inicializa o worker de leaderboards.
+
+        Args:
+            interval: Intervalo entre fotos dos rankings (segundos)
+            rebuild_interval: Intervalo entre reconstruções (segundos)
+            batch_size: Usuários por chamada ao banco na reconstrução
+        """
+        self.interval = interval
+        self.rebuild_interval = rebuild_interval
+        self.batch_size = batch_size
+        self.leaderboard_service = LeaderboardService()
+        self.running = False
+        self.last_run = 0.0
+        self.last_rebuild = 0.0
+        self.snapshots = 0
+        self.rebuilds = 0
+        self.failed_runs = 0
+
+        # Configura signal handlers para graceful shutdown
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+    def _signal_handler(self, signum, frame):
+        """Handler para signals de shutdown"""
+        logger.info(f"LeaderboardWorker recebeu signal {signum}, iniciando shutdown...")
+        self.stop()
+
+    def start(self):
+        """Inicia o loop de fotos e reconstruções"""
+        logger.info(f"LeaderboardWorker iniciando (intervalo: {self.interval}s)")
+        self.running = True
+
+        try:
+            while self.running:
+                if time.time() - self.last_run >= self.interval:
+                    self.run_once()
+                if self.running:
+                    time.sleep(1)
+
+        except KeyboardInterrupt:
+            logger.info("LeaderboardWorker interrompido pelo usuário")
+        except Exception as e:
+            logger.error(f"Erro no LeaderboardWorker: {e}", exc_info=True)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Para o worker"""
+        logger.info("LeaderboardWorker parando...")
+        self.running = False
+
+    def run_once(self):
+        """Reconstrói os rankings se for a hora (ou se ainda não existem) e grava as fotos"""
+        self.last_run = time.time()
+        try:
+            if self.last_run - self.last_rebuild >= self.rebuild_interval or not self.leaderboard_service.is_ready():
+                totals = self.leaderboard_service.rebuild(batch_size=self.batch_size)
+                self.last_rebuild = self.last_run
+                self.rebuilds += 1
+                logger.info(f"Leaderboards reconstruídos: {totals['users']} usuário(s), {totals['challenges']} desafio(s)")
+            self.snapshots += len(self.leaderboard_service.snapshot())
+        except Exception as e:
+            self.failed_runs += 1
+            logger.error(f"Erro ao atualizar leaderboards: {e}", exc_info=True)
+
+    def get_stats(self) -> dict:
+        """Retorna estatísticas do worker"""
+        return {
+            "worker_id": "leaderboard_worker",
+            "running": self.running,
+            "snapshots": self.snapshots,
+            "rebuilds": self.rebuilds,
+            "failed_runs": self.failed_runs,
+            "last_run": datetime.utcfromtimestamp(self.last_run).isoformat() if self.last_run else None,
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    interval = int(sys.argv[1]) if len(sys.argv) > 1 else 900
+    rebuild_interval = int(sys.argv[2]) if len(sys.argv) > 2 else 86400
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    worker = LeaderboardWorker(interval=interval, rebuild_interval=rebuild_interval)
+    worker.start()
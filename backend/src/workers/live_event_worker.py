@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Worker de Eventos de Live Streaming RE-EDUCA Store.
+
+- Lê os Redis Streams das transmissões (consumer group live_persist) e grava
+  mensagens e presentes em lote com insert_stream_events; as entradas só são
+  confirmadas depois da gravação, então falhas são relidas
+- A cada TICK_SECONDS envia para as salas os contadores de curtidas e
+  presentes alterados (stream_counters) e atualiza a métrica de mensagens
+  por segundo
+- A cada minuto reivindica entradas de workers parados e, a cada hora,
+  esquece streams de transmissões sem eventos
+
+Uso:
+    python -m workers.live_event_worker [batch_size]
+"""
+import logging
+import os
+import signal
+import socket
+import time
+from datetime import datetime
+
+from services.cache_service import cache_service
+from services.live_event_service import TICK_SECONDS, LiveEventService
+
+logger = logging.getLogger(__name__)
+
+CLAIM_INTERVAL = 60
+CLAIM_MIN_IDLE_MS = 60000
+PURGE_INTERVAL = 3600
+
+
+class LiveEventWorker:
+    """
+    Worker de gravação em lote e contadores dos eventos de live.
+
+    Pode rodar em mais de uma instância: o consumer group entrega cada
+    entrada a um único consumidor.
+    """
+
+    def __init__(self, batch_size: int = 1000, idle_sleep: float = 1.0):
+        """
+        Inicializa o worker de eventos de live.
+
+        Args:
+            batch_size: Eventos lidos por stream em cada lote
+            idle_sleep: Espera sem transmissões ativas ou após falha (segundos)
+        """
+        self.batch_size = batch_size
+        self.idle_sleep = idle_sleep
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.events = LiveEventService()
+        self.running = False
+        self.last_run = 0.0
+        self.last_tick = time.time()
+        self.last_claim = 0.0
+        self.last_purge = 0.0
+        self.batches = 0
+        self.messages = 0
+        self.gifts = 0
+        self.failed_batches = 0
+        self.tick_events = 0
+
+        # Configura signal handlers para graceful shutdown
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+    def _signal_handler(self, signum, frame):
+        """Handler para signals de shutdown"""
+        logger.info(f"LiveEventWorker recebeu signal {signum}, iniciando shutdown...")
+        self.stop()
+
+    def start(self):
+        """Inicia o loop de gravação e contadores"""
+        if not cache_service.redis_client:
+            logger.error("Redis não está conectado, não é possível iniciar o worker")
+            return
+
+        logger.info(f"LiveEventWorker iniciando (consumidor: {self.consumer}, lote: {self.batch_size})")
+        self.running = True
+
+        try:
+            while self.running:
+                now = time.time()
+                if now - self.last_claim >= CLAIM_INTERVAL:
+                    self.events.claim_stale(self.consumer, CLAIM_MIN_IDLE_MS, self.batch_size)
+                    self.last_claim = now
+                if now - self.last_purge >= PURGE_INTERVAL:
+                    self.events.purge_idle_streams()
+                    self.last_purge = now
+
+                read = self.run_once()
+                self.tick()
+                if read < 0 and self.running:
+                    time.sleep(self.idle_sleep)
+
+        except KeyboardInterrupt:
+            logger.info("LiveEventWorker interrompido pelo usuário")
+        except Exception as e:
+            logger.error(f"Erro no LiveEventWorker: {e}", exc_info=True)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Para o worker"""
+        logger.info("LiveEventWorker parando...")
+        self.running = False
+
+    def run_once(self) -> int:
+        """
+        Grava um lote: primeiro as entradas pendentes deste consumidor
+        (falhas anteriores e reivindicadas), depois as novas.
+
+        Returns:
+            Número de eventos gravados, ou -1 se não há transmissões ativas
+            ou o lote falhou
+        """
+        self.last_run = time.time()
+        entries = self.events.read_events(self.consumer, self.batch_size, pending=True)
+        if entries == []:
+            # Espera eventos novos até o próximo envio de contadores
+            block_ms = max(int((self.last_tick + TICK_SECONDS - time.time()) * 1000), 1)
+            entries = self.events.read_events(self.consumer, self.batch_size, block_ms=block_ms)
+        if entries is None:
+            return -1
+        if not entries:
+            return 0
+
+        try:
+            stats = self.events.persist(entries)
+        except Exception as e:
+            logger.error(f"Erro ao gravar eventos de live: {e}", exc_info=True)
+            stats = None
+
+        if stats is None:
+            self.failed_batches += 1
+            return -1
+        read = sum(len(items) for _, items in entries)
+        self.batches += 1
+        self.messages += stats["messages"]
+        self.gifts += stats["gifts"]
+        self.tick_events += read
+        return read
+
+    def tick(self):
+        """Envia os contadores alterados e a métrica de eventos por segundo a cada TICK_SECONDS"""
+        elapsed = time.time() - self.last_tick
+        if elapsed < TICK_SECONDS:
+            return
+        self.events.flush_counters()
+        cache_service.set("ws:messages_per_second", self.tick_events / elapsed, ttl=60)
+        self.tick_events = 0
+        self.last_tick = time.time()
+
+    def get_stats(self) -> dict:
+        """Retorna estatísticas do worker"""
+        return {
+            "worker_id": "live_event_worker",
+            "consumer": self.consumer,
+            "running": self.running,
+            "batches": self.batches,
+            "messages": self.messages,
+            "gifts": self.gifts,
+            "failed_batches": self.failed_batches,
+            "last_run": datetime.utcfromtimestamp(self.last_run).isoformat() if self.last_run else None,
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    worker = LiveEventWorker(batch_size=batch_size)
+    worker.start()
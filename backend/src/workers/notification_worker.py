@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Worker de Notificações Sociais RE-EDUCA Store.
+
+Consome a fila social_notifications em lotes e entrega cada lote com
+NotificationService.deliver (agrupamento, gravação em lote, badges e
+eventos Socket.IO). Lotes que falham voltam para a fila com retry.
+
+Os eventos retirados ficam na lista de processamento da instância até o
+lote ser entregue (claim_batch/ack_tasks); se o worker cair antes, eles
+voltam para a fila quando ele reinicia.
+
+Uso:
+    python -m workers.notification_worker [batch_size] [consumer_id]
+"""
+import logging
+import os
+import signal
+import time
+from datetime import datetime
+from typing import Optional
+
+from services.notification_service import NotificationService
+from services.queue_service import QueueNames, RedisQueueService
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationWorker:
+    """
+    Worker de entrega de notificações em lote.
+
+    Pode rodar em mais de uma instância: cada lote é retirado da fila de
+    forma atômica. Cada instância precisa de um consumer_id próprio e
+    estável entre reinícios (lista de processamento).
+    """
+
+    def __init__(self, batch_size: int = 500, idle_sleep: float = 1.0, consumer_id: Optional[str] = None):
+        """
+        Inicializa o worker de notificações.
+
+        Args:
+            batch_size: Eventos por lote
+            idle_sleep: Espera quando a fila está vazia (segundos)
+            consumer_id: ID da instância (padrão: WORKER_ID)
+        """
+        self.batch_size = batch_size
+        self.idle_sleep = idle_sleep
+        self.consumer_id = consumer_id or os.environ.get("WORKER_ID")
+        self.queue_service = RedisQueueService()
+        self.notification_service = NotificationService()
+        self.running = False
+        self.last_run = 0.0
+        self.batches = 0
+        self.events = 0
+        self.notifications = 0
+        self.failed_batches = 0
+
+        # Configura signal handlers para graceful shutdown
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+    def _signal_handler(self, signum, frame):
+        """Handler para signals de shutdown"""
+        logger.info(f"NotificationWorker recebeu signal {signum}, iniciando shutdown...")
+        self.stop()
+
+    def start(self):
+        """Inicia o loop de entrega"""
+        if not self.queue_service.is_connected():
+            logger.error("Redis não está conectado, não é possível iniciar o worker")
+            return
+
+        logger.info(f"NotificationWorker iniciando (lote: {self.batch_size})")
+        # Eventos retirados por uma execução anterior que caiu antes do ack
+        self.queue_service.requeue_unacked(QueueNames.SOCIAL_NOTIFICATIONS, self.consumer_id)
+        self.running = True
+
+        try:
+            while self.running:
+                # Fila vazia ou lote parcial: espera acumular eventos
+                if self.run_once() < self.batch_size and self.running:
+                    time.sleep(self.idle_sleep)
+
+        except KeyboardInterrupt:
+            logger.info("NotificationWorker interrompido pelo usuário")
+        except Exception as e:
+            logger.error(f"Erro no NotificationWorker: {e}", exc_info=True)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Para o worker"""
+        logger.info("NotificationWorker parando...")
+        self.running = False
+
+    def run_once(self) -> int:
+        """
+        Entrega um lote da fila.
+
+        Returns:
+            Número de eventos retirados da fila
+        """
+        self.last_run = time.time()
+        tasks = self.queue_service.claim_batch(QueueNames.SOCIAL_NOTIFICATIONS, self.batch_size, self.consumer_id)
+        if not tasks:
+            return 0
+
+        try:
+            stats = self.notification_service.deliver([task["data"] for task in tasks])
+        except Exception as e:
+            logger.error(f"Erro ao entregar notificações: {e}", exc_info=True)
+            stats = None
+
+        if stats is None:
+            self.failed_batches += 1
+            for task in tasks:
+                self.queue_service.retry_failed_task(QueueNames.SOCIAL_NOTIFICATIONS, task)
+        else:
+            self.batches += 1
+            self.notifications += stats["notifications"]
+        # Só depois da entrega (ou dos retries já recolocados na fila)
+        self.queue_service.ack_tasks(QueueNames.SOCIAL_NOTIFICATIONS, tasks, self.consumer_id)
+        self.events += len(tasks)
+        return len(tasks)
+
+    def get_stats(self) -> dict:
+        """Retorna estatísticas do worker"""
+        return {
+            "worker_id": "notification_worker",
+            "running": self.running,
+            "batches": self.batches,
+            "events": self.events,
+            "notifications": self.notifications,
+            "failed_batches": self.failed_batches,
+            "last_run": datetime.utcfromtimestamp(self.last_run).isoformat() if self.last_run else None,
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    consumer_id = sys.argv[2] if len(sys.argv) > 2 else None
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    worker = NotificationWorker(batch_size=batch_size, consumer_id=consumer_id)
+    worker.start()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Worker de Predições em Lote RE-EDUCA Store.
+
+Executa o PredictiveBatchService em agenda fixa, fora dos workers web:
+- A cada intervalo: reajusta health_predictions dos usuários com dados novos
+- Uma vez por dia (a partir de churn_hour UTC): recalcula churn_scores
+
+Uso:
+    python -m workers.prediction_worker [interval_seconds] [churn_hour]
+"""
+import logging
+import signal
+import time
+from datetime import datetime
+
+from services.predictive_batch_service import PredictiveBatchService
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionWorker:
+    """
+    Worker de predições em lote.
+
+    Uma instância basta: cada execução percorre todos os usuários ativos e só
+    reajusta quem teve dados novos.
+    """
+
+    def __init__(self, interval: int = 3600, churn_hour: int = 3, batch_size: int = 200):
+        """
+        Inicializa o worker de predições.
+
+        Args:
+            interval: Intervalo entre execuções das predições de saúde (segundos)
+            churn_hour: Hora (UTC) a partir da qual o churn diário é recalculado
+            batch_size: Usuários por página
+        """
+        self.interval = interval
+        self.churn_hour = churn_hour
+        self.batch_size = batch_size
+        self.batch_service = PredictiveBatchService()
+        self.running = False
+        self.last_run = 0.0
+        self.last_churn_date = None
+        self.runs = 0
+        self.refit_users = 0
+        self.failed_runs = 0
+
+        # Configura signal handlers para graceful shutdown
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+    def _signal_handler(self, signum, frame):
+        """Handler para signals de shutdown"""
+        logger.info(f"PredictionWorker recebeu signal {signum}, iniciando shutdown...")
+        self.stop()
+
+    def start(self):
+        """Inicia o loop de agendamento"""
+        logger.info("PredictionWorker iniciando")
+        self.running = True
+
+        try:
+            while self.running:
+                if time.time() - self.last_run >= self.interval:
+                    self.run_once()
+                if self.running:
+                    time.sleep(1)
+
+        except KeyboardInterrupt:
+            logger.info("PredictionWorker interrompido pelo usuário")
+        except Exception as e:
+            logger.error(f"Erro no PredictionWorker: {e}", exc_info=True)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Para o worker"""
+        logger.info("PredictionWorker parando...")
+        self.running = False
+
+    def run_once(self):
+        """Executa as predições de saúde e, se for a hora, o churn diário"""
+        self.last_run = time.time()
+        try:
+            stats = self.batch_service.run_health_predictions(batch_size=self.batch_size)
+            self.runs += 1
+            self.refit_users += stats["refit"]
+
+            now = datetime.utcnow()
+            if now.hour >= self.churn_hour and self.last_churn_date != now.date():
+                self.batch_service.run_churn_scores(batch_size=self.batch_size)
+                self.last_churn_date = now.date()
+        except Exception as e:
+            self.failed_runs += 1
+            logger.error(f"Erro na execução de predições em lote: {e}", exc_info=True)
+
+    def get_stats(self) -> dict:
+        """Retorna estatísticas do worker"""
+        return {
+            "worker_id": "prediction_worker",
+            "running": self.running,
+            "runs": self.runs,
+            "refit_users": self.refit_users,
+            "failed_runs": self.failed_runs,
+            "last_run": datetime.utcfromtimestamp(self.last_run).isoformat() if self.last_run else None,
+            "last_churn_date": self.last_churn_date.isoformat() if self.last_churn_date else None,
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    interval = int(sys.argv[1]) if len(sys.argv) > 1 else 3600
+    churn_hour = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    worker = PredictionWorker(interval=interval, churn_hour=churn_hour)
+    worker.start()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Worker de Reconciliação dos Contadores Sociais RE-EDUCA Store.
+
+Mantém os hashes de SocialCounterService alinhados com o banco:
+- A cada intervalo: reconcilia os usuários marcados como alterados (dirty)
+- A cada full_interval: varre todos os contadores em cache
+
+Uso:
+    python -m workers.social_counter_worker [interval_seconds] [full_interval_seconds]
+"""
+import logging
+import signal
+import time
+from datetime import datetime
+
+from services.social_counter_service import SocialCounterService
+
+logger = logging.getLogger(__name__)
+
+
+class SocialCounterWorker:
+    """
+    Worker de reconciliação dos contadores sociais.
+
+    Pode rodar em mais de uma instância: o conjunto dirty é consumido com SPOP.
+    """
+
+    def __init__(self, interval: int = 60, full_interval: int = 86400, batch_size: int = 500):
+        """
+        Inicializa o worker de contadores.
+
+        Args:
+            interval: Intervalo entre reconciliações dos usuários alterados (segundos)
+            full_interval: Intervalo entre varreduras completas (segundos)
+            batch_size: Usuários por chamada ao banco
+        """
+        self.interval = interval
+        self.full_interval = full_interval
+        self.batch_size = batch_size
+        self.counter_service = SocialCounterService()
+        self.running = False
+        self.last_run = 0.0
+        self.last_full_run = time.time()
+        self.runs = 0
+        self.checked_users = 0
+        self.corrected_users = 0
+        self.failed_runs = 0
+
+        # Configura signal handlers para graceful shutdown
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+    def _signal_handler(self, signum, frame):
+        """Handler para signals de shutdown"""
+        logger.info(f"SocialCounterWorker recebeu signal {signum}, iniciando shutdown...")
+        self.stop()
+
+    def start(self):
+        """Inicia o loop de reconciliação"""
+        logger.info(f"SocialCounterWorker iniciando (intervalo: {self.interval}s)")
+        self.running = True
+
+        try:
+            while self.running:
+                if time.time() - self.last_run >= self.interval:
+                    self.run_once()
+                if self.running:
+                    time.sleep(1)
+
+        except KeyboardInterrupt:
+            logger.info("SocialCounterWorker interrompido pelo usuário")
+        except Exception as e:
+            logger.error(f"Erro no SocialCounterWorker: {e}", exc_info=True)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Para o worker"""
+        logger.info("SocialCounterWorker parando...")
+        self.running = False
+
+    def run_once(self):
+        """Reconcilia os usuários alterados e, se for a hora, todos os contadores"""
+        self.last_run = time.time()
+        try:
+            if self.last_run - self.last_full_run >= self.full_interval:
+                stats = self.counter_service.reconcile_all(batch_size=self.batch_size)
+                self.last_full_run = self.last_run
+            else:
+                stats = self.counter_service.reconcile(batch_size=self.batch_size)
+            self.runs += 1
+            self.checked_users += stats["checked"]
+            self.corrected_users += stats["corrected"]
+        except Exception as e:
+            self.failed_runs += 1
+            logger.error(f"Erro na reconciliação de contadores sociais: {e}", exc_info=True)
+
+    def get_stats(self) -> dict:
+        """Retorna estatísticas do worker"""
+        return {
+            "worker_id": "social_counter_worker",
+            "running": self.running,
+            "runs": self.runs,
+            "checked_users": self.checked_users,
+            "corrected_users": self.corrected_users,
+            "failed_runs": self.failed_runs,
+            "last_run": datetime.utcfromtimestamp(self.last_run).isoformat() if self.last_run else None,
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    interval = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    full_interval = int(sys.argv[2]) if len(sys.argv) > 2 else 86400
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    worker = SocialCounterWorker(interval=interval, full_interval=full_interval)
+    worker.start()
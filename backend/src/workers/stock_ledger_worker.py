@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Worker do Livro de Estoque RE-EDUCA Store.
+
+Mantém o banco em dia com as reservas feitas no Redis
+(services/stock_ledger.py):
+- Grava em lotes os eventos da fila stock_ledger com apply_stock_events
+  (migração 044); só os eventos que falham voltam para a fila com retry
+  (até esgotar as tentativas da tarefa) e eventos repetidos são ignorados
+  pelo banco
+- Os eventos retirados ficam na lista de processamento da instância até o
+  lote ser gravado (claim_batch/ack_tasks); se o worker cair antes, eles
+  voltam para a fila quando ele reinicia
+- Expira as reservas vencidas (sorted set de prazos) a cada expire_interval
+- Reconcilia os contadores com o banco a cada reconcile_interval
+- Dispara a avaliação de alertas de estoque baixo dos produtos cujo
+  estoque caiu no lote (services/inventory_alerts.py)
+
+Uso:
+    python -m workers.stock_ledger_worker [batch_size] [consumer_id]
+"""
+import logging
+import os
+import signal
+import time
+from datetime import datetime
+from typing import Optional
+
+from services.inventory_alerts import inventory_alert_service
+from services.queue_service import QueueNames, RedisQueueService
+from services.stock_ledger import stock_ledger
+
+logger = logging.getLogger(__name__)
+
+
+class StockLedgerWorker:
+    """
+    Worker de gravação do livro de estoque.
+
+    Pode rodar em mais de uma instância: cada lote é retirado da fila de
+    forma atômica e cada reserva é finalizada uma única vez pelo script Lua.
+    Cada instância precisa de um consumer_id próprio e estável entre reinícios.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        idle_sleep: float = 0.2,
+        expire_interval: float = 1.0,
+        reconcile_interval: float = 60.0,
+        consumer_id: Optional[str] = None,
+    ):
+        """
+        Inicializa o worker do livro de estoque.
+
+        Args:
+            batch_size: Eventos por lote
+            idle_sleep: Espera quando a fila está vazia (segundos)
+            expire_interval: Intervalo entre varreduras de reservas vencidas (segundos)
+            reconcile_interval: Intervalo entre reconciliações com o banco (segundos)
+            consumer_id: ID da instância (padrão: WORKER_ID)
+        """
+        self.batch_size = batch_size
+        self.idle_sleep = idle_sleep
+        self.expire_interval = expire_interval
+        self.reconcile_interval = reconcile_interval
+        self.consumer_id = consumer_id or os.environ.get("WORKER_ID")
+        self.queue_service = RedisQueueService()
+        self.ledger = stock_ledger
+        self.alert_service = inventory_alert_service
+        self.running = False
+        self.last_run = 0.0
+        self.last_expire = 0.0
+        self.last_reconcile = 0.0
+        self.batches = 0
+        self.events = 0
+        self.failed_batches = 0
+        self.expired = 0
+        self.corrected = 0
+
+        # Configura signal handlers para graceful shutdown
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+    def _signal_handler(self, signum, frame):
+        """Handler para signals de shutdown"""
+        logger.info(f"StockLedgerWorker recebeu signal {signum}, iniciando shutdown...")
+        self.stop()
+
+    def start(self):
+        """Inicia o loop de gravação"""
+        if not self.queue_service.is_connected():
+            logger.error("Redis não está conectado, não é possível iniciar o worker")
+            return
+
+        logger.info(f"StockLedgerWorker iniciando (lote: {self.batch_size})")
+        # Eventos retirados por uma execução anterior que caiu antes do ack
+        self.queue_service.requeue_unacked(QueueNames.STOCK_LEDGER, self.consumer_id)
+        self.running = True
+
+        try:
+            while self.running:
+                processed = self.run_once()
+                self.run_maintenance()
+                if processed < self.batch_size and self.running:
+                    time.sleep(self.idle_sleep)
+
+        except KeyboardInterrupt:
+            logger.info("StockLedgerWorker interrompido pelo usuário")
+        except Exception as e:
+            logger.error(f"Erro no StockLedgerWorker: {e}", exc_info=True)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Para o worker"""
+        logger.info("StockLedgerWorker parando...")
+        self.running = False
+
+    def run_once(self) -> int:
+        """
+        Grava um lote da fila.
+
+        Returns:
+            Número de eventos retirados da fila
+        """
+        self.last_run = time.time()
+        tasks = self.queue_service.claim_batch(QueueNames.STOCK_LEDGER, self.batch_size, self.consumer_id)
+        if not tasks:
+            return 0
+
+        events = [task["data"] for task in tasks]
+        try:
+            failed = {id(event) for event in self.ledger.persist(events)}
+        except Exception as e:
+            logger.error(f"Erro ao gravar eventos de estoque: {e}", exc_info=True)
+            failed = {id(event) for event in events}
+
+        written = [event for event in events if id(event) not in failed]
+        if written:
+            self.batches += 1
+            self.events += len(written)
+            # Reservas e confirmações baixam o estoque no banco
+            self.alert_service.evaluate_async(
+                event["product_id"] for event in written if event.get("type") in ("reserve", "confirmed")
+            )
+        if failed:
+            self.failed_batches += 1
+            dropped = [
+                task["data"]
+                for task in tasks
+                if id(task["data"]) in failed
+                and not self.queue_service.retry_failed_task(QueueNames.STOCK_LEDGER, task)
+            ]
+            if dropped:
+                # Foram para a fila de falhas: a reconciliação volta a valer para esses produtos
+                logger.error(f"{len(dropped)} evento(s) de estoque movidos para a fila de falhas")
+                self.ledger.mark_done(dropped)
+        # Só depois da gravação (e dos retries já recolocados na fila)
+        self.queue_service.ack_tasks(QueueNames.STOCK_LEDGER, tasks, self.consumer_id)
+        return len(tasks)
+
+    def run_maintenance(self):
+        """Expira reservas vencidas e reconcilia com o banco nos intervalos configurados"""
+        now = time.time()
+        if now - self.last_expire >= self.expire_interval:
+            self.last_expire = now
+            self.expired += self.ledger.expire_due()
+        if now - self.last_reconcile >= self.reconcile_interval:
+            self.last_reconcile = now
+            self.corrected += self.ledger.reconcile()["corrected"]
+
+    def get_stats(self) -> dict:
+        """Retorna estatísticas do worker"""
+        return {
+            "worker_id": "stock_ledger_worker",
+            "running": self.running,
+            "batches": self.batches,
+            "events": self.events,
+            "failed_batches": self.failed_batches,
+            "expired_reservations": self.expired,
+            "reconciled_products": self.corrected,
+            "last_run": datetime.utcfromtimestamp(self.last_run).isoformat() if self.last_run else None,
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    consumer_id = sys.argv[2] if len(sys.argv) > 2 else None
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    worker = StockLedgerWorker(batch_size=batch_size, consumer_id=consumer_id)
+    worker.start()
@@ -170,6 +170,7 @@ def main():
         QueueNames.REPORTS,
         QueueNames.AI_PROCESSING,
         QueueNames.DATA_SYNC,
+        QueueNames.SOCIAL_FANOUT,
         "default",
     ]
 
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Worker de Webhooks RE-EDUCA Store.
+
+Consome as filas de webhooks preenchidas por services/webhook_inbox.py e
+processa os eventos em lotes (services/webhook_processor.py):
+- Cada instância consome um conjunto de partições; uma partição deve ter
+  um único consumidor para manter a ordem dos eventos de cada pedido
+- Os eventos retirados ficam na lista de processamento da partição até o
+  lote ser gravado (claim_batch/ack_tasks); se o worker cair antes, eles
+  voltam para a fila quando ele reinicia
+- Eventos que falham voltam para a fila com retry; os que esgotam as
+  tentativas vão para a fila de falhas e perdem a marca de deduplicação,
+  para que o próximo reenvio do provider seja aceito
+- Um evento em retry bloqueia sua chave de ordenação: os eventos seguintes
+  da chave (deste lote e dos próximos) ficam em espera, sem contar
+  tentativa, até ele ser gravado ou ir para a fila de falhas
+
+Uso:
+    python -m workers.webhook_worker [partições, ex: 0,1] [batch_size]
+"""
+import logging
+import signal
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+
+from services.queue_service import RedisQueueService
+from services.webhook_inbox import WEBHOOK_PARTITIONS, partition_queue, webhook_inbox
+from services.webhook_processor import WebhookProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookWorker:
+    """
+    Worker de processamento de webhooks.
+
+    Processa as partições em sequência, um lote por partição a cada volta.
+    """
+
+    def __init__(self, partitions: Optional[Iterable[int]] = None, batch_size: int = 100, idle_sleep: float = 0.2):
+        """
+        Inicializa o worker de webhooks.
+
+        Args:
+            partitions: Partições consumidas por esta instância (padrão: todas)
+            batch_size: Eventos por lote
+            idle_sleep: Espera quando as filas estão vazias (segundos)
+        """
+        self.partitions = list(partitions) if partitions is not None else list(range(WEBHOOK_PARTITIONS))
+        self.batch_size = batch_size
+        self.idle_sleep = idle_sleep
+        self.queue_service = RedisQueueService()
+        self.processor = WebhookProcessor()
+        self.inbox = webhook_inbox
+        self.running = False
+        self.last_run = 0.0
+        self.processed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.held = 0
+        self.max_lag = 0.0
+
+        # Configura signal handlers para graceful shutdown
+        signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
+
+    def _signal_handler(self, signum, frame):
+        """Handler para signals de shutdown"""
+        logger.info(f"WebhookWorker recebeu signal {signum}, iniciando shutdown...")
+        self.stop()
+
+    def start(self):
+        """Inicia o loop de processamento"""
+        if not self.queue_service.is_connected():
+            logger.error("Redis não está conectado, não é possível iniciar o worker")
+            return
+
+        logger.info(f"WebhookWorker iniciando (partições: {self.partitions}, lote: {self.batch_size})")
+        for partition in self.partitions:
+            # Eventos retirados por uma execução anterior que caiu antes do ack
+            self.queue_service.requeue_unacked(partition_queue(partition))
+        self.running = True
+
+        try:
+            while self.running:
+                processed = self.run_once()
+                if processed == 0 and self.running:
+                    time.sleep(self.idle_sleep)
+
+        except KeyboardInterrupt:
+            logger.info("WebhookWorker interrompido pelo usuário")
+        except Exception as e:
+            logger.error(f"Erro no WebhookWorker: {e}", exc_info=True)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Para o worker"""
+        logger.info("WebhookWorker parando...")
+        self.running = False
+
+    def run_once(self) -> int:
+        """
+        Processa um lote de cada partição.
+
+        Returns:
+            Número de eventos retirados das filas
+        """
+        self.last_run = time.time()
+        total = 0
+        for partition in self.partitions:
+            queue = partition_queue(partition)
+            tasks = self.queue_service.claim_batch(queue, self.batch_size)
+            if not tasks:
+                continue
+            total += len(tasks)
+            self.max_lag = max(self.max_lag, self.last_run - min(task["data"]["received_at"] for task in tasks))
+
+            # Chaves bloqueadas por um evento em retry: os demais eventos da chave esperam por ele
+            heads = self.inbox.blockers(self._ordering_key(task) for task in tasks)
+            ready = [task for task in tasks if heads.get(self._ordering_key(task), task["id"]) == task["id"]]
+            held = [task for task in tasks if heads.get(self._ordering_key(task), task["id"]) != task["id"]]
+
+            try:
+                failed = {id(event) for event in self.processor.process([task["data"] for task in ready])}
+            except Exception as e:
+                # Nada foi confirmado: o lote volta inteiro para a fila, na mesma ordem
+                logger.error(f"Erro ao processar lote da partição {partition}: {e}", exc_info=True)
+                self.queue_service.requeue_unacked(queue)
+                continue
+
+            released = set()
+            for task in ready:
+                key = self._ordering_key(task)
+                if id(task["data"]) not in failed:
+                    self.processed += 1
+                    if heads.get(key) == task["id"]:
+                        released.add(key)
+                    continue
+                if heads.get(key, task["id"]) != task["id"]:
+                    # Seguinte a um evento que falhou neste lote: não foi tentado
+                    held.append(task)
+                    continue
+                heads[key] = task["id"]
+                if self.queue_service.retry_failed_task(queue, task):
+                    self.retried += 1
+                    self.inbox.block(key, task["id"])
+                else:
+                    self.dropped += 1
+                    event = task["data"]
+                    logger.error(f"Webhook {event['provider']} {event['event_id']} movido para a fila de falhas")
+                    self.inbox.forget(event["provider"], event["event_id"])
+                    released.add(key)
+
+            # Em espera sem contar tentativa; chaves liberadas voltam para a frente da fila
+            for task in held:
+                self.inbox.hold(self._ordering_key(task), task)
+            self.held += len(held)
+            for key in released:
+                self.inbox.release(key)
+            # Só depois da gravação (e dos retries já recolocados na fila)
+            self.queue_service.ack_tasks(queue, tasks)
+        return total
+
+    @staticmethod
+    def _ordering_key(task: dict) -> str:
+        return task["data"].get("ordering_key") or task["data"]["event_id"]
+
+    def get_stats(self) -> dict:
+        """Retorna estatísticas do worker"""
+        return {
+            "worker_id": "webhook_worker",
+            "running": self.running,
+            "partitions": self.partitions,
+            "processed": self.processed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "held": self.held,
+            "max_lag_seconds": round(self.max_lag, 3),
+            "last_run": datetime.utcfromtimestamp(self.last_run).isoformat() if self.last_run else None,
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    partitions = [int(p) for p in sys.argv[1].split(",")] if len(sys.argv) > 1 else None
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    worker = WebhookWorker(partitions=partitions, batch_size=batch_size)
+    worker.start()
@@ -497,28 +497,47 @@ export const DataExport = ({
         })
       });
 
-      if (data.success) {
-        // Simular progresso
-        const interval = setInterval(() => {
-          setExportProgress((prev) => {
-            if (prev >= 100) {
+      if (data.success && data.export_id) {
+        // Exportação em background: acompanha o progresso real do job
+        const exportId = data.export_id;
+        const interval = setInterval(async () => {
+          try {
+            const status = await apiClient.request(`/lgpd/export/${exportId}`);
+            const job = status.export || {};
+            const total = job.progress?.total || 0;
+            const completed = job.progress?.completed || 0;
+            setExportProgress(total > 0 ? Math.min(95, Math.round((completed / total) * 95)) : 5);
+
+            if (job.status === 'completed') {
+              clearInterval(interval);
+              const download = await apiClient.request(`/lgpd/export/${exportId}/download`);
+              setExportProgress(100);
+              setIsExporting(false);
+              if (download.download_url) {
+                window.open(download.download_url, '_blank', 'noopener');
+              }
+            } else if (job.status === 'failed') {
               clearInterval(interval);
               setIsExporting(false);
-              
-              // Download do arquivo
-              const blob = new Blob([JSON.stringify(data.data, null, 2)], { type: 'application/json' });
-              const url = URL.createObjectURL(blob);
-              const a = document.createElement('a');
-              a.href = url;
-              a.download = `export-${new Date().toISOString()}.${selectedFormat}`;
-              a.click();
-              URL.revokeObjectURL(url);
-              
-              return 100;
+              alert('Erro ao exportar dados: ' + (job.error || 'Erro desconhecido'));
             }
-            return prev + 10;
-          });
-        }, 200);
+          } catch (pollError) {
+            clearInterval(interval);
+            logger.error('Erro ao acompanhar exportação:', pollError);
+            setIsExporting(false);
+          }
+        }, 2000);
+      } else if (data.success) {
+        // Exportação síncrona (fila indisponível)
+        setExportProgress(100);
+        setIsExporting(false);
+        const blob = new Blob([JSON.stringify(data.data, null, 2)], { type: 'application/json' });
+        const url = URL.createObjectURL(blob);
+        const a = document.createElement('a');
+        a.href = url;
+        a.download = `export-${new Date().toISOString()}.json`;
+        a.click();
+        URL.revokeObjectURL(url);
       } else {
         alert('Erro ao exportar dados: ' + (data.error || 'Erro desconhecido'));
         setIsExporting(false);
@@ -0,0 +1,58 @@
+-- ============================================================
+-- Migração 031: Jobs de Exportação de Dados em Background
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- Exportações LGPD e agendadas passam a ser processadas pelo
+-- ExportWorker (fila Redis 'exports'). Esta migração:
+-- - Garante a tabela data_exports usada pelo LGPDRepository
+-- - Adiciona colunas de progresso/artefato do job
+-- - Documenta o bucket privado 'exports' no Storage
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS data_exports (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    name TEXT NOT NULL DEFAULT 'Exportação de Dados',
+    format TEXT CHECK (format IN ('json', 'csv', 'pdf', 'xlsx')) NOT NULL DEFAULT 'json',
+    status TEXT CHECK (status IN ('pending', 'processing', 'completed', 'failed', 'expired')) DEFAULT 'pending',
+    data_types TEXT[],
+    file_url TEXT,
+    file_size BIGINT,
+    error_message TEXT,
+    expires_at TIMESTAMP WITH TIME ZONE DEFAULT (NOW() + INTERVAL '30 days'),
+    completed_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE data_exports ADD COLUMN IF NOT EXISTS progress JSONB DEFAULT '{}'::jsonb;
+ALTER TABLE data_exports ADD COLUMN IF NOT EXISTS storage_path TEXT;
+ALTER TABLE data_exports ADD COLUMN IF NOT EXISTS started_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE data_exports ADD COLUMN IF NOT EXISTS scheduled_export_id UUID
+    REFERENCES scheduled_exports(id) ON DELETE SET NULL;
+
+-- Índices para performance
+CREATE INDEX IF NOT EXISTS idx_data_exports_user_created ON data_exports(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_data_exports_status ON data_exports(status)
+    WHERE status IN ('pending', 'processing');
+CREATE INDEX IF NOT EXISTS idx_scheduled_exports_due ON scheduled_exports(next_run) WHERE enabled = true;
+
+-- RLS Policies
+ALTER TABLE data_exports ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view their own data exports" ON data_exports;
+CREATE POLICY "Users can view their own data exports" ON data_exports
+    FOR SELECT USING (auth.uid() = user_id);
+
+-- NOTA IMPORTANTE:
+-- O bucket de artefatos deve ser criado via Dashboard do Supabase ou API:
+-- 'exports' - Artefatos de exportação (privado; download apenas via URL assinada)
+
+-- Comentários
+COMMENT ON COLUMN data_exports.progress IS 'Progresso do job: {completed, total, fetch_seconds}';
+COMMENT ON COLUMN data_exports.storage_path IS 'Caminho do artefato no bucket exports';
+COMMENT ON COLUMN data_exports.scheduled_export_id IS 'Agendamento que originou a exportação (se houver)';
+
+SELECT 'Migração 031: Jobs de exportação configurados. Crie o bucket privado exports via Dashboard ou CLI.' as status;
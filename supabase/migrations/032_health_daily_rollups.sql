@@ -0,0 +1,282 @@
+-- ============================================================
+-- Migração 032: Rollups Diários de Saúde por Usuário
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- Dashboard e analytics de saúde reagregavam os registros brutos a
+-- cada leitura. Esta migração:
+-- 1. Cria health_daily_rollups (uma linha por usuário/dia)
+-- 2. Garante a tabela exercise_entries usada pelo HealthRepository
+-- 3. Cria rebuild_health_daily_rollups (recalcula um intervalo)
+-- 4. Mantém os rollups via triggers na mesma transação da escrita; cada
+--    usuário/dia é recalculado sob um advisory lock de transação, para que
+--    escritas concorrentes no mesmo dia não percam o agregado uma da outra
+-- 5. Faz o backfill dos últimos 90 dias
+--
+-- Backfill de histórico completo:
+--   python scripts/rebuild_health_rollups.py --days 3650
+-- ============================================================
+
+-- ============================================================
+-- 1. TABELAS
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS exercise_entries (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    exercise_name TEXT NOT NULL,
+    duration INTEGER DEFAULT 0 CHECK (duration >= 0),
+    intensity TEXT DEFAULT 'moderate',
+    calories_burned DECIMAL(10,2) DEFAULT 0,
+    exercise_type TEXT DEFAULT 'other',
+    entry_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    notes TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS health_daily_rollups (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    calories_in DECIMAL(10,2) NOT NULL DEFAULT 0,
+    protein DECIMAL(10,2) NOT NULL DEFAULT 0,
+    carbs DECIMAL(10,2) NOT NULL DEFAULT 0,
+    fat DECIMAL(10,2) NOT NULL DEFAULT 0,
+    fiber DECIMAL(10,2) NOT NULL DEFAULT 0,
+    food_entries INTEGER NOT NULL DEFAULT 0,
+    calories_out DECIMAL(10,2) NOT NULL DEFAULT 0,
+    exercise_minutes INTEGER NOT NULL DEFAULT 0,
+    exercise_entries INTEGER NOT NULL DEFAULT 0,
+    exercise_counts JSONB NOT NULL DEFAULT '{}'::jsonb,
+    latest_imc DECIMAL(4,1),
+    hydration_liters DECIMAL(6,2),
+    sleep_hours DECIMAL(4,2),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (user_id, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_exercise_entries_user_date ON exercise_entries(user_id, entry_date DESC);
+CREATE INDEX IF NOT EXISTS idx_food_diary_user_consumed ON food_diary_entries(user_id, consumed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_health_daily_rollups_day ON health_daily_rollups(day);
+
+-- ============================================================
+-- 2. FUNÇÃO DE RECÁLCULO (SET-BASED)
+-- ============================================================
+
+-- Recalcula os rollups de [p_start, p_end]; p_user_id NULL = todos os usuários.
+-- Dias sem nenhum registro são removidos. Retorna o número de linhas gravadas.
+CREATE OR REPLACE FUNCTION rebuild_health_daily_rollups(
+    p_user_id UUID,
+    p_start DATE,
+    p_end DATE
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    DELETE FROM health_daily_rollups
+    WHERE day BETWEEN p_start AND p_end
+      AND (p_user_id IS NULL OR user_id = p_user_id);
+
+    WITH food AS (
+        SELECT user_id, consumed_at::date AS day,
+               SUM(calories) AS calories_in, SUM(protein) AS protein, SUM(carbs) AS carbs,
+               SUM(fat) AS fat, SUM(fiber) AS fiber, COUNT(*) AS food_entries
+        FROM food_diary_entries
+        WHERE consumed_at::date BETWEEN p_start AND p_end
+          AND (p_user_id IS NULL OR user_id = p_user_id)
+        GROUP BY user_id, consumed_at::date
+    ),
+    exercise_by_name AS (
+        SELECT user_id, entry_date AS day, exercise_name,
+               COUNT(*) AS entries, SUM(duration) AS minutes, SUM(calories_burned) AS calories
+        FROM exercise_entries
+        WHERE entry_date BETWEEN p_start AND p_end
+          AND (p_user_id IS NULL OR user_id = p_user_id)
+        GROUP BY user_id, entry_date, exercise_name
+    ),
+    exercise AS (
+        SELECT user_id, day,
+               SUM(calories) AS calories_out, SUM(minutes) AS exercise_minutes, SUM(entries) AS exercise_entries,
+               jsonb_object_agg(COALESCE(exercise_name, 'Desconhecido'), entries) AS exercise_counts
+        FROM exercise_by_name
+        GROUP BY user_id, day
+    ),
+    -- imc_history foi criada com imc_value, mas o código grava imc: aceita ambos
+    imc AS (
+        SELECT DISTINCT ON (user_id, calculated_at::date)
+               user_id, calculated_at::date AS day,
+               COALESCE((to_jsonb(i) ->> 'imc')::numeric, (to_jsonb(i) ->> 'imc_value')::numeric) AS latest_imc
+        FROM imc_history i
+        WHERE calculated_at::date BETWEEN p_start AND p_end
+          AND (p_user_id IS NULL OR user_id = p_user_id)
+        ORDER BY user_id, calculated_at::date, calculated_at DESC
+    ),
+    hydration AS (
+        SELECT DISTINCT ON (user_id, created_at::date)
+               user_id, created_at::date AS day, total_intake AS hydration_liters
+        FROM hydration_calculations
+        WHERE created_at::date BETWEEN p_start AND p_end
+          AND (p_user_id IS NULL OR user_id = p_user_id)
+        ORDER BY user_id, created_at::date, created_at DESC
+    ),
+    sleep AS (
+        SELECT DISTINCT ON (user_id, created_at::date)
+               user_id, created_at::date AS day, sleep_duration AS sleep_hours
+        FROM sleep_calculations
+        WHERE created_at::date BETWEEN p_start AND p_end
+          AND (p_user_id IS NULL OR user_id = p_user_id)
+        ORDER BY user_id, created_at::date, created_at DESC
+    ),
+    days AS (
+        SELECT user_id, day FROM food
+        UNION SELECT user_id, day FROM exercise
+        UNION SELECT user_id, day FROM imc
+        UNION SELECT user_id, day FROM hydration
+        UNION SELECT user_id, day FROM sleep
+    )
+    INSERT INTO health_daily_rollups (
+        user_id, day, calories_in, protein, carbs, fat, fiber, food_entries,
+        calories_out, exercise_minutes, exercise_entries, exercise_counts,
+        latest_imc, hydration_liters, sleep_hours, updated_at
+    )
+    SELECT d.user_id, d.day,
+           COALESCE(f.calories_in, 0), COALESCE(f.protein, 0), COALESCE(f.carbs, 0),
+           COALESCE(f.fat, 0), COALESCE(f.fiber, 0), COALESCE(f.food_entries, 0),
+           COALESCE(e.calories_out, 0), COALESCE(e.exercise_minutes, 0), COALESCE(e.exercise_entries, 0),
+           COALESCE(e.exercise_counts, '{}'::jsonb),
+           m.latest_imc, h.hydration_liters, s.sleep_hours, NOW()
+    FROM days d
+    LEFT JOIN food f ON f.user_id = d.user_id AND f.day = d.day
+    LEFT JOIN exercise e ON e.user_id = d.user_id AND e.day = d.day
+    LEFT JOIN imc m ON m.user_id = d.user_id AND m.day = d.day
+    LEFT JOIN hydration h ON h.user_id = d.user_id AND h.day = d.day
+    LEFT JOIN sleep s ON s.user_id = d.user_id AND s.day = d.day
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        calories_in = EXCLUDED.calories_in,
+        protein = EXCLUDED.protein,
+        carbs = EXCLUDED.carbs,
+        fat = EXCLUDED.fat,
+        fiber = EXCLUDED.fiber,
+        food_entries = EXCLUDED.food_entries,
+        calories_out = EXCLUDED.calories_out,
+        exercise_minutes = EXCLUDED.exercise_minutes,
+        exercise_entries = EXCLUDED.exercise_entries,
+        exercise_counts = EXCLUDED.exercise_counts,
+        latest_imc = EXCLUDED.latest_imc,
+        hydration_liters = EXCLUDED.hydration_liters,
+        sleep_hours = EXCLUDED.sleep_hours,
+        updated_at = NOW();
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- ============================================================
+-- 3. MANUTENÇÃO NA ESCRITA (TRIGGERS)
+-- ============================================================
+
+-- Serializa o recálculo de um usuário/dia até o fim da transação. Quem
+-- espera o lock recalcula depois do commit da outra escrita e a enxerga
+-- (READ COMMITTED: cada instrução de rebuild_health_daily_rollups usa um
+-- snapshot novo).
+CREATE OR REPLACE FUNCTION lock_health_daily_rollup(p_user_id UUID, p_day DATE)
+RETURNS VOID AS $$
+    SELECT pg_advisory_xact_lock(hashtext(p_user_id::text || ':' || p_day::text));
+$$ LANGUAGE sql;
+
+-- TG_ARGV[0] = coluna de data da tabela de origem. Em UPDATE que muda o
+-- dia (ou o usuário), os dois dias afetados são recalculados; os locks são
+-- tomados em ordem fixa para evitar deadlock entre duas dessas escritas.
+CREATE OR REPLACE FUNCTION refresh_health_daily_rollup()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_old_day DATE;
+    v_new_day DATE;
+    v_moved BOOLEAN := FALSE;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        v_old_day := (to_jsonb(OLD) ->> TG_ARGV[0])::timestamptz::date;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        v_new_day := (to_jsonb(NEW) ->> TG_ARGV[0])::timestamptz::date;
+    END IF;
+    IF TG_OP = 'UPDATE' THEN
+        v_moved := v_new_day IS DISTINCT FROM v_old_day OR NEW.user_id IS DISTINCT FROM OLD.user_id;
+    END IF;
+
+    IF v_moved AND (NEW.user_id::text, v_new_day) < (OLD.user_id::text, v_old_day) THEN
+        PERFORM lock_health_daily_rollup(NEW.user_id, v_new_day);
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM lock_health_daily_rollup(OLD.user_id, v_old_day);
+        PERFORM rebuild_health_daily_rollups(OLD.user_id, v_old_day, v_old_day);
+    END IF;
+
+    IF TG_OP = 'INSERT' OR v_moved THEN
+        PERFORM lock_health_daily_rollup(NEW.user_id, v_new_day);
+        PERFORM rebuild_health_daily_rollups(NEW.user_id, v_new_day, v_new_day);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DROP TRIGGER IF EXISTS trigger_rollup_food_diary_entries ON food_diary_entries;
+CREATE TRIGGER trigger_rollup_food_diary_entries
+    AFTER INSERT OR UPDATE OR DELETE ON food_diary_entries
+    FOR EACH ROW EXECUTE FUNCTION refresh_health_daily_rollup('consumed_at');
+
+DROP TRIGGER IF EXISTS trigger_rollup_exercise_entries ON exercise_entries;
+CREATE TRIGGER trigger_rollup_exercise_entries
+    AFTER INSERT OR UPDATE OR DELETE ON exercise_entries
+    FOR EACH ROW EXECUTE FUNCTION refresh_health_daily_rollup('entry_date');
+
+DROP TRIGGER IF EXISTS trigger_rollup_imc_history ON imc_history;
+CREATE TRIGGER trigger_rollup_imc_history
+    AFTER INSERT OR UPDATE OR DELETE ON imc_history
+    FOR EACH ROW EXECUTE FUNCTION refresh_health_daily_rollup('calculated_at');
+
+DROP TRIGGER IF EXISTS trigger_rollup_hydration_calculations ON hydration_calculations;
+CREATE TRIGGER trigger_rollup_hydration_calculations
+    AFTER INSERT OR UPDATE OR DELETE ON hydration_calculations
+    FOR EACH ROW EXECUTE FUNCTION refresh_health_daily_rollup('created_at');
+
+DROP TRIGGER IF EXISTS trigger_rollup_sleep_calculations ON sleep_calculations;
+CREATE TRIGGER trigger_rollup_sleep_calculations
+    AFTER INSERT OR UPDATE OR DELETE ON sleep_calculations
+    FOR EACH ROW EXECUTE FUNCTION refresh_health_daily_rollup('created_at');
+
+-- ============================================================
+-- 4. RLS
+-- ============================================================
+
+ALTER TABLE exercise_entries ENABLE ROW LEVEL SECURITY;
+ALTER TABLE health_daily_rollups ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can manage own exercise_entries" ON exercise_entries;
+CREATE POLICY "Users can manage own exercise_entries" ON exercise_entries
+    FOR ALL USING (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Users can view own health_daily_rollups" ON health_daily_rollups;
+CREATE POLICY "Users can view own health_daily_rollups" ON health_daily_rollups
+    FOR SELECT USING (auth.uid() = user_id);
+
+-- ============================================================
+-- 5. BACKFILL INICIAL
+-- ============================================================
+
+SELECT rebuild_health_daily_rollups(NULL, CURRENT_DATE - 90, CURRENT_DATE);
+
+-- Comentários
+COMMENT ON TABLE health_daily_rollups IS 'Agregados diários de saúde por usuário (mantidos por triggers)';
+COMMENT ON COLUMN health_daily_rollups.exercise_counts IS 'Quantidade de registros por exercício no dia: {nome: total}';
+COMMENT ON COLUMN health_daily_rollups.latest_imc IS 'Último IMC calculado no dia';
+COMMENT ON COLUMN health_daily_rollups.hydration_liters IS 'Último cálculo de hidratação do dia (total_intake, litros)';
+COMMENT ON COLUMN health_daily_rollups.sleep_hours IS 'Último cálculo de sono do dia (sleep_duration)';
+COMMENT ON FUNCTION lock_health_daily_rollup IS 'Advisory lock de transação do rollup de um usuário/dia';
+COMMENT ON FUNCTION rebuild_health_daily_rollups IS 'Recalcula rollups de saúde de um intervalo (NULL = todos os usuários)';
+
+SELECT 'Migração 032: Rollups diários de saúde configurados!' as status;
@@ -0,0 +1,71 @@
+-- ============================================================
+-- Migração 033: Predições de Saúde e Churn Pré-calculadas
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- O PredictionWorker passa a ajustar os modelos em lote (todos os
+-- usuários ativos de uma vez) e grava o resultado aqui. As rotas de
+-- /api/predictive servem estas tabelas diretamente:
+-- - health_predictions: coeficientes por métrica + atividade e sazonalidade,
+--   carimbados com a versão dos dados usada no ajuste
+-- - churn_scores: tabela noturna de risco de churn
+-- ============================================================
+
+-- ============================================================
+-- 1. PREDIÇÕES DE SAÚDE
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS health_predictions (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    -- Impressão digital dos dados de origem (quantidade + último registro de
+    -- imc_history e workout_sessions); só usuários com versão diferente são reajustados
+    data_version TEXT NOT NULL,
+    data_points INTEGER NOT NULL DEFAULT 0,
+    -- {metrica: {slope, intercept, r2, x_max, n}}; projeção = intercept + slope * (x_max + dias)
+    models JSONB NOT NULL DEFAULT '{}'::jsonb,
+    activity JSONB,
+    seasonal JSONB,
+    confidence DECIMAL(5,1),
+    computed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_health_predictions_computed ON health_predictions(computed_at);
+
+-- ============================================================
+-- 2. SCORES DE CHURN
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS churn_scores (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    churn_score DECIMAL(3,2) NOT NULL,
+    risk_level TEXT CHECK (risk_level IN ('Alto', 'Médio', 'Baixo')) NOT NULL,
+    metrics JSONB NOT NULL DEFAULT '{}'::jsonb,
+    calculated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_churn_scores_risk ON churn_scores(risk_level, churn_score DESC);
+
+-- Índices usados pelas leituras em lote do pipeline
+CREATE INDEX IF NOT EXISTS idx_imc_history_user_calculated ON imc_history(user_id, calculated_at);
+CREATE INDEX IF NOT EXISTS idx_workout_sessions_user_completed ON workout_sessions(user_id, completed_at);
+
+-- ============================================================
+-- 3. RLS
+-- ============================================================
+
+ALTER TABLE health_predictions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE churn_scores ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own health_predictions" ON health_predictions;
+CREATE POLICY "Users can view own health_predictions" ON health_predictions
+    FOR SELECT USING (auth.uid() = user_id);
+
+-- churn_scores é uso interno (admin/service role): sem policy de leitura para usuários
+
+-- Comentários
+COMMENT ON TABLE health_predictions IS 'Modelos de predição de saúde ajustados em lote pelo PredictionWorker';
+COMMENT ON COLUMN health_predictions.data_version IS 'Versão dos dados usada no ajuste (reajuste só quando muda)';
+COMMENT ON TABLE churn_scores IS 'Risco de churn recalculado diariamente pelo PredictionWorker';
+
+SELECT 'Migração 033: Armazenamento de predições configurado!' as status;
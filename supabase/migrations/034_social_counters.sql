@@ -0,0 +1,123 @@
+-- ============================================================
+-- Migração 034: Contadores Sociais por Usuário
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- O perfil social contava seguidores, seguindo, posts e likes com uma
+-- query por contador (likes ainda buscava todos os ids de posts do
+-- usuário). Os contadores agora ficam em hashes Redis
+-- (services/social_counter_service.py); esta migração:
+-- 1. Cria get_social_user_counters, que calcula os quatro contadores
+--    de vários usuários em uma única chamada (preenchimento e
+--    reconciliação do cache)
+-- 2. Adiciona os índices usados pelas contagens
+-- 3. Cria add_post_reaction/remove_post_reactions e add_follow/remove_follow:
+--    uma instrução (INSERT ... ON CONFLICT DO NOTHING / DELETE ... RETURNING)
+--    que diz se a linha foi criada ou removida, para os contadores serem
+--    ajustados só nesses casos, sem consulta prévia
+-- ============================================================
+
+-- ============================================================
+-- 1. ÍNDICES
+-- ============================================================
+
+CREATE INDEX IF NOT EXISTS idx_reactions_post_type ON reactions(post_id, reaction_type);
+
+-- ============================================================
+-- 2. FUNÇÃO DE CONTADORES
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION get_social_user_counters(p_user_ids UUID[])
+RETURNS TABLE (
+    user_id UUID,
+    followers BIGINT,
+    following BIGINT,
+    posts BIGINT,
+    total_likes BIGINT
+) AS $$
+    SELECT
+        u.id AS user_id,
+        (SELECT COUNT(*) FROM follows f WHERE f.following_id = u.id) AS followers,
+        (SELECT COUNT(*) FROM follows f WHERE f.follower_id = u.id) AS following,
+        (SELECT COUNT(*) FROM posts p WHERE p.user_id = u.id) AS posts,
+        (
+            SELECT COUNT(*)
+            FROM posts p
+            JOIN reactions r ON r.post_id = p.id AND r.reaction_type = 'like'
+            WHERE p.user_id = u.id
+        ) AS total_likes
+    FROM unnest(p_user_ids) AS u(id);
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+-- ============================================================
+-- 3. REAÇÕES E SEGUIMENTOS
+-- ============================================================
+
+-- Retorna a reação criada e o autor do post; nenhuma linha se já existia
+CREATE OR REPLACE FUNCTION add_post_reaction(p_post_id UUID, p_user_id UUID, p_reaction_type TEXT)
+RETURNS TABLE (
+    reaction JSONB,
+    post_owner_id UUID
+) AS $$
+    WITH inserted AS (
+        INSERT INTO reactions (post_id, user_id, reaction_type)
+        VALUES (p_post_id, p_user_id, p_reaction_type)
+        ON CONFLICT (post_id, user_id, reaction_type) DO NOTHING
+        RETURNING *
+    )
+    SELECT to_jsonb(i), p.user_id
+    FROM inserted i
+    LEFT JOIN posts p ON p.id = i.post_id;
+$$ LANGUAGE sql SECURITY DEFINER;
+
+-- Remove as reações do usuário no post (p_reaction_type NULL = todas) e
+-- retorna as removidas com o autor do post
+CREATE OR REPLACE FUNCTION remove_post_reactions(p_post_id UUID, p_user_id UUID, p_reaction_type TEXT DEFAULT NULL)
+RETURNS TABLE (
+    reaction_type TEXT,
+    post_owner_id UUID
+) AS $$
+    WITH deleted AS (
+        DELETE FROM reactions r
+        WHERE r.post_id = p_post_id
+          AND r.user_id = p_user_id
+          AND (p_reaction_type IS NULL OR r.reaction_type = p_reaction_type)
+        RETURNING r.post_id, r.reaction_type
+    )
+    SELECT d.reaction_type::TEXT, p.user_id
+    FROM deleted d
+    LEFT JOIN posts p ON p.id = d.post_id;
+$$ LANGUAGE sql SECURITY DEFINER;
+
+-- TRUE se o seguimento foi criado (FALSE se já existia)
+CREATE OR REPLACE FUNCTION add_follow(p_follower_id UUID, p_following_id UUID)
+RETURNS BOOLEAN AS $$
+    WITH inserted AS (
+        INSERT INTO follows (follower_id, following_id)
+        VALUES (p_follower_id, p_following_id)
+        ON CONFLICT (follower_id, following_id) DO NOTHING
+        RETURNING 1
+    )
+    SELECT EXISTS (SELECT 1 FROM inserted);
+$$ LANGUAGE sql SECURITY DEFINER;
+
+-- TRUE se o seguimento existia e foi removido
+CREATE OR REPLACE FUNCTION remove_follow(p_follower_id UUID, p_following_id UUID)
+RETURNS BOOLEAN AS $$
+    WITH deleted AS (
+        DELETE FROM follows f
+        WHERE f.follower_id = p_follower_id AND f.following_id = p_following_id
+        RETURNING 1
+    )
+    SELECT EXISTS (SELECT 1 FROM deleted);
+$$ LANGUAGE sql SECURITY DEFINER;
+
+-- Comentários
+COMMENT ON FUNCTION add_post_reaction IS 'Cria a reação se ainda não existe e retorna a reação criada com o autor do post';
+COMMENT ON FUNCTION remove_post_reactions IS 'Remove reações do usuário em um post e retorna as removidas com o autor do post';
+COMMENT ON FUNCTION add_follow IS 'Cria o seguimento se ainda não existe (TRUE se criado)';
+COMMENT ON FUNCTION remove_follow IS 'Remove o seguimento (TRUE se existia)';
+COMMENT ON FUNCTION get_social_user_counters IS 'Seguidores, seguindo, posts e likes recebidos de cada usuário (fonte de verdade dos contadores em Redis)';
+
+SELECT 'Migração 034: Contadores sociais configurados!' as status;
@@ -0,0 +1,117 @@
+-- ============================================================
+-- Migração 035: Contadores de Likes e Comentários por Post
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- O feed buscava todas as linhas de reactions/comments dos posts da
+-- página para contá-las em Python; um post com 100 mil likes trafegava
+-- 100 mil linhas a cada renderização. Esta migração:
+-- 1. Adiciona posts.likes_count e posts.comments_count
+-- 2. Mantém os contadores via triggers na mesma transação da escrita
+-- 3. Faz o backfill a partir das tabelas de origem
+-- 4. Passa get_social_user_counters (migração 034) a somar likes_count
+-- ============================================================
+
+-- ============================================================
+-- 1. COLUNAS
+-- ============================================================
+
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS likes_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS comments_count INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_posts_likes_count ON posts(likes_count DESC, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_comments_post_id ON comments(post_id);
+
+-- ============================================================
+-- 2. TRIGGERS
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION update_post_likes_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.post_id IS NOT NULL AND NEW.reaction_type = 'like' THEN
+        UPDATE posts SET likes_count = likes_count + 1 WHERE id = NEW.post_id;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.post_id IS NOT NULL AND OLD.reaction_type = 'like' THEN
+        UPDATE posts SET likes_count = GREATEST(likes_count - 1, 0) WHERE id = OLD.post_id;
+    END IF;
+
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DROP TRIGGER IF EXISTS update_post_likes_count_trigger ON reactions;
+CREATE TRIGGER update_post_likes_count_trigger
+    AFTER INSERT OR DELETE OR UPDATE OF post_id, reaction_type ON reactions
+    FOR EACH ROW
+    EXECUTE FUNCTION update_post_likes_count();
+
+CREATE OR REPLACE FUNCTION update_post_comments_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE posts SET comments_count = comments_count + 1 WHERE id = NEW.post_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE posts SET comments_count = GREATEST(comments_count - 1, 0) WHERE id = OLD.post_id;
+    END IF;
+
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+DROP TRIGGER IF EXISTS update_post_comments_count_trigger ON comments;
+CREATE TRIGGER update_post_comments_count_trigger
+    AFTER INSERT OR DELETE ON comments
+    FOR EACH ROW
+    EXECUTE FUNCTION update_post_comments_count();
+
+-- ============================================================
+-- 3. BACKFILL
+-- ============================================================
+
+UPDATE posts p
+SET likes_count = COALESCE(r.total, 0)
+FROM (
+    SELECT post_id, COUNT(*) AS total
+    FROM reactions
+    WHERE post_id IS NOT NULL AND reaction_type = 'like'
+    GROUP BY post_id
+) r
+WHERE r.post_id = p.id;
+
+UPDATE posts p
+SET comments_count = c.total
+FROM (
+    SELECT post_id, COUNT(*) AS total
+    FROM comments
+    GROUP BY post_id
+) c
+WHERE c.post_id = p.id;
+
+-- ============================================================
+-- 4. CONTADORES POR USUÁRIO
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION get_social_user_counters(p_user_ids UUID[])
+RETURNS TABLE (
+    user_id UUID,
+    followers BIGINT,
+    following BIGINT,
+    posts BIGINT,
+    total_likes BIGINT
+) AS $$
+    SELECT
+        u.id AS user_id,
+        (SELECT COUNT(*) FROM follows f WHERE f.following_id = u.id) AS followers,
+        (SELECT COUNT(*) FROM follows f WHERE f.follower_id = u.id) AS following,
+        (SELECT COUNT(*) FROM posts p WHERE p.user_id = u.id) AS posts,
+        (SELECT COALESCE(SUM(p.likes_count), 0) FROM posts p WHERE p.user_id = u.id)::BIGINT AS total_likes
+    FROM unnest(p_user_ids) AS u(id);
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+-- Comentários
+COMMENT ON COLUMN posts.likes_count IS 'Reações do tipo like no post (mantido por trigger)';
+COMMENT ON COLUMN posts.comments_count IS 'Comentários do post (mantido por trigger)';
+
+SELECT 'Migração 035: Contadores de posts configurados!' as status;
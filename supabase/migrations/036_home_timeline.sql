@@ -0,0 +1,65 @@
+-- ============================================================
+-- Migração 036: Timeline Personalizada (Keyset)
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- O feed era a tabela posts inteira paginada por OFFSET. As timelines
+-- por usuário agora ficam em sorted sets Redis
+-- (services/timeline_service.py); esta migração:
+-- 1. Cria o índice (user_id, created_at, id) para paginação keyset
+-- 2. Cria get_home_timeline_ids, usada para reconstruir uma timeline
+--    ausente do Redis (posts próprios + de quem o usuário segue)
+-- ============================================================
+
+-- ============================================================
+-- 1. ÍNDICES
+-- ============================================================
+
+CREATE INDEX IF NOT EXISTS idx_posts_user_created_id ON posts(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_posts_created_id ON posts(created_at DESC, id DESC);
+
+-- ============================================================
+-- 2. FUNÇÃO DE TIMELINE
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION get_home_timeline_ids(
+    p_user_id UUID,
+    p_limit INTEGER DEFAULT 800,
+    p_before_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_before_id UUID DEFAULT NULL,
+    p_exclude_authors UUID[] DEFAULT '{}'
+)
+RETURNS TABLE (
+    id UUID,
+    user_id UUID,
+    created_at TIMESTAMP WITH TIME ZONE
+) AS $$
+    -- Os posts mais recentes de cada autor vêm do índice (user_id, created_at, id);
+    -- o custo depende de quantos autores são seguidos, não do tamanho de posts
+    SELECT p.id, p.user_id, p.created_at
+    FROM (
+        SELECT f.following_id AS author_id FROM follows f WHERE f.follower_id = p_user_id
+        UNION
+        SELECT p_user_id
+    ) a
+    CROSS JOIN LATERAL (
+        SELECT ap.id, ap.user_id, ap.created_at
+        FROM posts ap
+        WHERE ap.user_id = a.author_id
+          AND (
+              p_before_created_at IS NULL
+              OR (ap.created_at, ap.id) < (p_before_created_at, p_before_id)
+          )
+        ORDER BY ap.created_at DESC, ap.id DESC
+        LIMIT p_limit
+    ) p
+    WHERE NOT (a.author_id = ANY(p_exclude_authors))
+    ORDER BY p.created_at DESC, p.id DESC
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+-- Comentários
+COMMENT ON FUNCTION get_home_timeline_ids IS 'Ids da timeline de um usuário (posts próprios e de quem segue) em ordem keyset (created_at, id)';
+
+SELECT 'Migração 036: Timeline personalizada configurada!' as status;
@@ -0,0 +1,106 @@
+-- ============================================================
+-- Migração 037: Pipeline de Notificações
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- As notificações eram criadas por triggers, uma linha por curtida,
+-- comentário ou seguidor, e a contagem de não lidas era uma query a cada
+-- página. Agora o backend as enfileira (fila social_notifications), agrupa
+-- eventos semelhantes ("Ana e outras 40 pessoas curtiram seu post") e
+-- grava cada lote com uma chamada. Esta migração:
+-- 1. Remove os triggers create_notification (substituídos pela fila)
+-- 2. Adiciona colunas de agrupamento (group_key, actor_ids, actor_count, updated_at)
+-- 3. Garante uma notificação não lida por (user_id, group_key)
+-- 4. Cria upsert_notifications para gravação em lote
+-- ============================================================
+
+-- ============================================================
+-- 1. TRIGGERS ANTIGOS
+-- ============================================================
+
+DROP TRIGGER IF EXISTS trigger_notifications_reactions ON reactions;
+DROP TRIGGER IF EXISTS trigger_notifications_comments ON comments;
+DROP TRIGGER IF EXISTS trigger_notifications_follows ON follows;
+
+-- ============================================================
+-- 2. COLUNAS
+-- ============================================================
+
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS group_key TEXT;
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS actor_ids UUID[] NOT NULL DEFAULT '{}';
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS actor_count INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE notifications ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+
+UPDATE notifications
+SET actor_ids = CASE WHEN from_user_id IS NULL THEN '{}' ELSE ARRAY[from_user_id] END,
+    updated_at = created_at
+WHERE updated_at IS NULL OR cardinality(actor_ids) = 0;
+
+-- ============================================================
+-- 3. ÍNDICES
+-- ============================================================
+
+-- Alvo do ON CONFLICT: eventos novos se juntam à notificação ainda não lida
+CREATE UNIQUE INDEX IF NOT EXISTS idx_notifications_unread_group
+    ON notifications(user_id, group_key)
+    WHERE is_read = false AND group_key IS NOT NULL;
+
+-- Paginação keyset da lista (updated_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_notifications_user_updated
+    ON notifications(user_id, updated_at DESC, id DESC);
+
+-- ============================================================
+-- 4. GRAVAÇÃO EM LOTE
+-- ============================================================
+
+-- p_items: [{user_id, from_user_id, type, title, message, data, group_key,
+--            actor_ids, actor_count}], no máximo um item por (user_id, group_key)
+CREATE OR REPLACE FUNCTION upsert_notifications(p_items JSONB)
+RETURNS TABLE (
+    id UUID,
+    user_id UUID,
+    group_key TEXT,
+    actor_count INTEGER,
+    inserted BOOLEAN
+) AS $$
+    INSERT INTO notifications AS n (
+        user_id, from_user_id, type, title, message, data,
+        group_key, actor_ids, actor_count, updated_at
+    )
+    SELECT
+        (i->>'user_id')::UUID,
+        (i->>'from_user_id')::UUID,
+        i->>'type',
+        i->>'title',
+        i->>'message',
+        i->'data',
+        i->>'group_key',
+        ARRAY(SELECT jsonb_array_elements_text(COALESCE(i->'actor_ids', '[]'::JSONB)))::UUID[],
+        COALESCE((i->>'actor_count')::INTEGER, 1),
+        NOW()
+    FROM jsonb_array_elements(p_items) AS i
+    ON CONFLICT (user_id, group_key) WHERE is_read = false AND group_key IS NOT NULL
+    DO UPDATE SET
+        -- Atores já exibidos não contam de novo (ex.: descurtiu e curtiu outra vez)
+        actor_count = n.actor_count + EXCLUDED.actor_count - cardinality(ARRAY(
+            SELECT unnest(EXCLUDED.actor_ids) INTERSECT SELECT unnest(n.actor_ids)
+        )),
+        actor_ids = (EXCLUDED.actor_ids || ARRAY(
+            SELECT a FROM unnest(n.actor_ids) AS a WHERE a <> ALL(EXCLUDED.actor_ids)
+        ))[1:10],
+        from_user_id = EXCLUDED.from_user_id,
+        title = EXCLUDED.title,
+        message = EXCLUDED.message,
+        data = EXCLUDED.data,
+        updated_at = NOW()
+    RETURNING n.id, n.user_id, n.group_key, n.actor_count, (n.xmax = 0) AS inserted;
+$$ LANGUAGE sql VOLATILE SECURITY DEFINER;
+
+-- Comentários
+COMMENT ON COLUMN notifications.group_key IS 'Chave de agrupamento (ex.: like:post:{id}); eventos iguais viram uma notificação não lida';
+COMMENT ON COLUMN notifications.actor_ids IS 'Atores mais recentes do grupo (até 10)';
+COMMENT ON COLUMN notifications.actor_count IS 'Total de atores do grupo';
+COMMENT ON FUNCTION upsert_notifications IS 'Grava um lote de notificações agrupadas; inserted indica notificação nova (não lida)';
+
+SELECT 'Migração 037: Pipeline de notificações configurado!' as status;
@@ -0,0 +1,118 @@
+-- ============================================================
+-- Migração 038: Leaderboards
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- Os rankings passam a ser servidos por sorted sets no Redis (geral,
+-- semanal, mensal e por desafio), alimentados a cada ponto concedido.
+-- O banco continua sendo a fonte da verdade (ledger user_points). Esta
+-- migração:
+-- 1. Cria leaderboard_snapshots (fotos periódicas dos rankings)
+-- 2. Cria replace_leaderboard_snapshot para gravar uma foto em uma chamada
+-- 3. Cria get_leaderboard_ledger_totals para reconstruir os rankings a
+--    partir do ledger, em lotes de usuários
+-- ============================================================
+
+-- ============================================================
+-- 1. TABELA
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS leaderboard_snapshots (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    board TEXT NOT NULL, -- 'global', 'weekly:2026-W42', 'monthly:2026-10', 'challenge:{id}'
+    user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+    rank INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    taken_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_leaderboard_snapshots_board_rank
+    ON leaderboard_snapshots(board, rank);
+
+-- Reconstrução por janela (SUM ... FILTER (WHERE created_at >= ...))
+CREATE INDEX IF NOT EXISTS idx_user_points_user_created
+    ON user_points(user_id, created_at);
+
+-- ============================================================
+-- 2. FOTO DE UM RANKING
+-- ============================================================
+
+-- p_rows: [{user_id, rank, points}] (topo do ranking)
+CREATE OR REPLACE FUNCTION replace_leaderboard_snapshot(p_board TEXT, p_rows JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    DELETE FROM leaderboard_snapshots WHERE board = p_board;
+
+    INSERT INTO leaderboard_snapshots (board, user_id, rank, points)
+    SELECT p_board, (r->>'user_id')::UUID, (r->>'rank')::INTEGER, (r->>'points')::INTEGER
+    FROM jsonb_array_elements(p_rows) AS r;
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- ============================================================
+-- 3. TOTAIS DO LEDGER
+-- ============================================================
+
+-- Totais por usuário, paginados por user_id (keyset)
+CREATE OR REPLACE FUNCTION get_leaderboard_ledger_totals(
+    p_after_user_id UUID DEFAULT NULL,
+    p_limit INTEGER DEFAULT 1000,
+    p_week_start TIMESTAMP WITH TIME ZONE DEFAULT date_trunc('week', NOW()),
+    p_month_start TIMESTAMP WITH TIME ZONE DEFAULT date_trunc('month', NOW())
+)
+RETURNS TABLE (
+    user_id UUID,
+    name TEXT,
+    avatar_url TEXT,
+    total_points BIGINT,
+    week_points BIGINT,
+    month_points BIGINT,
+    challenge_points JSONB
+) AS $$
+    WITH batch AS (
+        SELECT DISTINCT up.user_id
+        FROM user_points up
+        WHERE up.user_id IS NOT NULL
+          AND (p_after_user_id IS NULL OR up.user_id > p_after_user_id)
+        ORDER BY up.user_id
+        LIMIT p_limit
+    )
+    SELECT
+        b.user_id,
+        u.name::TEXT,
+        u.avatar_url::TEXT,
+        COALESCE(SUM(up.points), 0),
+        -- Janelas e desafios contam apenas pontos ganhos (resgates não descontam)
+        COALESCE(SUM(up.points) FILTER (WHERE up.points > 0 AND up.created_at >= p_week_start), 0),
+        COALESCE(SUM(up.points) FILTER (WHERE up.points > 0 AND up.created_at >= p_month_start), 0),
+        (
+            SELECT COALESCE(jsonb_object_agg(c.source_id, c.points), '{}'::JSONB)
+            FROM (
+                SELECT up2.source_id, SUM(up2.points) AS points
+                FROM user_points up2
+                WHERE up2.user_id = b.user_id
+                  AND up2.source = 'challenge'
+                  AND up2.source_id IS NOT NULL
+                  AND up2.points > 0
+                GROUP BY up2.source_id
+            ) c
+        )
+    FROM batch b
+    JOIN user_points up ON up.user_id = b.user_id
+    LEFT JOIN users u ON u.id = b.user_id
+    GROUP BY b.user_id, u.name, u.avatar_url
+    ORDER BY b.user_id;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+-- Comentários
+COMMENT ON TABLE leaderboard_snapshots IS 'Fotos periódicas do topo dos rankings (Redis -> banco)';
+COMMENT ON FUNCTION replace_leaderboard_snapshot IS 'Substitui a foto de um ranking em uma transação';
+COMMENT ON FUNCTION get_leaderboard_ledger_totals IS 'Totais de pontos por usuário (geral, semana, mês e por desafio) a partir de user_points';
+
+SELECT 'Migração 038: Leaderboards configurados!' as status;
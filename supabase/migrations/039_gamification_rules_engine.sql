@@ -0,0 +1,414 @@
+-- ============================================================
+-- Migração 039: Motor de Regras de Gamificação
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- Desafios e conquistas passam a ser avaliados por eventos de domínio
+-- (exercício registrado, alimento no diário, pedido pago, post criado)
+-- consumidos de uma fila pelo GamificationEngine. Cada evento avalia
+-- apenas as regras indexadas pelo seu tipo e atualiza o progresso de forma
+-- incremental. Esta migração:
+-- 1. Cria user_achievement_progress (progresso das conquistas)
+-- 2. Cria user_gamification_stats (contadores e sequência de dias ativos
+--    por usuário, lidos em uma consulta)
+-- 3. Cria gamification_processed_events (eventos já aplicados: cada evento
+--    concede pontos e conquistas uma única vez, mesmo com retry da fila)
+-- 4. Cria apply_gamification_events para aplicar um lote em uma transação
+-- 5. Mantém os contadores de user_gamification_stats por triggers
+-- 6. Remove o trigger check_challenge_completion (substituído pelo motor)
+-- 7. Preenche user_gamification_stats com os dados existentes
+-- ============================================================
+
+-- ============================================================
+-- 1. TABELAS
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS user_achievement_progress (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    achievement_id UUID NOT NULL REFERENCES achievements(id) ON DELETE CASCADE,
+    progress INTEGER NOT NULL DEFAULT 0,
+    target INTEGER NOT NULL DEFAULT 1,
+    last_progress_on DATE,
+    unlocked_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (user_id, achievement_id)
+);
+
+CREATE TABLE IF NOT EXISTS user_gamification_stats (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    achievements_count INTEGER NOT NULL DEFAULT 0,
+    completed_challenges_count INTEGER NOT NULL DEFAULT 0,
+    active_challenges_count INTEGER NOT NULL DEFAULT 0,
+    claimed_rewards_count INTEGER NOT NULL DEFAULT 0,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    longest_streak INTEGER NOT NULL DEFAULT 0,
+    last_active_on DATE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS gamification_processed_events (
+    event_id UUID PRIMARY KEY,
+    user_id UUID,
+    processed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_gamification_processed_events_at
+    ON gamification_processed_events(processed_at);
+
+-- Dia do último avanço (regras por dias distintos ou consecutivos)
+ALTER TABLE user_challenges ADD COLUMN IF NOT EXISTS last_progress_on DATE;
+
+-- Conquistas concedidas pelo motor apontam para o template
+ALTER TABLE user_achievements ADD COLUMN IF NOT EXISTS achievement_id UUID REFERENCES achievements(id) ON DELETE SET NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_achievements_user_achievement
+    ON user_achievements(user_id, achievement_id) WHERE achievement_id IS NOT NULL;
+
+-- ============================================================
+-- 2. PROGRESSO DE UMA REGRA
+-- ============================================================
+
+-- p_mode: 'count' (soma p_amount), 'days' (dias distintos) ou
+-- 'consecutive' (dias seguidos; um dia sem evento reinicia em 1)
+CREATE OR REPLACE FUNCTION next_rule_progress(
+    p_mode TEXT,
+    p_progress INTEGER,
+    p_last DATE,
+    p_day DATE,
+    p_amount INTEGER
+)
+RETURNS INTEGER AS $$
+    SELECT CASE
+        WHEN p_mode = 'days' THEN
+            p_progress + CASE WHEN p_last IS NULL OR p_day > p_last THEN 1 ELSE 0 END
+        WHEN p_mode = 'consecutive' THEN
+            CASE
+                WHEN p_last IS NULL THEN 1
+                WHEN p_day <= p_last THEN p_progress
+                WHEN p_day = p_last + 1 THEN p_progress + 1
+                ELSE 1
+            END
+        ELSE p_progress + COALESCE(p_amount, 1)
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- ============================================================
+-- 3. APLICAÇÃO DE UM LOTE DE EVENTOS
+-- ============================================================
+
+-- p_events: [{event_id, user_id, day, active_day, updates: [{kind, rule_id,
+-- mode, amount, target, points, title, description, icon, rarity}]}]
+-- Retorna o progresso de cada regra alterada (completed = concluída agora)
+CREATE OR REPLACE FUNCTION apply_gamification_events(p_events JSONB)
+RETURNS TABLE (
+    user_id UUID,
+    kind TEXT,
+    rule_id UUID,
+    progress INTEGER,
+    target INTEGER,
+    completed BOOLEAN,
+    points INTEGER,
+    title TEXT
+) AS $$
+#variable_conflict use_column
+DECLARE
+    v_event JSONB;
+    v_update JSONB;
+    v_user UUID;
+    v_day DATE;
+    v_rule UUID;
+    v_points INTEGER;
+    v_row RECORD;
+    v_inserted INTEGER;
+BEGIN
+    FOR v_event IN SELECT * FROM jsonb_array_elements(p_events) LOOP
+        v_user := (v_event->>'user_id')::UUID;
+        v_day := (v_event->>'day')::DATE;
+
+        INSERT INTO gamification_processed_events (event_id, user_id)
+        VALUES ((v_event->>'event_id')::UUID, v_user)
+        ON CONFLICT (event_id) DO NOTHING;
+        GET DIAGNOSTICS v_inserted = ROW_COUNT;
+        CONTINUE WHEN v_inserted = 0;
+
+        -- Sequência de dias ativos
+        IF COALESCE((v_event->>'active_day')::BOOLEAN, false) THEN
+            INSERT INTO user_gamification_stats AS s (user_id, current_streak, longest_streak, last_active_on)
+            VALUES (v_user, 1, 1, v_day)
+            ON CONFLICT (user_id) DO UPDATE SET
+                current_streak = next_rule_progress('consecutive', s.current_streak, s.last_active_on, v_day, 1),
+                longest_streak = GREATEST(s.longest_streak, next_rule_progress('consecutive', s.current_streak, s.last_active_on, v_day, 1)),
+                last_active_on = GREATEST(s.last_active_on, v_day),
+                updated_at = NOW();
+        END IF;
+
+        FOR v_update IN SELECT * FROM jsonb_array_elements(COALESCE(v_event->'updates', '[]'::JSONB)) LOOP
+            v_rule := (v_update->>'rule_id')::UUID;
+            v_points := COALESCE((v_update->>'points')::INTEGER, 0);
+
+            IF v_update->>'kind' = 'challenge' THEN
+                -- Apenas desafios iniciados pelo usuário e ainda válidos
+                UPDATE user_challenges uc SET
+                    progress = LEAST(
+                        next_rule_progress(v_update->>'mode', uc.progress, uc.last_progress_on, v_day, (v_update->>'amount')::INTEGER),
+                        uc.target
+                    ),
+                    last_progress_on = GREATEST(uc.last_progress_on, v_day),
+                    updated_at = NOW()
+                WHERE uc.user_id = v_user
+                  AND uc.challenge_id = v_rule
+                  AND uc.status = 'in_progress'
+                  AND (uc.expires_at IS NULL OR uc.expires_at > NOW())
+                RETURNING uc.id, uc.progress, uc.target INTO v_row;
+                CONTINUE WHEN NOT FOUND;
+
+                IF v_row.progress >= v_row.target THEN
+                    UPDATE user_challenges
+                    SET status = 'completed', completed_at = NOW(), points_earned = v_points, updated_at = NOW()
+                    WHERE id = v_row.id;
+                    IF v_points <> 0 THEN
+                        INSERT INTO user_points (user_id, points, source, source_id, description)
+                        VALUES (v_user, v_points, 'challenge', v_rule, 'Desafio completado: ' || COALESCE(v_update->>'title', ''));
+                    END IF;
+                END IF;
+            ELSE
+                -- Conquistas valem para todos os usuários; desbloqueadas não mudam mais
+                INSERT INTO user_achievement_progress AS p (user_id, achievement_id, progress, target, last_progress_on)
+                VALUES (
+                    v_user,
+                    v_rule,
+                    LEAST(next_rule_progress(v_update->>'mode', 0, NULL, v_day, (v_update->>'amount')::INTEGER), (v_update->>'target')::INTEGER),
+                    (v_update->>'target')::INTEGER,
+                    v_day
+                )
+                ON CONFLICT (user_id, achievement_id) DO UPDATE SET
+                    progress = LEAST(
+                        next_rule_progress(v_update->>'mode', p.progress, p.last_progress_on, v_day, (v_update->>'amount')::INTEGER),
+                        EXCLUDED.target
+                    ),
+                    target = EXCLUDED.target,
+                    last_progress_on = GREATEST(p.last_progress_on, v_day),
+                    updated_at = NOW()
+                WHERE p.unlocked_at IS NULL
+                RETURNING p.progress, p.target INTO v_row;
+                CONTINUE WHEN NOT FOUND;
+
+                IF v_row.progress >= v_row.target THEN
+                    UPDATE user_achievement_progress
+                    SET unlocked_at = NOW()
+                    WHERE user_achievement_progress.user_id = v_user AND achievement_id = v_rule;
+
+                    INSERT INTO user_achievements (user_id, achievement_id, title, description, icon, rarity, points)
+                    VALUES (
+                        v_user,
+                        v_rule,
+                        COALESCE(v_update->>'title', 'Conquista'),
+                        v_update->>'description',
+                        v_update->>'icon',
+                        CASE WHEN v_update->>'rarity' IN ('common', 'rare', 'epic', 'legendary') THEN v_update->>'rarity' ELSE 'common' END,
+                        v_points
+                    )
+                    ON CONFLICT (user_id, achievement_id) WHERE achievement_id IS NOT NULL DO NOTHING;
+
+                    IF v_points <> 0 THEN
+                        INSERT INTO user_points (user_id, points, source, source_id, description)
+                        VALUES (v_user, v_points, 'achievement', v_rule, 'Conquista: ' || COALESCE(v_update->>'title', ''));
+                    END IF;
+                END IF;
+            END IF;
+
+            user_id := v_user;
+            kind := v_update->>'kind';
+            rule_id := v_rule;
+            progress := v_row.progress;
+            target := v_row.target;
+            completed := v_row.progress >= v_row.target;
+            points := CASE WHEN v_row.progress >= v_row.target THEN v_points ELSE 0 END;
+            title := v_update->>'title';
+            RETURN NEXT;
+        END LOOP;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- ============================================================
+-- 4. CONTADORES POR TRIGGER
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION bump_gamification_stats(
+    p_user_id UUID,
+    p_achievements INTEGER,
+    p_completed INTEGER,
+    p_active INTEGER,
+    p_rewards INTEGER
+)
+RETURNS VOID AS $$
+    INSERT INTO user_gamification_stats AS s (
+        user_id, achievements_count, completed_challenges_count, active_challenges_count, claimed_rewards_count
+    )
+    VALUES (p_user_id, GREATEST(p_achievements, 0), GREATEST(p_completed, 0), GREATEST(p_active, 0), GREATEST(p_rewards, 0))
+    ON CONFLICT (user_id) DO UPDATE SET
+        achievements_count = GREATEST(s.achievements_count + p_achievements, 0),
+        completed_challenges_count = GREATEST(s.completed_challenges_count + p_completed, 0),
+        active_challenges_count = GREATEST(s.active_challenges_count + p_active, 0),
+        claimed_rewards_count = GREATEST(s.claimed_rewards_count + p_rewards, 0),
+        updated_at = NOW();
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION update_challenge_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.user_id IS NOT NULL THEN
+        PERFORM bump_gamification_stats(
+            OLD.user_id, 0,
+            -(OLD.status = 'completed')::INTEGER,
+            -(OLD.status = 'in_progress')::INTEGER,
+            0
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.user_id IS NOT NULL THEN
+        PERFORM bump_gamification_stats(
+            NEW.user_id, 0,
+            (NEW.status = 'completed')::INTEGER,
+            (NEW.status = 'in_progress')::INTEGER,
+            0
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_update_challenge_stats ON user_challenges;
+CREATE TRIGGER trigger_update_challenge_stats
+    AFTER INSERT OR DELETE OR UPDATE OF status, user_id ON user_challenges
+    FOR EACH ROW
+    EXECUTE FUNCTION update_challenge_stats();
+
+CREATE OR REPLACE FUNCTION update_achievement_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' AND NEW.user_id IS NOT NULL THEN
+        PERFORM bump_gamification_stats(NEW.user_id, 1, 0, 0, 0);
+    ELSIF TG_OP = 'DELETE' AND OLD.user_id IS NOT NULL THEN
+        PERFORM bump_gamification_stats(OLD.user_id, -1, 0, 0, 0);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_update_achievement_stats ON user_achievements;
+CREATE TRIGGER trigger_update_achievement_stats
+    AFTER INSERT OR DELETE ON user_achievements
+    FOR EACH ROW
+    EXECUTE FUNCTION update_achievement_stats();
+
+CREATE OR REPLACE FUNCTION update_reward_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' AND NEW.user_id IS NOT NULL THEN
+        PERFORM bump_gamification_stats(NEW.user_id, 0, 0, 0, 1);
+    ELSIF TG_OP = 'DELETE' AND OLD.user_id IS NOT NULL THEN
+        PERFORM bump_gamification_stats(OLD.user_id, 0, 0, 0, -1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_update_reward_stats ON user_rewards;
+CREATE TRIGGER trigger_update_reward_stats
+    AFTER INSERT OR DELETE ON user_rewards
+    FOR EACH ROW
+    EXECUTE FUNCTION update_reward_stats();
+
+-- ============================================================
+-- 5. TRIGGER ANTIGO DE DESAFIOS
+-- ============================================================
+
+-- O motor avalia os desafios; manter o trigger contaria eventos duas vezes
+DROP TRIGGER IF EXISTS trigger_check_challenge_completion ON user_activities;
+
+-- Pedido conta quando é pago (evento order_paid)
+UPDATE challenges
+SET requirements = jsonb_set(requirements, '{action}', '"order_paid"'), updated_at = NOW()
+WHERE code = 'first_order' AND requirements->>'action' = 'order_created';
+
+-- ============================================================
+-- 6. CARGA INICIAL
+-- ============================================================
+
+INSERT INTO user_gamification_stats (
+    user_id, achievements_count, completed_challenges_count, active_challenges_count, claimed_rewards_count
+)
+SELECT
+    u.id,
+    (SELECT COUNT(*) FROM user_achievements ua WHERE ua.user_id = u.id),
+    (SELECT COUNT(*) FROM user_challenges uc WHERE uc.user_id = u.id AND uc.status = 'completed'),
+    (SELECT COUNT(*) FROM user_challenges uc WHERE uc.user_id = u.id AND uc.status = 'in_progress'),
+    (SELECT COUNT(*) FROM user_rewards ur WHERE ur.user_id = u.id)
+FROM users u
+ON CONFLICT (user_id) DO UPDATE SET
+    achievements_count = EXCLUDED.achievements_count,
+    completed_challenges_count = EXCLUDED.completed_challenges_count,
+    active_challenges_count = EXCLUDED.active_challenges_count,
+    claimed_rewards_count = EXCLUDED.claimed_rewards_count,
+    updated_at = NOW();
+
+-- Sequências a partir dos rollups diários (dias com alimento ou exercício)
+WITH active_days AS (
+    SELECT user_id, day
+    FROM health_daily_rollups
+    WHERE food_entries > 0 OR exercise_entries > 0
+),
+runs AS (
+    SELECT user_id, MAX(day) AS last_day, COUNT(*) AS length
+    FROM (
+        SELECT user_id, day, day - (ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY day))::INTEGER AS run
+        FROM active_days
+    ) d
+    GROUP BY user_id, run
+),
+streaks AS (
+    SELECT DISTINCT ON (user_id)
+        user_id,
+        length AS current_streak,
+        last_day,
+        MAX(length) OVER (PARTITION BY user_id) AS longest_streak
+    FROM runs
+    ORDER BY user_id, last_day DESC
+)
+UPDATE user_gamification_stats s
+SET current_streak = st.current_streak,
+    longest_streak = st.longest_streak,
+    last_active_on = st.last_day,
+    updated_at = NOW()
+FROM streaks st
+WHERE s.user_id = st.user_id;
+
+-- ============================================================
+-- 7. RLS
+-- ============================================================
+
+ALTER TABLE IF EXISTS user_achievement_progress ENABLE ROW LEVEL SECURITY;
+ALTER TABLE IF EXISTS user_gamification_stats ENABLE ROW LEVEL SECURITY;
+ALTER TABLE IF EXISTS gamification_processed_events ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_policies WHERE schemaname = 'public' AND tablename = 'user_achievement_progress' AND policyname = 'Users can view own achievement progress') THEN
+        CREATE POLICY "Users can view own achievement progress" ON user_achievement_progress
+            FOR SELECT USING (auth.uid() = user_id);
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM pg_policies WHERE schemaname = 'public' AND tablename = 'user_gamification_stats' AND policyname = 'Users can view own gamification stats') THEN
+        CREATE POLICY "Users can view own gamification stats" ON user_gamification_stats
+            FOR SELECT USING (auth.uid() = user_id);
+    END IF;
+END $$;
+
+-- Comentários
+COMMENT ON TABLE user_achievement_progress IS 'Progresso incremental das conquistas (motor de regras)';
+COMMENT ON TABLE user_gamification_stats IS 'Contadores de gamificação e sequência de dias ativos por usuário';
+COMMENT ON TABLE gamification_processed_events IS 'Eventos de domínio já aplicados pelo motor de regras (idempotência)';
+COMMENT ON FUNCTION apply_gamification_events IS 'Aplica um lote de eventos: progresso, conclusão de desafios, conquistas e pontos, uma vez por evento';
+
+SELECT 'Migração 039: Motor de regras de gamificação configurado!' as status;
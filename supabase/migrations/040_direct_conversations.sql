@@ -0,0 +1,267 @@
+-- ============================================================
+-- Migração 040: Índice de Conversas de Mensagens Diretas
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- A caixa de entrada deixa de ser derivada de direct_messages a cada
+-- leitura. Esta migração:
+-- 1. Cria direct_conversations (uma linha por participante: última
+--    mensagem e não lidas), lida em uma consulta paginada
+-- 2. Adiciona direct_messages.pair_key (par de usuários ordenado) e um
+--    índice para o histórico paginado por cursor
+-- 3. Mantém direct_conversations por triggers de instrução (um lote de
+--    mensagens ou de leituras atualiza cada conversa uma vez)
+-- 4. Cria insert_direct_messages (gravação em lote idempotente, usada pelo
+--    worker de mensagens) e mark_direct_messages_read (confirmação de
+--    leitura em lote). A leitura grava uma marca (last_read_at) na
+--    conversa; mensagens gravadas depois pelo worker e criadas até a marca
+--    já entram como lidas
+-- 5. Preenche direct_conversations com as mensagens existentes
+-- ============================================================
+
+-- ============================================================
+-- 1. TABELA
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS direct_conversations (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    other_user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    last_message_id UUID,
+    last_message TEXT,
+    last_attachment_type TEXT,
+    last_sender_id UUID,
+    last_message_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    unread_count INTEGER NOT NULL DEFAULT 0,
+    last_read_at TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (user_id, other_user_id)
+);
+
+-- Caixa de entrada (keyset por last_message_at, other_user_id)
+CREATE INDEX IF NOT EXISTS idx_direct_conversations_inbox
+    ON direct_conversations(user_id, last_message_at DESC, other_user_id DESC);
+
+-- ============================================================
+-- 2. HISTÓRICO POR PAR DE USUÁRIOS
+-- ============================================================
+
+ALTER TABLE direct_messages ADD COLUMN IF NOT EXISTS pair_key TEXT
+    GENERATED ALWAYS AS (LEAST(sender_id, recipient_id)::TEXT || ':' || GREATEST(sender_id, recipient_id)::TEXT) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_direct_messages_pair_created
+    ON direct_messages(pair_key, created_at DESC, id DESC);
+
+-- ============================================================
+-- 3. TRIGGERS
+-- ============================================================
+
+-- Novas mensagens: última mensagem dos dois lados e não lidas do destinatário
+-- (mensagens já gravadas como lidas não contam)
+CREATE OR REPLACE FUNCTION update_direct_conversations_on_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    WITH sides AS (
+        SELECT m.sender_id AS owner_id, m.recipient_id AS other_id, 0 AS unread,
+               m.id, m.sender_id, m.content, m.attachment_type, m.created_at
+        FROM new_rows m
+        UNION ALL
+        SELECT m.recipient_id, m.sender_id, CASE WHEN m.read_at IS NULL THEN 1 ELSE 0 END,
+               m.id, m.sender_id, m.content, m.attachment_type, m.created_at
+        FROM new_rows m
+    ),
+    latest AS (
+        SELECT DISTINCT ON (owner_id, other_id) *
+        FROM sides
+        ORDER BY owner_id, other_id, created_at DESC, id DESC
+    ),
+    unread AS (
+        SELECT owner_id, other_id, SUM(unread)::INTEGER AS total
+        FROM sides
+        GROUP BY owner_id, other_id
+    )
+    INSERT INTO direct_conversations AS c (
+        user_id, other_user_id, last_message_id, last_message, last_attachment_type,
+        last_sender_id, last_message_at, unread_count
+    )
+    SELECT l.owner_id, l.other_id, l.id, LEFT(l.content, 200), l.attachment_type,
+           l.sender_id, l.created_at, u.total
+    FROM latest l
+    JOIN unread u ON u.owner_id = l.owner_id AND u.other_id = l.other_id
+    ON CONFLICT (user_id, other_user_id) DO UPDATE SET
+        last_message_id = CASE WHEN EXCLUDED.last_message_at >= c.last_message_at THEN EXCLUDED.last_message_id ELSE c.last_message_id END,
+        last_message = CASE WHEN EXCLUDED.last_message_at >= c.last_message_at THEN EXCLUDED.last_message ELSE c.last_message END,
+        last_attachment_type = CASE WHEN EXCLUDED.last_message_at >= c.last_message_at THEN EXCLUDED.last_attachment_type ELSE c.last_attachment_type END,
+        last_sender_id = CASE WHEN EXCLUDED.last_message_at >= c.last_message_at THEN EXCLUDED.last_sender_id ELSE c.last_sender_id END,
+        last_message_at = GREATEST(c.last_message_at, EXCLUDED.last_message_at),
+        unread_count = c.unread_count + EXCLUDED.unread_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_direct_conversations_insert ON direct_messages;
+CREATE TRIGGER trigger_direct_conversations_insert
+    AFTER INSERT ON direct_messages
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION update_direct_conversations_on_insert();
+
+-- Leituras: desconta as não lidas de uma vez por conversa
+CREATE OR REPLACE FUNCTION update_direct_conversations_on_read()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE direct_conversations c
+    SET unread_count = GREATEST(c.unread_count - r.total, 0),
+        last_read_at = GREATEST(c.last_read_at, r.read_at)
+    FROM (
+        SELECT n.recipient_id, n.sender_id, COUNT(*)::INTEGER AS total, MAX(n.read_at) AS read_at
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        WHERE o.read_at IS NULL AND n.read_at IS NOT NULL
+        GROUP BY n.recipient_id, n.sender_id
+    ) r
+    WHERE c.user_id = r.recipient_id AND c.other_user_id = r.sender_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_direct_conversations_read ON direct_messages;
+CREATE TRIGGER trigger_direct_conversations_read
+    AFTER UPDATE ON direct_messages
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION update_direct_conversations_on_read();
+
+-- ============================================================
+-- 4. FUNÇÕES
+-- ============================================================
+
+-- Gravação em lote (write-behind); mensagens já gravadas (retry) e de
+-- usuários inexistentes são ignoradas. Mensagens criadas até a marca de
+-- leitura da conversa (lidas antes de chegarem ao banco) entram com read_at.
+CREATE OR REPLACE FUNCTION insert_direct_messages(p_messages JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    INSERT INTO direct_messages (
+        id, sender_id, recipient_id, content, attachment_url, attachment_type,
+        attachment_filename, attachment_size, created_at, updated_at, read_at
+    )
+    SELECT
+        (m->>'id')::UUID,
+        (m->>'sender_id')::UUID,
+        (m->>'recipient_id')::UUID,
+        COALESCE(m->>'content', ''),
+        m->>'attachment_url',
+        m->>'attachment_type',
+        m->>'attachment_filename',
+        (m->>'attachment_size')::INTEGER,
+        (m->>'created_at')::TIMESTAMPTZ,
+        (m->>'created_at')::TIMESTAMPTZ,
+        CASE WHEN (m->>'created_at')::TIMESTAMPTZ <= c.last_read_at THEN c.last_read_at END
+    FROM jsonb_array_elements(p_messages) AS m
+    LEFT JOIN direct_conversations c
+        ON c.user_id = (m->>'recipient_id')::UUID AND c.other_user_id = (m->>'sender_id')::UUID
+    -- Usuário removido não invalida o lote inteiro
+    WHERE EXISTS (SELECT 1 FROM users s WHERE s.id = (m->>'sender_id')::UUID)
+      AND EXISTS (SELECT 1 FROM users r WHERE r.id = (m->>'recipient_id')::UUID)
+    ORDER BY (m->>'created_at')::TIMESTAMPTZ
+    ON CONFLICT (id) DO NOTHING;
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Confirmação de leitura: uma mensagem (p_message_id) ou a conversa até
+-- p_up_to (NULL = tudo). Retorna as mensagens lidas agrupadas por remetente.
+-- A leitura de conversa também avança a marca last_read_at (criando a linha
+-- da conversa se a primeira mensagem ainda não foi gravada), para que
+-- insert_direct_messages grave como lidas as mensagens ainda na fila.
+CREATE OR REPLACE FUNCTION mark_direct_messages_read(
+    p_user_id UUID,
+    p_other_user_id UUID DEFAULT NULL,
+    p_up_to TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_message_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+    sender_id UUID,
+    read_count INTEGER,
+    read_at TIMESTAMP WITH TIME ZONE
+) AS $$
+    WITH marked AS (
+        UPDATE direct_messages m
+        SET read_at = NOW()
+        WHERE m.recipient_id = p_user_id
+          AND m.read_at IS NULL
+          AND (p_message_id IS NULL OR m.id = p_message_id)
+          AND (p_other_user_id IS NULL OR m.sender_id = p_other_user_id)
+          AND (p_up_to IS NULL OR m.created_at <= p_up_to)
+        RETURNING m.sender_id, m.read_at
+    ),
+    watermark AS (
+        INSERT INTO direct_conversations AS c (user_id, other_user_id, last_message_at, unread_count, last_read_at)
+        SELECT p_user_id, p_other_user_id, '-infinity'::TIMESTAMPTZ, 0, COALESCE(p_up_to, NOW())
+        WHERE p_message_id IS NULL AND p_other_user_id IS NOT NULL
+        ON CONFLICT (user_id, other_user_id) DO UPDATE SET
+            last_read_at = GREATEST(c.last_read_at, EXCLUDED.last_read_at)
+    ),
+    watermark_all AS (
+        UPDATE direct_conversations c
+        SET last_read_at = GREATEST(c.last_read_at, COALESCE(p_up_to, NOW()))
+        WHERE c.user_id = p_user_id AND p_message_id IS NULL AND p_other_user_id IS NULL
+    )
+    SELECT marked.sender_id, COUNT(*)::INTEGER, MAX(marked.read_at)
+    FROM marked
+    GROUP BY marked.sender_id;
+$$ LANGUAGE sql SECURITY DEFINER;
+
+-- ============================================================
+-- 5. CARGA INICIAL
+-- ============================================================
+
+INSERT INTO direct_conversations (
+    user_id, other_user_id, last_message_id, last_message, last_attachment_type,
+    last_sender_id, last_message_at, unread_count
+)
+SELECT
+    latest.owner_id, latest.other_id, latest.id, LEFT(latest.content, 200), latest.attachment_type,
+    latest.sender_id, latest.created_at,
+    (
+        SELECT COUNT(*)
+        FROM direct_messages u
+        WHERE u.recipient_id = latest.owner_id AND u.sender_id = latest.other_id AND u.read_at IS NULL
+    )
+FROM (
+    SELECT DISTINCT ON (sides.owner_id, sides.other_id) sides.*
+    FROM (
+        SELECT m.sender_id AS owner_id, m.recipient_id AS other_id, m.* FROM direct_messages m
+        UNION ALL
+        SELECT m.recipient_id, m.sender_id, m.* FROM direct_messages m
+    ) sides
+    ORDER BY sides.owner_id, sides.other_id, sides.created_at DESC, sides.id DESC
+) latest
+ON CONFLICT (user_id, other_user_id) DO NOTHING;
+
+-- ============================================================
+-- 6. RLS
+-- ============================================================
+
+ALTER TABLE IF EXISTS direct_conversations ENABLE ROW LEVEL SECURITY;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_policies WHERE schemaname = 'public' AND tablename = 'direct_conversations' AND policyname = 'Users can view own conversations') THEN
+        CREATE POLICY "Users can view own conversations" ON direct_conversations
+            FOR SELECT USING (auth.uid() = user_id);
+    END IF;
+END $$;
+
+-- Comentários
+COMMENT ON TABLE direct_conversations IS 'Caixa de entrada: última mensagem e não lidas por participante (mantida por triggers)';
+COMMENT ON COLUMN direct_conversations.last_read_at IS 'Marca de leitura: mensagens criadas até aqui entram como lidas';
+COMMENT ON COLUMN direct_messages.pair_key IS 'Par de usuários ordenado (menor:maior) para o histórico paginado';
+COMMENT ON FUNCTION insert_direct_messages IS 'Grava um lote de mensagens diretas ignorando IDs já gravados';
+COMMENT ON FUNCTION mark_direct_messages_read IS 'Marca mensagens como lidas em uma instrução e retorna o total por remetente';
+
+SELECT 'Migração 040: Índice de conversas configurado!' as status;
@@ -0,0 +1,77 @@
+-- ============================================================
+-- Migração 041: Gravação em Lote de Eventos de Live Streaming
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- Mensagens e presentes de live são aceitos e transmitidos na hora pelo
+-- WebSocket e ficam em um Redis Stream por transmissão; o worker de eventos
+-- de live (workers/live_event_worker.py) grava em lote. Esta migração:
+-- 1. Cria índices (stream_id, created_at) para o histórico do chat e dos
+--    presentes de uma transmissão
+-- 2. Cria insert_stream_events: grava um lote de mensagens e presentes em
+--    uma chamada, ignorando IDs já gravados (entregas repetidas do Redis
+--    Stream) e eventos de transmissões ou usuários removidos
+-- ============================================================
+
+-- ============================================================
+-- 1. ÍNDICES
+-- ============================================================
+
+CREATE INDEX IF NOT EXISTS idx_stream_messages_stream_created
+    ON stream_messages(stream_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_stream_gifts_stream_created
+    ON stream_gifts(stream_id, created_at DESC);
+
+-- ============================================================
+-- 2. FUNÇÕES
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION insert_stream_events(
+    p_messages JSONB DEFAULT '[]'::JSONB,
+    p_gifts JSONB DEFAULT '[]'::JSONB
+)
+RETURNS TABLE (
+    messages_inserted INTEGER,
+    gifts_inserted INTEGER
+) AS $$
+DECLARE
+    v_messages INTEGER;
+    v_gifts INTEGER;
+BEGIN
+    INSERT INTO stream_messages (id, stream_id, user_id, message, created_at)
+    SELECT
+        (m->>'id')::UUID,
+        (m->>'stream_id')::UUID,
+        (m->>'user_id')::UUID,
+        m->>'message',
+        (m->>'created_at')::TIMESTAMPTZ
+    FROM jsonb_array_elements(COALESCE(p_messages, '[]'::JSONB)) AS m
+    WHERE EXISTS (SELECT 1 FROM live_streams s WHERE s.id = (m->>'stream_id')::UUID)
+      AND EXISTS (SELECT 1 FROM users u WHERE u.id = (m->>'user_id')::UUID)
+    ON CONFLICT (id) DO NOTHING;
+    GET DIAGNOSTICS v_messages = ROW_COUNT;
+
+    INSERT INTO stream_gifts (id, stream_id, user_id, gift_id, gift_name, gift_cost, created_at)
+    SELECT
+        (g->>'id')::UUID,
+        (g->>'stream_id')::UUID,
+        (g->>'user_id')::UUID,
+        g->>'gift_id',
+        g->>'gift_name',
+        (g->>'gift_cost')::INTEGER,
+        (g->>'created_at')::TIMESTAMPTZ
+    FROM jsonb_array_elements(COALESCE(p_gifts, '[]'::JSONB)) AS g
+    WHERE EXISTS (SELECT 1 FROM live_streams s WHERE s.id = (g->>'stream_id')::UUID)
+      AND EXISTS (SELECT 1 FROM users u WHERE u.id = (g->>'user_id')::UUID)
+    ON CONFLICT (id) DO NOTHING;
+    GET DIAGNOSTICS v_gifts = ROW_COUNT;
+
+    RETURN QUERY SELECT v_messages, v_gifts;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+COMMENT ON FUNCTION insert_stream_events IS 'Grava um lote de mensagens e presentes de live ignorando IDs já gravados';
+
+SELECT 'Migração 041: Gravação em lote de eventos de live configurada!' as status;
@@ -0,0 +1,34 @@
+-- ============================================================
+-- Migração 042: Faixas de CEP nas Regras de Frete
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- As regras de frete são compiladas em memória pelo backend
+-- (services/shipping_rules.py) e avaliadas sem consultar o banco. Esta
+-- migração:
+-- 1. Adiciona cep_start / cep_end (faixa de CEP de destino, inclusiva) às
+--    regras; regra sem faixa vale para todo o Brasil
+-- ============================================================
+
+-- ============================================================
+-- 1. COLUNAS
+-- ============================================================
+
+ALTER TABLE shipping_rules ADD COLUMN IF NOT EXISTS cep_start VARCHAR(8);
+ALTER TABLE shipping_rules ADD COLUMN IF NOT EXISTS cep_end VARCHAR(8);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'shipping_rules_cep_range_check') THEN
+        ALTER TABLE shipping_rules ADD CONSTRAINT shipping_rules_cep_range_check CHECK (
+            (cep_start IS NULL AND cep_end IS NULL)
+            OR (cep_start ~ '^[0-9]{8}$' AND cep_end ~ '^[0-9]{8}$' AND cep_start <= cep_end)
+        );
+    END IF;
+END $$;
+
+COMMENT ON COLUMN shipping_rules.cep_start IS 'Início da faixa de CEP de destino (8 dígitos, inclusivo); NULL = todo o Brasil';
+COMMENT ON COLUMN shipping_rules.cep_end IS 'Fim da faixa de CEP de destino (8 dígitos, inclusivo)';
+
+SELECT 'Migração 042: Faixas de CEP nas regras de frete configuradas!' as status;
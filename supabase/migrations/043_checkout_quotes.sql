@@ -0,0 +1,97 @@
+-- ============================================================
+-- Migração 043: Criação de Pedido a partir de Cotação de Checkout
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- A página de checkout calcula uma cotação assinada (carrinho, desconto do
+-- cupom e frete, services/checkout_service.py). A criação do pedido
+-- confere a assinatura no backend e faz uma única chamada ao banco. Esta
+-- migração:
+-- 1. Cria create_order_from_quote: confere que o carrinho não mudou desde
+--    a cotação, reserva um uso do cupom e cria o pedido com
+--    create_order_atomic (estoque, pedido, itens e limpeza do carrinho),
+--    tudo na mesma transação
+-- ============================================================
+
+-- ============================================================
+-- 1. FUNÇÕES
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION create_order_from_quote(
+    p_user_id UUID,
+    p_order_data JSONB,
+    p_cart_items JSONB
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_changed INTEGER;
+    v_coupon TEXT := NULLIF(p_order_data->>'coupon_code', '');
+    v_result JSONB;
+BEGIN
+    -- Carrinho atual (produtos ativos) deve ser igual ao da cotação
+    WITH current_cart AS (
+        SELECT ci.product_id, ci.quantity
+        FROM cart_items ci
+        JOIN products p ON p.id = ci.product_id
+        WHERE ci.user_id = p_user_id AND COALESCE(p.is_active, true)
+    ),
+    quoted AS (
+        SELECT (i->>'product_id')::UUID AS product_id, (i->>'quantity')::INTEGER AS quantity
+        FROM jsonb_array_elements(COALESCE(p_cart_items, '[]'::JSONB)) AS i
+    )
+    SELECT COUNT(*) INTO v_changed FROM (
+        (SELECT * FROM current_cart EXCEPT SELECT * FROM quoted)
+        UNION ALL
+        (SELECT * FROM quoted EXCEPT SELECT * FROM current_cart)
+    ) AS diff;
+
+    IF v_changed > 0 THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', 'Carrinho alterado desde a cotação',
+            'code', 'quote_stale'
+        );
+    END IF;
+
+    -- Reservar um uso do cupom (limite conferido na mesma instrução)
+    IF v_coupon IS NOT NULL THEN
+        UPDATE coupons
+        SET usage_count = COALESCE(usage_count, 0) + 1,
+            updated_at = NOW()
+        WHERE code = v_coupon
+          AND COALESCE(is_active, true)
+          AND (valid_until IS NULL OR valid_until > NOW())
+          AND (usage_limit IS NULL OR COALESCE(usage_count, 0) < usage_limit);
+
+        IF NOT FOUND THEN
+            RETURN jsonb_build_object(
+                'success', false,
+                'error', 'Cupom não está mais disponível',
+                'code', 'quote_stale'
+            );
+        END IF;
+    END IF;
+
+    v_result := create_order_atomic(p_user_id, p_order_data, p_cart_items);
+
+    IF NOT COALESCE((v_result->>'success')::BOOLEAN, false) THEN
+        -- Desfaz a reserva do cupom
+        RAISE EXCEPTION '%', COALESCE(v_result->>'error', 'Erro ao criar pedido');
+    END IF;
+
+    RETURN v_result;
+
+EXCEPTION
+    WHEN OTHERS THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', SQLERRM
+        );
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION create_order_from_quote(UUID, JSONB, JSONB) IS
+'Cria pedido a partir de cotação de checkout: confere o carrinho, reserva uso do cupom e chama create_order_atomic em uma transação';
+
+SELECT 'Migração 043: Criação de pedido a partir de cotação configurada!' as status;
@@ -0,0 +1,215 @@
+-- ============================================================
+-- Migração 044: Livro de Estoque (reservas e movimentações)
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- Reservas de estoque são feitas no Redis (services/stock_ledger.py, um
+-- script Lua por operação) e gravadas depois no banco, em lotes, por
+-- workers/stock_ledger_worker.py. Esta migração:
+-- 1. Cria stock_reservations e stock_movements
+-- 2. Cria apply_stock_events: aplica um lote de eventos (reserva,
+--    confirmação, cancelamento, expiração) em uma transação; eventos
+--    repetidos ou fora de ordem são resolvidos pelo estado da reserva, e
+--    eventos inválidos são devolvidos em failed sem desfazer os demais
+-- 3. Cria expire_stock_reservations: expira reservas vencidas e devolve o
+--    estoque em uma instrução (reservas feitas sem Redis)
+-- ============================================================
+
+-- ============================================================
+-- 1. TABELAS
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS stock_reservations (
+    id UUID PRIMARY KEY,
+    product_id UUID NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    order_id UUID,
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    status TEXT NOT NULL DEFAULT 'reserved' CHECK (status IN ('reserved', 'confirmed', 'cancelled', 'expired')),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    confirmed_at TIMESTAMP WITH TIME ZONE,
+    cancelled_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_reservations_pending
+    ON stock_reservations(expires_at) WHERE status = 'reserved';
+CREATE INDEX IF NOT EXISTS idx_stock_reservations_product ON stock_reservations(product_id);
+
+CREATE TABLE IF NOT EXISTS stock_movements (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    product_id UUID NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    product_name TEXT,
+    reservation_id UUID,
+    previous_stock INTEGER,
+    new_stock INTEGER,
+    quantity_change INTEGER NOT NULL,
+    operation TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_movements_product ON stock_movements(product_id, created_at DESC);
+
+-- ============================================================
+-- 2. FUNÇÕES
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION apply_stock_events(
+    p_events JSONB,
+    p_strict BOOLEAN DEFAULT false
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_event JSONB;
+    v_index BIGINT;
+    v_type TEXT;
+    v_reservation UUID;
+    v_product UUID;
+    v_quantity INTEGER;
+    v_change INTEGER;
+    v_stock INTEGER;
+    v_name TEXT;
+    v_applied INTEGER := 0;
+    v_failed JSONB := '[]'::JSONB;
+BEGIN
+    FOR v_event, v_index IN SELECT * FROM jsonb_array_elements(COALESCE(p_events, '[]'::JSONB)) WITH ORDINALITY
+    LOOP
+        -- Cada evento em sua própria subtransação: um evento inválido (UUID
+        -- malformado, produto excluído) não derruba o resto do lote
+        BEGIN
+            v_type := v_event->>'type';
+            v_reservation := (v_event->>'reservation_id')::UUID;
+            v_product := (v_event->>'product_id')::UUID;
+            v_quantity := (v_event->>'quantity')::INTEGER;
+            v_change := 0;
+
+            IF v_type = 'reserve' THEN
+                INSERT INTO stock_reservations (id, product_id, order_id, quantity, status, expires_at, created_at)
+                VALUES (
+                    v_reservation,
+                    v_product,
+                    NULLIF(v_event->>'order_id', '')::UUID,
+                    v_quantity,
+                    'reserved',
+                    (v_event->>'expires_at')::TIMESTAMPTZ,
+                    COALESCE((v_event->>'at')::TIMESTAMPTZ, NOW())
+                )
+                ON CONFLICT (id) DO NOTHING;
+                IF FOUND THEN
+                    v_change := -v_quantity;
+                END IF;
+            ELSE
+                -- confirmed, cancelled ou expired: só reservas ainda pendentes
+                UPDATE stock_reservations
+                SET status = v_type,
+                    confirmed_at = CASE WHEN v_type = 'confirmed' THEN COALESCE((v_event->>'at')::TIMESTAMPTZ, NOW()) END,
+                    cancelled_at = CASE WHEN v_type <> 'confirmed' THEN COALESCE((v_event->>'at')::TIMESTAMPTZ, NOW()) END
+                WHERE id = v_reservation AND status = 'reserved';
+                IF FOUND THEN
+                    IF v_type <> 'confirmed' THEN
+                        v_change := v_quantity;
+                    END IF;
+                ELSE
+                    -- Finalização antes da reserva (lote da reserva ainda em retry):
+                    -- grava a reserva já finalizada; a reserva atrasada é ignorada
+                    INSERT INTO stock_reservations (id, product_id, quantity, status, expires_at, confirmed_at, cancelled_at)
+                    VALUES (
+                        v_reservation,
+                        v_product,
+                        v_quantity,
+                        v_type,
+                        COALESCE((v_event->>'at')::TIMESTAMPTZ, NOW()),
+                        CASE WHEN v_type = 'confirmed' THEN COALESCE((v_event->>'at')::TIMESTAMPTZ, NOW()) END,
+                        CASE WHEN v_type <> 'confirmed' THEN COALESCE((v_event->>'at')::TIMESTAMPTZ, NOW()) END
+                    )
+                    ON CONFLICT (id) DO NOTHING;
+                    IF NOT FOUND THEN
+                        CONTINUE;
+                    END IF;
+                    IF v_type = 'confirmed' THEN
+                        v_change := -v_quantity;
+                    END IF;
+                END IF;
+            END IF;
+
+            IF v_change <> 0 THEN
+                SELECT stock_quantity, name INTO v_stock, v_name FROM products WHERE id = v_product FOR UPDATE;
+                IF p_strict AND v_stock + v_change < 0 THEN
+                    RAISE EXCEPTION 'Estoque insuficiente';
+                END IF;
+
+                -- Em lote (Redis já garantiu o saldo), diferenças são corrigidas na reconciliação
+                UPDATE products
+                SET stock_quantity = GREATEST(v_stock + v_change, 0),
+                    updated_at = NOW()
+                WHERE id = v_product;
+
+                INSERT INTO stock_movements (product_id, product_name, reservation_id, previous_stock, new_stock, quantity_change, operation)
+                VALUES (v_product, v_name, v_reservation, v_stock, GREATEST(v_stock + v_change, 0), v_change, v_type);
+            END IF;
+
+            v_applied := v_applied + 1;
+        EXCEPTION
+            WHEN OTHERS THEN
+                v_failed := v_failed || jsonb_build_object(
+                    'index', v_index - 1,
+                    'reservation_id', v_event->>'reservation_id',
+                    'error', SQLERRM
+                );
+        END;
+    END LOOP;
+
+    -- Modo estrito (uma reserva direta no banco): a falha é o resultado da chamada
+    IF p_strict AND jsonb_array_length(v_failed) > 0 THEN
+        RETURN jsonb_build_object('success', false, 'error', v_failed->0->>'error', 'failed', v_failed);
+    END IF;
+
+    RETURN jsonb_build_object('success', true, 'applied', v_applied, 'failed', v_failed);
+
+EXCEPTION
+    WHEN OTHERS THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', SQLERRM
+        );
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION expire_stock_reservations(p_before TIMESTAMPTZ)
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    WITH expired AS (
+        UPDATE stock_reservations
+        SET status = 'expired', cancelled_at = NOW()
+        WHERE status = 'reserved' AND expires_at < p_before
+        RETURNING product_id, quantity
+    ),
+    totals AS (
+        SELECT product_id, SUM(quantity)::INTEGER AS quantity, COUNT(*)::INTEGER AS reservations
+        FROM expired
+        GROUP BY product_id
+    ),
+    restored AS (
+        UPDATE products p
+        SET stock_quantity = p.stock_quantity + t.quantity,
+            updated_at = NOW()
+        FROM totals t
+        WHERE p.id = t.product_id
+        RETURNING t.reservations
+    )
+    SELECT COALESCE(SUM(reservations), 0) INTO v_count FROM restored;
+
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE stock_reservations IS 'Reservas de estoque (gravadas em lote a partir do livro de estoque no Redis)';
+COMMENT ON TABLE stock_movements IS 'Movimentações de estoque aplicadas pelas reservas';
+COMMENT ON FUNCTION apply_stock_events(JSONB, BOOLEAN) IS
+'Aplica um lote de eventos de reserva em uma transação (eventos que falham voltam em failed, por índice); p_strict recusa estoque negativo (reserva sem Redis)';
+COMMENT ON FUNCTION expire_stock_reservations(TIMESTAMPTZ) IS
+'Expira reservas pendentes vencidas antes de p_before e devolve o estoque';
+
+SELECT 'Migração 044: Livro de estoque configurado!' as status;
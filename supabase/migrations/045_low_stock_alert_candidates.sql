@@ -0,0 +1,146 @@
+-- ============================================================
+-- Migração 045: Avaliação de Alertas de Estoque em Conjunto
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- Os alertas de estoque baixo eram avaliados produto a produto (uma
+-- consulta às configurações e outra ao histórico por produto). Esta
+-- migração:
+-- 1. Cria get_low_stock_alert_candidates: devolve, em uma consulta, os
+--    produtos que precisam de alerta (configuração + histórico recente)
+-- 2. Cria resolve_restocked_inventory_alerts: resolve os alertas de
+--    produtos que voltaram acima do limite, liberando novos alertas
+-- 3. Cria índice parcial para o histórico de alertas em aberto e um índice
+--    único parcial (um alerta em aberto por produto)
+-- 4. Cria insert_inventory_alerts: grava o lote com ON CONFLICT DO NOTHING,
+--    então avaliações concorrentes do mesmo produto gravam (e notificam)
+--    um único alerta
+-- ============================================================
+
+-- ============================================================
+-- 1. ÍNDICES
+-- ============================================================
+
+CREATE INDEX IF NOT EXISTS idx_inventory_alert_history_open
+    ON inventory_alert_history(product_id, sent_at DESC) WHERE is_resolved = false;
+
+-- Alertas em aberto repetidos (avaliações concorrentes antes desta
+-- migração): mantém o mais recente de cada produto
+UPDATE inventory_alert_history h
+SET is_resolved = true,
+    resolved_at = NOW()
+WHERE h.is_resolved = false
+  AND EXISTS (
+      SELECT 1
+      FROM inventory_alert_history newer
+      WHERE newer.product_id = h.product_id
+        AND newer.is_resolved = false
+        AND (newer.sent_at, newer.id) > (h.sent_at, h.id)
+  );
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_inventory_alert_history_one_open
+    ON inventory_alert_history(product_id) WHERE is_resolved = false;
+
+-- ============================================================
+-- 2. FUNÇÕES
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION get_low_stock_alert_candidates(
+    p_default_threshold INTEGER,
+    p_window_hours INTEGER DEFAULT 24,
+    p_product_ids UUID[] DEFAULT NULL
+)
+RETURNS TABLE (
+    product_id UUID,
+    product_name TEXT,
+    stock_quantity INTEGER,
+    threshold INTEGER,
+    notify_email TEXT[],
+    notify_admins BOOLEAN
+) AS $$
+    SELECT
+        p.id,
+        p.name,
+        p.stock_quantity,
+        COALESCE(s.threshold, p_default_threshold),
+        COALESCE(s.notify_email, ARRAY[]::TEXT[]),
+        COALESCE(s.notify_admins, true)
+    FROM products p
+    LEFT JOIN inventory_alert_settings s ON s.product_id = p.id
+    WHERE p.is_active = true
+      AND (s.id IS NULL OR s.enabled = true)
+      AND p.stock_quantity <= COALESCE(s.threshold, p_default_threshold)
+      AND (p_product_ids IS NULL OR p.id = ANY(p_product_ids))
+      AND NOT EXISTS (
+          SELECT 1
+          FROM inventory_alert_history h
+          WHERE h.product_id = p.id
+            AND h.is_resolved = false
+            AND h.sent_at >= NOW() - make_interval(hours => p_window_hours)
+      )
+    ORDER BY p.stock_quantity ASC;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION resolve_restocked_inventory_alerts(p_default_threshold INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    UPDATE inventory_alert_history h
+    SET is_resolved = true,
+        resolved_at = NOW()
+    FROM products p
+    LEFT JOIN inventory_alert_settings s ON s.product_id = p.id
+    WHERE h.product_id = p.id
+      AND h.is_resolved = false
+      AND p.stock_quantity > COALESCE(s.threshold, p_default_threshold);
+
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Grava um lote de alertas e retorna só os gravados. Alertas em aberto mais
+-- antigos que a janela são resolvidos antes (o produto volta a ser alertado,
+-- como em get_low_stock_alert_candidates); com um alerta em aberto recente,
+-- ou gravado por outra avaliação ao mesmo tempo, o produto é ignorado.
+CREATE OR REPLACE FUNCTION insert_inventory_alerts(p_alerts JSONB, p_window_hours INTEGER DEFAULT 24)
+RETURNS SETOF inventory_alert_history AS $$
+BEGIN
+    UPDATE inventory_alert_history h
+    SET is_resolved = true,
+        resolved_at = NOW()
+    WHERE h.is_resolved = false
+      AND h.sent_at < NOW() - make_interval(hours => p_window_hours)
+      AND h.product_id IN (SELECT (a->>'product_id')::UUID FROM jsonb_array_elements(p_alerts) AS a);
+
+    RETURN QUERY
+    INSERT INTO inventory_alert_history (
+        product_id, product_name, threshold, stock_quantity, alert_type,
+        notified_emails, notified_admins, sent_at, is_resolved
+    )
+    SELECT
+        (a->>'product_id')::UUID,
+        a->>'product_name',
+        (a->>'threshold')::INTEGER,
+        (a->>'stock_quantity')::INTEGER,
+        a->>'alert_type',
+        ARRAY(SELECT jsonb_array_elements_text(COALESCE(a->'notified_emails', '[]'::jsonb))),
+        COALESCE((a->>'notified_admins')::BOOLEAN, false),
+        COALESCE((a->>'sent_at')::TIMESTAMPTZ, NOW()),
+        false
+    FROM jsonb_array_elements(p_alerts) AS a
+    ON CONFLICT (product_id) WHERE is_resolved = false DO NOTHING
+    RETURNING *;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION get_low_stock_alert_candidates(INTEGER, INTEGER, UUID[]) IS
+'Produtos ativos no limite de estoque (configuração do produto ou p_default_threshold) sem alerta em aberto na janela';
+COMMENT ON FUNCTION resolve_restocked_inventory_alerts(INTEGER) IS
+'Resolve alertas em aberto de produtos que voltaram acima do limite';
+COMMENT ON FUNCTION insert_inventory_alerts(JSONB, INTEGER) IS
+'Grava alertas de estoque (um em aberto por produto) e retorna os gravados';
+
+SELECT 'Migração 045: Avaliação de alertas de estoque configurada!' as status;
@@ -0,0 +1,132 @@
+-- ============================================================
+-- Migração 046: Gravação em Lote de Webhooks de Pagamento
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- Webhooks de pagamento são recebidos pela API, enfileirados no Redis
+-- (services/webhook_inbox.py) e processados por workers/webhook_worker.py.
+-- Esta migração:
+-- 1. Cria apply_payment_webhooks: registra um lote de webhooks em
+--    processed_webhooks e aplica os status de pagamento dos pedidos em uma
+--    transação, na ordem recebida; webhooks já registrados são ignorados e
+--    eventos com erro são devolvidos em failed sem desfazer os demais
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION apply_payment_webhooks(p_events JSONB)
+RETURNS JSONB AS $$
+DECLARE
+    v_event JSONB;
+    v_index BIGINT;
+    v_order UUID;
+    v_status TEXT;
+    v_previous TEXT;
+    v_user UUID;
+    v_skip TEXT;
+    v_applied INTEGER := 0;
+    v_paid JSONB := '[]'::JSONB;
+    v_skipped JSONB := '[]'::JSONB;
+    v_failed JSONB := '[]'::JSONB;
+    v_blocked TEXT[] := '{}';
+BEGIN
+    FOR v_event, v_index IN SELECT * FROM jsonb_array_elements(COALESCE(p_events, '[]'::JSONB)) WITH ORDINALITY
+    LOOP
+        -- Depois de uma falha, os eventos seguintes da mesma chave de ordenação
+        -- não são aplicados: voltam em failed junto com ela
+        IF v_event->>'ordering_key' = ANY(v_blocked) THEN
+            v_failed := v_failed || jsonb_build_object(
+                'index', v_index - 1,
+                'webhook_id', v_event->>'webhook_id',
+                'error', 'held'
+            );
+            CONTINUE;
+        END IF;
+
+        -- Cada evento em sua própria subtransação: um evento com erro volta em
+        -- failed sem desfazer os demais do lote
+        BEGIN
+            v_order := NULL;
+            v_skip := NULL;
+            v_status := v_event->>'payment_status';
+
+            -- order_id vem do provider: o que não é UUID ou não existe é registrado
+            -- sem pedido (skipped), em vez de falhar a cada nova tentativa
+            IF v_event->>'order_id' ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$' THEN
+                v_order := (v_event->>'order_id')::UUID;
+                SELECT payment_status, user_id INTO v_previous, v_user FROM orders WHERE id = v_order FOR UPDATE;
+                IF NOT FOUND THEN
+                    v_order := NULL;
+                    v_skip := 'order_not_found';
+                END IF;
+            ELSIF NULLIF(v_event->>'order_id', '') IS NOT NULL THEN
+                v_skip := 'invalid_order_id';
+            END IF;
+
+            INSERT INTO processed_webhooks (webhook_id, provider, event_type, order_id, transaction_id, result)
+            VALUES (
+                v_event->>'webhook_id',
+                v_event->>'provider',
+                COALESCE(v_event->>'event_type', 'unknown'),
+                v_order,
+                v_event->>'transaction_id',
+                jsonb_strip_nulls(jsonb_build_object('payment_status', v_status, 'skipped', v_skip))
+            )
+            ON CONFLICT (webhook_id, provider) DO NOTHING;
+            CONTINUE WHEN NOT FOUND;
+
+            v_applied := v_applied + 1;
+            IF v_skip IS NOT NULL THEN
+                v_skipped := v_skipped || jsonb_build_object(
+                    'index', v_index - 1,
+                    'webhook_id', v_event->>'webhook_id',
+                    'reason', v_skip
+                );
+            END IF;
+            CONTINUE WHEN v_order IS NULL OR v_status IS NULL;
+            -- Notificação atrasada não desfaz um pagamento: pago só muda por reembolso,
+            -- e reembolsado não muda mais
+            CONTINUE WHEN v_previous = 'paid' AND v_status NOT IN ('paid', 'refunded');
+            CONTINUE WHEN v_previous = 'refunded';
+
+            UPDATE orders
+            SET payment_status = v_status,
+                status = COALESCE(v_event->>'order_status', status),
+                transaction_id = COALESCE(v_event->>'transaction_id', transaction_id),
+                updated_at = NOW()
+            WHERE id = v_order;
+
+            IF v_status = 'paid' AND v_previous IS DISTINCT FROM 'paid' THEN
+                v_paid := v_paid || jsonb_build_object('order_id', v_order, 'user_id', v_user);
+            END IF;
+        EXCEPTION
+            WHEN OTHERS THEN
+                v_blocked := v_blocked || (v_event->>'ordering_key');
+                v_failed := v_failed || jsonb_build_object(
+                    'index', v_index - 1,
+                    'webhook_id', v_event->>'webhook_id',
+                    'error', SQLERRM
+                );
+        END;
+    END LOOP;
+
+    RETURN jsonb_build_object(
+        'success', true,
+        'applied', v_applied,
+        'paid', v_paid,
+        'skipped', v_skipped,
+        'failed', v_failed
+    );
+
+EXCEPTION
+    WHEN OTHERS THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', SQLERRM
+        );
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION apply_payment_webhooks(JSONB) IS
+'Registra um lote de webhooks de pagamento e aplica os status dos pedidos em uma transação (eventos que falham voltam em failed, por índice); devolve os pedidos que passaram a pagos';
+
+SELECT 'Migração 046: Gravação em lote de webhooks configurada!' as status;
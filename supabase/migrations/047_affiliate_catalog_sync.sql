@@ -0,0 +1,112 @@
+-- ============================================================
+-- Migração 047: Sincronização Incremental do Catálogo de Afiliados
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- A sincronização de produtos de afiliados buscava só a primeira página
+-- de cada plataforma e gravava produto a produto. Esta migração:
+-- 1. Adiciona products.content_hash: hash do conteúdo vindo da
+--    plataforma, para gravar só o que mudou
+-- 2. Cria affiliate_sync_state: cursor (próxima página) e métricas da
+--    última execução por plataforma, para retomar uma sincronização
+--    interrompida
+-- 3. Cria upsert_affiliate_products: grava um lote de produtos
+--    (atualiza os existentes que mudaram e insere os novos)
+-- ============================================================
+
+-- ============================================================
+-- 1. COLUNAS E ÍNDICES
+-- ============================================================
+
+ALTER TABLE products
+ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);
+
+CREATE INDEX IF NOT EXISTS idx_products_platform_product
+    ON products(product_source, platform_product_id) WHERE platform_product_id IS NOT NULL;
+
+COMMENT ON COLUMN products.content_hash IS 'Hash do conteúdo do produto na plataforma externa (sincronização incremental)';
+
+-- ============================================================
+-- 2. TABELAS
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS affiliate_sync_state (
+    platform VARCHAR(50) PRIMARY KEY,
+    cursor INTEGER NOT NULL DEFAULT 0,
+    last_started_at TIMESTAMP WITH TIME ZONE,
+    last_completed_at TIMESTAMP WITH TIME ZONE,
+    last_stats JSONB DEFAULT '{}'::jsonb,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE affiliate_sync_state ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE affiliate_sync_state IS 'Estado da sincronização do catálogo por plataforma de afiliados';
+COMMENT ON COLUMN affiliate_sync_state.cursor IS 'Próxima página a sincronizar (0 = recomeçar do início)';
+
+-- ============================================================
+-- 3. FUNÇÕES
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION upsert_affiliate_products(p_products JSONB)
+RETURNS JSONB AS $$
+DECLARE
+    v_updated INTEGER;
+    v_inserted INTEGER;
+BEGIN
+    -- Execuções simultâneas não podem inserir o mesmo produto duas vezes
+    PERFORM pg_advisory_xact_lock(hashtext('upsert_affiliate_products'));
+
+    UPDATE products p
+    SET name = i.name,
+        description = i.description,
+        price = i.price,
+        image_url = i.image_url,
+        category = i.category,
+        tags = i.tags,
+        platform_url = i.platform_url,
+        content_hash = i.content_hash,
+        is_active = true,
+        updated_at = NOW()
+    FROM jsonb_to_recordset(p_products) AS i(
+        platform_product_id TEXT, product_source TEXT, name TEXT, description TEXT, price NUMERIC,
+        image_url TEXT, category TEXT, tags TEXT[], platform_url TEXT, content_hash TEXT
+    )
+    WHERE p.product_source = i.product_source
+      AND p.platform_product_id = i.platform_product_id
+      AND p.content_hash IS DISTINCT FROM i.content_hash;
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+
+    INSERT INTO products (
+        name, description, price, image_url, category, tags, platform_url, platform_product_id,
+        product_source, product_type, requires_shipping, content_hash
+    )
+    SELECT DISTINCT ON (i.product_source, i.platform_product_id)
+        i.name, i.description, i.price, i.image_url, i.category, i.tags, i.platform_url,
+        i.platform_product_id, i.product_source, 'digital', false, i.content_hash
+    FROM jsonb_to_recordset(p_products) AS i(
+        platform_product_id TEXT, product_source TEXT, name TEXT, description TEXT, price NUMERIC,
+        image_url TEXT, category TEXT, tags TEXT[], platform_url TEXT, content_hash TEXT
+    )
+    WHERE NOT EXISTS (
+        SELECT 1 FROM products p
+        WHERE p.product_source = i.product_source AND p.platform_product_id = i.platform_product_id
+    );
+    GET DIAGNOSTICS v_inserted = ROW_COUNT;
+
+    RETURN jsonb_build_object('success', true, 'updated', v_updated, 'inserted', v_inserted);
+
+EXCEPTION
+    WHEN OTHERS THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', SQLERRM
+        );
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION upsert_affiliate_products(JSONB) IS
+'Grava um lote de produtos de afiliados: atualiza os que mudaram (content_hash) e insere os novos';
+
+SELECT 'Migração 047: Sincronização incremental de afiliados configurada!' as status;
@@ -0,0 +1,209 @@
+-- ============================================================
+-- Migração 048: Histórico de Pedidos em Uma Consulta
+-- Para: RE-EDUCA Store - Sistema de Reeducação de Estilo de Vida
+-- Data: 2026-10-19
+-- ============================================================
+--
+-- O histórico de pedidos era lido com paginação por offset, e os itens e
+-- produtos eram buscados à parte (um find_by_id por item em alguns
+-- serviços). Esta migração:
+-- 1. Cria índices para paginação por cursor (created_at, id)
+-- 2. Cria get_order_history: devolve os pedidos com os itens embutidos
+--    (preço do pedido, nome, imagem e categoria do produto) em uma
+--    consulta, paginados por cursor
+-- 3. Atualiza apply_payment_webhooks para devolver também todos os
+--    pedidos alterados (a API invalida o histórico em cache dos usuários)
+-- ============================================================
+
+-- ============================================================
+-- 1. ÍNDICES
+-- ============================================================
+
+CREATE INDEX IF NOT EXISTS idx_orders_user_created_id ON orders(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_created_id ON orders(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id);
+
+-- ============================================================
+-- 2. FUNÇÕES
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION get_order_history(
+    p_user_id UUID,
+    p_limit INTEGER DEFAULT 20,
+    p_before_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_before_id UUID DEFAULT NULL,
+    p_offset INTEGER DEFAULT 0,
+    p_order_id UUID DEFAULT NULL,
+    p_status TEXT DEFAULT NULL,
+    p_with_user BOOLEAN DEFAULT false
+)
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_agg(page.projection ORDER BY page.created_at DESC, page.id DESC), '[]'::JSONB)
+    FROM (
+        SELECT
+            o.id,
+            o.created_at,
+            to_jsonb(o)
+                || jsonb_build_object(
+                    'items',
+                    COALESCE(
+                        (
+                            SELECT jsonb_agg(
+                                jsonb_build_object(
+                                    'id', oi.id,
+                                    'product_id', oi.product_id,
+                                    'quantity', oi.quantity,
+                                    'price', oi.price,
+                                    'name', COALESCE(p.name, 'Produto'),
+                                    'image_url', p.image_url,
+                                    'category', p.category
+                                )
+                                ORDER BY oi.created_at, oi.id
+                            )
+                            FROM order_items oi
+                            LEFT JOIN products p ON p.id = oi.product_id
+                            WHERE oi.order_id = o.id
+                        ),
+                        '[]'::JSONB
+                    )
+                )
+                || CASE
+                    WHEN p_with_user THEN jsonb_build_object(
+                        'users',
+                        (SELECT jsonb_build_object('name', u.name, 'email', u.email) FROM users u WHERE u.id = o.user_id)
+                    )
+                    ELSE '{}'::JSONB
+                END AS projection
+        FROM orders o
+        WHERE (p_user_id IS NULL OR o.user_id = p_user_id)
+          AND (p_order_id IS NULL OR o.id = p_order_id)
+          AND (p_status IS NULL OR o.status = p_status)
+          AND (p_before_created_at IS NULL OR (o.created_at, o.id) < (p_before_created_at, p_before_id))
+        ORDER BY o.created_at DESC, o.id DESC
+        OFFSET CASE WHEN p_before_created_at IS NULL THEN GREATEST(p_offset, 0) ELSE 0 END
+        LIMIT GREATEST(p_limit, 1)
+    ) page;
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION get_order_history(UUID, INTEGER, TIMESTAMP WITH TIME ZONE, UUID, INTEGER, UUID, TEXT, BOOLEAN) IS
+'Pedidos com itens embutidos em uma consulta; paginação por cursor (created_at, id), ou offset sem cursor';
+
+CREATE OR REPLACE FUNCTION apply_payment_webhooks(p_events JSONB)
+RETURNS JSONB AS $$
+DECLARE
+    v_event JSONB;
+    v_index BIGINT;
+    v_order UUID;
+    v_status TEXT;
+    v_previous TEXT;
+    v_user UUID;
+    v_skip TEXT;
+    v_applied INTEGER := 0;
+    v_paid JSONB := '[]'::JSONB;
+    v_orders JSONB := '[]'::JSONB;
+    v_skipped JSONB := '[]'::JSONB;
+    v_failed JSONB := '[]'::JSONB;
+    v_blocked TEXT[] := '{}';
+BEGIN
+    FOR v_event, v_index IN SELECT * FROM jsonb_array_elements(COALESCE(p_events, '[]'::JSONB)) WITH ORDINALITY
+    LOOP
+        -- Depois de uma falha, os eventos seguintes da mesma chave de ordenação
+        -- não são aplicados: voltam em failed junto com ela
+        IF v_event->>'ordering_key' = ANY(v_blocked) THEN
+            v_failed := v_failed || jsonb_build_object(
+                'index', v_index - 1,
+                'webhook_id', v_event->>'webhook_id',
+                'error', 'held'
+            );
+            CONTINUE;
+        END IF;
+
+        -- Cada evento em sua própria subtransação: um evento com erro volta em
+        -- failed sem desfazer os demais do lote
+        BEGIN
+            v_order := NULL;
+            v_skip := NULL;
+            v_status := v_event->>'payment_status';
+
+            -- order_id vem do provider: o que não é UUID ou não existe é registrado
+            -- sem pedido (skipped), em vez de falhar a cada nova tentativa
+            IF v_event->>'order_id' ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$' THEN
+                v_order := (v_event->>'order_id')::UUID;
+                SELECT payment_status, user_id INTO v_previous, v_user FROM orders WHERE id = v_order FOR UPDATE;
+                IF NOT FOUND THEN
+                    v_order := NULL;
+                    v_skip := 'order_not_found';
+                END IF;
+            ELSIF NULLIF(v_event->>'order_id', '') IS NOT NULL THEN
+                v_skip := 'invalid_order_id';
+            END IF;
+
+            INSERT INTO processed_webhooks (webhook_id, provider, event_type, order_id, transaction_id, result)
+            VALUES (
+                v_event->>'webhook_id',
+                v_event->>'provider',
+                COALESCE(v_event->>'event_type', 'unknown'),
+                v_order,
+                v_event->>'transaction_id',
+                jsonb_strip_nulls(jsonb_build_object('payment_status', v_status, 'skipped', v_skip))
+            )
+            ON CONFLICT (webhook_id, provider) DO NOTHING;
+            CONTINUE WHEN NOT FOUND;
+
+            v_applied := v_applied + 1;
+            IF v_skip IS NOT NULL THEN
+                v_skipped := v_skipped || jsonb_build_object(
+                    'index', v_index - 1,
+                    'webhook_id', v_event->>'webhook_id',
+                    'reason', v_skip
+                );
+            END IF;
+            CONTINUE WHEN v_order IS NULL OR v_status IS NULL;
+            -- Notificação atrasada não desfaz um pagamento: pago só muda por reembolso,
+            -- e reembolsado não muda mais
+            CONTINUE WHEN v_previous = 'paid' AND v_status NOT IN ('paid', 'refunded');
+            CONTINUE WHEN v_previous = 'refunded';
+
+            UPDATE orders
+            SET payment_status = v_status,
+                status = COALESCE(v_event->>'order_status', status),
+                transaction_id = COALESCE(v_event->>'transaction_id', transaction_id),
+                updated_at = NOW()
+            WHERE id = v_order;
+
+            v_orders := v_orders || jsonb_build_object('order_id', v_order, 'user_id', v_user);
+            IF v_status = 'paid' AND v_previous IS DISTINCT FROM 'paid' THEN
+                v_paid := v_paid || jsonb_build_object('order_id', v_order, 'user_id', v_user);
+            END IF;
+        EXCEPTION
+            WHEN OTHERS THEN
+                v_blocked := v_blocked || (v_event->>'ordering_key');
+                v_failed := v_failed || jsonb_build_object(
+                    'index', v_index - 1,
+                    'webhook_id', v_event->>'webhook_id',
+                    'error', SQLERRM
+                );
+        END;
+    END LOOP;
+
+    RETURN jsonb_build_object(
+        'success', true,
+        'applied', v_applied,
+        'paid', v_paid, 'orders', v_orders,
+        'skipped', v_skipped,
+        'failed', v_failed
+    );
+
+EXCEPTION
+    WHEN OTHERS THEN
+        RETURN jsonb_build_object(
+            'success', false,
+            'error', SQLERRM
+        );
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION apply_payment_webhooks(JSONB) IS
+'Registra um lote de webhooks de pagamento e aplica os status dos pedidos em uma transação (eventos que falham voltam em failed, por índice); devolve os pedidos alterados e os que passaram a pagos';
+
+SELECT 'Migração 048: Histórico de pedidos em uma consulta configurado!' as status;